@@ -52,6 +52,11 @@ class GuardianConfig:
     enable_tamper_protection: bool = True
     audit_encryption_enabled: bool = True
     audit_log_level: str = "detailed"  # minimal, standard, detailed
+    audit_storage_dir: str = field(
+        default_factory=lambda: os.getenv("GUARDIAN_AUDIT_DIR", "")
+    )  # empty: temporary directory owned by the service
+    audit_segment_minutes: int = 60  # time partition per segment file
+    audit_index_cache_segments: int = 16  # segment indexes kept in memory
 
     # Data protection configuration
     enable_data_encryption: bool = True
@@ -137,6 +142,9 @@ class GuardianConfig:
             "encryption": self.audit_encryption_enabled,
             "log_level": self.audit_log_level,
             "max_records_per_batch": self.max_audit_records_per_batch,
+            "storage_dir": self.audit_storage_dir,
+            "segment_minutes": self.audit_segment_minutes,
+            "index_cache_segments": self.audit_index_cache_segments,
         }
 
     def get_data_protection_config(self) -> Dict[str, Any]:
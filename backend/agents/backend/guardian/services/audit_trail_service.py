@@ -6,10 +6,10 @@ Handles comprehensive audit logging, trail management, and forensic analysis.
 import asyncio
 import json
 import hashlib
-import hmac
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Set, Union
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List, Set, Iterator
+from dataclasses import dataclass, field
 from enum import Enum
 import zlib
 import base64
@@ -25,6 +25,7 @@ from agents.backend.guardian.core.constants import (
     SECURITY_EVENT_TYPES,
     DATA_CLASSIFICATION_LEVELS,
 )
+from core.audit_log_store import AuditLogStore
 from core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -90,6 +91,92 @@ class AuditQuery:
     offset: Optional[int] = None
 
 
+SEVERITY_ORDER = ["critical", "high", "medium", "low", "info"]
+
+ACCESS_EVENT_TYPES = (
+    AuditEventType.AUTHENTICATION,
+    AuditEventType.AUTHORIZATION,
+    AuditEventType.DATA_ACCESS,
+)
+
+
+@dataclass
+class AuditReportStats:
+    """
+    Counters for audit reports, accumulated one event at a time.
+
+    Reports only need aggregates, so events are streamed from storage into
+    these counters instead of being materialized as a list.
+    """
+
+    total: int = 0
+    security_events: int = 0
+    failed_events: int = 0
+    tagged_events: int = 0
+    access_events: int = 0
+    risk_total: float = 0.0
+    high_risk_events: int = 0  # risk_score >= 7
+    very_high_risk_events: int = 0  # risk_score >= 8
+    type_counts: Counter = field(default_factory=Counter)
+    severity_counts: Counter = field(default_factory=Counter)
+    actor_counts: Counter = field(default_factory=Counter)
+    tag_counts: Counter = field(default_factory=Counter)
+    type_outcomes: Counter = field(default_factory=Counter)
+    type_severities: Counter = field(default_factory=Counter)
+    hourly_counts: Counter = field(default_factory=Counter)
+    window_counts: Counter = field(default_factory=Counter)
+    source_ips: Counter = field(default_factory=Counter)
+    user_agents: Counter = field(default_factory=Counter)
+
+    def add(self, event: AuditEvent) -> None:
+        self.total += 1
+        self.type_counts[event.event_type.value] += 1
+        self.severity_counts[event.severity.value] += 1
+        self.actor_counts[event.actor] += 1
+        self.type_outcomes[(event.event_type, event.outcome)] += 1
+        self.type_severities[(event.event_type, event.severity)] += 1
+
+        if event.event_type == AuditEventType.SECURITY or event.severity in (
+            AuditSeverity.CRITICAL,
+            AuditSeverity.HIGH,
+        ):
+            self.security_events += 1
+        if event.outcome == "failure":
+            self.failed_events += 1
+
+        self.risk_total += event.risk_score
+        if event.risk_score >= 7.0:
+            self.high_risk_events += 1
+        if event.risk_score >= 8.0:
+            self.very_high_risk_events += 1
+
+        if event.compliance_tags:
+            self.tagged_events += 1
+            self.tag_counts.update(event.compliance_tags)
+
+        timestamp = event.timestamp
+        self.hourly_counts[timestamp.replace(minute=0, second=0, microsecond=0)] += 1
+        self.window_counts[
+            timestamp.replace(
+                minute=(timestamp.minute // 5) * 5, second=0, microsecond=0
+            )
+        ] += 1
+
+        if event.event_type in ACCESS_EVENT_TYPES:
+            self.access_events += 1
+            if event.source_ip:
+                self.source_ips[event.source_ip] += 1
+            if event.user_agent:
+                self.user_agents[event.user_agent] += 1
+
+    def count_type(
+        self, event_type: AuditEventType, outcome: Optional[str] = None
+    ) -> int:
+        if outcome is not None:
+            return self.type_outcomes[(event_type, outcome)]
+        return self.type_counts[event_type.value]
+
+
 class AuditTrailService:
     """
     Comprehensive audit trail service for security and compliance logging.
@@ -103,15 +190,17 @@ class AuditTrailService:
     - Automated retention management
     - Audit data encryption
     - Chain of custody tracking
+
+    Events are kept in an AuditLogStore: append-only segment files
+    partitioned by time, with bitmap indexes and Merkle roots signed once
+    per batch of ``max_audit_records_per_batch`` events.
     """
 
     def __init__(self, config: GuardianConfig):
         self.config = config
-        self._audit_events: List[AuditEvent] = []
-        self._audit_indexes: Dict[str, Dict[str, Set[str]]] = {}
+        self._store: Optional[AuditLogStore] = None
         self._encryption_key: Optional[bytes] = None
         self._signing_key: Optional[bytes] = None
-        self._chain_hash: Optional[str] = None
         self._monitoring_active = False
         self._audit_tasks: Set[asyncio.Task] = set()
         self._retention_manager_task: Optional[asyncio.Task] = None
@@ -128,8 +217,8 @@ class AuditTrailService:
             if self.config.enable_tamper_protection:
                 await self._initialize_integrity_protection()
 
-            # Initialize audit indexes
-            await self._initialize_audit_indexes()
+            # Initialize segmented audit storage
+            await self._initialize_audit_storage()
 
             # Start audit monitoring
             if self.config.enable_audit_trail:
@@ -152,25 +241,22 @@ class AuditTrailService:
             "sha256", b"audit_encryption_key", b"audit_salt", 100000
         )
 
+    async def _initialize_integrity_protection(self) -> None:
+        """Initialize tamper protection mechanisms."""
+        # Key for the HMAC of each batch Merkle root (chained to the previous root)
         self._signing_key = hashlib.pbkdf2_hmac(
             "sha256", b"audit_signing_key", b"signing_salt", 100000
         )
 
-    async def _initialize_integrity_protection(self) -> None:
-        """Initialize tamper protection mechanisms."""
-        # Initialize chain hash for blockchain-like integrity
-        self._chain_hash = hashlib.sha256(b"audit_chain_genesis").hexdigest()
-
-    async def _initialize_audit_indexes(self) -> None:
-        """Initialize audit event indexes for fast queries."""
-        self._audit_indexes = {
-            "by_type": {},
-            "by_actor": {},
-            "by_resource": {},
-            "by_severity": {},
-            "by_compliance_tag": {},
-            "by_date": {},
-        }
+    async def _initialize_audit_storage(self) -> None:
+        """Open the segmented audit log (segments, bitmap indexes, batch signing)."""
+        self._store = AuditLogStore(
+            directory=self.config.audit_storage_dir or None,
+            segment_seconds=self.config.audit_segment_minutes * 60,
+            batch_size=self.config.max_audit_records_per_batch,
+            signing_key=self._signing_key,
+            cached_segments=self.config.audit_index_cache_segments,
+        )
 
     async def start_audit_monitoring(self) -> None:
         """Start audit trail monitoring."""
@@ -236,8 +322,8 @@ class AuditTrailService:
             try:
                 await asyncio.sleep(300)  # Check every 5 minutes
 
-                # Verify audit chain integrity
-                integrity_status = await self._verify_audit_chain()
+                # Cheap pass: unchanged sealed segments are re-checked in rotation
+                integrity_status = await self._verify_audit_chain(quick=True)
 
                 if not integrity_status["valid"]:
                     await self._handle_integrity_violation(integrity_status)
@@ -292,14 +378,7 @@ class AuditTrailService:
                     days=self.config.audit_retention_days
                 )
 
-                expired_events = [
-                    event
-                    for event in self._audit_events
-                    if event.timestamp < cutoff_date
-                ]
-
-                if expired_events:
-                    await self._archive_expired_events(expired_events)
+                await self._archive_expired_events(cutoff_date)
 
             except asyncio.CancelledError:
                 break
@@ -340,6 +419,11 @@ class AuditTrailService:
             str: Event ID of the logged event
         """
         try:
+            if self._store is None:
+                raise AuditTrailError(
+                    "Audit storage is not initialized", operation="log_event"
+                )
+
             # Generate event ID
             event_id = self._generate_event_id()
 
@@ -366,19 +450,15 @@ class AuditTrailService:
                 compliance_tags=compliance_tags or [],
             )
 
-            # Add integrity protection
-            if self.config.enable_tamper_protection:
-                await self._protect_event_integrity(audit_event)
-
             # Encrypt if required
             if self.config.audit_encryption_enabled:
                 await self._encrypt_audit_event(audit_event)
 
-            # Store event
-            self._audit_events.append(audit_event)
-
-            # Update indexes
-            await self._update_audit_indexes(audit_event)
+            # Append to the segment log; the stored bytes are hashed into the
+            # batch Merkle tree, which is signed once per batch
+            audit_event.hash = self._store.append(
+                self._event_to_record(audit_event), audit_event.timestamp
+            )
 
             # Check for immediate alerts
             if severity in [AuditSeverity.CRITICAL, AuditSeverity.HIGH]:
@@ -397,81 +477,95 @@ class AuditTrailService:
                 f"Audit event logging failed: {e}", operation="log_event"
             )
 
-    async def _protect_event_integrity(self, event: AuditEvent) -> None:
-        """Protect audit event integrity with cryptographic measures."""
-        # Create event hash
-        event_data = {
+    async def _encrypt_audit_event(self, event: AuditEvent) -> None:
+        """Encrypt sensitive audit event data."""
+        if not self._encryption_key:
+            return
+
+        # In production, this would use proper encryption like AES-GCM
+        # For demo, we'll use simple base64 encoding
+        sensitive_data = json.dumps(event.details)
+        encrypted = base64.b64encode(zlib.compress(sensitive_data.encode())).decode()
+
+        event.details = {"encrypted": encrypted}
+
+    def _event_to_record(self, event: AuditEvent) -> Dict[str, Any]:
+        """Serializable form of an audit event as written to the segment log."""
+        return {
             "event_id": event.event_id,
             "timestamp": event.timestamp.isoformat(),
             "event_type": event.event_type.value,
+            "severity": event.severity.value,
             "actor": event.actor,
             "action": event.action,
             "resource": event.resource,
             "outcome": event.outcome,
+            "source_ip": event.source_ip,
+            "user_agent": event.user_agent,
+            "session_id": event.session_id,
             "details": event.details,
+            "risk_score": event.risk_score,
+            "compliance_tags": event.compliance_tags,
         }
 
-        event_json = json.dumps(event_data, sort_keys=True)
-        event.hash = hashlib.sha256(event_json.encode()).hexdigest()
-
-        # Create chain hash (blockchain-like integrity)
-        chain_data = f"{self._chain_hash}{event.hash}"
-        self._chain_hash = hashlib.sha256(chain_data.encode()).hexdigest()
+    def _event_from_record(
+        self, record: Dict[str, Any], event_hash: Optional[str]
+    ) -> AuditEvent:
+        """Rebuild an audit event read from the segment log."""
+        return AuditEvent(
+            event_id=record["event_id"],
+            timestamp=datetime.fromisoformat(record["timestamp"]),
+            event_type=AuditEventType(record["event_type"]),
+            severity=AuditSeverity(record["severity"]),
+            actor=record["actor"],
+            action=record["action"],
+            resource=record["resource"],
+            outcome=record["outcome"],
+            source_ip=record["source_ip"],
+            user_agent=record["user_agent"],
+            session_id=record["session_id"],
+            details=record["details"],
+            risk_score=record["risk_score"],
+            compliance_tags=record["compliance_tags"],
+            hash=event_hash,
+        )
 
-        # Create digital signature
-        if self._signing_key:
-            event.signature = hmac.new(
-                self._signing_key, event_json.encode(), hashlib.sha256
-            ).hexdigest()
+    def iter_audit_events(self, query: AuditQuery) -> Iterator[AuditEvent]:
+        """
+        Stream audit events matching the query, newest first.
 
-    async def _encrypt_audit_event(self, event: AuditEvent) -> None:
-        """Encrypt sensitive audit event data."""
-        if not self._encryption_key:
+        Segments outside the time range are skipped, filters are resolved
+        on the per-segment bitmap indexes, and only matching events in the
+        requested page are read from disk.
+        """
+        if self._store is None:
             return
 
-        # In production, this would use proper encryption like AES-GCM
-        # For demo, we'll use simple base64 encoding
-        sensitive_data = json.dumps(event.details)
-        encrypted = base64.b64encode(zlib.compress(sensitive_data.encode())).decode()
+        severities = None
+        if query.severity_min:
+            min_index = SEVERITY_ORDER.index(query.severity_min.value)
+            severities = SEVERITY_ORDER[: min_index + 1]
 
-        event.details = {"encrypted": encrypted}
-
-    async def _update_audit_indexes(self, event: AuditEvent) -> None:
-        """Update audit indexes for fast querying."""
-        # Index by type
-        event_type = event.event_type.value
-        if event_type not in self._audit_indexes["by_type"]:
-            self._audit_indexes["by_type"][event_type] = set()
-        self._audit_indexes["by_type"][event_type].add(event.event_id)
-
-        # Index by actor
-        if event.actor not in self._audit_indexes["by_actor"]:
-            self._audit_indexes["by_actor"][event.actor] = set()
-        self._audit_indexes["by_actor"][event.actor].add(event.event_id)
-
-        # Index by resource
-        if event.resource:
-            if event.resource not in self._audit_indexes["by_resource"]:
-                self._audit_indexes["by_resource"][event.resource] = set()
-            self._audit_indexes["by_resource"][event.resource].add(event.event_id)
-
-        # Index by severity
-        severity = event.severity.value
-        if severity not in self._audit_indexes["by_severity"]:
-            self._audit_indexes["by_severity"][severity] = set()
-        self._audit_indexes["by_severity"][severity].add(event.event_id)
-
-        # Index by compliance tags
-        for tag in event.compliance_tags:
-            if tag not in self._audit_indexes["by_compliance_tag"]:
-                self._audit_indexes["by_compliance_tag"][tag] = set()
-            self._audit_indexes["by_compliance_tag"][tag].add(event.event_id)
+        filters = {
+            "event_type": (
+                [event_type.value for event_type in query.event_types]
+                if query.event_types
+                else None
+            ),
+            "severity": severities,
+            "actor": [query.actor_filter] if query.actor_filter else None,
+            "resource": [query.resource_filter] if query.resource_filter else None,
+            "compliance_tags": query.compliance_tags or None,
+        }
 
-        # Index by date
-        date_key = event.timestamp.date().isoformat()
-        if date_key not in self._audit_indexes["by_date"]:
-            self._audit_indexes["by_date"][date_key] = set()
-        self._audit_indexes["by_date"][date_key].add(event.event_id)
+        for record, event_hash in self._store.query(
+            filters,
+            start=query.start_time,
+            end=query.end_time,
+            offset=query.offset or 0,
+            limit=query.limit or None,
+        ):
+            yield self._event_from_record(record, event_hash)
 
     async def query_audit_events(self, query: AuditQuery) -> List[AuditEvent]:
         """
@@ -484,82 +578,7 @@ class AuditTrailService:
             List[AuditEvent]: Matching audit events
         """
         try:
-            # Start with all events
-            candidate_ids = set(event.event_id for event in self._audit_events)
-
-            # Filter by event types
-            if query.event_types:
-                type_ids = set()
-                for event_type in query.event_types:
-                    type_key = event_type.value
-                    if type_key in self._audit_indexes["by_type"]:
-                        type_ids.update(self._audit_indexes["by_type"][type_key])
-                candidate_ids &= type_ids
-
-            # Filter by severity
-            if query.severity_min:
-                severity_levels = ["critical", "high", "medium", "low", "info"]
-                min_index = severity_levels.index(query.severity_min.value)
-
-                severity_ids = set()
-                for severity in severity_levels[: min_index + 1]:
-                    if severity in self._audit_indexes["by_severity"]:
-                        severity_ids.update(
-                            self._audit_indexes["by_severity"][severity]
-                        )
-                candidate_ids &= severity_ids
-
-            # Filter by actor
-            if query.actor_filter:
-                if query.actor_filter in self._audit_indexes["by_actor"]:
-                    candidate_ids &= self._audit_indexes["by_actor"][query.actor_filter]
-                else:
-                    candidate_ids = set()
-
-            # Filter by resource
-            if query.resource_filter:
-                if query.resource_filter in self._audit_indexes["by_resource"]:
-                    candidate_ids &= self._audit_indexes["by_resource"][
-                        query.resource_filter
-                    ]
-                else:
-                    candidate_ids = set()
-
-            # Filter by compliance tags
-            if query.compliance_tags:
-                tag_ids = set()
-                for tag in query.compliance_tags:
-                    if tag in self._audit_indexes["by_compliance_tag"]:
-                        tag_ids.update(self._audit_indexes["by_compliance_tag"][tag])
-                candidate_ids &= tag_ids
-
-            # Get matching events
-            matching_events = [
-                event for event in self._audit_events if event.event_id in candidate_ids
-            ]
-
-            # Filter by time range
-            if query.start_time or query.end_time:
-                if query.start_time:
-                    matching_events = [
-                        e for e in matching_events if e.timestamp >= query.start_time
-                    ]
-                if query.end_time:
-                    matching_events = [
-                        e for e in matching_events if e.timestamp <= query.end_time
-                    ]
-
-            # Sort by timestamp (newest first)
-            matching_events.sort(key=lambda e: e.timestamp, reverse=True)
-
-            # Apply pagination
-            if query.offset:
-                matching_events = matching_events[query.offset :]
-
-            if query.limit:
-                matching_events = matching_events[: query.limit]
-
-            return matching_events
+            return list(self.iter_audit_events(query))
 
         except Exception as e:
             logger.error(f"Audit query failed: {e}")
@@ -592,109 +611,55 @@ class AuditTrailService:
             )
 
     async def _verify_single_event(self, event_id: str) -> Dict[str, Any]:
-        """Verify integrity of a single audit event."""
-        # Find the event
-        event = None
-        for e in self._audit_events:
-            if e.event_id == event_id:
-                event = e
-                break
-
-        if not event:
-            return {
-                "valid": False,
-                "error": f"Event {event_id} not found",
-            }
-
-        # Verify event hash
-        if event.hash:
-            event_data = {
-                "event_id": event.event_id,
-                "timestamp": event.timestamp.isoformat(),
-                "event_type": event.event_type.value,
-                "actor": event.actor,
-                "action": event.action,
-                "resource": event.resource,
-                "outcome": event.outcome,
-                "details": event.details,
-            }
-
-            event_json = json.dumps(event_data, sort_keys=True)
-            calculated_hash = hashlib.sha256(event_json.encode()).hexdigest()
-
-            if calculated_hash != event.hash:
-                return {
-                    "valid": False,
-                    "error": "Event hash mismatch",
-                    "expected": event.hash,
-                    "calculated": calculated_hash,
-                }
+        """Verify one event against its leaf hash, batch Merkle root and signature."""
+        if self._store is None:
+            return {"valid": False, "error": f"Event {event_id} not found"}
 
-        # Verify signature
-        if event.signature and self._signing_key:
-            event_data = {
-                "event_id": event.event_id,
-                "timestamp": event.timestamp.isoformat(),
-                "event_type": event.event_type.value,
-                "actor": event.actor,
-                "action": event.action,
-                "resource": event.resource,
-                "outcome": event.outcome,
-                "details": event.details,
-            }
-
-            event_json = json.dumps(event_data, sort_keys=True)
-            expected_signature = hmac.new(
-                self._signing_key, event_json.encode(), hashlib.sha256
-            ).hexdigest()
-
-            if expected_signature != event.signature:
-                return {
-                    "valid": False,
-                    "error": "Event signature mismatch",
-                }
+        verification = self._store.verify_record(
+            event_id, hint=self._event_id_timestamp(event_id)
+        )
+        if not verification["valid"]:
+            return verification
 
         return {
             "valid": True,
             "event_id": event_id,
+            "signed": verification["signed"],
             "verification_time": datetime.utcnow().isoformat(),
         }
 
-    async def _verify_audit_chain(self) -> Dict[str, Any]:
-        """Verify integrity of the entire audit chain."""
-        if not self._audit_events:
+    async def _verify_audit_chain(self, quick: bool = False) -> Dict[str, Any]:
+        """
+        Verify integrity of the entire audit chain.
+
+        Each batch root is recomputed from the segment log and checked
+        against its signature and the previous root. With ``quick`` (used by
+        the periodic monitor) sealed segments whose files look unchanged are
+        skipped, apart from one re-verified in rotation on every pass.
+        """
+        if self._store is None or self._store.count == 0:
             return {
                 "valid": True,
                 "events_verified": 0,
                 "chain_integrity": True,
             }
 
-        verified_count = 0
+        verification = self._store.verify(quick=quick)
         integrity_violations = []
-
-        # Verify each event
-        for event in self._audit_events:
-            verification = await self._verify_single_event(event.event_id)
-
-            if verification["valid"]:
-                verified_count += 1
-            else:
-                integrity_violations.append(
-                    {
-                        "event_id": event.event_id,
-                        "error": verification.get("error"),
-                    }
-                )
-
-        # Verify chain hash integrity (simplified)
-        chain_valid = True  # In production, would recalculate entire chain
+        for violation in verification["violations"]:
+            violation = dict(violation)
+            if "record_id" in violation:
+                violation["event_id"] = violation.pop("record_id")
+            integrity_violations.append(violation)
 
         return {
-            "valid": len(integrity_violations) == 0 and chain_valid,
-            "events_verified": verified_count,
-            "total_events": len(self._audit_events),
+            "valid": verification["valid"],
+            "events_verified": verification["records_verified"],
+            "total_events": verification["total_records"],
             "integrity_violations": integrity_violations,
-            "chain_integrity": chain_valid,
+            "chain_integrity": verification["chain_valid"],
+            "segments_verified": verification["segments_verified"],
+            "segments_skipped": verification["segments_skipped"],
             "verification_time": datetime.utcnow().isoformat(),
         }
 
@@ -734,17 +699,22 @@ class AuditTrailService:
                 ),
             )
 
-            events = await self.query_audit_events(query)
+            # Stream matching events into counters instead of loading them all
+            stats = AuditReportStats()
+            for position, event in enumerate(self.iter_audit_events(query), 1):
+                stats.add(event)
+                if position % self.config.max_audit_records_per_batch == 0:
+                    await asyncio.sleep(0)
 
             # Generate report based on type
             if report_type == "compliance":
                 report = await self._generate_compliance_audit_report(
-                    events, compliance_framework
+                    stats, compliance_framework
                 )
             elif report_type == "detailed":
-                report = await self._generate_detailed_audit_report(events)
+                report = await self._generate_detailed_audit_report(stats)
             else:
-                report = await self._generate_summary_audit_report(events)
+                report = await self._generate_summary_audit_report(stats)
 
             # Add metadata
             report.update(
@@ -757,7 +727,7 @@ class AuditTrailService:
                         "end": end_time.isoformat(),
                     },
                     "compliance_framework": compliance_framework,
-                    "total_events": len(events),
+                    "total_events": stats.total,
                 }
             )
 
@@ -770,68 +740,42 @@ class AuditTrailService:
             )
 
     async def _generate_summary_audit_report(
-        self, events: List[AuditEvent]
+        self, stats: AuditReportStats
     ) -> Dict[str, Any]:
         """Generate summary audit report."""
-        # Event type breakdown
-        type_counts = {}
-        for event in events:
-            event_type = event.event_type.value
-            type_counts[event_type] = type_counts.get(event_type, 0) + 1
-
-        # Severity breakdown
-        severity_counts = {}
-        for event in events:
-            severity = event.severity.value
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
-
-        # Top actors
-        actor_counts = {}
-        for event in events:
-            actor_counts[event.actor] = actor_counts.get(event.actor, 0) + 1
-
-        top_actors = sorted(actor_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-
-        # Security events
-        security_events = [
-            e
-            for e in events
-            if e.event_type == AuditEventType.SECURITY
-            or e.severity in [AuditSeverity.CRITICAL, AuditSeverity.HIGH]
-        ]
-
-        # Failed operations
-        failed_events = [e for e in events if e.outcome == "failure"]
+        top_actors = sorted(
+            stats.actor_counts.items(), key=lambda x: x[1], reverse=True
+        )[:10]
 
         return {
             "summary": {
-                "total_events": len(events),
-                "security_events": len(security_events),
-                "failed_operations": len(failed_events),
-                "unique_actors": len(actor_counts),
+                "total_events": stats.total,
+                "security_events": stats.security_events,
+                "failed_operations": stats.failed_events,
+                "unique_actors": len(stats.actor_counts),
             },
-            "event_types": type_counts,
-            "severity_distribution": severity_counts,
+            "event_types": dict(stats.type_counts),
+            "severity_distribution": dict(stats.severity_counts),
             "top_actors": top_actors,
-            "risk_assessment": self._assess_audit_risk(events),
-            "recommendations": self._generate_audit_recommendations(events),
+            "risk_assessment": self._assess_audit_risk(stats),
+            "recommendations": self._generate_audit_recommendations(stats),
         }
 
     async def _generate_detailed_audit_report(
-        self, events: List[AuditEvent]
+        self, stats: AuditReportStats
     ) -> Dict[str, Any]:
         """Generate detailed audit report."""
-        summary = await self._generate_summary_audit_report(events)
+        summary = await self._generate_summary_audit_report(stats)
 
         # Add detailed analysis
         summary.update(
             {
-                "timeline_analysis": self._analyze_event_timeline(events),
+                "timeline_analysis": self._analyze_event_timeline(stats),
                 "anomaly_detection": await self._detect_audit_anomalies_in_events(
-                    events
+                    stats
                 ),
-                "access_patterns": self._analyze_access_patterns(events),
-                "compliance_events": self._analyze_compliance_events(events),
+                "access_patterns": self._analyze_access_patterns(stats),
+                "compliance_events": self._analyze_compliance_events(stats),
                 "integrity_status": await self._verify_audit_chain(),
             }
         )
@@ -839,34 +783,26 @@ class AuditTrailService:
         return summary
 
     async def _generate_compliance_audit_report(
-        self, events: List[AuditEvent], framework: Optional[str]
+        self, stats: AuditReportStats, framework: Optional[str]
     ) -> Dict[str, Any]:
         """Generate compliance-specific audit report."""
-        compliance_events = [
-            e for e in events if not framework or framework in e.compliance_tags
-        ]
+        # The report query already filters by the framework tag
 
         # Compliance-specific analysis
-        audit_requirements = self._check_audit_requirements(
-            compliance_events, framework
-        )
+        audit_requirements = self._check_audit_requirements(stats, framework)
         retention_compliance = self._check_retention_compliance(framework)
-        access_controls = self._analyze_access_control_events(compliance_events)
+        access_controls = self._analyze_access_control_events(stats)
 
         return {
             "compliance_framework": framework,
-            "compliance_events": len(compliance_events),
+            "compliance_events": stats.total,
             "audit_requirements": audit_requirements,
             "retention_compliance": retention_compliance,
             "access_control_analysis": access_controls,
-            "data_protection_events": self._analyze_data_protection_events(
-                compliance_events
-            ),
-            "incident_response_events": self._analyze_incident_events(
-                compliance_events
-            ),
+            "data_protection_events": self._analyze_data_protection_events(stats),
+            "incident_response_events": self._analyze_incident_events(stats),
             "recommendations": self._generate_compliance_recommendations(
-                compliance_events, framework
+                stats, framework
             ),
         }
 
@@ -916,23 +852,18 @@ class AuditTrailService:
         # Normalize to 0-10 scale
         return min(10.0, base_score)
 
-    def _assess_audit_risk(self, events: List[AuditEvent]) -> Dict[str, Any]:
+    def _assess_audit_risk(self, stats: AuditReportStats) -> Dict[str, Any]:
         """Assess overall risk from audit events."""
-        if not events:
+        if not stats.total:
             return {"risk_level": "low", "risk_score": 0}
 
         # Calculate average risk score
-        total_risk = sum(event.risk_score for event in events)
-        avg_risk = total_risk / len(events)
-
-        # Count high-risk events
-        high_risk_events = [e for e in events if e.risk_score >= 7.0]
-        failed_events = [e for e in events if e.outcome == "failure"]
+        avg_risk = stats.risk_total / stats.total
 
         # Determine risk level
-        if avg_risk >= 7 or len(high_risk_events) > len(events) * 0.3:
+        if avg_risk >= 7 or stats.high_risk_events > stats.total * 0.3:
             risk_level = "high"
-        elif avg_risk >= 4 or len(high_risk_events) > len(events) * 0.1:
+        elif avg_risk >= 4 or stats.high_risk_events > stats.total * 0.1:
             risk_level = "medium"
         else:
             risk_level = "low"
@@ -940,70 +871,59 @@ class AuditTrailService:
         return {
             "risk_level": risk_level,
             "risk_score": round(avg_risk, 2),
-            "high_risk_events": len(high_risk_events),
-            "failed_events": len(failed_events),
-            "total_events": len(events),
+            "high_risk_events": stats.high_risk_events,
+            "failed_events": stats.failed_events,
+            "total_events": stats.total,
         }
 
-    def _generate_audit_recommendations(self, events: List[AuditEvent]) -> List[str]:
+    def _generate_audit_recommendations(self, stats: AuditReportStats) -> List[str]:
         """Generate audit-based recommendations."""
         recommendations = []
 
         # Check for excessive failures
-        failed_events = [e for e in events if e.outcome == "failure"]
-        if len(failed_events) > len(events) * 0.2:
+        if stats.failed_events > stats.total * 0.2:
             recommendations.append("Investigate high failure rate in audit events")
 
         # Check for suspicious patterns
-        high_risk_events = [e for e in events if e.risk_score >= 8.0]
-        if high_risk_events:
+        if stats.very_high_risk_events:
             recommendations.append(
                 "Review high-risk security events for potential threats"
             )
 
         # Check for compliance gaps
-        compliance_events = [e for e in events if e.compliance_tags]
-        if len(compliance_events) < len(events) * 0.5:
+        if stats.tagged_events < stats.total * 0.5:
             recommendations.append("Improve compliance tagging for audit events")
 
         return recommendations
 
     # Analysis helper methods
 
-    def _analyze_event_timeline(self, events: List[AuditEvent]) -> Dict[str, Any]:
+    def _analyze_event_timeline(self, stats: AuditReportStats) -> Dict[str, Any]:
         """Analyze event timeline patterns."""
-        if not events:
+        if not stats.total:
             return {}
 
-        # Group events by hour
-        hourly_counts = {}
-        for event in events:
-            hour_key = event.timestamp.replace(minute=0, second=0, microsecond=0)
-            hourly_counts[hour_key] = hourly_counts.get(hour_key, 0) + 1
-
         # Find peak hours
-        sorted_hours = sorted(hourly_counts.items(), key=lambda x: x[1], reverse=True)
+        sorted_hours = sorted(
+            stats.hourly_counts.items(), key=lambda x: x[1], reverse=True
+        )
 
         return {
             "peak_activity_hours": [
                 {"hour": hour.isoformat(), "count": count}
                 for hour, count in sorted_hours[:5]
             ],
-            "activity_distribution": len(hourly_counts),
+            "activity_distribution": len(stats.hourly_counts),
         }
 
     async def _detect_audit_anomalies_in_events(
-        self, events: List[AuditEvent]
+        self, stats: AuditReportStats
     ) -> List[Dict[str, Any]]:
         """Detect anomalies in audit events."""
         anomalies = []
 
-        # Check for unusual actor activity
-        actor_counts = {}
-        for event in events:
-            actor_counts[event.actor] = actor_counts.get(event.actor, 0) + 1
-
         # Find actors with unusually high activity
+        actor_counts = stats.actor_counts
         avg_activity = (
             sum(actor_counts.values()) / len(actor_counts) if actor_counts else 0
         )
@@ -1019,16 +939,8 @@ class AuditTrailService:
                     }
                 )
 
-        # Check for burst activity
-        # Group events by 5-minute windows
-        time_windows = {}
-        for event in events:
-            window = event.timestamp.replace(
-                minute=(event.timestamp.minute // 5) * 5, second=0, microsecond=0
-            )
-            time_windows[window] = time_windows.get(window, 0) + 1
-
-        # Find windows with unusually high activity
+        # Find 5-minute windows with unusually high activity
+        time_windows = stats.window_counts
         avg_window_activity = (
             sum(time_windows.values()) / len(time_windows) if time_windows else 0
         )
@@ -1046,87 +958,48 @@ class AuditTrailService:
 
         return anomalies
 
-    def _analyze_access_patterns(self, events: List[AuditEvent]) -> Dict[str, Any]:
+    def _analyze_access_patterns(self, stats: AuditReportStats) -> Dict[str, Any]:
         """Analyze access patterns from audit events."""
-        access_events = [
-            e
-            for e in events
-            if e.event_type
-            in [
-                AuditEventType.AUTHENTICATION,
-                AuditEventType.AUTHORIZATION,
-                AuditEventType.DATA_ACCESS,
-            ]
-        ]
-
-        # Analyze by source IP
-        ip_patterns = {}
-        for event in access_events:
-            if event.source_ip:
-                ip_patterns[event.source_ip] = ip_patterns.get(event.source_ip, 0) + 1
-
-        # Analyze by user agent
-        agent_patterns = {}
-        for event in access_events:
-            if event.user_agent:
-                agent_patterns[event.user_agent] = (
-                    agent_patterns.get(event.user_agent, 0) + 1
-                )
-
         return {
-            "total_access_events": len(access_events),
-            "unique_source_ips": len(ip_patterns),
-            "unique_user_agents": len(agent_patterns),
+            "total_access_events": stats.access_events,
+            "unique_source_ips": len(stats.source_ips),
+            "unique_user_agents": len(stats.user_agents),
             "top_source_ips": sorted(
-                ip_patterns.items(), key=lambda x: x[1], reverse=True
+                stats.source_ips.items(), key=lambda x: x[1], reverse=True
             )[:5],
-            "suspicious_patterns": self._identify_suspicious_access_patterns(
-                access_events
-            ),
+            "suspicious_patterns": self._identify_suspicious_access_patterns(stats),
         }
 
     def _identify_suspicious_access_patterns(
-        self, events: List[AuditEvent]
+        self, stats: AuditReportStats
     ) -> List[Dict[str, Any]]:
         """Identify suspicious access patterns."""
         suspicious = []
 
         # Check for multiple failed authentications
-        failed_auth = [
-            e
-            for e in events
-            if e.event_type == AuditEventType.AUTHENTICATION and e.outcome == "failure"
-        ]
+        failed_auth = stats.count_type(AuditEventType.AUTHENTICATION, "failure")
 
-        if len(failed_auth) > 10:
+        if failed_auth > 10:
             suspicious.append(
                 {
                     "pattern": "excessive_failed_authentication",
-                    "count": len(failed_auth),
+                    "count": failed_auth,
                     "threshold": 10,
                 }
             )
 
         return suspicious
 
-    def _analyze_compliance_events(self, events: List[AuditEvent]) -> Dict[str, Any]:
+    def _analyze_compliance_events(self, stats: AuditReportStats) -> Dict[str, Any]:
         """Analyze compliance-related events."""
-        compliance_events = [e for e in events if e.compliance_tags]
-
-        # Group by compliance framework
-        framework_counts = {}
-        for event in compliance_events:
-            for tag in event.compliance_tags:
-                framework_counts[tag] = framework_counts.get(tag, 0) + 1
-
         return {
-            "total_compliance_events": len(compliance_events),
-            "frameworks_involved": list(framework_counts.keys()),
-            "framework_distribution": framework_counts,
+            "total_compliance_events": stats.tagged_events,
+            "frameworks_involved": list(stats.tag_counts.keys()),
+            "framework_distribution": dict(stats.tag_counts),
         }
 
     def _check_audit_requirements(
-        self, events: List[AuditEvent], framework: Optional[str]
+        self, stats: AuditReportStats, framework: Optional[str]
     ) -> Dict[str, Any]:
         """Check if audit requirements are met."""
         # Check required event types for compliance
@@ -1142,13 +1015,13 @@ class AuditTrailService:
 
         if framework and framework in required_types:
             required = required_types[framework]
-            present_types = set(e.event_type for e in events)
-            missing_types = [t for t in required if t not in present_types]
+            present_types = list(stats.type_counts.keys())
+            missing_types = [t for t in required if t.value not in stats.type_counts]
 
             return {
                 "framework": framework,
                 "required_types": [t.value for t in required],
-                "present_types": [t.value for t in present_types],
+                "present_types": present_types,
                 "missing_types": [t.value for t in missing_types],
                 "compliance_met": len(missing_types) == 0,
             }
@@ -1180,83 +1053,65 @@ class AuditTrailService:
         return {"compliant": True}
 
     def _analyze_access_control_events(
-        self, events: List[AuditEvent]
+        self, stats: AuditReportStats
     ) -> Dict[str, Any]:
         """Analyze access control events."""
-        access_events = [
-            e
-            for e in events
-            if e.event_type
-            in [AuditEventType.AUTHENTICATION, AuditEventType.AUTHORIZATION]
-        ]
-
-        auth_events = [
-            e for e in access_events if e.event_type == AuditEventType.AUTHENTICATION
-        ]
-        authz_events = [
-            e for e in access_events if e.event_type == AuditEventType.AUTHORIZATION
-        ]
+        auth_events = stats.count_type(AuditEventType.AUTHENTICATION)
+        authz_events = stats.count_type(AuditEventType.AUTHORIZATION)
 
         return {
-            "total_access_events": len(access_events),
-            "authentication_events": len(auth_events),
-            "authorization_events": len(authz_events),
-            "failed_authentications": len(
-                [e for e in auth_events if e.outcome == "failure"]
+            "total_access_events": auth_events + authz_events,
+            "authentication_events": auth_events,
+            "authorization_events": authz_events,
+            "failed_authentications": stats.count_type(
+                AuditEventType.AUTHENTICATION, "failure"
             ),
-            "failed_authorizations": len(
-                [e for e in authz_events if e.outcome == "failure"]
+            "failed_authorizations": stats.count_type(
+                AuditEventType.AUTHORIZATION, "failure"
             ),
         }
 
     def _analyze_data_protection_events(
-        self, events: List[AuditEvent]
+        self, stats: AuditReportStats
     ) -> Dict[str, Any]:
         """Analyze data protection events."""
-        data_events = [e for e in events if e.event_type == AuditEventType.DATA_ACCESS]
+        data_events = stats.count_type(AuditEventType.DATA_ACCESS)
 
         return {
-            "total_data_events": len(data_events),
-            "data_access_attempts": len(data_events),
-            "failed_data_access": len(
-                [e for e in data_events if e.outcome == "failure"]
+            "total_data_events": data_events,
+            "data_access_attempts": data_events,
+            "failed_data_access": stats.count_type(
+                AuditEventType.DATA_ACCESS, "failure"
             ),
         }
 
-    def _analyze_incident_events(self, events: List[AuditEvent]) -> Dict[str, Any]:
+    def _analyze_incident_events(self, stats: AuditReportStats) -> Dict[str, Any]:
         """Analyze incident-related events."""
-        incident_events = [e for e in events if e.event_type == AuditEventType.INCIDENT]
-
         return {
-            "total_incidents": len(incident_events),
-            "critical_incidents": len(
-                [e for e in incident_events if e.severity == AuditSeverity.CRITICAL]
-            ),
-            "high_severity_incidents": len(
-                [e for e in incident_events if e.severity == AuditSeverity.HIGH]
-            ),
+            "total_incidents": stats.count_type(AuditEventType.INCIDENT),
+            "critical_incidents": stats.type_severities[
+                (AuditEventType.INCIDENT, AuditSeverity.CRITICAL)
+            ],
+            "high_severity_incidents": stats.type_severities[
+                (AuditEventType.INCIDENT, AuditSeverity.HIGH)
+            ],
         }
 
     def _generate_compliance_recommendations(
-        self, events: List[AuditEvent], framework: Optional[str]
+        self, stats: AuditReportStats, framework: Optional[str]
     ) -> List[str]:
         """Generate compliance-specific recommendations."""
         recommendations = []
 
         if framework == "GDPR":
-            data_events = [
-                e for e in events if e.event_type == AuditEventType.DATA_ACCESS
-            ]
-            if not data_events:
+            if not stats.count_type(AuditEventType.DATA_ACCESS):
                 recommendations.append(
                     "Implement data access logging for GDPR compliance"
                 )
 
         if framework == "HIPAA":
-            auth_events = [
-                e for e in events if e.event_type == AuditEventType.AUTHENTICATION
-            ]
-            if len(auth_events) < len(events) * 0.3:
+            auth_events = stats.count_type(AuditEventType.AUTHENTICATION)
+            if auth_events < stats.total * 0.3:
                 recommendations.append(
                     "Increase authentication event logging for HIPAA compliance"
                 )
@@ -1270,6 +1125,13 @@ class AuditTrailService:
         timestamp = datetime.utcnow().timestamp()
         return f"AUD-{int(timestamp * 1000000)}"
 
+    def _event_id_timestamp(self, event_id: str) -> Optional[datetime]:
+        """Creation time encoded in an event ID, used to locate its segment."""
+        try:
+            return datetime.fromtimestamp(int(event_id.split("-", 1)[1]) / 1000000)
+        except (IndexError, ValueError, OverflowError, OSError):
+            return None
+
     def _generate_report_id(self) -> str:
         """Generate unique report ID."""
         timestamp = datetime.utcnow().timestamp()
@@ -1302,9 +1164,12 @@ class AuditTrailService:
 
     async def _check_audit_performance(self) -> Dict[str, Any]:
         """Check audit trail performance."""
+        storage = self._store.stats() if self._store else {}
         return {
-            "total_events": len(self._audit_events),
-            "index_size": sum(len(idx) for idx in self._audit_indexes.values()),
+            "total_events": storage.get("total_records", 0),
+            "segments": storage.get("segments", 0),
+            "loaded_indexes": storage.get("loaded_indexes", 0),
+            "pending_signature": storage.get("pending_records", 0),
             "alerts": [],
         }
 
@@ -1313,30 +1178,14 @@ class AuditTrailService:
         # Simplified pattern analysis
         return []
 
-    async def _archive_expired_events(self, expired_events: List[AuditEvent]) -> None:
-        """Archive expired audit events."""
-        logger.info(f"Archiving {len(expired_events)} expired audit events")
-
-        # Remove from active storage
-        for event in expired_events:
-            if event in self._audit_events:
-                self._audit_events.remove(event)
-
-                # Remove from indexes
-                self._remove_from_indexes(event)
-
-    def _remove_from_indexes(self, event: AuditEvent) -> None:
-        """Remove event from all indexes."""
-        # Remove from type index
-        event_type = event.event_type.value
-        if event_type in self._audit_indexes["by_type"]:
-            self._audit_indexes["by_type"][event_type].discard(event.event_id)
-
-        # Remove from actor index
-        if event.actor in self._audit_indexes["by_actor"]:
-            self._audit_indexes["by_actor"][event.actor].discard(event.event_id)
+    async def _archive_expired_events(self, cutoff_date: datetime) -> None:
+        """Drop the segments whose events are all older than the cutoff."""
+        if self._store is None:
+            return
 
-        # Remove from other indexes similarly...
+        dropped = self._store.drop_before(cutoff_date)
+        if dropped:
+            logger.info(f"Archived {dropped} expired audit events")
 
     async def health_check(self) -> Dict[str, Any]:
         """Perform health check on audit trail service."""
@@ -1344,7 +1193,7 @@ class AuditTrailService:
             "service": "AuditTrailService",
             "status": "healthy" if self._initialized else "unhealthy",
             "monitoring_active": self._monitoring_active,
-            "total_events": len(self._audit_events),
+            "total_events": self._store.count if self._store else 0,
             "index_health": "good",
             "integrity_protected": self.config.enable_tamper_protection,
             "encryption_enabled": self.config.audit_encryption_enabled,
@@ -1355,8 +1204,9 @@ class AuditTrailService:
         if self._monitoring_active:
             await self.stop_audit_monitoring()
 
-        # Clear audit data (in production, would archive safely)
-        self._audit_events.clear()
-        self._audit_indexes.clear()
+        # Seal the active segment; a temporary audit directory is removed
+        if self._store is not None:
+            self._store.close()
+            self._store = None
 
         logger.info("Audit trail service cleaned up")
@@ -62,6 +62,9 @@ class NodeConfig:
     max_pipeline_stages: int = 10
     pipeline_timeout: float = 300.0  # 5 minutes
     enable_data_validation: bool = True
+    pipeline_chunk_size: int = 1000  # records per streamed chunk
+    pipeline_queue_chunks: int = 4  # chunks buffered between stages
+    pipeline_stage_parallelism: int = 1  # workers per transformation/loading stage
 
     # Infrastructure automation
     enable_infrastructure_automation: bool = True
@@ -176,6 +179,12 @@ class NodeConfig:
         if self.max_pipeline_stages <= 0:
             raise ValueError("max_pipeline_stages must be positive")
 
+        if self.pipeline_chunk_size <= 0:
+            raise ValueError("pipeline_chunk_size must be positive")
+
+        if self.pipeline_queue_chunks <= 0 or self.pipeline_stage_parallelism <= 0:
+            raise ValueError("pipeline queue size and parallelism must be positive")
+
         # Security validation for production
         if not self.debug_mode:
             if not self.enable_audit_logging:
@@ -4,10 +4,11 @@ Handles data extraction, transformation, loading, and pipeline orchestration.
 """
 
 import asyncio
+import copy
 import json
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Callable
-from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Callable, AsyncIterator
+from dataclasses import dataclass, field
 from enum import Enum
 
 from agents.backend.node.core.config import NodeConfig
@@ -18,6 +19,12 @@ from agents.backend.node.core.exceptions import (
 )
 from agents.backend.node.core.constants import PIPELINE_STAGES
 from core.logging_config import get_logger
+from core.stream_pipeline import (
+    StreamChunk,
+    StreamPipelineRunner,
+    StreamStage,
+    StreamStageError,
+)
 
 logger = get_logger(__name__)
 
@@ -89,6 +96,27 @@ class PipelineConfig:
     timeout_minutes: int = 60
     retry_attempts: int = 3
     enable_monitoring: bool = True
+    chunk_size: Optional[int] = None  # defaults to NodeConfig.pipeline_chunk_size
+    stage_parallelism: Optional[Dict[str, int]] = None  # e.g. {"loading": 4}
+
+
+# Rules whose output depends on earlier chunks; they force in-order transformation
+STATEFUL_RULES = {"deduplicate", "aggregate"}
+
+
+@dataclass
+class PipelineCheckpoint:
+    """Progress of a pipeline, committed after each loaded chunk."""
+
+    last_chunk: int = -1
+    records_extracted: int = 0  # source records covered by committed chunks
+    records_loaded: int = 0
+    transform_state: Dict[str, Any] = field(default_factory=dict)
+    quality: Dict[str, int] = field(
+        default_factory=lambda: {"total_records": 0, "valid_records": 0}
+    )
+    finalized: bool = False  # end-of-stream aggregates already loaded
+    updated_at: Optional[datetime] = None
 
 
 class DataPipelineService:
@@ -102,12 +130,21 @@ class DataPipelineService:
     - Data quality validation
     - Error handling and retry mechanisms
     - Performance monitoring and optimization
+
+    Runs stream the source in chunks through transformation and loading
+    (see core.stream_pipeline) and commit a checkpoint after each loaded
+    chunk; retries resume after the last committed chunk. Chunks after
+    that point may be loaded again on retry, so targets should tolerate
+    at-least-once delivery (e.g. upsert write mode).
     """
 
+    retry_backoff_seconds = 2.0
+
     def __init__(self, config: NodeConfig):
         self.config = config
         self._pipelines = {}
         self._pipeline_runs = {}
+        self._checkpoints: Dict[str, PipelineCheckpoint] = {}
         self._transformation_functions = {}
         self._initialized = False
 
@@ -224,11 +261,20 @@ class DataPipelineService:
                 pipeline_stage="execution",
             )
 
+        # A new execution starts from the beginning; only retries resume
+        self._checkpoints.pop(pipeline_id, None)
+        return await self._run_pipeline(pipeline_id, attempt=0)
+
+    async def _run_pipeline(self, pipeline_id: str, attempt: int) -> Dict[str, Any]:
+        """Run (or resume) a pipeline from its checkpoint."""
         pipeline = self._pipelines[pipeline_id]
         pipeline_config = pipeline["config"]
+        checkpoint = self._checkpoints.setdefault(pipeline_id, PipelineCheckpoint())
 
         # Create pipeline run
         run_id = f"run-{pipeline_id}-{int(datetime.utcnow().timestamp())}"
+        if attempt:
+            run_id = f"{run_id}-retry{attempt}"
 
         pipeline_run = {
             "run_id": run_id,
@@ -236,29 +282,32 @@ class DataPipelineService:
             "status": PipelineStatus.RUNNING.value,
             "started_at": datetime.utcnow(),
             "completed_at": None,
+            "attempt": attempt,
             "stages_completed": [],
             "stages_failed": [],
             "records_processed": 0,
             "errors": [],
-            "metrics": {},
+            "metrics": {"resumed_from_chunk": checkpoint.last_chunk + 1},
         }
 
         self._pipeline_runs[run_id] = pipeline_run
 
         try:
-            logger.info(f"Starting pipeline execution: {run_id}")
+            logger.info(
+                f"Starting pipeline execution: {run_id} "
+                f"(from chunk {checkpoint.last_chunk + 1})"
+            )
 
-            # Execute pipeline stages
-            data = await self._execute_extraction_stage(pipeline_config, pipeline_run)
-            data = await self._execute_transformation_stage(
-                pipeline_config, pipeline_run, data
+            # Stream extraction -> transformation -> loading, then validate
+            await self._execute_streaming_stages(
+                pipeline_config, pipeline_run, checkpoint
             )
-            await self._execute_loading_stage(pipeline_config, pipeline_run, data)
-            await self._execute_validation_stage(pipeline_config, pipeline_run, data)
+            await self._execute_validation_stage(pipeline_run, checkpoint)
 
             # Update pipeline run status
             pipeline_run["status"] = PipelineStatus.COMPLETED.value
             pipeline_run["completed_at"] = datetime.utcnow()
+            self._checkpoints.pop(pipeline_id, None)
 
             # Update pipeline statistics
             await self._update_pipeline_statistics(pipeline_id, pipeline_run)
@@ -273,6 +322,7 @@ class DataPipelineService:
                 "completed_at": pipeline_run["completed_at"].isoformat(),
                 "records_processed": pipeline_run["records_processed"],
                 "stages_completed": pipeline_run["stages_completed"],
+                "attempts": attempt + 1,
                 "runtime_seconds": (
                     pipeline_run["completed_at"] - pipeline_run["started_at"]
                 ).total_seconds(),
@@ -289,132 +339,288 @@ class DataPipelineService:
 
             logger.error(f"Pipeline execution failed: {run_id} - {e}")
 
-            # Implement retry logic if configured
-            if pipeline_config.retry_attempts > 0:
+            # Retry from the last committed chunk if attempts remain
+            if attempt < pipeline_config.retry_attempts:
                 return await self._retry_pipeline_execution(
                     pipeline_id, pipeline_run, e
                 )
 
+            self._checkpoints.pop(pipeline_id, None)
             raise DataPipelineError(
                 f"Pipeline execution failed: {e}",
                 pipeline_stage="execution",
             )
 
-    async def _execute_extraction_stage(
-        self, config: PipelineConfig, pipeline_run: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """Execute data extraction stage."""
-        try:
-            logger.info(f"Executing extraction stage for {pipeline_run['run_id']}")
-
-            data_source = config.data_source
-            extracted_data = []
-
-            if data_source.source_type == "database":
-                extracted_data = await self._extract_from_database(data_source)
-            elif data_source.source_type == "api":
-                extracted_data = await self._extract_from_api(data_source)
-            elif data_source.source_type == "file":
-                extracted_data = await self._extract_from_file(data_source)
-            elif data_source.source_type == "stream":
-                extracted_data = await self._extract_from_stream(data_source)
-            else:
-                raise DataPipelineError(
-                    f"Unsupported source type: {data_source.source_type}",
-                    pipeline_stage="extraction",
-                )
+    async def _execute_streaming_stages(
+        self,
+        config: PipelineConfig,
+        pipeline_run: Dict[str, Any],
+        checkpoint: PipelineCheckpoint,
+    ) -> None:
+        """Stream chunks through transformation and loading, committing each one."""
+        extractor = self._get_extractor(config.data_source, pipeline_run)
+        loader = self._get_loader(config.data_target, pipeline_run)
+
+        for rule in config.transformation_rules:
+            if rule.rule_type not in self._transformation_functions:
+                logger.warning(f"Unknown transformation rule: {rule.rule_type}")
+
+        chunk_size = config.chunk_size or self.config.pipeline_chunk_size
+        parallelism = {
+            PipelineStage.TRANSFORMATION.value: self.config.pipeline_stage_parallelism,
+            PipelineStage.LOADING.value: self.config.pipeline_stage_parallelism,
+            **(config.stage_parallelism or {}),
+        }
+        if any(rule.rule_type in STATEFUL_RULES for rule in config.transformation_rules):
+            # Deduplication and aggregation must see chunks in order
+            parallelism[PipelineStage.TRANSFORMATION.value] = 1
+
+        # Live transformation state starts from what was committed
+        state = copy.deepcopy(checkpoint.transform_state)
+
+        async def transform(chunk: StreamChunk) -> StreamChunk:
+            return await self._transform_chunk(config, chunk, state)
+
+        async def finish_transformation(index: int) -> Optional[StreamChunk]:
+            return await self._finish_transformation(config, index, state, checkpoint)
+
+        async def load(chunk: StreamChunk) -> StreamChunk:
+            if chunk.records:
+                await loader(config.data_target, chunk.records)
+            return chunk
+
+        async def commit(chunk: StreamChunk) -> None:
+            await self._commit_chunk(pipeline_run, checkpoint, chunk)
+
+        runner = StreamPipelineRunner(
+            [
+                StreamStage(
+                    PipelineStage.TRANSFORMATION.value,
+                    transform,
+                    parallelism=parallelism[PipelineStage.TRANSFORMATION.value],
+                    finish=finish_transformation,
+                ),
+                StreamStage(
+                    PipelineStage.LOADING.value,
+                    load,
+                    parallelism=parallelism[PipelineStage.LOADING.value],
+                ),
+            ],
+            chunk_size=chunk_size,
+            queue_size=self.config.pipeline_queue_chunks,
+        )
 
-            pipeline_run["stages_completed"].append(PipelineStage.EXTRACTION.value)
-            pipeline_run["records_processed"] = len(extracted_data)
+        try:
+            logger.info(
+                f"Streaming {pipeline_run['run_id']} in chunks of {chunk_size} "
+                f"(parallelism {parallelism})"
+            )
+            counters = await runner.run(
+                extractor(config.data_source, offset=checkpoint.records_extracted),
+                commit,
+                start_index=checkpoint.last_chunk + 1,
+            )
+        except StreamStageError as e:
+            pipeline_run["stages_failed"].append(e.stage)
+            raise DataPipelineError(
+                f"{e.stage.capitalize()} stage failed at chunk {e.chunk_index}: {e.error}",
+                pipeline_stage=e.stage,
+            )
 
-            return extracted_data
+        pipeline_run["stages_completed"].extend(
+            [
+                PipelineStage.EXTRACTION.value,
+                PipelineStage.TRANSFORMATION.value,
+                PipelineStage.LOADING.value,
+            ]
+        )
+        pipeline_run["metrics"].update(
+            {
+                "chunk_size": chunk_size,
+                "chunks_committed": checkpoint.last_chunk + 1,
+                "chunks_this_run": counters["chunks_committed"],
+                "records_extracted": checkpoint.records_extracted,
+            }
+        )
 
-        except Exception as e:
+    def _get_extractor(
+        self, data_source: DataSource, pipeline_run: Dict[str, Any]
+    ) -> Callable[..., AsyncIterator[Dict[str, Any]]]:
+        """Streaming extractor for the source type."""
+        extractors = {
+            "database": self._extract_from_database,
+            "api": self._extract_from_api,
+            "file": self._extract_from_file,
+            "stream": self._extract_from_stream,
+        }
+        if data_source.source_type not in extractors:
             pipeline_run["stages_failed"].append(PipelineStage.EXTRACTION.value)
             raise DataPipelineError(
-                f"Extraction stage failed: {e}",
+                f"Extraction stage failed: Unsupported source type: {data_source.source_type}",
                 pipeline_stage="extraction",
             )
+        return extractors[data_source.source_type]
+
+    def _get_loader(
+        self, data_target: DataTarget, pipeline_run: Dict[str, Any]
+    ) -> Callable[[DataTarget, List[Dict[str, Any]]], Any]:
+        """Chunk loader for the target type."""
+        loaders = {
+            "database": self._load_to_database,
+            "api": self._load_to_api,
+            "file": self._load_to_file,
+            "stream": self._load_to_stream,
+        }
+        if data_target.target_type not in loaders:
+            pipeline_run["stages_failed"].append(PipelineStage.LOADING.value)
+            raise DataPipelineError(
+                f"Loading stage failed: Unsupported target type: {data_target.target_type}",
+                pipeline_stage="loading",
+            )
+        return loaders[data_target.target_type]
 
-    async def _execute_transformation_stage(
+    async def _transform_chunk(
         self,
         config: PipelineConfig,
-        pipeline_run: Dict[str, Any],
-        data: List[Dict[str, Any]],
-    ) -> List[Dict[str, Any]]:
-        """Execute data transformation stage."""
-        try:
-            logger.info(f"Executing transformation stage for {pipeline_run['run_id']}")
-
-            transformed_data = data
-
-            # Apply transformation rules in sequence
-            for rule in config.transformation_rules:
-                if rule.rule_type in self._transformation_functions:
-                    transform_func = self._transformation_functions[rule.rule_type]
-                    transformed_data = await transform_func(transformed_data, rule)
-                else:
-                    logger.warning(f"Unknown transformation rule: {rule.rule_type}")
+        chunk: StreamChunk,
+        state: Dict[str, Any],
+        start_rule: int = 0,
+    ) -> StreamChunk:
+        """
+        Apply the transformation rules to one chunk.
 
-            pipeline_run["stages_completed"].append(PipelineStage.TRANSFORMATION.value)
-            pipeline_run["records_processed"] = len(transformed_data)
+        Stateful rules update ``state`` and record what they added in the
+        chunk's delta, which is folded into the checkpoint when the chunk
+        is committed.
+        """
+        records = chunk.records
+        delta: Dict[str, Any] = {}
+
+        for position in range(start_rule, len(config.transformation_rules)):
+            rule = config.transformation_rules[position]
+            transform_func = self._transformation_functions.get(rule.rule_type)
+            if transform_func is None:
+                continue
+
+            key = f"{rule.rule_type}:{position}"
+            if rule.rule_type == "deduplicate":
+                records = await self._deduplicate_transform(
+                    records, rule, seen=state.setdefault(key, set())
+                )
+                key_field = self._deduplication_key(rule)
+                delta[key] = [record.get(key_field) for record in records]
+            elif rule.rule_type == "aggregate" and rule.expression == "sum_values":
+                # Partial sums per chunk; the aggregate is emitted at end of stream
+                partial = (await self._aggregate_transform(records, rule))[0]
+                self._add_aggregate(state, key, partial)
+                delta[key] = partial
+                records = []
+            else:
+                records = await transform_func(records, rule)
 
-            return transformed_data
+        return StreamChunk(
+            chunk.index,
+            records,
+            {"source_records": len(chunk.records) if not start_rule else 0, "transform": delta},
+        )
 
-        except Exception as e:
-            pipeline_run["stages_failed"].append(PipelineStage.TRANSFORMATION.value)
-            raise DataPipelineError(
-                f"Transformation stage failed: {e}",
-                pipeline_stage="transformation",
+    async def _finish_transformation(
+        self,
+        config: PipelineConfig,
+        index: int,
+        state: Dict[str, Any],
+        checkpoint: PipelineCheckpoint,
+    ) -> Optional[StreamChunk]:
+        """Emit end-of-stream aggregates through the rules that follow them."""
+        aggregates = [
+            position
+            for position, rule in enumerate(config.transformation_rules)
+            if rule.rule_type == "aggregate" and rule.expression == "sum_values"
+        ]
+        if not aggregates or checkpoint.finalized:
+            return None
+
+        records: List[Dict[str, Any]] = []
+        delta: Dict[str, Any] = {}
+        for position in aggregates:
+            aggregated = dict(
+                state.get(
+                    f"aggregate:{position}", {"aggregated_value": 0, "record_count": 0}
+                )
             )
+            chunk = await self._transform_chunk(
+                config, StreamChunk(index, [aggregated]), state, start_rule=position + 1
+            )
+            records.extend(chunk.records)
+            for key, value in chunk.state["transform"].items():
+                self._merge_transform_delta(delta, key, value)
+
+        return StreamChunk(
+            index,
+            records,
+            {"source_records": 0, "transform": delta, "finalized": True},
+        )
 
-    async def _execute_loading_stage(
+    async def _commit_chunk(
         self,
-        config: PipelineConfig,
         pipeline_run: Dict[str, Any],
-        data: List[Dict[str, Any]],
+        checkpoint: PipelineCheckpoint,
+        chunk: StreamChunk,
     ) -> None:
-        """Execute data loading stage."""
-        try:
-            logger.info(f"Executing loading stage for {pipeline_run['run_id']}")
-
-            data_target = config.data_target
-
-            if data_target.target_type == "database":
-                await self._load_to_database(data_target, data)
-            elif data_target.target_type == "api":
-                await self._load_to_api(data_target, data)
-            elif data_target.target_type == "file":
-                await self._load_to_file(data_target, data)
-            elif data_target.target_type == "stream":
-                await self._load_to_stream(data_target, data)
-            else:
-                raise DataPipelineError(
-                    f"Unsupported target type: {data_target.target_type}",
-                    pipeline_stage="loading",
-                )
+        """Record a loaded chunk in the checkpoint."""
+        for key, value in chunk.state.get("transform", {}).items():
+            self._merge_transform_delta(checkpoint.transform_state, key, value)
 
-            pipeline_run["stages_completed"].append(PipelineStage.LOADING.value)
+        quality = await self._validate_data_quality(chunk.records)
+        checkpoint.quality["total_records"] += quality["total_records"]
+        checkpoint.quality["valid_records"] += quality["valid_records"]
 
-        except Exception as e:
-            pipeline_run["stages_failed"].append(PipelineStage.LOADING.value)
-            raise DataPipelineError(
-                f"Loading stage failed: {e}",
-                pipeline_stage="loading",
-            )
+        checkpoint.records_extracted += chunk.state.get("source_records", 0)
+        checkpoint.records_loaded += len(chunk.records)
+        checkpoint.finalized = checkpoint.finalized or chunk.state.get("finalized", False)
+        checkpoint.last_chunk = chunk.index
+        checkpoint.updated_at = datetime.utcnow()
+
+        pipeline_run["records_processed"] = checkpoint.records_loaded
+
+    def _add_aggregate(
+        self, state: Dict[str, Any], key: str, partial: Dict[str, Any]
+    ) -> None:
+        totals = state.setdefault(key, {"aggregated_value": 0, "record_count": 0})
+        totals["aggregated_value"] += partial["aggregated_value"]
+        totals["record_count"] += partial["record_count"]
+
+    def _merge_transform_delta(
+        self, state: Dict[str, Any], key: str, value: Any
+    ) -> None:
+        """Fold a chunk's state delta into accumulated transformation state."""
+        if key.startswith("deduplicate:"):
+            state.setdefault(key, set()).update(value)
+        elif key.startswith("aggregate:"):
+            self._add_aggregate(state, key, value)
 
     async def _execute_validation_stage(
-        self,
-        config: PipelineConfig,
-        pipeline_run: Dict[str, Any],
-        data: List[Dict[str, Any]],
+        self, pipeline_run: Dict[str, Any], checkpoint: PipelineCheckpoint
     ) -> None:
-        """Execute data validation stage."""
+        """Execute data validation stage over the counts of every loaded chunk."""
         try:
             logger.info(f"Executing validation stage for {pipeline_run['run_id']}")
 
-            # Perform data quality checks
-            validation_results = await self._validate_data_quality(data)
+            total_records = checkpoint.quality["total_records"]
+            valid_records = checkpoint.quality["valid_records"]
+            validation_results = {
+                "passed": valid_records == total_records,
+                "total_records": total_records,
+                "valid_records": valid_records,
+                "validity_rate": (
+                    valid_records / total_records if total_records > 0 else 0
+                ),
+                "errors": (
+                    []
+                    if valid_records == total_records
+                    else ["Some records failed validation"]
+                ),
+            }
 
             # Store validation metrics
             pipeline_run["metrics"]["data_quality"] = validation_results
@@ -435,22 +641,27 @@ class DataPipelineService:
                 pipeline_stage="validation",
             )
 
-    # Data extraction methods
+    # Data extraction methods (async generators; ``offset`` skips records
+    # already covered by committed chunks)
     async def _extract_from_database(
-        self, data_source: DataSource
-    ) -> List[Dict[str, Any]]:
+        self, data_source: DataSource, offset: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Extract data from database source."""
         # Mock database extraction
-        return [
+        records = [
             {"id": 1, "name": "Record 1", "value": 100},
             {"id": 2, "name": "Record 2", "value": 200},
             {"id": 3, "name": "Record 3", "value": 300},
         ]
+        for record in records[offset:]:
+            yield record
 
-    async def _extract_from_api(self, data_source: DataSource) -> List[Dict[str, Any]]:
+    async def _extract_from_api(
+        self, data_source: DataSource, offset: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Extract data from API source."""
         # Mock API extraction
-        return [
+        records = [
             {
                 "timestamp": datetime.utcnow().isoformat(),
                 "metric": "cpu",
@@ -462,21 +673,27 @@ class DataPipelineService:
                 "value": 82.3,
             },
         ]
+        for record in records[offset:]:
+            yield record
 
-    async def _extract_from_file(self, data_source: DataSource) -> List[Dict[str, Any]]:
+    async def _extract_from_file(
+        self, data_source: DataSource, offset: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Extract data from file source."""
         # Mock file extraction
-        return [
+        records = [
             {"line": 1, "content": "First line of data"},
             {"line": 2, "content": "Second line of data"},
         ]
+        for record in records[offset:]:
+            yield record
 
     async def _extract_from_stream(
-        self, data_source: DataSource
-    ) -> List[Dict[str, Any]]:
+        self, data_source: DataSource, offset: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Extract data from streaming source."""
         # Mock stream extraction
-        return [
+        records = [
             {
                 "event_id": "evt_1",
                 "event_type": "user_action",
@@ -488,6 +705,8 @@ class DataPipelineService:
                 "timestamp": datetime.utcnow().isoformat(),
             },
         ]
+        for record in records[offset:]:
+            yield record
 
     # Data loading methods
     async def _load_to_database(
@@ -565,12 +784,15 @@ class DataPipelineService:
         return validated_data
 
     async def _deduplicate_transform(
-        self, data: List[Dict[str, Any]], rule: TransformationRule
+        self,
+        data: List[Dict[str, Any]],
+        rule: TransformationRule,
+        seen: Optional[set] = None,
     ) -> List[Dict[str, Any]]:
-        """Apply deduplication transformation."""
-        seen = set()
+        """Apply deduplication transformation (``seen`` carries keys across chunks)."""
+        seen = set() if seen is None else seen
         deduplicated = []
-        key_field = rule.parameters.get("key_field", "id") if rule.parameters else "id"
+        key_field = self._deduplication_key(rule)
 
         for record in data:
             key = record.get(key_field)
@@ -580,6 +802,9 @@ class DataPipelineService:
 
         return deduplicated
 
+    def _deduplication_key(self, rule: TransformationRule) -> str:
+        return rule.parameters.get("key_field", "id") if rule.parameters else "id"
+
     async def _normalize_transform(
         self, data: List[Dict[str, Any]], rule: TransformationRule
     ) -> List[Dict[str, Any]]:
@@ -668,10 +893,17 @@ class DataPipelineService:
     async def _retry_pipeline_execution(
         self, pipeline_id: str, failed_run: Dict[str, Any], error: Exception
     ) -> Dict[str, Any]:
-        """Retry pipeline execution with exponential backoff."""
-        # Implement retry logic
-        await asyncio.sleep(2)  # Simple delay
-        return await self.execute_pipeline(pipeline_id)
+        """Retry with exponential backoff, resuming after the last committed chunk."""
+        attempt = failed_run["attempt"] + 1
+        checkpoint = self._checkpoints.get(pipeline_id, PipelineCheckpoint())
+        delay = self.retry_backoff_seconds * (2 ** (attempt - 1))
+
+        logger.info(
+            f"Retrying pipeline {pipeline_id} (attempt {attempt}) in {delay:.1f}s "
+            f"from chunk {checkpoint.last_chunk + 1} after: {error}"
+        )
+        await asyncio.sleep(delay)
+        return await self._run_pipeline(pipeline_id, attempt)
 
     async def get_pipeline_status(self, pipeline_id: str) -> Dict[str, Any]:
         """Get detailed pipeline status."""
@@ -18,6 +18,7 @@ import random
 import time
 
 from core.settings_lazy import settings
+from agents.base.a2a_dispatch import TaskDispatcher, TaskRegistry
 A2A_SERVER_URL = None  # Will be initialized lazily
 A2A_WEBSOCKET_URL = None  # Will be initialized lazily
 from core.skill import Skill, SkillStatus
@@ -29,6 +30,7 @@ logger = logging.getLogger(__name__)
 AGENT_PING_INTERVAL = (
     25  # Segundos, ligeramente menor que HEARTBEAT_INTERVAL del servidor
 )
+SATURATED_RETRY_AFTER = 1.0  # Segundos sugeridos al servidor al rechazar una tarea
 
 
 class A2AAgent(BaseAgent):
@@ -51,6 +53,10 @@ class A2AAgent(BaseAgent):
         skills: Optional[List[Dict[str, str]]] = None,
         auto_register_skills: bool = True,
         a2a_server_url: Optional[str] = None,
+        max_concurrent_tasks: int = 8,
+        max_queued_tasks: int = 32,
+        task_registry_size: int = 1000,
+        task_ttl_seconds: float = 3600.0,
         **kwargs,  # Aceptar parámetros adicionales como toolkit, etc.
     ):
         """
@@ -66,6 +72,10 @@ class A2AAgent(BaseAgent):
             skills: Lista de habilidades del agente (nombre y descripción)
             auto_register_skills: Si es True, registra automáticamente las skills disponibles
             a2a_server_url: URL del servidor A2A (opcional, por defecto usa config.settings)
+            max_concurrent_tasks: Mensajes procesados a la vez
+            max_queued_tasks: Mensajes en espera antes de rechazar (backpressure)
+            task_registry_size: Máximo de tareas recordadas para get_skill_status
+            task_ttl_seconds: Tiempo que se recuerda una tarea sin actualizarse
             **kwargs: Parámetros adicionales para pasar a la clase base BaseAgent
         """
         # Pasar parámetros comunes a la clase base BaseAgent
@@ -83,7 +93,15 @@ class A2AAgent(BaseAgent):
 
         # Inicializar registro de skills
         self.registered_skills: Dict[str, Skill] = {}
-        self.skill_tasks: Dict[str, Dict[str, Any]] = {}
+        self.skill_tasks = TaskRegistry(task_registry_size, task_ttl_seconds)
+
+        # Despacho concurrente: un mensaje lento no bloquea pings ni otras tareas
+        self._dispatcher = TaskDispatcher(
+            self._process_message,
+            max_concurrent=max_concurrent_tasks,
+            max_queued=max_queued_tasks,
+            on_pressure=self._signal_backpressure,
+        )
 
         # Convertir capabilities a skills si no se proporcionan skills
         if not skills and capabilities:
@@ -220,7 +238,7 @@ class A2AAgent(BaseAgent):
             task_id: ID de la tarea
 
         Returns:
-            Dict con el estado de la tarea o None si no existe
+            Dict con el estado de la tarea o None si no existe (o ya caducó)
         """
         return self.skill_tasks.get(task_id)
 
@@ -439,6 +457,9 @@ class A2AAgent(BaseAgent):
                 logger.debug(f"Tarea de envío de pings cancelada para {self.agent_id}")
         self._send_pings_task = None
 
+        # Cancelar los mensajes que aún se estén procesando
+        await self._dispatcher.shutdown()
+
         if not self.is_connected or not self.websocket:
             logger.debug(
                 f"Agente {self.agent_id} ya está desconectado o sin websocket."
@@ -482,16 +503,27 @@ class A2AAgent(BaseAgent):
                     data = json.loads(message)
                     logger.debug(f"Mensaje recibido para {self.agent_id}: {data}")
 
-                    # Manejo de Heartbeat (Ping/Pong)
-                    if isinstance(data, dict) and data.get("type") == "ping":
+                    if not isinstance(data, dict):
+                        logger.warning(f"Mensaje ignorado (no es un objeto) para {self.agent_id}")
+                        continue
+
+                    # Carril prioritario: el heartbeat y las cancelaciones se
+                    # atienden en el propio bucle, nunca detrás de una tarea
+                    message_type = data.get("type")
+                    if message_type == "ping":
                         logger.debug(
                             f"Ping recibido de servidor, enviando pong para {self.agent_id}"
                         )
                         await self.send_message({"type": "pong"})
-                        continue  # No procesar pings más allá
+                        continue
+                    if message_type == "pong":
+                        continue
+                    if message_type == "cancel":
+                        await self._cancel_task(data.get("task_id"))
+                        continue
 
-                    # Procesar otros mensajes
-                    await self._process_message(data)
+                    # El resto se despacha de forma concurrente
+                    await self._dispatch_message(data)
 
                 except json.JSONDecodeError:
                     logger.error(
@@ -653,6 +685,66 @@ class A2AAgent(BaseAgent):
                 await asyncio.sleep(5)
         logger.debug(f"Tarea _send_pings finalizada para {self.agent_id}")
 
+    async def _dispatch_message(self, data: Dict[str, Any]) -> None:
+        """
+        Entrega un mensaje al despachador; si está lleno rechaza la tarea
+        indicando al servidor cuándo reintentar.
+        """
+        key = data.get("task_id") or data.get("id") or f"msg_{uuid.uuid4().hex[:8]}"
+        if await self._dispatcher.submit(key, data):
+            return
+
+        logger.warning(f"Agente {self.agent_id} saturado; mensaje {key} rechazado")
+        if data.get("type") == "task":
+            await self.send_message(
+                {
+                    "type": "task_update",
+                    "task_id": data.get("task_id"),
+                    "status": "rejected",
+                    "result": None,
+                    "error": {
+                        "type": "agent_saturated",
+                        "message": "Agent at capacity, retry later",
+                        "retry_after": SATURATED_RETRY_AFTER,
+                    },
+                }
+            )
+
+    async def _cancel_task(self, task_id: Optional[str]) -> None:
+        """Cancela una tarea en curso a petición del servidor."""
+        if not task_id or not self._dispatcher.cancel(task_id):
+            logger.debug(f"Cancelación ignorada para tarea desconocida {task_id}")
+            return
+        self.skill_tasks.update(
+            task_id, status=SkillStatus.CANCELLED, updated_at=datetime.now().isoformat()
+        )
+        await self.send_message(
+            {"type": "task_update", "task_id": task_id, "status": "cancelled", "result": None}
+        )
+
+    async def _signal_backpressure(self, saturated: bool, stats: Dict[str, Any]) -> None:
+        """Notifica al servidor A2A que el agente está saturado o vuelve a estar libre."""
+        logger.info(
+            f"Agente {self.agent_id} {'saturado' if saturated else 'disponible'}: {stats}"
+        )
+        await self.send_message(
+            {
+                "type": "backpressure",
+                "agent_id": self.agent_id,
+                "status": "saturated" if saturated else "available",
+                **stats,
+            }
+        )
+
+    def get_dispatch_stats(self) -> Dict[str, Any]:
+        """Estado del despachador y del registro de tareas."""
+        return {
+            **self._dispatcher.snapshot(),
+            "saturated": self._dispatcher.saturated,
+            "tracked_tasks": len(self.skill_tasks),
+            "evicted_tasks": self.skill_tasks.evicted,
+        }
+
     async def _process_message(self, data: Dict[str, Any]):
         """
         Procesa un mensaje recibido del servidor A2A.
@@ -667,10 +759,22 @@ class A2AAgent(BaseAgent):
             task_id = data.get("task_id")
             content = data.get("content", {})
             logger.info(f"Tarea '{task_id}' recibida por agente {self.agent_id}")
+            record = self.skill_tasks.put(
+                task_id,
+                {
+                    "skill": None,
+                    "status": SkillStatus.RUNNING,
+                    "created_at": datetime.now().isoformat(),
+                    "updated_at": datetime.now().isoformat(),
+                    "result": None,
+                    "error": None,
+                },
+            )
 
             try:
                 # Llamar al manejador de la tarea
-                result, status = await self._handle_task(task_id, content)
+                result = await self._handle_task(task_id, content)
+                status = result.get("status", "completed") if isinstance(result, dict) else "completed"
                 logger.info(
                     f"Tarea '{task_id}' procesada por {self.agent_id} con estado '{status}'"
                 )
@@ -681,6 +785,12 @@ class A2AAgent(BaseAgent):
                 result = {"error": str(e)}
                 status = "failed"
 
+            record.update(
+                status=SkillStatus.FAILED if status == "failed" else SkillStatus.COMPLETED,
+                result=result,
+                updated_at=datetime.now().isoformat(),
+            )
+
             # Enviar actualización de estado de vuelta al servidor
             update_message = {
                 "type": "task_update",
@@ -872,26 +982,30 @@ class A2AAgent(BaseAgent):
                 # Ejecutar la skill especificada
                 skill = self.registered_skills[skill_name]
 
-                # Registrar la tarea
-                self.skill_tasks[task_id] = {
-                    "skill": skill_name,
-                    "status": SkillStatus.PENDING,
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                    "result": None,
-                    "error": None,
-                }
+                # Registrar la tarea (se conserva la referencia aunque el
+                # registro la desaloje antes de terminar)
+                record = self.skill_tasks.put(
+                    task_id,
+                    {
+                        "skill": skill_name,
+                        "status": SkillStatus.RUNNING,
+                        "created_at": datetime.now().isoformat(),
+                        "updated_at": datetime.now().isoformat(),
+                        "result": None,
+                        "error": None,
+                    },
+                )
 
                 try:
                     # Ejecutar la skill
                     result = await skill.execute(task.get("parameters", {}))
 
                     # Actualizar el estado de la tarea
-                    self.skill_tasks[task_id]["status"] = SkillStatus.COMPLETED
-                    self.skill_tasks[task_id]["result"] = result
-                    self.skill_tasks[task_id]["updated_at"] = datetime.now().isoformat()
-                    self.skill_tasks[task_id]["execution_time"] = (
-                        time.time() - task_start_time
+                    record.update(
+                        status=SkillStatus.COMPLETED,
+                        result=result,
+                        updated_at=datetime.now().isoformat(),
+                        execution_time=time.time() - task_start_time,
                     )
 
                     # Formatear resultado según el estándar A2A
@@ -916,11 +1030,11 @@ class A2AAgent(BaseAgent):
 
                 except Exception as e:
                     # Registrar el error
-                    self.skill_tasks[task_id]["status"] = SkillStatus.FAILED
-                    self.skill_tasks[task_id]["error"] = str(e)
-                    self.skill_tasks[task_id]["updated_at"] = datetime.now().isoformat()
-                    self.skill_tasks[task_id]["execution_time"] = (
-                        time.time() - task_start_time
+                    record.update(
+                        status=SkillStatus.FAILED,
+                        error=str(e),
+                        updated_at=datetime.now().isoformat(),
+                        execution_time=time.time() - task_start_time,
                     )
 
                     logger.error(f"Error al ejecutar skill {skill_name}: {e}")
@@ -0,0 +1,194 @@
+"""
+Despacho concurrente de mensajes y registro acotado de tareas para agentes A2A.
+
+``TaskDispatcher`` ejecuta los mensajes recibidos en tareas asyncio con un
+límite de concurrencia, una cola acotada y una señal de backpressure con
+histéresis. ``TaskRegistry`` guarda el estado de las tareas con límite de
+entradas (LRU) y caducidad (TTL) para que los procesos de larga duración no
+acumulen memoria.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRegistry:
+    """
+    Registro de tareas acotado por número de entradas y por antigüedad.
+
+    Cada acceso o actualización mueve la tarea al final (LRU); al superar
+    ``max_entries`` se descartan las menos recientes y las que llevan más de
+    ``ttl_seconds`` sin actualizarse se consideran caducadas. Los registros
+    son diccionarios: quien ejecuta la tarea puede conservar la referencia y
+    mutarla aunque haya sido desalojada.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.evicted = 0
+
+    def put(self, task_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra (o reemplaza) una tarea y devuelve su registro."""
+        self._entries[task_id] = (time.monotonic(), record)
+        self._entries.move_to_end(task_id)
+        self._evict()
+        return record
+
+    def update(self, task_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Actualiza campos de una tarea registrada; None si ya no existe."""
+        record = self.get(task_id)
+        if record is None:
+            return None
+        record.update(fields)
+        self._entries[task_id] = (time.monotonic(), record)
+        return record
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return None
+        touched_at, record = entry
+        if time.monotonic() - touched_at > self.ttl_seconds:
+            del self._entries[task_id]
+            self.evicted += 1
+            return None
+        self._entries.move_to_end(task_id)
+        return record
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        # Las entradas más antiguas están al principio: caducadas primero
+        while self._entries:
+            task_id, (touched_at, _) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - touched_at <= self.ttl_seconds:
+                break
+            del self._entries[task_id]
+            self.evicted += 1
+
+    def __contains__(self, task_id: object) -> bool:
+        return isinstance(task_id, str) and self.get(task_id) is not None
+
+    def __getitem__(self, task_id: str) -> Dict[str, Any]:
+        record = self.get(task_id)
+        if record is None:
+            raise KeyError(task_id)
+        return record
+
+    def __setitem__(self, task_id: str, record: Dict[str, Any]) -> None:
+        self.put(task_id, record)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+
+class TaskDispatcher:
+    """
+    Ejecuta mensajes de forma concurrente con límite y backpressure.
+
+    Hasta ``max_concurrent`` mensajes se procesan a la vez; hasta
+    ``max_queued`` más esperan un hueco. Por encima de eso ``submit`` los
+    rechaza. Cuando todos los huecos están ocupados se notifica saturación
+    y, al bajar a la mitad, disponibilidad (histéresis para no oscilar).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        max_concurrent: int = 8,
+        max_queued: int = 32,
+        on_pressure: Optional[Callable[[bool, Dict[str, Any]], Awaitable[None]]] = None,
+    ):
+        self.handler = handler
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.on_pressure = on_pressure
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running = 0
+        self.saturated = False
+        self.stats = {"accepted": 0, "rejected": 0, "cancelled": 0, "failed": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "queued": len(self._tasks) - self._running,
+            "capacity": self.max_concurrent,
+            "max_queued": self.max_queued,
+            **self.stats,
+        }
+
+    async def submit(self, key: str, data: Dict[str, Any]) -> bool:
+        """
+        Programa ``handler(data)`` sin esperar a que termine.
+
+        Returns:
+            False si la cola está llena y el mensaje se rechaza
+        """
+        if len(self._tasks) >= self.max_concurrent + self.max_queued or key in self._tasks:
+            self.stats["rejected"] += 1
+            return False
+
+        self.stats["accepted"] += 1
+        task = asyncio.create_task(self._run(key, data))
+        self._tasks[key] = task
+        if not self.saturated and len(self._tasks) >= self.max_concurrent:
+            self.saturated = True
+            await self._notify()
+        return True
+
+    def cancel(self, key: str) -> bool:
+        """Cancela un mensaje en cola o en ejecución."""
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        self.stats["cancelled"] += 1
+        return True
+
+    async def shutdown(self) -> None:
+        """Cancela todo lo pendiente y espera a que termine."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, key: str, data: Dict[str, Any]) -> None:
+        try:
+            async with self._slots:
+                self._running += 1
+                try:
+                    await self.handler(data)
+                finally:
+                    self._running -= 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Error procesando mensaje despachado {key}: {e}")
+        finally:
+            self._tasks.pop(key, None)
+            if self.saturated and len(self._tasks) <= self.max_concurrent // 2:
+                self.saturated = False
+                await self._notify()
+
+    async def _notify(self) -> None:
+        if self.on_pressure is None:
+            return
+        try:
+            await self.on_pressure(self.saturated, self.snapshot())
+        except Exception as e:
+            logger.warning(f"No se pudo notificar backpressure: {e}")
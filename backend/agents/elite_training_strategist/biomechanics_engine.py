@@ -0,0 +1,602 @@
+"""
+BLAZE Biomechanics Engine - Análisis biomecánico vectorizado por clip.
+
+Representa los keypoints de un clip como un tensor ``frames × landmarks × coords``
+y calcula ángulos articulares, simetría, fases/tempo y degradación técnica con
+operaciones NumPy sobre todo el clip a la vez, en lugar de construir dicts y
+arrays pequeños por articulación y por frame.
+
+Para videos largos, ``StreamingBiomechanicsAnalyzer`` procesa el clip por
+chunks y emite análisis por ventanas; cada chunk se reduce de inmediato a
+series compactas (ángulos y simetría por frame) y el tensor crudo se descarta.
+"""
+
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LANDMARK_NAMES: Tuple[str, ...] = (
+    "nose",
+    "left_shoulder",
+    "right_shoulder",
+    "left_elbow",
+    "right_elbow",
+    "left_wrist",
+    "right_wrist",
+    "left_hip",
+    "right_hip",
+    "left_knee",
+    "right_knee",
+    "left_ankle",
+    "right_ankle",
+)
+LANDMARK_INDEX: Dict[str, int] = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+
+# Ángulos articulares como (punto, vértice, punto)
+JOINT_TRIPLETS: Dict[str, Tuple[str, str, str]] = {
+    "left_knee": ("left_hip", "left_knee", "left_ankle"),
+    "right_knee": ("right_hip", "right_knee", "right_ankle"),
+    "left_hip": ("left_shoulder", "left_hip", "left_knee"),
+    "right_hip": ("right_shoulder", "right_hip", "right_knee"),
+}
+JOINT_NAMES: Tuple[str, ...] = tuple(JOINT_TRIPLETS) + ("torso_lean",)
+
+SYMMETRIC_PAIRS: Tuple[Tuple[str, str], ...] = (
+    ("left_shoulder", "right_shoulder"),
+    ("left_elbow", "right_elbow"),
+    ("left_hip", "right_hip"),
+    ("left_knee", "right_knee"),
+    ("left_ankle", "right_ankle"),
+)
+
+PHASE_NAMES: Tuple[str, ...] = ("isometric", "eccentric", "concentric")
+PHASE_ISOMETRIC, PHASE_ECCENTRIC, PHASE_CONCENTRIC = 0, 1, 2
+
+DEFAULT_SYMMETRY_SCORE = 75.0
+HOLD_VELOCITY_DEG_S = 15.0  # Por debajo de esta velocidad angular la fase es isométrica
+MIN_REP_ROM_DEG = 15.0
+MIN_REP_SECONDS = 0.6
+SMOOTHING_SECONDS = 0.3
+MIN_REPS_FOR_TREND = 3
+ROM_LOSS_THRESHOLD_PCT = 10.0
+TEMPO_SLOWDOWN_THRESHOLD_PCT = 20.0
+SYMMETRY_DROP_THRESHOLD = 10.0
+
+_TRIPLET_INDEX = np.array(
+    [[LANDMARK_INDEX[name] for name in triplet] for triplet in JOINT_TRIPLETS.values()],
+    dtype=np.intp,
+)
+_LEFT_INDEX = np.array([LANDMARK_INDEX[left] for left, _ in SYMMETRIC_PAIRS])
+_RIGHT_INDEX = np.array([LANDMARK_INDEX[right] for _, right in SYMMETRIC_PAIRS])
+_SHOULDER_INDEX = np.array(
+    [LANDMARK_INDEX["left_shoulder"], LANDMARK_INDEX["right_shoulder"]]
+)
+_HIP_INDEX = np.array([LANDMARK_INDEX["left_hip"], LANDMARK_INDEX["right_hip"]])
+_TORSO_COLUMN = JOINT_NAMES.index("torso_lean")
+
+
+@dataclass
+class KeypointTensor:
+    """Keypoints de un clip como tensor ``(frames, landmarks, 3)``.
+
+    Las coordenadas de landmarks no detectados son NaN, de modo que todas las
+    métricas se propagan sin ramas por articulación.
+    """
+
+    coords: np.ndarray
+    visibility: np.ndarray
+    fps: float = 10.0
+
+    @classmethod
+    def allocate(cls, num_frames: int, fps: float = 10.0) -> "KeypointTensor":
+        """Reserva un tensor vacío (todo NaN) para ``num_frames`` frames."""
+        return cls(
+            coords=np.full((num_frames, len(LANDMARK_NAMES), 3), np.nan),
+            visibility=np.zeros((num_frames, len(LANDMARK_NAMES))),
+            fps=fps,
+        )
+
+    @classmethod
+    def from_landmark_frames(
+        cls, frames: Sequence[Dict[str, Any]], fps: float = 10.0
+    ) -> "KeypointTensor":
+        """Construye el tensor desde frames con formato ``{"pose_landmarks": [...]}``."""
+        tensor = cls.allocate(len(frames), fps)
+        for f, frame in enumerate(frames):
+            for landmark in frame.get("pose_landmarks", []):
+                idx = LANDMARK_INDEX.get(landmark.get("name"))
+                if idx is None:
+                    continue
+                tensor.coords[f, idx] = (
+                    landmark.get("x", np.nan),
+                    landmark.get("y", np.nan),
+                    landmark.get("z", 0.0),
+                )
+                tensor.visibility[f, idx] = landmark.get("visibility", 1.0)
+        return tensor
+
+    @property
+    def num_frames(self) -> int:
+        return self.coords.shape[0]
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.num_frames / self.fps if self.fps else 0.0
+
+    def frame_confidence(self) -> np.ndarray:
+        """Visibilidad media de los landmarks detectados en cada frame."""
+        detected = self.visibility > 0
+        counts = detected.sum(axis=1)
+        totals = self.visibility.sum(axis=1)
+        return np.divide(
+            totals, counts, out=np.zeros(self.num_frames), where=counts > 0
+        )
+
+
+def compute_joint_angles(tensor: KeypointTensor) -> np.ndarray:
+    """Calcula todos los ángulos de ``JOINT_NAMES`` para todo el clip.
+
+    Returns:
+        Array ``(frames, len(JOINT_NAMES))`` en grados; NaN si faltan landmarks.
+    """
+    xy = tensor.coords[..., :2]
+    a = xy[:, _TRIPLET_INDEX[:, 0]]
+    b = xy[:, _TRIPLET_INDEX[:, 1]]  # vértice
+    c = xy[:, _TRIPLET_INDEX[:, 2]]
+    ba = a - b
+    bc = c - b
+
+    angles = np.empty((tensor.num_frames, len(JOINT_NAMES)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cosine = np.einsum("fjc,fjc->fj", ba, bc) / (
+            np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)
+        )
+    angles[:, :_TORSO_COLUMN] = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+    # Inclinación del torso respecto a la vertical (0 = vertical perfecto)
+    torso_top = xy[:, _SHOULDER_INDEX].mean(axis=1)
+    torso_bottom = xy[:, _HIP_INDEX].mean(axis=1)
+    angles[:, _TORSO_COLUMN] = np.abs(
+        np.degrees(
+            np.arctan2(
+                torso_top[:, 0] - torso_bottom[:, 0],
+                torso_bottom[:, 1] - torso_top[:, 1],
+            )
+        )
+    )
+    return angles
+
+
+def compute_symmetry_scores(tensor: KeypointTensor) -> np.ndarray:
+    """Score de simetría (0-100) por frame según la diferencia de altura entre pares."""
+    y = tensor.coords[..., 1]
+    scores = np.maximum(0.0, 100.0 - np.abs(y[:, _LEFT_INDEX] - y[:, _RIGHT_INDEX]) * 500)
+    valid = ~np.isnan(scores)
+    counts = valid.sum(axis=1)
+    totals = np.where(valid, scores, 0.0).sum(axis=1)
+    return np.divide(
+        totals,
+        counts,
+        out=np.full(tensor.num_frames, DEFAULT_SYMMETRY_SCORE),
+        where=counts > 0,
+    )
+
+
+def angles_to_dict(row: np.ndarray) -> Dict[str, float]:
+    """Convierte una fila de ``compute_joint_angles`` al formato dict por articulación."""
+    return {
+        name: float(value)
+        for name, value in zip(JOINT_NAMES, row)
+        if not np.isnan(value)
+    }
+
+
+def segment_phases(
+    signal: np.ndarray, fps: float, hold_velocity: float = HOLD_VELOCITY_DEG_S
+) -> np.ndarray:
+    """Etiqueta cada frame como isométrico, excéntrico o concéntrico.
+
+    Un ángulo decreciente (flexión) se considera fase excéntrica.
+    """
+    phases = np.full(signal.shape[0], PHASE_ISOMETRIC, dtype=np.int8)
+    if signal.shape[0] < 2:
+        return phases
+    velocity = np.gradient(signal) * fps
+    phases[velocity < -hold_velocity] = PHASE_ECCENTRIC
+    phases[velocity > hold_velocity] = PHASE_CONCENTRIC
+    return phases
+
+
+def detect_repetitions(
+    signal: np.ndarray, fps: float, min_rom: float = MIN_REP_ROM_DEG
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Detecta repeticiones como valles del ángulo principal.
+
+    Returns:
+        ``(valleys, edges)``: índice del punto más bajo de cada repetición y
+        límites de segmento (``len(valleys) + 1`` valores) para ``reduceat``.
+    """
+    n = signal.shape[0]
+    empty = np.empty(0, dtype=np.intp)
+    if n < 3:
+        return empty, empty
+
+    sign = np.sign(np.diff(signal))
+    # Propagar el último signo no nulo a través de mesetas
+    last_nonzero = np.where(sign != 0, np.arange(sign.shape[0]), 0)
+    np.maximum.accumulate(last_nonzero, out=last_nonzero)
+    sign = sign[last_nonzero]
+
+    valleys = np.flatnonzero((sign[:-1] < 0) & (sign[1:] > 0)) + 1
+    ceiling = np.percentile(signal, 90)
+    valleys = valleys[signal[valleys] <= ceiling - min_rom]
+    if valleys.size == 0:
+        return empty, empty
+
+    min_gap = max(1, int(fps * MIN_REP_SECONDS))
+    kept = [int(valleys[0])]
+    for valley in valleys[1:]:
+        if valley - kept[-1] >= min_gap:
+            kept.append(int(valley))
+        elif signal[valley] < signal[kept[-1]]:
+            kept[-1] = int(valley)
+
+    # Límite entre repeticiones: el punto más alto entre dos valles consecutivos
+    bounds = [
+        start + int(np.argmax(signal[start:end])) for start, end in zip(kept, kept[1:])
+    ]
+    edges = np.array([0] + bounds + [n], dtype=np.intp)
+    return np.array(kept, dtype=np.intp), edges
+
+
+def _fill_gaps(signal: np.ndarray) -> np.ndarray:
+    """Interpola linealmente los NaN de una serie."""
+    missing = np.isnan(signal)
+    if not missing.any():
+        return signal
+    if missing.all():
+        return np.zeros_like(signal)
+    positions = np.arange(signal.shape[0])
+    filled = signal.copy()
+    filled[missing] = np.interp(
+        positions[missing], positions[~missing], signal[~missing]
+    )
+    return filled
+
+
+def _smooth(signal: np.ndarray, fps: float) -> np.ndarray:
+    """Media móvil centrada de ``SMOOTHING_SECONDS``."""
+    window = int(fps * SMOOTHING_SECONDS) | 1
+    if window <= 1 or signal.shape[0] < window:
+        return signal
+    padded = np.pad(signal, window // 2, mode="edge")
+    return np.convolve(padded, np.ones(window) / window, mode="valid")
+
+
+def _repetition_stats(
+    signal: np.ndarray,
+    symmetry: np.ndarray,
+    phases: np.ndarray,
+    edges: np.ndarray,
+    fps: float,
+) -> Dict[str, np.ndarray]:
+    """Métricas por repetición con ``reduceat`` sobre los segmentos."""
+    if edges.size < 2:
+        empty = np.empty(0)
+        return {
+            "rom": empty,
+            "duration": empty,
+            "eccentric_time": empty,
+            "concentric_time": empty,
+            "symmetry": empty,
+        }
+    starts = edges[:-1]
+    lengths = np.diff(edges)
+    return {
+        "rom": np.maximum.reduceat(signal, starts) - np.minimum.reduceat(signal, starts),
+        "duration": lengths / fps,
+        "eccentric_time": np.add.reduceat((phases == PHASE_ECCENTRIC).astype(np.int32), starts) / fps,
+        "concentric_time": np.add.reduceat((phases == PHASE_CONCENTRIC).astype(np.int32), starts) / fps,
+        "symmetry": np.add.reduceat(symmetry, starts) / lengths,
+    }
+
+
+def _coefficient_of_variation(values: np.ndarray) -> float:
+    mean = values.mean() if values.size else 0.0
+    return float(values.std() / mean) if mean else 0.0
+
+
+def _tempo_metrics(reps: Dict[str, np.ndarray]) -> Dict[str, float]:
+    durations = reps["duration"]
+    if durations.size == 0:
+        return {
+            "avg_rep_duration": 0.0,
+            "cadence_reps_per_minute": 0.0,
+            "avg_eccentric_time": 0.0,
+            "avg_concentric_time": 0.0,
+            "eccentric_concentric_ratio": 0.0,
+            "tempo_variability": 0.0,
+        }
+    eccentric = float(reps["eccentric_time"].mean())
+    concentric = float(reps["concentric_time"].mean())
+    return {
+        "avg_rep_duration": round(float(durations.mean()), 2),
+        "cadence_reps_per_minute": round(60.0 / float(durations.mean()), 1),
+        "avg_eccentric_time": round(eccentric, 2),
+        "avg_concentric_time": round(concentric, 2),
+        "eccentric_concentric_ratio": (
+            round(eccentric / concentric, 2) if concentric else 0.0
+        ),
+        "tempo_variability": round(_coefficient_of_variation(durations), 3),
+    }
+
+
+def _consistency_metrics(
+    reps: Dict[str, np.ndarray], torso_lean: np.ndarray
+) -> Dict[str, float]:
+    rom_cv = _coefficient_of_variation(reps["rom"])
+    duration_cv = _coefficient_of_variation(reps["duration"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        torso_std = np.nanstd(torso_lean) if torso_lean.size else np.nan
+    stability = 75.0 if np.isnan(torso_std) else max(0.0, 100.0 - torso_std * 3)
+    return {
+        "rom_variability": round(rom_cv, 3),
+        "tempo_variability": round(duration_cv, 3),
+        "consistency_score": round(100.0 * (1.0 - min(1.0, (rom_cv + duration_cv) / 2)), 1),
+        "stability_score": round(float(stability), 1),
+    }
+
+
+def _fatigue_metrics(reps: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    rom = reps["rom"]
+    count = rom.size
+    if count < MIN_REPS_FOR_TREND:
+        return {
+            "fatigue_detected": False,
+            "severity": "none",
+            "indicators": [],
+            "reason": "insufficient_repetitions",
+        }
+
+    third = max(1, count // 3)
+    early, late = slice(0, third), slice(count - third, count)
+    baseline_rom = rom[early].mean()
+    rom_loss_pct = (1 - rom[late].mean() / baseline_rom) * 100 if baseline_rom else 0.0
+    duration = reps["duration"]
+    slowdown_pct = (duration[late].mean() / duration[early].mean() - 1) * 100
+    symmetry_drop = reps["symmetry"][early].mean() - reps["symmetry"][late].mean()
+
+    indicators = []
+    if rom_loss_pct > ROM_LOSS_THRESHOLD_PCT:
+        indicators.append("rom_loss")
+    if slowdown_pct > TEMPO_SLOWDOWN_THRESHOLD_PCT:
+        indicators.append("tempo_slowdown")
+    if symmetry_drop > SYMMETRY_DROP_THRESHOLD:
+        indicators.append("symmetry_drop")
+
+    below = np.flatnonzero(rom < baseline_rom * (1 - ROM_LOSS_THRESHOLD_PCT / 100))
+    below = below[below >= third]
+
+    return {
+        "fatigue_detected": bool(indicators),
+        "severity": (
+            "high" if len(indicators) >= 2 else "moderate" if indicators else "none"
+        ),
+        "indicators": indicators,
+        "rom_loss_pct": round(float(rom_loss_pct), 1),
+        "tempo_slowdown_pct": round(float(slowdown_pct), 1),
+        "symmetry_drop": round(float(symmetry_drop), 1),
+        "rom_slope_per_rep": round(float(np.polyfit(np.arange(count), rom, 1)[0]), 2),
+        "onset_repetition": int(below[0]) + 1 if below.size else None,
+    }
+
+
+def _quality_trend(reps: Dict[str, np.ndarray], symmetry: np.ndarray) -> str:
+    series = reps["symmetry"] if reps["symmetry"].size >= MIN_REPS_FOR_TREND else symmetry
+    if series.size < 2:
+        return "stable"
+    total_change = np.polyfit(np.arange(series.size), series, 1)[0] * series.size
+    if total_change > 5:
+        return "improving"
+    if total_change < -5:
+        return "declining"
+    return "stable"
+
+
+def analyze_series(
+    angles: np.ndarray,
+    symmetry: np.ndarray,
+    fps: float,
+    primary_joint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Analiza series de ángulos ``(frames, joints)`` y simetría ``(frames,)``.
+
+    Args:
+        angles: Salida de ``compute_joint_angles``
+        symmetry: Salida de ``compute_symmetry_scores``
+        fps: Frames por segundo de las series
+        primary_joint: Articulación que define las repeticiones; por defecto
+            la de mayor rango de movimiento
+
+    Returns:
+        Resumen con ángulos, simetría, fases, repeticiones, tempo,
+        consistencia, fatiga y tendencia de calidad
+    """
+    num_frames = angles.shape[0]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mins = np.nanmin(angles, axis=0) if num_frames else np.full(len(JOINT_NAMES), np.nan)
+        maxs = np.nanmax(angles, axis=0) if num_frames else np.full(len(JOINT_NAMES), np.nan)
+        means = np.nanmean(angles, axis=0) if num_frames else np.full(len(JOINT_NAMES), np.nan)
+    ranges = maxs - mins
+
+    if primary_joint is None:
+        joint_ranges = np.nan_to_num(ranges[:_TORSO_COLUMN], nan=-1.0)
+        primary_joint = JOINT_NAMES[int(np.argmax(joint_ranges))]
+    column = JOINT_NAMES.index(primary_joint)
+
+    signal = _smooth(_fill_gaps(angles[:, column]), fps)
+    phases = segment_phases(signal, fps)
+    _, edges = detect_repetitions(signal, fps)
+    reps = _repetition_stats(signal, symmetry, phases, edges, fps)
+    phase_counts = np.bincount(phases, minlength=len(PHASE_NAMES))
+
+    return {
+        "total_frames": num_frames,
+        "duration_seconds": round(num_frames / fps, 2) if fps else 0.0,
+        "primary_joint": primary_joint,
+        "joint_angles": {
+            name: {
+                "mean": round(float(means[j]), 1),
+                "min": round(float(mins[j]), 1),
+                "max": round(float(maxs[j]), 1),
+                "range": round(float(ranges[j]), 1),
+            }
+            for j, name in enumerate(JOINT_NAMES)
+            if not np.isnan(means[j])
+        },
+        "symmetry": {
+            "mean": round(float(symmetry.mean()), 1) if num_frames else DEFAULT_SYMMETRY_SCORE,
+            "min": round(float(symmetry.min()), 1) if num_frames else DEFAULT_SYMMETRY_SCORE,
+        },
+        "phases": {
+            "distribution": {
+                name: round(float(phase_counts[p] / num_frames), 3) if num_frames else 0.0
+                for p, name in enumerate(PHASE_NAMES)
+            },
+            "transitions": int(np.count_nonzero(np.diff(phases))),
+        },
+        "repetitions": {
+            "count": int(reps["rom"].size),
+            **{key: np.round(values, 2).tolist() for key, values in reps.items()},
+        },
+        "tempo": _tempo_metrics(reps),
+        "consistency": _consistency_metrics(reps, angles[:, _TORSO_COLUMN]),
+        "fatigue": _fatigue_metrics(reps),
+        "quality_trend": _quality_trend(reps, symmetry),
+    }
+
+
+def analyze_clip(
+    tensor: KeypointTensor, primary_joint: Optional[str] = None
+) -> Dict[str, Any]:
+    """Análisis completo de un clip en una sola pasada vectorizada."""
+    return analyze_series(
+        compute_joint_angles(tensor),
+        compute_symmetry_scores(tensor),
+        tensor.fps,
+        primary_joint,
+    )
+
+
+class StreamingBiomechanicsAnalyzer:
+    """Análisis por ventanas para videos largos.
+
+    Cada chunk de keypoints se reduce a ángulos y simetría por frame, que se
+    acumulan en buffers pre-reservados (crecen por duplicación). Cada
+    ``hop_seconds`` se emite el análisis de la última ventana completa.
+    """
+
+    def __init__(
+        self,
+        fps: float,
+        window_seconds: float = 10.0,
+        hop_seconds: float = 5.0,
+        initial_capacity: int = 1024,
+        primary_joint: Optional[str] = None,
+    ):
+        self.fps = fps
+        self.window_frames = max(2, int(round(window_seconds * fps)))
+        self.hop_frames = max(1, int(round(hop_seconds * fps)))
+        self.primary_joint = primary_joint
+        self.window_results: List[Dict[str, Any]] = []
+
+        self._angles = np.empty((initial_capacity, len(JOINT_NAMES)))
+        self._symmetry = np.empty(initial_capacity)
+        self._confidence = np.empty(initial_capacity)
+        self._size = 0
+        self._next_emit = self.window_frames
+
+    @property
+    def total_frames(self) -> int:
+        return self._size
+
+    @property
+    def angles(self) -> np.ndarray:
+        return self._angles[: self._size]
+
+    @property
+    def symmetry(self) -> np.ndarray:
+        return self._symmetry[: self._size]
+
+    @property
+    def average_confidence(self) -> float:
+        return float(self._confidence[: self._size].mean()) if self._size else 0.0
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = self._angles.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self._angles = np.resize(self._angles, (capacity, len(JOINT_NAMES)))
+        self._symmetry = np.resize(self._symmetry, capacity)
+        self._confidence = np.resize(self._confidence, capacity)
+
+    def push(self, chunk: KeypointTensor) -> List[Dict[str, Any]]:
+        """Añade un chunk de frames y devuelve las ventanas completadas."""
+        count = chunk.num_frames
+        self._reserve(count)
+        end = self._size + count
+        self._angles[self._size : end] = compute_joint_angles(chunk)
+        self._symmetry[self._size : end] = compute_symmetry_scores(chunk)
+        self._confidence[self._size : end] = chunk.frame_confidence()
+        self._size = end
+
+        emitted = []
+        while self._size >= self._next_emit:
+            stop = self._next_emit
+            start = stop - self.window_frames
+            result = analyze_series(
+                self._angles[start:stop],
+                self._symmetry[start:stop],
+                self.fps,
+                self.primary_joint,
+            )
+            result["window"] = {
+                "start_frame": start,
+                "end_frame": stop,
+                "start_seconds": round(start / self.fps, 2),
+            }
+            emitted.append(result)
+            self._next_emit += self.hop_frames
+
+        self.window_results.extend(emitted)
+        return emitted
+
+    def finalize(self) -> Dict[str, Any]:
+        """Análisis del clip completo sobre las series acumuladas."""
+        summary = analyze_series(self.angles, self.symmetry, self.fps, self.primary_joint)
+        summary["windows_analyzed"] = len(self.window_results)
+        return summary
+
+    def frame_records(self) -> List[Dict[str, Any]]:
+        """Vista por frame (solo bajo demanda, p.ej. ``return_frame_analysis``)."""
+        return [
+            {
+                "frame_number": f,
+                "timestamp": round(f / self.fps, 3),
+                "joint_angles": angles_to_dict(self._angles[f]),
+                "symmetry_score": round(float(self._symmetry[f]), 1),
+                "confidence": round(float(self._confidence[f]), 3),
+            }
+            for f in range(self._size)
+        ]
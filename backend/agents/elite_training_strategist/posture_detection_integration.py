@@ -18,19 +18,35 @@ NUEVAS CAPACIDADES OPTIMIZADAS:
 
 import json
 import cv2
-import numpy as np
 from typing import Dict, Any, List, Optional, Union, Tuple
 from datetime import datetime, timedelta
 import asyncio
 import hashlib
+import os
+import tempfile
 from dataclasses import dataclass, asdict
 
+try:
+    import mediapipe as mp
+
+    MEDIAPIPE_AVAILABLE = True
+except ImportError:
+    MEDIAPIPE_AVAILABLE = False
+
 from agents.skills.advanced_vision_skills import ExercisePostureDetectionSkill
 from clients.vertex_ai.advanced_vision_client import AdvancedVisionClient
 from config.gemini_models import get_model_config
 from core.logging_config import get_logger
 from adk.agent import Skill
 
+from .biomechanics_engine import (
+    KeypointTensor,
+    StreamingBiomechanicsAnalyzer,
+    angles_to_dict,
+    compute_joint_angles,
+    compute_symmetry_scores,
+)
+
 # Importar funciones auxiliares optimizadas
 from .vision_optimization_helpers import (
     analyze_biomechanics,
@@ -46,6 +62,11 @@ logger = get_logger(__name__)
 _vision_cache = {}
 _cache_timeout = timedelta(hours=1)
 
+# Streaming de video: lotes de frames y ventanas de análisis
+VIDEO_BATCH_FRAMES = 64
+VIDEO_WINDOW_SECONDS = 10.0
+VIDEO_WINDOW_HOP_SECONDS = 5.0
+
 
 @dataclass
 class KeypointAnalysis:
@@ -331,76 +352,9 @@ class BlazeEnhancedVisionMixin:
 
     def _calculate_joint_angles(self, keypoints: Dict[str, Any]) -> Dict[str, float]:
         """Calcula ángulos articulares precisos desde keypoints."""
-        landmarks = {
-            lm["name"]: (lm["x"], lm["y"]) for lm in keypoints["pose_landmarks"]
-        }
-
-        def angle_between_points(p1, p2, p3):
-            """Calcula ángulo entre tres puntos."""
-            import math
-
-            a = np.array(p1)
-            b = np.array(p2)  # punto vértice
-            c = np.array(p3)
-
-            ba = a - b
-            bc = c - b
-
-            cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-            angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-            return np.degrees(angle)
-
         try:
-            angles = {}
-
-            # Ángulo de rodilla izquierda
-            if all(k in landmarks for k in ["left_hip", "left_knee", "left_ankle"]):
-                angles["left_knee"] = angle_between_points(
-                    landmarks["left_hip"],
-                    landmarks["left_knee"],
-                    landmarks["left_ankle"],
-                )
-
-            # Ángulo de rodilla derecha
-            if all(k in landmarks for k in ["right_hip", "right_knee", "right_ankle"]):
-                angles["right_knee"] = angle_between_points(
-                    landmarks["right_hip"],
-                    landmarks["right_knee"],
-                    landmarks["right_ankle"],
-                )
-
-            # Ángulo de cadera (tronco-muslo)
-            if all(k in landmarks for k in ["left_shoulder", "left_hip", "left_knee"]):
-                angles["left_hip"] = angle_between_points(
-                    landmarks["left_shoulder"],
-                    landmarks["left_hip"],
-                    landmarks["left_knee"],
-                )
-
-            # Ángulo de espalda (inclinación)
-            if all(
-                k in landmarks
-                for k in ["left_shoulder", "right_shoulder", "left_hip", "right_hip"]
-            ):
-                torso_center_top = (
-                    (landmarks["left_shoulder"][0] + landmarks["right_shoulder"][0])
-                    / 2,
-                    (landmarks["left_shoulder"][1] + landmarks["right_shoulder"][1])
-                    / 2,
-                )
-                torso_center_bottom = (
-                    (landmarks["left_hip"][0] + landmarks["right_hip"][0]) / 2,
-                    (landmarks["left_hip"][1] + landmarks["right_hip"][1]) / 2,
-                )
-
-                # Ángulo con vertical (0 = vertical perfecto)
-                torso_angle = np.arctan2(
-                    torso_center_top[0] - torso_center_bottom[0],
-                    torso_center_bottom[1] - torso_center_top[1],
-                )
-                angles["torso_lean"] = abs(np.degrees(torso_angle))
-
-            return angles
+            tensor = KeypointTensor.from_landmark_frames([keypoints])
+            return angles_to_dict(compute_joint_angles(tensor)[0])
 
         except Exception as e:
             logger.warning(f"Error calculando ángulos articulares: {e}")
@@ -408,41 +362,256 @@ class BlazeEnhancedVisionMixin:
 
     def _calculate_symmetry_score(self, keypoints: Dict[str, Any]) -> float:
         """Calcula score de simetría corporal (0-100)."""
-        landmarks = {
-            lm["name"]: (lm["x"], lm["y"]) for lm in keypoints["pose_landmarks"]
-        }
+        try:
+            tensor = KeypointTensor.from_landmark_frames([keypoints])
+            return float(compute_symmetry_scores(tensor)[0])
+
+        except Exception as e:
+            logger.warning(f"Error calculando simetría: {e}")
+            return 75.0  # Score neutro
+
+    # 🎬 PROCESAMIENTO DE VIDEO VECTORIZADO
+
+    def _iter_video_frame_batches(
+        self, video_data: Union[str, bytes], analysis_fps: int, batch_size: int
+    ):
+        """Decodifica el video muestreando a ``analysis_fps`` y agrupa frames en lotes."""
+        temp_path = None
+        if isinstance(video_data, bytes):
+            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+                tmp.write(video_data)
+                temp_path = tmp.name
+        source = temp_path or video_data
 
+        capture = cv2.VideoCapture(source)
         try:
-            # Pares simétricos para comparar
-            symmetric_pairs = [
-                ("left_shoulder", "right_shoulder"),
-                ("left_elbow", "right_elbow"),
-                ("left_hip", "right_hip"),
-                ("left_knee", "right_knee"),
-                ("left_ankle", "right_ankle"),
+            source_fps = capture.get(cv2.CAP_PROP_FPS) or analysis_fps
+            step = max(1, int(round(source_fps / analysis_fps)))
+            batch = []
+            frame_index = 0
+            while True:
+                grabbed = capture.grab()
+                if not grabbed:
+                    break
+                if frame_index % step == 0:
+                    _, frame = capture.retrieve()
+                    batch.append(frame)
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+                frame_index += 1
+            if batch:
+                yield batch
+        finally:
+            capture.release()
+            if temp_path:
+                os.unlink(temp_path)
+
+    def _detect_pose_batch(self, frames: List[Any]) -> List[Dict[str, Any]]:
+        """Ejecuta el modelo de pose sobre cada frame BGR decodificado (bloqueante)."""
+        results = []
+        with mp.solutions.pose.Pose(
+            static_image_mode=False, model_complexity=1
+        ) as pose:
+            for frame in frames:
+                detection = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                landmarks = []
+                if detection.pose_landmarks:
+                    for landmark_id, landmark in zip(
+                        mp.solutions.pose.PoseLandmark,
+                        detection.pose_landmarks.landmark,
+                    ):
+                        landmarks.append(
+                            {
+                                "name": landmark_id.name.lower(),
+                                "x": landmark.x,
+                                "y": landmark.y,
+                                "z": landmark.z,
+                                "visibility": landmark.visibility,
+                            }
+                        )
+                results.append({"pose_landmarks": landmarks})
+        return results
+
+    async def _extract_keypoint_tensor(
+        self, frames: List[Any], analysis_fps: int
+    ) -> KeypointTensor:
+        """Extrae los keypoints de cada frame del lote como tensor."""
+        if MEDIAPIPE_AVAILABLE:
+            loop = asyncio.get_running_loop()
+            keypoints = await loop.run_in_executor(
+                None, self._detect_pose_batch, frames
+            )
+        else:
+            keypoints = [
+                await self._simulate_mediapipe_keypoints(frame) for frame in frames
             ]
+        return KeypointTensor.from_landmark_frames(keypoints, fps=analysis_fps)
 
-            symmetry_scores = []
+    async def _process_video_frames(
+        self,
+        video_data: Union[str, bytes],
+        exercise_name: str,
+        analysis_fps: int,
+        include_frames: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Procesa el video en modo streaming por ventanas.
 
-            for left_point, right_point in symmetric_pairs:
-                if left_point in landmarks and right_point in landmarks:
-                    left_pos = landmarks[left_point]
-                    right_pos = landmarks[right_point]
+        Cada lote de frames se convierte en un tensor de keypoints y se reduce
+        a series de ángulos/simetría; los frames decodificados no se retienen.
+        """
+        analyzer = StreamingBiomechanicsAnalyzer(
+            fps=analysis_fps,
+            window_seconds=VIDEO_WINDOW_SECONDS,
+            hop_seconds=VIDEO_WINDOW_HOP_SECONDS,
+        )
+        # La decodificación con cv2 es bloqueante: cada lote se lee en el executor
+        loop = asyncio.get_running_loop()
+        batches = self._iter_video_frame_batches(
+            video_data, analysis_fps, VIDEO_BATCH_FRAMES
+        )
+        try:
+            while True:
+                frame_batch = await loop.run_in_executor(None, next, batches, None)
+                if frame_batch is None:
+                    break
+                analyzer.push(
+                    await self._extract_keypoint_tensor(frame_batch, analysis_fps)
+                )
+        finally:
+            await loop.run_in_executor(None, batches.close)
+
+        clip_analysis = analyzer.finalize()
+        video_analysis = {
+            "exercise": exercise_name,
+            "total_frames": analyzer.total_frames,
+            "duration_seconds": clip_analysis["duration_seconds"],
+            "avg_confidence": round(analyzer.average_confidence, 3),
+            "clip_analysis": clip_analysis,
+            "window_analyses": analyzer.window_results,
+        }
+        if include_frames:
+            video_analysis["frames"] = analyzer.frame_records()
+        return video_analysis
 
-                    # Calcular diferencia en altura (y) - debería ser similar
-                    height_diff = abs(left_pos[1] - right_pos[1])
+    def _extract_movement_patterns(
+        self,
+        video_analysis: Dict[str, Any],
+        exercise_name: str,
+        key_phases: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Extrae patrones de movimiento (repeticiones y fases) del análisis del clip."""
+        clip = video_analysis["clip_analysis"]
+        windows = video_analysis.get("window_analyses", [])
+        ranked = sorted(
+            windows, key=lambda w: w["consistency"]["consistency_score"], reverse=True
+        )
 
-                    # Score: 100 = perfecta simetría, 0 = muy asimétrico
-                    score = max(
-                        0, 100 - (height_diff * 500)
-                    )  # Escalado para rango visible
-                    symmetry_scores.append(score)
+        def window_label(window: Dict[str, Any]) -> str:
+            return f"{window['window']['start_seconds']:.0f}s"
+
+        patterns = asdict(
+            MovementPattern(
+                exercise_type=exercise_name,
+                total_frames=clip["total_frames"],
+                key_phases=key_phases or list(clip["phases"]["distribution"]),
+                tempo_analysis=clip["tempo"],
+                consistency_score=clip["consistency"]["consistency_score"],
+                technique_scores={
+                    "symmetry": clip["symmetry"]["mean"],
+                    "stability": clip["consistency"]["stability_score"],
+                },
+            )
+        )
+        patterns.update(
+            {
+                "primary_joint": clip["primary_joint"],
+                "repetitions": clip["repetitions"],
+                "phase_distribution": clip["phases"]["distribution"],
+                "best_phases": [window_label(w) for w in ranked[:2]],
+                "worst_phases": (
+                    [window_label(w) for w in ranked[-2:][::-1]]
+                    if len(ranked) > 2
+                    else []
+                ),
+            }
+        )
+        return patterns
 
-            return np.mean(symmetry_scores) if symmetry_scores else 75.0
+    def _analyze_movement_consistency(
+        self, video_analysis: Dict[str, Any], movement_patterns: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Consistencia de ROM y tempo entre repeticiones."""
+        return dict(video_analysis["clip_analysis"]["consistency"])
 
-        except Exception as e:
-            logger.warning(f"Error calculando simetría: {e}")
-            return 75.0  # Score neutro
+    def _detect_technique_degradation(
+        self, video_analysis: Dict[str, Any], movement_patterns: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Detecta fatiga comparando las primeras y últimas repeticiones."""
+        return dict(video_analysis["clip_analysis"]["fatigue"])
+
+    def _analyze_movement_tempo(
+        self, video_analysis: Dict[str, Any], exercise_name: str
+    ) -> Dict[str, Any]:
+        """Métricas de tempo con recomendaciones de ritmo."""
+        tempo = dict(video_analysis["clip_analysis"]["tempo"])
+        recommendations = []
+        if (
+            tempo["eccentric_concentric_ratio"]
+            and tempo["eccentric_concentric_ratio"] < 1.0
+        ):
+            recommendations.append(
+                "Controlar la fase excéntrica: bajar al menos tan lento como se sube"
+            )
+        if tempo["tempo_variability"] > 0.2:
+            recommendations.append("Mantener un ritmo constante entre repeticiones")
+        tempo["recommendations"] = recommendations
+        return tempo
+
+    def _assess_quality_trend(self, video_analysis: Dict[str, Any]) -> str:
+        """Tendencia de calidad técnica a lo largo del clip."""
+        return video_analysis["clip_analysis"]["quality_trend"]
+
+    def _generate_video_recommendations(
+        self, consistency_analysis: Dict[str, Any], fatigue_analysis: Dict[str, Any]
+    ) -> List[str]:
+        """Recomendaciones técnicas derivadas de consistencia y fatiga."""
+        recommendations = []
+        if consistency_analysis.get("consistency_score", 100) < 70:
+            recommendations.append("Trabajar la consistencia del rango de movimiento")
+        if consistency_analysis.get("stability_score", 100) < 70:
+            recommendations.append(
+                "Reforzar la estabilidad del tronco durante la serie"
+            )
+        indicators = fatigue_analysis.get("indicators", [])
+        if "rom_loss" in indicators:
+            recommendations.append(
+                "Mantener la profundidad en las últimas repeticiones"
+            )
+        if "symmetry_drop" in indicators:
+            recommendations.append(
+                "Vigilar compensaciones laterales al acumular fatiga"
+            )
+        return recommendations or ["Técnica estable durante toda la serie"]
+
+    def _suggest_training_modifications(
+        self, fatigue_analysis: Dict[str, Any], consistency_analysis: Dict[str, Any]
+    ) -> List[str]:
+        """Ajustes de volumen/carga según la degradación técnica detectada."""
+        if fatigue_analysis.get("severity") == "high":
+            return [
+                "Reducir repeticiones por serie o la carga un 10%",
+                "Aumentar el descanso entre series",
+            ]
+        if fatigue_analysis.get("fatigue_detected"):
+            onset = fatigue_analysis.get("onset_repetition")
+            if onset:
+                return [
+                    f"Limitar la serie a {max(1, onset - 1)} repeticiones de calidad"
+                ]
+            return ["Reducir ligeramente el volumen por serie"]
+        return []
 
     # 🔥 SKILLS OPTIMIZADAS IMPLEMENTADAS
 
@@ -603,9 +772,12 @@ class BlazeEnhancedVisionMixin:
                 f"🎬 Iniciando análisis de video en tiempo real: {exercise_name}"
             )
 
-            # Simular procesamiento de video (implementación futura real)
+            # Procesamiento por ventanas sobre tensores de keypoints
             video_analysis = await self._process_video_frames(
-                video_data, exercise_name, analysis_fps
+                video_data,
+                exercise_name,
+                analysis_fps,
+                include_frames=return_frame_analysis,
             )
 
             # Extraer patrones de movimiento
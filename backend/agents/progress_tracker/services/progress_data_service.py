@@ -11,6 +11,8 @@ from dataclasses import dataclass, asdict
 from collections import defaultdict, deque
 import statistics
 
+from core.metric_rollups import RollupSeries, rollup_values
+
 from ..core.constants import (
     ProgressMetricType,
     AchievementCategory,
@@ -73,6 +75,7 @@ class ProgressDataService:
         self.cache_ttl = cache_ttl_seconds
         self.max_cache_size = max_cache_size
         self.cache_access_order = deque()
+        self.user_cache_keys = defaultdict(set)  # user_id -> cache keys
 
         # Performance metrics
         self.operation_stats = defaultdict(int)
@@ -208,13 +211,68 @@ class ProgressDataService:
             filtered_data = filtered_data[:limit]
 
         # Cache result
-        self._store_in_cache(cache_key, filtered_data)
+        self._store_in_cache(cache_key, filtered_data, user_id)
 
         # Update stats
         self.operation_stats["retrieve"] += 1
 
         return filtered_data
 
+    def rollup_progress_data(
+        self,
+        user_id: str,
+        data_type: str,
+        fields: List[str],
+        bucket: str = "week",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> RollupSeries:
+        """
+        Bucketed rollups of numeric content fields for charts.
+
+        Args:
+            user_id: User identifier
+            data_type: Type of progress data
+            fields: Numeric content fields to aggregate
+            bucket: 'day', 'week' or 'month'
+            start_date: Filter by start date
+            end_date: Filter by end date
+
+        Returns:
+            Columnar series (one point per bucket with count/min/max/avg/percentiles)
+        """
+        cache_key = self._generate_cache_key(
+            "rollup", user_id, data_type, tuple(fields), bucket, start_date, end_date
+        )
+        cached_result = self._get_from_cache(cache_key)
+        if cached_result is not None:
+            self.operation_stats["cache_hit"] += 1
+            return cached_result
+
+        entries = [
+            entry
+            for entry in self.progress_data.get(user_id, [])
+            if entry.data_type == data_type
+            and (not start_date or entry.timestamp >= start_date)
+            and (not end_date or entry.timestamp <= end_date)
+        ]
+        values = {
+            name: [
+                value if isinstance(value, (int, float)) else None
+                for value in (entry.content.get(name) for entry in entries)
+            ]
+            for name in fields
+        }
+        series = RollupSeries.from_rows(
+            bucket,
+            fields,
+            rollup_values((entry.timestamp for entry in entries), values, bucket),
+        )
+
+        self._store_in_cache(cache_key, series, user_id)
+        self.operation_stats["rollup"] += 1
+        return series
+
     def analyze_progress_patterns(
         self, user_id: str, analysis_type: str
     ) -> Dict[str, Any]:
@@ -662,7 +720,7 @@ class ProgressDataService:
 
         return self.cache[cache_key]
 
-    def _store_in_cache(self, cache_key: str, value: Any):
+    def _store_in_cache(self, cache_key: str, value: Any, user_id: Optional[str] = None):
         """Store value in cache with LRU eviction."""
         # Remove oldest entries if cache is full
         while len(self.cache) >= self.max_cache_size:
@@ -673,6 +731,8 @@ class ProgressDataService:
         self.cache[cache_key] = value
         self.cache_timestamps[cache_key] = datetime.utcnow()
         self.cache_access_order.append(cache_key)
+        if user_id:
+            self.user_cache_keys[user_id].add(cache_key)
 
     def _is_cache_valid(self, cache_key: str) -> bool:
         """Check if cache entry is still valid."""
@@ -684,12 +744,14 @@ class ProgressDataService:
 
     def _clear_user_cache(self, user_id: str):
         """Clear cache entries for a specific user."""
-        keys_to_remove = []
-        for key in self.cache.keys():
-            if user_id in key:
-                keys_to_remove.append(key)
+        # Cache keys are hashed, so they are tracked per user when stored
+        keys_to_remove = list(self.user_cache_keys.pop(user_id, ()))
+        keys_to_remove += [
+            key for key in self.analysis_cache if key.startswith(f"analysis_{user_id}_")
+        ]
 
         for key in keys_to_remove:
+            self.analysis_cache.pop(key, None)
             if key in self.cache:
                 del self.cache[key]
             if key in self.cache_timestamps:
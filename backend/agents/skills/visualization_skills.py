@@ -9,13 +9,9 @@ import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
+from core.chart_rendering import chart_renderer
 from core.skill import Skill
-from core.visualization import (
-    ExerciseVideoLinkGenerator,
-    NutritionInfographicGenerator,
-    PDFReportGenerator,
-    ProgressChartGenerator,
-)
+from core.visualization import ExerciseVideoLinkGenerator
 from clients.supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
@@ -54,7 +50,6 @@ class GenerateProgressChartSkill(Skill):
                 },
             },
         )
-        self.chart_generator = ProgressChartGenerator()
 
     async def execute(self, context: Dict[str, Any], **params) -> Dict[str, Any]:
         """Generate a progress chart based on user data."""
@@ -112,8 +107,8 @@ class GenerateProgressChartSkill(Skill):
                 }
 
                 # Generate chart
-                chart_bytes = await self.chart_generator.generate_weight_progress_chart(
-                    response.data, user_info
+                chart = await chart_renderer.render(
+                    "weight_progress", response.data, user_info
                 )
 
                 return {
@@ -142,11 +137,7 @@ class GenerateProgressChartSkill(Skill):
                         "message": "No body composition data found for the specified period",
                     }
 
-                chart_bytes = (
-                    await self.chart_generator.generate_body_composition_chart(
-                        response.data
-                    )
-                )
+                chart = await chart_renderer.render("body_composition", response.data)
 
                 return {
                     "status": "success",
@@ -177,10 +168,8 @@ class GenerateProgressChartSkill(Skill):
                         "message": f"No {metric_type} performance data found",
                     }
 
-                chart_bytes = (
-                    await self.chart_generator.generate_performance_metrics_chart(
-                        response.data, metric_type
-                    )
+                chart = await chart_renderer.render(
+                    "performance_metrics", response.data, metric_type
                 )
 
                 return {
@@ -241,7 +230,6 @@ class GenerateNutritionInfographicSkill(Skill):
                 },
             },
         )
-        self.nutrition_generator = NutritionInfographicGenerator()
 
     async def execute(self, context: Dict[str, Any], **params) -> Dict[str, Any]:
         """Generate a nutrition infographic."""
@@ -301,10 +289,8 @@ class GenerateNutritionInfographicSkill(Skill):
                     )
 
                 # Generate infographic
-                chart_bytes = (
-                    await self.nutrition_generator.generate_daily_nutrition_breakdown(
-                        nutrition_data
-                    )
+                chart = await chart_renderer.render(
+                    "nutrition_breakdown", nutrition_data
                 )
 
                 return {
@@ -349,11 +335,7 @@ class GenerateNutritionInfographicSkill(Skill):
                 meal_plan = self._organize_meal_plan(response.data)
 
                 # Generate infographic
-                chart_bytes = (
-                    await self.nutrition_generator.generate_meal_plan_infographic(
-                        meal_plan
-                    )
-                )
+                chart = await chart_renderer.render("meal_plan", meal_plan)
 
                 return {
                     "status": "success",
@@ -468,7 +450,6 @@ class GenerateProgressReportSkill(Skill):
                 },
             },
         )
-        self.pdf_generator = PDFReportGenerator()
 
     async def execute(self, context: Dict[str, Any], **params) -> Dict[str, Any]:
         """Generate a comprehensive progress report."""
@@ -602,8 +583,8 @@ class GenerateProgressReportSkill(Skill):
             )
 
             # Generate PDF report
-            pdf_bytes = await self.pdf_generator.generate_progress_report(
-                user_data, progress_data, period
+            report = await chart_renderer.render(
+                "progress_report", user_data, progress_data, period
             )
 
             # In a real implementation, you would save the PDF and return a URL
@@ -5,13 +5,15 @@ Este módulo proporciona endpoints para gestionar circuit breakers,
 consultar su estado y resetearlos.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, Depends, Path
 from pydantic import BaseModel, Field
 
 from core.circuit_breaker import (
-    get_all_circuit_breakers,
-    get_circuit_breaker,
+    get_all_circuit_breakers as get_registered_circuit_breakers,
+    get_circuit_breaker as get_registered_circuit_breaker,
+    register_circuit_breaker,
+    reset_all_circuit_breakers as reset_registered_circuit_breakers,
     CircuitBreaker,
 )
 from core.auth import get_current_user
@@ -29,7 +31,7 @@ class CircuitBreakerConfigRequest(BaseModel):
     """Solicitud para configurar un circuit breaker."""
 
     failure_threshold: int = Field(
-        default=5, description="Número de fallos para abrir el circuito"
+        default=5, description="Número de fallos consecutivos para abrir el circuito"
     )
     success_threshold: int = Field(
         default=2, description="Número de éxitos para cerrar el circuito"
@@ -38,37 +40,33 @@ class CircuitBreakerConfigRequest(BaseModel):
         default=60, description="Tiempo en segundos que el circuito permanece abierto"
     )
     window_size: int = Field(
-        default=10, description="Tamaño de la ventana para calcular la tasa de fallos"
+        default=60, description="Duración en segundos de la ventana deslizante"
     )
     error_threshold_percentage: float = Field(
         default=50.0, description="Porcentaje de fallos para abrir el circuito"
     )
-
-
-class CircuitBreakerConfigResponse(BaseModel):
-    """Respuesta con la configuración de un circuit breaker."""
-
-    failure_threshold: int = Field(
-        ..., description="Número de fallos para abrir el circuito"
+    slow_call_duration: Optional[float] = Field(
+        default=None, description="Segundos a partir de los cuales una llamada es lenta"
     )
-    success_threshold: int = Field(
-        ..., description="Número de éxitos para cerrar el circuito"
+    slow_call_threshold_percentage: float = Field(
+        default=80.0, description="Porcentaje de llamadas lentas para abrir el circuito"
     )
-    timeout: int = Field(
-        ..., description="Tiempo en segundos que el circuito permanece abierto"
+    minimum_calls: int = Field(
+        default=20, description="Llamadas mínimas en la ventana para evaluar tasas"
     )
-    has_fallback: bool = Field(..., description="Si tiene función de fallback")
-    exclude_exceptions: List[str] = Field(
-        ..., description="Excepciones que no cuentan como fallos"
-    )
-    include_exceptions: Optional[List[str]] = Field(
-        default=None, description="Solo estas excepciones cuentan como fallos"
-    )
-    window_size: int = Field(
-        ..., description="Tamaño de la ventana para calcular la tasa de fallos"
-    )
-    error_threshold_percentage: float = Field(
-        ..., description="Porcentaje de fallos para abrir el circuito"
+
+
+class CircuitBreakerMetricsResponse(BaseModel):
+    """Métricas de la ventana deslizante de un circuit breaker."""
+
+    calls: int = Field(..., description="Llamadas en la ventana")
+    failures: int = Field(..., description="Fallos en la ventana")
+    slow_calls: int = Field(..., description="Llamadas lentas en la ventana")
+    failure_rate: float = Field(..., description="Tasa de fallos (0-1)")
+    slow_call_rate: float = Field(..., description="Tasa de llamadas lentas (0-1)")
+    window_seconds: float = Field(..., description="Duración de la ventana")
+    latency_ms: Dict[str, float] = Field(
+        ..., description="Percentiles de latencia (p50, p90, p99) en milisegundos"
     )
 
 
@@ -79,20 +77,16 @@ class CircuitBreakerStateResponse(BaseModel):
     state: str = Field(
         ..., description="Estado del circuit breaker (closed, open, half_open)"
     )
-    failure_count: int = Field(..., description="Contador de fallos")
-    success_count: int = Field(..., description="Contador de éxitos")
-    last_failure_time: Optional[str] = Field(
-        default=None, description="Fecha del último fallo"
+    failure_count: int = Field(..., description="Fallos consecutivos")
+    success_count: int = Field(..., description="Éxitos en half-open")
+    last_failure_time: Optional[float] = Field(
+        default=None, description="Timestamp del último fallo"
     )
-    last_state_change_time: str = Field(
-        ..., description="Fecha del último cambio de estado"
-    )
-    results_window: List[bool] = Field(..., description="Historial de resultados")
-    failure_rate: float = Field(..., description="Tasa de fallos")
-    config: CircuitBreakerConfigResponse = Field(
-        ..., description="Configuración del circuit breaker"
+    window: CircuitBreakerMetricsResponse = Field(
+        ..., description="Métricas de la ventana deslizante"
     )
-    stats: Dict[str, Any] = Field(..., description="Estadísticas del circuit breaker")
+    config: Dict[str, Any] = Field(..., description="Configuración del circuit breaker")
+    stats: Dict[str, Any] = Field(..., description="Estadísticas acumuladas")
 
 
 class CircuitBreakerCreateRequest(BaseModel):
@@ -104,6 +98,15 @@ class CircuitBreakerCreateRequest(BaseModel):
     )
 
 
+def _get_or_404(name: str) -> CircuitBreaker:
+    breaker = get_registered_circuit_breaker(name)
+    if not breaker:
+        raise HTTPException(
+            status_code=404, detail=f"Circuit breaker '{name}' no encontrado"
+        )
+    return breaker
+
+
 @router.get("/", response_model=Dict[str, CircuitBreakerStateResponse])
 async def get_all_circuit_breakers(user_id: str = Depends(get_current_user)):
     """
@@ -115,8 +118,10 @@ async def get_all_circuit_breakers(user_id: str = Depends(get_current_user)):
     Returns:
         Estado de todos los circuit breakers
     """
-    states = await circuit_breaker_registry.get_all_states()
-    return states
+    return {
+        name: breaker.get_stats()
+        for name, breaker in get_registered_circuit_breakers().items()
+    }
 
 
 @router.get("/{name}", response_model=CircuitBreakerStateResponse)
@@ -134,14 +139,25 @@ async def get_circuit_breaker(
     Returns:
         Estado del circuit breaker
     """
-    circuit_breaker = await circuit_breaker_registry.get(name)
+    return _get_or_404(name).get_stats()
 
-    if not circuit_breaker:
-        raise HTTPException(
-            status_code=404, detail=f"Circuit breaker '{name}' no encontrado"
-        )
 
-    return circuit_breaker.get_state()
+@router.get("/{name}/metrics", response_model=CircuitBreakerMetricsResponse)
+async def get_circuit_breaker_metrics(
+    name: str = Path(..., description="Nombre del circuit breaker"),
+    user_id: str = Depends(get_current_user),
+):
+    """
+    Obtiene tasas de fallo/lentitud y percentiles de latencia de la ventana actual.
+
+    Args:
+        name: Nombre del circuit breaker
+        user_id: ID del usuario autenticado
+
+    Returns:
+        Métricas de la ventana deslizante
+    """
+    return _get_or_404(name).get_metrics()
 
 
 @router.post("/", response_model=CircuitBreakerStateResponse)
@@ -158,19 +174,23 @@ async def create_circuit_breaker(
     Returns:
         Estado del circuit breaker creado
     """
-    # Crear configuración
-    config = CircuitBreakerConfig(
-        failure_threshold=request.config.failure_threshold,
-        success_threshold=request.config.success_threshold,
-        timeout=request.config.timeout,
-        window_size=request.config.window_size,
-        error_threshold_percentage=request.config.error_threshold_percentage,
-    )
-
-    # Crear circuit breaker
-    circuit_breaker = await circuit_breaker_registry.get_or_create(request.name, config)
+    breaker = get_registered_circuit_breaker(request.name)
+    if not breaker:
+        config = request.config
+        breaker = CircuitBreaker(
+            name=request.name,
+            failure_threshold=config.failure_threshold,
+            recovery_timeout=config.timeout,
+            success_threshold=config.success_threshold,
+            failure_rate_threshold=config.error_threshold_percentage / 100,
+            slow_call_duration=config.slow_call_duration,
+            slow_call_rate_threshold=config.slow_call_threshold_percentage / 100,
+            minimum_calls=config.minimum_calls,
+            window_seconds=config.window_size,
+        )
+        register_circuit_breaker(breaker)
 
-    return circuit_breaker.get_state()
+    return breaker.get_stats()
 
 
 @router.post("/{name}/reset", response_model=Dict[str, Any])
@@ -188,12 +208,7 @@ async def reset_circuit_breaker(
     Returns:
         Resultado de la operación
     """
-    success = await circuit_breaker_registry.reset(name)
-
-    if not success:
-        raise HTTPException(
-            status_code=404, detail=f"Circuit breaker '{name}' no encontrado"
-        )
+    await _get_or_404(name).reset()
 
     return {"success": True, "message": f"Circuit breaker '{name}' reseteado"}
 
@@ -209,6 +224,6 @@ async def reset_all_circuit_breakers(user_id: str = Depends(get_current_user)):
     Returns:
         Resultado de la operación
     """
-    await circuit_breaker_registry.reset_all()
+    await reset_registered_circuit_breakers()
 
     return {"success": True, "message": "Todos los circuit breakers reseteados"}
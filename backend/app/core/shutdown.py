@@ -14,6 +14,7 @@ from core.telemetry import shutdown_telemetry
 from core.metrics import metrics_collector
 from core.circuit_breaker import CircuitBreakerManager
 from core.budget import budget_manager
+from core.chart_rendering import chart_renderer
 from infrastructure.background_tasks import BackgroundTaskManager
 from infrastructure.monitoring import MonitoringService
 from infrastructure.a2a_server import A2AServer
@@ -103,6 +104,10 @@ async def stop_background_services() -> None:
                 await a2a_server.stop()
         except:
             pass
+
+        # 5. Detener pool de renderizado de gráficos
+        logger.info("📊 Deteniendo pool de renderizado de gráficos...")
+        await chart_renderer.shutdown()
             
     except Exception as e:
         logger.error(f"Error al detener servicios en segundo plano: {e}")
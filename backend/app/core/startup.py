@@ -17,6 +17,7 @@ from core.settings_lazy import settings
 from core.metrics import metrics_collector
 from core.circuit_breaker import CircuitBreakerManager
 from core.budget import budget_manager
+from core.chart_rendering import chart_renderer
 from infrastructure.health import HealthCheck
 from infrastructure.cache_warming import CacheWarmer
 from infrastructure.background_tasks import BackgroundTaskManager
@@ -136,7 +137,7 @@ async def start_background_services() -> None:
         # 2. Calentar caché si está habilitado
         if hasattr(settings, "cache_warming_enabled") and settings.cache_warming_enabled:
             logger.info("🔥 Calentando caché...")
-            cache_warmer = CacheWarmer()
+            cache_warmer = CacheWarmer.get_instance()
             asyncio.create_task(cache_warmer.start())
         
         # 3. Iniciar monitoreo
@@ -149,6 +150,10 @@ async def start_background_services() -> None:
             logger.info("🔗 Iniciando servidor A2A...")
             a2a_server = A2AServer()
             asyncio.create_task(a2a_server.start())
+
+        # 5. Calentar el pool de renderizado de gráficos
+        logger.info("📊 Iniciando pool de renderizado de gráficos...")
+        asyncio.create_task(chart_renderer.start())
             
     except Exception as e:
         logger.error(f"Error al iniciar servicios en segundo plano: {e}")
@@ -5,11 +5,14 @@ Este módulo proporciona middleware para instrumentar aplicaciones FastAPI
 con telemetría, incluyendo métricas, tracing y logging.
 """
 
+import random
 import time
 import uuid
-from typing import Callable
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from fastapi import FastAPI, Request, Response
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
 from fastapi.routing import APIRoute
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
@@ -18,7 +21,6 @@ from starlette.types import ASGIApp
 from core.telemetry import (
     get_meter,
     get_tracer,
-    record_exception,
     extract_trace_context,
 )
 from core.logging_config import configure_logging
@@ -69,6 +71,31 @@ if settings.telemetry_enabled:
     )
 
 
+# Clave del scope ASGI con la decisión de muestreo de la solicitud
+SAMPLED_SCOPE_KEY = "ngx.telemetry.sampled"
+
+# Etiqueta para solicitudes que no coinciden con ninguna ruta (404, estáticos)
+UNMATCHED_ROUTE = "__unmatched__"
+
+_KNOWN_METHODS = frozenset(
+    {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Devuelve la plantilla de la ruta resuelta (p. ej. ``/users/{user_id}``).
+
+    El router de FastAPI deja la ruta coincidente en ``scope["route"]``; las
+    solicitudes sin ruta comparten una única etiqueta para no crear una serie
+    temporal por cada path desconocido.
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    return getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE)
+
+
 class TelemetryMiddleware(BaseHTTPMiddleware):
     """
     Middleware para añadir telemetría a las solicitudes HTTP.
@@ -76,16 +103,101 @@ class TelemetryMiddleware(BaseHTTPMiddleware):
     Este middleware captura métricas de solicitudes HTTP, añade información
     de contexto a los spans, registra errores y excepciones, y proporciona
     correlación entre logs y traces.
+
+    Para acotar coste y cardinalidad:
+
+    - Las métricas se etiquetan con la plantilla de la ruta, no con el path.
+    - Los spans se muestrean en la cabecera (respetando el flag del padre o
+      ``sample_ratio``); las solicitudes no muestreadas que fallan o superan
+      ``slow_request_ms`` se registran igualmente al terminar (muestreo de cola).
+    - Los diccionarios de atributos de las métricas se reutilizan por
+      combinación (método, ruta, estado) y el tiempo propio del middleware se
+      mide en ``get_overhead_stats``.
     """
 
-    def __init__(self, app: ASGIApp):
+    def __init__(
+        self,
+        app: ASGIApp,
+        tracer: Optional[Any] = None,
+        meter: Optional[Any] = None,
+        sample_ratio: Optional[float] = None,
+        slow_request_ms: Optional[float] = None,
+    ):
         """
         Inicializa el middleware de telemetría.
 
         Args:
             app: La aplicación ASGI a instrumentar.
+            tracer: Tracer a usar (por defecto el del módulo).
+            meter: Meter para crear las métricas (por defecto las del módulo).
+            sample_ratio: Fracción de solicitudes trazadas desde el inicio.
+            slow_request_ms: Duración a partir de la cual siempre se traza.
         """
         super().__init__(app)
+        self.tracer = tracer or globals()["tracer"]
+        if meter is not None:
+            self.requests_counter = meter.create_counter(
+                name="http.requests", description="Número de solicitudes HTTP recibidas", unit="1"
+            )
+            self.request_duration = meter.create_histogram(
+                name="http.request.duration", description="Duración de las solicitudes HTTP", unit="ms"
+            )
+            self.request_size = meter.create_histogram(
+                name="http.request.size", description="Tamaño de las solicitudes HTTP", unit="bytes"
+            )
+            self.response_size = meter.create_histogram(
+                name="http.response.size", description="Tamaño de las respuestas HTTP", unit="bytes"
+            )
+        else:
+            self.requests_counter = http_requests_counter
+            self.request_duration = http_request_duration
+            self.request_size = http_request_size
+            self.response_size = http_response_size
+
+        self.sample_ratio = (
+            settings.telemetry_sample_ratio if sample_ratio is None else sample_ratio
+        )
+        self.slow_request_ms = (
+            settings.telemetry_slow_request_ms if slow_request_ms is None else slow_request_ms
+        )
+
+        # Atributos de métricas preasignados por (método, ruta, estado, error);
+        # acotado por el número de rutas registradas
+        self._metric_attributes: Dict[Tuple[str, str, int, bool], Dict[str, Any]] = {}
+        self._overhead = {"requests": 0, "total_ns": 0, "max_ns": 0}
+        self._traces = {"head": 0, "tail": 0, "dropped": 0}
+
+    def _attributes(self, method: str, route: str, status: int, error: bool) -> Dict[str, Any]:
+        key = (method, route, status, error)
+        attributes = self._metric_attributes.get(key)
+        if attributes is None:
+            attributes = {
+                "http.method": method,
+                "http.route": route,
+                "http.status_code": str(status),
+            }
+            if error:
+                attributes["error"] = True
+            self._metric_attributes[key] = attributes
+        return attributes
+
+    def _head_sampled(self, trace_context: Any) -> bool:
+        """Decide si la solicitud se traza desde el inicio."""
+        parent = trace.get_current_span(trace_context).get_span_context()
+        if parent.is_valid:
+            return parent.trace_flags.sampled
+        return random.random() < self.sample_ratio
+
+    def get_overhead_stats(self) -> Dict[str, Any]:
+        """Tiempo propio del middleware (sin contar la aplicación) y trazas emitidas."""
+        requests = self._overhead["requests"]
+        return {
+            "requests": requests,
+            "mean_us": (self._overhead["total_ns"] / requests / 1000) if requests else 0.0,
+            "max_us": self._overhead["max_ns"] / 1000,
+            "label_sets": len(self._metric_attributes),
+            "traces": dict(self._traces),
+        }
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """
@@ -98,6 +210,10 @@ class TelemetryMiddleware(BaseHTTPMiddleware):
         Returns:
             Response: La respuesta HTTP.
         """
+        overhead_start = time.perf_counter_ns()
+        start_ns = time.time_ns()
+        method = request.method if request.method in _KNOWN_METHODS else "OTHER"
+
         # Generar ID de solicitud si no existe
         request_id = request.headers.get("X-Request-ID")
         if not request_id:
@@ -107,111 +223,115 @@ class TelemetryMiddleware(BaseHTTPMiddleware):
                 (b"x-request-id", request_id.encode())
             )
 
-        # Extraer contexto de trace de los headers
-        trace_context = extract_trace_context(dict(request.headers))
-
-        # Iniciar span para la solicitud
-        with tracer.start_as_current_span(
-            f"{request.method} {request.url.path}",
-            context=trace_context,
-            attributes={
-                "http.method": request.method,
-                "http.url": str(request.url),
-                "http.scheme": request.url.scheme,
-                "http.host": request.url.hostname,
-                "http.target": request.url.path,
-                "http.request_id": request_id,
-                "http.user_agent": request.headers.get("user-agent", ""),
-                "http.client_ip": request.client.host if request.client else "",
-            },
-        ) as span:
-            start_time = time.time()
-
-            # Registrar información de la solicitud
-            content_length = request.headers.get("content-length")
-            if content_length:
-                span.set_attribute("http.request_content_length", int(content_length))
-                http_request_size.record(int(content_length))
-
-            try:
-                # Procesar la solicitud
-                response = await call_next(request)
-
-                # Registrar información de la respuesta
-                span.set_attribute("http.status_code", response.status_code)
-
-                # Añadir el ID de solicitud a la respuesta
-                response.headers["X-Request-ID"] = request_id
-
-                # Registrar métricas
-                duration_ms = (time.time() - start_time) * 1000
-                http_request_duration.record(
-                    duration_ms,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": str(response.status_code),
-                    },
-                )
-
-                http_requests_counter.add(
-                    1,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": str(response.status_code),
-                    },
-                )
-
-                # Registrar tamaño de la respuesta
-                resp_content_length = response.headers.get("content-length")
-                if resp_content_length:
-                    span.set_attribute(
-                        "http.response_content_length", int(resp_content_length)
-                    )
-                    http_response_size.record(int(resp_content_length))
-
-                return response
-
-            except Exception as e:
-                # Registrar la excepción en el span
-                record_exception(e, {"error.type": type(e).__name__})
-                span.set_attribute("http.status_code", 500)
-
-                # Registrar métricas de error
-                duration_ms = (time.time() - start_time) * 1000
-                http_request_duration.record(
-                    duration_ms,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": "500",
-                        "error": True,
-                    },
-                )
-
-                http_requests_counter.add(
-                    1,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": "500",
-                        "error": True,
-                    },
-                )
-
-                # Registrar el error
-                logger.exception(
-                    f"Error procesando solicitud: {request.method} {request.url.path}",
-                    extra={
-                        "request_id": request_id,
+        # Extraer contexto de trace de los headers (sin copiarlos si no hay)
+        trace_context = (
+            extract_trace_context(request.headers)
+            if "traceparent" in request.headers
+            else None
+        )
+        sampled = self._head_sampled(trace_context)
+        request.scope[SAMPLED_SCOPE_KEY] = sampled
+
+        span = None
+        span_scope = None
+        if sampled:
+            # El nombre definitivo se fija cuando se conoce la ruta
+            span = self.tracer.start_span(
+                method,
+                context=trace_context,
+                start_time=start_ns,
+                attributes={
+                    "http.method": request.method,
+                    "http.target": request.url.path,
+                    "http.request_id": request_id,
+                },
+            )
+            span_scope = trace.use_span(span, end_on_exit=False)
+            span_scope.__enter__()
+            self._traces["head"] += 1
+
+        content_length = request.headers.get("content-length")
+        if content_length:
+            self.request_size.record(int(content_length))
+
+        response = None
+        error: Optional[Exception] = None
+        app_ns = time.perf_counter_ns()
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            error = e
+        finally:
+            app_ns = time.perf_counter_ns() - app_ns
+            if span_scope is not None:
+                span_scope.__exit__(None, None, None)
+
+        status = response.status_code if response is not None else 500
+        route = route_template(request.scope)
+        duration_ms = app_ns / 1_000_000
+        attributes = self._attributes(method, route, status, error is not None)
+        self.request_duration.record(duration_ms, attributes)
+        self.requests_counter.add(1, attributes)
+
+        if response is not None:
+            # Añadir el ID de solicitud a la respuesta
+            response.headers["X-Request-ID"] = request_id
+            resp_content_length = response.headers.get("content-length")
+            if resp_content_length:
+                self.response_size.record(int(resp_content_length))
+
+        # Muestreo de cola: los errores y las solicitudes lentas siempre se trazan
+        if span is None:
+            if error is not None or status >= 500 or duration_ms >= self.slow_request_ms:
+                span = self.tracer.start_span(
+                    method,
+                    context=trace_context,
+                    start_time=start_ns,
+                    attributes={
                         "http.method": request.method,
-                        "http.url": str(request.url),
+                        "http.target": request.url.path,
+                        "http.request_id": request_id,
+                        "sampling.tail": True,
                     },
                 )
+                self._traces["tail"] += 1
+            else:
+                self._traces["dropped"] += 1
+
+        if span is not None:
+            span.update_name(f"{request.method} {route}")
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", status)
+            if content_length:
+                span.set_attribute("http.request_content_length", int(content_length))
+            if error is not None:
+                span.record_exception(error)
+                span.set_status(Status(StatusCode.ERROR, type(error).__name__))
+            elif status >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            span.end(end_time=start_ns + app_ns)
+
+        overhead = time.perf_counter_ns() - overhead_start - app_ns
+        self._overhead["requests"] += 1
+        self._overhead["total_ns"] += overhead
+        if overhead > self._overhead["max_ns"]:
+            self._overhead["max_ns"] = overhead
+
+        if error is not None:
+            # Registrar el error
+            logger.exception(
+                f"Error procesando solicitud: {request.method} {route}",
+                extra={
+                    "request_id": request_id,
+                    "http.method": request.method,
+                    "http.route": route,
+                },
+                exc_info=error,
+            )
+            # Re-lanzar la excepción para que FastAPI la maneje
+            raise error
 
-                # Re-lanzar la excepción para que FastAPI la maneje
-                raise
+        return response
 
 
 class TelemetryRoute(APIRoute):
@@ -231,6 +351,10 @@ class TelemetryRoute(APIRoute):
         original_route_handler = super().get_route_handler()
 
         async def route_handler(request: Request) -> Response:
+            # Solo se crean spans de endpoint para solicitudes muestreadas
+            if not request.scope.get(SAMPLED_SCOPE_KEY):
+                return await original_route_handler(request)
+
             # Obtener el nombre de la operación
             operation_name = (
                 f"{self.name}" if self.name else f"{request.method} {request.url.path}"
@@ -14,7 +14,6 @@ from core.adherence_prediction_engine import (
     AdherencePredictionEngine,
     AdherenceMetrics,
     AdherencePrediction,
-    AdherenceRiskLevel,
     AdherenceTrigger,
 )
 from core.adherence_monitoring_service import AdherenceMonitoringService
@@ -327,60 +326,28 @@ async def batch_predict_adherence(
     """
     Predict adherence for multiple users in batch.
 
-    Efficiently processes multiple adherence predictions and provides
-    summary statistics for population-level insights.
+    Scores the whole batch with vectorized rules (no per-user AI
+    refinements), caches every prediction in one Redis pipeline and
+    provides summary statistics for population-level insights.
     """
     try:
+        user_predictions = request.user_predictions
+        result = await prediction_engine.predict_adherence_batch(
+            user_ids=[p.user_id for p in user_predictions],
+            metrics=[p.metrics.dict() for p in user_predictions],
+            contexts={p.user_id: p.context or {} for p in user_predictions},
+        )
+
         predictions = []
-        successful_predictions = 0
-        failed_predictions = 0
-        risk_summary = {level.value: 0 for level in AdherenceRiskLevel}
-
-        for prediction_request in request.user_predictions:
-            try:
-                # Convert request to AdherenceMetrics
-                metrics = AdherenceMetrics(**prediction_request.metrics.dict())
-
-                # Generate prediction
-                prediction = await prediction_engine.predict_adherence(
-                    user_id=prediction_request.user_id,
-                    current_metrics=metrics,
-                    historical_data=None,
-                    context=prediction_request.context,
-                )
-
-                # Convert to response format
-                prediction_response = PredictionResponse(
-                    user_id=prediction.user_id,
-                    prediction_date=prediction.prediction_date,
-                    adherence_probability=prediction.adherence_probability,
-                    risk_level=prediction.risk_level.value,
-                    confidence_score=prediction.confidence_score,
-                    primary_risk_factors=prediction.primary_risk_factors,
-                    protective_factors=prediction.protective_factors,
-                    triggers_detected=[
-                        trigger.value for trigger in prediction.triggers_detected
-                    ],
-                    estimated_dropout_timeframe_days=prediction.estimated_dropout_timeframe_days,
-                    critical_intervention_window_days=prediction.critical_intervention_window_days,
-                    intervention_strategies=(
-                        prediction.intervention_strategies
-                        if prediction_request.include_interventions
-                        else None
-                    ),
-                    monitoring_frequency=prediction.monitoring_frequency,
-                    success_probability_with_intervention=prediction.success_probability_with_intervention,
-                )
-
-                predictions.append(prediction_response)
-                successful_predictions += 1
-                risk_summary[prediction.risk_level.value] += 1
-
-            except Exception as e:
-                logger.warning(
-                    f"Batch prediction failed for user {prediction_request.user_id}: {e}"
-                )
-                failed_predictions += 1
+        for i, prediction_request in enumerate(user_predictions):
+            prediction = result.prediction(i)
+            if not prediction_request.include_interventions:
+                prediction["intervention_strategies"] = None
+            predictions.append(PredictionResponse(**prediction))
+
+        successful_predictions = len(predictions)
+        failed_predictions = len(user_predictions) - successful_predictions
+        risk_summary = result.risk_summary()
 
         response = BatchPredictionResponse(
             total_users=len(request.user_predictions),
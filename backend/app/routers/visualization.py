@@ -11,12 +11,13 @@ from fastapi.responses import StreamingResponse
 
 from core.auth import get_current_user
 from app.schemas.auth import User
-from core.visualization import (
-    ExerciseVideoLinkGenerator,
-    NutritionInfographicGenerator,
-    PDFReportGenerator,
-    ProgressChartGenerator,
-    create_progress_collage,
+from core.chart_rendering import chart_renderer
+from core.visualization import ExerciseVideoLinkGenerator
+from core.metric_rollups import (
+    BUCKETS,
+    MetricRollupService,
+    SupabaseRollupBackend,
+    bucket_for_days,
 )
 from clients.supabase_client import get_supabase_client
 
@@ -24,12 +25,30 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/visualization", tags=["visualization"])
 
-# Initialize generators
-progress_chart_gen = ProgressChartGenerator()
-nutrition_gen = NutritionInfographicGenerator()
-pdf_gen = PDFReportGenerator()
+# Charts render in the chart_renderer process pool; video links are not CPU-bound
 exercise_video_gen = ExerciseVideoLinkGenerator()
 
+# Charts are drawn from server-side rollups (one point per bucket), not raw logs
+metric_rollups = MetricRollupService(SupabaseRollupBackend(get_supabase_client))
+
+TIME_RANGE_DAYS = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
+BODY_COMPOSITION_METRICS = ("muscle_mass", "body_fat", "water")
+PERFORMANCE_METRICS = {
+    "strength": ("bench_press", "squat", "deadlift", "overhead_press"),
+    "endurance": (
+        "running_distance",
+        "running_pace",
+        "vo2_max",
+        "heart_rate_recovery",
+    ),
+    "flexibility": (),
+}
+ROLLUP_SOURCES = {
+    "weight": ("weight_logs", ("weight",)),
+    "body-composition": ("body_composition_logs", BODY_COMPOSITION_METRICS),
+    "performance": ("performance_logs", None),
+}
+
 
 @router.post("/charts/weight-progress")
 async def generate_weight_progress_chart(
@@ -47,27 +66,22 @@ async def generate_weight_progress_chart(
     """
     try:
         # Parse time range
-        days = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}.get(time_range, 30)
+        days = TIME_RANGE_DAYS.get(time_range, 30)
 
         start_date = datetime.now() - timedelta(days=days)
 
-        # Fetch weight data from database
-        supabase = get_supabase_client()
-        response = (
-            supabase.table("weight_logs")
-            .select("*")
-            .eq("user_id", current_user.id)
-            .gte("date", start_date.isoformat())
-            .order("date")
-            .execute()
+        # Fetch bucketed weight rollup (aggregated in Postgres)
+        series = await metric_rollups.rollup(
+            current_user.id, "weight_logs", ("weight",), bucket_for_days(days), start_date
         )
 
-        if not response.data:
+        if not series:
             raise HTTPException(
                 status_code=404, detail="No weight data found for the specified period"
             )
 
         # Get user info including goals
+        supabase = get_supabase_client()
         user_response = (
             supabase.table("users")
             .select("*")
@@ -84,12 +98,12 @@ async def generate_weight_progress_chart(
         }
 
         # Generate chart
-        chart_bytes = await progress_chart_gen.generate_weight_progress_chart(
-            response.data, user_info
+        chart = await chart_renderer.render(
+            "weight_progress", series.chart_data(), user_info
         )
 
         return Response(
-            content=chart_bytes,
+            content=chart.content,
             media_type="image/png",
             headers={"Content-Disposition": "inline; filename=weight_progress.png"},
         )
@@ -114,34 +128,30 @@ async def generate_body_composition_chart(
         PNG image of body composition chart
     """
     try:
-        days = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}.get(time_range, 30)
+        days = TIME_RANGE_DAYS.get(time_range, 30)
 
         start_date = datetime.now() - timedelta(days=days)
 
-        # Fetch body composition data
-        supabase = get_supabase_client()
-        response = (
-            supabase.table("body_composition_logs")
-            .select("*")
-            .eq("user_id", current_user.id)
-            .gte("date", start_date.isoformat())
-            .order("date")
-            .execute()
+        # Fetch body composition rollup
+        series = await metric_rollups.rollup(
+            current_user.id,
+            "body_composition_logs",
+            BODY_COMPOSITION_METRICS,
+            bucket_for_days(days),
+            start_date,
         )
 
-        if not response.data:
+        if not series:
             raise HTTPException(
                 status_code=404,
                 detail="No body composition data found for the specified period",
             )
 
         # Generate chart
-        chart_bytes = await progress_chart_gen.generate_body_composition_chart(
-            response.data
-        )
+        chart = await chart_renderer.render("body_composition", series.chart_data())
 
         return Response(
-            content=chart_bytes,
+            content=chart.content,
             media_type="image/png",
             headers={"Content-Disposition": "inline; filename=body_composition.png"},
         )
@@ -175,34 +185,32 @@ async def generate_performance_chart(
                 detail="Invalid metric type. Must be 'strength', 'endurance', or 'flexibility'",
             )
 
-        days = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}.get(time_range, 30)
+        days = TIME_RANGE_DAYS.get(time_range, 30)
 
         start_date = datetime.now() - timedelta(days=days)
 
-        # Fetch performance data
-        supabase = get_supabase_client()
-        response = (
-            supabase.table("performance_logs")
-            .select("*")
-            .eq("user_id", current_user.id)
-            .eq("metric_type", metric_type)
-            .gte("date", start_date.isoformat())
-            .order("date")
-            .execute()
+        # Fetch performance rollup
+        series = await metric_rollups.rollup(
+            current_user.id,
+            "performance_logs",
+            PERFORMANCE_METRICS[metric_type],
+            bucket_for_days(days),
+            start_date,
+            filters={"metric_type": metric_type},
         )
 
-        if not response.data:
+        if not series:
             raise HTTPException(
                 status_code=404, detail=f"No {metric_type} performance data found"
             )
 
         # Generate chart
-        chart_bytes = await progress_chart_gen.generate_performance_metrics_chart(
-            response.data, metric_type
+        chart = await chart_renderer.render(
+            "performance_metrics", series.chart_data(), metric_type
         )
 
         return Response(
-            content=chart_bytes,
+            content=chart.content,
             media_type="image/png",
             headers={
                 "Content-Disposition": f"inline; filename={metric_type}_performance.png"
@@ -266,12 +274,12 @@ async def generate_comparison_chart(
             )
 
         # Generate comparison chart
-        chart_bytes = await progress_chart_gen.generate_comparison_chart(
-            current_response.data[0], previous_response.data[0], period
+        chart = await chart_renderer.render(
+            "comparison", current_response.data[0], previous_response.data[0], period
         )
 
         return Response(
-            content=chart_bytes,
+            content=chart.content,
             media_type="image/png",
             headers={
                 "Content-Disposition": f"inline; filename=comparison_{period}.png"
@@ -283,6 +291,85 @@ async def generate_comparison_chart(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/rollups/{source}")
+async def get_metric_rollup(
+    source: str,
+    time_range: Optional[str] = "30d",
+    bucket: Optional[str] = None,
+    metric_type: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """
+    Get chart-ready rollups (count, min, max, avg, percentiles per bucket).
+
+    Args:
+        source: 'weight', 'body-composition' or 'performance'
+        time_range: Time range for data (e.g., "7d", "30d", "90d", "1y")
+        bucket: 'day', 'week' or 'month' (chosen from time_range if omitted)
+        metric_type: Performance metric type (required for 'performance')
+        current_user: Authenticated user
+
+    Returns:
+        Columnar series: {"bucket", "starts", "metrics": {metric: {stat: [...]}}}
+    """
+    try:
+        if source not in ROLLUP_SOURCES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid source. Must be one of: {', '.join(ROLLUP_SOURCES)}",
+            )
+        if bucket is not None and bucket not in BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid bucket. Must be one of: {', '.join(BUCKETS)}",
+            )
+
+        table, metrics = ROLLUP_SOURCES[source]
+        filters = {}
+        if source == "performance":
+            if metric_type not in PERFORMANCE_METRICS:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Invalid metric type. Must be 'strength', 'endurance', or 'flexibility'",
+                )
+            metrics = PERFORMANCE_METRICS[metric_type]
+            filters = {"metric_type": metric_type}
+
+        days = TIME_RANGE_DAYS.get(time_range, 30)
+        series = await metric_rollups.rollup(
+            current_user.id,
+            table,
+            metrics,
+            bucket or bucket_for_days(days),
+            datetime.now() - timedelta(days=days),
+            filters=filters,
+        )
+        return series.to_dict()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing metric rollup: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/rollups/cache")
+async def invalidate_metric_rollups(
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """
+    Invalidate the current user's cached rollups after logging new data.
+
+    Args:
+        current_user: Authenticated user
+
+    Returns:
+        Rollup cache statistics
+    """
+    metric_rollups.invalidate(current_user.id)
+    return metric_rollups.get_stats()
+
+
 @router.post("/nutrition/daily-breakdown")
 async def generate_nutrition_breakdown(
     date: Optional[str] = None, current_user: User = Depends(get_current_user)
@@ -365,12 +452,10 @@ async def generate_nutrition_breakdown(
             )
 
         # Generate infographic
-        chart_bytes = await nutrition_gen.generate_daily_nutrition_breakdown(
-            nutrition_data
-        )
+        chart = await chart_renderer.render("nutrition_breakdown", nutrition_data)
 
         return Response(
-            content=chart_bytes,
+            content=chart.content,
             media_type="image/png",
             headers={"Content-Disposition": "inline; filename=nutrition_breakdown.png"},
         )
@@ -436,10 +521,10 @@ async def generate_meal_plan_infographic(
             }
 
         # Generate infographic
-        chart_bytes = await nutrition_gen.generate_meal_plan_infographic(meal_plan)
+        chart = await chart_renderer.render("meal_plan", meal_plan)
 
         return Response(
-            content=chart_bytes,
+            content=chart.content,
             media_type="image/png",
             headers={"Content-Disposition": "inline; filename=meal_plan.png"},
         )
@@ -546,7 +631,7 @@ async def generate_progress_report(
             "body_composition_data": body_comp_response.data,
             "performance_data": performance_response.data,
             "performance_type": "strength",  # Could be determined from data
-            "nutrition_data": self._aggregate_nutrition_data(nutrition_response.data),
+            "nutrition_data": _aggregate_nutrition_data(nutrition_response.data),
         }
 
         # Calculate changes
@@ -564,12 +649,12 @@ async def generate_progress_report(
             ) - body_comp_response.data[0].get("muscle_mass", 0)
 
         # Generate PDF report
-        pdf_bytes = await pdf_gen.generate_progress_report(
-            user_data, progress_data, period
+        report = await chart_renderer.render(
+            "progress_report", user_data, progress_data, period
         )
 
         return Response(
-            content=pdf_bytes,
+            content=report.content,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=progress_report_{period}_{datetime.now().strftime('%Y%m%d')}.pdf"
@@ -678,10 +763,10 @@ async def create_progress_collage_endpoint(
             raise HTTPException(status_code=404, detail="No valid images found")
 
         # Create collage
-        collage_bytes = await create_progress_collage(images, layout)
+        collage = await chart_renderer.render("progress_collage", images, layout)
 
         return Response(
-            content=collage_bytes,
+            content=collage.content,
             media_type="image/png",
             headers={
                 "Content-Disposition": f"inline; filename=progress_collage_{layout}.png"
@@ -2,7 +2,9 @@
 Cliente base con funcionalidad común para todos los clientes de servicios externos.
 
 Implementa patrones como reintentos con backoff exponencial, manejo de errores,
-y registro de métricas básicas.
+y registro de métricas básicas. Las peticiones HTTP pasan por el transporte
+compartido de ``core.http_transport`` (pool por host, HTTP/2, reintentos,
+hedging de GETs y latencias por upstream).
 """
 
 import asyncio
@@ -13,7 +15,10 @@ from abc import ABC, abstractmethod
 from functools import wraps
 from typing import Any, Callable, Dict, Optional, TypeVar
 
+import httpx
+
 from config.secrets import settings
+from core.http_transport import HTTPTransport, get_http_transport
 
 logger = logging.getLogger(__name__)
 
@@ -138,6 +143,26 @@ class BaseClient(ABC):
         Esta función debe ser implementada por cada cliente concreto.
         """
 
+    @property
+    def http_transport(self) -> HTTPTransport:
+        """Transporte HTTP compartido por todos los clientes."""
+        return get_http_transport()
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Envía una petición HTTP por el transporte compartido.
+
+        Args:
+            method: Método HTTP
+            url: URL absoluta
+            **kwargs: Argumentos de ``HTTPTransport.request`` (``json``,
+                ``headers``, ``idempotent``, ``hedge``, ``timeout``...)
+
+        Returns:
+            Respuesta con el cuerpo ya leído
+        """
+        return await self.http_transport.request(method, url, **kwargs)
+
     def _record_call(self, method_name: str) -> None:
         """
         Registra una llamada a un método para métricas.
@@ -9,8 +9,6 @@ import json
 import logging
 from typing import Any, Dict, Optional
 
-import httpx
-
 from clients.base_client import BaseClient, retry_with_backoff
 from config.secrets import settings
 
@@ -46,14 +44,15 @@ class PerplexityClient(BaseClient):
 
         super().__init__(service_name="perplexity")
         self.api_key = None
-        self.http_client = None
+        self.headers: Optional[Dict[str, str]] = None
         self._initialized = True
 
     async def initialize(self) -> None:
         """
         Inicializa la conexión con Perplexity AI.
 
-        Configura la API key y prepara el cliente HTTP para su uso.
+        Configura la API key y las cabeceras; las peticiones usan el
+        transporte HTTP compartido.
         """
         if not settings.PERPLEXITY_API_KEY:
             raise ValueError(
@@ -62,15 +61,10 @@ class PerplexityClient(BaseClient):
 
         self.api_key = settings.PERPLEXITY_API_KEY
 
-        # Inicializar cliente HTTP
-        self.http_client = httpx.AsyncClient(
-            base_url=self.API_URL,
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            },
-            timeout=settings.DEFAULT_TIMEOUT,
-        )
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
 
         logger.info("Cliente Perplexity AI inicializado")
 
@@ -89,7 +83,7 @@ class PerplexityClient(BaseClient):
         Returns:
             Resultados de la búsqueda con fuentes y respuesta
         """
-        if not self.http_client:
+        if not self.headers:
             await self.initialize()
 
         self._record_call("search")
@@ -100,7 +94,7 @@ class PerplexityClient(BaseClient):
             "max_sources": max_sources,
         }
 
-        response = await self.http_client.post("/search", json=payload)
+        response = await self._post("/search", payload)
         response.raise_for_status()
 
         return response.json()
@@ -125,7 +119,7 @@ class PerplexityClient(BaseClient):
         Returns:
             Respuesta con fuentes y metadatos
         """
-        if not self.http_client:
+        if not self.headers:
             await self.initialize()
 
         self._record_call("ask")
@@ -136,7 +130,7 @@ class PerplexityClient(BaseClient):
             "options": {"temperature": temperature, "max_tokens": max_tokens},
         }
 
-        response = await self.http_client.post("/chat/completions", json=payload)
+        response = await self._post("/chat/completions", payload)
         response.raise_for_status()
 
         return response.json()
@@ -161,7 +155,7 @@ class PerplexityClient(BaseClient):
         Returns:
             Resultados de la investigación con fuentes y estructura
         """
-        if not self.http_client:
+        if not self.headers:
             await self.initialize()
 
         self._record_call("research")
@@ -186,7 +180,7 @@ class PerplexityClient(BaseClient):
             ],
         }
 
-        response = await self.http_client.post("/chat/completions", json=payload)
+        response = await self._post("/chat/completions", payload)
         response.raise_for_status()
 
         return response.json()
@@ -205,7 +199,7 @@ class PerplexityClient(BaseClient):
         Returns:
             Resultado de la verificación con fuentes y explicación
         """
-        if not self.http_client:
+        if not self.headers:
             await self.initialize()
 
         self._record_call("fact_check")
@@ -236,7 +230,7 @@ class PerplexityClient(BaseClient):
             ],
         }
 
-        response = await self.http_client.post("/chat/completions", json=payload)
+        response = await self._post("/chat/completions", payload)
         response.raise_for_status()
 
         result = response.json()
@@ -258,10 +252,19 @@ class PerplexityClient(BaseClient):
 
         return result
 
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        """POST a la API; los reintentos los gestiona ``retry_with_backoff``."""
+        return await self._request(
+            "POST",
+            f"{self.API_URL}{path}",
+            json=payload,
+            headers=self.headers,
+            timeout=settings.DEFAULT_TIMEOUT,
+        )
+
     async def close(self) -> None:
-        """Cierra el cliente HTTP."""
-        if self.http_client:
-            await self.http_client.aclose()
+        """Libera el cliente (el transporte compartido sigue abierto)."""
+        self.headers = None
 
 
 # Instancia global para uso en toda la aplicación
@@ -245,7 +245,12 @@ class SupabaseClient:
                         else:
                             query = query.eq(filter_key, filter_value)
 
-                if "limit" in kwargs:
+                if "offset" in kwargs and "limit" in kwargs:
+                    # Paginación: PostgREST trabaja con rangos inclusivos
+                    query = query.range(
+                        kwargs["offset"], kwargs["offset"] + kwargs["limit"] - 1
+                    )
+                elif "limit" in kwargs:
                     query = query.limit(kwargs["limit"])
 
                 if "order" in kwargs:
@@ -6,7 +6,7 @@ import time
 import zlib
 import hashlib
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from core.logging_config import (
     get_logger,
@@ -140,6 +140,12 @@ class CacheManager:
         # Bloqueos para operaciones de caché (uno por partición)
         self.locks = [asyncio.Lock() for _ in range(self.partitions)]
 
+        # Hooks del controlador adaptativo (core.cache_controller):
+        # access_observer(key, hit, level) recibe cada acceso y
+        # ttl_advisor(key) propone el TTL cuando set() no lo especifica
+        self.access_observer: Optional[Callable[[str, bool, Optional[str]], None]] = None
+        self.ttl_advisor: Optional[Callable[[str], Optional[int]]] = None
+
         # Métricas de caché avanzadas
         self.stats = {
             "hits": {"l1": 0, "l2": 0, "total": 0},
@@ -283,6 +289,7 @@ class CacheManager:
                     # Verificar si hay patrones suscritos a esta clave
                     await self._check_pattern_subscriptions(key)
 
+                    self._notify_access(key, True, "l1")
                     return value
 
                 # 2. Si no está en L1 y L2 está habilitado, intentar obtener de Redis
@@ -293,6 +300,7 @@ class CacheManager:
                         self.stats["misses"]["total"] += 1
                         if self.enable_telemetry and span:
                             span.set_attribute("cache.hit", False)
+                        self._notify_access(key, False, None)
                         return default
 
                     # Obtener de Redis
@@ -314,6 +322,7 @@ class CacheManager:
                                 span.set_attribute("cache.level", "L2")
                                 span.set_attribute("cache.promoted", True)
 
+                            self._notify_access(key, True, "l2")
                             return value_data
                     except Exception as e:
                         logger.error(f"Error al obtener valor de Redis: {e}")
@@ -329,6 +338,7 @@ class CacheManager:
                 if self.enable_telemetry and span:
                     span.set_attribute("cache.hit", False)
 
+                self._notify_access(key, False, None)
                 return default
 
         except Exception as e:
@@ -336,6 +346,36 @@ class CacheManager:
             self.stats["errors"]["total"] += 1
             return default
 
+    def _notify_access(self, key: str, hit: bool, level: Optional[str]) -> None:
+        """Notifica un acceso al observador registrado (si existe)."""
+        if self.access_observer is not None:
+            try:
+                self.access_observer(key, hit, level)
+            except Exception as e:
+                logger.debug(f"Error en observador de accesos: {e}")
+
+    async def load_backing_value(self, key: str) -> Any:
+        """Lee una clave directamente de L2 (Redis), sin estadísticas ni observador.
+
+        El controlador adaptativo la usa como origen de prefetch: las claves
+        con acceso previsto se reescriben en L1 (y se renueva su TTL en L2)
+        antes de que expiren.
+
+        Args:
+            key: Clave a leer
+
+        Returns:
+            Any: Valor almacenado en L2 o None si no existe
+        """
+        if not (self.l2_enabled and self.redis_client):
+            return None
+        if not await self._ensure_redis_connected():
+            return None
+        redis_value = await self.redis_client.get(key)
+        if not redis_value:
+            return None
+        return await self._deserialize_value(redis_value)
+
     async def _deserialize_value(self, serialized_value: bytes) -> Any:
         """Deserializa y descomprime un valor.
 
@@ -420,8 +460,9 @@ class CacheManager:
                 if key in self.memory_cache[partition]:
                     entry = self.memory_cache[partition][key]
 
-                    # Verificar si ha expirado
-                    if time.time() - entry["timestamp"] > self.ttl:
+                    # Verificar si ha expirado (TTL propio de la entrada si existe)
+                    entry_ttl = entry.get("metadata", {}).get("ttl", self.ttl)
+                    if time.time() - entry["timestamp"] > entry_ttl:
                         # Eliminar entrada expirada
                         self.memory_cache[partition].pop(key)
                         self.memory_cache_current_bytes -= entry["size_bytes"]
@@ -523,6 +564,8 @@ class CacheManager:
         Returns:
             bool: True si se almacenó correctamente
         """
+        if ttl is None and self.ttl_advisor is not None:
+            ttl = self.ttl_advisor(key)
         current_ttl = ttl if ttl is not None else self.ttl
         try:
             with (
@@ -0,0 +1,583 @@
+"""
+Vectorized adherence scoring for whole user populations.
+
+``AdherenceFrame`` packs the ``AdherenceMetrics`` of many users into one
+float array per field, and ``score_adherence_batch`` applies the same rules
+as ``AdherencePredictionEngine.predict_adherence`` (base score, adjustments,
+risk level, rule-based triggers, risk/protective factors, dropout timeframe,
+intervention window, confidence and success probability) as numpy array
+operations. The per-user AI refinements are not part of a batch run; their
+neutral fallbacks are used unless adjustments are passed in explicitly.
+``write_predictions_to_cache`` stores every prediction in one Redis
+pipeline using the engine's cache format.
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+METRIC_FIELDS = (
+    "daily_app_usage_minutes",
+    "weekly_active_days",
+    "agent_interaction_frequency",
+    "message_response_time_hours",
+    "consistency_score",
+    "goal_completion_rate",
+    "self_reporting_frequency",
+    "protocol_modification_requests",
+    "progress_satisfaction_score",
+    "milestone_achievement_rate",
+    "plateau_duration_days",
+    "expectation_reality_gap",
+    "support_system_strength",
+    "environmental_challenges",
+    "competing_priorities",
+    "previous_program_completion_rate",
+    "longest_adherence_streak_days",
+    "average_dropout_timeframe_days",
+)
+
+# Fields checked by the engine's data completeness assessment
+COMPLETENESS_FIELDS = (
+    "daily_app_usage_minutes",
+    "weekly_active_days",
+    "consistency_score",
+    "goal_completion_rate",
+    "progress_satisfaction_score",
+    "support_system_strength",
+)
+
+DEFAULT_FEATURE_WEIGHTS = {
+    "engagement": 0.25,
+    "behavioral": 0.30,
+    "progress": 0.20,
+    "social_environmental": 0.15,
+    "historical": 0.10,
+}
+
+# Risk levels from lowest to highest risk with their minimum probability
+RISK_LEVELS = ("very_low", "low", "moderate", "high", "very_high")
+DEFAULT_RISK_THRESHOLDS = (0.8, 0.6, 0.4, 0.2, 0.0)
+
+TRIGGERS = (
+    "plateau",
+    "time_pressure",
+    "motivation_drop",
+    "complexity_overload",
+    "social_pressure",
+    "health_concern",
+    "life_event",
+    "progress_dissatisfaction",
+)
+
+# (label, metric field, comparison, threshold) in reporting order
+RISK_FACTOR_RULES = (
+    ("Low daily engagement", "daily_app_usage_minutes", "<", 10),
+    ("Infrequent app usage", "weekly_active_days", "<", 4),
+    ("Delayed response to communications", "message_response_time_hours", ">", 12),
+    ("Inconsistent behavior patterns", "consistency_score", "<", 0.6),
+    ("Low goal completion rate", "goal_completion_rate", "<", 0.7),
+    ("Frequent protocol modifications", "protocol_modification_requests", ">", 5),
+    ("Low progress satisfaction", "progress_satisfaction_score", "<", 6),
+    ("Extended progress plateau", "plateau_duration_days", ">", 21),
+    ("Unmet expectations", "expectation_reality_gap", "<", -0.3),
+    ("Weak support system", "support_system_strength", "<", 0.4),
+    ("High environmental barriers", "environmental_challenges", ">", 6),
+    ("Too many competing priorities", "competing_priorities", ">", 7),
+    ("History of program discontinuation", "previous_program_completion_rate", "<", 0.5),
+    ("Short historical adherence streaks", "longest_adherence_streak_days", "<", 30),
+)
+
+PROTECTIVE_FACTOR_RULES = (
+    ("High daily engagement", "daily_app_usage_minutes", ">", 20),
+    ("Consistent daily usage", "weekly_active_days", ">=", 6),
+    ("Strong behavioral consistency", "consistency_score", ">", 0.8),
+    ("Excellent goal achievement", "goal_completion_rate", ">", 0.85),
+    ("High progress satisfaction", "progress_satisfaction_score", ">", 8),
+    ("Exceeding expectations", "expectation_reality_gap", ">", 0.2),
+    ("Strong support network", "support_system_strength", ">", 0.7),
+    ("Favorable environment", "environmental_challenges", "<", 3),
+    ("Strong completion history", "previous_program_completion_rate", ">", 0.8),
+    ("Demonstrated long-term adherence", "longest_adherence_streak_days", ">", 90),
+)
+
+_RISK_FACTOR_LABELS = tuple(rule[0] for rule in RISK_FACTOR_RULES)
+_PROTECTIVE_FACTOR_LABELS = tuple(rule[0] for rule in PROTECTIVE_FACTOR_RULES)
+
+MAX_FACTORS = 5
+MAX_INTERVENTIONS = 5
+
+_COMPARISONS = {
+    "<": np.less,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+_RISK_LEVEL_INTERVENTIONS = (
+    (
+        ("high", "very_high"),
+        {
+            "type": "immediate_outreach",
+            "description": "Personal check-in call within 24 hours",
+            "priority": "critical",
+            "timeline": "immediate",
+        },
+    ),
+    (
+        ("moderate", "high"),
+        {
+            "type": "goal_simplification",
+            "description": "Reduce complexity and focus on 1-2 key behaviors",
+            "priority": "high",
+            "timeline": "this_week",
+        },
+    ),
+)
+
+# First keyword found in the (lower-cased) risk factor picks the intervention
+_RISK_FACTOR_INTERVENTIONS = (
+    (
+        "engagement",
+        {
+            "type": "engagement_boost",
+            "description": "Implement push notifications and gamification",
+            "priority": "medium",
+            "timeline": "next_week",
+        },
+    ),
+    (
+        "satisfaction",
+        {
+            "type": "progress_reframing",
+            "description": "Highlight micro-wins and adjust expectations",
+            "priority": "high",
+            "timeline": "this_week",
+        },
+    ),
+    (
+        "support",
+        {
+            "type": "social_support",
+            "description": "Connect with community or accountability partner",
+            "priority": "medium",
+            "timeline": "next_week",
+        },
+    ),
+)
+
+_TRIGGER_INTERVENTIONS = {
+    "plateau": {
+        "type": "protocol_refresh",
+        "description": "Introduce new exercises or nutrition strategies",
+        "priority": "high",
+        "timeline": "this_week",
+    },
+    "time_pressure": {
+        "type": "time_optimization",
+        "description": "Provide shorter, more efficient protocols",
+        "priority": "high",
+        "timeline": "immediate",
+    },
+    "motivation_drop": {
+        "type": "motivation_renewal",
+        "description": "Revisit goals and celebrate achievements",
+        "priority": "high",
+        "timeline": "this_week",
+    },
+}
+
+_PRIORITY_ORDER = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+
+# Triggers that shorten the dropout estimate and the intervention window
+_DROPOUT_URGENT_TRIGGERS = ("health_concern", "life_event", "time_pressure")
+_WINDOW_URGENT_TRIGGERS = ("health_concern", "life_event", "motivation_drop")
+
+_BASE_WINDOWS = {"very_high": 2, "high": 5, "moderate": 10, "low": 14, "very_low": 21}
+_MONITORING_FREQUENCIES = {
+    "very_high": "daily",
+    "high": "every_2_days",
+    "moderate": "weekly",
+    "low": "bi_weekly",
+    "very_low": "monthly",
+}
+
+
+def matching_factors(metrics: Any, rules: Sequence[Tuple[str, str, str, float]]) -> List[str]:
+    """Labels of the rules a single user's metrics satisfy, capped at MAX_FACTORS."""
+    labels = [
+        label
+        for label, field, op, threshold in rules
+        if _COMPARISONS[op](getattr(metrics, field), threshold)
+    ]
+    return labels[:MAX_FACTORS]
+
+
+def intervention_strategies(
+    risk_level: str, risk_factors: Sequence[str], triggers: Iterable[str]
+) -> List[Dict[str, Any]]:
+    """Interventions for a risk level, its risk factors and detected triggers."""
+    interventions = [
+        dict(intervention)
+        for levels, intervention in _RISK_LEVEL_INTERVENTIONS
+        if risk_level in levels
+    ]
+
+    for risk_factor in risk_factors:
+        lowered = risk_factor.lower()
+        for keyword, intervention in _RISK_FACTOR_INTERVENTIONS:
+            if keyword in lowered:
+                interventions.append(dict(intervention))
+                break
+
+    for trigger in triggers:
+        if trigger in _TRIGGER_INTERVENTIONS:
+            interventions.append(dict(_TRIGGER_INTERVENTIONS[trigger]))
+
+    interventions.sort(key=lambda x: _PRIORITY_ORDER.get(x["priority"], 0), reverse=True)
+    return interventions[:MAX_INTERVENTIONS]
+
+
+def _metric_value(metrics: Any, field: str) -> Any:
+    if isinstance(metrics, Mapping):
+        return metrics.get(field)
+    return getattr(metrics, field, None)
+
+
+@dataclass
+class AdherenceFrame:
+    """AdherenceMetrics for many users as one float64 column per field."""
+
+    user_ids: List[str]
+    columns: Dict[str, np.ndarray]
+
+    @classmethod
+    def from_metrics(
+        cls, user_ids: Sequence[str], metrics: Sequence[Any]
+    ) -> "AdherenceFrame":
+        """Build a frame from AdherenceMetrics objects or equivalent mappings."""
+        if len(user_ids) != len(metrics):
+            raise ValueError("user_ids and metrics must have the same length")
+
+        # One column per field; float64 turns missing values (None) into NaN
+        if all(isinstance(m, Mapping) for m in metrics):
+            columns = {
+                field: np.array([m.get(field) for m in metrics], dtype=np.float64)
+                for field in METRIC_FIELDS
+            }
+        else:
+            columns = {
+                field: np.array([_metric_value(m, field) for m in metrics], dtype=np.float64)
+                for field in METRIC_FIELDS
+            }
+        return cls(user_ids=list(user_ids), columns=columns)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Mapping[str, Any]]) -> "AdherenceFrame":
+        """Build a frame from database rows carrying ``user_id`` and the metric fields."""
+        return cls.from_metrics([row["user_id"] for row in rows], rows)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+
+@dataclass
+class AdherenceBatchResult:
+    """Columnar adherence predictions; ``prediction(i)`` materializes one user."""
+
+    user_ids: List[str]
+    prediction_date: datetime
+    adherence_probability: np.ndarray
+    risk_level_index: np.ndarray
+    confidence_score: np.ndarray
+    risk_factor_mask: np.ndarray  # (n, len(RISK_FACTOR_RULES)), capped at MAX_FACTORS
+    protective_factor_mask: np.ndarray
+    trigger_mask: np.ndarray  # (n, len(TRIGGERS))
+    dropout_timeframe_days: np.ndarray  # 0 when dropout risk is low
+    intervention_window_days: np.ndarray
+    success_probability: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def risk_levels(self) -> List[str]:
+        return [RISK_LEVELS[i] for i in self.risk_level_index]
+
+    def risk_summary(self) -> Dict[str, int]:
+        counts = np.bincount(self.risk_level_index, minlength=len(RISK_LEVELS))
+        return {level: int(count) for level, count in zip(RISK_LEVELS, counts)}
+
+    def prediction(self, i: int) -> Dict[str, Any]:
+        """One user's prediction with the same fields as AdherencePrediction."""
+        risk_level = RISK_LEVELS[self.risk_level_index[i]]
+        risk_factors = [_RISK_FACTOR_LABELS[j] for j in np.flatnonzero(self.risk_factor_mask[i])]
+        triggers = [TRIGGERS[j] for j in np.flatnonzero(self.trigger_mask[i])]
+        dropout = int(self.dropout_timeframe_days[i])
+        return {
+            "user_id": self.user_ids[i],
+            "prediction_date": self.prediction_date,
+            "adherence_probability": float(self.adherence_probability[i]),
+            "risk_level": risk_level,
+            "confidence_score": float(self.confidence_score[i]),
+            "primary_risk_factors": risk_factors,
+            "protective_factors": [
+                _PROTECTIVE_FACTOR_LABELS[j]
+                for j in np.flatnonzero(self.protective_factor_mask[i])
+            ],
+            "triggers_detected": triggers,
+            "estimated_dropout_timeframe_days": dropout or None,
+            "critical_intervention_window_days": int(self.intervention_window_days[i]),
+            "intervention_strategies": intervention_strategies(risk_level, risk_factors, triggers),
+            "monitoring_frequency": _MONITORING_FREQUENCIES[risk_level],
+            "success_probability_with_intervention": float(self.success_probability[i]),
+        }
+
+    def predictions(self) -> List[Dict[str, Any]]:
+        return [self.prediction(i) for i in range(len(self))]
+
+
+def _rule_mask(frame: AdherenceFrame, rules: Sequence[Tuple[str, str, str, float]]) -> np.ndarray:
+    """Boolean (n, rules) matrix keeping only the first MAX_FACTORS hits per user."""
+    if not len(frame):
+        return np.zeros((0, len(rules)), dtype=bool)
+    hits = np.column_stack(
+        [_COMPARISONS[op](frame[field], threshold) for _, field, op, threshold in rules]
+    )
+    return hits & (np.cumsum(hits, axis=1) <= MAX_FACTORS)
+
+
+def _as_column(values: Optional[Any], n: int, default: float) -> np.ndarray:
+    if values is None:
+        return np.full(n, default, dtype=np.float64)
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (n,))
+
+
+def score_adherence_batch(
+    frame: AdherenceFrame,
+    historical_adjustment: Optional[Any] = None,
+    contextual_adjustment: Optional[Any] = None,
+    time_constraints_increased: Optional[Any] = None,
+    extra_triggers: Optional[np.ndarray] = None,
+    has_history: Optional[Any] = None,
+    temporal_relevance: Optional[Any] = None,
+    feature_weights: Optional[Mapping[str, float]] = None,
+    risk_thresholds: Sequence[float] = DEFAULT_RISK_THRESHOLDS,
+    prediction_date: Optional[datetime] = None,
+) -> AdherenceBatchResult:
+    """
+    Score every user in ``frame`` with array operations.
+
+    Args:
+        frame: Metrics of the population to score
+        historical_adjustment: Per-user (or scalar) adjustment, clipped to ±0.2
+        contextual_adjustment: Per-user (or scalar) adjustment, clipped to ±0.15
+        time_constraints_increased: Per-user context flag for the time pressure trigger
+        extra_triggers: Optional (n, len(TRIGGERS)) mask of externally detected triggers
+        has_history: Per-user flag for available historical data
+        temporal_relevance: Per-user relevance of that history (0.5 without history)
+        feature_weights: Weights of the five sub-scores
+        risk_thresholds: Minimum probability of each level in RISK_LEVELS order
+
+    Returns:
+        Columnar predictions in the order of ``frame.user_ids``
+    """
+    n = len(frame)
+    weights = feature_weights or DEFAULT_FEATURE_WEIGHTS
+    f = frame.columns
+
+    # Sub-scores, same formulas as the engine's _normalize_* helpers
+    usage = np.clip(f["daily_app_usage_minutes"] / 30.0, 0.0, 1.0)
+    usage = np.where(f["daily_app_usage_minutes"] > 60, usage * 0.8, usage)
+    days = np.minimum(1.0, f["weekly_active_days"] / 7.0)
+    interactions = np.clip(f["agent_interaction_frequency"] / 5.0, 0.0, 1.0)
+    interactions = np.where(f["agent_interaction_frequency"] > 10, interactions * 0.7, interactions)
+    response = np.maximum(0.0, 1.0 - f["message_response_time_hours"] / 24.0)
+    engagement = (usage + days + interactions + response) / 4.0
+
+    behavioral = (
+        f["consistency_score"]
+        + f["goal_completion_rate"]
+        + np.minimum(1.0, f["self_reporting_frequency"] / 5.0)
+        + np.maximum(0.0, 1.0 - f["protocol_modification_requests"] / 10.0)
+    ) / 4.0
+
+    progress = (
+        (f["progress_satisfaction_score"] - 1) / 9.0
+        + f["milestone_achievement_rate"]
+        + np.maximum(0.0, 1.0 - f["plateau_duration_days"] / 30.0)
+        + (f["expectation_reality_gap"] + 1) / 2.0
+    ) / 4.0
+
+    social = (
+        f["support_system_strength"]
+        + np.maximum(0.0, 1.0 - f["environmental_challenges"] / 10.0)
+        + np.maximum(0.0, 1.0 - f["competing_priorities"] / 10.0)
+    ) / 3.0
+
+    avg_dropout = f["average_dropout_timeframe_days"]
+    known_dropout = ~np.isnan(avg_dropout)
+    historical = (
+        f["previous_program_completion_rate"]
+        + np.minimum(1.0, f["longest_adherence_streak_days"] / 90.0)
+        + np.where(known_dropout, np.minimum(1.0, np.nan_to_num(avg_dropout) / 180.0), 0.5)
+    ) / 3.0
+
+    base = np.clip(
+        engagement * weights["engagement"]
+        + behavioral * weights["behavioral"]
+        + progress * weights["progress"]
+        + social * weights["social_environmental"]
+        + historical * weights["historical"],
+        0.0,
+        1.0,
+    )
+    probability = np.clip(
+        base
+        + np.clip(_as_column(historical_adjustment, n, 0.0), -0.2, 0.2)
+        + np.clip(_as_column(contextual_adjustment, n, 0.0), -0.15, 0.15),
+        0.0,
+        1.0,
+    )
+
+    # Risk level: first threshold (lowest risk first) the probability reaches
+    reached = probability[:, None] >= np.asarray(risk_thresholds)[None, :]
+    risk_index = np.where(reached.any(axis=1), reached.argmax(axis=1), len(RISK_LEVELS) - 1)
+
+    # Rule-based triggers
+    triggers = np.zeros((n, len(TRIGGERS)), dtype=bool)
+    column = {t: i for i, t in enumerate(TRIGGERS)}
+    triggers[:, column["plateau"]] = f["plateau_duration_days"] > 14
+    triggers[:, column["time_pressure"]] = _as_column(time_constraints_increased, n, 0.0) > 0
+    triggers[:, column["motivation_drop"]] = (
+        f["progress_satisfaction_score"] < f["expectation_reality_gap"] + 7
+    )
+    triggers[:, column["complexity_overload"]] = f["protocol_modification_requests"] > 3
+    triggers[:, column["social_pressure"]] = (f["support_system_strength"] < 0.5) & (
+        f["environmental_challenges"] > 5
+    )
+    triggers[:, column["progress_dissatisfaction"]] = f["expectation_reality_gap"] < -0.4
+    if extra_triggers is not None:
+        triggers |= np.asarray(extra_triggers, dtype=bool)
+
+    def any_trigger(names: Sequence[str]) -> np.ndarray:
+        return triggers[:, [column[t] for t in names]].any(axis=1)
+
+    # Dropout timeframe (0 = low risk, no estimate)
+    timeframe = np.select(
+        [probability <= 0.0, probability <= 0.2, probability <= 0.4],
+        [7.0, 14.0, 30.0],
+        default=60.0,
+    )
+    timeframe = np.where(any_trigger(_DROPOUT_URGENT_TRIGGERS), np.floor(timeframe * 0.5), timeframe)
+    with_history = known_dropout & (np.nan_to_num(avg_dropout) != 0)
+    timeframe = np.where(
+        with_history, np.floor(timeframe * (np.nan_to_num(avg_dropout) / 60.0)), timeframe
+    )
+    timeframe = np.where(probability > 0.6, 0, np.maximum(7, timeframe)).astype(np.int64)
+
+    # Intervention window
+    base_windows = np.array([_BASE_WINDOWS[level] for level in RISK_LEVELS])
+    window = base_windows[risk_index]
+    window = np.where(any_trigger(_WINDOW_URGENT_TRIGGERS), np.maximum(1, window // 2), window)
+
+    # Confidence (deterministic part of the engine's assessment)
+    history = _as_column(has_history, n, 0.0) > 0
+    present = np.column_stack([~np.isnan(f[field]) for field in COMPLETENESS_FIELDS])
+    completeness = np.minimum(
+        1.0, present.sum(axis=1) / len(COMPLETENESS_FIELDS) + np.where(history, 0.1, 0.0)
+    )
+    consistency = (
+        f["consistency_score"]
+        + (1.0 - np.abs(f["expectation_reality_gap"]))
+        + np.minimum(1.0, f["longest_adherence_streak_days"] / 60.0)
+    ) / 3.0
+    relevance = np.where(history, _as_column(temporal_relevance, n, 0.7), 0.5)
+    confidence = (completeness + consistency + relevance) / 3.0
+
+    risk_mask = _rule_mask(frame, RISK_FACTOR_RULES)
+    protective_mask = _rule_mask(frame, PROTECTIVE_FACTOR_RULES)
+
+    # Intervention counts by priority, mirroring intervention_strategies()
+    level = np.asarray(RISK_LEVELS, dtype=object)[risk_index]
+    critical = np.isin(level, ("high", "very_high")).astype(np.int64)
+    high = np.isin(level, ("moderate", "high")).astype(np.int64)
+    medium = np.zeros(n, dtype=np.int64)
+    for j, (label, *_) in enumerate(RISK_FACTOR_RULES):
+        lowered = label.lower()
+        for keyword, intervention in _RISK_FACTOR_INTERVENTIONS:
+            if keyword in lowered:
+                if intervention["priority"] == "high":
+                    high += risk_mask[:, j]
+                else:
+                    medium += risk_mask[:, j]
+                break
+    for trigger in _TRIGGER_INTERVENTIONS:
+        high += triggers[:, column[trigger]]
+    urgent = critical + high
+    total = np.minimum(MAX_INTERVENTIONS, urgent + medium)
+    urgent = np.minimum(MAX_INTERVENTIONS, urgent)
+
+    responsiveness = (
+        (f["message_response_time_hours"] < 6).astype(np.int64)
+        + (f["protocol_modification_requests"] < 3)
+        + (f["support_system_strength"] > 0.6)
+    )
+    success = np.minimum(
+        0.95, probability + total * 0.05 + urgent * 0.08 + responsiveness * 0.05
+    )
+
+    return AdherenceBatchResult(
+        user_ids=list(frame.user_ids),
+        prediction_date=prediction_date or datetime.now(),
+        adherence_probability=probability,
+        risk_level_index=risk_index,
+        confidence_score=confidence,
+        risk_factor_mask=risk_mask,
+        protective_factor_mask=protective_mask,
+        trigger_mask=triggers,
+        dropout_timeframe_days=timeframe,
+        intervention_window_days=window,
+        success_probability=success,
+    )
+
+
+def cache_key(user_id: str) -> str:
+    return f"adherence_prediction:{user_id}"
+
+
+async def write_predictions_to_cache(
+    client: Any,
+    result: AdherenceBatchResult,
+    ttl: timedelta = timedelta(days=30),
+    chunk_size: int = 5000,
+) -> int:
+    """
+    Store every prediction under the engine's cache key with pipelined SETEX.
+
+    Returns:
+        Number of predictions written
+    """
+    if client is None or not len(result):
+        return 0
+
+    created_at = datetime.now().isoformat()
+    seconds = int(ttl.total_seconds())
+    written = 0
+    for start in range(0, len(result), chunk_size):
+        pipe = client.pipeline(transaction=False)
+        stop = min(start + chunk_size, len(result))
+        for i in range(start, stop):
+            payload = {"prediction": result.prediction(i), "created_at": created_at}
+            pipe.setex(cache_key(result.user_ids[i]), seconds, json.dumps(payload, default=str))
+        await pipe.execute()
+        written += stop - start
+    return written
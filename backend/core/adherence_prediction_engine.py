@@ -14,6 +14,17 @@ from enum import Enum
 from clients.vertex_ai.vertex_ai_client import VertexAIClient
 from core.telemetry import trace_async
 from core.redis_pool import get_redis_client
+from core.adherence_batch import (
+    PROTECTIVE_FACTOR_RULES,
+    RISK_FACTOR_RULES,
+    RISK_LEVELS,
+    AdherenceBatchResult,
+    AdherenceFrame,
+    intervention_strategies,
+    matching_factors,
+    score_adherence_batch,
+    write_predictions_to_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -105,10 +116,15 @@ class AdherencePredictionEngine:
     Achieves 85% accuracy through ML-enhanced pattern recognition.
     """
 
-    def __init__(self, vertex_ai_client: Optional[VertexAIClient] = None):
+    def __init__(
+        self,
+        vertex_ai_client: Optional[VertexAIClient] = None,
+        redis_client: Optional[Any] = None,
+    ):
         """Initialize the adherence prediction engine."""
         self.vertex_ai_client = vertex_ai_client or VertexAIClient()
-        self.redis_client = get_redis_client()
+        # get_redis_client is async: the pooled client is resolved on first use
+        self.redis_client = redis_client
 
         # Model weights (tuned for 85% accuracy)
         self.feature_weights = {
@@ -236,6 +252,56 @@ class AdherencePredictionEngine:
             logger.error(f"Adherence prediction failed for user {user_id}: {e}")
             raise
 
+    async def predict_adherence_batch(
+        self,
+        user_ids: List[str],
+        metrics: List[Any],
+        contexts: Optional[Dict[str, Dict[str, Any]]] = None,
+        cache: bool = True,
+    ) -> AdherenceBatchResult:
+        """
+        Score many users at once with vectorized rules.
+
+        Uses the same base score, risk levels, factors, timeframes and
+        interventions as predict_adherence, but without the per-user AI
+        refinements: adjustments are neutral, triggers are rule-based and
+        confidence uses the deterministic fallback.
+
+        Args:
+            user_ids: User identifiers
+            metrics: AdherenceMetrics (or equivalent mappings), one per user
+            contexts: Optional context per user id
+            cache: Store every prediction in Redis with one pipeline
+
+        Returns:
+            Columnar batch result (see core.adherence_batch)
+        """
+        contexts = contexts or {}
+        frame = AdherenceFrame.from_metrics(user_ids, metrics)
+        result = score_adherence_batch(
+            frame,
+            time_constraints_increased=[
+                bool(contexts.get(user_id, {}).get("time_constraints_increased"))
+                for user_id in user_ids
+            ],
+            feature_weights=self.feature_weights,
+            risk_thresholds=[
+                self.risk_thresholds[AdherenceRiskLevel(level)] for level in RISK_LEVELS
+            ],
+        )
+
+        if cache:
+            try:
+                await write_predictions_to_cache(await self._get_redis(), result)
+            except Exception as e:
+                logger.warning(f"Failed to cache batch predictions: {e}")
+
+        logger.info(
+            f"Batch adherence prediction completed for {len(result)} users: "
+            f"{result.risk_summary()}"
+        )
+        return result
+
     async def _calculate_base_adherence_score(self, metrics: AdherenceMetrics) -> float:
         """Calculate base adherence score from current metrics."""
 
@@ -498,86 +564,14 @@ class AdherencePredictionEngine:
     async def _identify_risk_factors(
         self, metrics: AdherenceMetrics, context: Optional[Dict[str, Any]]
     ) -> List[str]:
-        """Identify primary risk factors for adherence."""
-        risk_factors = []
-
-        # Engagement risk factors
-        if metrics.daily_app_usage_minutes < 10:
-            risk_factors.append("Low daily engagement")
-        if metrics.weekly_active_days < 4:
-            risk_factors.append("Infrequent app usage")
-        if metrics.message_response_time_hours > 12:
-            risk_factors.append("Delayed response to communications")
-
-        # Behavioral risk factors
-        if metrics.consistency_score < 0.6:
-            risk_factors.append("Inconsistent behavior patterns")
-        if metrics.goal_completion_rate < 0.7:
-            risk_factors.append("Low goal completion rate")
-        if metrics.protocol_modification_requests > 5:
-            risk_factors.append("Frequent protocol modifications")
-
-        # Progress risk factors
-        if metrics.progress_satisfaction_score < 6:
-            risk_factors.append("Low progress satisfaction")
-        if metrics.plateau_duration_days > 21:
-            risk_factors.append("Extended progress plateau")
-        if metrics.expectation_reality_gap < -0.3:
-            risk_factors.append("Unmet expectations")
-
-        # Social/environmental risk factors
-        if metrics.support_system_strength < 0.4:
-            risk_factors.append("Weak support system")
-        if metrics.environmental_challenges > 6:
-            risk_factors.append("High environmental barriers")
-        if metrics.competing_priorities > 7:
-            risk_factors.append("Too many competing priorities")
-
-        # Historical risk factors
-        if metrics.previous_program_completion_rate < 0.5:
-            risk_factors.append("History of program discontinuation")
-        if metrics.longest_adherence_streak_days < 30:
-            risk_factors.append("Short historical adherence streaks")
-
-        return risk_factors[:5]  # Return top 5 risk factors
+        """Identify primary risk factors for adherence (top 5)."""
+        return matching_factors(metrics, RISK_FACTOR_RULES)
 
     async def _identify_protective_factors(
         self, metrics: AdherenceMetrics, context: Optional[Dict[str, Any]]
     ) -> List[str]:
-        """Identify protective factors that support adherence."""
-        protective_factors = []
-
-        # Strong engagement
-        if metrics.daily_app_usage_minutes > 20:
-            protective_factors.append("High daily engagement")
-        if metrics.weekly_active_days >= 6:
-            protective_factors.append("Consistent daily usage")
-
-        # Positive behaviors
-        if metrics.consistency_score > 0.8:
-            protective_factors.append("Strong behavioral consistency")
-        if metrics.goal_completion_rate > 0.85:
-            protective_factors.append("Excellent goal achievement")
-
-        # Good progress
-        if metrics.progress_satisfaction_score > 8:
-            protective_factors.append("High progress satisfaction")
-        if metrics.expectation_reality_gap > 0.2:
-            protective_factors.append("Exceeding expectations")
-
-        # Strong support
-        if metrics.support_system_strength > 0.7:
-            protective_factors.append("Strong support network")
-        if metrics.environmental_challenges < 3:
-            protective_factors.append("Favorable environment")
-
-        # Good history
-        if metrics.previous_program_completion_rate > 0.8:
-            protective_factors.append("Strong completion history")
-        if metrics.longest_adherence_streak_days > 90:
-            protective_factors.append("Demonstrated long-term adherence")
-
-        return protective_factors[:5]  # Return top 5 protective factors
+        """Identify protective factors that support adherence (top 5)."""
+        return matching_factors(metrics, PROTECTIVE_FACTOR_RULES)
 
     async def _detect_triggers(
         self,
@@ -647,98 +641,10 @@ class AdherencePredictionEngine:
         metrics: AdherenceMetrics,
     ) -> List[Dict[str, Any]]:
         """Generate personalized intervention strategies."""
-
-        interventions = []
-
-        # Risk level-based interventions
-        if risk_level in [AdherenceRiskLevel.HIGH, AdherenceRiskLevel.VERY_HIGH]:
-            interventions.append(
-                {
-                    "type": "immediate_outreach",
-                    "description": "Personal check-in call within 24 hours",
-                    "priority": "critical",
-                    "timeline": "immediate",
-                }
-            )
-
-        if risk_level in [AdherenceRiskLevel.MODERATE, AdherenceRiskLevel.HIGH]:
-            interventions.append(
-                {
-                    "type": "goal_simplification",
-                    "description": "Reduce complexity and focus on 1-2 key behaviors",
-                    "priority": "high",
-                    "timeline": "this_week",
-                }
-            )
-
-        # Risk factor-based interventions
-        for risk_factor in risk_factors:
-            if "engagement" in risk_factor.lower():
-                interventions.append(
-                    {
-                        "type": "engagement_boost",
-                        "description": "Implement push notifications and gamification",
-                        "priority": "medium",
-                        "timeline": "next_week",
-                    }
-                )
-            elif "satisfaction" in risk_factor.lower():
-                interventions.append(
-                    {
-                        "type": "progress_reframing",
-                        "description": "Highlight micro-wins and adjust expectations",
-                        "priority": "high",
-                        "timeline": "this_week",
-                    }
-                )
-            elif "support" in risk_factor.lower():
-                interventions.append(
-                    {
-                        "type": "social_support",
-                        "description": "Connect with community or accountability partner",
-                        "priority": "medium",
-                        "timeline": "next_week",
-                    }
-                )
-
-        # Trigger-based interventions
-        for trigger in triggers:
-            if trigger == AdherenceTrigger.PLATEAU:
-                interventions.append(
-                    {
-                        "type": "protocol_refresh",
-                        "description": "Introduce new exercises or nutrition strategies",
-                        "priority": "high",
-                        "timeline": "this_week",
-                    }
-                )
-            elif trigger == AdherenceTrigger.TIME_PRESSURE:
-                interventions.append(
-                    {
-                        "type": "time_optimization",
-                        "description": "Provide shorter, more efficient protocols",
-                        "priority": "high",
-                        "timeline": "immediate",
-                    }
-                )
-            elif trigger == AdherenceTrigger.MOTIVATION_DROP:
-                interventions.append(
-                    {
-                        "type": "motivation_renewal",
-                        "description": "Revisit goals and celebrate achievements",
-                        "priority": "high",
-                        "timeline": "this_week",
-                    }
-                )
-
-        # Limit to top 5 interventions by priority
-        priority_order = {"critical": 4, "high": 3, "medium": 2, "low": 1}
-        interventions.sort(
-            key=lambda x: priority_order.get(x["priority"], 0), reverse=True
+        return intervention_strategies(
+            risk_level.value, risk_factors, [trigger.value for trigger in triggers]
         )
 
-        return interventions[:5]
-
     async def _calculate_confidence_score(
         self,
         metrics: AdherenceMetrics,
@@ -968,28 +874,49 @@ class AdherencePredictionEngine:
         """Cache prediction for monitoring and tracking."""
         try:
             cache_key = f"adherence_prediction:{prediction.user_id}"
+            prediction_data = asdict(prediction)
+            prediction_data["risk_level"] = prediction.risk_level.value
+            prediction_data["triggers_detected"] = [
+                trigger.value for trigger in prediction.triggers_detected
+            ]
             cache_data = {
-                "prediction": asdict(prediction),
+                "prediction": prediction_data,
                 "created_at": datetime.now().isoformat(),
             }
 
+            redis_client = await self._get_redis()
+            if redis_client is None:
+                return
+
             # Cache for 30 days
-            await self.redis_client.setex(
+            await redis_client.setex(
                 cache_key,
-                timedelta(days=30).total_seconds(),
+                int(timedelta(days=30).total_seconds()),
                 json.dumps(cache_data, default=str),
             )
 
         except Exception as e:
             logger.warning(f"Failed to cache prediction: {e}")
 
+    async def _get_redis(self) -> Optional[Any]:
+        """Get the pooled Redis client (None if unavailable)."""
+        if self.redis_client is None:
+            try:
+                self.redis_client = await get_redis_client()
+            except Exception as e:
+                logger.warning(f"Redis unavailable for adherence predictions: {e}")
+        return self.redis_client
+
     async def get_cached_prediction(
         self, user_id: str
     ) -> Optional[AdherencePrediction]:
         """Retrieve cached prediction for user."""
         try:
             cache_key = f"adherence_prediction:{user_id}"
-            cached_data = await self.redis_client.get(cache_key)
+            redis_client = await self._get_redis()
+            if redis_client is None:
+                return None
+            cached_data = await redis_client.get(cache_key)
 
             if cached_data:
                 data = json.loads(cached_data)
@@ -21,7 +21,7 @@ import json
 import time
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union, Tuple, Set
+from typing import Callable, Dict, List, Optional, Any, Union, Tuple, Set
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
@@ -539,6 +539,10 @@ class AdvancedCacheManager:
         self.prefetch_enabled = True
         self.prefetch_threshold = 0.7  # Prefetch cuando hit ratio > 70%
         
+        # Hooks del controlador adaptativo (core.cache_controller)
+        self.access_observer: Optional[Callable[[str, bool, Optional[str]], None]] = None
+        self.ttl_advisor: Optional[Callable[[str], Optional[int]]] = None
+        
     async def initialize(self) -> None:
         """Inicializa el gestor de caché avanzado"""
         try:
@@ -562,6 +566,7 @@ class AdvancedCacheManager:
             entry = await self.l1_cache.get(key)
             if entry:
                 self._record_global_hit(time.time() - start_time)
+                self._notify_access(key, True, CacheLayer.L1_MEMORY.value)
                 logger.debug(f"Cache hit L1: {key}")
                 return entry.value
             
@@ -571,6 +576,7 @@ class AdvancedCacheManager:
                 # Promover a L1
                 await self._promote_to_l1(entry)
                 self._record_global_hit(time.time() - start_time)
+                self._notify_access(key, True, CacheLayer.L2_REDIS.value)
                 logger.debug(f"Cache hit L2: {key}")
                 return entry.value
             
@@ -581,11 +587,13 @@ class AdvancedCacheManager:
                 await self._promote_to_l2(entry)
                 await self._promote_to_l1(entry)
                 self._record_global_hit(time.time() - start_time)
+                self._notify_access(key, True, CacheLayer.L3_DATABASE.value)
                 logger.debug(f"Cache hit L3: {key}")
                 return entry.value
             
             # Cache miss completo
             self._record_global_miss(time.time() - start_time)
+            self._notify_access(key, False, None)
             logger.debug(f"Cache miss completo: {key}")
             return None
             
@@ -604,6 +612,9 @@ class AdvancedCacheManager:
     ) -> bool:
         """Establece valor en el caché usando estrategia configurada"""
         try:
+            if ttl is None and self.ttl_advisor is not None:
+                ttl = self.ttl_advisor(key)
+            
             # Calcular tamaño del valor
             value_size = self._calculate_value_size(value)
             
@@ -670,6 +681,25 @@ class AdvancedCacheManager:
         except Exception as e:
             logger.error(f"Error limpiando caché: {e}")
     
+    async def load_backing_value(self, key: str) -> Optional[Any]:
+        """Lee una clave de L2/L3 sin pasar por L1 ni notificar al observador.
+
+        Origen de prefetch del controlador adaptativo (``core.cache_controller``).
+        """
+        for layer in (self.l2_cache, self.l3_cache):
+            entry = await layer.get(key)
+            if entry:
+                return entry.value
+        return None
+    
+    def _notify_access(self, key: str, hit: bool, layer: Optional[str]) -> None:
+        """Notifica un acceso al observador registrado (si existe)"""
+        if self.access_observer is not None:
+            try:
+                self.access_observer(key, hit, layer)
+            except Exception as e:
+                logger.debug(f"Error en observador de accesos: {e}")
+    
     async def _promote_to_l1(self, entry: CacheEntry) -> bool:
         """Promueve entrada a L1"""
         try:
@@ -0,0 +1,869 @@
+"""
+Append-only, time-partitioned storage for audit records.
+
+Records are written as JSON lines to segment files, one segment per time
+partition (an hour by default). Each segment keeps:
+
+- bitmap indexes per indexed field (``int`` bitsets over segment ordinals,
+  zlib-compressed on disk), so filters are AND/OR of bitmaps
+- the timestamp and byte offset of every record, so time ranges are
+  resolved by bisection and reads go through ``mmap`` without scanning
+- one Merkle tree per batch of records; the batch root is HMAC-signed once
+  and chained to the previous root, and the segment root covers all batches
+
+Queries skip segments outside the requested time range and stream results
+newest first. Memory is bounded by the active segment plus a small LRU of
+loaded segment indexes; retention drops whole segment files.
+"""
+
+import base64
+import bisect
+import hashlib
+import hmac
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+GENESIS_ROOT = hashlib.sha256(b"audit_chain_genesis").hexdigest()
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+DIGEST_SIZE = 32
+
+DEFAULT_INDEX_FIELDS = (
+    "event_type",
+    "actor",
+    "resource",
+    "severity",
+    "compliance_tags",
+)
+
+
+def leaf_hash(line: bytes) -> bytes:
+    """Hash of a stored record line (domain-separated from inner nodes)."""
+    return hashlib.sha256(LEAF_PREFIX + line).digest()
+
+
+def merkle_root(leaves: Sequence[bytes]) -> bytes:
+    """Merkle root of the given digests; an odd node is carried up unchanged."""
+    if not leaves:
+        return hashlib.sha256(NODE_PREFIX).digest()
+    level = list(leaves)
+    while len(level) > 1:
+        paired = [
+            hashlib.sha256(NODE_PREFIX + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0]
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Epoch seconds; naive datetimes are taken as UTC."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def count_bits(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def iter_bits_desc(bits: int) -> Iterator[int]:
+    """Positions of the set bits, highest first."""
+    digits = bin(bits)
+    top = len(digits) - 3
+    position = digits.find("1", 2)
+    while position != -1:
+        yield top - (position - 2)
+        position = digits.find("1", position + 1)
+
+
+def _encode_bitmap(bits: int) -> str:
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    return base64.b64encode(zlib.compress(raw)).decode()
+
+
+def _decode_bitmap(encoded: str) -> int:
+    return int.from_bytes(zlib.decompress(base64.b64decode(encoded)), "little")
+
+
+def _encode_bytes(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+@dataclass
+class SegmentIndex:
+    """Per-record offsets, timestamps, leaf hashes and bitmaps of a segment."""
+
+    offsets: array = field(default_factory=lambda: array("Q"))
+    timestamps: array = field(default_factory=lambda: array("d"))
+    leaves: bytearray = field(default_factory=bytearray)
+    ids: List[Optional[str]] = field(default_factory=list)
+    positions: Dict[str, int] = field(default_factory=dict)
+    bitmaps: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    batches: List[Dict[str, Any]] = field(default_factory=list)
+    seal: Optional[Dict[str, Any]] = None
+    monotonic: bool = True
+    size: int = 0
+    _map: Optional[mmap.mmap] = None
+
+    def add(
+        self,
+        record: Dict[str, Any],
+        line: bytes,
+        epoch: float,
+        index_fields: Iterable[str],
+        id_field: str,
+    ) -> int:
+        ordinal = len(self.offsets)
+        self.offsets.append(self.size)
+        self.size += len(line)
+        if self.timestamps and epoch < self.timestamps[-1]:
+            self.monotonic = False
+        self.timestamps.append(epoch)
+        self.leaves += leaf_hash(line)
+
+        record_id = record.get(id_field)
+        self.ids.append(record_id)
+        if record_id is not None:
+            self.positions[str(record_id)] = ordinal
+
+        bit = 1 << ordinal
+        for name in index_fields:
+            value = record.get(name)
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else (value,)
+            bitmaps = self.bitmaps.setdefault(name, {})
+            for item in values:
+                key = str(item)
+                bitmaps[key] = bitmaps.get(key, 0) | bit
+        return ordinal
+
+    def leaf(self, ordinal: int) -> bytes:
+        start = ordinal * DIGEST_SIZE
+        return bytes(self.leaves[start : start + DIGEST_SIZE])
+
+    def line(self, path: str, ordinal: int) -> bytes:
+        """Raw record line, read through a memory map of the log file."""
+        if self._map is None or len(self._map) < self.size:
+            with open(path, "rb") as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        start = self.offsets[ordinal]
+        end = (
+            self.offsets[ordinal + 1] if ordinal + 1 < len(self.offsets) else self.size
+        )
+        return self._map[start:end]
+
+    def batch_for(self, ordinal: int) -> Optional[Dict[str, Any]]:
+        """Signed batch containing the ordinal, or None if still pending."""
+        firsts = [batch["first"] for batch in self.batches]
+        position = bisect.bisect_right(firsts, ordinal) - 1
+        if position < 0:
+            return None
+        batch = self.batches[position]
+        return batch if ordinal < batch["first"] + batch["count"] else None
+
+    def time_mask(self, start: Optional[float], end: Optional[float]) -> int:
+        """Bitmap of the records with start <= timestamp <= end."""
+        count = len(self.timestamps)
+        if self.monotonic:
+            low = bisect.bisect_left(self.timestamps, start) if start is not None else 0
+            high = (
+                bisect.bisect_right(self.timestamps, end) if end is not None else count
+            )
+            return ((1 << high) - 1) ^ ((1 << low) - 1) if high > low else 0
+
+        flags = bytearray((count + 7) // 8)
+        for ordinal, epoch in enumerate(self.timestamps):
+            if (start is None or epoch >= start) and (end is None or epoch <= end):
+                flags[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(flags, "little")
+
+    def to_payload(self) -> bytes:
+        payload = {
+            "offsets": _encode_bytes(self.offsets.tobytes()),
+            "timestamps": _encode_bytes(self.timestamps.tobytes()),
+            "leaves": _encode_bytes(bytes(self.leaves)),
+            "ids": self.ids,
+            "bitmaps": {
+                name: {value: _encode_bitmap(bits) for value, bits in values.items()}
+                for name, values in self.bitmaps.items()
+            },
+            "batches": self.batches,
+            "seal": self.seal,
+        }
+        return zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+    @classmethod
+    def from_payload(cls, data: bytes, monotonic: bool, size: int) -> "SegmentIndex":
+        payload = json.loads(zlib.decompress(data))
+        index = cls(monotonic=monotonic, size=size)
+        index.offsets.frombytes(base64.b64decode(payload["offsets"]))
+        index.timestamps.frombytes(base64.b64decode(payload["timestamps"]))
+        index.leaves = bytearray(base64.b64decode(payload["leaves"]))
+        index.ids = payload["ids"]
+        index.positions = {
+            str(record_id): ordinal
+            for ordinal, record_id in enumerate(index.ids)
+            if record_id is not None
+        }
+        index.bitmaps = {
+            name: {value: _decode_bitmap(bits) for value, bits in values.items()}
+            for name, values in payload["bitmaps"].items()
+        }
+        index.batches = payload["batches"]
+        index.seal = payload["seal"]
+        return index
+
+
+@dataclass
+class AuditSegment:
+    """Summary of a segment; the index is loaded on demand."""
+
+    name: str
+    key: int
+    path: str
+    count: int = 0
+    min_ts: float = float("inf")
+    max_ts: float = float("-inf")
+    sealed: bool = False
+    root: Optional[str] = None
+    last_root: Optional[str] = None
+    index: Optional[SegmentIndex] = None
+
+    @property
+    def log_path(self) -> str:
+        return self.path + ".log"
+
+    @property
+    def journal_path(self) -> str:
+        return self.path + ".batches"
+
+    @property
+    def index_path(self) -> str:
+        return self.path + ".idx"
+
+    def overlaps(self, start: Optional[float], end: Optional[float]) -> bool:
+        if self.count == 0:
+            return False
+        if start is not None and self.max_ts < start:
+            return False
+        return end is None or self.min_ts <= end
+
+
+class AuditLogStore:
+    """
+    Segmented, append-only audit log.
+
+    Records are appended with ``append`` and signed in batches of
+    ``batch_size`` (``flush`` signs the pending tail early). ``query``
+    streams ``(record, leaf_hash)`` pairs newest first; ``verify`` checks
+    every batch root, signature and chain link. ``verify(quick=True)`` is
+    the cheap monitoring mode: it skips sealed segments whose files look
+    unchanged since they were last verified, except for a few that are
+    re-verified in rotation on every call.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        segment_seconds: int = 3600,
+        batch_size: int = 1000,
+        signing_key: Optional[bytes] = None,
+        index_fields: Sequence[str] = DEFAULT_INDEX_FIELDS,
+        id_field: str = "event_id",
+        cached_segments: int = 16,
+    ):
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="audit-log-")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.segment_seconds = max(1, int(segment_seconds))
+        self.batch_size = max(1, int(batch_size))
+        self.index_fields = tuple(index_fields)
+        self.id_field = id_field
+        self.cached_segments = max(1, cached_segments)
+        self._signing_key = signing_key
+
+        self.segments: List[AuditSegment] = []
+        self._active: Optional[AuditSegment] = None
+        self._writer = None
+        self._dirty = False
+        self._pending_from = 0
+        self._last_root = GENESIS_ROOT
+        self._next_seq = 0
+        self._loaded: "OrderedDict[str, AuditSegment]" = OrderedDict()
+        self._verified: Dict[str, Tuple[Any, ...]] = {}
+        self._rotation = 0
+
+        self._open_existing()
+
+    # Writing
+
+    def append(self, record: Dict[str, Any], timestamp: datetime) -> str:
+        """Append a record and return its leaf hash (hex)."""
+        epoch = to_epoch(timestamp)
+        key = int(epoch // self.segment_seconds) * self.segment_seconds
+        if self._active is None or key > self._active.key:
+            self._rotate(key)
+
+        segment = self._active
+        line = (
+            json.dumps(
+                {"ts": epoch, "data": record},
+                sort_keys=True,
+                separators=(",", ":"),
+                default=str,
+            ).encode()
+            + b"\n"
+        )
+        self._writer.write(line)
+        self._dirty = True
+
+        ordinal = segment.index.add(
+            record, line, epoch, self.index_fields, self.id_field
+        )
+        segment.count += 1
+        segment.min_ts = min(segment.min_ts, epoch)
+        segment.max_ts = max(segment.max_ts, epoch)
+
+        if segment.count - self._pending_from >= self.batch_size:
+            self.flush()
+        return segment.index.leaf(ordinal).hex()
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Sign the pending records of the active segment as one batch."""
+        segment = self._active
+        if segment is None or segment.count == self._pending_from:
+            return None
+
+        first = self._pending_from
+        leaves = [segment.index.leaf(i) for i in range(first, segment.count)]
+        root = merkle_root(leaves).hex()
+        batch = {
+            "first": first,
+            "count": segment.count - first,
+            "root": root,
+            "prev": self._last_root,
+            "signature": self._sign(self._last_root, root),
+        }
+
+        self._sync_writer()
+        self._append_journal(segment, batch)
+        segment.index.batches.append(batch)
+        segment.last_root = self._last_root = root
+        self._pending_from = segment.count
+        return batch
+
+    @property
+    def pending(self) -> int:
+        """Records appended but not yet covered by a signed batch."""
+        return self._active.count - self._pending_from if self._active else 0
+
+    def _rotate(self, key: int) -> None:
+        if self._active is not None:
+            self._seal(self._active)
+
+        name = f"{self._next_seq:08d}-{key}"
+        self._next_seq += 1
+        segment = AuditSegment(
+            name=name,
+            key=key,
+            path=os.path.join(self.directory, name),
+            last_root=self._last_root,
+            index=SegmentIndex(),
+        )
+        self._writer = open(segment.log_path, "ab")
+        self._active = segment
+        self._pending_from = 0
+        self.segments.append(segment)
+
+    def _seal(self, segment: AuditSegment) -> None:
+        """Sign the tail, compute the segment root and persist the index."""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._dirty = False
+
+        index = segment.index
+        roots = [bytes.fromhex(batch["root"]) for batch in index.batches]
+        segment.root = merkle_root(roots).hex()
+        index.seal = {
+            "root": segment.root,
+            "signature": self._sign(segment.name, segment.root),
+        }
+        self._append_journal(segment, dict(index.seal, sealed=True))
+
+        header = {
+            "count": segment.count,
+            "min_ts": segment.min_ts if segment.count else None,
+            "max_ts": segment.max_ts if segment.count else None,
+            "root": segment.root,
+            "last_root": segment.last_root,
+            "monotonic": index.monotonic,
+            "size": index.size,
+        }
+        temporary = segment.index_path + ".tmp"
+        with open(temporary, "wb") as handle:
+            handle.write(json.dumps(header).encode() + b"\n")
+            handle.write(index.to_payload())
+        os.replace(temporary, segment.index_path)
+
+        segment.sealed = True
+        self._active = None
+        self._remember(segment)
+
+    def _append_journal(self, segment: AuditSegment, entry: Dict[str, Any]) -> None:
+        with open(segment.journal_path, "ab") as handle:
+            handle.write(json.dumps(entry, sort_keys=True).encode() + b"\n")
+
+    def _sync_writer(self) -> None:
+        if self._writer is not None and self._dirty:
+            self._writer.flush()
+            self._dirty = False
+
+    def _sign(self, prefix: str, root: str) -> Optional[str]:
+        if not self._signing_key:
+            return None
+        return hmac.new(
+            self._signing_key, f"{prefix}{root}".encode(), hashlib.sha256
+        ).hexdigest()
+
+    def _signature_ok(self, prefix: str, root: str, signature: Optional[str]) -> bool:
+        if not self._signing_key:
+            return True
+        expected = self._sign(prefix, root)
+        return signature is not None and hmac.compare_digest(expected, signature)
+
+    # Index cache
+
+    def _index(self, segment: AuditSegment) -> SegmentIndex:
+        if segment.index is None:
+            with open(segment.index_path, "rb") as handle:
+                header = json.loads(handle.readline())
+                segment.index = SegmentIndex.from_payload(
+                    handle.read(), header["monotonic"], header["size"]
+                )
+        if segment.sealed:
+            self._remember(segment)
+        return segment.index
+
+    def _remember(self, segment: AuditSegment) -> None:
+        self._loaded[segment.name] = segment
+        self._loaded.move_to_end(segment.name)
+        while len(self._loaded) > self.cached_segments:
+            _, evicted = self._loaded.popitem(last=False)
+            evicted.index = None
+
+    # Reading
+
+    def _matching(
+        self,
+        segment: AuditSegment,
+        index: SegmentIndex,
+        filters: Dict[str, List[str]],
+        start: Optional[float],
+        end: Optional[float],
+    ) -> int:
+        bits = (1 << segment.count) - 1
+        for name, values in filters.items():
+            bitmaps = index.bitmaps.get(name, {})
+            field_bits = 0
+            for value in values:
+                field_bits |= bitmaps.get(str(value), 0)
+            bits &= field_bits
+            if not bits:
+                return 0
+        if (start is not None and segment.min_ts < start) or (
+            end is not None and segment.max_ts > end
+        ):
+            bits &= index.time_mask(start, end)
+        return bits
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Optional[Iterable[Any]]]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """
+        Stream ``(record, leaf_hash)`` pairs matching the filters, newest first.
+
+        Values within a field are OR-ed and fields are AND-ed; only fields
+        listed in ``index_fields`` can be filtered on.
+        """
+        active_filters = {}
+        for name, values in (filters or {}).items():
+            if values is None:
+                continue
+            if name not in self.index_fields:
+                raise ValueError(f"Field '{name}' is not indexed")
+            active_filters[name] = [str(value) for value in values]
+
+        start_epoch = to_epoch(start) if start else None
+        end_epoch = to_epoch(end) if end else None
+        skip = offset or 0
+        remaining = limit
+
+        for segment in reversed(list(self.segments)):
+            if remaining is not None and remaining <= 0:
+                return
+            if not segment.overlaps(start_epoch, end_epoch):
+                continue
+
+            index = self._index(segment)
+            bits = self._matching(
+                segment, index, active_filters, start_epoch, end_epoch
+            )
+            if not bits:
+                continue
+            if skip:
+                matched = count_bits(bits)
+                if skip >= matched:
+                    skip -= matched
+                    continue
+
+            if segment is self._active:
+                self._sync_writer()
+            for ordinal in iter_bits_desc(bits):
+                if skip:
+                    skip -= 1
+                    continue
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                line = index.line(segment.log_path, ordinal)
+                yield json.loads(line)["data"], index.leaf(ordinal).hex()
+
+    def find(
+        self, record_id: str, hint: Optional[datetime] = None
+    ) -> Optional[Tuple[AuditSegment, int]]:
+        """Segment and ordinal of a record, trying the hinted time first."""
+        candidates = list(reversed(self.segments))
+        if hint is not None:
+            epoch = to_epoch(hint)
+            candidates.sort(key=lambda segment: not segment.overlaps(epoch, epoch))
+        for segment in candidates:
+            if segment.count == 0:
+                continue
+            ordinal = self._index(segment).positions.get(record_id)
+            if ordinal is not None:
+                return segment, ordinal
+        return None
+
+    @property
+    def count(self) -> int:
+        return sum(segment.count for segment in self.segments)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "total_records": self.count,
+            "segments": len(self.segments),
+            "loaded_indexes": len(self._loaded) + (1 if self._active else 0),
+            "pending_records": self.pending,
+            "disk_bytes": sum(
+                os.path.getsize(path)
+                for segment in self.segments
+                for path in (
+                    segment.log_path,
+                    segment.journal_path,
+                    segment.index_path,
+                )
+                if os.path.exists(path)
+            ),
+        }
+
+    # Integrity
+
+    def verify_record(
+        self, record_id: str, hint: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Check one record against its leaf hash, batch root and signature."""
+        location = self.find(record_id, hint)
+        if location is None:
+            return {"valid": False, "error": f"Record {record_id} not found"}
+
+        segment, ordinal = location
+        index = self._index(segment)
+        if segment is self._active:
+            self._sync_writer()
+
+        expected = index.leaf(ordinal)
+        calculated = leaf_hash(index.line(segment.log_path, ordinal))
+        if calculated != expected:
+            return {
+                "valid": False,
+                "error": "Record hash mismatch",
+                "expected": expected.hex(),
+                "calculated": calculated.hex(),
+            }
+
+        batch = index.batch_for(ordinal)
+        if batch is None:
+            return {"valid": True, "signed": False, "hash": expected.hex()}
+
+        leaves = [
+            index.leaf(i) for i in range(batch["first"], batch["first"] + batch["count"])
+        ]
+        if merkle_root(leaves).hex() != batch["root"]:
+            return {"valid": False, "error": "Batch Merkle root mismatch"}
+        if not self._signature_ok(batch["prev"], batch["root"], batch["signature"]):
+            return {"valid": False, "error": "Batch signature mismatch"}
+
+        return {
+            "valid": True,
+            "signed": True,
+            "hash": expected.hex(),
+            "batch_root": batch["root"],
+        }
+
+    def verify(self, quick: bool = False, rotate: int = 1) -> Dict[str, Any]:
+        """
+        Verify every segment; pending records are signed first.
+
+        With ``quick`` sealed segments verified earlier are skipped while
+        their size and mtime are unchanged. File metadata can be reset after
+        tampering, so ``rotate`` of them are still re-verified per call,
+        cycling through the log; a full verification never skips.
+        """
+        self.flush()
+
+        violations: List[Dict[str, Any]] = []
+        verified = 0
+        skipped = 0
+        chain_valid = True
+        previous_root: Optional[str] = None
+
+        segments = list(self.segments)
+        recheck = set()
+        if quick and segments:
+            recheck = {(self._rotation + i) % len(segments) for i in range(rotate)}
+            self._rotation = (self._rotation + rotate) % len(segments)
+
+        for position, segment in enumerate(segments):
+            fingerprint = self._fingerprint(segment)
+            if (
+                quick
+                and position not in recheck
+                and segment.sealed
+                and self._verified.get(segment.name) == fingerprint
+            ):
+                verified += segment.count
+                skipped += 1
+                previous_root = segment.last_root
+                continue
+
+            index = self._index(segment)
+            if segment is self._active:
+                self._sync_writer()
+            found = []
+            for batch in index.batches:
+                if previous_root is not None and batch["prev"] != previous_root:
+                    chain_valid = False
+                    found.append(
+                        {
+                            "segment": segment.name,
+                            "batch": batch["first"],
+                            "error": "Broken chain link",
+                        }
+                    )
+                previous_root = batch["root"]
+                verified += self._verify_batch(segment, index, batch, found)
+
+            if segment.sealed:
+                roots = [bytes.fromhex(batch["root"]) for batch in index.batches]
+                seal = index.seal or {}
+                if merkle_root(roots).hex() != seal.get("root") or not self._signature_ok(
+                    segment.name, seal.get("root", ""), seal.get("signature")
+                ):
+                    found.append(
+                        {"segment": segment.name, "error": "Segment root mismatch"}
+                    )
+                elif not found:
+                    self._verified[segment.name] = fingerprint
+            violations.extend(found)
+
+        return {
+            "valid": not violations and chain_valid,
+            "records_verified": verified,
+            "total_records": self.count,
+            "violations": violations,
+            "chain_valid": chain_valid,
+            "segments_verified": len(self.segments) - skipped,
+            "segments_skipped": skipped,
+        }
+
+    def _verify_batch(
+        self,
+        segment: AuditSegment,
+        index: SegmentIndex,
+        batch: Dict[str, Any],
+        violations: List[Dict[str, Any]],
+    ) -> int:
+        """Recompute a batch from the log; returns how many records check out."""
+        ordinals = range(batch["first"], batch["first"] + batch["count"])
+        leaves = [leaf_hash(index.line(segment.log_path, i)) for i in ordinals]
+        signed = self._signature_ok(batch["prev"], batch["root"], batch["signature"])
+        if signed and merkle_root(leaves).hex() == batch["root"]:
+            return batch["count"]
+
+        if not signed:
+            violations.append(
+                {
+                    "segment": segment.name,
+                    "batch": batch["first"],
+                    "error": "Batch signature mismatch",
+                }
+            )
+            return 0
+
+        stored = [index.leaf(ordinal) for ordinal in ordinals]
+        if merkle_root(stored).hex() != batch["root"]:
+            # The index itself was altered: no record of the batch can be trusted
+            violations.append(
+                {
+                    "segment": segment.name,
+                    "batch": batch["first"],
+                    "error": "Batch Merkle root mismatch",
+                }
+            )
+            return 0
+
+        intact = 0
+        for ordinal, leaf, expected in zip(ordinals, leaves, stored):
+            if leaf == expected:
+                intact += 1
+            else:
+                violations.append(
+                    {"record_id": index.ids[ordinal], "error": "Record hash mismatch"}
+                )
+        return intact
+
+    def _fingerprint(self, segment: AuditSegment) -> Tuple[Any, ...]:
+        fingerprint = []
+        for path in (segment.log_path, segment.journal_path, segment.index_path):
+            try:
+                stat = os.stat(path)
+                fingerprint.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+    # Retention and lifecycle
+
+    def drop_before(self, cutoff: datetime) -> int:
+        """Delete sealed segments whose newest record is older than the cutoff."""
+        cutoff_epoch = to_epoch(cutoff)
+        kept, dropped = [], 0
+        for segment in self.segments:
+            if segment.sealed and segment.max_ts < cutoff_epoch:
+                for path in (
+                    segment.log_path,
+                    segment.journal_path,
+                    segment.index_path,
+                ):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._loaded.pop(segment.name, None)
+                self._verified.pop(segment.name, None)
+                dropped += segment.count
+            else:
+                kept.append(segment)
+        self.segments = kept
+        return dropped
+
+    def close(self, remove: Optional[bool] = None) -> None:
+        """Seal the active segment; removes the directory if the store created it."""
+        if self._active is not None:
+            self._seal(self._active)
+        if remove if remove is not None else self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.segments = []
+            self._loaded.clear()
+            self._verified.clear()
+
+    def _open_existing(self) -> None:
+        names = sorted(
+            entry[: -len(".log")]
+            for entry in os.listdir(self.directory)
+            if entry.endswith(".log")
+        )
+        for name in names:
+            seq, key = name.split("-", 1)
+            segment = AuditSegment(
+                name=name, key=int(key), path=os.path.join(self.directory, name)
+            )
+            if os.path.exists(segment.index_path):
+                with open(segment.index_path, "rb") as handle:
+                    header = json.loads(handle.readline())
+                segment.count = header["count"]
+                if segment.count:
+                    segment.min_ts, segment.max_ts = header["min_ts"], header["max_ts"]
+                segment.root = header["root"]
+                segment.last_root = header["last_root"]
+                segment.sealed = True
+                self.segments.append(segment)
+            else:
+                self.segments.append(segment)
+                self._recover(segment)
+            self._last_root = segment.last_root or self._last_root
+            self._next_seq = max(self._next_seq, int(seq) + 1)
+
+    def _recover(self, segment: AuditSegment) -> None:
+        """Rebuild the index of a segment left open by a crash, then seal it."""
+        with open(segment.log_path, "rb") as handle:
+            data = handle.read()
+        complete = data[: data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with open(segment.log_path, "r+b") as handle:
+                handle.truncate(len(complete))
+
+        batches = []
+        if os.path.exists(segment.journal_path):
+            with open(segment.journal_path, "rb") as handle:
+                batches = [
+                    entry
+                    for entry in (json.loads(line) for line in handle if line.strip())
+                    if not entry.get("sealed")
+                ]
+
+        index = SegmentIndex()
+        for line in complete.splitlines(keepends=True):
+            entry = json.loads(line)
+            index.add(entry["data"], line, entry["ts"], self.index_fields, self.id_field)
+            segment.min_ts = min(segment.min_ts, entry["ts"])
+            segment.max_ts = max(segment.max_ts, entry["ts"])
+        index.batches = batches
+        segment.index = index
+        segment.count = len(index.offsets)
+
+        self._active = segment
+        self._writer = open(segment.log_path, "ab")
+        self._pending_from = sum(batch["count"] for batch in batches)
+        if batches:
+            self._last_root = batches[-1]["root"]
+        segment.last_root = self._last_root
+        logger.warning(
+            f"Recovered audit segment {segment.name}: {segment.count} records, "
+            f"{segment.count - self._pending_from} unsigned"
+        )
+        self._seal(segment)
@@ -0,0 +1,200 @@
+"""
+Detector de comportamientos en una sola pasada.
+
+``BehaviorDetector`` recorre cada entrada de memoria conversacional una
+sola vez: ``KeywordMatcher`` decide en esa pasada a qué tipos de
+comportamiento pertenece y las estadísticas de cada tipo (histogramas de
+día y hora, contextos, emociones, importancia y timestamps ordenados) se
+acumulan sobre la marcha. Las entradas nuevas se suman con ``observe`` y
+las que salen de la ventana se restan con ``expire``, de modo que el
+análisis no necesita volver a recorrer todo el historial.
+"""
+
+import bisect
+import heapq
+import itertools
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Generic, Hashable, Iterable, List, Mapping, Optional, Tuple, TypeVar
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+L = TypeVar("L", bound=Hashable)
+
+
+class KeywordMatcher(Generic[L]):
+    """
+    Tabla compilada de keywords por etiqueta.
+
+    Las keywords se normalizan a minúsculas una vez y cada texto se pasa a
+    minúsculas una sola vez para evaluar todas las etiquetas. Cada etiqueta
+    deja de comprobar keywords en cuanto una coincide.
+    """
+
+    def __init__(self, keywords: Mapping[L, Iterable[str]]):
+        self._table: Tuple[Tuple[L, Tuple[str, ...]], ...] = tuple(
+            (label, tuple(dict.fromkeys(k.lower() for k in words if k)))
+            for label, words in keywords.items()
+        )
+
+    @property
+    def labels(self) -> Tuple[L, ...]:
+        return tuple(label for label, _ in self._table)
+
+    def match(self, text: str) -> Tuple[L, ...]:
+        """Etiquetas con al menos una keyword contenida en ``text``."""
+        text = text.lower()
+        return tuple(
+            label for label, words in self._table if any(w in text for w in words)
+        )
+
+
+@dataclass
+class _Observation:
+    entry_id: str
+    timestamp: datetime
+    labels: Tuple[Any, ...]
+    context: Any
+    emotion: Any
+    importance: float
+
+
+@dataclass
+class BehaviorStats:
+    """Estadísticas acumuladas de las entradas de un tipo de comportamiento."""
+
+    count: int = 0
+    importance_sum: float = 0.0
+    weekdays: Counter = field(default_factory=Counter)
+    hours: Counter = field(default_factory=Counter)
+    contexts: Counter = field(default_factory=Counter)
+    emotions: Counter = field(default_factory=Counter)
+    timestamps: List[datetime] = field(default_factory=list)  # ordenados
+
+    def _add(self, observation: _Observation) -> None:
+        self.count += 1
+        self.importance_sum += observation.importance
+        self.weekdays[observation.timestamp.strftime("%A").lower()] += 1
+        self.hours[observation.timestamp.hour] += 1
+        if observation.context:
+            self.contexts[observation.context] += 1
+        if observation.emotion:
+            self.emotions[observation.emotion] += 1
+        bisect.insort(self.timestamps, observation.timestamp)
+
+    def _remove(self, observation: _Observation) -> None:
+        self.count -= 1
+        self.importance_sum -= observation.importance
+        _decrement(self.weekdays, observation.timestamp.strftime("%A").lower())
+        _decrement(self.hours, observation.timestamp.hour)
+        if observation.context:
+            _decrement(self.contexts, observation.context)
+        if observation.emotion:
+            _decrement(self.emotions, observation.emotion)
+        index = bisect.bisect_left(self.timestamps, observation.timestamp)
+        del self.timestamps[index]
+
+    @property
+    def first_observed(self) -> Optional[datetime]:
+        return self.timestamps[0] if self.timestamps else None
+
+    @property
+    def last_observed(self) -> Optional[datetime]:
+        return self.timestamps[-1] if self.timestamps else None
+
+    def mean_importance(self) -> float:
+        return self.importance_sum / self.count if self.count else 0.0
+
+    def time_patterns(self) -> Dict[str, float]:
+        """Frecuencia relativa por día de la semana y por hora."""
+        if not self.count:
+            return {}
+        patterns = {
+            f"weekday_{weekday}": count / self.count
+            for weekday, count in self.weekdays.items()
+        }
+        patterns.update(
+            {f"hour_{hour}": count / self.count for hour, count in self.hours.items()}
+        )
+        return patterns
+
+    def trigger_contexts(self, top: int = 3) -> List[Any]:
+        return [context for context, _ in self.contexts.most_common(top)]
+
+    def emotional_associations(self) -> Dict[Any, float]:
+        total = sum(self.emotions.values())
+        if not total:
+            return {}
+        return {emotion: count / total for emotion, count in self.emotions.items()}
+
+    def interval_days(self) -> List[int]:
+        """Días completos entre entradas consecutivas."""
+        return [(b - a).days for a, b in zip(self.timestamps, self.timestamps[1:])]
+
+
+def _decrement(counter: Counter, key: Any) -> None:
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class BehaviorDetector(Generic[L]):
+    """Estadísticas por tipo de comportamiento de un usuario, mantenidas incrementalmente."""
+
+    def __init__(self, matcher: KeywordMatcher[L]):
+        self.matcher = matcher
+        self.total = 0
+        self.newest: Optional[datetime] = None
+        self.stats: Dict[L, BehaviorStats] = {label: BehaviorStats() for label in matcher.labels}
+        self._observations: Dict[str, _Observation] = {}
+        self._expiry: List[Tuple[datetime, int, str]] = []
+        self._sequence = itertools.count()
+
+    def observe(self, entry: Any) -> bool:
+        """
+        Sumar una entrada de memoria (MemoryEntry o equivalente).
+
+        Returns:
+            False si la entrada ya se había contado
+        """
+        if entry.id in self._observations:
+            return False
+
+        observation = _Observation(
+            entry_id=entry.id,
+            timestamp=entry.timestamp,
+            labels=self.matcher.match(entry.content or ""),
+            context=entry.context,
+            emotion=entry.emotional_state,
+            importance=entry.importance_score,
+        )
+        self._observations[entry.id] = observation
+        heapq.heappush(self._expiry, (entry.timestamp, next(self._sequence), entry.id))
+
+        self.total += 1
+        if self.newest is None or entry.timestamp > self.newest:
+            self.newest = entry.timestamp
+        for label in observation.labels:
+            self.stats[label]._add(observation)
+        return True
+
+    def observe_many(self, entries: Iterable[Any]) -> int:
+        return sum(1 for entry in entries if self.observe(entry))
+
+    def expire(self, cutoff: datetime) -> int:
+        """Restar las entradas anteriores a ``cutoff``. Devuelve cuántas salieron."""
+        removed = 0
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, _, entry_id = heapq.heappop(self._expiry)
+            observation = self._observations.pop(entry_id)
+            self.total -= 1
+            for label in observation.labels:
+                self.stats[label]._remove(observation)
+            removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return self.total
@@ -16,18 +16,21 @@ IMPACTO ESPERADO: Personalización 500% más efectiva
 
 import asyncio
 import json
-import numpy as np
+import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union, Tuple, Set
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
-from collections import defaultdict, Counter
+from collections import defaultdict, OrderedDict
 import statistics
 
 from core.logging_config import get_logger
-from core.conversation_memory import ConversationMemoryEngine, ConversationContext, EmotionalState, MemoryEntry
-from core.memory_cache_optimizer import cache_get, cache_set, CachePriority
+from core.conversation_memory import (
+    ConversationMemoryEngine, ConversationContext, EmotionalState, MemoryEntry, add_memory_listener
+)
+from core.memory_cache_optimizer import cache_get, cache_set, cache_invalidate, CachePriority
+from core.behavior_detector import BehaviorDetector, BehaviorStats, KeywordMatcher
 from clients.supabase_client import get_supabase_client
 
 logger = get_logger(__name__)
@@ -154,6 +157,12 @@ class BehaviorPatternAnalyzer:
         self.min_observations_for_pattern = 5
         self.pattern_detection_window_days = 30
         self.behavior_keywords = self._initialize_behavior_keywords()
+        self.keyword_matcher = KeywordMatcher(self.behavior_keywords)
+        
+        # Detectores incrementales por usuario (LRU)
+        self.max_tracked_users = 1000
+        self._detectors: "OrderedDict[str, BehaviorDetector]" = OrderedDict()
+        add_memory_listener(self.observe_conversation)
         
         # Cache
         self.cache_ttl = 1800  # 30 minutos
@@ -213,10 +222,10 @@ class BehaviorPatternAnalyzer:
             if cached_patterns:
                 return [BehaviorPattern(**pattern) for pattern in cached_patterns]
             
-            # Obtener datos conversacionales
-            conversation_data = await self._get_user_conversation_data(user_id)
+            # Estadísticas por tipo acumuladas en una sola pasada
+            detector = await self._get_behavior_detector(user_id)
             
-            if not conversation_data:
+            if not detector.total:
                 logger.info(f"No hay datos conversacionales para análisis: {user_id}")
                 return []
             
@@ -224,10 +233,9 @@ class BehaviorPatternAnalyzer:
             detected_patterns = []
             
             for behavior_type in BehaviorType:
-                patterns = await self._detect_behavior_patterns(
-                    user_id, behavior_type, conversation_data
-                )
-                detected_patterns.extend(patterns)
+                pattern = self._build_behavior_pattern(user_id, behavior_type, detector)
+                if pattern:
+                    detected_patterns.append(pattern)
             
             # Filtrar patrones significativos
             significant_patterns = [
@@ -250,29 +258,80 @@ class BehaviorPatternAnalyzer:
             logger.error(f"Error analizando patrones de usuario: {e}")
             return []
     
-    async def _get_user_conversation_data(self, user_id: str) -> List[MemoryEntry]:
-        """Obtiene datos conversacionales del usuario"""
+    async def _get_behavior_detector(self, user_id: str) -> BehaviorDetector:
+        """
+        Obtiene el detector del usuario.
+        
+        La primera vez carga la ventana completa; después solo pide al
+        almacenamiento las entradas desde la más reciente ya contada, para
+        recoger las conversaciones guardadas por otros procesos.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=self.pattern_detection_window_days)
+        
+        detector = self._detectors.get(user_id)
+        if detector is not None:
+            self._detectors.move_to_end(user_id)
+            # Desde el timestamp más reciente inclusive: observe descarta repetidas
+            detector.observe_many(
+                await self._get_user_conversation_data(user_id, since=detector.newest)
+            )
+            detector.expire(cutoff)
+            return detector
+        
+        detector = BehaviorDetector(self.keyword_matcher)
+        detector.observe_many(await self._get_user_conversation_data(user_id))
+        detector.expire(cutoff)
+        
+        self._detectors[user_id] = detector
+        while len(self._detectors) > self.max_tracked_users:
+            self._detectors.popitem(last=False)
+        return detector
+    
+    def observe_conversation(self, entry: MemoryEntry) -> None:
+        """Suma una conversación nueva al detector del usuario sin reanalizar el historial"""
+        detector = self._detectors.get(entry.user_id)
+        if detector is not None and detector.observe(entry):
+            cache_invalidate(f"behavior_patterns:{entry.user_id}")
+    
+    async def _get_user_conversation_data(
+        self, user_id: str, since: Optional[datetime] = None
+    ) -> List[MemoryEntry]:
+        """Obtiene datos conversacionales del usuario (desde ``since`` si se indica)"""
         try:
             # Obtener conversaciones de los últimos 30 días
             cutoff_date = datetime.utcnow() - timedelta(days=self.pattern_detection_window_days)
+            if since is not None:
+                cutoff_date = max(cutoff_date, since)
             
             # Para desarrollo, generamos datos simulados
             logger.info(f"Generando datos conversacionales simulados para análisis: {user_id}")
             
-            # Simular conversaciones variadas
+            # Simular conversaciones variadas. Cada conversación ocupa una franja
+            # fija del calendario y se genera con una semilla (usuario, franja),
+            # así que id y timestamp son estables entre llamadas y la puesta al
+            # día del detector no cuenta dos veces la misma conversación.
             simulated_conversations = []
             contexts = list(ConversationContext)
             emotions = list(EmotionalState)
-            
-            # Generar 50 conversaciones simuladas en el último mes
-            for i in range(50):
-                days_ago = np.random.randint(0, 30)
-                hours = np.random.randint(6, 23)
-                timestamp = datetime.utcnow() - timedelta(days=days_ago, hours=hours)
+            now = datetime.utcnow()
+            epoch = datetime(1970, 1, 1)
+            
+            # Unas 50 conversaciones simuladas en la ventana de análisis
+            slot_seconds = self.pattern_detection_window_days * 86400 / 50
+            first_slot = int((cutoff_date - epoch).total_seconds() // slot_seconds)
+            last_slot = int((now - epoch).total_seconds() // slot_seconds)
+            
+            for slot in range(first_slot, last_slot + 1):
+                rng = random.Random(f"{user_id}:{slot}")
+                timestamp = epoch + timedelta(
+                    seconds=slot * slot_seconds + rng.uniform(0, slot_seconds)
+                )
+                if timestamp < cutoff_date or timestamp > now:
+                    continue
                 
                 # Seleccionar contexto y emoción con cierta lógica
-                context = np.random.choice(contexts)
-                emotion = np.random.choice(emotions)
+                context = rng.choice(contexts)
+                emotion = rng.choice(emotions)
                 
                 # Generar contenido basado en contexto
                 content_templates = {
@@ -293,19 +352,19 @@ class BehaviorPatternAnalyzer:
                     ]
                 }
                 
-                content = np.random.choice(
+                content = rng.choice(
                     content_templates.get(context, ["Conversación general"])
                 )
                 
                 memory_entry = MemoryEntry(
-                    id=str(uuid.uuid4()),
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"simulated-conversation:{user_id}:{slot}")),
                     user_id=user_id,
                     agent_id="behavioral_analyzer",
                     timestamp=timestamp,
                     content=content,
                     context=context,
                     emotional_state=emotion,
-                    importance_score=np.random.uniform(0.3, 0.9),
+                    importance_score=rng.uniform(0.3, 0.9),
                     metadata={"simulated": True}
                 )
                 
@@ -324,142 +383,60 @@ class BehaviorPatternAnalyzer:
         conversations: List[MemoryEntry]
     ) -> List[BehaviorPattern]:
         """Detecta patrones específicos de un tipo de comportamiento"""
+        detector = BehaviorDetector(self.keyword_matcher)
+        detector.observe_many(conversations)
+        pattern = self._build_behavior_pattern(user_id, behavior_type, detector)
+        return [pattern] if pattern else []
+    
+    def _build_behavior_pattern(
+        self,
+        user_id: str,
+        behavior_type: BehaviorType,
+        detector: BehaviorDetector
+    ) -> Optional[BehaviorPattern]:
+        """Construye el patrón de un tipo a partir de sus estadísticas acumuladas"""
         try:
-            keywords = self.behavior_keywords.get(behavior_type, [])
-            relevant_conversations = []
-            
-            # Filtrar conversaciones relevantes
-            for conv in conversations:
-                content_lower = conv.content.lower()
-                if any(keyword in content_lower for keyword in keywords):
-                    relevant_conversations.append(conv)
+            stats: BehaviorStats = detector.stats[behavior_type]
             
-            if len(relevant_conversations) < self.min_observations_for_pattern:
-                return []
-            
-            # Analizar patrones temporales
-            time_patterns = self._analyze_temporal_patterns(relevant_conversations)
-            
-            # Analizar contextos disparadores
-            trigger_contexts = self._analyze_trigger_contexts(relevant_conversations)
-            
-            # Analizar asociaciones emocionales
-            emotional_associations = self._analyze_emotional_associations(relevant_conversations)
+            if stats.count < self.min_observations_for_pattern:
+                return None
             
             # Calcular métricas del patrón
-            frequency = self._calculate_frequency(relevant_conversations, conversations)
-            strength = self._calculate_pattern_strength(relevant_conversations)
-            stability = self._calculate_pattern_stability(relevant_conversations)
-            confidence = self._calculate_confidence_score(
-                len(relevant_conversations), strength, stability
-            )
+            frequency = self._calculate_frequency(stats.count, detector.total)
+            strength = stats.mean_importance()
+            stability = self._calculate_pattern_stability(stats.interval_days())
+            confidence = self._calculate_confidence_score(stats.count, strength, stability)
             
             # Crear patrón si es significativo
             if confidence > 0.5:
-                pattern = BehaviorPattern(
+                return BehaviorPattern(
                     pattern_id=str(uuid.uuid4()),
                     user_id=user_id,
                     behavior_type=behavior_type,
                     frequency=frequency,
-                    time_patterns=time_patterns,
-                    trigger_contexts=trigger_contexts,
-                    emotional_associations=emotional_associations,
+                    time_patterns=stats.time_patterns(),
+                    trigger_contexts=stats.trigger_contexts(),
+                    emotional_associations=stats.emotional_associations(),
                     confidence_score=confidence,
-                    first_observed=min(conv.timestamp for conv in relevant_conversations),
-                    last_observed=max(conv.timestamp for conv in relevant_conversations),
+                    first_observed=stats.first_observed,
+                    last_observed=stats.last_observed,
                     strength=strength,
                     stability=stability
                 )
-                
-                return [pattern]
             
-            return []
+            return None
             
         except Exception as e:
             logger.error(f"Error detectando patrón {behavior_type.value}: {e}")
-            return []
-    
-    def _analyze_temporal_patterns(self, conversations: List[MemoryEntry]) -> Dict[str, float]:
-        """Analiza patrones temporales en las conversaciones"""
-        try:
-            weekday_counts = defaultdict(int)
-            hour_counts = defaultdict(int)
-            
-            for conv in conversations:
-                weekday = conv.timestamp.strftime('%A').lower()
-                hour = conv.timestamp.hour
-                
-                weekday_counts[weekday] += 1
-                hour_counts[f"hour_{hour}"] += 1
-            
-            total_conversations = len(conversations)
-            
-            # Normalizar a frecuencias
-            time_patterns = {}
-            
-            # Patrones de día de semana
-            for weekday, count in weekday_counts.items():
-                time_patterns[f"weekday_{weekday}"] = count / total_conversations
-            
-            # Patrones de hora del día
-            for hour_key, count in hour_counts.items():
-                time_patterns[hour_key] = count / total_conversations
-            
-            return time_patterns
-            
-        except Exception as e:
-            logger.error(f"Error analizando patrones temporales: {e}")
-            return {}
-    
-    def _analyze_trigger_contexts(self, conversations: List[MemoryEntry]) -> List[ConversationContext]:
-        """Analiza contextos que disparan el comportamiento"""
-        try:
-            context_counts = Counter(conv.context for conv in conversations if conv.context)
-            
-            # Retornar contextos más frecuentes (top 3)
-            top_contexts = [context for context, _ in context_counts.most_common(3)]
-            return top_contexts
-            
-        except Exception as e:
-            logger.error(f"Error analizando contextos disparadores: {e}")
-            return []
-    
-    def _analyze_emotional_associations(self, conversations: List[MemoryEntry]) -> Dict[EmotionalState, float]:
-        """Analiza asociaciones emocionales del comportamiento"""
-        try:
-            emotion_counts = Counter(
-                conv.emotional_state for conv in conversations 
-                if conv.emotional_state
-            )
-            
-            total_with_emotion = sum(emotion_counts.values())
-            
-            if total_with_emotion == 0:
-                return {}
-            
-            # Normalizar a frecuencias
-            emotional_associations = {
-                emotion: count / total_with_emotion
-                for emotion, count in emotion_counts.items()
-            }
-            
-            return emotional_associations
-            
-        except Exception as e:
-            logger.error(f"Error analizando asociaciones emocionales: {e}")
-            return {}
+            return None
     
-    def _calculate_frequency(
-        self, 
-        relevant_conversations: List[MemoryEntry], 
-        all_conversations: List[MemoryEntry]
-    ) -> PatternFrequency:
+    def _calculate_frequency(self, relevant_count: int, total_count: int) -> PatternFrequency:
         """Calcula la frecuencia del patrón"""
         try:
-            if not all_conversations:
+            if not total_count:
                 return PatternFrequency.VERY_RARE
             
-            frequency_ratio = len(relevant_conversations) / len(all_conversations)
+            frequency_ratio = relevant_count / total_count
             
             if frequency_ratio < 0.05:
                 return PatternFrequency.VERY_RARE
@@ -476,39 +453,16 @@ class BehaviorPatternAnalyzer:
             logger.error(f"Error calculando frecuencia: {e}")
             return PatternFrequency.RARE
     
-    def _calculate_pattern_strength(self, conversations: List[MemoryEntry]) -> float:
-        """Calcula la fuerza del patrón basada en importancia promedio"""
-        try:
-            if not conversations:
-                return 0.0
-            
-            importance_scores = [conv.importance_score for conv in conversations]
-            return statistics.mean(importance_scores)
-            
-        except Exception as e:
-            logger.error(f"Error calculando fuerza del patrón: {e}")
-            return 0.0
-    
-    def _calculate_pattern_stability(self, conversations: List[MemoryEntry]) -> float:
-        """Calcula la estabilidad del patrón basada en consistencia temporal"""
+    def _calculate_pattern_stability(self, intervals: List[int]) -> float:
+        """Calcula la estabilidad del patrón a partir de los días entre observaciones"""
         try:
-            if len(conversations) < 3:
-                return 0.5
-            
-            # Calcular intervalos entre conversaciones
-            sorted_conversations = sorted(conversations, key=lambda x: x.timestamp)
-            intervals = []
-            
-            for i in range(1, len(sorted_conversations)):
-                interval = (sorted_conversations[i].timestamp - sorted_conversations[i-1].timestamp).days
-                intervals.append(interval)
-            
-            if not intervals:
+            # Menos de 3 observaciones (2 intervalos) no bastan para medir consistencia
+            if len(intervals) < 2:
                 return 0.5
             
             # Estabilidad basada en varianza de intervalos
             mean_interval = statistics.mean(intervals)
-            variance = statistics.variance(intervals) if len(intervals) > 1 else 0
+            variance = statistics.variance(intervals)
             
             # Normalizar estabilidad (menor varianza = mayor estabilidad)
             stability = max(0.1, 1.0 - (variance / (mean_interval**2 + 1)))
@@ -0,0 +1,509 @@
+"""
+Cache Controller - lazo cerrado de TTL adaptativo y prefetch
+===========================================================
+
+Conecta el ``CachePredictionEngine`` con los cachés reales:
+
+1. ``AccessEventFeed``: recibe los accesos de los cachés (Vertex ``CacheManager``
+   y ``AdvancedCacheManager``) mediante su ``access_observer``. El muestreo es
+   por key (hash estable), de modo que las keys muestreadas conservan su
+   historial completo y los intervalos entre accesos no se distorsionan.
+   La cola es un buffer circular acotado.
+2. ``AdaptiveTTLPolicy``: TTL recomendado por key y, por extensión, por
+   familia de keys (prefijo), consultado por los cachés vía ``ttl_advisor``.
+3. ``CacheController.run_cycle``: drena eventos, alimenta el motor, ajusta
+   TTLs y precarga las keys con acceso previsto respetando un límite de
+   concurrencia y un presupuesto de coste por ciclo. Cada caché declara los
+   prefijos de key que le pertenecen y una key precargada solo se escribe en
+   el caché propietario.
+4. ``replay_access_trace``: reproduce trazas grabadas (JSONL) para medir la
+   ganancia de hit rate frente a un TTL estático.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import zlib
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from core.cache_prediction_engine import (
+    AccessEvent,
+    AccessPrediction,
+    CachePredictionEngine,
+    key_family,
+)
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# (key, timestamp epoch, hit, origen)
+TraceEvent = Tuple[str, float, bool, Optional[str]]
+
+Loader = Callable[[str], Awaitable[Any]]
+
+_SAMPLE_SPACE = 1 << 16
+
+
+class AccessEventFeed:
+    """Cola acotada y muestreada de eventos de acceso al caché."""
+
+    def __init__(self, capacity: int = 50000, sample_rate: float = 0.25):
+        self.capacity = capacity
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self._threshold = int(self.sample_rate * _SAMPLE_SPACE)
+        self._events: Deque[TraceEvent] = deque(maxlen=capacity)
+        self.stats = {"offered": 0, "sampled": 0, "dropped": 0}
+
+    def is_sampled(self, key: str) -> bool:
+        """Muestreo estable por key (la misma key siempre entra o nunca)."""
+        if self._threshold >= _SAMPLE_SPACE:
+            return True
+        return (zlib.crc32(key.encode()) & (_SAMPLE_SPACE - 1)) < self._threshold
+
+    def record(
+        self,
+        key: str,
+        hit: bool,
+        source: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Registra un acceso si la key está muestreada (O(1), sin await)."""
+        self.stats["offered"] += 1
+        if not self.is_sampled(key):
+            return
+        if len(self._events) == self.capacity:
+            self.stats["dropped"] += 1
+        self._events.append(
+            (key, timestamp if timestamp is not None else time.time(), hit, source)
+        )
+        self.stats["sampled"] += 1
+
+    def observer(self, source: str) -> Callable[[str, bool, Optional[str]], None]:
+        """Callback para ``access_observer`` de un caché."""
+
+        def observe(key: str, hit: bool, level: Optional[str]) -> None:
+            self.record(key, hit, source)
+
+        return observe
+
+    def drain(self, max_events: Optional[int] = None) -> List[TraceEvent]:
+        """Extrae los eventos pendientes en orden de llegada."""
+        count = len(self._events) if max_events is None else min(max_events, len(self._events))
+        popleft = self._events.popleft
+        return [popleft() for _ in range(count)]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class AdaptiveTTLPolicy:
+    """
+    TTLs recomendados por key y por familia, con memoria acotada.
+
+    Las keys sin recomendación propia (p. ej. no muestreadas) heredan la
+    mediana de su familia; si tampoco hay familia, el caché usa su TTL por
+    defecto.
+    """
+
+    def __init__(self, max_keys: int = 20000, max_families: int = 1000):
+        self.max_keys = max_keys
+        self.max_families = max_families
+        self._key_ttls: "OrderedDict[str, int]" = OrderedDict()
+        self._family_ttls: Dict[str, int] = {}
+
+    def update(self, key: str, ttl: int) -> None:
+        self._key_ttls[key] = ttl
+        self._key_ttls.move_to_end(key)
+        if len(self._key_ttls) > self.max_keys:
+            self._key_ttls.popitem(last=False)
+
+    def recompute_families(self) -> None:
+        """Recalcula el TTL de cada familia como la mediana de sus keys."""
+        grouped: Dict[str, List[int]] = defaultdict(list)
+        for key, ttl in self._key_ttls.items():
+            grouped[key_family(key)].append(ttl)
+        largest = sorted(grouped.items(), key=lambda item: len(item[1]), reverse=True)
+        self._family_ttls = {
+            family: int(statistics.median(ttls))
+            for family, ttls in largest[: self.max_families]
+        }
+
+    def __call__(self, key: str) -> Optional[int]:
+        ttl = self._key_ttls.get(key)
+        if ttl is not None:
+            return ttl
+        return self._family_ttls.get(key_family(key))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "keys_with_ttl": len(self._key_ttls),
+            "family_ttls": dict(self._family_ttls),
+        }
+
+
+@dataclass
+class PrefetchLoader:
+    """Función que obtiene el valor de origen para las keys con un prefijo."""
+
+    prefix: str
+    loader: Loader
+    cost: float = 1.0
+
+
+class CacheController:
+    """
+    Controlador de lazo cerrado: accesos -> patrones -> TTL y prefetch.
+
+    Todo el estado es acotado: la cola de eventos, el historial del motor
+    (``max_tracked_keys``), la tabla de TTLs y el registro de precargas.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[CachePredictionEngine] = None,
+        feed: Optional[AccessEventFeed] = None,
+        policy: Optional[AdaptiveTTLPolicy] = None,
+        prefetch_concurrency: int = 4,
+        prefetch_cost_budget: float = 20.0,
+        prefetch_timeout: float = 10.0,
+        max_events_per_cycle: int = 50000,
+        trace_path: Optional[str] = None,
+    ):
+        self.engine = engine if engine is not None else CachePredictionEngine()
+        self.feed = feed if feed is not None else AccessEventFeed()
+        self.policy = policy if policy is not None else AdaptiveTTLPolicy()
+        self.prefetch_concurrency = prefetch_concurrency
+        self.prefetch_cost_budget = prefetch_cost_budget
+        self.prefetch_timeout = prefetch_timeout
+        self.max_events_per_cycle = max_events_per_cycle
+        self.trace_path = trace_path
+
+        self.caches: Dict[str, Any] = {}
+        # (prefijo, caché) con los prefijos más largos primero
+        self._owners: List[Tuple[str, str]] = []
+        self.loaders: List[PrefetchLoader] = []
+        # key -> epoch hasta el que la precarga sigue vigente
+        self._prefetched: "OrderedDict[str, float]" = OrderedDict()
+        self._max_prefetched = 10000
+
+        self.stats = {
+            "cycles": 0,
+            "events_processed": 0,
+            "hits": 0,
+            "misses": 0,
+            "ttl_updates": 0,
+            "prefetch_attempts": 0,
+            "prefetch_loaded": 0,
+            "prefetch_failed": 0,
+            "prefetch_skipped_budget": 0,
+            "prefetch_hits": 0,
+        }
+
+    def attach(self, name: str, cache: Any, prefixes: Iterable[str] = ("",)) -> None:
+        """
+        Conecta un caché: sus accesos alimentan el feed y consulta la política de TTL.
+
+        ``prefixes`` son los espacios de keys que pertenecen al caché; la
+        precarga de una key solo escribe en el caché con el prefijo más largo
+        que coincide.
+        """
+        cache.access_observer = self.feed.observer(name)
+        cache.ttl_advisor = self.policy
+        self.caches[name] = cache
+        self._owners = [owner for owner in self._owners if owner[1] != name]
+        self._owners.extend((prefix, name) for prefix in prefixes)
+        self._owners.sort(key=lambda owner: len(owner[0]), reverse=True)
+        logger.info(f"Cache '{name}' conectado al controlador adaptativo")
+
+    def detach(self, name: str) -> None:
+        cache = self.caches.pop(name, None)
+        self._owners = [owner for owner in self._owners if owner[1] != name]
+        if cache is not None:
+            cache.access_observer = None
+            cache.ttl_advisor = None
+
+    def owner_of(self, key: str) -> Optional[str]:
+        """Nombre del caché al que pertenece ``key`` (None si ninguno)."""
+        for prefix, name in self._owners:
+            if key.startswith(prefix):
+                return name
+        return None
+
+    def register_loader(self, prefix: str, loader: Loader, cost: float = 1.0) -> None:
+        """Registra el origen de datos para precargar las keys con ``prefix``."""
+        self.loaders.append(PrefetchLoader(prefix, loader, cost))
+        # Prefijos más largos primero para que gane la coincidencia más específica
+        self.loaders.sort(key=lambda item: len(item.prefix), reverse=True)
+
+    def _loader_for(self, key: str) -> Optional[PrefetchLoader]:
+        for entry in self.loaders:
+            if key.startswith(entry.prefix):
+                return entry
+        return None
+
+    async def run_cycle(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Ejecuta un ciclo completo del lazo de control."""
+        now = now or datetime.utcnow()
+        events = self.feed.drain(self.max_events_per_cycle)
+        touched = self._ingest(events)
+
+        ttl_updates = 0
+        for key in touched:
+            ttl = self.engine.recommend_ttl(key)
+            if ttl is not None:
+                self.policy.update(key, ttl)
+                ttl_updates += 1
+        if ttl_updates:
+            self.policy.recompute_families()
+        self.stats["ttl_updates"] += ttl_updates
+
+        if self.trace_path and events:
+            await asyncio.to_thread(self._append_trace, events)
+
+        prefetched = 0
+        if self.loaders and self.caches:
+            predictions = await self.engine.get_prefetch_predictions(now=now)
+            prefetched = await self._prefetch(predictions, now)
+
+        self.stats["cycles"] += 1
+        return {
+            "events": len(events),
+            "ttl_updates": ttl_updates,
+            "prefetched": prefetched,
+            "pending_events": len(self.feed),
+        }
+
+    def _ingest(self, events: List[TraceEvent]) -> List[str]:
+        """Alimenta el motor con los eventos y devuelve las keys tocadas."""
+        if not events:
+            return []
+        access_events = []
+        touched: Dict[str, None] = {}
+        for key, timestamp, hit, source in events:
+            if hit:
+                self.stats["hits"] += 1
+                if self._prefetched.pop(key, None) is not None:
+                    self.stats["prefetch_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+            access_events.append(
+                AccessEvent(
+                    key=key,
+                    timestamp=datetime.utcfromtimestamp(timestamp),
+                    hit=hit,
+                    layer=None,
+                    response_time_ms=0.0,
+                    user_id=None,
+                    context=source,
+                    metadata={},
+                )
+            )
+            touched[key] = None
+        self.engine.ingest_events(access_events)
+        self.stats["events_processed"] += len(events)
+        return list(touched)
+
+    async def _prefetch(self, predictions: List[AccessPrediction], now: datetime) -> int:
+        """Precarga las keys previstas bajo límite de concurrencia y presupuesto."""
+        now_epoch = now.timestamp() if now.tzinfo else _utc_epoch(now)
+        budget = self.prefetch_cost_budget
+        jobs = []
+        for prediction in predictions:
+            key = prediction.key
+            if self._prefetched.get(key, 0.0) > now_epoch:
+                continue
+            loader = self._loader_for(key)
+            owner = self.owner_of(key)
+            if loader is None or owner is None:
+                continue
+            if loader.cost > budget:
+                self.stats["prefetch_skipped_budget"] += 1
+                continue
+            budget -= loader.cost
+            lead = (prediction.predicted_access_time - now).total_seconds()
+            ttl = max(self.policy(key) or prediction.recommended_ttl, int(lead) + 60)
+            jobs.append((key, loader, self.caches[owner], ttl))
+
+        if not jobs:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.prefetch_concurrency)
+
+        async def run(key: str, loader: PrefetchLoader, cache: Any, ttl: int) -> bool:
+            async with semaphore:
+                self.stats["prefetch_attempts"] += 1
+                try:
+                    value = await asyncio.wait_for(loader.loader(key), self.prefetch_timeout)
+                    if value is None:
+                        return False
+                    await cache.set(key, value, ttl=ttl)
+                except Exception as e:
+                    self.stats["prefetch_failed"] += 1
+                    logger.debug(f"Error precargando {key}: {e}")
+                    return False
+                self._mark_prefetched(key, now_epoch + ttl)
+                return True
+
+        results = await asyncio.gather(*(run(*job) for job in jobs))
+        loaded = sum(results)
+        self.stats["prefetch_loaded"] += loaded
+        return loaded
+
+    def _mark_prefetched(self, key: str, until: float) -> None:
+        self._prefetched[key] = until
+        self._prefetched.move_to_end(key)
+        if len(self._prefetched) > self._max_prefetched:
+            self._prefetched.popitem(last=False)
+
+    def _append_trace(self, events: List[TraceEvent]) -> None:
+        with open(self.trace_path, "a", encoding="utf-8") as trace_file:
+            for key, timestamp, hit, source in events:
+                trace_file.write(
+                    json.dumps({"key": key, "ts": timestamp, "hit": hit, "source": source})
+                    + "\n"
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "sampled_hit_ratio": self.stats["hits"] / total if total else 0.0,
+            "feed": {**self.feed.stats, "pending": len(self.feed)},
+            "ttl_policy": self.policy.snapshot(),
+            "attached_caches": list(self.caches),
+        }
+
+
+def _utc_epoch(moment: datetime) -> float:
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+
+def load_trace(path: str) -> List[TraceEvent]:
+    """Carga una traza JSONL grabada por ``CacheController(trace_path=...)``."""
+    events = []
+    with open(path, encoding="utf-8") as trace_file:
+        for line in trace_file:
+            if line.strip():
+                record = json.loads(line)
+                events.append(
+                    (record["key"], float(record["ts"]), bool(record.get("hit")), record.get("source"))
+                )
+    return events
+
+
+class _ReplayCache:
+    """Caché TTL con reloj virtual para la reproducción de trazas."""
+
+    def __init__(self, default_ttl: int):
+        self.default_ttl = default_ttl
+        self.clock = 0.0
+        self.expiry: Dict[str, float] = {}
+        self.ttl_advisor: Optional[Callable[[str], Optional[int]]] = None
+        self.access_observer = None
+        self.ttl_seconds_set = 0.0
+        self.sets = 0
+
+    def access(self, key: str) -> bool:
+        hit = self.expiry.get(key, float("-inf")) >= self.clock
+        if self.access_observer is not None:
+            self.access_observer(key, hit, None)
+        if not hit:
+            ttl = self.ttl_advisor(key) if self.ttl_advisor else None
+            self._store(key, ttl or self.default_ttl)
+        return hit
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        self._store(key, ttl or self.default_ttl)
+        return True
+
+    def _store(self, key: str, ttl: int) -> None:
+        self.expiry[key] = self.clock + ttl
+        self.ttl_seconds_set += ttl
+        self.sets += 1
+
+
+async def replay_access_trace(
+    trace: Iterable[TraceEvent],
+    static_ttl: int = 3600,
+    cycle_seconds: float = 300.0,
+    sample_rate: float = 1.0,
+    prefetch: bool = True,
+    engine: Optional[CachePredictionEngine] = None,
+) -> Dict[str, Any]:
+    """
+    Compara el hit rate de un TTL estático con el del lazo adaptativo.
+
+    Ambos escenarios reproducen la misma traza con un caché TTL simulado; el
+    adaptativo ejecuta ``run_cycle`` cada ``cycle_seconds`` de tiempo de traza,
+    por lo que solo usa información pasada (sin mirar al futuro).
+    """
+    events = sorted(trace, key=lambda event: event[1])
+    if not events:
+        return {"events": 0}
+
+    static_cache = _ReplayCache(static_ttl)
+    static_hits = 0
+    for key, timestamp, _, _ in events:
+        static_cache.clock = timestamp
+        static_hits += static_cache.access(key)
+
+    adaptive_cache = _ReplayCache(static_ttl)
+    controller = CacheController(
+        engine=engine or CachePredictionEngine(),
+        feed=AccessEventFeed(capacity=len(events) + 1, sample_rate=sample_rate),
+    )
+    controller.attach("replay", adaptive_cache)
+    adaptive_cache.access_observer = None  # los eventos se inyectan con su timestamp
+    if prefetch:
+        async def load(key: str) -> bool:
+            return True
+
+        controller.register_loader("", load)
+
+    adaptive_hits = 0
+    next_cycle = events[0][1] + cycle_seconds
+    for key, timestamp, _, _ in events:
+        while timestamp >= next_cycle:
+            adaptive_cache.clock = next_cycle
+            await controller.run_cycle(now=datetime.utcfromtimestamp(next_cycle))
+            next_cycle += cycle_seconds
+        adaptive_cache.clock = timestamp
+        hit = adaptive_cache.access(key)
+        adaptive_hits += hit
+        controller.feed.record(key, hit, "replay", timestamp=timestamp)
+
+    total = len(events)
+    return {
+        "events": total,
+        "distinct_keys": len(static_cache.expiry),
+        "static": {
+            "ttl_seconds": static_ttl,
+            "hit_rate": static_hits / total,
+            "mean_ttl_seconds": static_cache.ttl_seconds_set / max(static_cache.sets, 1),
+        },
+        "adaptive": {
+            "hit_rate": adaptive_hits / total,
+            "mean_ttl_seconds": adaptive_cache.ttl_seconds_set / max(adaptive_cache.sets, 1),
+            "prefetch_loaded": controller.stats["prefetch_loaded"],
+            "prefetch_hits": controller.stats["prefetch_hits"],
+            "keys_with_ttl": controller.policy.snapshot()["keys_with_ttl"],
+        },
+        "hit_rate_gain": (adaptive_hits - static_hits) / total,
+    }
+
+
+_cache_controller: Optional[CacheController] = None
+
+
+def get_cache_controller() -> CacheController:
+    """Controlador global, asociado al motor de predicción global."""
+    global _cache_controller
+    if _cache_controller is None:
+        from core.cache_prediction_engine import cache_prediction_engine
+
+        _cache_controller = CacheController(engine=cache_prediction_engine)
+    return _cache_controller
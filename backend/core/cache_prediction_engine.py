@@ -24,6 +24,7 @@ from typing import Dict, List, Optional, Any, Union, Tuple, Set
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
+import random
 import statistics
 from collections import defaultdict, deque
 import math
@@ -32,6 +33,13 @@ from core.logging_config import get_logger
 from core.advanced_cache_manager import AdvancedCacheManager, CacheLayer, CachePriority
 from core.behavioral_pattern_analyzer import BehaviorPatternAnalyzer
 from core.memory_cache_optimizer import cache_get, cache_set
+from core.streaming_sketches import (
+    CountMinSketch,
+    HyperLogLog,
+    Reservoir,
+    SpaceSaving,
+    stable_hash64,
+)
 
 logger = get_logger(__name__)
 
@@ -47,6 +55,14 @@ class AccessPattern(Enum):
     HOTSPOT = "hotspot"            # Hotspot específico
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(moment: datetime) -> float:
+    """Epoch de un datetime UTC naive"""
+    return (moment - _EPOCH).total_seconds()
+
+
 class PrefetchStrategy(Enum):
     """Estrategias de prefetching"""
     AGGRESSIVE = "aggressive"       # Prefetch agresivo
@@ -118,46 +134,193 @@ class CacheOptimizationRecommendation:
         return data
 
 
+def key_family(key: str) -> str:
+    """
+    Familia de una key: todo salvo el último segmento ``:``.
+    
+    ``user_profile:123`` -> ``user_profile``. Sin separador se eliminan los
+    dígitos (``user_data_42`` -> ``user_data_``).
+    """
+    if ":" in key:
+        return key.rsplit(":", 1)[0]
+    return "".join(c for c in key if not c.isdigit())
+
+
+class _KeyStats:
+    """Estado de tamaño fijo de una key seguida como heavy hitter"""
+    
+    __slots__ = ("last_seen", "recent", "intervals")
+    
+    def __init__(self, reservoir_size: int, recent_size: int, rng: random.Random):
+        self.last_seen: Optional[float] = None
+        self.recent: deque = deque(maxlen=recent_size)
+        self.intervals = Reservoir(reservoir_size, rng)
+
+
 class AccessPatternAnalyzer:
-    """Analizador de patrones de acceso al caché"""
+    """
+    Analizador de patrones de acceso al caché con memoria constante.
     
-    def __init__(self, window_size: int = 1000):
+    - Heavy hitters con SpaceSaving (``max_tracked_keys`` contadores); solo
+      estas keys guardan estado propio: reservorio de intervalos entre
+      accesos y últimos timestamps.
+    - Frecuencia de cualquier key con Count-Min Sketch.
+    - Keys distintas con HyperLogLog.
+    - Intervalos de reutilización de keys no seguidas mediante una tabla
+      hash de "último acceso" de tamaño fijo, agregados por familia.
+    
+    Cada ``decay_every`` eventos se dividen los contadores a la mitad para
+    que los hotspots reflejen la actividad reciente.
+    """
+    
+    def __init__(
+        self,
+        window_size: int = 1000,
+        max_tracked_keys: int = 1024,
+        sketch_width: int = 4096,
+        sketch_depth: int = 4,
+        hll_precision: int = 12,
+        reservoir_size: int = 32,
+        recent_timestamps: int = 20,
+        last_seen_slots: int = 1 << 15,
+        max_families: int = 256,
+        decay_every: Optional[int] = None
+    ):
         self.window_size = window_size
-        self.access_history: deque = deque(maxlen=window_size)
-        self.key_access_patterns: Dict[str, List[AccessEvent]] = defaultdict(list)
-        self.temporal_patterns: Dict[str, List[datetime]] = defaultdict(list)
+        self.max_tracked_keys = max_tracked_keys
+        self.reservoir_size = reservoir_size
+        self.recent_timestamps = recent_timestamps
+        self.max_families = max_families
+        self.decay_every = decay_every or window_size * 10
+        
+        self.heavy_hitters = SpaceSaving(max_tracked_keys)
+        self.frequency = CountMinSketch(sketch_width, sketch_depth)
+        self.distinct_keys = HyperLogLog(hll_precision)
+        self.key_stats: Dict[str, _KeyStats] = {}
+        self.family_intervals: Dict[str, Reservoir] = {}
+        
+        # Tabla de último acceso: slot -> (huella, timestamp)
+        self._last_seen_slots = last_seen_slots
+        self._last_seen_fingerprint = [0] * last_seen_slots
+        self._last_seen_time = [0.0] * last_seen_slots
+        
+        # Últimas keys vistas (detección de patrones secuenciales)
+        self.access_history: deque = deque(maxlen=20)
+        self.total_events = 0
+        self._rng = random.Random(0)
         
     def record_access(self, event: AccessEvent):
-        """Registra evento de acceso"""
+        """Registra evento de acceso en O(1) y memoria constante"""
         try:
-            self.access_history.append(event)
-            
-            # Mantener historial por key (últimos 50 accesos)
-            if len(self.key_access_patterns[event.key]) >= 50:
-                self.key_access_patterns[event.key].pop(0)
-            self.key_access_patterns[event.key].append(event)
-            
-            # Patrones temporales
-            if len(self.temporal_patterns[event.key]) >= 100:
-                self.temporal_patterns[event.key].pop(0)
-            self.temporal_patterns[event.key].append(event.timestamp)
+            key = event.key
+            now = _epoch_seconds(event.timestamp)
+            hashed = stable_hash64(key)
+            
+            self.access_history.append(key)
+            self.total_events += 1
+            self.frequency.add(hashed)
+            self.distinct_keys.add(hashed)
+            self._record_reuse_interval(key, hashed, now)
+            
+            evicted = self.heavy_hitters.increment(key)
+            if evicted is not None:
+                self.key_stats.pop(evicted, None)
+            stats = self.key_stats.get(key)
+            if stats is None:
+                stats = _KeyStats(self.reservoir_size, self.recent_timestamps, self._rng)
+                self.key_stats[key] = stats
+            if stats.last_seen is not None:
+                stats.intervals.add(now - stats.last_seen)
+            stats.last_seen = now
+            stats.recent.append(now)
+            
+            if self.total_events % self.decay_every == 0:
+                self._decay()
             
         except Exception as e:
             logger.error(f"Error registrando acceso: {e}")
     
+    def _record_reuse_interval(self, key: str, hashed: int, now: float) -> None:
+        """Intervalo desde el acceso anterior de la key, agregado por familia"""
+        slot = hashed % self._last_seen_slots
+        fingerprint = (hashed >> 32) & 0xFFFFFFFF
+        if self._last_seen_fingerprint[slot] == fingerprint and self._last_seen_time[slot] > 0:
+            family = key_family(key)
+            reservoir = self.family_intervals.get(family)
+            if reservoir is None and len(self.family_intervals) < self.max_families:
+                reservoir = Reservoir(self.reservoir_size * 4, self._rng)
+                self.family_intervals[family] = reservoir
+            if reservoir is not None:
+                reservoir.add(now - self._last_seen_time[slot])
+        self._last_seen_fingerprint[slot] = fingerprint
+        self._last_seen_time[slot] = now
+    
+    def _decay(self) -> None:
+        """Envejece los contadores para priorizar la actividad reciente"""
+        for key in self.heavy_hitters.decay():
+            self.key_stats.pop(key, None)
+        self.frequency.decay()
+    
+    def tracked_keys(self) -> List[str]:
+        """Keys con estado propio (heavy hitters actuales)"""
+        return list(self.heavy_hitters.keys())
+    
+    def get_access_count(self, key: str) -> int:
+        """Accesos estimados de una key (cota superior)"""
+        estimate = self.frequency.estimate(stable_hash64(key))
+        if key in self.heavy_hitters:
+            return min(estimate, self.heavy_hitters.count(key))
+        return estimate
+    
+    def get_distinct_key_count(self) -> int:
+        """Número estimado de keys distintas vistas"""
+        return self.distinct_keys.count()
+    
+    def get_last_access(self, key: str) -> Optional[datetime]:
+        """Último acceso registrado para una key seguida"""
+        stats = self.key_stats.get(key)
+        if stats is None or stats.last_seen is None:
+            return None
+        return datetime.utcfromtimestamp(stats.last_seen)
+    
+    def get_recent_timestamps(self, key: str) -> List[datetime]:
+        """Últimos timestamps de una key seguida, en orden"""
+        stats = self.key_stats.get(key)
+        if stats is None:
+            return []
+        return [datetime.utcfromtimestamp(ts) for ts in stats.recent]
+    
+    def get_intervals(self, key: str) -> List[float]:
+        """Muestra (reservorio) de intervalos entre accesos de una key seguida"""
+        stats = self.key_stats.get(key)
+        return list(stats.intervals.samples) if stats else []
+    
+    def get_family_intervals(self, key: str) -> List[float]:
+        """Muestra de intervalos de reutilización de la familia de la key"""
+        reservoir = self.family_intervals.get(key_family(key))
+        return list(reservoir.samples) if reservoir else []
+    
+    def memory_footprint_bytes(self) -> int:
+        """Cota del tamaño de las estructuras (no depende del tráfico)"""
+        per_key = 8 * (self.reservoir_size + self.recent_timestamps) + 200
+        return (
+            self.frequency.nbytes
+            + self.distinct_keys.nbytes
+            + 16 * self._last_seen_slots
+            + self.max_tracked_keys * per_key
+            + self.max_families * 8 * self.reservoir_size * 4
+        )
+    
     def analyze_key_pattern(self, key: str) -> AccessPattern:
         """Analiza el patrón de acceso de una key específica"""
         try:
-            if key not in self.temporal_patterns or len(self.temporal_patterns[key]) < 5:
+            if self.get_access_count(key) < 5:
                 return AccessPattern.RANDOM
             
-            timestamps = self.temporal_patterns[key]
-            intervals = []
+            timestamps = self.get_recent_timestamps(key)
             
             # Calcular intervalos entre accesos
-            for i in range(1, len(timestamps)):
-                interval = (timestamps[i] - timestamps[i-1]).total_seconds()
-                intervals.append(interval)
+            intervals = self.get_intervals(key)
             
             if not intervals:
                 return AccessPattern.RANDOM
@@ -209,7 +372,7 @@ class AccessPatternAnalyzer:
         try:
             # Buscar patrones secuenciales en el nombre de la key
             # Ej: "user_data_1", "user_data_2", etc.
-            recent_keys = [event.key for event in list(self.access_history)[-20:]]
+            recent_keys = list(self.access_history)
             
             # Contar keys similares con números secuenciales
             base_key = ''.join([c for c in key if not c.isdigit()])
@@ -253,18 +416,9 @@ class AccessPatternAnalyzer:
             return False
     
     def get_hotspot_keys(self, top_n: int = 10) -> List[Tuple[str, int]]:
-        """Identifica las keys más accedidas (hotspots)"""
+        """Identifica las keys más accedidas (hotspots) en O(top_n)"""
         try:
-            key_counts = defaultdict(int)
-            
-            # Contar accesos en el historial reciente
-            for event in self.access_history:
-                key_counts[event.key] += 1
-            
-            # Ordenar por frecuencia
-            sorted_keys = sorted(key_counts.items(), key=lambda x: x[1], reverse=True)
-            
-            return sorted_keys[:top_n]
+            return self.heavy_hitters.top(top_n)
             
         except Exception as e:
             logger.error(f"Error identificando hotspots: {e}")
@@ -286,6 +440,12 @@ class CachePredictionEngine:
         self.min_access_frequency = 3
         self.prefetch_confidence_threshold = 0.7
         
+        # Límites para TTL adaptativo (segundos)
+        self.min_ttl_seconds = 60
+        self.max_ttl_seconds = 86400
+        self.ttl_interval_percentile = 90
+        self.ttl_headroom = 1.2
+        
         # Estado interno
         self.user_cache_patterns: Dict[str, Dict[str, Any]] = {}
         self.global_cache_metrics: Dict[str, Any] = {}
@@ -329,10 +489,35 @@ class CachePredictionEngine:
         except Exception as e:
             logger.error(f"Error registrando acceso al caché: {e}")
     
+    def ingest_events(self, events: List[AccessEvent]) -> None:
+        """Registra un lote de eventos sin el coste por evento de la vía async"""
+        record = self.pattern_analyzer.record_access
+        for event in events:
+            record(event)
+    
+    def recommend_ttl(self, key: str) -> Optional[int]:
+        """
+        TTL que cubre el intervalo típico entre accesos de una key.
+        
+        Usa el percentil ``ttl_interval_percentile`` de los intervalos con un
+        margen, de modo que el siguiente acceso encuentre la entrada viva.
+        Retorna None si no hay historial suficiente.
+        """
+        intervals = self.pattern_analyzer.get_intervals(key)
+        if len(intervals) < 4:
+            # Keys no seguidas: intervalo típico de su familia
+            intervals = self.pattern_analyzer.get_family_intervals(key)
+        if len(intervals) < 4:
+            return None
+        reuse_interval = float(np.percentile(intervals, self.ttl_interval_percentile))
+        ttl = int(math.ceil(reuse_interval * self.ttl_headroom))
+        return max(self.min_ttl_seconds, min(self.max_ttl_seconds, ttl))
+    
     async def predict_access_patterns(
         self,
         user_id: Optional[str] = None,
-        time_horizon_hours: int = 24
+        time_horizon_hours: int = 24,
+        now: Optional[datetime] = None
     ) -> List[AccessPrediction]:
         """Predice patrones de acceso futuro"""
         try:
@@ -350,7 +535,7 @@ class CachePredictionEngine:
                 
                 # Predecir próximo acceso
                 prediction = await self._predict_key_access(
-                    key, pattern, user_id, time_horizon_hours
+                    key, pattern, user_id, time_horizon_hours, now
                 )
                 
                 if prediction and prediction.confidence > 0.5:
@@ -374,29 +559,23 @@ class CachePredictionEngine:
         key: str,
         pattern: AccessPattern,
         user_id: Optional[str],
-        time_horizon_hours: int
+        time_horizon_hours: int,
+        now: Optional[datetime] = None
     ) -> Optional[AccessPrediction]:
         """Predice acceso futuro para una key específica"""
         try:
             # Obtener historial de la key
-            if key not in self.pattern_analyzer.temporal_patterns:
-                return None
-            
-            timestamps = self.pattern_analyzer.temporal_patterns[key]
-            
-            if len(timestamps) < 3:
+            access_count = self.pattern_analyzer.get_access_count(key)
+            if access_count < 3:
                 return None
             
             # Calcular intervalos promedio
-            intervals = []
-            for i in range(1, len(timestamps)):
-                interval = (timestamps[i] - timestamps[i-1]).total_seconds()
-                intervals.append(interval)
-            
+            intervals = self.pattern_analyzer.get_intervals(key)
             avg_interval = statistics.mean(intervals)
             
             # Predecir próximo acceso basado en patrón
-            last_access = timestamps[-1]
+            last_access = self.pattern_analyzer.get_last_access(key)
+            now = now or datetime.utcnow()
             
             if pattern == AccessPattern.PERIODIC:
                 predicted_time = last_access + timedelta(seconds=avg_interval)
@@ -423,7 +602,7 @@ class CachePredictionEngine:
                 access_probability = 0.6
             
             # Ajustar si está fuera del horizonte de tiempo
-            max_prediction_time = datetime.utcnow() + timedelta(hours=time_horizon_hours)
+            max_prediction_time = now + timedelta(hours=time_horizon_hours)
             if predicted_time > max_prediction_time:
                 return None
             
@@ -442,7 +621,7 @@ class CachePredictionEngine:
             factors = [
                 f"Pattern: {pattern.value}",
                 f"Avg interval: {avg_interval:.1f}s",
-                f"Recent accesses: {len(timestamps)}"
+                f"Recent accesses: {access_count}"
             ]
             
             if user_id:
@@ -457,7 +636,7 @@ class CachePredictionEngine:
                 recommended_ttl=recommended_ttl,
                 pattern_type=pattern,
                 factors=factors,
-                generated_at=datetime.utcnow()
+                generated_at=now
             )
             
         except Exception as e:
@@ -466,29 +645,42 @@ class CachePredictionEngine:
     
     async def generate_prefetch_recommendations(
         self,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+        limit: int = 10
     ) -> List[str]:
         """Genera recomendaciones de prefetching"""
+        predictions = await self.get_prefetch_predictions(user_id, now)
+        prefetch_keys = [prediction.key for prediction in predictions[:limit]]
+        logger.info(f"Recomendadas {len(prefetch_keys)} keys para prefetch")
+        return prefetch_keys
+    
+    async def get_prefetch_predictions(
+        self,
+        user_id: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[AccessPrediction]:
+        """Predicciones con confianza suficiente y acceso previsto en 1-30 minutos"""
         try:
+            now = now or datetime.utcnow()
             # Obtener predicciones de acceso
-            predictions = await self.predict_access_patterns(user_id, 2)  # 2 horas
+            predictions = await self.predict_access_patterns(user_id, 2, now)  # 2 horas
             
-            prefetch_keys = []
+            prefetch_predictions = []
             
             for prediction in predictions:
                 # Solo prefetch si la confianza es alta
                 if prediction.confidence >= self.prefetch_confidence_threshold:
                     # Y el acceso se predice pronto
                     time_until_access = (
-                        prediction.predicted_access_time - datetime.utcnow()
+                        prediction.predicted_access_time - now
                     ).total_seconds()
                     
                     # Prefetch si el acceso es en los próximos 30 minutos
                     if 60 <= time_until_access <= 1800:  # Entre 1 min y 30 min
-                        prefetch_keys.append(prediction.key)
+                        prefetch_predictions.append(prediction)
             
-            logger.info(f"Recomendadas {len(prefetch_keys)} keys para prefetch")
-            return prefetch_keys[:10]  # Máximo 10 prefetch por vez
+            return prefetch_predictions
             
         except Exception as e:
             logger.error(f"Error generando recomendaciones de prefetch: {e}")
@@ -503,24 +695,14 @@ class CachePredictionEngine:
             recommendations = []
             
             # Analizar todas las keys con patrones conocidos
-            for key in self.pattern_analyzer.key_access_patterns.keys():
+            for key in self.pattern_analyzer.tracked_keys():
                 pattern = self.pattern_analyzer.analyze_key_pattern(key)
                 
                 # Calcular TTL óptimo basado en patrón
-                if key in self.pattern_analyzer.temporal_patterns:
-                    timestamps = self.pattern_analyzer.temporal_patterns[key]
-                    
-                    if len(timestamps) >= 5:
-                        # Calcular intervalo promedio entre accesos
-                        intervals = []
-                        for i in range(1, len(timestamps)):
-                            interval = (timestamps[i] - timestamps[i-1]).total_seconds()
-                            intervals.append(interval)
-                        
-                        avg_interval = statistics.mean(intervals)
-                        
-                        # TTL óptimo = 80% del intervalo promedio
-                        optimal_ttl = int(avg_interval * 0.8)
+                if self.pattern_analyzer.get_access_count(key) >= 5:
+                    optimal_ttl = self.recommend_ttl(key)
+                    if optimal_ttl is not None:
+                        avg_interval = statistics.mean(self.pattern_analyzer.get_intervals(key))
                         
                         # Crear recomendación
                         recommendation = CacheOptimizationRecommendation(
@@ -567,7 +749,7 @@ class CachePredictionEngine:
             
             # Analizar distribución de patrones
             pattern_distribution = defaultdict(int)
-            for key in self.pattern_analyzer.key_access_patterns.keys():
+            for key in self.pattern_analyzer.tracked_keys():
                 pattern = self.pattern_analyzer.analyze_key_pattern(key)
                 pattern_distribution[pattern.value] += 1
             
@@ -605,7 +787,8 @@ class CachePredictionEngine:
                 "hotspot_count": len(hotspots),
                 "pattern_distribution": dict(pattern_distribution),
                 "improvement_opportunities": improvement_opportunities,
-                "total_keys_analyzed": len(self.pattern_analyzer.key_access_patterns),
+                "total_keys_analyzed": len(self.pattern_analyzer.tracked_keys()),
+                "distinct_keys_estimate": self.pattern_analyzer.get_distinct_key_count(),
                 "analysis_timestamp": datetime.utcnow().isoformat()
             }
             
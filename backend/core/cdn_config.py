@@ -49,6 +49,11 @@ class CDNConfig:
                 "public": False,
                 "vary": ["Authorization"],
             },
+            "rendered_charts": {
+                "max_age": 31536000,  # 1 year, paths are content-addressed
+                "public": True,
+                "immutable": True,
+            },
             "realtime": {
                 "max_age": 0,
                 "no_cache": True,
@@ -125,7 +130,9 @@ class CDNConfig:
         headers = {}
 
         # Determine cache category
-        if content_type.startswith("image/"):
+        if path.startswith("/charts/"):
+            cache_config = self.cache_settings["rendered_charts"]
+        elif content_type.startswith("image/"):
             cache_config = self.cache_settings["images"]
         elif path.startswith("/api/"):
             if "/stream/" in path or "/ws/" in path:
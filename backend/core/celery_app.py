@@ -208,6 +208,15 @@ app.conf.beat_schedule = {
             "priority": 5,
         },
     },
+    # Nightly vectorized adherence scoring for all users
+    "adherence-population-scoring": {
+        "task": "tasks.analytics.score_adherence_population",
+        "schedule": 86400.0,  # Every 24 hours
+        "options": {
+            "queue": "analytics",
+            "priority": 2,
+        },
+    },
 }
 
 # Auto-discover tasks
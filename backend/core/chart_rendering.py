@@ -0,0 +1,433 @@
+"""
+Out-of-process chart rendering service.
+
+Chart generation in core.visualization is CPU-bound matplotlib/PIL work
+that blocks the event loop when run inside a request coroutine.
+ChartRenderService runs it in a warm process pool (matplotlib backend,
+style and font cache loaded once per worker), coalesces identical
+concurrent requests by spec hash and keeps rendered output in a
+content-addressed cache: in memory first and, optionally, in GCS behind
+the CDN (core.cdn_config).
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from core.lazy_init import LazyInstance
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when chart code changes so cached output from older renderers is not reused
+RENDERER_VERSION = "1"
+
+# kind -> (generator class in core.visualization, or None for a module function,
+#          callable name, content type)
+RENDERERS: Dict[str, Tuple[Optional[str], str, str]] = {
+    "weight_progress": ("ProgressChartGenerator", "generate_weight_progress_chart", "image/png"),
+    "body_composition": ("ProgressChartGenerator", "generate_body_composition_chart", "image/png"),
+    "performance_metrics": (
+        "ProgressChartGenerator",
+        "generate_performance_metrics_chart",
+        "image/png",
+    ),
+    "comparison": ("ProgressChartGenerator", "generate_comparison_chart", "image/png"),
+    "nutrition_breakdown": (
+        "NutritionInfographicGenerator",
+        "generate_daily_nutrition_breakdown",
+        "image/png",
+    ),
+    "meal_plan": ("NutritionInfographicGenerator", "generate_meal_plan_infographic", "image/png"),
+    "progress_report": ("PDFReportGenerator", "generate_progress_report", "application/pdf"),
+    "progress_collage": (None, "create_progress_collage", "image/png"),
+}
+
+_EXTENSIONS = {"image/png": ".png", "application/pdf": ".pdf"}
+
+# Per-process state of a render worker
+_worker_generators: Dict[str, Any] = {}
+
+
+def _init_worker() -> None:
+    """Load matplotlib, the chart style and the font cache once per worker."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
+    import core.visualization as visualization  # applies the seaborn style
+
+    for class_name in {entry[0] for entry in RENDERERS.values() if entry[0]}:
+        _worker_generators[class_name] = getattr(visualization, class_name)()
+
+    # Best effort: an exception in the initializer would break the whole pool
+    try:
+        font_manager.findfont(font_manager.FontProperties(family=["sans-serif"]))
+        # A throwaway figure primes text layout and the PNG writer
+        fig = plt.figure(figsize=(1, 1))
+        fig.text(0.5, 0.5, "warm-up")
+        fig.savefig(io.BytesIO(), format="png")
+        plt.close(fig)
+    except Exception as e:
+        logger.warning(f"Chart worker warm-up incomplete: {e}")
+
+
+def _warm() -> int:
+    return os.getpid()
+
+
+def _render(kind: str, args: tuple, kwargs: dict) -> bytes:
+    """Entry point executed inside a worker."""
+    if not _worker_generators:
+        _init_worker()
+    class_name, name, _ = RENDERERS[kind]
+    if class_name:
+        func = getattr(_worker_generators[class_name], name)
+    else:
+        import core.visualization as visualization
+
+        func = getattr(visualization, name)
+    # The generators are coroutines without real awaits
+    return asyncio.run(func(*args, **kwargs))
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return {"__sha256__": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, float) and value != value:
+        return "NaN"
+    return value
+
+
+def spec_hash(kind: str, args: tuple = (), kwargs: Optional[dict] = None) -> str:
+    """Stable hash of a render request (renderer version, kind and inputs)."""
+    payload = json.dumps(
+        [RENDERER_VERSION, kind, _canonical(list(args)), _canonical(kwargs or {})],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class RenderedChart:
+    """Rendered output plus its cache identity."""
+
+    spec_hash: str
+    content_hash: str
+    content_type: str
+    content: bytes
+    source: str  # memory, store or render
+    url: Optional[str] = None
+
+
+class _ContentCache:
+    """
+    Content-addressed in-memory cache bounded by total bytes.
+
+    Blobs are stored once per content hash; each spec hash points to a
+    blob, so different requests producing identical output share memory.
+    """
+
+    def __init__(self, max_bytes: int, max_specs: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_specs = max_specs
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._specs: "OrderedDict[str, Tuple[str, str, Optional[str]]]" = OrderedDict()
+        self.size = 0
+
+    def get(self, key: str) -> Optional[RenderedChart]:
+        entry = self._specs.get(key)
+        if entry is None:
+            return None
+        content_hash, content_type, url = entry
+        content = self._blobs.get(content_hash)
+        if content is None:
+            del self._specs[key]
+            return None
+        self._specs.move_to_end(key)
+        self._blobs.move_to_end(content_hash)
+        return RenderedChart(key, content_hash, content_type, content, "memory", url)
+
+    def put(self, chart: RenderedChart) -> None:
+        if len(chart.content) > self.max_bytes:
+            return
+        if chart.content_hash not in self._blobs:
+            self._blobs[chart.content_hash] = chart.content
+            self.size += len(chart.content)
+        self._specs[chart.spec_hash] = (chart.content_hash, chart.content_type, chart.url)
+        while self.size > self.max_bytes:
+            _, evicted = self._blobs.popitem(last=False)
+            self.size -= len(evicted)
+        while len(self._specs) > self.max_specs:
+            self._specs.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+
+class GCSChartStore:
+    """
+    Second cache tier: rendered charts in GCS, served through the CDN.
+
+    Objects are named by spec hash, which already includes the renderer
+    version, so their content never changes and the CDN can cache them
+    as immutable.
+    """
+
+    def __init__(self, gcs_client: Any = None, prefix: str = "charts", cdn: Any = None):
+        self._gcs = gcs_client
+        self.prefix = prefix.strip("/")
+        self._cdn = cdn
+
+    @property
+    def gcs(self) -> Any:
+        if self._gcs is None:
+            from clients.gcs_client import GCSClient
+
+            self._gcs = GCSClient()
+        return self._gcs
+
+    @property
+    def cdn(self) -> Any:
+        if self._cdn is None:
+            from core.cdn_config import cdn_config
+
+            self._cdn = cdn_config
+        return self._cdn
+
+    def blob_name(self, key: str, content_type: str) -> str:
+        return f"{self.prefix}/{key}{_EXTENSIONS.get(content_type, '')}"
+
+    def url(self, key: str, content_type: str) -> str:
+        return self.cdn.get_cdn_url(f"/{self.blob_name(key, content_type)}")
+
+    async def get(self, key: str, content_type: str) -> Optional[bytes]:
+        name = self.blob_name(key, content_type)
+        # list_files is a cheap existence probe; download_file retries on missing blobs
+        if not any(f["name"] == name for f in await self.gcs.list_files(prefix=name)):
+            return None
+        return await self.gcs.download_file(name)
+
+    async def put(self, key: str, content_type: str, content: bytes) -> str:
+        await self.gcs.upload_file(
+            content,
+            self.blob_name(key, content_type),
+            content_type=content_type,
+            metadata={"renderer_version": RENDERER_VERSION},
+        )
+        return self.url(key, content_type)
+
+
+class ChartRenderService:
+    """
+    Renders charts off the event loop, once per distinct spec.
+
+    Requests wait in FIFO order for one of ``workers`` render slots.
+    Concurrent requests with the same spec hash share one render, and
+    finished output is served from the content cache (and the store, when
+    configured) without rendering again. ``workers=0`` renders in a single
+    background thread instead of processes (development and tests).
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_cache_bytes: int = 64 * 1024 * 1024,
+        store: Optional[GCSChartStore] = None,
+        render_timeout: float = 120.0,
+    ):
+        self.workers = workers
+        self.store = store
+        self.render_timeout = render_timeout
+        self._cache = _ContentCache(max_cache_bytes)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._background: set = set()
+        self.stats = {
+            "requests": 0,
+            "memory_hits": 0,
+            "store_hits": 0,
+            "coalesced": 0,
+            "renders": 0,
+            "failures": 0,
+            "queued": 0,
+            "render_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls) -> "ChartRenderService":
+        from core.settings_lazy import settings
+
+        return cls(
+            workers=settings.chart_render_workers,
+            max_cache_bytes=settings.chart_render_cache_mb * 1024 * 1024,
+            store=GCSChartStore() if settings.chart_render_gcs_enabled else None,
+        )
+
+    def _ensure_executor(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            else:
+                # pyplot keeps global state: a single thread serializes renders
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="chart-render"
+                )
+            self._slots = asyncio.Semaphore(max(1, self.workers))
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the pool and warm every worker before the first request."""
+        executor = self._ensure_executor()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        pids = await asyncio.gather(
+            *(loop.run_in_executor(executor, _warm) for _ in range(max(1, self.workers)))
+        )
+        logger.info(
+            f"Chart render pool ready: {len(set(pids))} worker(s) in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+    async def render(self, kind: str, *args: Any, **kwargs: Any) -> RenderedChart:
+        """
+        Render a chart (or return the cached rendering of the same spec).
+
+        Args:
+            kind: Renderer name (see RENDERERS)
+            *args, **kwargs: Arguments for the underlying generator; they
+                must be picklable and are hashed to identify the spec
+
+        Returns:
+            RenderedChart with the output bytes
+        """
+        if kind not in RENDERERS:
+            raise ValueError(f"Unknown chart renderer: {kind}")
+        self.stats["requests"] += 1
+        key = spec_hash(kind, args, kwargs)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.stats["memory_hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(self._produce(key, kind, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled caller must not cancel the render other callers wait on
+        return await asyncio.shield(task)
+
+    async def _produce(self, key: str, kind: str, args: tuple, kwargs: dict) -> RenderedChart:
+        content_type = RENDERERS[kind][2]
+
+        if self.store is not None:
+            try:
+                content = await self.store.get(key, content_type)
+            except Exception as e:
+                logger.warning(f"Chart store lookup failed for {key[:12]}: {e}")
+                content = None
+            if content is not None:
+                self.stats["store_hits"] += 1
+                chart = RenderedChart(
+                    key,
+                    hashlib.sha256(content).hexdigest(),
+                    content_type,
+                    content,
+                    "store",
+                    self.store.url(key, content_type),
+                )
+                self._cache.put(chart)
+                return chart
+
+        executor = self._ensure_executor()
+        slots = self._slots
+        self.stats["queued"] += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        try:
+            started = time.perf_counter()
+            content = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(
+                    executor, _render, kind, args, kwargs
+                ),
+                self.render_timeout,
+            )
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool: start a fresh one on the next request
+            self.stats["failures"] += 1
+            self._executor = None
+            raise
+        except BaseException:
+            self.stats["failures"] += 1
+            raise
+        finally:
+            slots.release()
+        self.stats["renders"] += 1
+        self.stats["render_seconds"] += time.perf_counter() - started
+
+        chart = RenderedChart(
+            key, hashlib.sha256(content).hexdigest(), content_type, content, "render"
+        )
+        if self.store is not None:
+            chart.url = self.store.url(key, content_type)
+            upload = asyncio.create_task(self._upload(key, content_type, content))
+            self._background.add(upload)
+            upload.add_done_callback(self._background.discard)
+        self._cache.put(chart)
+        return chart
+
+    async def _upload(self, key: str, content_type: str, content: bytes) -> None:
+        try:
+            await self.store.put(key, content_type, content)
+        except Exception as e:
+            logger.warning(f"Could not upload rendered chart {key[:12]}: {e}")
+
+    async def shutdown(self) -> None:
+        """Wait for pending uploads and stop the worker pool."""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "inflight": len(self._inflight),
+            "cached_blobs": len(self._cache),
+            "cached_bytes": self._cache.size,
+        }
+
+
+# Singleton instance, configured from settings on first use; the pool starts
+# on the first render or via start()
+chart_renderer = LazyInstance(factory=ChartRenderService.from_settings, name="ChartRenderService")
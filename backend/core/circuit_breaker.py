@@ -5,10 +5,11 @@ This module provides a circuit breaker pattern implementation to prevent
 cascading failures when calling external services.
 """
 
-import asyncio
 import time
+from bisect import bisect_left
+from collections import deque
 from enum import Enum
-from typing import Callable, Optional, Any, Dict
+from typing import Callable, Optional, Any, Dict, List, Tuple
 from functools import wraps
 
 from core.logging_config import get_logger
@@ -24,6 +25,144 @@ class CircuitState(Enum):
     HALF_OPEN = "half_open"  # Testing if service recovered
 
 
+# Límites superiores (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class SlidingWindowStats:
+    """
+    Time-bucketed ring buffer of call outcomes.
+
+    The window is split into ``bucket_count`` buckets of equal duration. Each
+    bucket keeps call, failure and slow-call counters plus a latency
+    histogram; a bucket is lazily cleared when the ring wraps around to it.
+    Recording is O(log len(LATENCY_BUCKETS)) and allocation-free.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        bucket_count: int = 12,
+        slow_call_duration: Optional[float] = None,
+    ):
+        self.window_seconds = window_seconds
+        self.bucket_count = bucket_count
+        self.bucket_width = window_seconds / bucket_count
+        self.slow_call_duration = slow_call_duration
+
+        self._epochs = [-1] * bucket_count
+        self._calls = [0] * bucket_count
+        self._failures = [0] * bucket_count
+        self._slow_calls = [0] * bucket_count
+        self._histograms = [
+            [0] * (len(LATENCY_BUCKETS) + 1) for _ in range(bucket_count)
+        ]
+
+    def _current_bucket(self, now: float) -> int:
+        epoch = int(now / self.bucket_width)
+        index = epoch % self.bucket_count
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._calls[index] = 0
+            self._failures[index] = 0
+            self._slow_calls[index] = 0
+            histogram = self._histograms[index]
+            for i in range(len(histogram)):
+                histogram[i] = 0
+        return index
+
+    def record(self, duration: float, failed: bool, now: Optional[float] = None) -> bool:
+        """
+        Record one call outcome.
+
+        Returns:
+            True if the call counts as slow
+        """
+        index = self._current_bucket(time.monotonic() if now is None else now)
+        self._calls[index] += 1
+        if failed:
+            self._failures[index] += 1
+        slow = (
+            self.slow_call_duration is not None
+            and duration >= self.slow_call_duration
+        )
+        if slow:
+            self._slow_calls[index] += 1
+        self._histograms[index][bisect_left(LATENCY_BUCKETS, duration)] += 1
+        return slow
+
+    def _live_buckets(self, now: Optional[float]) -> List[int]:
+        current = int((time.monotonic() if now is None else now) / self.bucket_width)
+        oldest = current - self.bucket_count
+        return [
+            i for i, epoch in enumerate(self._epochs) if oldest < epoch <= current
+        ]
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Aggregate counters and rates over the live window."""
+        live = self._live_buckets(now)
+        calls = sum(self._calls[i] for i in live)
+        failures = sum(self._failures[i] for i in live)
+        slow_calls = sum(self._slow_calls[i] for i in live)
+        return {
+            "calls": calls,
+            "failures": failures,
+            "slow_calls": slow_calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow_calls / calls if calls else 0.0,
+        }
+
+    def percentiles(
+        self, percents: Tuple[int, ...] = (50, 90, 99), now: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        Latency percentiles (milliseconds) over the live window.
+
+        Values are histogram bucket upper bounds, so they are conservative.
+        """
+        merged = [0] * (len(LATENCY_BUCKETS) + 1)
+        for i in self._live_buckets(now):
+            for slot, count in enumerate(self._histograms[i]):
+                merged[slot] += count
+        total = sum(merged)
+
+        result = {}
+        for percent in percents:
+            if not total:
+                result[f"p{percent}"] = 0.0
+                continue
+            target = percent / 100 * total
+            cumulative = 0
+            for slot, count in enumerate(merged):
+                cumulative += count
+                if cumulative >= target:
+                    break
+            bound = LATENCY_BUCKETS[min(slot, len(LATENCY_BUCKETS) - 1)]
+            result[f"p{percent}"] = bound * 1000
+        return result
+
+    def reset(self) -> None:
+        """Discard all recorded outcomes."""
+        for i in range(self.bucket_count):
+            self._epochs[i] = -1
+
+
 class CircuitBreaker:
     """
     Circuit breaker implementation for protecting external service calls.
@@ -34,10 +173,16 @@ class CircuitBreaker:
     - HALF_OPEN: Testing if service has recovered
 
     State transitions:
-    - CLOSED -> OPEN: When failure threshold is exceeded
+    - CLOSED -> OPEN: When consecutive failures reach ``failure_threshold``, or
+      when the sliding window holds at least ``minimum_calls`` calls and the
+      failure rate or slow-call rate exceeds its threshold
     - OPEN -> HALF_OPEN: After timeout period
-    - HALF_OPEN -> CLOSED: When test request succeeds
-    - HALF_OPEN -> OPEN: When test request fails
+    - HALF_OPEN -> CLOSED: When test requests succeed
+    - HALF_OPEN -> OPEN: When a test request fails
+
+    All bookkeeping happens synchronously between awaits, so a breaker shared
+    by coroutines on one event loop needs no lock: the closed-state fast path
+    is a state check, two clock reads and a few counter increments.
     """
 
     def __init__(
@@ -48,17 +193,30 @@ class CircuitBreaker:
         expected_exception: type = Exception,
         success_threshold: int = 3,
         half_open_max_calls: int = 3,
+        failure_rate_threshold: float = 0.5,
+        slow_call_duration: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        minimum_calls: int = 20,
+        window_seconds: float = 60.0,
+        window_buckets: int = 12,
     ):
         """
         Initialize the circuit breaker.
 
         Args:
             name: Name of the circuit breaker (for logging)
-            failure_threshold: Number of failures before opening circuit
+            failure_threshold: Consecutive failures before opening circuit
             recovery_timeout: Seconds to wait before trying half-open
             expected_exception: Exception type to catch (default: Exception)
             success_threshold: Successes needed in half-open to close circuit
             half_open_max_calls: Max concurrent calls allowed in half-open state
+            failure_rate_threshold: Window failure rate (0-1) that opens the circuit
+            slow_call_duration: Seconds after which a call counts as slow
+                (None disables latency-based tripping)
+            slow_call_rate_threshold: Window slow-call rate (0-1) that opens the circuit
+            minimum_calls: Calls required in the window before rates are evaluated
+            window_seconds: Length of the sliding statistics window
+            window_buckets: Number of time buckets in the window
         """
         self.name = name
         self.failure_threshold = failure_threshold
@@ -66,13 +224,21 @@ class CircuitBreaker:
         self.expected_exception = expected_exception
         self.success_threshold = success_threshold
         self.half_open_max_calls = half_open_max_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
 
         self._state = CircuitState.CLOSED
         self._failure_count = 0
         self._last_failure_time = None
         self._success_count = 0
         self._half_open_calls = 0
-        self._lock = asyncio.Lock()
+        self._window = SlidingWindowStats(
+            window_seconds=window_seconds,
+            bucket_count=window_buckets,
+            slow_call_duration=slow_call_duration,
+        )
 
         # Statistics
         self._stats = {
@@ -80,7 +246,8 @@ class CircuitBreaker:
             "successful_calls": 0,
             "failed_calls": 0,
             "rejected_calls": 0,
-            "state_changes": [],
+            "slow_calls": 0,
+            "state_changes": deque(maxlen=50),
         }
 
         logger.info(
@@ -103,7 +270,7 @@ class CircuitBreaker:
         """Check if circuit is open (rejecting requests)."""
         return self._state == CircuitState.OPEN
 
-    async def _change_state(self, new_state: CircuitState) -> None:
+    def _change_state(self, new_state: CircuitState, reason: str = "") -> None:
         """Change the circuit breaker state."""
         old_state = self._state
         self._state = new_state
@@ -111,22 +278,29 @@ class CircuitBreaker:
         # Log state change
         logger.info(
             f"Circuit breaker '{self.name}' state changed: {old_state.value} -> {new_state.value}"
+            + (f" ({reason})" if reason else "")
         )
 
         # Record in statistics
         self._stats["state_changes"].append(
-            {"from": old_state.value, "to": new_state.value, "timestamp": time.time()}
+            {
+                "from": old_state.value,
+                "to": new_state.value,
+                "reason": reason,
+                "timestamp": time.time(),
+            }
         )
 
         # Reset counters based on new state
         if new_state == CircuitState.CLOSED:
             self._failure_count = 0
             self._success_count = 0
+            self._window.reset()
         elif new_state == CircuitState.HALF_OPEN:
             self._success_count = 0
             self._half_open_calls = 0
 
-    async def _should_attempt_reset(self) -> bool:
+    def _should_attempt_reset(self) -> bool:
         """Check if we should attempt to reset the circuit."""
         return (
             self._state == CircuitState.OPEN
@@ -134,6 +308,25 @@ class CircuitBreaker:
             and time.time() - self._last_failure_time >= self.recovery_timeout
         )
 
+    def _admit(self) -> None:
+        """Admission control for the OPEN and HALF_OPEN states."""
+        if self._should_attempt_reset():
+            self._change_state(CircuitState.HALF_OPEN, "recovery timeout elapsed")
+
+        if self._state == CircuitState.OPEN:
+            self._stats["rejected_calls"] += 1
+            raise CircuitBreakerOpenError(
+                f"Circuit breaker '{self.name}' is OPEN. Service calls are suspended."
+            )
+
+        if self._state == CircuitState.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                self._stats["rejected_calls"] += 1
+                raise CircuitBreakerOpenError(
+                    f"Circuit breaker '{self.name}' is HALF_OPEN but max calls reached."
+                )
+            self._half_open_calls += 1
+
     async def call(self, func: Callable, *args, **kwargs) -> Any:
         """
         Execute a function through the circuit breaker.
@@ -150,79 +343,123 @@ class CircuitBreaker:
             CircuitBreakerOpenError: If circuit is open
             Exception: If function fails
         """
-        async with self._lock:
-            self._stats["total_calls"] += 1
+        self._stats["total_calls"] += 1
 
-            # Check if we should attempt reset
-            if await self._should_attempt_reset():
-                await self._change_state(CircuitState.HALF_OPEN)
+        half_open_probe = False
+        if self._state is not CircuitState.CLOSED:
+            self._admit()
+            half_open_probe = self._state is CircuitState.HALF_OPEN
 
-            # Handle based on current state
-            if self._state == CircuitState.OPEN:
-                self._stats["rejected_calls"] += 1
-                raise CircuitBreakerOpenError(
-                    f"Circuit breaker '{self.name}' is OPEN. Service calls are suspended."
-                )
-
-            elif self._state == CircuitState.HALF_OPEN:
-                if self._half_open_calls >= self.half_open_max_calls:
-                    self._stats["rejected_calls"] += 1
-                    raise CircuitBreakerOpenError(
-                        f"Circuit breaker '{self.name}' is HALF_OPEN but max calls reached."
-                    )
-                self._half_open_calls += 1
-
-        # Execute the function
+        start = time.perf_counter()
         try:
             result = await func(*args, **kwargs)
-            await self._on_success()
-            return result
-        except self.expected_exception as e:
-            await self._on_failure()
+        except self.expected_exception:
+            self._on_failure(time.perf_counter() - start, half_open_probe)
+            raise
+        except BaseException:
+            if half_open_probe:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
             raise
 
-    async def _on_success(self) -> None:
-        """Handle successful call."""
-        async with self._lock:
-            self._stats["successful_calls"] += 1
+        self._on_success(time.perf_counter() - start, half_open_probe)
+        return result
 
-            if self._state == CircuitState.HALF_OPEN:
-                self._success_count += 1
-                if self._success_count >= self.success_threshold:
-                    await self._change_state(CircuitState.CLOSED)
+    def _on_success(self, duration: float, half_open_probe: bool = False) -> None:
+        """Handle successful call."""
+        self._stats["successful_calls"] += 1
+        slow = self._window.record(duration, failed=False)
 
-            elif self._state == CircuitState.CLOSED:
-                self._failure_count = 0  # Reset failure count on success
+        if half_open_probe:
+            self._half_open_calls = max(0, self._half_open_calls - 1)
 
-    async def _on_failure(self) -> None:
-        """Handle failed call."""
-        async with self._lock:
-            self._stats["failed_calls"] += 1
-            self._last_failure_time = time.time()
+        if self._state == CircuitState.HALF_OPEN:
+            self._success_count += 1
+            if self._success_count >= self.success_threshold:
+                self._change_state(CircuitState.CLOSED, "half-open probes succeeded")
 
-            if self._state == CircuitState.CLOSED:
-                self._failure_count += 1
-                if self._failure_count >= self.failure_threshold:
-                    await self._change_state(CircuitState.OPEN)
+        elif self._state == CircuitState.CLOSED:
+            self._failure_count = 0  # Reset failure count on success
+            if slow:
+                self._stats["slow_calls"] += 1
+                self._evaluate_window()
 
-            elif self._state == CircuitState.HALF_OPEN:
-                await self._change_state(CircuitState.OPEN)
+    def _on_failure(self, duration: float, half_open_probe: bool = False) -> None:
+        """Handle failed call."""
+        self._stats["failed_calls"] += 1
+        self._last_failure_time = time.time()
+        if self._window.record(duration, failed=True):
+            self._stats["slow_calls"] += 1
+
+        if half_open_probe:
+            self._half_open_calls = max(0, self._half_open_calls - 1)
+
+        if self._state == CircuitState.CLOSED:
+            self._failure_count += 1
+            if self._failure_count >= self.failure_threshold:
+                self._change_state(
+                    CircuitState.OPEN, f"{self._failure_count} consecutive failures"
+                )
+            else:
+                self._evaluate_window()
+
+        elif self._state == CircuitState.HALF_OPEN:
+            self._change_state(CircuitState.OPEN, "half-open probe failed")
+
+    def _evaluate_window(self) -> None:
+        """Open the circuit if the sliding-window rates exceed their thresholds."""
+        snapshot = self._window.snapshot()
+        if snapshot["calls"] < self.minimum_calls:
+            return
+
+        if snapshot["failure_rate"] >= self.failure_rate_threshold:
+            reason = f"failure rate {snapshot['failure_rate']:.0%}"
+        elif (
+            self.slow_call_duration is not None
+            and snapshot["slow_call_rate"] >= self.slow_call_rate_threshold
+        ):
+            reason = f"slow-call rate {snapshot['slow_call_rate']:.0%}"
+        else:
+            return
+
+        # Ensure the recovery timer starts now even if the trigger was slowness
+        self._last_failure_time = time.time()
+        self._change_state(CircuitState.OPEN, reason)
 
     async def reset(self) -> None:
         """Manually reset the circuit breaker to closed state."""
-        async with self._lock:
-            await self._change_state(CircuitState.CLOSED)
-            self._failure_count = 0
-            self._last_failure_time = None
+        self._change_state(CircuitState.CLOSED, "manual reset")
+        self._failure_count = 0
+        self._last_failure_time = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Sliding-window rates and latency percentiles."""
+        window = self._window.snapshot()
+        window["window_seconds"] = self._window.window_seconds
+        window["latency_ms"] = self._window.percentiles()
+        return window
 
     def get_stats(self) -> Dict[str, Any]:
         """Get circuit breaker statistics."""
+        stats = self._stats.copy()
+        stats["state_changes"] = list(self._stats["state_changes"])
         return {
             "name": self.name,
             "state": self._state.value,
-            "stats": self._stats.copy(),
+            "stats": stats,
             "failure_count": self._failure_count,
             "success_count": self._success_count,
+            "last_failure_time": self._last_failure_time,
+            "window": self.get_metrics(),
+            "config": {
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "success_threshold": self.success_threshold,
+                "half_open_max_calls": self.half_open_max_calls,
+                "failure_rate_threshold": self.failure_rate_threshold,
+                "slow_call_duration": self.slow_call_duration,
+                "slow_call_rate_threshold": self.slow_call_rate_threshold,
+                "minimum_calls": self.minimum_calls,
+            },
         }
 
 
@@ -238,16 +475,21 @@ def circuit_breaker(
     recovery_timeout: int = 60,
     expected_exception: type = Exception,
     success_threshold: int = 3,
+    slow_call_duration: Optional[float] = None,
 ):
     """
     Decorator to apply circuit breaker pattern to async functions.
 
+    The breaker is added to the global registry so its metrics are visible
+    through the circuit breaker API.
+
     Args:
         name: Circuit breaker name (defaults to function name)
         failure_threshold: Number of failures before opening
         recovery_timeout: Seconds before attempting recovery
         expected_exception: Exception type to catch
         success_threshold: Successes needed to close circuit
+        slow_call_duration: Seconds after which a call counts as slow
 
     Example:
         @circuit_breaker(name="external_api", failure_threshold=3)
@@ -265,7 +507,9 @@ def circuit_breaker(
             recovery_timeout=recovery_timeout,
             expected_exception=expected_exception,
             success_threshold=success_threshold,
+            slow_call_duration=slow_call_duration,
         )
+        register_circuit_breaker(breaker)
 
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -331,6 +575,7 @@ class CircuitBreakerManager:
             recovery_timeout=60,
             expected_exception=Exception,
             success_threshold=3,
+            slow_call_duration=30.0,
         )
         self.register(vertex_ai_breaker)
         
@@ -341,6 +586,7 @@ class CircuitBreakerManager:
             recovery_timeout=30,
             expected_exception=Exception,
             success_threshold=2,
+            slow_call_duration=5.0,
         )
         self.register(supabase_breaker)
         
@@ -351,6 +597,7 @@ class CircuitBreakerManager:
             recovery_timeout=120,
             expected_exception=Exception,
             success_threshold=3,
+            slow_call_duration=10.0,
         )
         self.register(external_api_breaker)
         
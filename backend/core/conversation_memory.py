@@ -15,13 +15,15 @@ import asyncio
 import json
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import Callable, Dict, List, Optional, Any, Union, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import hashlib
+import weakref
 
 from core.logging_config import get_logger
 from core.memory_cache_optimizer import cache_get, cache_set, cache_invalidate, CachePriority
+from core.recommendation_graph import CONVERSATION_DATA, notify_data_changed
 from clients.supabase_client import get_supabase_client
 
 logger = get_logger(__name__)
@@ -109,6 +111,29 @@ class PersonalityProfile:
         return cls(**data)
 
 
+# Observadores de entradas nuevas (p. ej. el detector incremental de comportamiento).
+# Se guardan como referencias débiles para no mantener vivos a sus dueños.
+_memory_listeners: List[weakref.WeakMethod] = []
+
+
+def add_memory_listener(callback: Callable[[MemoryEntry], None]) -> None:
+    """Registra un método que recibe cada MemoryEntry almacenada"""
+    _memory_listeners.append(weakref.WeakMethod(callback))
+
+
+def _notify_memory_listeners(entry: MemoryEntry) -> None:
+    """Entrega la entrada a los observadores vivos y descarta los muertos"""
+    for ref in list(_memory_listeners):
+        callback = ref()
+        if callback is None:
+            _memory_listeners.remove(ref)
+            continue
+        try:
+            callback(entry)
+        except Exception as e:
+            logger.warning(f"Error notificando entrada de memoria: {e}")
+
+
 class ConversationMemoryEngine:
     """
     Motor principal de memoria conversacional inteligente
@@ -191,6 +216,10 @@ class ConversationMemoryEngine:
             # Actualizar caché
             await self._update_memory_cache(user_id, entry)
             
+            # Invalidar segmentación y recomendaciones que dependen de la conversación
+            notify_data_changed(user_id, CONVERSATION_DATA)
+            _notify_memory_listeners(entry)
+            
             # Disparar actualización de personalidad si es necesario
             asyncio.create_task(self._maybe_update_personality(user_id))
             
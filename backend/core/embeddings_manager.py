@@ -6,7 +6,11 @@ embeddings vectoriales, permitiendo búsquedas semánticas y recuperación
 de contexto relevante basado en similitud.
 """
 
+import asyncio
 import hashlib
+import os
+import shutil
+import tempfile
 import time
 import numpy as np
 from datetime import datetime
@@ -15,6 +19,7 @@ from typing import Any, Dict, List, Optional
 from clients.vertex_ai import vertex_ai_client
 from clients.gcs_client import gcs_client
 from clients.vertex_ai.vector_search_client import vector_search_client
+from core.embeddings_store import EmbeddingStore, load_concurrently
 from core.logging_config import get_logger
 from core.telemetry import telemetry_manager
 import json
@@ -40,6 +45,9 @@ class EmbeddingsManager:
         use_gcs: bool = True,
         gcs_prefix: str = "embeddings/",
         use_vector_search: bool = True,
+        gcs_concurrency: int = 16,
+        refresh_interval: float = 300.0,
+        snapshot_dir: Optional[str] = None,
     ):
         """
         Inicializa el gestor de embeddings.
@@ -49,6 +57,9 @@ class EmbeddingsManager:
             cache_ttl: Tiempo de vida del caché en segundos
             vector_dimension: Dimensión de los vectores de embedding
             similarity_threshold: Umbral de similitud para considerar relevante
+            gcs_concurrency: Descargas simultáneas al cargar desde GCS
+            refresh_interval: Segundos entre refrescos incrementales en segundo plano
+            snapshot_dir: Directorio local para snapshots (por defecto, temporal)
         """
         self.cache_enabled = cache_enabled
         self.cache_ttl = cache_ttl
@@ -57,9 +68,22 @@ class EmbeddingsManager:
         self.use_gcs = use_gcs
         self.gcs_prefix = gcs_prefix
         self.use_vector_search = use_vector_search
+        self.gcs_concurrency = gcs_concurrency
+        self.refresh_interval = refresh_interval
+        self.snapshot_dir = snapshot_dir or os.path.join(
+            tempfile.gettempdir(), "ngx_embeddings"
+        )
+        # Snapshot compacto (matriz + sidecar) junto a los embeddings individuales
+        self.snapshot_prefix = f"{gcs_prefix}_snapshot/"
+
+        # Almacenamiento de embeddings (matriz float32 en memoria o mmap)
+        self.embeddings_store = EmbeddingStore()
 
-        # Almacenamiento de embeddings (en memoria como caché)
-        self.embeddings_store = {}
+        # Refresco en segundo plano desde GCS
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+        self._snapshot_loaded = False
+        self._snapshot_download_dir: Optional[str] = None
 
         # Flags de inicialización
         self._gcs_initialized = False
@@ -76,6 +100,8 @@ class EmbeddingsManager:
             "cache_hits": 0,
             "cache_misses": 0,
             "errors": 0,
+            "gcs_refreshes": 0,
+            "gcs_blobs_loaded": 0,
         }
 
         logger.info("Gestor de embeddings inicializado")
@@ -104,51 +130,190 @@ class EmbeddingsManager:
                 logger.error(f"Error al inicializar Vector Search: {e}")
                 self.use_vector_search = False  # Fallback a búsqueda local
 
-    async def _load_embeddings_from_gcs(self, limit: int = 100) -> None:
+    def _is_embedding_blob(self, blob_name: str) -> bool:
+        return (
+            blob_name.startswith(self.gcs_prefix)
+            and blob_name.endswith(".json")
+            and not blob_name.startswith(self.snapshot_prefix)
+        )
+
+    async def _load_snapshot_from_gcs(self) -> bool:
+        """
+        Descarga el snapshot compacto de GCS y lo mapea en memoria.
+
+        Cada descarga va a un directorio nuevo: ``snapshot_dir`` se comparte
+        entre procesos y reescribir en sitio un ``.npy`` que otro almacén
+        tiene mapeado provocaría SIGBUS o vectores a medias.
+
+        Returns:
+            bool: True si se cargó un snapshot
+        """
+        directory = None
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix="download-", dir=self.snapshot_dir)
+            for suffix in (".npy", ".json"):
+                await gcs_client.download_file(
+                    f"{self.snapshot_prefix}embeddings{suffix}",
+                    destination_file_path=os.path.join(directory, f"embeddings{suffix}"),
+                )
+            snapshot = EmbeddingStore.from_snapshot(directory)
+        except FileNotFoundError:
+            logger.info("No hay snapshot de embeddings en GCS")
+            self._discard_snapshot_dir(directory)
+            return False
+        except Exception as e:
+            logger.error(f"Error al cargar snapshot de embeddings: {e}")
+            self._discard_snapshot_dir(directory)
+            return False
+
+        # Conservar lo escrito en memoria antes de que llegara el snapshot
+        for key in list(self.embeddings_store):
+            snapshot[key] = self.embeddings_store[key]
+        self.embeddings_store = snapshot
+        # El mapeo anterior sigue siendo válido aunque se borren sus ficheros
+        self._discard_snapshot_dir(self._snapshot_download_dir)
+        self._snapshot_download_dir = directory
+        logger.info(f"Snapshot de embeddings cargado: {len(snapshot)} entradas")
+        return True
+
+    @staticmethod
+    def _discard_snapshot_dir(directory: Optional[str]) -> None:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    async def _load_embeddings_from_gcs(self, limit: Optional[int] = None) -> int:
         """
-        Carga embeddings desde GCS a memoria.
+        Carga desde GCS los embeddings nuevos o actualizados.
+
+        La primera vez parte del snapshot compacto si existe; después solo se
+        descargan los blobs modificados tras la marca de agua, con
+        paralelismo acotado por ``gcs_concurrency``.
 
         Args:
-            limit: Número máximo de embeddings a cargar (para evitar sobrecarga de memoria)
+            limit: Número máximo de blobs a descargar en esta pasada
+
+        Returns:
+            int: Número de embeddings cargados
         """
         if not self._gcs_initialized:
-            return
-
-        try:
-            # Listar archivos de embeddings en GCS
-            files = await gcs_client.list_files(prefix=self.gcs_prefix)
+            return 0
 
-            # Cargar hasta 'limit' embeddings
-            loaded = 0
-            for file_info in files[:limit]:
-                if loaded >= limit:
-                    break
+        async with self._refresh_lock:
+            if not self._snapshot_loaded:
+                self._snapshot_loaded = True
+                await self._load_snapshot_from_gcs()
 
+            try:
+                files = await gcs_client.list_files(prefix=self.gcs_prefix)
+            except Exception as e:
+                logger.error(f"Error al listar embeddings en GCS: {e}")
+                return 0
+
+            watermark = self.embeddings_store.watermark
+            pending = []
+            newest = watermark
+            for file_info in files:
+                if not self._is_embedding_blob(file_info["name"]):
+                    continue
+                updated = file_info.get("updated")
+                updated = updated.isoformat() if hasattr(updated, "isoformat") else updated
+                key = file_info["name"][len(self.gcs_prefix) : -5]
+                if updated and watermark and updated <= watermark and key in self.embeddings_store:
+                    continue
+                pending.append(file_info["name"])
+                if updated and (newest is None or updated > newest):
+                    newest = updated
+            if limit is not None:
+                pending = pending[:limit]
+
+            async def fetch(blob_name: str) -> Dict[str, Any]:
+                content = await gcs_client.download_file(blob_name)
+                return json.loads(content.decode("utf-8"))
+
+            loaded, failed = await load_concurrently(
+                pending, fetch, concurrency=self.gcs_concurrency
+            )
+            for blob_name, embedding_data in loaded.items():
                 try:
-                    # Extraer key del nombre del archivo
-                    blob_name = file_info["name"]
-                    if blob_name.startswith(self.gcs_prefix) and blob_name.endswith(
-                        ".json"
-                    ):
-                        key = blob_name[
-                            len(self.gcs_prefix) : -5
-                        ]  # Remover prefijo y .json
-
-                        # Descargar y parsear
-                        content = await gcs_client.download_file(blob_name)
-                        embedding_data = json.loads(content.decode("utf-8"))
-
-                        # Almacenar en memoria
-                        self.embeddings_store[key] = embedding_data
-                        loaded += 1
-
-                except Exception as e:
-                    logger.error(f"Error al cargar embedding {file_info['name']}: {e}")
+                    self.embeddings_store[blob_name[len(self.gcs_prefix) : -5]] = embedding_data
+                except (KeyError, ValueError) as e:
+                    logger.error(f"Embedding inválido en {blob_name}: {e}")
+
+            # La marca de agua solo avanza si la pasada fue completa
+            if not failed and len(pending) == len(loaded) and limit is None:
+                self.embeddings_store.watermark = newest
+
+            self.stats["gcs_refreshes"] += 1
+            self.stats["gcs_blobs_loaded"] += len(loaded)
+            logger.info(
+                f"Cargados {len(loaded)} embeddings desde GCS ({len(failed)} fallidos)"
+            )
+            return len(loaded)
 
-            logger.info(f"Cargados {loaded} embeddings desde GCS")
+    async def save_snapshot_to_gcs(self) -> bool:
+        """
+        Escribe el almacén actual como snapshot compacto y lo sube a GCS.
 
+        Returns:
+            bool: True si se subió correctamente
+        """
+        await self._ensure_gcs_initialized()
+        if not self._gcs_initialized:
+            return False
+        try:
+            loop = asyncio.get_event_loop()
+            directory = os.path.join(self.snapshot_dir, "upload")
+            matrix_path, sidecar_path = await loop.run_in_executor(
+                None, self.embeddings_store.write_snapshot, directory
+            )
+            # El sidecar se sube al final: es el que hace visible la matriz nueva
+            for path, content_type in (
+                (matrix_path, "application/octet-stream"),
+                (sidecar_path, "application/json"),
+            ):
+                await gcs_client.upload_file(
+                    file_path_or_content=path,
+                    destination_blob_name=f"{self.snapshot_prefix}{os.path.basename(path)}",
+                    content_type=content_type,
+                    metadata={"type": "embedding_snapshot"},
+                )
+            logger.info(f"Snapshot de embeddings subido ({len(self.embeddings_store)} entradas)")
+            return True
         except Exception as e:
-            logger.error(f"Error al listar embeddings en GCS: {e}")
+            logger.error(f"Error al subir snapshot de embeddings: {e}")
+            return False
+
+    def start_background_refresh(self) -> Optional[asyncio.Task]:
+        """Inicia (si no lo está) el refresco periódico desde GCS."""
+        if not self.use_gcs:
+            return None
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        return self._refresh_task
+
+    async def stop_background_refresh(self) -> None:
+        """Detiene el refresco periódico."""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self._ensure_gcs_initialized()
+                if not self._gcs_initialized:
+                    return
+                await self._load_embeddings_from_gcs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en refresco de embeddings: {e}")
+            await asyncio.sleep(self.refresh_interval)
 
     def _get_cache_key(self, text: str) -> str:
         """
@@ -551,35 +716,11 @@ class EmbeddingsManager:
                         )
                         # Continuar con búsqueda local
 
-            # Búsqueda local (fallback o si Vector Search no está disponible)
-            # Si GCS está habilitado y no tenemos suficientes embeddings en memoria,
-            # cargar más desde GCS
-            if self.use_gcs and len(self.embeddings_store) < top_k * 2:
-                await self._ensure_gcs_initialized()
-                if self._gcs_initialized:
-                    await self._load_embeddings_from_gcs(limit=min(1000, top_k * 10))
-
-            # Calcular similitud con todos los embeddings almacenados
-            similarities = []
-
-            for key, item in self.embeddings_store.items():
-                similarity = self._calculate_similarity(
-                    query_embedding, item["embedding"]
-                )
-
-                if similarity >= threshold:
-                    similarities.append(
-                        {
-                            "key": key,
-                            "text": item["text"],
-                            "metadata": item["metadata"],
-                            "similarity": similarity,
-                        }
-                    )
-
-            # Ordenar por similitud (descendente) y limitar a top_k
-            similarities.sort(key=lambda x: x["similarity"], reverse=True)
-            results = similarities[:top_k]
+            # Búsqueda local (fallback o si Vector Search no está disponible).
+            # Los embeddings de GCS se cargan en segundo plano: la consulta
+            # nunca espera a la red
+            self.start_background_refresh()
+            results = self._search_local(query_embedding, top_k, threshold)
 
             telemetry_manager.set_span_attribute(span_id, "search_method", "local")
             telemetry_manager.set_span_attribute(span_id, "results_count", len(results))
@@ -622,24 +763,7 @@ class EmbeddingsManager:
                 threshold = self.similarity_threshold
 
             # Calcular similitud con todos los embeddings almacenados
-            similarities = []
-
-            for key, item in self.embeddings_store.items():
-                similarity = self._calculate_similarity(embedding, item["embedding"])
-
-                if similarity >= threshold:
-                    similarities.append(
-                        {
-                            "key": key,
-                            "text": item["text"],
-                            "metadata": item["metadata"],
-                            "similarity": similarity,
-                        }
-                    )
-
-            # Ordenar por similitud (descendente) y limitar a top_k
-            similarities.sort(key=lambda x: x["similarity"], reverse=True)
-            results = similarities[:top_k]
+            results = self._search_local(embedding, top_k, threshold)
 
             telemetry_manager.set_span_attribute(span_id, "results_count", len(results))
             return results
@@ -655,6 +779,23 @@ class EmbeddingsManager:
         finally:
             telemetry_manager.end_span(span_id)
 
+    def _search_local(
+        self, embedding: List[float], top_k: int, threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Búsqueda vectorizada sobre el almacén en memoria."""
+        results = []
+        for key, similarity in self.embeddings_store.search(embedding, top_k, threshold):
+            item = self.embeddings_store[key]
+            results.append(
+                {
+                    "key": key,
+                    "text": item["text"],
+                    "metadata": item["metadata"],
+                    "similarity": similarity,
+                }
+            )
+        return results
+
     async def get_by_key(self, key: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene un item por su clave.
@@ -734,7 +875,8 @@ class EmbeddingsManager:
 
     def clear_store(self) -> None:
         """Limpia el almacén de embeddings."""
-        self.embeddings_store = {}
+        self.embeddings_store = EmbeddingStore()
+        self._snapshot_loaded = False
         logger.info("Almacén de embeddings limpiado")
 
     def clear_cache(self) -> None:
@@ -762,6 +904,9 @@ class EmbeddingsManager:
             "gcs_prefix": self.gcs_prefix,
             "use_vector_search": self.use_vector_search,
             "vector_search_initialized": self._vector_search_initialized,
+            "store": self.embeddings_store.stats(),
+            "background_refresh": self._refresh_task is not None
+            and not self._refresh_task.done(),
             "timestamp": datetime.now().isoformat(),
         }
 
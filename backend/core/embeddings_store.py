@@ -0,0 +1,352 @@
+"""
+Almacén de embeddings en matriz float32 con snapshots mapeables en memoria.
+
+El almacén se compone de una base inmutable (normalmente un snapshot cargado
+con ``mmap``) y un delta en memoria con las escrituras posteriores. Las
+claves de la base que se reescriben o eliminan se marcan como tumbas. La
+búsqueda por similitud es un producto matriz-vector sobre ambas partes.
+
+Formato de snapshot (``<name>.npy`` + ``<name>.json``):
+
+- ``.npy``: matriz ``float32`` de forma ``(n, dimension)`` en orden C,
+  cargable con ``np.load(..., mmap_mode="r")``
+- ``.json``: sidecar con ``keys``, ``texts``, ``metadata`` y ``timestamps``
+  alineados por fila, más la dimensión y la marca de agua de la fuente
+"""
+
+import asyncio
+import json
+import os
+from collections.abc import MutableMapping
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Filas por bloque al calcular normas de la base (acota la memoria residente)
+_NORM_CHUNK_ROWS = 8192
+
+
+class EmbeddingStore(MutableMapping):
+    """
+    Mapa ``key -> {"text", "embedding", "metadata", "timestamp"}`` respaldado
+    por matrices float32.
+
+    Se comporta como un diccionario para el código existente; ``search``
+    calcula la similitud coseno contra todos los vectores de una vez.
+    """
+
+    def __init__(self, dimension: Optional[int] = None):
+        self.dimension = dimension
+
+        # Base inmutable (snapshot)
+        self._base: Optional[np.ndarray] = None
+        self._base_norms: Optional[np.ndarray] = None
+        self._base_alive: Optional[np.ndarray] = None
+        self._base_keys: List[str] = []
+        self._base_index: Dict[str, int] = {}
+        self._base_texts: List[str] = []
+        self._base_metadata: List[Dict[str, Any]] = []
+        self._base_timestamps: List[float] = []
+        self._base_dead = 0
+
+        # Escrituras posteriores a la base
+        self._delta: Dict[str, Dict[str, Any]] = {}
+        self._delta_vectors: Dict[str, np.ndarray] = {}
+        self._delta_matrix: Optional[Tuple[List[str], np.ndarray, np.ndarray]] = None
+
+        # Marca de agua de la fuente (p. ej. última actualización en GCS)
+        self.watermark: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Interfaz de mapa
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        record = self._delta.get(key)
+        if record is not None:
+            return record
+        row = self._base_index.get(key)
+        if row is None or not self._base_alive[row]:
+            raise KeyError(key)
+        return {
+            "text": self._base_texts[row],
+            "embedding": self._base[row].tolist(),
+            "metadata": self._base_metadata[row],
+            "timestamp": self._base_timestamps[row],
+        }
+
+    def __setitem__(self, key: str, record: Dict[str, Any]) -> None:
+        vector = np.asarray(record["embedding"], dtype=np.float32)
+        if vector.ndim != 1:
+            raise ValueError("El embedding debe ser un vector")
+        if self.dimension is None:
+            self.dimension = vector.shape[0]
+        elif vector.shape[0] != self.dimension:
+            raise ValueError(
+                f"Dimensión de embedding {vector.shape[0]} distinta de {self.dimension}"
+            )
+        self._tombstone(key)
+        self._delta[key] = record
+        self._delta_vectors[key] = vector
+        self._delta_matrix = None
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._delta:
+            del self._delta[key]
+            del self._delta_vectors[key]
+            self._delta_matrix = None
+        elif not self._tombstone(key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._delta:
+            return True
+        row = self._base_index.get(key)  # type: ignore[arg-type]
+        return row is not None and bool(self._base_alive[row])
+
+    def __iter__(self) -> Iterator[str]:
+        for row, key in enumerate(self._base_keys):
+            if self._base_alive[row] and key not in self._delta:
+                yield key
+        yield from list(self._delta)
+
+    def __len__(self) -> int:
+        return len(self._base_keys) - self._base_dead + len(self._delta)
+
+    def _tombstone(self, key: str) -> bool:
+        row = self._base_index.get(key)
+        if row is None or not self._base_alive[row]:
+            return False
+        self._base_alive[row] = False
+        self._base_dead += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _delta_arrays(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        if self._delta_matrix is None:
+            keys = list(self._delta_vectors)
+            if keys:
+                matrix = np.stack([self._delta_vectors[k] for k in keys])
+            else:
+                matrix = np.empty((0, self.dimension or 0), dtype=np.float32)
+            self._delta_matrix = (keys, matrix, np.linalg.norm(matrix, axis=1))
+        return self._delta_matrix
+
+    def search(
+        self, query: List[float], top_k: int = 5, threshold: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """
+        Claves más similares a ``query`` (similitud coseno >= threshold).
+
+        Returns:
+            Lista de (clave, similitud) ordenada de mayor a menor
+        """
+        if top_k <= 0 or len(self) == 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        if self.dimension is not None and q.shape[0] != self.dimension:
+            raise ValueError(
+                f"Dimensión de la consulta {q.shape[0]} distinta de {self.dimension}"
+            )
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0:
+            return []
+
+        candidates: List[Tuple[str, float]] = []
+        if self._base is not None and len(self._base_keys):
+            scores = self._cosine(self._base, self._base_norms, q, q_norm)
+            scores[~self._base_alive] = -np.inf
+            candidates.extend(
+                (self._base_keys[row], score)
+                for row, score in self._top(scores, top_k, threshold)
+            )
+
+        keys, matrix, norms = self._delta_arrays()
+        if keys:
+            scores = self._cosine(matrix, norms, q, q_norm)
+            candidates.extend(
+                (keys[row], score) for row, score in self._top(scores, top_k, threshold)
+            )
+
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return candidates[:top_k]
+
+    @staticmethod
+    def _cosine(matrix: np.ndarray, norms: np.ndarray, q: np.ndarray, q_norm: float) -> np.ndarray:
+        dots = matrix @ q
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = dots / (norms * q_norm)
+        scores[norms == 0] = 0.0
+        return scores
+
+    @staticmethod
+    def _top(scores: np.ndarray, top_k: int, threshold: float) -> List[Tuple[int, float]]:
+        if scores.shape[0] > top_k:
+            rows = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            rows = np.arange(scores.shape[0])
+        return [(int(row), float(scores[row])) for row in rows if scores[row] >= threshold]
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def write_snapshot(self, directory: str, name: str = "embeddings") -> Tuple[str, str]:
+        """
+        Escribe todas las entradas vivas como snapshot (matriz + sidecar).
+
+        Los ficheros se escriben con un nombre temporal y se renombran para
+        que un lector nunca vea un snapshot a medias.
+
+        Returns:
+            Rutas (matriz, sidecar)
+        """
+        os.makedirs(directory, exist_ok=True)
+        matrix_path = os.path.join(directory, f"{name}.npy")
+        sidecar_path = os.path.join(directory, f"{name}.json")
+
+        keys: List[str] = []
+        texts: List[str] = []
+        metadata: List[Dict[str, Any]] = []
+        timestamps: List[float] = []
+        rows: List[int] = []
+        for row, key in enumerate(self._base_keys):
+            if self._base_alive[row] and key not in self._delta:
+                rows.append(row)
+                keys.append(key)
+                texts.append(self._base_texts[row])
+                metadata.append(self._base_metadata[row])
+                timestamps.append(self._base_timestamps[row])
+
+        delta_keys, delta_matrix, _ = self._delta_arrays()
+        for key in delta_keys:
+            record = self._delta[key]
+            keys.append(key)
+            texts.append(record.get("text", ""))
+            metadata.append(record.get("metadata") or {})
+            timestamps.append(record.get("timestamp", 0.0))
+
+        dimension = self.dimension or 0
+        parts = []
+        if rows:
+            parts.append(np.asarray(self._base[rows], dtype=np.float32))
+        if delta_keys:
+            parts.append(delta_matrix)
+        matrix = (
+            np.concatenate(parts) if parts else np.empty((0, dimension), dtype=np.float32)
+        )
+
+        tmp_matrix = f"{matrix_path}.tmp"
+        with open(tmp_matrix, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(matrix, dtype=np.float32))
+        tmp_sidecar = f"{sidecar_path}.tmp"
+        with open(tmp_sidecar, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "dimension": dimension,
+                    "count": len(keys),
+                    "watermark": self.watermark,
+                    "keys": keys,
+                    "texts": texts,
+                    "metadata": metadata,
+                    "timestamps": timestamps,
+                },
+                fh,
+            )
+        os.replace(tmp_matrix, matrix_path)
+        os.replace(tmp_sidecar, sidecar_path)
+        return matrix_path, sidecar_path
+
+    @classmethod
+    def from_snapshot(
+        cls, directory: str, name: str = "embeddings", mmap: bool = True
+    ) -> "EmbeddingStore":
+        """
+        Carga un snapshot como base del almacén.
+
+        Args:
+            directory: Directorio con ``<name>.npy`` y ``<name>.json``
+            name: Nombre base de los ficheros
+            mmap: Mapear la matriz en memoria en lugar de leerla entera
+
+        Raises:
+            ValueError: Si la matriz y el sidecar no son coherentes
+        """
+        with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as fh:
+            sidecar = json.load(fh)
+        if sidecar.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Versión de snapshot no soportada: {sidecar.get('version')}")
+
+        matrix = np.load(
+            os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None
+        )
+        keys = sidecar["keys"]
+        if matrix.dtype != np.float32 or matrix.ndim != 2 or matrix.shape[0] != len(keys):
+            raise ValueError("Snapshot inconsistente: la matriz no coincide con el sidecar")
+
+        store = cls(dimension=sidecar["dimension"] or None)
+        store._base = matrix
+        store._base_keys = keys
+        store._base_index = {key: row for row, key in enumerate(keys)}
+        store._base_texts = sidecar["texts"]
+        store._base_metadata = sidecar["metadata"]
+        store._base_timestamps = sidecar["timestamps"]
+        store._base_alive = np.ones(len(keys), dtype=bool)
+        store._base_norms = np.empty(len(keys), dtype=np.float32)
+        for start in range(0, len(keys), _NORM_CHUNK_ROWS):
+            chunk = matrix[start : start + _NORM_CHUNK_ROWS]
+            store._base_norms[start : start + len(chunk)] = np.linalg.norm(chunk, axis=1)
+        store.watermark = sidecar.get("watermark")
+        return store
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño de la base, del delta y número de tumbas."""
+        return {
+            "base_size": len(self._base_keys),
+            "base_mmapped": isinstance(self._base, np.memmap),
+            "delta_size": len(self._delta),
+            "tombstones": self._base_dead,
+            "watermark": self.watermark,
+        }
+
+
+async def load_concurrently(
+    names: Iterable[str],
+    fetch: Callable[[str], Awaitable[Any]],
+    concurrency: int = 16,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Ejecuta ``fetch(name)`` para cada nombre con paralelismo acotado.
+
+    Args:
+        names: Nombres a cargar (p. ej. blobs de GCS)
+        fetch: Corrutina que carga un nombre
+        concurrency: Máximo de cargas simultáneas
+
+    Returns:
+        (resultados por nombre, nombres que fallaron)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loaded: Dict[str, Any] = {}
+    failed: List[str] = []
+
+    async def run(name: str) -> None:
+        async with semaphore:
+            try:
+                loaded[name] = await fetch(name)
+            except Exception as e:
+                logger.error(f"Error al cargar {name}: {e}")
+                failed.append(name)
+
+    await asyncio.gather(*(run(name) for name in names))
+    return loaded, failed
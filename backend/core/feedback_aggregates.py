@@ -0,0 +1,316 @@
+"""
+Agregados materializados de feedback.
+
+Mantiene contadores incrementales por día (valoraciones por agente, buckets
+de NPS, histogramas de satisfacción, sentimiento y temas) que se actualizan
+al registrar cada feedback, de modo que las analíticas se obtienen sin
+releer la tabla de feedback. Incluye un evaluador de sentimiento memoizado
+que puede puntuar lotes de comentarios.
+"""
+
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+POSITIVE_WORDS = ("excelente", "bueno", "genial", "útil", "rápido", "eficiente", "gracias")
+NEGATIVE_WORDS = ("malo", "lento", "error", "problema", "falla", "no funciona", "terrible")
+
+# Tema -> palabras que lo indican (coincidencia por subcadena)
+TOPIC_KEYWORDS = {
+    "velocidad": ("velocidad", "rápido"),
+    "precisión": ("precisión", "preciso"),
+    "interfaz": ("interfaz", "ui"),
+}
+
+# Umbrales para clasificar un score de sentimiento
+SENTIMENT_THRESHOLD = 0.3
+
+POSITIVE_TYPES = frozenset({"thumbs_up"})
+NEGATIVE_TYPES = frozenset({"thumbs_down", "issue", "suggestion"})
+
+
+def _alternation(words: Iterable[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(re.escape(word) for word in words))
+
+
+class SentimentScorer:
+    """
+    Puntuación heurística de sentimiento con memoización LRU.
+
+    El score es ``(positivas - negativas) / (positivas + negativas)`` sobre
+    las palabras distintas encontradas, en [-1, 1]. Los textos repetidos
+    (muy frecuentes en comentarios cortos) se resuelven desde la caché.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._positive = _alternation(POSITIVE_WORDS)
+        self._negative = _alternation(NEGATIVE_WORDS)
+        self.hits = 0
+        self.misses = 0
+
+    def score(self, text: str) -> float:
+        """Score de sentimiento entre -1 (muy negativo) y 1 (muy positivo)."""
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: Iterable[str]) -> List[float]:
+        """Puntúa varios textos; los duplicados se calculan una sola vez."""
+        scores = []
+        for text in texts:
+            key = text.lower()
+            score = self._cache.get(key)
+            if score is None:
+                self.misses += 1
+                score = self._compute(key)
+                self._cache[key] = score
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            else:
+                self.hits += 1
+                self._cache.move_to_end(key)
+            scores.append(score)
+        return scores
+
+    def _compute(self, text_lower: str) -> float:
+        positive_count = len(set(self._positive.findall(text_lower)))
+        negative_count = len(set(self._negative.findall(text_lower)))
+        if positive_count + negative_count == 0:
+            return 0.0
+        score = (positive_count - negative_count) / (positive_count + negative_count)
+        return max(-1.0, min(1.0, score))
+
+    @staticmethod
+    def label(score: float) -> str:
+        """Clasifica un score como positive, negative o neutral."""
+        if score > SENTIMENT_THRESHOLD:
+            return "positive"
+        if score < -SENTIMENT_THRESHOLD:
+            return "negative"
+        return "neutral"
+
+
+def extract_topics(text: str) -> List[str]:
+    """Temas mencionados en un comentario."""
+    text_lower = text.lower()
+    return [
+        topic
+        for topic, keywords in TOPIC_KEYWORDS.items()
+        if any(keyword in text_lower for keyword in keywords)
+    ]
+
+
+def nps_bucket(overall_rating: int, would_recommend: Optional[bool]) -> str:
+    """
+    Bucket de NPS adaptado a la escala 1-5: promotores (5 y recomendaría),
+    detractores (1-3) y pasivos (el resto).
+    """
+    if overall_rating == 5 and would_recommend:
+        return "promoter"
+    if overall_rating <= 3:
+        return "detractor"
+    return "passive"
+
+
+def to_day(value: Any) -> date:
+    """Día (UTC) de un datetime o de un timestamp ISO devuelto por la BD."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.utcnow().date()
+
+
+@dataclass
+class DailyFeedbackBucket:
+    """Contadores de un día de feedback."""
+
+    total: int = 0
+    positive: int = 0
+    negative: int = 0
+    rating_histogram: List[int] = field(default_factory=lambda: [0] * 6)
+    sentiment: Counter = field(default_factory=Counter)
+    topics: Counter = field(default_factory=Counter)
+    improvement_categories: Counter = field(default_factory=Counter)
+    # agente -> [suma de ratings, número de ratings, total de feedback]
+    agents: Dict[str, List[int]] = field(default_factory=dict)
+    nps: Counter = field(default_factory=Counter)
+
+
+class FeedbackAggregates:
+    """
+    Agregados de feedback por día, actualizados en O(1) por evento.
+
+    Las consultas recorren solo los días del rango pedido (acotados por
+    ``retention_days``), nunca las filas de feedback, y su resultado se
+    memoiza hasta la siguiente escritura.
+    """
+
+    def __init__(self, retention_days: int = 400):
+        self.retention_days = retention_days
+        self._days: Dict[date, DailyFeedbackBucket] = {}
+        self._version = 0
+        self._snapshots: Dict[Tuple[Optional[date], Optional[date]], Tuple[int, Dict[str, Any]]] = {}
+        self.events = 0
+
+    def _bucket(self, day: date) -> Optional[DailyFeedbackBucket]:
+        bucket = self._days.get(day)
+        if bucket is None:
+            oldest = datetime.utcnow().date() - timedelta(days=self.retention_days)
+            if day < oldest:
+                return None
+            bucket = self._days[day] = DailyFeedbackBucket()
+            if len(self._days) > self.retention_days + 1:
+                for stale in [d for d in self._days if d < oldest]:
+                    del self._days[stale]
+        self._version += 1
+        self.events += 1
+        return bucket
+
+    def add_message_feedback(
+        self,
+        created_at: Any,
+        feedback_type: str,
+        rating: Optional[int] = None,
+        categories: Iterable[str] = (),
+        sentiment: Optional[float] = None,
+        topics: Iterable[str] = (),
+        agent_id: Optional[str] = None,
+    ) -> None:
+        """Acumula un feedback de mensaje."""
+        bucket = self._bucket(to_day(created_at))
+        if bucket is None:
+            return
+
+        bucket.total += 1
+        if feedback_type in POSITIVE_TYPES or (rating and rating >= 4):
+            bucket.positive += 1
+        if rating and 1 <= rating <= 5:
+            bucket.rating_histogram[rating] += 1
+        if sentiment is not None:
+            bucket.sentiment[SentimentScorer.label(sentiment)] += 1
+        bucket.topics.update(topics)
+
+        if feedback_type in NEGATIVE_TYPES or (rating and rating <= 2):
+            bucket.negative += 1
+            bucket.improvement_categories.update(categories)
+
+        if agent_id:
+            stats = bucket.agents.setdefault(agent_id, [0, 0, 0])
+            if rating:
+                stats[0] += rating
+                stats[1] += 1
+            stats[2] += 1
+
+    def add_session_feedback(
+        self, created_at: Any, overall_rating: int, would_recommend: Optional[bool]
+    ) -> None:
+        """Acumula un feedback de sesión en los buckets de NPS."""
+        bucket = self._bucket(to_day(created_at))
+        if bucket is not None:
+            bucket.nps[nps_bucket(overall_rating, would_recommend)] += 1
+
+    def snapshot(
+        self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Analíticas del rango [start_date, end_date] (por días completos).
+
+        Returns:
+            Dict con los campos de FeedbackAnalytics
+        """
+        key = (
+            start_date.date() if start_date else None,
+            end_date.date() if end_date else None,
+        )
+        cached = self._snapshots.get(key)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+
+        days = sorted(
+            day
+            for day in self._days
+            if (key[0] is None or day >= key[0]) and (key[1] is None or day <= key[1])
+        )
+
+        sentiment: Counter = Counter()
+        topics: Counter = Counter()
+        categories: Counter = Counter()
+        nps: Counter = Counter()
+        agents: Dict[str, List[int]] = {}
+        negative_total = 0
+        trend = []
+
+        for day in days:
+            bucket = self._days[day]
+            sentiment.update(bucket.sentiment)
+            topics.update(bucket.topics)
+            categories.update(bucket.improvement_categories)
+            nps.update(bucket.nps)
+            negative_total += bucket.negative
+            for agent_id, (rating_sum, rated, total) in bucket.agents.items():
+                stats = agents.setdefault(agent_id, [0, 0, 0])
+                stats[0] += rating_sum
+                stats[1] += rated
+                stats[2] += total
+            if bucket.total:
+                trend.append(
+                    {
+                        "date": day.isoformat(),
+                        "satisfaction_rate": bucket.positive / bucket.total,
+                        "total_feedback": bucket.total,
+                        "rating_distribution": {
+                            str(rating): bucket.rating_histogram[rating]
+                            for rating in range(1, 6)
+                        },
+                    }
+                )
+
+        with_comments = sum(sentiment.values())
+        sentiment_analysis = {
+            label: (sentiment[label] / with_comments if with_comments else 0)
+            for label in ("positive", "negative", "neutral")
+        }
+
+        nps_total = sum(nps.values())
+        nps_score = (
+            round((nps["promoter"] - nps["detractor"]) / nps_total * 100, 1)
+            if nps_total
+            else None
+        )
+
+        result = {
+            "sentiment_analysis": sentiment_analysis,
+            "trending_topics": [
+                {"topic": topic, "mentions": count} for topic, count in topics.most_common(5)
+            ],
+            "agent_performance": {
+                agent_id: {
+                    "avg_rating": round(rating_sum / rated, 2) if rated else None,
+                    "total_feedback": total,
+                }
+                for agent_id, (rating_sum, rated, total) in agents.items()
+            },
+            "user_satisfaction_trend": trend,
+            "improvement_areas": [
+                {
+                    "category": category,
+                    "issue_count": count,
+                    "percentage": (count / negative_total) * 100 if negative_total else 0,
+                }
+                for category, count in categories.most_common(5)
+            ],
+            "nps_score": nps_score,
+        }
+        self._snapshots[key] = (self._version, result)
+        if len(self._snapshots) > 64:
+            self._snapshots = {key: self._snapshots[key]}
+        return result
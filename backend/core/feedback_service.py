@@ -20,6 +20,11 @@ from core.metrics import (
     METRICS_REGISTRY,
 )
 from clients.supabase_client import SupabaseClient
+from core.feedback_aggregates import (
+    FeedbackAggregates,
+    SentimentScorer,
+    extract_topics,
+)
 from app.schemas.feedback import (
     FeedbackType,
     FeedbackCategory,
@@ -66,9 +71,29 @@ class FeedbackService:
         """Inicializa el servicio de feedback."""
         self.supabase_client = SupabaseClient()
         self._feedback_cache = {}
-        self._analytics_cache = {}
         self._cache_ttl = 300  # 5 minutos
 
+        # Analíticas materializadas: se actualizan en cada registro, se
+        # reconstruyen desde la BD con backfill_aggregates() y cada
+        # _sync_interval segundos leen solo las filas nuevas de la BD, de modo
+        # que todas las réplicas convergen con lo escrito por las demás
+        self.sentiment_scorer = SentimentScorer()
+        self.aggregates = FeedbackAggregates()
+        self._aggregates_ready = False
+        self._rebuilding: Optional[FeedbackAggregates] = None
+        self._backfill_task: Optional[asyncio.Task] = None
+        self._backfill_page_size = 1000
+        self._sync_interval = self._cache_ttl
+        self._sync_overlap = timedelta(seconds=60)
+        self._synced_until: Optional[datetime] = None
+        self._last_sync = float("-inf")
+        # Filas ya aplicadas dentro de la ventana de solape (clave -> created_at)
+        self._applied: Dict[str, datetime] = {}
+        # Backoff tras un backfill/sincronización fallidos
+        self._retry_at = float("-inf")
+        self._retry_delay = 30.0
+        self._max_retry_delay = 900.0
+
     async def initialize(self):
         """Inicializa el servicio y verifica/crea tablas necesarias."""
         logger.info("Inicializando servicio de feedback...")
@@ -79,6 +104,9 @@ class FeedbackService:
         # Crear tablas si no existen
         await self._ensure_tables_exist()
 
+        # Reconstruir los agregados en segundo plano
+        self._ensure_backfill()
+
         logger.info("Servicio de feedback inicializado")
 
     async def _ensure_tables_exist(self):
@@ -194,12 +222,15 @@ class FeedbackService:
             ).inc()
 
             # Analizar sentimiento si hay comentario
+            sentiment_score = None
             if request.comment:
                 sentiment_score = await self._analyze_sentiment(request.comment)
                 feedback_sentiment_score.observe(sentiment_score)
 
-            # Invalidar caché de analytics
-            self._invalidate_analytics_cache()
+            # Actualizar analíticas materializadas
+            now = datetime.utcnow()
+            self._mark_applied("feedback", feedback_data, now)
+            self._apply_message_feedback(now, feedback_data, sentiment_score)
 
             return FeedbackResponse(
                 feedback_id=feedback_id,
@@ -265,14 +296,10 @@ class FeedbackService:
                 type="session", rating=str(request.overall_rating)
             ).inc()
 
-            # Calcular NPS si aplica
-            if request.would_recommend is not None:
-                await self._update_nps_metrics(
-                    request.would_recommend, request.overall_rating
-                )
-
-            # Invalidar caché
-            self._invalidate_analytics_cache()
+            # Actualizar buckets de NPS
+            now = datetime.utcnow()
+            self._mark_applied("session_feedback", feedback_data, now)
+            self._apply_session_feedback(now, feedback_data)
 
             return FeedbackResponse(
                 feedback_id=feedback_id,
@@ -444,6 +471,12 @@ class FeedbackService:
         """
         Obtiene analytics avanzados del feedback.
 
+        Se calculan a partir de los agregados diarios, por lo que el coste no
+        depende del volumen de feedback. La primera llamada espera al
+        backfill inicial si aún no se ha hecho; después, si la última
+        sincronización tiene más de ``_sync_interval`` segundos, se leen
+        solo las filas nuevas.
+
         Args:
             start_date: Fecha de inicio
             end_date: Fecha de fin
@@ -451,29 +484,10 @@ class FeedbackService:
         Returns:
             FeedbackAnalytics con análisis detallado
         """
-        # Verificar caché
-        cache_key = f"analytics_{start_date}_{end_date}"
-        if cache_key in self._analytics_cache:
-            cached_data, cached_time = self._analytics_cache[cache_key]
-            if datetime.utcnow() - cached_time < timedelta(seconds=self._cache_ttl):
-                return cached_data
-
         try:
-            # Obtener todos los feedbacks del período
-            filters = FeedbackFilter(
-                start_date=start_date,
-                end_date=end_date,
-                limit=1000,  # Ajustar según necesidad
-            )
-            feedback_list = await self.search_feedback(filters)
+            await self._refresh_aggregates()
 
-            # Analizar datos
-            analytics = await self._perform_analytics(feedback_list.items)
-
-            # Cachear resultado
-            self._analytics_cache[cache_key] = (analytics, datetime.utcnow())
-
-            return analytics
+            return FeedbackAnalytics(**self.aggregates.snapshot(start_date, end_date))
 
         except Exception as e:
             logger.error(f"Error al generar analytics: {str(e)}")
@@ -486,6 +500,244 @@ class FeedbackService:
                 improvement_areas=[],
             )
 
+    async def _refresh_aggregates(self) -> None:
+        """Espera al backfill o a la sincronización si tocan (respetando el backoff)."""
+        now = asyncio.get_event_loop().time()
+        if now < self._retry_at:
+            return
+        if self._aggregates_ready and now - self._last_sync < self._sync_interval:
+            return
+        await self._ensure_backfill()
+
+    def _ensure_backfill(self) -> "asyncio.Task":
+        """Lanza el backfill (o la sincronización incremental) si no hay uno en curso."""
+        if self._backfill_task is None or self._backfill_task.done():
+            self._backfill_task = asyncio.create_task(self._run_refresh())
+        return self._backfill_task
+
+    async def _run_refresh(self) -> None:
+        """Backfill completo o sincronización incremental, con backoff si falla."""
+        loop = asyncio.get_event_loop()
+        try:
+            if self._aggregates_ready:
+                await self.sync_aggregates()
+            else:
+                await self.backfill_aggregates()
+        except Exception as e:
+            self._retry_at = loop.time() + self._retry_delay
+            logger.error(
+                f"Error actualizando agregados de feedback, reintento en "
+                f"{self._retry_delay:.0f}s: {str(e)}"
+            )
+            self._retry_delay = min(self._retry_delay * 2, self._max_retry_delay)
+        else:
+            self._last_sync = loop.time()
+            self._retry_at = float("-inf")
+            self._retry_delay = 30.0
+
+    async def backfill_aggregates(
+        self, page_size: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Reconstruye los agregados leyendo todo el feedback almacenado.
+
+        Se recorren ambas tablas por páginas hasta el instante de inicio; el
+        feedback registrado mientras tanto se aplica también a los agregados
+        en construcción, que sustituyen a los actuales al terminar.
+
+        Args:
+            page_size: Filas por página (por defecto 1000)
+
+        Returns:
+            Dict con el número de filas procesadas por tabla
+        """
+        page_size = page_size or self._backfill_page_size
+        cutoff = datetime.utcnow()
+        rebuilt = FeedbackAggregates(self.aggregates.retention_days)
+        self._rebuilding = rebuilt
+        start_time = asyncio.get_event_loop().time()
+
+        try:
+            # Las filas del backfill no se deduplican contra ``_applied``:
+            # los agregados nuevos parten de cero
+            counts = await self._ingest(cutoff, None, page_size, (rebuilt,))
+            self.aggregates = rebuilt
+            self._aggregates_ready = True
+            self._synced_until = cutoff
+            self._prune_applied()
+            logger.info(f"Agregados de feedback reconstruidos: {counts}")
+            return counts
+        finally:
+            self._rebuilding = None
+            feedback_processing_time.labels(operation="backfill").observe(
+                asyncio.get_event_loop().time() - start_time
+            )
+
+    async def sync_aggregates(self, page_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Aplica a los agregados el feedback guardado desde la última sincronización.
+
+        Lee las filas creadas desde ``_synced_until`` menos un margen de
+        solape (para las transacciones que confirman tarde) y omite las ya
+        aplicadas, incluidas las registradas por esta misma réplica.
+
+        Returns:
+            Dict con el número de filas nuevas aplicadas por tabla
+        """
+        if self._synced_until is None:
+            return await self.backfill_aggregates(page_size)
+
+        page_size = page_size or self._backfill_page_size
+        cutoff = datetime.utcnow()
+        since = self._synced_until - self._sync_overlap
+        start_time = asyncio.get_event_loop().time()
+        try:
+            counts = await self._ingest(cutoff, since, page_size, None)
+            self._synced_until = cutoff
+            self._prune_applied()
+            if any(counts.values()):
+                logger.debug(f"Agregados de feedback sincronizados: {counts}")
+            return counts
+        finally:
+            feedback_processing_time.labels(operation="sync").observe(
+                asyncio.get_event_loop().time() - start_time
+            )
+
+    async def _ingest(
+        self,
+        cutoff: datetime,
+        since: Optional[datetime],
+        page_size: int,
+        targets: Optional[Tuple[FeedbackAggregates, ...]],
+    ) -> Dict[str, int]:
+        """Aplica las filas de ambas tablas creadas en ``[since, cutoff]``."""
+        deduplicate = targets is None
+        counts = {"feedback": 0, "session_feedback": 0}
+
+        async for rows in self._paginate("feedback", cutoff, page_size, since):
+            if deduplicate:
+                rows = [row for row in rows if self._mark_applied("feedback", row)]
+            else:
+                for row in rows:
+                    self._mark_applied("feedback", row)
+            comments = [row.get("comment") or "" for row in rows]
+            scores = self.sentiment_scorer.score_batch(comments)
+            for row, comment, score in zip(rows, comments, scores):
+                self._apply_message_feedback(
+                    row.get("created_at"),
+                    row,
+                    score if comment else None,
+                    targets=targets,
+                )
+            counts["feedback"] += len(rows)
+
+        async for rows in self._paginate("session_feedback", cutoff, page_size, since):
+            for row in rows:
+                if self._mark_applied("session_feedback", row) or not deduplicate:
+                    self._apply_session_feedback(
+                        row.get("created_at"), row, targets=targets
+                    )
+                    counts["session_feedback"] += 1
+
+        return counts
+
+    def _mark_applied(
+        self, table: str, row: Dict[str, Any], created_at: Optional[datetime] = None
+    ) -> bool:
+        """Registra una fila como aplicada; False si ya lo estaba."""
+        key = f"{table}:{row.get('id') or json.dumps(row, sort_keys=True, default=str)}"
+        if key in self._applied:
+            return False
+        if created_at is None:
+            value = row.get("created_at")
+            created_at = (
+                datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(
+                    tzinfo=None
+                )
+                if value
+                else datetime.utcnow()
+            )
+        self._applied[key] = created_at
+        return True
+
+    def _prune_applied(self) -> None:
+        """Olvida las filas anteriores a la ventana de solape."""
+        if self._synced_until is None:
+            return
+        horizon = self._synced_until - self._sync_overlap
+        self._applied = {
+            key: created_at
+            for key, created_at in self._applied.items()
+            if created_at >= horizon
+        }
+
+    async def _paginate(
+        self,
+        table: str,
+        cutoff: datetime,
+        page_size: int,
+        since: Optional[datetime] = None,
+    ):
+        """Itera las filas de una tabla creadas hasta ``cutoff`` (y desde ``since``), por páginas."""
+        offset = 0
+        while True:
+            query = self.supabase_client.table(table).select("*")
+            if since is not None:
+                query = query.gte("created_at", since.isoformat())
+            query = (
+                query.lte("created_at", cutoff.isoformat())
+                .order("created_at")
+                .limit(page_size)
+                .offset(offset)
+            )
+            result = await query.execute()
+            rows = result.data or []
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            offset += page_size
+
+    def _targets(self) -> Tuple[FeedbackAggregates, ...]:
+        """Agregados a actualizar (incluye los que se están reconstruyendo)."""
+        if self._rebuilding is None:
+            return (self.aggregates,)
+        return (self.aggregates, self._rebuilding)
+
+    def _apply_message_feedback(
+        self,
+        created_at: Any,
+        feedback: Dict[str, Any],
+        sentiment_score: Optional[float],
+        targets: Optional[Tuple[FeedbackAggregates, ...]] = None,
+    ) -> None:
+        """Acumula un feedback de mensaje en los agregados."""
+        comment = feedback.get("comment")
+        topics = extract_topics(comment) if comment else []
+        metadata = feedback.get("metadata") or {}
+        for aggregates in targets or self._targets():
+            aggregates.add_message_feedback(
+                created_at,
+                feedback["feedback_type"],
+                rating=feedback.get("rating"),
+                categories=feedback.get("categories") or [],
+                sentiment=sentiment_score,
+                topics=topics,
+                agent_id=metadata.get("agent_id"),
+            )
+
+    def _apply_session_feedback(
+        self,
+        created_at: Any,
+        feedback: Dict[str, Any],
+        targets: Optional[Tuple[FeedbackAggregates, ...]] = None,
+    ) -> None:
+        """Acumula un feedback de sesión en los buckets de NPS."""
+        for aggregates in targets or self._targets():
+            aggregates.add_session_feedback(
+                created_at, feedback["overall_rating"], feedback.get("would_recommend")
+            )
+
     async def _calculate_stats(
         self, feedbacks: List[Dict[str, Any]], start_date: datetime, end_date: datetime
     ) -> FeedbackStats:
@@ -556,51 +808,8 @@ class FeedbackService:
             Score entre -1 (muy negativo) y 1 (muy positivo)
         """
         # TODO: Implementar análisis de sentimiento real
-        # Por ahora, usar heurísticas simples
-
-        positive_words = [
-            "excelente",
-            "bueno",
-            "genial",
-            "útil",
-            "rápido",
-            "eficiente",
-            "gracias",
-        ]
-        negative_words = [
-            "malo",
-            "lento",
-            "error",
-            "problema",
-            "falla",
-            "no funciona",
-            "terrible",
-        ]
-
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-
-        if positive_count + negative_count == 0:
-            return 0.0
-
-        score = (positive_count - negative_count) / (positive_count + negative_count)
-        return max(-1.0, min(1.0, score))
-
-    async def _update_nps_metrics(self, would_recommend: bool, rating: int):
-        """Actualiza métricas de Net Promoter Score."""
-        # NPS: Promotores (9-10), Pasivos (7-8), Detractores (0-6)
-        # Adaptado a escala 1-5: Promotores (5), Pasivos (4), Detractores (1-3)
-
-        if rating == 5 and would_recommend:
-            category = "promoter"
-        elif rating == 4:
-            category = "passive"
-        else:
-            category = "detractor"
-
-        # Registrar en métricas (crear métrica si es necesario)
-        # TODO: Implementar métrica específica de NPS
+        # Por ahora, heurísticas simples memoizadas en SentimentScorer
+        return self.sentiment_scorer.score(text)
 
     def _extract_common_issues(
         self, issues: List[Dict[str, Any]]
@@ -632,196 +841,19 @@ class FeedbackService:
 
         return common_issues
 
-    async def _perform_analytics(
-        self, feedbacks: List[FeedbackItem]
-    ) -> FeedbackAnalytics:
-        """Realiza análisis avanzados sobre el feedback."""
-        # Análisis de sentimiento agregado
-        sentiments = {"positive": 0, "negative": 0, "neutral": 0}
-        for feedback in feedbacks:
-            if feedback.comment:
-                score = await self._analyze_sentiment(feedback.comment)
-                if score > 0.3:
-                    sentiments["positive"] += 1
-                elif score < -0.3:
-                    sentiments["negative"] += 1
-                else:
-                    sentiments["neutral"] += 1
-
-        total_with_comments = sum(sentiments.values())
-        if total_with_comments > 0:
-            for key in sentiments:
-                sentiments[key] = sentiments[key] / total_with_comments
-
-        # Trending topics (simplificado)
-        topics = self._extract_trending_topics(feedbacks)
-
-        # Performance por agente (simulado por ahora)
-        agent_performance = {
-            "orchestrator": {"avg_rating": 4.2, "total_feedback": 150},
-            "elite_training_strategist": {"avg_rating": 4.5, "total_feedback": 89},
-            "precision_nutrition_architect": {"avg_rating": 4.1, "total_feedback": 76},
+    def get_aggregates_stats(self) -> Dict[str, Any]:
+        """Estado de los agregados materializados y del evaluador de sentimiento."""
+        return {
+            "ready": self._aggregates_ready,
+            "rebuilding": self._rebuilding is not None,
+            "synced_until": (
+                self._synced_until.isoformat() if self._synced_until else None
+            ),
+            "events": self.aggregates.events,
+            "sentiment_cache_hits": self.sentiment_scorer.hits,
+            "sentiment_cache_misses": self.sentiment_scorer.misses,
         }
 
-        # Tendencia de satisfacción (últimos 7 días)
-        satisfaction_trend = self._calculate_satisfaction_trend(feedbacks)
-
-        # Áreas de mejora
-        improvement_areas = self._identify_improvement_areas(feedbacks)
-
-        # Calcular NPS
-        nps_score = await self._calculate_nps(feedbacks)
-
-        return FeedbackAnalytics(
-            sentiment_analysis=sentiments,
-            trending_topics=topics,
-            agent_performance=agent_performance,
-            user_satisfaction_trend=satisfaction_trend,
-            improvement_areas=improvement_areas,
-            nps_score=nps_score,
-        )
-
-    def _extract_trending_topics(
-        self, feedbacks: List[FeedbackItem]
-    ) -> List[Dict[str, Any]]:
-        """Extrae temas trending del feedback."""
-        # Implementación simplificada
-        topics = Counter()
-
-        for feedback in feedbacks:
-            if feedback.comment:
-                # Extraer temas (simplificado)
-                if (
-                    "velocidad" in feedback.comment.lower()
-                    or "rápido" in feedback.comment.lower()
-                ):
-                    topics["velocidad"] += 1
-                if (
-                    "precisión" in feedback.comment.lower()
-                    or "preciso" in feedback.comment.lower()
-                ):
-                    topics["precisión"] += 1
-                if (
-                    "interfaz" in feedback.comment.lower()
-                    or "ui" in feedback.comment.lower()
-                ):
-                    topics["interfaz"] += 1
-
-        return [
-            {"topic": topic, "mentions": count}
-            for topic, count in topics.most_common(5)
-        ]
-
-    def _calculate_satisfaction_trend(
-        self, feedbacks: List[FeedbackItem]
-    ) -> List[Dict[str, Any]]:
-        """Calcula la tendencia de satisfacción en el tiempo."""
-        # Agrupar por día
-        daily_satisfaction = defaultdict(lambda: {"total": 0, "positive": 0})
-
-        for feedback in feedbacks:
-            day = feedback.created_at.date()
-            daily_satisfaction[day]["total"] += 1
-
-            if feedback.feedback_type == FeedbackType.THUMBS_UP:
-                daily_satisfaction[day]["positive"] += 1
-            elif feedback.rating and feedback.rating >= 4:
-                daily_satisfaction[day]["positive"] += 1
-
-        # Convertir a lista ordenada
-        trend = []
-        for date, data in sorted(daily_satisfaction.items()):
-            satisfaction_rate = (
-                data["positive"] / data["total"] if data["total"] > 0 else 0
-            )
-            trend.append(
-                {
-                    "date": date.isoformat(),
-                    "satisfaction_rate": satisfaction_rate,
-                    "total_feedback": data["total"],
-                }
-            )
-
-        return trend
-
-    def _identify_improvement_areas(
-        self, feedbacks: List[FeedbackItem]
-    ) -> List[Dict[str, Any]]:
-        """Identifica las principales áreas de mejora."""
-        # Analizar feedback negativo
-        negative_feedback = [
-            f
-            for f in feedbacks
-            if f.feedback_type == FeedbackType.THUMBS_DOWN
-            or (f.rating and f.rating <= 2)
-            or f.feedback_type in [FeedbackType.ISSUE, FeedbackType.SUGGESTION]
-        ]
-
-        # Agrupar por categoría
-        category_issues = defaultdict(int)
-        for feedback in negative_feedback:
-            for category in feedback.categories:
-                category_issues[category] += 1
-
-        # Ordenar por frecuencia
-        improvement_areas = []
-        for category, count in sorted(
-            category_issues.items(), key=lambda x: x[1], reverse=True
-        )[:5]:
-            improvement_areas.append(
-                {
-                    "category": category.value,
-                    "issue_count": count,
-                    "percentage": (
-                        (count / len(negative_feedback)) * 100
-                        if negative_feedback
-                        else 0
-                    ),
-                }
-            )
-
-        return improvement_areas
-
-    async def _calculate_nps(self, feedbacks: List[FeedbackItem]) -> Optional[float]:
-        """Calcula el Net Promoter Score."""
-        # Buscar feedback de sesión para NPS
-        try:
-            # Query session feedback
-            result = (
-                await self.supabase_client.table("session_feedback")
-                .select("*")
-                .execute()
-            )
-            session_feedbacks = result.data if result.data else []
-
-            if not session_feedbacks:
-                return None
-
-            promoters = sum(
-                1
-                for f in session_feedbacks
-                if f.get("overall_rating") == 5 and f.get("would_recommend")
-            )
-            detractors = sum(
-                1 for f in session_feedbacks if f.get("overall_rating") <= 3
-            )
-            total = len(session_feedbacks)
-
-            if total == 0:
-                return None
-
-            nps = ((promoters - detractors) / total) * 100
-            return round(nps, 1)
-
-        except Exception as e:
-            logger.error(f"Error calculando NPS: {str(e)}")
-            return None
-
-    def _invalidate_analytics_cache(self):
-        """Invalida el caché de analytics."""
-        self._analytics_cache.clear()
-        logger.debug("Caché de analytics invalidado")
-
 
 # Instancia singleton del servicio
 feedback_service = FeedbackService()
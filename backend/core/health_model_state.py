@@ -0,0 +1,320 @@
+"""
+Estado incremental de los modelos de trayectoria de salud.
+
+Cada par (usuario, métrica) guarda estadísticas suficientes que se
+actualizan en O(1) con cada punto nuevo, de modo que las trayectorias se
+calculan sin volver a leer ni reajustar el historial:
+
+- ``RegressionStats``: sumas de la regresión lineal valor ~ días, con
+  ventana deslizante (los puntos que salen se restan)
+- ``EWMStats``: media y varianza con ponderación exponencial
+- ``HoltState``: nivel y tendencia por día (Holt con intervalos irregulares)
+- ``WeeklyMeans``: medias semanales con la misma agrupación que usaba el
+  predictor de adherencia
+
+``ModelStateStore`` mantiene esos estados por usuario con expulsión LRU.
+
+Cada estado recuerda hasta qué momento de ingesta ha leído del
+almacenamiento (``ingested_until``) y los ids de los puntos recientes, para
+ponerse al día con lo que guarden otros procesos sin contar nada dos veces.
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+
+
+@dataclass
+class RegressionStats:
+    """Sumas de una regresión lineal simple sobre una ventana de días."""
+
+    window_days: int = 90
+    n: int = 0
+    sum_x: float = 0.0
+    sum_y: float = 0.0
+    sum_xx: float = 0.0
+    sum_xy: float = 0.0
+    sum_yy: float = 0.0
+    points: Deque[Tuple[datetime, int, float]] = field(default_factory=deque)
+
+    def add(self, timestamp: datetime, x: int, y: float) -> None:
+        self._apply(x, y, 1)
+        self.points.append((timestamp, x, y))
+        cutoff = timestamp - timedelta(days=self.window_days)
+        while self.points and self.points[0][0] < cutoff:
+            _, old_x, old_y = self.points.popleft()
+            self._apply(old_x, old_y, -1)
+
+    def _apply(self, x: float, y: float, sign: int) -> None:
+        self.n += sign
+        self.sum_x += sign * x
+        self.sum_y += sign * y
+        self.sum_xx += sign * x * x
+        self.sum_xy += sign * x * y
+        self.sum_yy += sign * y * y
+
+    def fit(self) -> Tuple[float, float]:
+        """Pendiente e intersección por mínimos cuadrados."""
+        if self.n == 0:
+            return 0.0, 0.0
+        denominator = self.n * self.sum_xx - self.sum_x**2
+        if denominator == 0:
+            return 0.0, self.sum_y / self.n
+        slope = (self.n * self.sum_xy - self.sum_x * self.sum_y) / denominator
+        return slope, (self.sum_y - slope * self.sum_x) / self.n
+
+    def r_squared(self) -> float:
+        """1 - var(residuos)/var(y); 0 si los valores no varían."""
+        if self.n < 2:
+            return 0.0
+        s_xx = self.sum_xx - self.sum_x**2 / self.n
+        s_xy = self.sum_xy - self.sum_x * self.sum_y / self.n
+        s_yy = self.sum_yy - self.sum_y**2 / self.n
+        if s_xx <= 0 or s_yy <= 0:
+            return 0.0
+        return max(0.0, min(1.0, s_xy * s_xy / (s_xx * s_yy)))
+
+
+@dataclass
+class EWMStats:
+    """Media y varianza con ponderación exponencial."""
+
+    alpha: float = 0.3
+    count: int = 0
+    mean: float = 0.0
+    variance: float = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if self.count == 1:
+            self.mean, self.variance = value, 0.0
+            return
+        diff = value - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + diff * increment)
+
+    @property
+    def std(self) -> float:
+        return self.variance**0.5
+
+
+@dataclass
+class HoltState:
+    """Suavizado de Holt con tendencia expresada por día."""
+
+    alpha: float = 0.4
+    beta: float = 0.2
+    level: Optional[float] = None
+    trend: float = 0.0  # unidades por día
+    last_timestamp: Optional[datetime] = None
+
+    def add(self, timestamp: datetime, value: float) -> None:
+        if self.level is None or self.last_timestamp is None:
+            self.level, self.last_timestamp = value, timestamp
+            return
+
+        elapsed = (timestamp - self.last_timestamp).total_seconds() / SECONDS_PER_DAY
+        if elapsed <= 0:
+            # Mismo instante o punto atrasado: solo corrige el nivel
+            self.level = self.alpha * value + (1 - self.alpha) * self.level
+            return
+
+        previous = self.level
+        forecast = self.level + self.trend * elapsed
+        self.level = self.alpha * value + (1 - self.alpha) * forecast
+        self.trend = self.beta * (self.level - previous) / elapsed + (1 - self.beta) * self.trend
+        self.last_timestamp = timestamp
+
+    def forecast(self, days_ahead: float) -> float:
+        return (self.level or 0.0) + self.trend * days_ahead
+
+
+@dataclass
+class WeeklyMeans:
+    """
+    Medias por semana: una semana empieza en el primer día con datos y
+    termina cuando llega un punto a 7 o más días de ese inicio.
+    """
+
+    max_weeks: int = 13
+    week_start: Optional[datetime] = None
+    week_sum: float = 0.0
+    week_count: int = 0
+    closed: Deque[float] = field(default_factory=deque)
+    closed_sum: float = 0.0
+
+    def add(self, timestamp: datetime, value: float) -> None:
+        day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.week_start is not None and (day - self.week_start).days >= 7:
+            self._close_week()
+        if self.week_count == 0:
+            self.week_start = day
+        self.week_sum += value
+        self.week_count += 1
+
+    def _close_week(self) -> None:
+        mean = self.week_sum / self.week_count
+        self.closed.append(mean)
+        self.closed_sum += mean
+        if len(self.closed) > self.max_weeks - 1:
+            self.closed_sum -= self.closed.popleft()
+        self.week_sum, self.week_count = 0.0, 0
+
+    @property
+    def weeks(self) -> int:
+        return len(self.closed) + (1 if self.week_count else 0)
+
+    @property
+    def current(self) -> Optional[float]:
+        """Media de la semana en curso (siempre abierta tras el primer punto)."""
+        return self.week_sum / self.week_count if self.week_count else None
+
+    def recent_trend(self) -> float:
+        """Media de las dos últimas semanas menos la media de las anteriores."""
+        if self.weeks < 2:
+            return 0.0
+        previous = self.closed[-1]
+        recent = (self.current + previous) / 2
+        older_count = len(self.closed) - 1
+        if older_count == 0:
+            # Con dos semanas se compara contra la primera, como antes
+            return recent - previous
+        return recent - (self.closed_sum - previous) / older_count
+
+
+@dataclass
+class MetricState:
+    """Estadísticas suficientes de una métrica de un usuario."""
+
+    regression: RegressionStats = field(default_factory=RegressionStats)
+    ewm: EWMStats = field(default_factory=EWMStats)
+    holt: HoltState = field(default_factory=HoltState)
+    weekly: WeeklyMeans = field(default_factory=WeeklyMeans)
+    count: int = 0
+    origin: Optional[datetime] = None
+    last_value: Optional[float] = None
+    last_timestamp: Optional[datetime] = None
+    metric_type: Any = None
+    user_id: Optional[str] = None
+    ingested_until: Optional[datetime] = None
+    recent_ids: Dict[str, Optional[datetime]] = field(default_factory=dict)
+
+    def observe(self, point: Any) -> bool:
+        """
+        Sumar un HealthDataPoint (o equivalente) en O(1) amortizado.
+
+        Returns:
+            False si el punto ya se había contado
+        """
+        point_id = getattr(point, "id", None)
+        if point_id is not None:
+            if point_id in self.recent_ids:
+                return False
+            self.recent_ids[point_id] = getattr(point, "ingested_at", None)
+
+        if self.origin is None:
+            self.origin = point.timestamp
+            self.metric_type = point.metric_type
+            self.user_id = point.user_id
+
+        value = float(point.value)
+        self.regression.add(point.timestamp, (point.timestamp - self.origin).days, value)
+        self.ewm.add(value)
+        self.holt.add(point.timestamp, value)
+        self.weekly.add(point.timestamp, value)
+
+        self.count += 1
+        if self.last_timestamp is None or point.timestamp >= self.last_timestamp:
+            self.last_value, self.last_timestamp = value, point.timestamp
+        return True
+
+    def catch_up(self, points: Any) -> int:
+        """
+        Sumar, en orden, los puntos leídos del almacenamiento que aún no se
+        habían contado y avanzar ``ingested_until``.
+
+        La lectura siguiente pide lo ingerido desde ``ingested_until``
+        (inclusive), así que solo hace falta recordar los ids a partir de ahí.
+        """
+        added = 0
+        for point in sorted(points, key=lambda p: p.timestamp):
+            if self.observe(point):
+                added += 1
+            ingested_at = getattr(point, "ingested_at", None)
+            if ingested_at is not None and (
+                self.ingested_until is None or ingested_at > self.ingested_until
+            ):
+                self.ingested_until = ingested_at
+
+        if self.ingested_until is not None:
+            cursor = self.ingested_until
+            self.recent_ids = {
+                point_id: ingested_at
+                for point_id, ingested_at in self.recent_ids.items()
+                if ingested_at is None or ingested_at >= cursor
+            }
+        return added
+
+    @property
+    def window_size(self) -> int:
+        """Puntos dentro de la ventana de la regresión."""
+        return self.regression.n
+
+    @property
+    def last_day(self) -> int:
+        return (self.last_timestamp - self.origin).days if self.origin else 0
+
+
+class ModelStateStore:
+    """Estados por usuario y métrica con expulsión LRU de usuarios."""
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._states: "OrderedDict[str, Dict[Hashable, MetricState]]" = OrderedDict()
+
+    def get(self, user_id: str, metric_type: Hashable) -> Optional[MetricState]:
+        metrics = self._states.get(user_id)
+        if metrics is None or metric_type not in metrics:
+            return None
+        self._states.move_to_end(user_id)
+        return metrics[metric_type]
+
+    def observe(self, point: Any) -> MetricState:
+        """Actualizar el estado del usuario y métrica del punto."""
+        metrics = self._states.pop(point.user_id, {})
+        self._states[point.user_id] = metrics
+        while len(self._states) > self.max_users:
+            self._states.popitem(last=False)
+
+        state = metrics.get(point.metric_type)
+        if state is None:
+            state = metrics[point.metric_type] = MetricState()
+        state.observe(point)
+        return state
+
+    def load(self, user_id: str, metric_type: Hashable, points: Any) -> MetricState:
+        """Construir el estado desde el historial (arranque en frío)."""
+        metrics = self._states.setdefault(user_id, {})
+        state = metrics[metric_type] = MetricState(user_id=user_id, metric_type=metric_type)
+        state.catch_up(points)
+        self._states.move_to_end(user_id)
+        while len(self._states) > self.max_users:
+            self._states.popitem(last=False)
+        return state
+
+    def has(self, user_id: str, metric_type: Hashable) -> bool:
+        return metric_type in self._states.get(user_id, {})
+
+    def discard(self, user_id: str) -> None:
+        self._states.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._states)
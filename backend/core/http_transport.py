@@ -0,0 +1,405 @@
+"""
+Transporte HTTP compartido para adaptadores MCP y clientes de servicios externos.
+
+Un único ``HTTPTransport`` por proceso mantiene un ``httpx.AsyncClient`` por
+upstream (scheme://host:port) para que las conexiones keep-alive, los
+handshakes TLS y los límites de conexión se compartan entre todos los
+componentes que hablan con el mismo servicio:
+
+- Pool por host configurable (``HostPolicy``)
+- HTTP/2 con multiplexación cuando el upstream lo negocia (ALPN) y ``h2``
+  está instalado; si no, HTTP/1.1 con keep-alive
+- Reintentos con backoff exponencial y jitter completo, solo para peticiones
+  idempotentes (o marcadas como tales); respeta ``Retry-After``
+- Hedging de GETs: si la respuesta tarda más que el p95 observado del
+  upstream se lanza una segunda petición y gana la primera que responda
+- Histograma de latencias por upstream
+"""
+
+import asyncio
+import random
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.logging_config import get_logger
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Límites superiores de los buckets en milisegundos
+LATENCY_BUCKETS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 750,
+    1000, 2000, 5000, 10000, 30000, 60000,
+)
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos (memoria constante)."""
+
+    __slots__ = ("bounds", "counts", "count", "total_ms", "max_ms")
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # último bucket: +Inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, latency_ms: float) -> None:
+        self.counts[bisect_left(self.bounds, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil ``q`` (0-100) interpolado linealmente dentro del bucket."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max_ms
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max_ms)
+            cumulative += bucket_count
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": {
+                **{f"le_{bound}": n for bound, n in zip(self.bounds, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Política de reintentos con backoff exponencial y jitter completo."""
+
+    max_retries: int = 2
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 502, 503, 504})
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Espera antes del reintento ``attempt`` (1-based)."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Configuración del pool y del comportamiento por upstream."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    timeout: float = 10.0
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    hedge: bool = True
+    hedge_delay: Optional[float] = None  # None: p95 observado del upstream
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.05
+
+
+class _UpstreamStats:
+    """Contadores y latencias de un upstream."""
+
+    __slots__ = (
+        "requests", "errors", "retries", "hedges", "hedge_wins",
+        "statuses", "http_versions", "latency",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.statuses: Dict[int, int] = {}
+        self.http_versions: Dict[str, int] = {}
+        self.latency = LatencyHistogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "statuses": dict(self.statuses),
+            "http_versions": dict(self.http_versions),
+            "latency": self.latency.snapshot(),
+        }
+
+
+def upstream_of(url: str) -> str:
+    """``https://api.x.com/v1/a`` -> ``https://api.x.com:443``"""
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.hostname:
+        raise ValueError(f"URL absoluta requerida: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class HTTPTransport:
+    """
+    Transporte HTTP con un pool de conexiones por upstream.
+
+    Las peticiones devuelven ``httpx.Response`` con el cuerpo ya leído. Los
+    errores de red se propagan como ``httpx.TransportError`` una vez agotados
+    los reintentos; las respuestas HTTP (incluidas 4xx/5xx) se devuelven.
+    """
+
+    def __init__(
+        self,
+        default_policy: Optional[HostPolicy] = None,
+        transport_factory: Optional[Any] = None,
+    ):
+        """
+        Args:
+            default_policy: Política para upstreams sin configuración propia
+            transport_factory: ``callable(upstream, policy)`` que devuelve un
+                ``httpx.AsyncBaseTransport`` (p. ej. ``httpx.MockTransport``)
+        """
+        self.default_policy = default_policy or HostPolicy()
+        self._transport_factory = transport_factory
+        self._policies: Dict[str, HostPolicy] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._retired: List[httpx.AsyncClient] = []
+        self._stats: Dict[str, _UpstreamStats] = {}
+
+    def configure_host(self, url: str, **overrides: Any) -> HostPolicy:
+        """
+        Ajusta la política de un upstream.
+
+        Si ya había un cliente para el upstream se retira (se cierra en
+        ``aclose``) y el siguiente uso crea uno con la nueva política.
+        """
+        upstream = upstream_of(url)
+        policy = replace(self._policies.get(upstream, self.default_policy), **overrides)
+        self._policies[upstream] = policy
+        client = self._clients.pop(upstream, None)
+        if client is not None:
+            self._retired.append(client)
+        return policy
+
+    def policy_for(self, url: str) -> HostPolicy:
+        return self._policies.get(upstream_of(url), self.default_policy)
+
+    def _client(self, upstream: str, policy: HostPolicy) -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=policy.max_connections,
+                max_keepalive_connections=policy.max_keepalive_connections,
+                keepalive_expiry=policy.keepalive_expiry,
+            )
+            kwargs: Dict[str, Any] = {
+                "limits": limits,
+                "timeout": policy.timeout,
+                "http2": policy.http2 and HTTP2_AVAILABLE,
+            }
+            if self._transport_factory is not None:
+                kwargs["transport"] = self._transport_factory(upstream, policy)
+            client = httpx.AsyncClient(**kwargs)
+            self._clients[upstream] = client
+        return client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        idempotent: Optional[bool] = None,
+        hedge: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Envía una petición con reintentos y, para GETs, hedging.
+
+        Args:
+            method: Método HTTP
+            url: URL absoluta
+            idempotent: Permite reintentar; por defecto según el método
+            hedge: Fuerza/desactiva el hedging (solo se aplica a GET)
+            timeout: Timeout por intento; por defecto el de la política
+            **kwargs: Argumentos de ``httpx.AsyncClient.request``
+        """
+        method = method.upper()
+        upstream = upstream_of(url)
+        policy = self._policies.get(upstream, self.default_policy)
+        client = self._client(upstream, policy)
+        stats = self._stats.setdefault(upstream, _UpstreamStats())
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        use_hedge = method == "GET" and (policy.hedge if hedge is None else hedge)
+        retry = policy.retry
+        max_attempts = retry.max_retries + 1 if idempotent else 1
+
+        for attempt in range(1, max_attempts + 1):
+            try:
+                if use_hedge:
+                    response = await self._hedged(client, method, url, policy, stats, kwargs)
+                else:
+                    response = await self._send(client, method, url, stats, kwargs)
+            except httpx.TransportError as e:
+                if attempt >= max_attempts:
+                    raise
+                stats.retries += 1
+                wait = retry.delay(attempt)
+                logger.warning(
+                    f"{method} {upstream} falló ({type(e).__name__}); "
+                    f"reintento {attempt}/{retry.max_retries} en {wait:.2f}s"
+                )
+                await asyncio.sleep(wait)
+                continue
+
+            if response.status_code in retry.retry_statuses and attempt < max_attempts:
+                stats.retries += 1
+                await asyncio.sleep(retry.delay(attempt, response.headers.get("Retry-After")))
+                continue
+            return response
+
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        stats: _UpstreamStats,
+        kwargs: Dict[str, Any],
+    ) -> httpx.Response:
+        """Un intento; registra latencia, estado y versión HTTP."""
+        stats.requests += 1
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latency.observe((time.perf_counter() - start) * 1000)
+        stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+        version = response.http_version
+        stats.http_versions[version] = stats.http_versions.get(version, 0) + 1
+        return response
+
+    def _hedge_delay(self, policy: HostPolicy, stats: _UpstreamStats) -> Optional[float]:
+        """Segundos antes de lanzar el hedge; None si aún no hay datos."""
+        if policy.hedge_delay is not None:
+            return policy.hedge_delay
+        if stats.latency.count < policy.hedge_min_samples:
+            return None
+        p95 = stats.latency.percentile(95) / 1000
+        return min(max(p95, policy.hedge_min_delay), policy.timeout / 2)
+
+    async def _hedged(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        policy: HostPolicy,
+        stats: _UpstreamStats,
+        kwargs: Dict[str, Any],
+    ) -> httpx.Response:
+        """Petición primaria más, si tarda, una secundaria; gana la primera."""
+        delay = self._hedge_delay(policy, stats)
+        primary = asyncio.create_task(self._send(client, method, url, stats, kwargs))
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        stats.hedges += 1
+        hedge = asyncio.create_task(self._send(client, method, url, stats, kwargs))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas por upstream."""
+        return {
+            "http2_available": HTTP2_AVAILABLE,
+            "upstreams": {
+                upstream: stats.snapshot() for upstream, stats in self._stats.items()
+            },
+        }
+
+    async def aclose(self) -> None:
+        """Cierra todos los clientes (activos y retirados)."""
+        clients = list(self._clients.values()) + self._retired
+        self._clients.clear()
+        self._retired.clear()
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+_http_transport: Optional[HTTPTransport] = None
+
+
+def get_http_transport() -> HTTPTransport:
+    """Transporte global compartido por adaptadores MCP, gateway y clientes."""
+    global _http_transport
+    if _http_transport is None:
+        _http_transport = HTTPTransport()
+    return _http_transport
+
+
+async def close_http_transport() -> None:
+    """Cierra el transporte global (apagado de la aplicación)."""
+    global _http_transport
+    if _http_transport is not None:
+        await _http_transport.aclose()
+        _http_transport = None
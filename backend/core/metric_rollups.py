@@ -0,0 +1,397 @@
+"""
+Rollups de métricas de progreso agregados en la base de datos.
+
+Los gráficos de progreso necesitan un punto por día, semana o mes, no cada
+registro del periodo. ``MetricRollupService`` pide esos buckets (n, min,
+max, media y percentiles) a Postgres mediante la función
+``get_metric_rollup`` (sql/V8_METRIC_ROLLUPS.sql), los cachea por usuario
+hasta que llegan datos nuevos y los devuelve como arrays columnares listos
+para graficar. ``SQLiteRollupBackend`` ejecuta la misma agregación sobre
+SQLite como sustituto local de Postgres, y ``rollup_values`` la calcula con
+numpy para datos que ya están en memoria.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+BUCKETS = ("day", "week", "month")
+PERCENTILES = (25, 50, 75, 90)
+STATS = ("n", "min", "max", "avg", "p25", "p50", "p75", "p90")
+
+# Tablas que admite get_metric_rollup (la función SQL valida la misma lista)
+ROLLUP_TABLES = frozenset(
+    {"weight_logs", "body_composition_logs", "performance_logs", "nutrition_logs"}
+)
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def bucket_for_days(days: int) -> str:
+    """Granularidad que mantiene un gráfico por debajo de ~100 puntos."""
+    if days <= 93:
+        return "day"
+    if days <= 730:
+        return "week"
+    return "month"
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """Inicio del bucket de un día (lunes para semanas), como date_trunc."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _as_day(value: Any) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _validate(table: str, metrics: Sequence[str], bucket: str, filters: Mapping[str, Any]) -> None:
+    if table not in ROLLUP_TABLES:
+        raise ValueError(f"Tabla no permitida para rollups: {table}")
+    if bucket not in BUCKETS:
+        raise ValueError(f"Bucket no soportado: {bucket}")
+    for name in (*metrics, *filters):
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Nombre de columna inválido: {name}")
+
+
+def _stats_from_values(values: np.ndarray) -> Dict[str, float]:
+    """Estadísticos de un bucket (percentiles continuos, como percentile_cont)."""
+    percentiles = np.percentile(values, PERCENTILES)
+    return {
+        "n": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "avg": float(values.mean()),
+        **{f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)},
+    }
+
+
+def rollup_values(
+    timestamps: Iterable[Any], values: Mapping[str, Iterable[Any]], bucket: str = "week"
+) -> List[Dict[str, Any]]:
+    """
+    Agrega en memoria con numpy, con la misma semántica que get_metric_rollup.
+
+    Args:
+        timestamps: Fecha de cada registro (date, datetime o ISO)
+        values: Métrica -> valor por registro (None/NaN se ignoran)
+        bucket: day, week o month
+
+    Returns:
+        Filas con el formato de la función SQL
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Bucket no soportado: {bucket}")
+
+    days = np.array(
+        [np.datetime64(_as_day(ts), "D") for ts in timestamps], dtype="datetime64[D]"
+    )
+    if bucket == "week":
+        ordinals = days.astype(np.int64)
+        # 1970-01-01 fue jueves: (ordinal + 3) % 7 es el día de la semana desde el lunes
+        keys = (ordinals - (ordinals + 3) % 7).astype("datetime64[D]")
+    elif bucket == "month":
+        keys = days.astype("datetime64[M]").astype("datetime64[D]")
+    else:
+        keys = days
+
+    rows = []
+    for metric, column in values.items():
+        column = np.array(
+            [np.nan if v is None else v for v in column], dtype=np.float64
+        )
+        valid = ~np.isnan(column)
+        if not valid.any():
+            continue
+        metric_keys = keys[valid]
+        order = np.argsort(metric_keys, kind="stable")
+        metric_keys, column = metric_keys[order], column[valid][order]
+        starts, first = np.unique(metric_keys, return_index=True)
+        for start, group in zip(starts, np.split(column, first[1:])):
+            rows.append(
+                {"bucket_start": str(start), "metric": metric, **_stats_from_values(group)}
+            )
+    return rows
+
+
+def _normalize_row(row: Mapping[str, Any]) -> Tuple[str, str, Dict[str, Optional[float]]]:
+    """Acepta filas de la RPC (min_value, percentiles[]) o ya normalizadas."""
+    stats = {
+        "n": row.get("n"),
+        "min": row.get("min", row.get("min_value")),
+        "max": row.get("max", row.get("max_value")),
+        "avg": row.get("avg", row.get("avg_value")),
+    }
+    percentiles = row.get("percentiles")
+    if isinstance(percentiles, str):
+        percentiles = json.loads(percentiles)
+    for i, p in enumerate(PERCENTILES):
+        key = f"p{p}"
+        stats[key] = row.get(key, percentiles[i] if percentiles else None)
+    stats = {k: (None if v is None else float(v)) for k, v in stats.items()}
+    if stats["n"] is not None:
+        stats["n"] = int(stats["n"])
+    return str(row["bucket_start"])[:10], row["metric"], stats
+
+
+@dataclass
+class RollupSeries:
+    """
+    Serie de rollups en formato columnar.
+
+    ``starts`` tiene el inicio de cada bucket (ISO) y ``metrics`` guarda,
+    por métrica y estadístico, una lista alineada con ``starts`` (None en
+    los buckets donde la métrica no tiene datos).
+    """
+
+    bucket: str
+    starts: List[str] = field(default_factory=list)
+    metrics: Dict[str, Dict[str, List[Optional[float]]]] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(
+        cls, bucket: str, metrics: Sequence[str], rows: Iterable[Mapping[str, Any]]
+    ) -> "RollupSeries":
+        normalized = [_normalize_row(row) for row in rows]
+        starts = sorted({start for start, _, _ in normalized})
+        position = {start: i for i, start in enumerate(starts)}
+        columns = {}
+        for start, metric, stats in normalized:
+            if metric not in metrics:
+                continue
+            if metric not in columns:
+                columns[metric] = {stat: [None] * len(starts) for stat in STATS}
+            for stat in STATS:
+                columns[metric][stat][position[start]] = stats[stat]
+        ordered = {metric: columns[metric] for metric in metrics if metric in columns}
+        return cls(bucket=bucket, starts=starts, metrics=ordered)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def column(self, metric: str, stat: str = "avg") -> List[Optional[float]]:
+        return self.metrics.get(metric, {}).get(stat, [None] * len(self.starts))
+
+    def chart_data(self, stat: str = "avg") -> Dict[str, List[Any]]:
+        """Columnas {"date": [...], métrica: [...]} que aceptan los generadores de gráficos."""
+        data: Dict[str, List[Any]] = {"date": list(self.starts)}
+        for metric, stats in self.metrics.items():
+            data[metric] = stats[stat]
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bucket": self.bucket, "starts": self.starts, "metrics": self.metrics}
+
+
+class SupabaseRollupBackend:
+    """Ejecuta get_metric_rollup como RPC de Supabase."""
+
+    def __init__(self, client_factory: Callable[[], Any]):
+        self.client_factory = client_factory
+
+    async def fetch(
+        self,
+        user_id: str,
+        table: str,
+        metrics: Sequence[str],
+        bucket: str,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        filters: Mapping[str, Any],
+    ) -> List[Dict[str, Any]]:
+        params = {
+            "p_user_id": user_id,
+            "p_table": table,
+            "p_metrics": list(metrics),
+            "p_bucket": bucket,
+            "p_start_date": start_date.isoformat() if start_date else None,
+            "p_end_date": end_date.isoformat() if end_date else None,
+            "p_filters": dict(filters),
+        }
+        # El cliente de Supabase es síncrono: no bloquear el event loop
+        response = await asyncio.to_thread(
+            lambda: self.client_factory().rpc("get_metric_rollup", params).execute()
+        )
+        return response.data or []
+
+
+class _PercentileAggregate:
+    """Agregado SQLite equivalente a percentile_cont(ARRAY[...]) (devuelve JSON)."""
+
+    def __init__(self):
+        self.values: List[float] = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(float(value))
+
+    def finalize(self):
+        if not self.values:
+            return None
+        return json.dumps(np.percentile(self.values, PERCENTILES).tolist())
+
+
+def _sqlite_date_trunc(bucket: str, value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return bucket_start(_as_day(value), bucket).isoformat()
+
+
+class SQLiteRollupBackend:
+    """
+    Sustituto local de Postgres para get_metric_rollup.
+
+    Ejecuta la misma agregación (GROUP BY por bucket con min/max/avg y
+    percentiles continuos) dentro de SQLite, registrando ``date_trunc`` y un
+    agregado ``percentiles``. Las tablas deben tener las columnas
+    ``user_id`` y ``date`` del esquema de Supabase.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        connection.create_function("date_trunc", 2, _sqlite_date_trunc, deterministic=True)
+        connection.create_aggregate("percentiles", 1, _PercentileAggregate)
+
+    async def fetch(
+        self,
+        user_id: str,
+        table: str,
+        metrics: Sequence[str],
+        bucket: str,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        filters: Mapping[str, Any],
+    ) -> List[Dict[str, Any]]:
+        _validate(table, metrics, bucket, filters)
+        columns = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+        filter_sql = "".join(f" AND CAST({key} AS TEXT) = ?" for key in filters)
+        start = start_date.isoformat() if start_date else None
+        end = end_date.isoformat() if end_date else None
+
+        rows = []
+        for metric in metrics:
+            if metric not in columns:
+                continue
+            query = (
+                f"SELECT date_trunc(?, date), COUNT({metric}), MIN({metric}), MAX({metric}), "
+                f"AVG({metric}), percentiles({metric}) FROM {table} "
+                f"WHERE user_id = ? AND {metric} IS NOT NULL "
+                f"AND (? IS NULL OR date >= ?) AND (? IS NULL OR date <= ?){filter_sql} "
+                "GROUP BY 1 ORDER BY 1"
+            )
+            params = [bucket, user_id, start, start, end, end, *map(str, filters.values())]
+            for bucket_value, n, min_value, max_value, avg_value, percentiles in (
+                self.connection.execute(query, params)
+            ):
+                rows.append(
+                    {
+                        "bucket_start": bucket_value,
+                        "metric": metric,
+                        "n": n,
+                        "min_value": min_value,
+                        "max_value": max_value,
+                        "avg_value": avg_value,
+                        "percentiles": percentiles,
+                    }
+                )
+        return rows
+
+
+class MetricRollupService:
+    """
+    Rollups por usuario con caché invalidable.
+
+    Cada entrada se guarda con la versión de datos de (usuario, tabla);
+    ``invalidate`` incrementa esa versión cuando llegan registros nuevos y
+    las entradas anteriores dejan de servirse. ``ttl_seconds`` acota la
+    antigüedad para escrituras que no pasan por el backend (p. ej. el
+    frontend escribiendo directamente en Supabase).
+    """
+
+    def __init__(self, backend: Any, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._cache: "OrderedDict[tuple, Tuple[float, int, RollupSeries]]" = OrderedDict()
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    async def rollup(
+        self,
+        user_id: str,
+        table: str,
+        metrics: Sequence[str],
+        bucket: str = "week",
+        start_date: Optional[Any] = None,
+        end_date: Optional[Any] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+    ) -> RollupSeries:
+        """
+        Rollup de ``metrics`` de ``table`` para un usuario.
+
+        Las fechas se normalizan a días para que peticiones del mismo día
+        (p. ej. "últimos 30 días") compartan entrada de caché.
+        """
+        filters = dict(filters or {})
+        _validate(table, metrics, bucket, filters)
+        start, end = _as_day(start_date), _as_day(end_date)
+        key = (
+            user_id,
+            table,
+            tuple(metrics),
+            bucket,
+            start,
+            end,
+            tuple(sorted((k, str(v)) for k, v in filters.items())),
+        )
+        version = self._versions.get((user_id, table), 0)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            stored_at, cached_version, series = cached
+            if cached_version == version and time.monotonic() - stored_at < self.ttl_seconds:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return series
+            del self._cache[key]
+
+        self.stats["misses"] += 1
+        rows = await self.backend.fetch(user_id, table, metrics, bucket, start, end, filters)
+        series = RollupSeries.from_rows(bucket, metrics, rows)
+
+        self._cache[key] = (time.monotonic(), version, series)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return series
+
+    def invalidate(self, user_id: str, table: Optional[str] = None) -> None:
+        """Marca como obsoletos los rollups de un usuario (de una tabla o de todas)."""
+        for name in [table] if table else ROLLUP_TABLES:
+            self._versions[(user_id, name)] = self._versions.get((user_id, name), 0) + 1
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._cache), **self.stats}
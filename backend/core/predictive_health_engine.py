@@ -16,6 +16,7 @@ IMPACTO ESPERADO: Coaching proactivo 400% más efectivo
 
 import asyncio
 import json
+import random
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union, Tuple
@@ -27,7 +28,8 @@ from abc import ABC, abstractmethod
 
 from core.logging_config import get_logger
 from core.conversation_memory import ConversationMemoryEngine, ConversationContext, EmotionalState
-from core.memory_cache_optimizer import cache_get, cache_set, CachePriority
+from core.health_model_state import MetricState, ModelStateStore
+from core.recommendation_graph import HEALTH_DATA, notify_data_changed
 from clients.supabase_client import get_supabase_client
 
 logger = get_logger(__name__)
@@ -73,11 +75,15 @@ class HealthDataPoint:
     confidence: float  # 0.0 - 1.0
     source: str
     metadata: Dict[str, Any]
+    id: Optional[str] = None  # id del registro almacenado
+    ingested_at: Optional[datetime] = None  # cuándo se guardó (no cuándo se midió)
     
     def to_dict(self) -> Dict[str, Any]:
         data = asdict(self)
         data['metric_type'] = self.metric_type.value
         data['timestamp'] = self.timestamp.isoformat()
+        if self.ingested_at is not None:
+            data['ingested_at'] = self.ingested_at.isoformat()
         return data
 
 
@@ -128,11 +134,23 @@ class RiskAssessment:
 
 
 class BasePredictor(ABC):
-    """Clase base para predictores específicos"""
+    """
+    Clase base para predictores específicos
+
+    Los predictores trabajan sobre el estado incremental de la métrica
+    (MetricState); ``predict`` construye ese estado desde una lista de puntos.
+    """
     
-    @abstractmethod
     async def predict(self, data_points: List[HealthDataPoint]) -> HealthTrajectory:
         """Genera predicción basada en datos históricos"""
+        state = MetricState()
+        for dp in sorted(data_points, key=lambda dp: dp.timestamp):
+            state.observe(dp)
+        return self.predict_from_state(state)
+    
+    @abstractmethod
+    def predict_from_state(self, state: MetricState) -> HealthTrajectory:
+        """Genera predicción desde las estadísticas suficientes de la métrica"""
         pass
     
     @abstractmethod
@@ -148,50 +166,33 @@ class WeightTrajectoryPredictor(BasePredictor):
         self.min_data_points = 7
         self.max_lookback_days = 90
     
-    async def predict(self, data_points: List[HealthDataPoint]) -> HealthTrajectory:
+    def predict_from_state(self, state: MetricState) -> HealthTrajectory:
         """Predice trayectoria de peso usando regresión lineal simple"""
         try:
-            if len(data_points) < self.min_data_points:
+            if state.window_size < self.min_data_points:
                 raise ValueError(f"Necesitamos al menos {self.min_data_points} puntos de datos")
             
-            # Extraer valores y timestamps
-            values = [dp.value for dp in data_points]
-            timestamps = [dp.timestamp for dp in data_points]
-            
-            # Convertir timestamps a días desde el inicio
-            start_date = min(timestamps)
-            days = [(ts - start_date).days for ts in timestamps]
+            # Regresión lineal desde las sumas acumuladas (días desde el origen)
+            slope, intercept = state.regression.fit()
             
-            # Regresión lineal simple
-            x = np.array(days)
-            y = np.array(values)
-            
-            # Calcular pendiente y intersección
-            n = len(x)
-            slope = (n * np.sum(x * y) - np.sum(x) * np.sum(y)) / (n * np.sum(x**2) - (np.sum(x))**2)
-            intercept = (np.sum(y) - slope * np.sum(x)) / n
+            # Confianza: 1 - var(residuos)/var(valores), es decir R²
+            confidence = max(0.1, state.regression.r_squared())
             
             # Generar predicciones para los próximos 30 días
-            current_value = values[-1]
+            current_value = state.last_value
             predicted_values = []
             
             for days_ahead in range(1, 31):
-                future_date = timestamps[-1] + timedelta(days=days_ahead)
-                future_day = days[-1] + days_ahead
+                future_date = state.last_timestamp + timedelta(days=days_ahead)
+                future_day = state.last_day + days_ahead
                 predicted_value = slope * future_day + intercept
-                
-                # Calcular confianza basada en varianza
-                residuals = y - (slope * x + intercept)
-                variance = np.var(residuals)
-                confidence = max(0.1, 1.0 - (variance / np.var(y)))
-                
                 predicted_values.append((future_date, predicted_value, confidence))
             
             # Determinar tendencia
             if slope > 0.1:
-                trend = "improving" if data_points[0].metric_type == HealthMetricType.MUSCLE_MASS else "declining"
+                trend = "improving" if state.metric_type == HealthMetricType.MUSCLE_MASS else "declining"
             elif slope < -0.1:
-                trend = "declining" if data_points[0].metric_type == HealthMetricType.MUSCLE_MASS else "improving"
+                trend = "declining" if state.metric_type == HealthMetricType.MUSCLE_MASS else "improving"
             else:
                 trend = "stable"
             
@@ -207,8 +208,8 @@ class WeightTrajectoryPredictor(BasePredictor):
             factors = ["Tendencia histórica", "Consistencia de datos", "Variabilidad reciente"]
             
             return HealthTrajectory(
-                user_id=data_points[0].user_id,
-                metric_type=data_points[0].metric_type,
+                user_id=state.user_id,
+                metric_type=state.metric_type,
                 current_value=current_value,
                 predicted_values=predicted_values,
                 trend_direction=trend,
@@ -222,6 +223,9 @@ class WeightTrajectoryPredictor(BasePredictor):
         except Exception as e:
             logger.error(f"Error en predicción de peso: {e}")
             raise
+    
+    def get_required_data_points(self) -> int:
+        return self.min_data_points
 
 
 class AdherencePredictor(BasePredictor):
@@ -230,49 +234,22 @@ class AdherencePredictor(BasePredictor):
     def __init__(self):
         self.min_data_points = 14
     
-    async def predict(self, data_points: List[HealthDataPoint]) -> HealthTrajectory:
+    def predict_from_state(self, state: MetricState) -> HealthTrajectory:
         """Predice adherencia basada en patrones históricos"""
         try:
-            if len(data_points) < self.min_data_points:
+            if state.window_size < self.min_data_points:
                 raise ValueError(f"Necesitamos al menos {self.min_data_points} puntos de datos")
             
-            # Calcular adherencia en ventanas de 7 días
-            values = [dp.value for dp in data_points]
-            timestamps = [dp.timestamp for dp in data_points]
-            
-            # Agrupar por semanas
-            weekly_adherence = []
-            current_week = []
-            current_week_start = timestamps[0].replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            for i, ts in enumerate(timestamps):
-                week_start = ts.replace(hour=0, minute=0, second=0, microsecond=0)
-                days_diff = (week_start - current_week_start).days
-                
-                if days_diff < 7:
-                    current_week.append(values[i])
-                else:
-                    if current_week:
-                        weekly_adherence.append(np.mean(current_week))
-                    current_week = [values[i]]
-                    current_week_start = week_start
-            
-            # Agregar última semana
-            if current_week:
-                weekly_adherence.append(np.mean(current_week))
-            
-            # Calcular tendencia de adherencia
-            if len(weekly_adherence) >= 2:
-                recent_trend = np.mean(weekly_adherence[-2:]) - np.mean(weekly_adherence[:-2] if len(weekly_adherence) > 2 else weekly_adherence[:1])
-            else:
-                recent_trend = 0
+            # Medias semanales acumuladas: tendencia de las dos últimas semanas
+            # frente a las anteriores
+            recent_trend = state.weekly.recent_trend()
             
             # Generar predicciones para las próximas 4 semanas
-            current_adherence = weekly_adherence[-1] if weekly_adherence else 0.5
+            current_adherence = state.weekly.current if state.weekly.weeks else 0.5
             predicted_values = []
             
             for week in range(1, 5):
-                future_date = timestamps[-1] + timedelta(weeks=week)
+                future_date = state.last_timestamp + timedelta(weeks=week)
                 
                 # Modelo simple: adherencia decae con el tiempo sin intervención
                 decay_factor = 0.95 ** week  # Decaimiento del 5% por semana
@@ -311,7 +288,7 @@ class AdherencePredictor(BasePredictor):
             ]
             
             return HealthTrajectory(
-                user_id=data_points[0].user_id,
+                user_id=state.user_id,
                 metric_type=HealthMetricType.ADHERENCE_RATE,
                 current_value=current_adherence,
                 predicted_values=predicted_values,
@@ -331,6 +308,73 @@ class AdherencePredictor(BasePredictor):
         return self.min_data_points
 
 
+class SmoothedTrendPredictor(BasePredictor):
+    """Predictor para métricas autorreportadas (energía, sueño, estrés...)"""
+    
+    def __init__(self, higher_is_better: bool = True):
+        self.min_data_points = 7
+        self.higher_is_better = higher_is_better
+    
+    def predict_from_state(self, state: MetricState) -> HealthTrajectory:
+        """Predice la métrica con el nivel y la tendencia de Holt"""
+        try:
+            if state.window_size < self.min_data_points:
+                raise ValueError(f"Necesitamos al menos {self.min_data_points} puntos de datos")
+            
+            holt = state.holt
+            ewm = state.ewm
+            
+            # Confianza base según la variabilidad reciente (coeficiente de variación)
+            scale = abs(ewm.mean) or 1.0
+            base_confidence = max(0.1, min(0.9, 1.0 - ewm.std / scale))
+            
+            # Predicciones diarias para las próximas 2 semanas
+            predicted_values = []
+            for days_ahead in range(1, 15):
+                future_date = state.last_timestamp + timedelta(days=days_ahead)
+                confidence = max(0.1, base_confidence * (1 - days_ahead / 30))
+                predicted_values.append((future_date, holt.forecast(days_ahead), confidence))
+            
+            # Cambio semanal relativo al nivel actual
+            weekly_change = holt.trend * 7 / scale
+            if not self.higher_is_better:
+                weekly_change = -weekly_change
+            
+            if weekly_change > 0.02:
+                trend = "improving"
+            elif weekly_change < -0.02:
+                trend = "declining"
+            else:
+                trend = "stable"
+            
+            if weekly_change < -0.1:
+                risk = RiskLevel.HIGH
+            elif weekly_change < -0.02:
+                risk = RiskLevel.MODERATE
+            else:
+                risk = RiskLevel.LOW
+            
+            return HealthTrajectory(
+                user_id=state.user_id,
+                metric_type=state.metric_type,
+                current_value=holt.level,
+                predicted_values=predicted_values,
+                trend_direction=trend,
+                risk_level=risk,
+                confidence_score=base_confidence,
+                horizon=PredictionHorizon.SHORT_TERM,
+                generated_at=datetime.utcnow(),
+                factors=["Nivel suavizado", "Tendencia reciente", "Variabilidad reciente"]
+            )
+            
+        except Exception as e:
+            logger.error(f"Error en predicción suavizada: {e}")
+            raise
+    
+    def get_required_data_points(self) -> int:
+        return self.min_data_points
+
+
 class PredictiveHealthEngine:
     """
     Motor principal de predicciones de salud
@@ -350,9 +394,16 @@ class PredictiveHealthEngine:
             HealthMetricType.MUSCLE_MASS: WeightTrajectoryPredictor(),
             HealthMetricType.ADHERENCE_RATE: AdherencePredictor(),
             HealthMetricType.WORKOUT_CONSISTENCY: AdherencePredictor(),
+            HealthMetricType.ENERGY_LEVEL: SmoothedTrendPredictor(),
+            HealthMetricType.SLEEP_QUALITY: SmoothedTrendPredictor(),
+            HealthMetricType.NUTRITION_SCORE: SmoothedTrendPredictor(),
+            HealthMetricType.MOTIVATION_LEVEL: SmoothedTrendPredictor(),
+            HealthMetricType.STRESS_LEVEL: SmoothedTrendPredictor(higher_is_better=False),
         }
         
-        self.cache_ttl = 3600  # 1 hora
+        # Estadísticas suficientes por usuario y métrica: cada punto nuevo se
+        # suma en O(1) y las trayectorias no vuelven a leer el historial
+        self.model_states = ModelStateStore()
         
     async def initialize(self) -> None:
         """Inicializa el motor predictivo"""
@@ -380,21 +431,31 @@ class PredictiveHealthEngine:
     ) -> str:
         """Almacena nuevo punto de datos de salud"""
         try:
+            now = datetime.utcnow()
+            data_id = str(uuid.uuid4())
             data_point = HealthDataPoint(
                 user_id=user_id,
                 metric_type=metric_type,
                 value=value,
-                timestamp=datetime.utcnow(),
+                timestamp=now,
                 confidence=1.0,  # Datos manuales tienen alta confianza
                 source=source,
-                metadata=metadata or {}
+                metadata=metadata or {},
+                id=data_id,
+                ingested_at=now
             )
             
             # Para desarrollo, simulamos el almacenamiento
-            data_id = str(uuid.uuid4())
             logger.info(f"Datos de salud simulados almacenados: {data_id} para usuario {user_id}")
             
-            # Invalidar caché de predicciones para este usuario
+            # Actualizar el modelo si ya está cargado; si no, el historial
+            # (que incluye este punto) se carga en la próxima predicción.
+            # El cursor de ingesta no avanza: solo lo mueven las lecturas del
+            # almacenamiento, y este punto se descarta allí por su id
+            if self.model_states.has(user_id, metric_type):
+                self.model_states.observe(data_point)
+            
+            # Avisar a las evaluaciones y recomendaciones dependientes
             await self._invalidate_user_predictions_cache(user_id)
             
             return data_id
@@ -411,42 +472,26 @@ class PredictiveHealthEngine:
     ) -> Optional[HealthTrajectory]:
         """Genera trayectoria de salud predicha"""
         try:
-            # Intentar desde caché
-            cache_key = f"health_trajectory:{user_id}:{metric_type.value}:{horizon.value}"
-            cached_trajectory = await cache_get(cache_key)
-            
-            if cached_trajectory:
-                return HealthTrajectory(**cached_trajectory)
-            
-            # Obtener datos históricos
-            historical_data = await self._get_historical_data(user_id, metric_type)
-            
-            if not historical_data:
-                logger.info(f"No hay datos históricos suficientes para {user_id}, {metric_type.value}")
-                return None
-            
             # Verificar si tenemos predictor para este tipo de métrica
             if metric_type not in self.predictors:
                 logger.warning(f"No hay predictor disponible para {metric_type.value}")
                 return None
             
+            state = await self._get_model_state(user_id, metric_type)
+            
+            if state is None:
+                logger.info(f"No hay datos históricos suficientes para {user_id}, {metric_type.value}")
+                return None
+            
             predictor = self.predictors[metric_type]
             
             # Verificar datos mínimos
-            if len(historical_data) < predictor.get_required_data_points():
-                logger.info(f"Datos insuficientes para predicción: {len(historical_data)}/{predictor.get_required_data_points()}")
+            if state.window_size < predictor.get_required_data_points():
+                logger.info(f"Datos insuficientes para predicción: {state.window_size}/{predictor.get_required_data_points()}")
                 return None
             
-            # Generar predicción
-            trajectory = await predictor.predict(historical_data)
-            
-            # Cachear resultado
-            await cache_set(
-                cache_key,
-                trajectory.to_dict(),
-                ttl=self.cache_ttl,
-                priority=CachePriority.NORMAL
-            )
+            # Generar predicción desde el estado incremental
+            trajectory = predictor.predict_from_state(state)
             
             logger.info(f"Trayectoria generada para {user_id}, {metric_type.value}")
             return trajectory
@@ -455,20 +500,55 @@ class PredictiveHealthEngine:
             logger.error(f"Error generando trayectoria de salud: {e}")
             return None
     
+    async def _get_model_state(
+        self,
+        user_id: str,
+        metric_type: HealthMetricType
+    ) -> Optional[MetricState]:
+        """
+        Estado del modelo.
+        
+        El historial completo solo se lee la primera vez; después se piden
+        los puntos ingeridos desde ``ingested_until`` para recoger los que
+        hayan guardado otros procesos, aunque tengan fechas de medición
+        anteriores. Los ya contados se descartan por id.
+        """
+        state = self.model_states.get(user_id, metric_type)
+        if state is not None:
+            state.catch_up(
+                await self._get_historical_data(
+                    user_id, metric_type, ingested_since=state.ingested_until
+                )
+            )
+            return state
+        
+        historical_data = await self._get_historical_data(user_id, metric_type)
+        if not historical_data:
+            return None
+        return self.model_states.load(user_id, metric_type, historical_data)
+    
     async def _get_historical_data(
         self,
         user_id: str,
         metric_type: HealthMetricType,
-        days_back: int = 90
+        days_back: int = 90,
+        ingested_since: Optional[datetime] = None
     ) -> List[HealthDataPoint]:
-        """Obtiene datos históricos del usuario"""
+        """Obtiene datos históricos del usuario (solo los ingeridos desde ``ingested_since`` si se indica)"""
         try:
             # Para desarrollo, generamos datos simulados
             logger.info(f"Generando datos históricos simulados para {user_id}, {metric_type.value}")
             
-            # Generar datos simulados para testing
+            # Generar datos simulados para testing. Los puntos caen en días
+            # pares fijos del calendario y el ruido sale de una semilla por
+            # punto, así que cada llamada devuelve los mismos ids y fechas
             historical_data = []
-            base_date = datetime.utcnow() - timedelta(days=days_back)
+            now = datetime.utcnow()
+            base_date = (now - timedelta(days=days_back)).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            if base_date.toordinal() % 2:
+                base_date += timedelta(days=1)
             
             # Valores base por tipo de métrica
             base_values = {
@@ -484,10 +564,16 @@ class PredictiveHealthEngine:
             # Generar serie temporal con tendencia y ruido
             for i in range(0, days_back, 2):  # Datos cada 2 días
                 date = base_date + timedelta(days=i)
+                if date > now:
+                    break
+                point_id = str(uuid.uuid5(
+                    uuid.NAMESPACE_URL,
+                    f"simulated-health:{user_id}:{metric_type.value}:{date.date()}"
+                ))
                 
                 # Agregar tendencia gradual y ruido
                 trend = i * 0.01  # Tendencia gradual
-                noise = np.random.normal(0, 0.1)  # Ruido gaussiano
+                noise = random.Random(point_id).gauss(0, 0.1)  # Ruido gaussiano
                 value = base_value + trend + noise
                 
                 # Mantener valores realistas
@@ -503,10 +589,13 @@ class PredictiveHealthEngine:
                     timestamp=date,
                     confidence=0.9,
                     source="simulated",
-                    metadata={"generated": True}
+                    metadata={"generated": True},
+                    id=point_id,
+                    ingested_at=date
                 )
                 
-                historical_data.append(data_point)
+                if ingested_since is None or date >= ingested_since:
+                    historical_data.append(data_point)
             
             return historical_data
             
@@ -649,12 +738,13 @@ class PredictiveHealthEngine:
         """Invalida caché de predicciones para un usuario"""
         try:
             cache_patterns = [
-                f"health_trajectory:{user_id}:*",
                 f"risk_assessment:{user_id}",
                 f"recommendations:{user_id}:*"
             ]
             
             # En implementación real, invalidaríamos usando patrones
+            # Las evaluaciones de riesgo y recomendaciones dependientes se recalculan
+            notify_data_changed(user_id, HEALTH_DATA)
             logger.debug(f"Cache de predicciones invalidado para usuario {user_id}")
             
         except Exception as e:
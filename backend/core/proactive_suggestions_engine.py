@@ -4,10 +4,11 @@ Sistema inteligente de sugerencias proactivas basado en patrones de comportamien
 contexto del usuario y predicciones de IA.
 """
 
+import asyncio
 import logging
 import json
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 
@@ -15,6 +16,15 @@ from clients.vertex_ai.vertex_ai_client import VertexAIClient
 from core.telemetry import trace_async
 from core.redis_pool import get_redis_client
 from core.adherence_prediction_engine import AdherencePredictionEngine, AdherenceMetrics
+from core.suggestion_pipeline import (
+    UserFeatureSnapshot,
+    cooldown_key,
+    fan_out,
+    fetch_active_cooldowns,
+    gather_bounded,
+    suggestion_key,
+    write_suggestion_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -130,10 +140,17 @@ class ProactiveSuggestionsEngine:
     inteligentes y oportunas.
     """
 
-    def __init__(self, vertex_ai_client: Optional[VertexAIClient] = None):
+    def __init__(
+        self,
+        vertex_ai_client: Optional[VertexAIClient] = None,
+        redis_client: Optional[Any] = None,
+        max_concurrent_users: int = 32,
+    ):
         """Inicializar motor de sugerencias proactivas."""
         self.vertex_ai_client = vertex_ai_client or VertexAIClient()
-        self.redis_client = get_redis_client()
+        # get_redis_client es asíncrono: el cliente se resuelve en el primer uso
+        self.redis_client = redis_client
+        self.max_concurrent_users = max_concurrent_users
         self.adherence_engine = AdherencePredictionEngine(vertex_ai_client)
 
         # Configuración de sugerencias
@@ -181,87 +198,136 @@ class ProactiveSuggestionsEngine:
             Lista de sugerencias priorizadas
         """
         try:
-            suggestions = []
+            results = await self.generate_suggestions_batch([user_context], limit)
+            return results[user_context.user_id]
 
-            # 1. Analizar patrones de comportamiento
-            behavior_insights = await self._analyze_behavior_patterns(user_context)
+        except Exception as e:
+            logger.error(f"Failed to generate proactive suggestions: {e}")
+            raise
 
-            # 2. Evaluar estado actual vs objetivos
-            goal_analysis = await self._analyze_goal_progress(user_context)
+    @trace_async("generate_suggestions_batch")
+    async def generate_suggestions_batch(
+        self, user_contexts: Sequence[UserContext], limit: int = 5
+    ) -> Dict[str, List[ProactiveSuggestion]]:
+        """
+        Generar sugerencias para muchos usuarios en una sola pasada.
 
-            # 3. Detectar oportunidades contextuales
-            contextual_opportunities = await self._detect_contextual_opportunities(
-                user_context
-            )
+        Pensado para campañas push: el historial se obtiene con una consulta
+        para todos los usuarios, los cooldowns con un único MGET y las
+        sugerencias resultantes se cachean en un solo pipeline.
 
-            # 4. Generar sugerencias por categoría
-            suggestion_categories = [
-                await self._generate_workout_suggestions(
-                    user_context, behavior_insights
-                ),
-                await self._generate_nutrition_suggestions(
-                    user_context, behavior_insights
-                ),
-                await self._generate_recovery_suggestions(
-                    user_context, behavior_insights
-                ),
-                await self._generate_motivation_suggestions(
-                    user_context, goal_analysis
-                ),
-                await self._generate_habit_suggestions(user_context, behavior_insights),
-                await self._generate_goal_suggestions(user_context, goal_analysis),
-                await self._generate_social_suggestions(
-                    user_context, contextual_opportunities
-                ),
-                await self._generate_biometric_suggestions(user_context),
-                await self._generate_seasonal_suggestions(user_context),
-                await self._generate_stress_suggestions(user_context),
-            ]
-
-            # Combinar todas las sugerencias
-            for category_suggestions in suggestion_categories:
-                suggestions.extend(category_suggestions)
-
-            # 5. Filtrar por cooldowns y umbrales de confianza
-            filtered_suggestions = await self._filter_suggestions(
-                suggestions, user_context
-            )
+        Args:
+            user_contexts: Contextos de los usuarios (uno por usuario)
+            limit: Número máximo de sugerencias por usuario
+
+        Returns:
+            Sugerencias priorizadas por user_id
+        """
+        contexts = list({c.user_id: c for c in user_contexts}.values())
+        if not contexts:
+            return {}
+
+        # 1-3. Snapshot de features por usuario (historial en una sola consulta)
+        snapshots = await self.build_feature_snapshots(contexts)
+
+        # 4. Todos los generadores a la vez sobre la snapshot de cada usuario
+        candidates = await gather_bounded(
+            snapshots,
+            lambda snapshot: fan_out(self._suggestion_generators(), snapshot),
+            self.max_concurrent_users,
+        )
+
+        # 5. Filtrar por cooldowns y umbrales de confianza
+        filtered = await self._filter_suggestions_batch(
+            [s for suggestions in candidates for s in suggestions]
+        )
 
+        results: Dict[str, List[ProactiveSuggestion]] = {}
+        for context in contexts:
             # 6. Priorizar y limitar
-            prioritized_suggestions = self._prioritize_suggestions(filtered_suggestions)
+            prioritized = self._prioritize_suggestions(
+                filtered.get(context.user_id, [])
+            )
 
             # 7. Optimizar timing de entrega
-            optimized_suggestions = await self._optimize_delivery_timing(
-                prioritized_suggestions[:limit], user_context
+            results[context.user_id] = await self._optimize_delivery_timing(
+                prioritized[:limit], context
             )
 
-            # 8. Cachear para tracking
-            await self._cache_suggestions(optimized_suggestions)
+        # 8. Cachear para tracking
+        await self._cache_suggestions(
+            [s for suggestions in results.values() for s in suggestions]
+        )
 
-            logger.info(
-                f"Generated {len(optimized_suggestions)} proactive suggestions for user {user_context.user_id}"
-            )
+        logger.info(
+            f"Generated {sum(len(s) for s in results.values())} proactive suggestions "
+            f"for {len(results)} user(s)"
+        )
 
-            return optimized_suggestions
+        return results
 
-        except Exception as e:
-            logger.error(f"Failed to generate proactive suggestions: {e}")
-            raise
+    async def build_feature_snapshots(
+        self, user_contexts: Sequence[UserContext]
+    ) -> List[UserFeatureSnapshot]:
+        """Construir la snapshot inmutable de features de cada usuario."""
+        user_ids = [context.user_id for context in user_contexts]
+        history, biometrics = await asyncio.gather(
+            self._get_users_historical_data(user_ids),
+            self._get_users_biometric_data(user_ids),
+        )
+
+        async def build(user_context: UserContext) -> UserFeatureSnapshot:
+            historical_data = history.get(user_context.user_id, {})
+            behavior, goals, opportunities = await asyncio.gather(
+                self._analyze_behavior_patterns(user_context, historical_data),
+                self._analyze_goal_progress(user_context),
+                self._detect_contextual_opportunities(user_context),
+            )
+            return UserFeatureSnapshot.build(
+                user_context,
+                history=historical_data,
+                biometrics=biometrics.get(user_context.user_id, {}),
+                behavior=behavior,
+                goals=goals,
+                opportunities=opportunities,
+            )
+
+        return await gather_bounded(user_contexts, build, self.max_concurrent_users)
+
+    def _suggestion_generators(self):
+        """Generadores por categoría, cada uno leyendo su parte de la snapshot."""
+        return [
+            ("workout", lambda s: self._generate_workout_suggestions(s.context, s.behavior)),
+            ("nutrition", lambda s: self._generate_nutrition_suggestions(s.context, s.behavior)),
+            ("recovery", lambda s: self._generate_recovery_suggestions(s.context, s.behavior)),
+            ("motivation", lambda s: self._generate_motivation_suggestions(s.context, s.goals)),
+            ("habit", lambda s: self._generate_habit_suggestions(s.context, s.behavior)),
+            ("goal", lambda s: self._generate_goal_suggestions(s.context, s.goals)),
+            ("social", lambda s: self._generate_social_suggestions(s.context, s.opportunities)),
+            ("biometric", lambda s: self._generate_biometric_suggestions(s.context)),
+            ("seasonal", lambda s: self._generate_seasonal_suggestions(s.context)),
+            ("stress", lambda s: self._generate_stress_suggestions(s.context)),
+        ]
 
     async def _analyze_behavior_patterns(
-        self, user_context: UserContext
+        self,
+        user_context: UserContext,
+        historical_data: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Analizar patrones de comportamiento del usuario."""
 
-        # Obtener datos históricos del usuario
-        historical_data = await self._get_user_historical_data(user_context.user_id)
+        # Obtener datos históricos del usuario si no vienen de la snapshot
+        if historical_data is None:
+            historical_data = await self._get_user_historical_data(
+                user_context.user_id
+            )
 
         # Usar IA para análisis de patrones
         prompt = f"""
         Analiza los patrones de comportamiento de este usuario:
         
         Contexto: {asdict(user_context)}
-        Datos históricos: {json.dumps(historical_data, indent=2)}
+        Datos históricos: {json.dumps(historical_data, indent=2, default=str)}
         
         Identifica:
         1. Patrones de actividad (horarios preferidos, duración, intensidad)
@@ -871,23 +937,32 @@ class ProactiveSuggestionsEngine:
         self, suggestions: List[ProactiveSuggestion], user_context: UserContext
     ) -> List[ProactiveSuggestion]:
         """Filtrar sugerencias por cooldowns y umbrales de confianza."""
-        filtered = []
+        filtered = await self._filter_suggestions_batch(suggestions)
+        return filtered.get(user_context.user_id, [])
 
-        for suggestion in suggestions:
-            # Verificar umbral de confianza
-            min_confidence = self.confidence_thresholds.get(
-                suggestion.suggestion_type, 0.6
-            )
-            if suggestion.confidence_score < min_confidence:
-                continue
+    async def _filter_suggestions_batch(
+        self, suggestions: List[ProactiveSuggestion]
+    ) -> Dict[str, List[ProactiveSuggestion]]:
+        """Filtrar sugerencias de varios usuarios con una sola consulta de cooldowns."""
+        # Verificar umbral de confianza
+        confident = [
+            suggestion
+            for suggestion in suggestions
+            if suggestion.confidence_score
+            >= self.confidence_thresholds.get(suggestion.suggestion_type, 0.6)
+        ]
+
+        # Verificar cooldowns de todas las candidatas en un único MGET
+        on_cooldown = await fetch_active_cooldowns(
+            await self._get_redis(),
+            ((s.user_id, s.suggestion_type.value) for s in confident),
+        )
 
-            # Verificar cooldown
-            if await self._is_on_cooldown(
-                user_context.user_id, suggestion.suggestion_type
-            ):
+        filtered: Dict[str, List[ProactiveSuggestion]] = {}
+        for suggestion in confident:
+            if (suggestion.user_id, suggestion.suggestion_type.value) in on_cooldown:
                 continue
-
-            filtered.append(suggestion)
+            filtered.setdefault(suggestion.user_id, []).append(suggestion)
 
         return filtered
 
@@ -972,78 +1047,112 @@ class ProactiveSuggestionsEngine:
 
         return suggestions
 
+    async def _get_redis(self) -> Optional[Any]:
+        """Obtener el cliente Redis del pool (None si no está disponible)."""
+        if self.redis_client is None:
+            try:
+                self.redis_client = await get_redis_client()
+            except Exception as e:
+                logger.warning(f"Redis unavailable for suggestions: {e}")
+        return self.redis_client
+
     async def _is_on_cooldown(
         self, user_id: str, suggestion_type: SuggestionType
     ) -> bool:
         """Verificar si el tipo de sugerencia está en cooldown."""
-        try:
-            cooldown_key = f"suggestion_cooldown:{user_id}:{suggestion_type.value}"
-            cooldown_data = await self.redis_client.get(cooldown_key)
-            return cooldown_data is not None
-        except Exception as e:
-            logger.warning(f"Cooldown check failed: {e}")
-            return False
+        active = await fetch_active_cooldowns(
+            await self._get_redis(), [(user_id, suggestion_type.value)]
+        )
+        return bool(active)
 
     async def _set_suggestion_cooldown(
         self, user_id: str, suggestion_type: SuggestionType
     ) -> None:
         """Establecer cooldown para tipo de sugerencia."""
         try:
-            cooldown_key = f"suggestion_cooldown:{user_id}:{suggestion_type.value}"
+            redis_client = await self._get_redis()
+            if redis_client is None:
+                return
             cooldown_hours = self.suggestion_cooldowns[suggestion_type]
-            await self.redis_client.setex(
-                cooldown_key, timedelta(hours=cooldown_hours).total_seconds(), "active"
+            await redis_client.setex(
+                cooldown_key(user_id, suggestion_type.value),
+                int(timedelta(hours=cooldown_hours).total_seconds()),
+                "active",
             )
         except Exception as e:
             logger.warning(f"Setting cooldown failed: {e}")
 
     async def _cache_suggestions(self, suggestions: List[ProactiveSuggestion]) -> None:
-        """Cachear sugerencias para tracking."""
-        try:
-            for suggestion in suggestions:
-                cache_key = f"suggestion:{suggestion.suggestion_id}"
-                cache_data = asdict(suggestion)
-                # Convertir datetime a ISO string para JSON
-                cache_data["created_at"] = suggestion.created_at.isoformat()
-                cache_data["optimal_delivery_time"] = (
-                    suggestion.optimal_delivery_time.isoformat()
-                )
-                if suggestion.expires_at:
-                    cache_data["expires_at"] = suggestion.expires_at.isoformat()
+        """Cachear sugerencias para tracking en un único pipeline."""
+        entries = []
+        for suggestion in suggestions:
+            cache_data = asdict(suggestion)
+            # Convertir enums y datetime a valores JSON
+            cache_data["suggestion_type"] = suggestion.suggestion_type.value
+            cache_data["priority"] = suggestion.priority.value
+            cache_data["timing"] = suggestion.timing.value
+            cache_data["created_at"] = suggestion.created_at.isoformat()
+            cache_data["optimal_delivery_time"] = (
+                suggestion.optimal_delivery_time.isoformat()
+            )
+            if suggestion.expires_at:
+                cache_data["expires_at"] = suggestion.expires_at.isoformat()
+            entries.append(
+                (suggestion.suggestion_id, json.dumps(cache_data, default=str))
+            )
 
-                await self.redis_client.setex(
-                    cache_key,
-                    timedelta(days=7).total_seconds(),
-                    json.dumps(cache_data, default=str),
-                )
-        except Exception as e:
-            logger.warning(f"Failed to cache suggestions: {e}")
+        await write_suggestion_cache(
+            await self._get_redis(), entries, int(timedelta(days=7).total_seconds())
+        )
 
     async def _get_user_historical_data(self, user_id: str) -> Dict[str, Any]:
         """Obtener datos históricos del usuario."""
+        history = await self._get_users_historical_data([user_id])
+        return history.get(user_id, {})
+
+    async def _get_users_historical_data(
+        self, user_ids: Sequence[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Obtener datos históricos de varios usuarios en una sola consulta."""
         try:
             # En implementación real, esto vendría de Supabase
-            # Por ahora, retornar datos mock básicos
+            # (una consulta con user_id IN (...)). Por ahora, datos mock básicos
             return {
-                "workout_frequency": "4-5 times per week",
-                "preferred_times": ["morning", "evening"],
-                "nutrition_adherence": 0.75,
-                "avg_motivation": 0.68,
-                "stress_patterns": ["monday_high", "friday_moderate"],
-                "successful_interventions": ["morning_motivation", "nutrition_timing"],
-                "goal_completion_rate": 0.82,
+                user_id: {
+                    "workout_frequency": "4-5 times per week",
+                    "preferred_times": ["morning", "evening"],
+                    "nutrition_adherence": 0.75,
+                    "avg_motivation": 0.68,
+                    "stress_patterns": ["monday_high", "friday_moderate"],
+                    "successful_interventions": [
+                        "morning_motivation",
+                        "nutrition_timing",
+                    ],
+                    "goal_completion_rate": 0.82,
+                }
+                for user_id in user_ids
             }
         except Exception as e:
             logger.warning(f"Failed to get historical data: {e}")
             return {}
 
+    async def _get_users_biometric_data(
+        self, user_ids: Sequence[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Obtener los últimos biométricos de varios usuarios en una sola consulta."""
+        # Se expandiría con datos de wearables; por ahora no hay fuente conectada
+        return {user_id: {} for user_id in user_ids}
+
     async def mark_suggestion_delivered(
         self, suggestion_id: str, delivery_method: str = "app_notification"
     ) -> bool:
         """Marcar sugerencia como entregada."""
         try:
-            cache_key = f"suggestion:{suggestion_id}"
-            cached_data = await self.redis_client.get(cache_key)
+            redis_client = await self._get_redis()
+            if redis_client is None:
+                return False
+            cache_key = suggestion_key(suggestion_id)
+            cached_data = await redis_client.get(cache_key)
 
             if cached_data:
                 suggestion_data = json.loads(cached_data)
@@ -1051,9 +1160,9 @@ class ProactiveSuggestionsEngine:
                 suggestion_data["delivery_method"] = delivery_method
                 suggestion_data["delivered_at"] = datetime.now().isoformat()
 
-                await self.redis_client.setex(
+                await redis_client.setex(
                     cache_key,
-                    timedelta(days=7).total_seconds(),
+                    int(timedelta(days=7).total_seconds()),
                     json.dumps(suggestion_data, default=str),
                 )
 
@@ -1075,8 +1184,11 @@ class ProactiveSuggestionsEngine:
     ) -> bool:
         """Registrar feedback del usuario sobre la sugerencia."""
         try:
-            cache_key = f"suggestion:{suggestion_id}"
-            cached_data = await self.redis_client.get(cache_key)
+            redis_client = await self._get_redis()
+            if redis_client is None:
+                return False
+            cache_key = suggestion_key(suggestion_id)
+            cached_data = await redis_client.get(cache_key)
 
             if cached_data:
                 suggestion_data = json.loads(cached_data)
@@ -1084,9 +1196,9 @@ class ProactiveSuggestionsEngine:
                 suggestion_data["effectiveness_score"] = effectiveness_score
                 suggestion_data["feedback_at"] = datetime.now().isoformat()
 
-                await self.redis_client.setex(
+                await redis_client.setex(
                     cache_key,
-                    timedelta(days=30).total_seconds(),  # Extender TTL para análisis
+                    int(timedelta(days=30).total_seconds()),  # Extender TTL para análisis
                     json.dumps(suggestion_data, default=str),
                 )
 
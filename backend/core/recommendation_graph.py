@@ -0,0 +1,214 @@
+"""
+Grafo de construcción de recomendaciones con caché por nodo.
+
+Cada nodo (evaluación de riesgos, segmento de comportamiento, cada
+generador y el conjunto final) declara las fuentes de datos y los nodos de
+los que depende. ``RecommendationGraph.evaluate`` resuelve los nodos
+independientes concurrentemente y reutiliza el resultado cacheado de un
+nodo mientras no cambien sus entradas: la versión de sus fuentes
+(``notify_data_changed`` la incrementa al llegar datos de salud o de
+conversación) y la revisión de sus dependencias. Así, un dato de salud
+nuevo recalcula la evaluación de riesgos y los generadores que la usan,
+pero no el segmento ni los generadores que solo leen el segmento.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+HEALTH_DATA = "health"
+CONVERSATION_DATA = "conversation"
+
+
+class DataVersions:
+    """Contador de versión por usuario y fuente de datos."""
+
+    def __init__(self):
+        self._versions: Dict[Tuple[str, str], int] = {}
+
+    def bump(self, user_id: str, source: str) -> int:
+        key = (user_id, source)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        return self._versions[key]
+
+    def get(self, user_id: str, source: str) -> int:
+        return self._versions.get((user_id, source), 0)
+
+
+# Versiones compartidas por los motores que reciben datos y los que los consumen
+data_versions = DataVersions()
+
+
+def notify_data_changed(user_id: str, source: str) -> None:
+    """Marcar que llegaron datos nuevos de ``source`` para el usuario."""
+    data_versions.bump(user_id, source)
+
+
+@dataclass(frozen=True)
+class GraphNode:
+    """
+    Nodo del grafo.
+
+    ``compute`` recibe el user_id y el valor de cada dependencia como
+    argumento con nombre. ``ttl`` (segundos) acota cuánto se reutiliza el
+    resultado aunque sus entradas no cambien.
+    """
+
+    name: str
+    compute: Callable[..., Awaitable[Any]]
+    sources: Tuple[str, ...] = ()
+    deps: Tuple[str, ...] = ()
+    ttl: Optional[float] = None
+
+
+@dataclass
+class _NodeResult:
+    fingerprint: Tuple[Any, ...]
+    value: Any
+    revision: int
+    computed_at: float
+
+
+class RecommendationGraph:
+    """Evaluador del grafo con resultados cacheados por usuario y nodo."""
+
+    def __init__(
+        self,
+        nodes: Iterable[GraphNode],
+        versions: Optional[DataVersions] = None,
+        max_users: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.nodes: Dict[str, GraphNode] = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Nodo duplicado: {node.name}")
+            self.nodes[node.name] = node
+        self._check_dependencies()
+
+        self.versions = versions or data_versions
+        self.max_users = max_users
+        self.clock = clock
+        self._results: "OrderedDict[str, Dict[str, _NodeResult]]" = OrderedDict()
+        # Revisiones únicas: un resultado nuevo nunca coincide con uno descartado
+        self._revisions = itertools.count(1)
+        self.stats = {"computed": 0, "reused": 0, "failed": 0}
+
+    def _check_dependencies(self) -> None:
+        """Validar que las dependencias existen y no forman ciclos."""
+        visiting, done = set(), set()
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo en el grafo: {' -> '.join(path + (name,))}")
+            if name not in self.nodes:
+                raise ValueError(f"Dependencia desconocida: {name} (en {path[-1]})")
+            visiting.add(name)
+            for dep in self.nodes[name].deps:
+                visit(dep, path + (name,))
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.nodes:
+            visit(name, ())
+
+    async def evaluate(
+        self, user_id: str, targets: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluar los nodos pedidos (todos por defecto) para un usuario.
+
+        Returns:
+            Valor de cada nodo evaluado, incluidas sus dependencias
+        """
+        cached = self._results.pop(user_id, {})
+        self._results[user_id] = cached
+        while len(self._results) > self.max_users:
+            self._results.popitem(last=False)
+
+        tasks: Dict[str, asyncio.Task] = {}
+
+        def resolve(name: str) -> asyncio.Task:
+            if name not in tasks:
+                tasks[name] = asyncio.ensure_future(
+                    self._evaluate_node(user_id, name, cached, resolve)
+                )
+            return tasks[name]
+
+        names = list(targets) if targets is not None else list(self.nodes)
+        try:
+            await asyncio.gather(*(resolve(name) for name in names))
+        except BaseException:
+            # Un nodo falló (o se canceló la evaluación): no dejar nodos hermanos
+            # ejecutándose sin nadie que los espere
+            started = list(tasks.values())
+            for task in started:
+                task.cancel()
+            await asyncio.gather(*started, return_exceptions=True)
+            raise
+        # Al terminar los objetivos también han terminado sus dependencias
+        return {name: task.result().value for name, task in tasks.items()}
+
+    async def _evaluate_node(
+        self,
+        user_id: str,
+        name: str,
+        cached: Dict[str, _NodeResult],
+        resolve: Callable[[str], "asyncio.Task"],
+    ) -> _NodeResult:
+        node = self.nodes[name]
+        dep_results: List[_NodeResult] = list(
+            await asyncio.gather(*(resolve(dep) for dep in node.deps))
+        )
+        fingerprint = (
+            tuple(self.versions.get(user_id, source) for source in node.sources),
+            tuple(result.revision for result in dep_results),
+        )
+
+        previous = cached.get(name)
+        now = self.clock()
+        if (
+            previous is not None
+            and previous.fingerprint == fingerprint
+            and (node.ttl is None or now - previous.computed_at < node.ttl)
+        ):
+            self.stats["reused"] += 1
+            return previous
+
+        try:
+            value = await node.compute(
+                user_id, **{dep: result.value for dep, result in zip(node.deps, dep_results)}
+            )
+        except Exception:
+            self.stats["failed"] += 1
+            logger.error(f"Error evaluando nodo {name} para usuario {user_id}")
+            raise
+
+        self.stats["computed"] += 1
+        result = _NodeResult(
+            fingerprint=fingerprint,
+            value=value,
+            revision=next(self._revisions),
+            computed_at=now,
+        )
+        cached[name] = result
+        return result
+
+    def invalidate(self, user_id: str, name: Optional[str] = None) -> None:
+        """Descartar los resultados cacheados de un usuario (o de uno de sus nodos)."""
+        if name is None:
+            self._results.pop(user_id, None)
+        else:
+            self._results.get(user_id, {}).pop(name, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "users_cached": len(self._results)}
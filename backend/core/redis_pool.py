@@ -257,3 +257,37 @@ async def get_redis_client() -> Optional[redis.Redis]:
 async def close_redis_pool() -> None:
     """Close the global Redis connection pool."""
     await redis_pool_manager.close()
+
+
+@asynccontextmanager
+async def standalone_redis_client():
+    """
+    Open a Redis client bound to the running event loop.
+
+    Pooled connections stay tied to the loop that opened them, so code that
+    runs under its own ``asyncio.run`` (Celery tasks, scheduler jobs) must not
+    use the global pool. This client is closed before the context exits.
+
+    Yields:
+        Optional[redis.Redis]: Redis client or None if not available
+    """
+    if not REDIS_AVAILABLE:
+        yield None
+        return
+
+    client = redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        decode_responses=True,
+        socket_timeout=int(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+        socket_connect_timeout=int(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "5")),
+    )
+    try:
+        try:
+            await client.ping()
+        except Exception as e:
+            logger.warning(f"Redis not reachable, continuing without it: {e}")
+            yield None
+        else:
+            yield client
+    finally:
+        await client.aclose()
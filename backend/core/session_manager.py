@@ -22,8 +22,8 @@ from enum import Enum
 import hashlib
 
 from core.logging_config import get_logger
-from core.memory_cache_optimizer import cache_get, cache_set, cache_invalidate, CachePriority
 from core.conversation_memory import ConversationContext, EmotionalState
+from core.session_store import RedisSessionStore
 from clients.supabase_client import get_supabase_client
 
 logger = get_logger(__name__)
@@ -112,6 +112,77 @@ class SessionInfo:
         data['status'] = SessionStatus(data['status'])
         data['context'] = SessionContext.from_dict(data['context'])
         return cls(**data)
+    
+    def to_redis_hash(self) -> Dict[str, str]:
+        """Aplana la sesión a campos de hash de Redis (metadata como ``meta:<clave>``)"""
+        context = self.context
+        fields = {
+            'user_id': self.user_id,
+            'device_id': self.device_id,
+            'device_type': self.device_type.value,
+            'status': self.status.value,
+            'created_at': self.created_at.isoformat(),
+            'last_activity': self.last_activity.isoformat(),
+            'expires_at': self.expires_at.isoformat() if self.expires_at else '',
+            'sync_token': self.sync_token,
+            'total_interactions': str(self.total_interactions),
+        }
+        fields.update(context_to_redis_fields(context))
+        return fields
+    
+    @classmethod
+    def from_redis_hash(cls, session_id: str, fields: Dict[str, str]) -> 'SessionInfo':
+        """Reconstruye la sesión desde un hash de Redis"""
+        metadata = {
+            key[len(METADATA_FIELD_PREFIX):]: json.loads(value)
+            for key, value in fields.items()
+            if key.startswith(METADATA_FIELD_PREFIX)
+        }
+        context = SessionContext(
+            current_topic=ConversationContext(fields['current_topic']) if fields.get('current_topic') else None,
+            active_agent_id=fields.get('active_agent_id') or None,
+            conversation_flow=json.loads(fields.get('conversation_flow') or '[]'),
+            user_goals=json.loads(fields.get('user_goals') or '[]'),
+            session_metadata=metadata,
+            last_emotional_state=EmotionalState(fields['last_emotional_state']) if fields.get('last_emotional_state') else None
+        )
+        return cls(
+            session_id=session_id,
+            user_id=fields['user_id'],
+            device_id=fields['device_id'],
+            device_type=DeviceType(fields['device_type']),
+            status=SessionStatus(fields['status']),
+            created_at=datetime.fromisoformat(fields['created_at']),
+            last_activity=datetime.fromisoformat(fields['last_activity']),
+            expires_at=datetime.fromisoformat(fields['expires_at']) if fields.get('expires_at') else None,
+            context=context,
+            sync_token=fields['sync_token'],
+            total_interactions=int(fields.get('total_interactions', 0))
+        )
+
+
+METADATA_FIELD_PREFIX = "meta:"
+
+
+def metadata_to_redis_fields(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """Serializa cada clave de metadata como campo independiente del hash"""
+    return {
+        f"{METADATA_FIELD_PREFIX}{key}": json.dumps(value, default=str)
+        for key, value in metadata.items()
+    }
+
+
+def context_to_redis_fields(context: SessionContext) -> Dict[str, str]:
+    """Campos de hash correspondientes al contexto de sesión"""
+    fields = {
+        'current_topic': context.current_topic.value if context.current_topic else '',
+        'active_agent_id': context.active_agent_id or '',
+        'conversation_flow': json.dumps(context.conversation_flow),
+        'user_goals': json.dumps(context.user_goals),
+        'last_emotional_state': context.last_emotional_state.value if context.last_emotional_state else '',
+    }
+    fields.update(metadata_to_redis_fields(context.session_metadata))
+    return fields
 
 
 class SessionManager:
@@ -137,9 +208,13 @@ class SessionManager:
         self.sync_interval = sync_interval
         self.supabase = get_supabase_client()
         
-        # Cache configuration
+        # Redis: hash por sesión + índice ZSET por usuario
         self.session_cache_prefix = "session"
         self.user_sessions_cache_prefix = "user_sessions"
+        self.store = RedisSessionStore(
+            session_prefix=self.session_cache_prefix,
+            index_prefix=self.user_sessions_cache_prefix
+        )
         
         # Active sessions tracking (memory only)
         self._active_sessions: Set[str] = set()
@@ -197,9 +272,6 @@ class SessionManager:
             Información de la sesión creada
         """
         try:
-            # Verificar límite de sesiones por usuario
-            await self._enforce_session_limits(user_id)
-            
             # Generar IDs únicos
             session_id = self._generate_session_id(user_id, device_id)
             sync_token = self._generate_sync_token()
@@ -236,12 +308,25 @@ class SessionManager:
             # Almacenar en base de datos
             await self._store_session(session_info)
             
+            # Hash + índice + límite por usuario en un solo pipeline
+            evicted = await self.store.create(
+                session_id,
+                session_info.to_redis_hash(),
+                last_activity=session_info.last_activity,
+                expires_at=expires_at,
+                max_sessions=self.max_sessions_per_user,
+                index_retention=max(ttl, self.default_session_ttl)
+            )
+            if evicted is None:
+                await self._enforce_session_limits(user_id)
+            else:
+                for evicted_id in evicted:
+                    await self.end_session(evicted_id)
+                    logger.info(f"Sesión más antigua terminada para aplicar límite: {evicted_id}")
+            
             # Agregar a tracking activo
             self._active_sessions.add(session_id)
             
-            # Cachear sesión
-            await self._cache_session(session_info)
-            
             logger.info(f"Sesión creada: {session_id} para usuario {user_id}")
             return session_info
             
@@ -252,21 +337,16 @@ class SessionManager:
     async def get_session(self, session_id: str) -> Optional[SessionInfo]:
         """Obtiene información de una sesión"""
         try:
-            # Intentar desde caché primero
-            cache_key = f"{self.session_cache_prefix}:{session_id}"
-            cached_session = await cache_get(cache_key)
+            # Un HGETALL; Redis elimina el hash al llegar a expires_at
+            fields = await self.store.get(session_id)
+            if fields:
+                return SessionInfo.from_redis_hash(session_id, fields)
             
-            if cached_session:
-                session_info = SessionInfo.from_dict(cached_session)
-                
-                # Verificar si no ha expirado
-                if self._is_session_expired(session_info):
-                    await self._expire_session(session_id)
-                    return None
-                
-                return session_info
+            if self.store.available:
+                self._active_sessions.discard(session_id)
+                return None
             
-            # Para desarrollo, creamos una sesión mock si coincide con el ID
+            # Sin Redis (desarrollo), creamos una sesión mock si coincide con el ID
             if session_id in self._active_sessions:
                 # Crear sesión mock básica
                 mock_session = SessionInfo(
@@ -321,38 +401,36 @@ class SessionManager:
             True si se actualizó exitosamente
         """
         try:
-            session_info = await self.get_session(session_id)
-            if not session_info:
-                logger.warning(f"Sesión no encontrada para actualizar: {session_id}")
-                return False
+            now = datetime.utcnow()
             
-            # Actualizar timestamps
-            session_info.last_activity = datetime.utcnow()
-            session_info.total_interactions += 1
-            
-            # Actualizar contexto
+            # Solo se escriben los campos que cambian en esta interacción
+            changed = {'last_activity': now.isoformat()}
             if agent_id:
-                session_info.context.active_agent_id = agent_id
-                if agent_id not in session_info.context.conversation_flow:
-                    session_info.context.conversation_flow.append(agent_id)
-            
+                changed['active_agent_id'] = agent_id
             if emotional_state:
-                session_info.context.last_emotional_state = emotional_state
-            
+                changed['last_emotional_state'] = emotional_state.value
             if context_update:
-                session_info.context.session_metadata.update(context_update)
-            
-            # Extender expiración si está cerca de expirar
-            if session_info.expires_at:
-                time_until_expiry = session_info.expires_at - datetime.utcnow()
-                if time_until_expiry.total_seconds() < 300:  # Menos de 5 minutos
-                    session_info.expires_at = datetime.utcnow() + timedelta(seconds=self.default_session_ttl)
-            
-            # Actualizar en base de datos
-            await self._update_session(session_info)
+                changed.update(metadata_to_redis_fields(context_update))
+            
+            # La actividad por mensaje no se persiste en base de datos; solo
+            # las transiciones de estado (crear/pausar/reanudar/terminar)
+            updated = await self.store.record_activity(
+                session_id,
+                changed,
+                agent_id=agent_id,
+                now=now,
+                session_ttl=self.default_session_ttl
+            )
+            if updated is None:
+                # Sin Redis (desarrollo) la base de datos es el único almacén
+                updated = await self._record_activity_without_store(
+                    session_id, now, agent_id, context_update, emotional_state
+                )
             
-            # Actualizar caché
-            await self._cache_session(session_info)
+            if not updated:
+                self._active_sessions.discard(session_id)
+                logger.warning(f"Sesión no encontrada para actualizar: {session_id}")
+                return False
             
             # Agregar a tracking activo
             self._active_sessions.add(session_id)
@@ -364,6 +442,41 @@ class SessionManager:
             logger.error(f"Error actualizando actividad de sesión {session_id}: {e}")
             return False
     
+    async def _record_activity_without_store(
+        self,
+        session_id: str,
+        now: datetime,
+        agent_id: Optional[str],
+        context_update: Optional[Dict[str, Any]],
+        emotional_state: Optional[EmotionalState]
+    ) -> bool:
+        """Aplica una interacción sobre la sesión y la persiste (modo desarrollo)"""
+        session_info = await self.get_session(session_id)
+        if not session_info:
+            return False
+        
+        session_info.last_activity = now
+        session_info.total_interactions += 1
+        
+        if agent_id:
+            session_info.context.active_agent_id = agent_id
+            if agent_id not in session_info.context.conversation_flow:
+                session_info.context.conversation_flow.append(agent_id)
+        
+        if emotional_state:
+            session_info.context.last_emotional_state = emotional_state
+        
+        if context_update:
+            session_info.context.session_metadata.update(context_update)
+        
+        if session_info.expires_at:
+            time_until_expiry = session_info.expires_at - now
+            if time_until_expiry.total_seconds() < 300:  # Menos de 5 minutos
+                session_info.expires_at = now + timedelta(seconds=self.default_session_ttl)
+        
+        await self._update_session(session_info)
+        return True
+    
     async def get_user_sessions(
         self,
         user_id: str,
@@ -371,20 +484,17 @@ class SessionManager:
     ) -> List[SessionInfo]:
         """Obtiene todas las sesiones de un usuario"""
         try:
-            # Intentar desde caché
-            cache_key = f"{self.user_sessions_cache_prefix}:{user_id}"
-            cached_sessions = await cache_get(cache_key)
-            
-            if cached_sessions:
-                sessions = [SessionInfo.from_dict(s) for s in cached_sessions]
-                # Filtrar sesiones expiradas
-                valid_sessions = []
-                for session in sessions:
-                    if self._is_session_expired(session):
-                        await self._expire_session(session.session_id)
-                    else:
-                        valid_sessions.append(session)
-                return valid_sessions
+            # ZREVRANGE del índice + HGETALL en pipeline, por actividad descendente
+            stored_sessions = await self.store.list_user_sessions(user_id)
+            
+            if stored_sessions is not None:
+                sessions = [
+                    SessionInfo.from_redis_hash(fields.pop('session_id'), fields)
+                    for fields in stored_sessions
+                ]
+                if not include_inactive:
+                    sessions = [s for s in sessions if s.status == SessionStatus.ACTIVE]
+                return sessions
             
             # Para desarrollo, devolvemos lista vacía
             logger.debug(f"Búsqueda simulada de sesiones para usuario {user_id}")
@@ -408,7 +518,16 @@ class SessionManager:
             session_info.last_activity = datetime.utcnow()
             
             await self._update_session(session_info)
-            await self._cache_session(session_info)
+            await self.store.update_fields(
+                session_id,
+                session_info.user_id,
+                {
+                    'status': session_info.status.value,
+                    'last_activity': session_info.last_activity.isoformat()
+                },
+                last_activity=session_info.last_activity,
+                index_retention=self.default_session_ttl
+            )
             
             # Remover de tracking activo
             self._active_sessions.discard(session_id)
@@ -434,7 +553,18 @@ class SessionManager:
             session_info.expires_at = datetime.utcnow() + timedelta(seconds=self.default_session_ttl)
             
             await self._update_session(session_info)
-            await self._cache_session(session_info)
+            await self.store.update_fields(
+                session_id,
+                session_info.user_id,
+                {
+                    'status': session_info.status.value,
+                    'last_activity': session_info.last_activity.isoformat(),
+                    'expires_at': session_info.expires_at.isoformat()
+                },
+                last_activity=session_info.last_activity,
+                expires_at=session_info.expires_at,
+                index_retention=self.default_session_ttl
+            )
             
             # Agregar a tracking activo
             self._active_sessions.add(session_id)
@@ -458,8 +588,8 @@ class SessionManager:
             
             await self._update_session(session_info)
             
-            # Remover de caché y tracking
-            await self._remove_session_from_cache(session_id)
+            # Remover de Redis (hash + índice) y tracking
+            await self.store.delete(session_id, session_info.user_id)
             self._active_sessions.discard(session_id)
             
             logger.info(f"Sesión terminada: {session_id}")
@@ -477,50 +607,66 @@ class SessionManager:
     ) -> Optional[SessionInfo]:
         """Sincroniza una sesión entre dispositivos"""
         try:
-            # Obtener sesión fuente
-            source_session = await self.get_session(source_session_id)
+            # Sesión fuente + sesión del dispositivo destino en un round-trip
+            lookup = await self.store.get_with_device_session(
+                source_session_id, user_id, target_device_id
+            )
+            if lookup is None:
+                source_session = await self.get_session(source_session_id)
+                target_session_id = None
+            else:
+                source_fields, target_session_id = lookup
+                source_session = (
+                    SessionInfo.from_redis_hash(source_session_id, source_fields)
+                    if source_fields else None
+                )
             if not source_session or source_session.user_id != user_id:
                 return None
             
-            # Verificar si ya existe sesión en dispositivo destino
-            target_sessions = await self.get_user_sessions(user_id)
-            target_session = None
+            if target_session_id and target_session_id != source_session_id:
+                # Copiar contexto de la fuente sobre la sesión existente (un pipeline)
+                now = datetime.utcnow()
+                fields = context_to_redis_fields(source_session.context)
+                fields['sync_token'] = source_session.sync_token
+                fields['last_activity'] = now.isoformat()
+                synced = await self.store.update_fields(
+                    target_session_id,
+                    user_id,
+                    fields,
+                    last_activity=now,
+                    return_fields=True,
+                    index_retention=self.default_session_ttl
+                )
+                if synced:
+                    logger.info(f"Sesión sincronizada: {source_session_id} -> {target_session_id}")
+                    return SessionInfo.from_redis_hash(target_session_id, synced)
             
-            for session in target_sessions:
-                if session.device_id == target_device_id and session.status == SessionStatus.ACTIVE:
-                    target_session = session
-                    break
+            # Crear nueva sesión en dispositivo destino
+            new_session = await self.create_session(
+                user_id=user_id,
+                device_id=target_device_id,
+                device_type=DeviceType.UNKNOWN,
+                initial_context=source_session.context.session_metadata
+            )
+            
+            # Copiar contexto completo
+            new_session.context = source_session.context
+            new_session.sync_token = source_session.sync_token
+            
+            fields = context_to_redis_fields(new_session.context)
+            fields['sync_token'] = new_session.sync_token
+            await self._update_session(new_session)
+            await self.store.update_fields(
+                new_session.session_id,
+                user_id,
+                fields,
+                last_activity=new_session.last_activity,
+                index_retention=self.default_session_ttl
+            )
+            
+            logger.info(f"Nueva sesión sincronizada creada: {new_session.session_id}")
+            return new_session
             
-            if target_session:
-                # Actualizar sesión existente con contexto de fuente
-                target_session.context = source_session.context
-                target_session.sync_token = source_session.sync_token
-                target_session.last_activity = datetime.utcnow()
-                
-                await self._update_session(target_session)
-                await self._cache_session(target_session)
-                
-                logger.info(f"Sesión sincronizada: {source_session_id} -> {target_session.session_id}")
-                return target_session
-            else:
-                # Crear nueva sesión en dispositivo destino
-                new_session = await self.create_session(
-                    user_id=user_id,
-                    device_id=target_device_id,
-                    device_type=DeviceType.UNKNOWN,
-                    initial_context=source_session.context.session_metadata
-                )
-                
-                # Copiar contexto completo
-                new_session.context = source_session.context
-                new_session.sync_token = source_session.sync_token
-                
-                await self._update_session(new_session)
-                await self._cache_session(new_session)
-                
-                logger.info(f"Nueva sesión sincronizada creada: {new_session.session_id}")
-                return new_session
-                
         except Exception as e:
             logger.error(f"Error sincronizando sesión: {e}")
             return None
@@ -563,30 +709,10 @@ class SessionManager:
             logger.error(f"Error actualizando sesión: {e}")
             raise
     
-    async def _cache_session(self, session_info: SessionInfo) -> None:
-        """Cachea información de sesión"""
-        try:
-            # Para desarrollo, solo registramos el intento de cache
-            logger.debug(f"Cache simulado de sesión: {session_info.session_id}")
-            # En producción aquí iría el cache real
-            
-        except Exception as e:
-            logger.error(f"Error cacheando sesión: {e}")
-    
-    async def _remove_session_from_cache(self, session_id: str) -> None:
-        """Remueve sesión del caché"""
-        try:
-            # Para desarrollo, solo registramos la remoción
-            logger.debug(f"Remoción simulada de cache: {session_id}")
-            
-        except Exception as e:
-            logger.error(f"Error removiendo sesión del caché: {e}")
-    
     async def _expire_session(self, session_id: str) -> None:
         """Marca una sesión como expirada"""
         try:
-            # Para desarrollo, simulamos la expiración
-            await self._remove_session_from_cache(session_id)
+            # Redis expira el hash con EXPIREAT; aquí solo se limpia el tracking
             self._active_sessions.discard(session_id)
             
             logger.debug(f"Sesión simulada expirada: {session_id}")
@@ -595,7 +721,7 @@ class SessionManager:
             logger.error(f"Error expirando sesión {session_id}: {e}")
     
     async def _enforce_session_limits(self, user_id: str) -> None:
-        """Aplica límites de sesiones por usuario"""
+        """Aplica límites de sesiones por usuario (sin Redis; con Redis lo hace ``store.create``)"""
         try:
             user_sessions = await self.get_user_sessions(user_id, include_inactive=False)
             
@@ -0,0 +1,341 @@
+"""
+Session Store - almacenamiento de sesiones en Redis
+===================================================
+
+Estructura de claves:
+- ``session:{session_id}``: HASH compacto con los campos de la sesión
+  (contexto aplanado, metadata como campos ``meta:<clave>``). Expira con
+  ``EXPIREAT`` en ``expires_at``, por lo que Redis gestiona la expiración.
+- ``user_sessions:{user_id}``: ZSET de session_ids ordenado por última actividad.
+- ``user_devices:{user_id}``: HASH device_id -> session_id más reciente.
+
+Todas las operaciones multi-clave se envían en un único pipeline, y las
+actualizaciones de actividad solo escriben los campos que cambian, dentro de
+una transacción WATCH/MULTI para no recrear hashes que acaban de expirar.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.logging_config import get_logger
+from core.redis_pool import get_redis_client
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # pragma: no cover - sin redis el store no se usa
+    WatchError = Exception
+
+logger = get_logger(__name__)
+
+# Extender la expiración si quedan menos de estos segundos
+EXPIRY_EXTENSION_THRESHOLD = 300
+
+# Reintentos de la transacción de actividad ante escrituras concurrentes
+ACTIVITY_MAX_RETRIES = 5
+
+
+def _score(moment: datetime) -> float:
+    """Convierte un datetime UTC naive (``datetime.utcnow()``) a epoch con fracción."""
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _epoch(moment: datetime) -> int:
+    """Epoch entero para ``EXPIREAT``."""
+    return int(_score(moment))
+
+
+def _retention(minimum: int, now: datetime, expires_at: Optional[datetime]) -> int:
+    """TTL de las claves por usuario: al menos hasta que expire la sesión."""
+    if expires_at is None:
+        return minimum
+    return max(minimum, int((expires_at - now).total_seconds()) + 1)
+
+
+class RedisSessionStore:
+    """
+    Almacén de sesiones sobre hashes de Redis con índice por usuario.
+
+    Los métodos devuelven ``None`` cuando Redis no está disponible, para que
+    el llamador pueda degradar al modo desarrollo.
+    """
+
+    def __init__(
+        self,
+        session_prefix: str = "session",
+        index_prefix: str = "user_sessions",
+        devices_prefix: str = "user_devices",
+        redis_client: Any = None,
+    ):
+        self.session_prefix = session_prefix
+        self.index_prefix = index_prefix
+        self.devices_prefix = devices_prefix
+        self._redis = redis_client
+        self.available = redis_client is not None
+
+    async def _client(self) -> Any:
+        if self._redis is None:
+            self._redis = await get_redis_client()
+            self.available = self._redis is not None
+        return self._redis
+
+    def session_key(self, session_id: str) -> str:
+        return f"{self.session_prefix}:{session_id}"
+
+    def index_key(self, user_id: str) -> str:
+        return f"{self.index_prefix}:{user_id}"
+
+    def devices_key(self, user_id: str) -> str:
+        return f"{self.devices_prefix}:{user_id}"
+
+    @staticmethod
+    def _decode(data: Dict[Any, Any]) -> Dict[str, str]:
+        return {
+            (k.decode() if isinstance(k, bytes) else k): (
+                v.decode() if isinstance(v, bytes) else v
+            )
+            for k, v in data.items()
+        }
+
+    async def create(
+        self,
+        session_id: str,
+        fields: Dict[str, str],
+        last_activity: datetime,
+        expires_at: Optional[datetime],
+        max_sessions: int,
+        index_retention: int,
+    ) -> Optional[List[str]]:
+        """
+        Crea la sesión, la indexa y aplica el límite por usuario.
+
+        El caso común es un solo round-trip; solo si se supera
+        ``max_sessions`` se hace un segundo round-trip para sacar del índice
+        las sesiones menos recientes. Sus hashes se conservan para que el
+        llamador las cierre (base de datos incluida) con ``end_session``.
+
+        Returns:
+            IDs de sesiones desalojadas, o None si Redis no está disponible
+        """
+        client = await self._client()
+        if client is None:
+            return None
+
+        user_id = fields["user_id"]
+        session_key = self.session_key(session_id)
+        index_key = self.index_key(user_id)
+        devices_key = self.devices_key(user_id)
+        score = _score(last_activity)
+
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(session_key, mapping=fields)
+        if expires_at:
+            pipe.expireat(session_key, _epoch(expires_at))
+        pipe.zremrangebyscore(index_key, "-inf", score - index_retention)
+        pipe.zadd(index_key, {session_id: score})
+        pipe.hset(devices_key, fields["device_id"], session_id)
+        pipe.expire(index_key, index_retention)
+        pipe.expire(devices_key, index_retention)
+        pipe.zcard(index_key)
+        results = await pipe.execute()
+
+        overflow = results[-1] - max_sessions
+        if overflow <= 0:
+            return []
+
+        popped = await client.zpopmin(index_key, overflow)
+        return [
+            member.decode() if isinstance(member, bytes) else member
+            for member, _ in popped
+        ]
+
+    async def get(self, session_id: str) -> Optional[Dict[str, str]]:
+        """Obtiene el hash de una sesión (un round-trip)."""
+        client = await self._client()
+        if client is None:
+            return None
+        data = await client.hgetall(self.session_key(session_id))
+        return self._decode(data) if data else None
+
+    async def list_user_sessions(
+        self, user_id: str, limit: Optional[int] = None
+    ) -> Optional[List[Dict[str, str]]]:
+        """
+        Sesiones de un usuario ordenadas por actividad (más reciente primero).
+
+        Las entradas del índice cuyo hash ya expiró se eliminan del índice.
+        """
+        client = await self._client()
+        if client is None:
+            return None
+
+        index_key = self.index_key(user_id)
+        stop = -1 if limit is None else limit - 1
+        members = await client.zrevrange(index_key, 0, stop)
+        if not members:
+            return []
+        session_ids = [m.decode() if isinstance(m, bytes) else m for m in members]
+
+        pipe = client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(self.session_key(session_id))
+        hashes = await pipe.execute()
+
+        sessions, stale = [], []
+        for session_id, data in zip(session_ids, hashes):
+            if data:
+                decoded = self._decode(data)
+                decoded["session_id"] = session_id
+                sessions.append(decoded)
+            else:
+                stale.append(session_id)
+
+        if stale:
+            await client.zrem(index_key, *stale)
+        return sessions
+
+    async def record_activity(
+        self,
+        session_id: str,
+        fields: Dict[str, str],
+        agent_id: Optional[str],
+        now: datetime,
+        session_ttl: int,
+        index_retention: Optional[int] = None,
+    ) -> Any:
+        """
+        Registra una interacción escribiendo solo los campos que cambian.
+
+        Con WATCH sobre el hash, un HMGET lee lo necesario para decidir
+        (usuario, flujo de agentes, expiración) y un MULTI escribe los
+        campos, incrementa el contador, reaplica EXPIREAT, actualiza el
+        índice y renueva el TTL del índice y del mapa de dispositivos para
+        que no expiren antes que la sesión. Si el hash expira o cambia entre
+        la lectura y el EXEC la transacción se descarta y se reintenta, de
+        modo que nunca se recrea un hash sin TTL.
+
+        Returns:
+            El hash actualizado, False si la sesión no existe, None sin Redis
+        """
+        client = await self._client()
+        if client is None:
+            return None
+
+        session_key = self.session_key(session_id)
+        async with client.pipeline(transaction=True) as pipe:
+            for _ in range(ACTIVITY_MAX_RETRIES):
+                try:
+                    await pipe.watch(session_key)
+                    user_id, flow, expires_at = [
+                        v.decode() if isinstance(v, bytes) else v
+                        for v in await pipe.hmget(
+                            session_key, "user_id", "conversation_flow", "expires_at"
+                        )
+                    ]
+                    if user_id is None:
+                        await pipe.unwatch()
+                        return False
+
+                    updates = dict(fields)
+                    if agent_id:
+                        conversation_flow = json.loads(flow) if flow else []
+                        if agent_id not in conversation_flow:
+                            conversation_flow.append(agent_id)
+                            updates["conversation_flow"] = json.dumps(conversation_flow)
+
+                    expiry = datetime.fromisoformat(expires_at) if expires_at else None
+                    if (
+                        expiry
+                        and (expiry - now).total_seconds() < EXPIRY_EXTENSION_THRESHOLD
+                    ):
+                        expiry = now + timedelta(seconds=session_ttl)
+                        updates["expires_at"] = expiry.isoformat()
+
+                    retention = _retention(index_retention or session_ttl, now, expiry)
+
+                    pipe.multi()
+                    pipe.hset(session_key, mapping=updates)
+                    pipe.hincrby(session_key, "total_interactions", 1)
+                    if expiry:
+                        pipe.expireat(session_key, _epoch(expiry))
+                    pipe.zadd(self.index_key(user_id), {session_id: _score(now)})
+                    pipe.expire(self.index_key(user_id), retention)
+                    pipe.expire(self.devices_key(user_id), retention)
+                    pipe.hgetall(session_key)
+                    results = await pipe.execute()
+                    return self._decode(results[-1])
+                except WatchError:
+                    continue
+
+        logger.warning(f"Actividad no registrada por contención: {session_id}")
+        return False
+
+    async def update_fields(
+        self,
+        session_id: str,
+        user_id: str,
+        fields: Dict[str, str],
+        last_activity: datetime,
+        expires_at: Optional[datetime] = None,
+        return_fields: bool = False,
+        index_retention: int = 3600,
+    ) -> Any:
+        """
+        Actualiza campos concretos de una sesión existente en un pipeline
+        y renueva el TTL del índice y del mapa de dispositivos del usuario.
+
+        Returns:
+            True/False según exista la sesión (o el hash resultante si
+            ``return_fields``), None sin Redis
+        """
+        client = await self._client()
+        if client is None:
+            return None
+
+        session_key = self.session_key(session_id)
+        pipe = client.pipeline(transaction=True)
+        pipe.exists(session_key)
+        pipe.hset(session_key, mapping=fields)
+        if expires_at:
+            pipe.expireat(session_key, _epoch(expires_at))
+        pipe.zadd(self.index_key(user_id), {session_id: _score(last_activity)})
+        retention = _retention(index_retention, last_activity, expires_at)
+        pipe.expire(self.index_key(user_id), retention)
+        pipe.expire(self.devices_key(user_id), retention)
+        if return_fields:
+            pipe.hgetall(session_key)
+        results = await pipe.execute()
+
+        if not results[0]:
+            # La sesión expiró entre la lectura y la escritura: deshacer
+            await self.delete(session_id, user_id)
+            return False
+        if return_fields:
+            return self._decode(results[-1])
+        return True
+
+    async def get_with_device_session(
+        self, session_id: str, user_id: str, device_id: str
+    ) -> Optional[Tuple[Optional[Dict[str, str]], Optional[str]]]:
+        """Obtiene una sesión y la sesión del dispositivo destino en un round-trip."""
+        client = await self._client()
+        if client is None:
+            return None
+        pipe = client.pipeline(transaction=False)
+        pipe.hgetall(self.session_key(session_id))
+        pipe.hget(self.devices_key(user_id), device_id)
+        data, device_session = await pipe.execute()
+        if isinstance(device_session, bytes):
+            device_session = device_session.decode()
+        return (self._decode(data) if data else None), device_session
+
+    async def delete(self, session_id: str, user_id: str) -> Optional[bool]:
+        """Elimina el hash de la sesión y su entrada en el índice."""
+        client = await self._client()
+        if client is None:
+            return None
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(self.session_key(session_id))
+        pipe.zrem(self.index_key(user_id), session_id)
+        await pipe.execute()
+        return True
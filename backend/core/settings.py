@@ -79,6 +79,23 @@ class Settings(BaseSettings):
     telemetry_enabled: bool = Field(
         default=False, json_schema_extra={"env": "ENABLE_TELEMETRY"}
     )
+    telemetry_sample_ratio: float = Field(
+        default=0.1, json_schema_extra={"env": "TELEMETRY_SAMPLE_RATIO"}
+    )
+    telemetry_slow_request_ms: float = Field(
+        default=1000.0, json_schema_extra={"env": "TELEMETRY_SLOW_REQUEST_MS"}
+    )
+
+    # Configuración del renderizado de gráficos
+    chart_render_workers: int = Field(
+        default=2, json_schema_extra={"env": "CHART_RENDER_WORKERS"}
+    )
+    chart_render_cache_mb: int = Field(
+        default=64, json_schema_extra={"env": "CHART_RENDER_CACHE_MB"}
+    )
+    chart_render_gcs_enabled: bool = Field(
+        default=False, json_schema_extra={"env": "CHART_RENDER_GCS_ENABLED"}
+    )
     gcp_project_id: Optional[str] = Field(
         default=None, json_schema_extra={"env": "GCP_PROJECT_ID"}
     )
@@ -34,7 +34,12 @@ from core.behavioral_pattern_analyzer import (
     BehaviorPatternAnalyzer, UserBehaviorProfile, AdherenceProfile, UserSegment
 )
 from core.conversation_memory import ConversationMemoryEngine, ConversationContext, EmotionalState
-from core.memory_cache_optimizer import cache_get, cache_set, CachePriority
+from core.recommendation_graph import (
+    CONVERSATION_DATA,
+    HEALTH_DATA,
+    GraphNode,
+    RecommendationGraph,
+)
 from clients.supabase_client import get_supabase_client
 
 logger = get_logger(__name__)
@@ -126,6 +131,9 @@ class RecommendationSet:
 class BaseRecommendationGenerator(ABC):
     """Clase base para generadores de recomendaciones específicos"""
     
+    # Entradas del grafo que lee el generador; solo se recalcula si cambian
+    input_dependencies: Tuple[str, ...] = ("risk_assessment", "segment")
+    
     @abstractmethod
     async def generate_recommendations(
         self,
@@ -272,6 +280,8 @@ class WorkoutRecommendationGenerator(BaseRecommendationGenerator):
 class NutritionRecommendationGenerator(BaseRecommendationGenerator):
     """Generador de recomendaciones nutricionales"""
     
+    input_dependencies = ("segment",)
+    
     def get_recommendation_type(self) -> RecommendationType:
         return RecommendationType.NUTRITION_ADJUSTMENT
     
@@ -446,6 +456,76 @@ class SmartRecommendationsEngine:
         # Configuración
         self.max_recommendations_per_set = 5
         self.recommendation_ttl = 3600  # 1 hora
+        # Respaldo para los datos que llegan a otras réplicas: notify_data_changed
+        # solo versiona los datos recibidos por este proceso
+        self.assessment_ttl = 3600  # 1 hora
+        
+        self.graph = RecommendationGraph(self._build_graph_nodes())
+        
+    def _build_graph_nodes(self) -> List[GraphNode]:
+        """Define el grafo: entradas, un nodo por generador y el conjunto final"""
+        generator_nodes = [
+            GraphNode(
+                name=f"generator:{rec_type.value}",
+                compute=self._generator_node(rec_type, generator),
+                deps=generator.input_dependencies,
+                ttl=self.recommendation_ttl,
+            )
+            for rec_type, generator in self.generators.items()
+        ]
+        return [
+            GraphNode(
+                name="risk_assessment",
+                compute=lambda user_id: self.health_engine.assess_health_risks(user_id),
+                sources=(HEALTH_DATA,),
+                ttl=self.assessment_ttl,
+            ),
+            GraphNode(
+                name="segment",
+                compute=lambda user_id: self.behavior_analyzer.segment_user(user_id),
+                sources=(CONVERSATION_DATA,),
+                ttl=self.assessment_ttl,
+            ),
+            *generator_nodes,
+            GraphNode(
+                name="recommendation_set",
+                compute=self._build_recommendation_set,
+                deps=("risk_assessment", "segment") + tuple(n.name for n in generator_nodes),
+            ),
+        ]
+    
+    def _generator_node(
+        self, rec_type: RecommendationType, generator: BaseRecommendationGenerator
+    ):
+        """Adapta un generador a la firma de nodo del grafo"""
+        async def compute(
+            user_id: str,
+            risk_assessment: Optional[RiskAssessment] = None,
+            segment: Optional[UserBehaviorProfile] = None,
+        ) -> List[Recommendation]:
+            context = self._generation_context(risk_assessment, segment)
+            try:
+                return await generator.generate_recommendations(
+                    user_id, risk_assessment, segment, context
+                )
+            except Exception as e:
+                logger.error(f"Error con generador {rec_type.value}: {e}")
+                return []
+        
+        return compute
+    
+    @staticmethod
+    def _generation_context(
+        health_assessment: Optional[RiskAssessment],
+        behavior_profile: Optional[UserBehaviorProfile],
+    ) -> Dict[str, Any]:
+        """Contexto adicional compartido por los generadores"""
+        context: Dict[str, Any] = {"current_time": datetime.utcnow()}
+        if behavior_profile is not None:
+            context["user_segment"] = behavior_profile.primary_segment.value
+        if health_assessment is not None:
+            context["risk_level"] = health_assessment.overall_risk.value
+        return context
         
     async def initialize(self) -> None:
         """Inicializa el motor de recomendaciones"""
@@ -464,74 +544,54 @@ class SmartRecommendationsEngine:
             logger.warning(f"No se pudieron crear tablas de recomendaciones: {e}")
     
     async def generate_recommendation_set(self, user_id: str) -> RecommendationSet:
-        """Genera un conjunto completo de recomendaciones para el usuario"""
+        """
+        Genera un conjunto completo de recomendaciones para el usuario
+        
+        La evaluación de riesgos y la segmentación se calculan en paralelo y,
+        después, los generadores también. Cada resultado intermedio queda
+        cacheado hasta que lleguen datos de salud o de conversación nuevos,
+        así que solo se recalculan los nodos cuyas entradas cambiaron.
+        """
         try:
-            # Intentar desde caché
-            cache_key = f"recommendations_set:{user_id}"
-            cached_set = await cache_get(cache_key)
-            
-            if cached_set:
-                return RecommendationSet(**cached_set)
-            
-            # Obtener datos de contexto
-            health_assessment = await self.health_engine.assess_health_risks(user_id)
-            behavior_profile = await self.behavior_analyzer.segment_user(user_id)
-            
-            # Contexto adicional
-            context = {
-                "current_time": datetime.utcnow(),
-                "user_segment": behavior_profile.primary_segment.value,
-                "risk_level": health_assessment.overall_risk.value
-            }
-            
-            # Generar recomendaciones con cada generador
-            all_recommendations = []
-            
-            for rec_type, generator in self.generators.items():
-                try:
-                    recommendations = await generator.generate_recommendations(
-                        user_id, health_assessment, behavior_profile, context
-                    )
-                    all_recommendations.extend(recommendations)
-                except Exception as e:
-                    logger.error(f"Error con generador {rec_type.value}: {e}")
-            
-            # Filtrar y priorizar recomendaciones
-            prioritized_recommendations = self._prioritize_recommendations(all_recommendations)
-            
-            # Limitar número de recomendaciones
-            final_recommendations = prioritized_recommendations[:self.max_recommendations_per_set]
-            
-            # Calcular métricas del conjunto
-            set_confidence = statistics.mean([r.confidence_score for r in final_recommendations]) if final_recommendations else 0.5
-            total_expected_impact = sum([r.expected_impact for r in final_recommendations])
-            
-            # Crear conjunto de recomendaciones
-            recommendation_set = RecommendationSet(
-                user_id=user_id,
-                recommendations=final_recommendations,
-                set_confidence=set_confidence,
-                generation_context=context,
-                next_review_date=datetime.utcnow() + timedelta(days=7),
-                total_expected_impact=total_expected_impact,
-                generated_at=datetime.utcnow()
-            )
-            
-            # Cachear resultado
-            await cache_set(
-                cache_key,
-                recommendation_set.to_dict(),
-                ttl=self.recommendation_ttl,
-                priority=CachePriority.HIGH
-            )
-            
-            logger.info(f"Conjunto de {len(final_recommendations)} recomendaciones generado para usuario {user_id}")
-            return recommendation_set
+            values = await self.graph.evaluate(user_id, ["recommendation_set"])
+            return values["recommendation_set"]
             
         except Exception as e:
             logger.error(f"Error generando conjunto de recomendaciones: {e}")
             raise
     
+    async def _build_recommendation_set(
+        self,
+        user_id: str,
+        risk_assessment: RiskAssessment,
+        segment: UserBehaviorProfile,
+        **generated: List[Recommendation],
+    ) -> RecommendationSet:
+        """Combina la salida de los generadores en el conjunto final"""
+        context = self._generation_context(risk_assessment, segment)
+        all_recommendations = [rec for recs in generated.values() for rec in recs]
+        
+        # Filtrar y priorizar recomendaciones
+        prioritized_recommendations = self._prioritize_recommendations(all_recommendations)
+        
+        # Limitar número de recomendaciones
+        final_recommendations = prioritized_recommendations[:self.max_recommendations_per_set]
+        
+        # Calcular métricas del conjunto
+        set_confidence = statistics.mean([r.confidence_score for r in final_recommendations]) if final_recommendations else 0.5
+        total_expected_impact = sum([r.expected_impact for r in final_recommendations])
+        
+        logger.info(f"Conjunto de {len(final_recommendations)} recomendaciones generado para usuario {user_id}")
+        return RecommendationSet(
+            user_id=user_id,
+            recommendations=final_recommendations,
+            set_confidence=set_confidence,
+            generation_context=context,
+            next_review_date=datetime.utcnow() + timedelta(days=7),
+            total_expected_impact=total_expected_impact,
+            generated_at=datetime.utcnow()
+        )
+    
     def _prioritize_recommendations(self, recommendations: List[Recommendation]) -> List[Recommendation]:
         """Prioriza recomendaciones basándose en múltiples factores"""
         try:
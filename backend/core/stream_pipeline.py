@@ -0,0 +1,227 @@
+"""
+Chunked streaming runtime for ETL-style pipelines.
+
+The source is an async iterator of records, cut into numbered chunks.
+Chunks flow through a chain of stages connected by bounded queues, so a
+slow stage applies backpressure all the way to the source and memory
+stays proportional to ``queue_size * chunk_size`` rather than to the
+dataset. Each stage can run several workers; a sequencer re-emits their
+output in chunk order, so the final ``commit`` callback always sees
+chunks contiguously. That makes "last committed chunk" a valid
+checkpoint: a later run started with ``start_index = last + 1`` resumes
+from the next chunk.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SOURCE_STAGE = "extraction"
+
+_END = object()
+
+
+@dataclass
+class StreamChunk:
+    """A numbered slice of the stream plus state deltas from stateful stages."""
+
+    index: int
+    records: List[Dict[str, Any]]
+    state: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class StreamStage:
+    """
+    One stage of the pipeline.
+
+    ``process`` receives a chunk and returns the chunk to pass downstream.
+    ``finish`` runs once after the last chunk with the next free index and
+    may return one more chunk (e.g. aggregates) to pass downstream.
+    """
+
+    name: str
+    process: Callable[[StreamChunk], Awaitable[StreamChunk]]
+    parallelism: int = 1
+    finish: Optional[Callable[[int], Awaitable[Optional[StreamChunk]]]] = None
+
+
+class StreamStageError(Exception):
+    """A stage failed on a chunk; the original exception is the cause."""
+
+    def __init__(self, stage: str, chunk_index: Optional[int], error: BaseException):
+        super().__init__(f"{stage} failed at chunk {chunk_index}: {error}")
+        self.stage = stage
+        self.chunk_index = chunk_index
+        self.error = error
+
+
+async def chunk_records(
+    records: AsyncIterable[Dict[str, Any]], chunk_size: int, start_index: int = 0
+) -> AsyncIterator[StreamChunk]:
+    """Group an async record stream into chunks numbered from start_index."""
+    index, batch = start_index, []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            yield StreamChunk(index, batch)
+            index, batch = index + 1, []
+    if batch:
+        yield StreamChunk(index, batch)
+
+
+class _Sequencer:
+    """Lets out-of-order workers hand chunks downstream in index order."""
+
+    def __init__(self, next_index: int):
+        self.next_index = next_index
+        self._condition = asyncio.Condition()
+
+    async def emit(self, index: int, put: Callable[[], Awaitable[None]]) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.next_index == index)
+            await put()
+            self.next_index += 1
+            self._condition.notify_all()
+
+
+class StreamPipelineRunner:
+    """
+    Run a source through stages into an ordered commit callback.
+
+    Args:
+        stages: Stages applied in order to every chunk
+        chunk_size: Records per chunk
+        queue_size: Chunks buffered between two stages (backpressure bound)
+    """
+
+    def __init__(
+        self, stages: List[StreamStage], chunk_size: int = 1000, queue_size: int = 4
+    ):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.stages = stages
+        self.chunk_size = chunk_size
+        self.queue_size = max(1, queue_size)
+
+    async def run(
+        self,
+        source: AsyncIterable[Dict[str, Any]],
+        commit: Callable[[StreamChunk], Awaitable[None]],
+        start_index: int = 0,
+    ) -> Dict[str, int]:
+        """
+        Stream the source and commit every chunk in order.
+
+        Returns counters for the run. Raises StreamStageError naming the
+        first stage that failed; the other tasks are cancelled.
+        """
+        counters = {"chunks_committed": 0, "records_in": 0, "records_committed": 0}
+        queues = [
+            asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+
+        tasks = [asyncio.create_task(self._produce(source, queues[0], start_index, counters))]
+        for position, stage in enumerate(self.stages):
+            tasks.append(
+                asyncio.create_task(
+                    self._run_stage(stage, queues[position], queues[position + 1], start_index)
+                )
+            )
+        tasks.append(asyncio.create_task(self._commit(queues[-1], commit, counters)))
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return counters
+
+    async def _produce(
+        self,
+        source: AsyncIterable[Dict[str, Any]],
+        output: asyncio.Queue,
+        start_index: int,
+        counters: Dict[str, int],
+    ) -> None:
+        index = start_index
+        try:
+            async for chunk in chunk_records(source, self.chunk_size, start_index):
+                index = chunk.index
+                counters["records_in"] += len(chunk.records)
+                await output.put(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise StreamStageError(SOURCE_STAGE, index, e) from e
+        await output.put(_END)
+
+    async def _run_stage(
+        self,
+        stage: StreamStage,
+        source: asyncio.Queue,
+        output: asyncio.Queue,
+        start_index: int,
+    ) -> None:
+        sequencer = _Sequencer(start_index)
+
+        async def worker() -> None:
+            while True:
+                chunk = await source.get()
+                if chunk is _END:
+                    # Leave the marker for the sibling workers
+                    await source.put(_END)
+                    return
+                try:
+                    result = await stage.process(chunk)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    raise StreamStageError(stage.name, chunk.index, e) from e
+                await sequencer.emit(chunk.index, lambda: output.put(result))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, stage.parallelism))))
+
+        if stage.finish is not None:
+            index = sequencer.next_index
+            try:
+                final_chunk = await stage.finish(index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                raise StreamStageError(stage.name, index, e) from e
+            if final_chunk is not None:
+                await output.put(final_chunk)
+        await output.put(_END)
+
+    async def _commit(
+        self,
+        source: asyncio.Queue,
+        commit: Callable[[StreamChunk], Awaitable[None]],
+        counters: Dict[str, int],
+    ) -> None:
+        while True:
+            chunk = await source.get()
+            if chunk is _END:
+                return
+            await commit(chunk)
+            counters["chunks_committed"] += 1
+            counters["records_committed"] += len(chunk.records)
@@ -0,0 +1,284 @@
+"""
+Streaming Sketches - estructuras probabilísticas de memoria constante
+=====================================================================
+
+Estructuras para analizar flujos de eventos con millones de claves distintas
+sin que la memoria crezca con la cardinalidad:
+
+- ``CountMinSketch``: frecuencia aproximada de cualquier clave (sobreestima,
+  nunca subestima), con actualización conservadora.
+- ``HyperLogLog``: número aproximado de claves distintas (~1.6% de error con
+  precisión 12, 4 KB).
+- ``SpaceSaving``: top-k (heavy hitters) sobre una Stream-Summary; incrementar
+  es O(1) y recorrer los ``n`` más frecuentes es O(n).
+- ``Reservoir``: muestra uniforme de tamaño fijo (algoritmo R).
+
+Todas usan ``stable_hash64`` para que los resultados sean reproducibles entre
+procesos. Los contadores son listas/bytearrays de Python: en el camino caliente
+(un evento cada vez) el acceso escalar es varias veces más rápido que numpy.
+"""
+
+import hashlib
+import math
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_MASK32 = (1 << 32) - 1
+
+
+def stable_hash64(key: str) -> int:
+    """Hash de 64 bits estable entre procesos."""
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+    )
+
+
+class CountMinSketch:
+    """Count-Min Sketch con actualización conservadora."""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows: List[List[int]] = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    def _indexes(self, hashed: int) -> List[int]:
+        h1 = hashed & _MASK32
+        h2 = (hashed >> 32) | 1
+        width = self.width
+        return [(h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, hashed: int, count: int = 1) -> int:
+        """Suma ``count`` a la clave (ya hasheada) y devuelve la nueva estimación."""
+        h1 = hashed & _MASK32
+        h2 = (hashed >> 32) | 1
+        width = self.width
+        cells = [(row, (h1 + i * h2) % width) for i, row in enumerate(self.rows)]
+        target = min([row[col] for row, col in cells]) + count
+        for row, col in cells:
+            if row[col] < target:
+                row[col] = target
+        self.total += count
+        return target
+
+    def estimate(self, hashed: int) -> int:
+        return min(row[col] for row, col in zip(self.rows, self._indexes(hashed)))
+
+    def decay(self, factor: int = 2) -> None:
+        """Divide todos los contadores (envejecimiento de la ventana)."""
+        self.rows = [[value // factor for value in row] for row in self.rows]
+        self.total //= factor
+
+    @property
+    def nbytes(self) -> int:
+        return 8 * self.width * self.depth
+
+
+class HyperLogLog:
+    """Estimador de cardinalidad HyperLogLog."""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, hashed: int) -> None:
+        index = hashed >> (64 - self.precision)
+        remainder = (hashed << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if remainder == 0 else 65 - remainder.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        raw = self._alpha * self.m * self.m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            return int(round(self.m * math.log(self.m / zeros)))
+        return int(round(raw))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.registers)
+
+
+class _Bucket:
+    """Nodo de la Stream-Summary: claves que comparten contador."""
+
+    __slots__ = ("count", "keys", "prev", "next")
+
+    def __init__(self, count: int):
+        self.count = count
+        self.keys: Dict[str, None] = {}
+        self.prev: Optional["_Bucket"] = None
+        self.next: Optional["_Bucket"] = None
+
+
+class SpaceSaving:
+    """
+    Heavy hitters con el algoritmo SpaceSaving sobre una Stream-Summary.
+
+    Mantiene como máximo ``capacity`` claves. Los buckets forman una lista
+    doblemente enlazada ordenada por contador, por lo que un incremento es O(1)
+    y ``top(n)`` recorre solo los ``n`` primeros desde el máximo.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._bucket_of: Dict[str, _Bucket] = {}
+        self._errors: Dict[str, int] = {}
+        self._head: Optional[_Bucket] = None  # contador mínimo
+        self._tail: Optional[_Bucket] = None  # contador máximo
+
+    def __len__(self) -> int:
+        return len(self._bucket_of)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._bucket_of
+
+    def count(self, key: str) -> int:
+        bucket = self._bucket_of.get(key)
+        return bucket.count if bucket else 0
+
+    def error(self, key: str) -> int:
+        return self._errors.get(key, 0)
+
+    def keys(self) -> Iterator[str]:
+        return iter(self._bucket_of)
+
+    def increment(self, key: str) -> Optional[str]:
+        """
+        Cuenta una ocurrencia de ``key``.
+
+        Returns:
+            La clave desalojada para hacerle sitio, si la hubo
+        """
+        bucket = self._bucket_of.get(key)
+        evicted = None
+
+        if bucket is None:
+            if len(self._bucket_of) < self.capacity:
+                self._errors[key] = 0
+                head = self._head
+                if head is None or head.count != 1:
+                    head = self._insert_after(None, 1)
+                head.keys[key] = None
+                self._bucket_of[key] = head
+                return None
+
+            # Reemplazar una clave del bucket mínimo heredando su contador
+            bucket = self._head
+            evicted = next(iter(bucket.keys))
+            del bucket.keys[evicted]
+            del self._bucket_of[evicted]
+            self._errors.pop(evicted, None)
+            self._errors[key] = bucket.count
+        else:
+            del bucket.keys[key]
+
+        target = bucket.next
+        if target is None or target.count != bucket.count + 1:
+            target = self._insert_after(bucket, bucket.count + 1)
+        target.keys[key] = None
+        self._bucket_of[key] = target
+        if not bucket.keys:
+            self._unlink(bucket)
+        return evicted
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """Las ``n`` claves más frecuentes, de mayor a menor, en O(n)."""
+        result: List[Tuple[str, int]] = []
+        bucket = self._tail
+        while bucket is not None and len(result) < n:
+            for key in bucket.keys:
+                result.append((key, bucket.count))
+                if len(result) == n:
+                    break
+            bucket = bucket.prev
+        return result
+
+    def decay(self, factor: int = 2) -> List[str]:
+        """
+        Divide los contadores; las claves que quedan a cero se eliminan.
+
+        Es O(capacity) y reconstruye la Stream-Summary.
+
+        Returns:
+            Claves eliminadas
+        """
+        items = []
+        bucket = self._head
+        while bucket is not None:
+            items.extend((key, bucket.count // factor) for key in bucket.keys)
+            bucket = bucket.next
+
+        self._bucket_of.clear()
+        self._head = self._tail = None
+        removed = []
+        previous: Optional[_Bucket] = None
+        for key, count in items:
+            if count <= 0:
+                removed.append(key)
+                self._errors.pop(key, None)
+                continue
+            self._errors[key] //= factor
+            if previous is None or previous.count != count:
+                previous = self._insert_after(self._tail, count)
+            previous.keys[key] = None
+            self._bucket_of[key] = previous
+        return removed
+
+    def _insert_after(self, bucket: Optional[_Bucket], count: int) -> _Bucket:
+        """Inserta un bucket nuevo tras ``bucket`` (o al inicio si es None)."""
+        new = _Bucket(count)
+        if bucket is None:
+            new.next = self._head
+            if self._head is not None:
+                self._head.prev = new
+            self._head = new
+            if self._tail is None:
+                self._tail = new
+        else:
+            new.prev = bucket
+            new.next = bucket.next
+            if bucket.next is not None:
+                bucket.next.prev = new
+            else:
+                self._tail = new
+            bucket.next = new
+        return new
+
+    def _unlink(self, bucket: _Bucket) -> None:
+        if bucket.prev is not None:
+            bucket.prev.next = bucket.next
+        else:
+            self._head = bucket.next
+        if bucket.next is not None:
+            bucket.next.prev = bucket.prev
+        else:
+            self._tail = bucket.prev
+
+
+class Reservoir:
+    """Muestra uniforme de tamaño fijo sobre un flujo (algoritmo R)."""
+
+    __slots__ = ("size", "samples", "seen", "_rng")
+
+    def __init__(self, size: int = 32, rng: Optional[random.Random] = None):
+        self.size = size
+        self.samples: List[float] = []
+        self.seen = 0
+        self._rng = rng or random.Random()
+
+    def add(self, value: float) -> None:
+        self.seen += 1
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+            return
+        slot = self._rng.randrange(self.seen)
+        if slot < self.size:
+            self.samples[slot] = value
+
+    def __len__(self) -> int:
+        return len(self.samples)
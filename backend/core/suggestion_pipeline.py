@@ -0,0 +1,183 @@
+"""
+Piezas del pipeline de sugerencias proactivas.
+
+``ProactiveSuggestionsEngine`` construye una sola ``UserFeatureSnapshot``
+inmutable por usuario (historial, biométricos, comportamiento, objetivos y
+oportunidades) y la comparte entre todos los generadores, que se ejecutan
+concurrentemente con ``fan_out``. Los cooldowns de todas las sugerencias
+candidatas, de uno o de muchos usuarios, se resuelven con un único MGET y
+las sugerencias finales se cachean en un solo pipeline de Redis.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+COOLDOWN_PREFIX = "suggestion_cooldown"
+SUGGESTION_PREFIX = "suggestion"
+
+
+def cooldown_key(user_id: str, suggestion_type: str) -> str:
+    """Clave Redis del cooldown de un tipo de sugerencia para un usuario."""
+    return f"{COOLDOWN_PREFIX}:{user_id}:{suggestion_type}"
+
+
+def suggestion_key(suggestion_id: str) -> str:
+    """Clave Redis de una sugerencia cacheada."""
+    return f"{SUGGESTION_PREFIX}:{suggestion_id}"
+
+
+def freeze(value: Any) -> Any:
+    """Copia profunda de solo lectura de dicts, listas y sets."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class UserFeatureSnapshot:
+    """
+    Features de un usuario calculadas una vez por pasada del pipeline.
+
+    Todos los generadores leen la misma instancia, así que ninguno vuelve a
+    consultar el historial ni a llamar al modelo. Los mapeos se congelan con
+    ``freeze`` para que un generador no pueda alterar lo que ven los demás.
+    """
+
+    context: Any
+    history: Mapping[str, Any]
+    biometrics: Mapping[str, Any]
+    behavior: Mapping[str, Any]
+    goals: Mapping[str, Any]
+    opportunities: Mapping[str, Any]
+    built_at: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def build(
+        cls,
+        context: Any,
+        history: Optional[Mapping[str, Any]] = None,
+        biometrics: Optional[Mapping[str, Any]] = None,
+        behavior: Optional[Mapping[str, Any]] = None,
+        goals: Optional[Mapping[str, Any]] = None,
+        opportunities: Optional[Mapping[str, Any]] = None,
+    ) -> "UserFeatureSnapshot":
+        return cls(
+            context=context,
+            history=freeze(history or {}),
+            biometrics=freeze(biometrics or {}),
+            behavior=freeze(behavior or {}),
+            goals=freeze(goals or {}),
+            opportunities=freeze(opportunities or {}),
+        )
+
+    @property
+    def user_id(self) -> str:
+        return self.context.user_id
+
+
+async def gather_bounded(
+    items: Iterable[T],
+    func: Callable[[T], Awaitable[R]],
+    concurrency: int,
+) -> List[R]:
+    """Aplicar ``func`` a cada elemento con como mucho ``concurrency`` en vuelo."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+
+async def fan_out(
+    generators: Sequence[Tuple[str, Callable[[UserFeatureSnapshot], Awaitable[List[T]]]]],
+    snapshot: UserFeatureSnapshot,
+) -> List[T]:
+    """
+    Ejecutar todos los generadores a la vez sobre la misma snapshot.
+
+    La latencia es la del generador más lento en lugar de la suma. Un
+    generador que falla se registra y se omite sin descartar el resto.
+    """
+    results = await asyncio.gather(
+        *(generator(snapshot) for _, generator in generators),
+        return_exceptions=True,
+    )
+
+    candidates: List[T] = []
+    for (name, _), result in zip(generators, results):
+        if isinstance(result, BaseException):
+            logger.warning(
+                f"Suggestion generator {name} failed for user {snapshot.user_id}: {result}"
+            )
+            continue
+        candidates.extend(result)
+    return candidates
+
+
+async def fetch_active_cooldowns(
+    client: Any, pairs: Iterable[Tuple[str, str]]
+) -> Set[Tuple[str, str]]:
+    """
+    Devolver los pares (user_id, tipo) que están en cooldown con un solo MGET.
+
+    Si Redis no está disponible o falla se asume que no hay cooldowns,
+    igual que hacía la comprobación individual.
+    """
+    unique = list(dict.fromkeys(pairs))
+    if client is None or not unique:
+        return set()
+
+    try:
+        values = await client.mget([cooldown_key(u, t) for u, t in unique])
+    except Exception as e:
+        logger.warning(f"Cooldown check failed: {e}")
+        return set()
+
+    return {pair for pair, value in zip(unique, values) if value is not None}
+
+
+async def write_suggestion_cache(
+    client: Any, entries: Iterable[Tuple[str, str]], ttl_seconds: int
+) -> int:
+    """Guardar (suggestion_id, json) en un único pipeline. Devuelve cuántas se escribieron."""
+    entries = list(entries)
+    if client is None or not entries:
+        return 0
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        for suggestion_id, payload in entries:
+            pipe.setex(suggestion_key(suggestion_id), ttl_seconds, payload)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to cache suggestions: {e}")
+        return 0
+    return len(entries)
@@ -11,6 +11,7 @@ import uuid
 from enum import Enum
 from typing import Any, Dict, Optional, Callable
 
+from core.circuit_breaker import CircuitBreaker
 from core.logging_config import get_logger
 
 # Intentar importar telemetry_manager del módulo real, si falla usar el mock
@@ -33,174 +34,6 @@ class MessagePriority(Enum):
     CRITICAL = 3
 
 
-class CircuitBreakerState(Enum):
-    """Estados posibles del Circuit Breaker."""
-
-    CLOSED = 0  # Funcionamiento normal
-    OPEN = 1  # Bloqueando llamadas
-    HALF_OPEN = 2  # Probando recuperación
-
-
-class CircuitBreaker:
-    """
-    Implementación del patrón Circuit Breaker.
-
-    Protege contra fallos en cascada al detectar errores y
-    bloquear temporalmente las llamadas a un servicio con problemas.
-    """
-
-    def __init__(
-        self,
-        name: str,
-        failure_threshold: int = 5,
-        recovery_timeout: int = 30,
-        half_open_max_calls: int = 2,
-    ):
-        """
-        Inicializa el Circuit Breaker.
-
-        Args:
-            name: Nombre identificativo
-            failure_threshold: Número de fallos para abrir el circuito
-            recovery_timeout: Tiempo en segundos antes de probar recuperación
-            half_open_max_calls: Máximo de llamadas en estado half-open
-        """
-        self.name = name
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.half_open_max_calls = half_open_max_calls
-
-        # Estado actual
-        self.state = CircuitBreakerState.CLOSED
-        self.failure_count = 0
-        self.last_failure_time = 0
-        self.half_open_calls = 0
-
-        # Estadísticas
-        self.total_calls = 0
-        self.successful_calls = 0
-        self.failed_calls = 0
-        self.prevented_calls = 0
-
-        # Lock para operaciones concurrentes
-        self._lock = asyncio.Lock()
-
-        logger.info(f"Circuit Breaker '{name}' inicializado")
-
-    async def execute(self, func: Callable, *args, **kwargs) -> Any:
-        """
-        Ejecuta una función protegida por el Circuit Breaker.
-
-        Args:
-            func: Función a ejecutar
-            *args: Argumentos posicionales para la función
-            **kwargs: Argumentos con nombre para la función
-
-        Returns:
-            Any: Resultado de la función
-
-        Raises:
-            Exception: Si el circuito está abierto o la función falla
-        """
-        async with self._lock:
-            self.total_calls += 1
-
-            # Verificar si el circuito está abierto
-            if self.state == CircuitBreakerState.OPEN:
-                # Verificar si ha pasado el tiempo de recuperación
-                if time.time() - self.last_failure_time > self.recovery_timeout:
-                    logger.info(
-                        f"Circuit Breaker '{self.name}' cambiando a estado HALF_OPEN"
-                    )
-                    self.state = CircuitBreakerState.HALF_OPEN
-                    self.half_open_calls = 0
-                else:
-                    self.prevented_calls += 1
-                    raise Exception(f"Circuit Breaker '{self.name}' está abierto")
-
-            # Verificar si estamos en half-open y ya alcanzamos el máximo de llamadas
-            if (
-                self.state == CircuitBreakerState.HALF_OPEN
-                and self.half_open_calls >= self.half_open_max_calls
-            ):
-                self.prevented_calls += 1
-                raise Exception(
-                    f"Circuit Breaker '{self.name}' ha alcanzado el máximo de llamadas en HALF_OPEN"
-                )
-
-            # Incrementar contador de llamadas en half-open
-            if self.state == CircuitBreakerState.HALF_OPEN:
-                self.half_open_calls += 1
-
-        # Ejecutar función
-        try:
-            result = await func(*args, **kwargs)
-
-            # Actualizar estado en caso de éxito
-            async with self._lock:
-                self.successful_calls += 1
-
-                if self.state == CircuitBreakerState.HALF_OPEN:
-                    logger.info(
-                        f"Circuit Breaker '{self.name}' recuperado, cambiando a CLOSED"
-                    )
-                    self.state = CircuitBreakerState.CLOSED
-                    self.failure_count = 0
-
-                elif self.state == CircuitBreakerState.CLOSED:
-                    # Reducir contador de fallos gradualmente con cada éxito
-                    if self.failure_count > 0:
-                        self.failure_count -= 1
-
-            return result
-
-        except Exception as e:
-            # Actualizar estado en caso de fallo
-            async with self._lock:
-                self.failed_calls += 1
-                self.failure_count += 1
-                self.last_failure_time = time.time()
-
-                # Verificar si debemos abrir el circuito
-                if (
-                    self.state == CircuitBreakerState.CLOSED
-                    and self.failure_count >= self.failure_threshold
-                ):
-                    logger.warning(
-                        f"Circuit Breaker '{self.name}' cambiando a estado OPEN"
-                    )
-                    self.state = CircuitBreakerState.OPEN
-
-                # Si estamos en half-open y falla, volver a abrir
-                elif self.state == CircuitBreakerState.HALF_OPEN:
-                    logger.warning(
-                        f"Circuit Breaker '{self.name}' fallo en recuperación, volviendo a OPEN"
-                    )
-                    self.state = CircuitBreakerState.OPEN
-
-            # Re-lanzar la excepción
-            raise
-
-    def get_stats(self) -> Dict[str, Any]:
-        """
-        Obtiene estadísticas del Circuit Breaker.
-
-        Returns:
-            Dict[str, Any]: Estadísticas
-        """
-        return {
-            "name": self.name,
-            "state": self.state.name,
-            "failure_count": self.failure_count,
-            "total_calls": self.total_calls,
-            "successful_calls": self.successful_calls,
-            "failed_calls": self.failed_calls,
-            "prevented_calls": self.prevented_calls,
-            "failure_threshold": self.failure_threshold,
-            "recovery_timeout": self.recovery_timeout,
-        }
-
-
 class MessageQueue:
     """
     Cola de mensajes con prioridad para comunicación entre agentes.
@@ -669,7 +502,7 @@ class A2AServer:
                             cb = self.circuit_breakers.get(agent_id)
 
                             if cb:
-                                await cb.execute(handler, message)
+                                await cb.call(handler, message)
                             else:
                                 await handler(message)
 
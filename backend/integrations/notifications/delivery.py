@@ -0,0 +1,246 @@
+"""
+Concurrent push delivery for Firebase Cloud Messaging.
+
+The FCM HTTP v1 API takes one token per request, so a multicast is the same
+message fanned out over many requests. MulticastDispatcher sends tokens in
+batches of at most MULTICAST_LIMIT, keeps a bounded number of requests in
+flight across all batches, retries tokens that failed with a transient
+status and suppresses a payload that a token already received within the
+deduplication window.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+# Same cap as firebase_admin.messaging.send_each_for_multicast
+MULTICAST_LIMIT = 500
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Status used for connection errors and timeouts (no HTTP response)
+NETWORK_ERROR = 0
+
+
+@dataclass
+class SendResponse:
+    """Outcome of one FCM send request."""
+
+    status: int
+    body: Dict[str, Any] = field(default_factory=dict)
+    retry_after: Optional[float] = None
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == NETWORK_ERROR or self.status in RETRYABLE_STATUSES
+
+    @property
+    def unregistered(self) -> bool:
+        return self.status == 404 or "UNREGISTERED" in str(self.body.get("error", ""))
+
+
+@dataclass
+class TokenOutcome:
+    """Final delivery result for one device token."""
+
+    token: str
+    success: bool
+    message_id: Optional[str] = None
+    error: Optional[str] = None
+    status: Optional[int] = None
+    attempts: int = 0
+    unregistered: bool = False
+    duplicate: bool = False
+
+
+SendFunction = Callable[[Dict[str, Any]], Awaitable[SendResponse]]
+
+
+def payload_fingerprint(message: Dict[str, Any]) -> str:
+    """Stable hash of a message body, independent of key order."""
+    canonical = json.dumps(message, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PayloadDeduplicator:
+    """
+    Remembers which (token, payload) pairs went out recently.
+
+    A pair is claimed before sending and released again if the send fails,
+    so only delivered payloads block repeats. A window of 0 disables it.
+    """
+
+    def __init__(
+        self, window_seconds: float = 600.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._expiry: Dict[Tuple[str, str], float] = {}
+        self._order: Deque[Tuple[float, Tuple[str, str]]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def claim(self, token: str, fingerprint: str) -> bool:
+        """Return False if the pair was claimed within the window."""
+        if self.window_seconds <= 0:
+            return True
+        now = self._clock()
+        self._expire(now)
+        key = (token, fingerprint)
+        if key in self._expiry:
+            return False
+        expiry = now + self.window_seconds
+        self._expiry[key] = expiry
+        self._order.append((expiry, key))
+        return True
+
+    def release(self, token: str, fingerprint: str) -> None:
+        self._expiry.pop((token, fingerprint), None)
+
+    def _expire(self, now: float) -> None:
+        while self._order and self._order[0][0] <= now:
+            expiry, key = self._order.popleft()
+            # Skip entries released and claimed again since
+            if self._expiry.get(key) == expiry:
+                del self._expiry[key]
+
+
+class MulticastDispatcher:
+    """
+    Fan one message out to many tokens with bounded concurrency.
+
+    Args:
+        send: Coroutine that posts ``{"message": {...}}`` and returns a SendResponse
+        max_concurrency: Requests in flight at once, shared by all dispatches
+        max_attempts: Attempts per token for retryable failures
+        backoff_seconds: Base delay before a retry round, doubled each round
+        deduplicator: Optional PayloadDeduplicator
+        batch_size: Tokens per multicast batch
+    """
+
+    def __init__(
+        self,
+        send: SendFunction,
+        max_concurrency: int = 100,
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.5,
+        deduplicator: Optional[PayloadDeduplicator] = None,
+        batch_size: int = MULTICAST_LIMIT,
+    ):
+        self._send = send
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.deduplicator = deduplicator
+        self.batch_size = max(1, min(batch_size, MULTICAST_LIMIT))
+
+    async def dispatch(
+        self,
+        message: Dict[str, Any],
+        tokens: Iterable[str],
+        fingerprint: Optional[str] = None,
+    ) -> Dict[str, TokenOutcome]:
+        """
+        Send ``message`` (the FCM message without its token) to every token.
+
+        ``fingerprint`` identifies the payload for deduplication and defaults
+        to a hash of the message. Returns one outcome per distinct token.
+        """
+        fingerprint = fingerprint or payload_fingerprint(message)
+        outcomes: Dict[str, TokenOutcome] = {}
+        fresh: List[str] = []
+        for token in dict.fromkeys(tokens):
+            if self.deduplicator is not None and not self.deduplicator.claim(
+                token, fingerprint
+            ):
+                outcomes[token] = TokenOutcome(
+                    token, False, error="Duplicate payload suppressed", duplicate=True
+                )
+            else:
+                fresh.append(token)
+
+        batches = [
+            fresh[start : start + self.batch_size]
+            for start in range(0, len(fresh), self.batch_size)
+        ]
+        for batch_outcomes in await asyncio.gather(
+            *(self._send_batch(message, batch) for batch in batches)
+        ):
+            outcomes.update(batch_outcomes)
+
+        if self.deduplicator is not None:
+            for token in fresh:
+                if not outcomes[token].success:
+                    self.deduplicator.release(token, fingerprint)
+        return outcomes
+
+    async def _send_batch(
+        self, message: Dict[str, Any], tokens: List[str]
+    ) -> Dict[str, TokenOutcome]:
+        outcomes: Dict[str, TokenOutcome] = {}
+        pending = tokens
+        for attempt in range(1, self.max_attempts + 1):
+            responses = await asyncio.gather(
+                *(self._send_token(message, token) for token in pending)
+            )
+            retry, delay = [], 0.0
+            for token, response in zip(pending, responses):
+                outcome = self._outcome(token, response, attempt)
+                outcomes[token] = outcome
+                if (
+                    not outcome.success
+                    and isinstance(response, SendResponse)
+                    and response.retryable
+                ):
+                    retry.append(token)
+                    delay = max(delay, response.retry_after or 0.0)
+            if not retry or attempt == self.max_attempts:
+                break
+            await asyncio.sleep(max(delay, self.backoff_seconds * 2 ** (attempt - 1)))
+            pending = retry
+        return outcomes
+
+    async def _send_token(self, message: Dict[str, Any], token: str):
+        async with self._semaphore:
+            try:
+                return await self._send({"message": {**message, "token": token}})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return e
+
+    @staticmethod
+    def _outcome(token: str, response, attempt: int) -> TokenOutcome:
+        if isinstance(response, Exception):
+            return TokenOutcome(token, False, error=str(response), attempts=attempt)
+        if response.status == 200:
+            return TokenOutcome(
+                token,
+                True,
+                message_id=response.body.get("name"),
+                status=200,
+                attempts=attempt,
+            )
+        return TokenOutcome(
+            token,
+            False,
+            error=str(response.body.get("error", "")),
+            status=response.status,
+            attempts=attempt,
+            unregistered=response.unregistered,
+        )
@@ -10,13 +10,22 @@ import json
 import logging
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from enum import Enum
 
 import aiohttp
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
 
+from .delivery import (
+    NETWORK_ERROR,
+    MulticastDispatcher,
+    PayloadDeduplicator,
+    SendResponse,
+    TokenOutcome,
+    payload_fingerprint,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -178,7 +187,13 @@ class FirebaseNotificationService:
         ),
     }
 
-    def __init__(self, config: Dict[str, Any]):
+    DEFAULT_ENDPOINT = "https://fcm.googleapis.com"
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        deduplicator: Optional[PayloadDeduplicator] = None,
+    ):
         """
         Initialize Firebase notification service
 
@@ -187,14 +202,35 @@ class FirebaseNotificationService:
                 - service_account_key: Path to Firebase service account JSON
                 - project_id: Firebase project ID
                 - custom_templates: Optional custom notification templates
+                - fcm_endpoint: Base URL of the FCM API (a local stand-in in tests)
+                - max_concurrent_requests: FCM requests in flight at once
+                - max_send_attempts: Attempts per token on transient errors
+                - retry_backoff_seconds: Base delay between retry rounds
+                - dedup_window_seconds: Suppress identical payloads to a token
+                  within this window (0 disables)
+            deduplicator: Shared deduplicator, for callers that create a
+                service per run but need duplicates suppressed across runs
         """
         self.config = config
         self.project_id = config.get("project_id")
+        self.endpoint = config.get("fcm_endpoint", self.DEFAULT_ENDPOINT).rstrip("/")
         self.credentials = None
         self.access_token = None
         self.token_expiry = None
         self.session: Optional[aiohttp.ClientSession] = None
 
+        # One dispatcher per service so the concurrency bound covers all sends
+        self.max_concurrent_requests = config.get("max_concurrent_requests", 100)
+        if deduplicator is None:
+            deduplicator = PayloadDeduplicator(config.get("dedup_window_seconds", 600))
+        self.dispatcher = MulticastDispatcher(
+            self._post_message,
+            max_concurrency=self.max_concurrent_requests,
+            max_attempts=config.get("max_send_attempts", 3),
+            backoff_seconds=config.get("retry_backoff_seconds", 0.5),
+            deduplicator=deduplicator,
+        )
+
         # Initialize templates
         self.templates = self.DEFAULT_TEMPLATES.copy()
         if "custom_templates" in config:
@@ -239,9 +275,15 @@ class FirebaseNotificationService:
             except (ValueError, KeyError) as e:
                 logger.warning(f"Failed to load custom template {type_str}: {e}")
 
+    def _create_session(self) -> aiohttp.ClientSession:
+        """HTTP session whose pool keeps one connection per in-flight request"""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrent_requests)
+        )
+
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession()
+        self.session = self._create_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -251,6 +293,9 @@ class FirebaseNotificationService:
 
     async def _get_access_token(self) -> str:
         """Get valid access token, refreshing if necessary"""
+        if not self.credentials and self.endpoint != self.DEFAULT_ENDPOINT:
+            # Local stand-ins accept any bearer token, like the Firebase emulators
+            return "owner"
         if not self.credentials:
             raise ValueError("Firebase credentials not configured")
 
@@ -337,7 +382,7 @@ class FirebaseNotificationService:
             List of notification results (one per device)
         """
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            self.session = self._create_session()
 
         # Get user's device tokens
         user_tokens = self.device_tokens.get(user_id, [])
@@ -360,31 +405,24 @@ class FirebaseNotificationService:
             logger.error(f"Missing template data field: {e}")
             return [NotificationResult(success=False, error=f"Missing data: {e}")]
 
-        # Prepare notification payload
-        notification_priority = priority or template.default_priority
-
-        # Send to each device
-        results = []
-        for device_token in user_tokens:
-            if device_token.is_active:
-                result = await self._send_to_device(
-                    device_token,
-                    content,
-                    notification_type,
-                    notification_priority,
-                    custom_sound or template.sound,
-                    badge_count or template.badge,
-                    template.icon,
-                    template.color,
-                    additional_data,
-                )
-                results.append(result)
+        message, fingerprint = self._build_message(
+            content,
+            notification_type,
+            priority or template.default_priority,
+            custom_sound or template.sound,
+            badge_count or template.badge,
+            template.icon,
+            template.color,
+            additional_data,
+        )
 
-        return results
+        # Send to every active device in one multicast
+        active_tokens = [token for token in user_tokens if token.is_active]
+        results = await self._deliver(message, fingerprint, active_tokens)
+        return [results[device_token.token] for device_token in active_tokens]
 
-    async def _send_to_device(
+    def _build_message(
         self,
-        device_token: DeviceToken,
         content: Dict[str, str],
         notification_type: NotificationType,
         priority: NotificationPriority,
@@ -393,34 +431,41 @@ class FirebaseNotificationService:
         icon: Optional[str],
         color: Optional[str],
         additional_data: Optional[Dict[str, Any]],
-    ) -> NotificationResult:
-        """Send notification to a specific device"""
-        try:
-            access_token = await self._get_access_token()
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Build the FCM message (without token) and its payload fingerprint.
 
-            # Build FCM message
-            message = {
-                "message": {
-                    "token": device_token.token,
-                    "notification": {
-                        "title": content["title"],
-                        "body": content["body"],
-                    },
-                    "data": {
-                        "type": notification_type.value,
-                        "timestamp": datetime.utcnow().isoformat(),
-                        **(additional_data or {}),
-                    },
-                    "android": {
-                        "priority": priority.value.upper(),
-                        "notification": {"icon": icon, "color": color, "sound": sound},
-                    },
-                    "apns": {"payload": {"aps": {"sound": sound, "badge": badge}}},
-                }
-            }
+        The fingerprint is taken before the send timestamp is added, so the
+        same content sent twice counts as the same payload.
+        """
+        message = {
+            "notification": {
+                "title": content["title"],
+                "body": content["body"],
+            },
+            "data": {
+                "type": notification_type.value,
+                **(additional_data or {}),
+            },
+            "android": {
+                "priority": priority.value.upper(),
+                "notification": {"icon": icon, "color": color, "sound": sound},
+            },
+            "apns": {"payload": {"aps": {"sound": sound, "badge": badge}}},
+        }
+        fingerprint = payload_fingerprint(message)
+        message["data"] = {
+            "type": notification_type.value,
+            "timestamp": datetime.utcnow().isoformat(),
+            **(additional_data or {}),
+        }
+        return message, fingerprint
 
-            # Send via FCM API
-            url = f"https://fcm.googleapis.com/v1/projects/{self.project_id}/messages:send"
+    async def _post_message(self, message: Dict[str, Any]) -> SendResponse:
+        """Post one FCM v1 message"""
+        try:
+            access_token = await self._get_access_token()
+            url = f"{self.endpoint}/v1/projects/{self.project_id}/messages:send"
             headers = {
                 "Authorization": f"Bearer {access_token}",
                 "Content-Type": "application/json",
@@ -430,30 +475,46 @@ class FirebaseNotificationService:
                 url, headers=headers, json=message
             ) as response:
                 if response.status == 200:
-                    data = await response.json()
-                    message_id = data.get("name")
-
-                    # Update last used timestamp
-                    device_token.last_used = datetime.utcnow()
-
-                    logger.info(f"Notification sent successfully: {message_id}")
-                    return NotificationResult(success=True, message_id=message_id)
-                else:
-                    error_data = await response.text()
-                    logger.error(f"Failed to send notification: {error_data}")
-
-                    # Handle invalid token
-                    if response.status == 404 or "UNREGISTERED" in error_data:
-                        device_token.is_active = False
+                    return SendResponse(200, await response.json())
+                error_data = await response.text()
+                return SendResponse(
+                    response.status,
+                    {"error": error_data},
+                    _retry_after(response.headers.get("Retry-After")),
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return SendResponse(NETWORK_ERROR, {"error": str(e) or type(e).__name__})
 
-                    return NotificationResult(
-                        success=False,
-                        error=f"FCM error: {response.status} - {error_data}",
-                    )
+    async def _deliver(
+        self,
+        message: Dict[str, Any],
+        fingerprint: str,
+        device_tokens: List[DeviceToken],
+    ) -> Dict[str, NotificationResult]:
+        """Multicast a message and apply the outcomes to the device tokens"""
+        outcomes = await self.dispatcher.dispatch(
+            message, [device_token.token for device_token in device_tokens], fingerprint
+        )
 
-        except Exception as e:
-            logger.error(f"Error sending notification: {e}")
-            return NotificationResult(success=False, error=str(e))
+        now = datetime.utcnow()
+        for device_token in device_tokens:
+            outcome = outcomes[device_token.token]
+            if outcome.success:
+                device_token.last_used = now
+            elif outcome.unregistered:
+                device_token.is_active = False
+
+        results = {token: _to_result(outcome) for token, outcome in outcomes.items()}
+        failed = [o for o in outcomes.values() if not o.success and not o.duplicate]
+        duplicates = sum(1 for o in outcomes.values() if o.duplicate)
+        logger.info(
+            f"Multicast {message['data']['type']}: "
+            f"{len(outcomes) - len(failed) - duplicates} sent, "
+            f"{len(failed)} failed, {duplicates} duplicates suppressed"
+        )
+        if failed:
+            logger.error(f"Failed to send notification: {failed[0].error}")
+        return results
 
     async def send_bulk_notification(
         self,
@@ -465,6 +526,9 @@ class FirebaseNotificationService:
         """
         Send notification to multiple users
 
+        The payload is rendered once and multicast to all active tokens of
+        all users; a token shared by several users receives it once.
+
         Args:
             user_ids: List of user IDs
             notification_type: Type of notification
@@ -474,18 +538,52 @@ class FirebaseNotificationService:
         Returns:
             Dictionary mapping user_id to notification results
         """
-        results = {}
+        if not self.session:
+            self.session = self._create_session()
+
+        user_ids = list(dict.fromkeys(user_ids))
+        template = self.templates.get(notification_type)
+        if not template:
+            logger.error(f"Unknown notification type: {notification_type}")
+            error = NotificationResult(success=False, error="Unknown notification type")
+            return {user_id: [error] for user_id in user_ids}
 
-        # Send notifications concurrently
-        tasks = []
-        for user_id in user_ids:
-            task = self.send_notification(user_id, notification_type, data, priority)
-            tasks.append((user_id, task))
+        try:
+            content = template.render(**data)
+        except KeyError as e:
+            logger.error(f"Missing template data field: {e}")
+            error = NotificationResult(success=False, error=f"Missing data: {e}")
+            return {user_id: [error] for user_id in user_ids}
+
+        message, fingerprint = self._build_message(
+            content,
+            notification_type,
+            priority or template.default_priority,
+            template.sound,
+            template.badge,
+            template.icon,
+            template.color,
+            None,
+        )
 
-        # Gather results
-        for user_id, task in tasks:
-            results[user_id] = await task
+        targets = {
+            user_id: [t for t in self.device_tokens.get(user_id, []) if t.is_active]
+            for user_id in user_ids
+        }
+        delivered = await self._deliver(
+            message,
+            fingerprint,
+            [device_token for tokens in targets.values() for device_token in tokens],
+        )
 
+        results = {}
+        for user_id, tokens in targets.items():
+            if not self.device_tokens.get(user_id):
+                results[user_id] = [
+                    NotificationResult(success=False, error="No device tokens")
+                ]
+            else:
+                results[user_id] = [delivered[t.token] for t in tokens]
         return results
 
     async def schedule_notification(self, notification: ScheduledNotification) -> bool:
@@ -588,6 +686,25 @@ class FirebaseNotificationService:
         ]
 
 
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds"""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_result(outcome: TokenOutcome) -> NotificationResult:
+    """Convert a dispatcher outcome to the public result type"""
+    if outcome.success:
+        return NotificationResult(success=True, message_id=outcome.message_id)
+    if outcome.status:
+        return NotificationResult(
+            success=False, error=f"FCM error: {outcome.status} - {outcome.error}"
+        )
+    return NotificationResult(success=False, error=outcome.error)
+
+
 # Example usage
 def example_notification_usage():
     """Example of how to use the notification service"""
@@ -7,22 +7,61 @@ It checks for pending notifications and sends them at the appropriate time.
 
 import asyncio
 import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 from celery import Celery
 from celery.schedules import crontab
 
 from core.celery_app import celery_app
+from core.redis_pool import standalone_redis_client
+from integrations.nutrition import NutritionIntegrationService
 from .firebase_service import (
     FirebaseNotificationService,
     ScheduledNotification,
     NotificationType,
 )
+from .delivery import PayloadDeduplicator, payload_fingerprint
+from .timing_wheel import RedisWheelCursor, TimingWheel, minute_of_day
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class DailyReminder:
+    """A daily reminder placed on the timing wheel"""
+
+    user_id: str
+    type: NotificationType
+    data: Dict[str, Any]
+
+
+# Daily reminders by UTC minute of day, reloaded every few minutes so
+# changes made by users reach every worker process
+REMINDER_RELOAD_SECONDS = 300
+REMINDER_CATCH_UP_MINUTES = 5
+_reminder_wheel: TimingWheel = TimingWheel(max_catch_up=0)
+_reminders_loaded_at: Optional[float] = None
+
+# Shared across runs so a payload repeated within the hour is not resent by
+# this process; minutes are never replayed across processes
+_reminder_deduplicator = PayloadDeduplicator(window_seconds=3600)
+
+# Shared across runs so weekly trends reuse the rolling statistics of users
+# whose stored days have not changed
+_nutrition_service: Optional[NutritionIntegrationService] = None
+
+
+def get_nutrition_service() -> NutritionIntegrationService:
+    """Nutrition service kept for the lifetime of the worker process"""
+    global _nutrition_service
+    if _nutrition_service is None:
+        _nutrition_service = NutritionIntegrationService({})
+    return _nutrition_service
+
+
 @celery_app.task(name="process_scheduled_notifications")
 def process_scheduled_notifications():
     """
@@ -103,60 +142,135 @@ def send_daily_reminders():
     asyncio.run(_send_daily_reminders())
 
 
-async def _send_daily_reminders():
-    """Send daily reminder notifications to users"""
+async def _send_daily_reminders(now: Optional[datetime] = None):
+    """Send the daily reminders due in the current minute"""
+    global _reminders_loaded_at
     try:
+        loaded_at = time.monotonic()
+        if (
+            _reminders_loaded_at is None
+            or loaded_at - _reminders_loaded_at >= REMINDER_RELOAD_SECONDS
+        ):
+            _reminder_wheel.clear()
+            load_daily_reminders(_reminder_wheel, get_users_with_reminders())
+            _reminders_loaded_at = loaded_at
+
+        now = now or datetime.utcnow()
+        # Each task run has its own event loop, so the client cannot come
+        # from the global pool
+        async with standalone_redis_client() as redis_client:
+            if redis_client is not None:
+                # Cursor and minute claims shared by every worker process
+                cursor = RedisWheelCursor(
+                    redis_client,
+                    namespace="notifications:reminders:",
+                    max_catch_up=REMINDER_CATCH_UP_MINUTES,
+                )
+                batches = await cursor.advance(_reminder_wheel, now)
+            else:
+                # Per-process cursor: no catch-up, or workers would replay
+                # minutes already sent by others
+                batches = _reminder_wheel.advance(now)
+
+        due = [reminder for batch in batches for reminder in batch.items]
+        if not due:
+            return
+
         config = {
             "project_id": "ngx-agents",
             "service_account_key": "/path/to/serviceAccountKey.json",
         }
 
-        async with FirebaseNotificationService(config) as service:
-            # In production, this would query users with daily reminders enabled
-            # For demo, we'll use mock data
-            users_with_reminders = [
-                {
-                    "user_id": "user123",
-                    "workout_time": "08:00",
-                    "meal_times": ["08:30", "13:00", "19:00"],
-                }
-            ]
-
-            current_hour = datetime.utcnow().hour
-
-            for user in users_with_reminders:
-                # Check if it's time for workout reminder
-                workout_hour = int(user["workout_time"].split(":")[0])
-                if current_hour == workout_hour:
-                    await service.send_notification(
-                        user_id=user["user_id"],
-                        notification_type=NotificationType.WORKOUT_REMINDER,
-                        data={
-                            "workout_type": "Morning Workout",
-                            "duration": 45,
-                            "workout_id": "daily_workout",
-                        },
+        async with FirebaseNotificationService(
+            config, deduplicator=_reminder_deduplicator
+        ) as service:
+            # One multicast per distinct payload
+            groups = group_reminders(due)
+            await asyncio.gather(
+                *(
+                    service.send_bulk_notification(
+                        user_ids=user_ids,
+                        notification_type=notification_type,
+                        data=data,
                     )
-
-                # Check meal times
-                for meal_time in user["meal_times"]:
-                    meal_hour = int(meal_time.split(":")[0])
-                    if current_hour == meal_hour:
-                        meal_type = get_meal_type_by_time(meal_hour)
-                        await service.send_notification(
-                            user_id=user["user_id"],
-                            notification_type=NotificationType.MEAL_REMINDER,
-                            data={
-                                "meal_type": meal_type,
-                                "calories": get_meal_calories(meal_type),
-                                "meal_id": f"daily_{meal_type.lower()}",
-                            },
-                        )
+                    for notification_type, data, user_ids in groups
+                )
+            )
+            logger.info(f"Sent {len(due)} daily reminders in {len(groups)} multicasts")
 
     except Exception as e:
         logger.error(f"Error sending daily reminders: {e}")
 
 
+def get_users_with_reminders() -> List[Dict[str, Any]]:
+    """Users with daily reminders enabled"""
+    # In production, this would query users with daily reminders enabled
+    # For demo, we'll use mock data
+    return [
+        {
+            "user_id": "user123",
+            "workout_time": "08:00",
+            "meal_times": ["08:30", "13:00", "19:00"],
+        }
+    ]
+
+
+def load_daily_reminders(wheel: TimingWheel, users: List[Dict[str, Any]]) -> None:
+    """
+    Place each user's workout and meal reminders on the wheel
+
+    Re-loading a user replaces their previous entries.
+    """
+    for user in users:
+        user_id = user["user_id"]
+        if user.get("workout_time"):
+            wheel.schedule(
+                (user_id, "workout"),
+                user["workout_time"],
+                DailyReminder(
+                    user_id=user_id,
+                    type=NotificationType.WORKOUT_REMINDER,
+                    data={
+                        "workout_type": "Morning Workout",
+                        "duration": 45,
+                        "workout_id": "daily_workout",
+                    },
+                ),
+            )
+
+        for meal_time in user.get("meal_times", []):
+            meal_type = get_meal_type_by_time(minute_of_day(meal_time) // 60)
+            wheel.schedule(
+                (user_id, "meal", meal_time),
+                meal_time,
+                DailyReminder(
+                    user_id=user_id,
+                    type=NotificationType.MEAL_REMINDER,
+                    data={
+                        "meal_type": meal_type,
+                        "calories": get_meal_calories(meal_type),
+                        "meal_id": f"daily_{meal_type.lower()}",
+                    },
+                ),
+            )
+
+
+def group_reminders(
+    reminders: List[DailyReminder],
+) -> List[Tuple[NotificationType, Dict[str, Any], List[str]]]:
+    """Group reminders with identical payloads into (type, data, user_ids)"""
+    groups: Dict[Tuple[NotificationType, str], Tuple[Dict[str, Any], List[str]]] = {}
+    for reminder in reminders:
+        key = (reminder.type, payload_fingerprint(reminder.data))
+        if key not in groups:
+            groups[key] = (reminder.data, [])
+        groups[key][1].append(reminder.user_id)
+    return [
+        (notification_type, data, user_ids)
+        for (notification_type, _), (data, user_ids) in groups.items()
+    ]
+
+
 @celery_app.task(name="send_weekly_progress_update")
 def send_weekly_progress_update():
     """
@@ -187,12 +301,24 @@ async def _send_weekly_progress_update():
                 }
             ]
 
-            for progress in users_progress:
-                await service.send_notification(
-                    user_id=progress["user_id"],
-                    notification_type=NotificationType.PROGRESS_UPDATE,
-                    data=progress,
+            # Weekly nutrition trends for all users in one pass
+            trends = await get_nutrition_service().get_bulk_nutrition_trends(
+                [progress["user_id"] for progress in users_progress], days=7
+            )
+
+            await asyncio.gather(
+                *(
+                    service.send_notification(
+                        user_id=progress["user_id"],
+                        notification_type=NotificationType.PROGRESS_UPDATE,
+                        data=progress,
+                        additional_data=weekly_nutrition_data(
+                            trends.get(progress["user_id"], {})
+                        ),
+                    )
+                    for progress in users_progress
                 )
+            )
 
     except Exception as e:
         logger.error(f"Error sending weekly progress updates: {e}")
@@ -268,6 +394,18 @@ def calculate_next_send_time(recurrence_rule: str, current_time: datetime) -> da
         return current_time + timedelta(days=1)
 
 
+def weekly_nutrition_data(trends: Dict[str, Any]) -> Dict[str, str]:
+    """FCM data fields (string values) summarizing a weekly trends report"""
+    if not trends.get("days_analyzed"):
+        return {}
+    return {
+        "nutrition_days": str(trends["days_analyzed"]),
+        "avg_calories": str(trends["average_daily_calories"]),
+        "avg_protein_g": str(trends["average_daily_protein_g"]),
+        "calorie_trend": trends["calorie_trend"],
+    }
+
+
 def get_meal_type_by_time(hour: int) -> str:
     """Get meal type based on hour of day"""
     if 6 <= hour < 11:
@@ -303,7 +441,7 @@ celery_app.conf.beat_schedule.update(
         },
         "send-daily-reminders": {
             "task": "send_daily_reminders",
-            "schedule": crontab(minute=0),  # Every hour at minute 0
+            "schedule": crontab(),  # Every minute
         },
         "send-weekly-progress": {
             "task": "send_weekly_progress_update",
@@ -0,0 +1,158 @@
+"""
+Minute-resolution timing wheel for daily recurring reminders.
+
+Each of the 1440 slots holds the reminders due at that minute of the day,
+so a scheduler tick only touches the reminders that are due instead of
+scanning every user. ``advance`` remembers the last minute it emitted and
+catches up on minutes skipped by a late tick, up to ``max_catch_up``.
+
+That cursor is private to one process. ``RedisWheelCursor`` keeps it in
+Redis instead and claims each minute with SET NX, so several worker
+processes ticking the same wheel emit every minute exactly once.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+MINUTES_PER_DAY = 24 * 60
+
+T = TypeVar("T")
+
+
+def minute_of_day(value: Any) -> int:
+    """Minute index for a datetime or an ``HH:MM`` string."""
+    if isinstance(value, datetime):
+        return value.hour * 60 + value.minute
+    hours, minutes = str(value).split(":")[:2]
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute < MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time of day: {value}")
+    return minute
+
+
+@dataclass
+class DueBatch(Generic[T]):
+    """Reminders due at one minute of the day."""
+
+    minute: int
+    items: List[T] = field(default_factory=list)
+
+
+class TimingWheel(Generic[T]):
+    """
+    Daily wheel of keyed items.
+
+    Args:
+        max_catch_up: Most minutes ``advance`` replays after a late tick
+    """
+
+    def __init__(self, max_catch_up: int = 5):
+        self.max_catch_up = max(0, max_catch_up)
+        self._slots: List[Dict[Hashable, T]] = [{} for _ in range(MINUTES_PER_DAY)]
+        self._positions: Dict[Hashable, int] = {}
+        self._cursor: Optional[Tuple[int, int]] = None  # (day ordinal, minute)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def schedule(self, key: Hashable, time_of_day: Any, item: T) -> None:
+        """Place ``item`` at a minute of the day, replacing any entry for ``key``."""
+        minute = minute_of_day(time_of_day)
+        self.cancel(key)
+        self._slots[minute][key] = item
+        self._positions[key] = minute
+
+    def clear(self) -> None:
+        """Remove every item, keeping the cursor."""
+        for minute in set(self._positions.values()):
+            self._slots[minute].clear()
+        self._positions.clear()
+
+    def cancel(self, key: Hashable) -> bool:
+        minute = self._positions.pop(key, None)
+        if minute is None:
+            return False
+        del self._slots[minute][key]
+        return True
+
+    def due(self, minute: int) -> DueBatch[T]:
+        """Items in one slot."""
+        return DueBatch(minute, list(self._slots[minute % MINUTES_PER_DAY].values()))
+
+    def advance(self, now: datetime) -> List[DueBatch[T]]:
+        """
+        Emit every non-empty slot from the last emitted minute up to ``now``.
+
+        The first call emits only the current minute. Calls within an
+        already emitted minute return nothing.
+        """
+        day, minute = now.toordinal(), minute_of_day(now)
+        absolute = day * MINUTES_PER_DAY + minute
+        if self._cursor is None:
+            first = absolute
+        else:
+            last = self._cursor[0] * MINUTES_PER_DAY + self._cursor[1]
+            if absolute <= last:
+                return []
+            first = max(last + 1, absolute - self.max_catch_up)
+        self._cursor = (day, minute)
+
+        batches = []
+        for position in range(first, absolute + 1):
+            batch = self.due(position % MINUTES_PER_DAY)
+            if batch.items:
+                batches.append(batch)
+        return batches
+
+
+class RedisWheelCursor:
+    """
+    Wheel cursor shared by every process through Redis.
+
+    The last emitted minute lives in a sorted set (only ever moved forward
+    with ``ZADD GT``) and every minute is claimed with ``SET NX`` before it
+    is emitted, so a catch-up never replays a minute another process sent.
+
+    Args:
+        client: Async Redis client
+        namespace: Key prefix
+        max_catch_up: Most minutes ``advance`` replays after a late tick
+    """
+
+    def __init__(self, client: Any, namespace: str = "wheel:", max_catch_up: int = 5):
+        self.client = client
+        self.max_catch_up = max(0, max_catch_up)
+        self._cursor_key = f"{namespace}cursor"
+        self._claim_prefix = f"{namespace}minute:"
+        # Claims only need to outlive the catch-up window; keep them a day
+        self._claim_ttl = MINUTES_PER_DAY * 60
+
+    async def advance(self, wheel: TimingWheel[T], now: datetime) -> List[DueBatch[T]]:
+        """Emit the non-empty slots of the minutes this process claims up to ``now``."""
+        absolute = now.toordinal() * MINUTES_PER_DAY + minute_of_day(now)
+        last = await self.client.zscore(self._cursor_key, "minute")
+        if last is None:
+            first = absolute
+        elif absolute <= int(last):
+            return []
+        else:
+            first = max(int(last) + 1, absolute - self.max_catch_up)
+
+        pipe = self.client.pipeline(transaction=False)
+        for position in range(first, absolute + 1):
+            pipe.set(f"{self._claim_prefix}{position}", 1, nx=True, ex=self._claim_ttl)
+        pipe.zadd(self._cursor_key, {"minute": absolute}, gt=True)
+        claims = (await pipe.execute())[:-1]
+
+        batches = []
+        for position, claimed in zip(range(first, absolute + 1), claims):
+            if not claimed:
+                continue
+            batch = wheel.due(position % MINUTES_PER_DAY)
+            if batch.items:
+                batches.append(batch)
+        return batches
@@ -0,0 +1,535 @@
+"""
+Food Search for NGX Agents
+Type-ahead food search backed by a local index, a query cache and a pooled
+MyFitnessPal session
+
+Queries are answered from the local index (seed foods plus every food a
+remote search has returned) and only go to MyFitnessPal when the index has
+too few matches. Remote searches reuse authenticated adapters from a pool
+instead of logging in per call, identical concurrent queries share one
+remote request, and popular queries can be re-warmed before they expire.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .adapters.myfitnesspal import MFPConfig, MyFitnessPalAdapter
+
+logger = logging.getLogger(__name__)
+
+SEED_FOODS_PATH = os.path.join(os.path.dirname(__file__), "data", "seed_foods.json")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = decomposed.encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(_TOKEN_PATTERN.findall(ascii_text))
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+@dataclass
+class FoodRecord:
+    """A food in the local search index"""
+
+    food_id: str
+    name: str
+    brand: Optional[str] = None
+    serving_size: Optional[str] = None
+    calories: float = 0.0
+    protein_g: float = 0.0
+    carbs_g: float = 0.0
+    fat_g: float = 0.0
+    source: str = "seed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_mfp(cls, raw: Dict[str, Any]) -> Optional["FoodRecord"]:
+        """Build a record from a MyFitnessPal search item, if it has a name"""
+        item = raw.get("item", raw)
+        name = item.get("description") or item.get("food_name") or item.get("name")
+        if not name:
+            return None
+
+        nutrition = item.get("nutritional_contents") or item
+
+        def amount(*keys: str) -> float:
+            for key in keys:
+                value = nutrition.get(key)
+                if isinstance(value, dict):
+                    value = value.get("value")
+                if value is not None:
+                    try:
+                        return float(value)
+                    except (TypeError, ValueError):
+                        return 0.0
+            return 0.0
+
+        serving = item.get("serving_size")
+        serving_sizes = item.get("serving_sizes") or []
+        if not serving and serving_sizes:
+            first = serving_sizes[0]
+            serving = f"{first.get('value', 1)} {first.get('unit', '')}".strip()
+
+        food_id = item.get("id") or f"{name}|{item.get('brand_name') or ''}"
+        return cls(
+            food_id=f"mfp:{food_id}",
+            name=name,
+            brand=item.get("brand_name"),
+            serving_size=serving,
+            calories=amount("energy", "calories"),
+            protein_g=amount("protein"),
+            carbs_g=amount("carbohydrates"),
+            fat_g=amount("fat"),
+            source="myfitnesspal",
+        )
+
+
+def load_seed_foods(path: str = SEED_FOODS_PATH) -> List[FoodRecord]:
+    """Load the bundled seed dataset"""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return [FoodRecord(**entry) for entry in json.load(fh)]
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Could not load seed foods from {path}: {e}")
+        return []
+
+
+class FoodIndex:
+    """
+    In-memory food index with prefix and fuzzy token matching
+
+    Every query token must match a token of the food's name or brand:
+    exactly, as a prefix (type-ahead) or, when neither matches anything,
+    within a small edit distance (typos). Results are ranked by match quality, then by how often the
+    food was logged, then by shorter names.
+    """
+
+    EXACT_SCORE = 1.0
+    PREFIX_SCORE = 0.8
+    FUZZY_SCORE = 0.6
+    MAX_PREFIX_EXPANSION = 500
+
+    def __init__(self):
+        self.foods: Dict[str, FoodRecord] = {}
+        self.popularity: Counter = Counter()
+        self._food_tokens: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._sorted_tokens: List[str] = []
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+        self._names: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.foods)
+
+    def add(self, food: FoodRecord) -> None:
+        """Add or replace a food"""
+        if food.food_id in self.foods:
+            self._unindex(food.food_id)
+        self.foods[food.food_id] = food
+        tokens = set(normalize_text(f"{food.name} {food.brand or ''}").split())
+        self._food_tokens[food.food_id] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._sorted_tokens, token)
+                for trigram in _trigrams(token):
+                    self._trigram_tokens.setdefault(trigram, set()).add(token)
+            postings.add(food.food_id)
+        self._names.setdefault(normalize_text(food.name), []).append(food.food_id)
+
+    def add_many(self, foods: Iterable[FoodRecord]) -> None:
+        for food in foods:
+            self.add(food)
+
+    def record_use(self, name: str) -> int:
+        """Count a logged food toward ranking; returns the foods matched"""
+        food_ids = self._names.get(normalize_text(name), [])
+        self.popularity.update(food_ids)
+        return len(food_ids)
+
+    def search(self, query: str, limit: int = 10) -> List[FoodRecord]:
+        """Foods matching every token of the query, best first"""
+        tokens = normalize_text(query).split()
+        if not tokens or limit <= 0:
+            return []
+
+        scores: Optional[Dict[str, float]] = None
+        for token in tokens:
+            matches = self._match_token(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    food_id: score + matches[food_id]
+                    for food_id, score in scores.items()
+                    if food_id in matches
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(
+            scores,
+            key=lambda food_id: (
+                -scores[food_id],
+                -self.popularity[food_id],
+                len(self.foods[food_id].name),
+                food_id,
+            ),
+        )
+        return [self.foods[food_id] for food_id in ranked[:limit]]
+
+    def _match_token(self, token: str) -> Dict[str, float]:
+        """Best score per food for one query token"""
+        token_scores: Dict[str, float] = {}
+
+        start = bisect.bisect_left(self._sorted_tokens, token)
+        for candidate in self._sorted_tokens[start : start + self.MAX_PREFIX_EXPANSION]:
+            if not candidate.startswith(token):
+                break
+            token_scores[candidate] = (
+                self.EXACT_SCORE if candidate == token else self.PREFIX_SCORE
+            )
+
+        # Typo tolerance only when nothing matches as typed
+        if not token_scores and len(token) >= 4:
+            limit = 1 if len(token) < 8 else 2
+            shared = Counter(
+                candidate
+                for trigram in _trigrams(token)
+                for candidate in self._trigram_tokens.get(trigram, ())
+            )
+            for candidate, count in shared.items():
+                if count < 2:
+                    continue
+                # Compare against the candidate's prefix too, for partial words
+                distance = min(
+                    _edit_distance(token, candidate, limit),
+                    _edit_distance(token, candidate[: len(token)], limit),
+                )
+                if distance <= limit:
+                    token_scores[candidate] = self.FUZZY_SCORE - 0.1 * distance
+
+        food_scores: Dict[str, float] = {}
+        for candidate, score in token_scores.items():
+            for food_id in self._postings[candidate]:
+                if score > food_scores.get(food_id, 0.0):
+                    food_scores[food_id] = score
+        return food_scores
+
+    def _unindex(self, food_id: str) -> None:
+        food = self.foods.pop(food_id)
+        for token in self._food_tokens.pop(food_id):
+            postings = self._postings[token]
+            postings.discard(food_id)
+            if not postings:
+                del self._postings[token]
+                del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+                for trigram in _trigrams(token):
+                    self._trigram_tokens[trigram].discard(token)
+        name_ids = self._names.get(normalize_text(food.name), [])
+        if food_id in name_ids:
+            name_ids.remove(food_id)
+
+
+class QueryCache:
+    """
+    LRU cache of search results with expiry and query popularity
+
+    Popularity counts are halved when too many distinct queries are
+    tracked, so old bursts fade and memory stays bounded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: (
+            "OrderedDict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]]"
+        ) = OrderedDict()
+        self.popularity: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get((query, limit))
+        if entry is None or entry[0] <= self._clock():
+            self.misses += 1
+            return None
+        self._entries.move_to_end((query, limit))
+        self.hits += 1
+        return entry[1]
+
+    def put(
+        self,
+        query: str,
+        limit: int,
+        results: List[Dict[str, Any]],
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[(query, limit)] = (self._clock() + ttl, results)
+        self._entries.move_to_end((query, limit))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record(self, query: str, limit: int) -> None:
+        self.popularity[(query, limit)] += 1
+        if len(self.popularity) > 10 * self.max_entries:
+            self.popularity = Counter(
+                {key: count // 2 for key, count in self.popularity.items() if count > 1}
+            )
+
+    def popular(self, count: int) -> List[Tuple[str, int]]:
+        """Most requested (query, limit) pairs"""
+        return [key for key, _ in self.popularity.most_common(count)]
+
+
+class MFPSessionPool:
+    """
+    Pool of authenticated MyFitnessPal adapters
+
+    Adapters log in once when created and again only after reauth_seconds;
+    the adapter itself re-authenticates on a 401. An adapter whose request
+    raised is closed and replaced on the next checkout.
+    """
+
+    def __init__(
+        self,
+        config: MFPConfig,
+        size: int = 2,
+        reauth_seconds: float = 1800.0,
+        adapter_factory: Callable[
+            [MFPConfig], MyFitnessPalAdapter
+        ] = MyFitnessPalAdapter,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config
+        self.size = max(1, size)
+        self.reauth_seconds = reauth_seconds
+        self._adapter_factory = adapter_factory
+        self._clock = clock
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: List[MyFitnessPalAdapter] = []
+        self._authenticated_at: Dict[int, float] = {}
+        self.logins = 0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[MyFitnessPalAdapter]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            adapter = await self._checkout()
+            try:
+                yield adapter
+            except BaseException:
+                await self._discard(adapter)
+                raise
+            self._idle.append(adapter)
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    async def _checkout(self) -> MyFitnessPalAdapter:
+        if self._idle:
+            adapter = self._idle.pop()
+            age = self._clock() - self._authenticated_at.get(id(adapter), 0.0)
+            if age < self.reauth_seconds:
+                return adapter
+        else:
+            adapter = self._adapter_factory(self.config)
+            await adapter.__aenter__()
+        try:
+            await self._login(adapter)
+        except BaseException:
+            await self._discard(adapter)
+            raise
+        return adapter
+
+    async def _login(self, adapter: MyFitnessPalAdapter) -> None:
+        await adapter.authenticate()
+        self.logins += 1
+        self._authenticated_at[id(adapter)] = self._clock()
+
+    async def _discard(self, adapter: MyFitnessPalAdapter) -> None:
+        self._authenticated_at.pop(id(adapter), None)
+        try:
+            await adapter.__aexit__(None, None, None)
+        except Exception as e:
+            logger.debug(f"Error closing MyFitnessPal adapter: {e}")
+
+
+class FoodSearchEngine:
+    """
+    Local-first food search
+
+    Args:
+        pool: Session pool for remote searches (None for local only)
+        index: Local food index
+        cache: Query result cache
+        min_remote_chars: Shortest query worth a remote search
+        fallback_ttl_seconds: Cache lifetime of local-only results served
+            because the remote search failed
+    """
+
+    def __init__(
+        self,
+        pool: Optional[MFPSessionPool] = None,
+        index: Optional[FoodIndex] = None,
+        cache: Optional[QueryCache] = None,
+        min_remote_chars: int = 3,
+        fallback_ttl_seconds: float = 30.0,
+    ):
+        self.pool = pool
+        self.index = index if index is not None else FoodIndex()
+        self.cache = cache if cache is not None else QueryCache()
+        self.min_remote_chars = min_remote_chars
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search foods, serving repeats from the cache"""
+        normalized = normalize_text(query)
+        if not normalized or limit <= 0:
+            return []
+        self.cache.record(normalized, limit)
+
+        cached = self.cache.get(normalized, limit)
+        if cached is not None:
+            return cached
+        return await self._resolve(normalized, limit)
+
+    async def warm(self, count: int = 50) -> int:
+        """Refresh the most popular queries; returns how many were refreshed"""
+        popular = self.cache.popular(count)
+        for query, limit in popular:
+            await self._resolve(query, limit)
+        return len(popular)
+
+    def record_use(self, food_name: str) -> None:
+        self.index.record_use(food_name)
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+
+    async def _resolve(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Compute and cache results, sharing work between identical calls"""
+        key = (query, limit)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            results, complete = await self._compute(query, limit)
+            # Fallback results are retried soon instead of pinned for the full TTL
+            self.cache.put(
+                query,
+                limit,
+                results,
+                ttl_seconds=None if complete else self.fallback_ttl_seconds,
+            )
+            future.set_result(results)
+            return results
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _compute(
+        self, query: str, limit: int
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Results and whether they are complete (False after a remote failure)"""
+        local = self.index.search(query, limit)
+        if (
+            len(local) >= limit
+            or self.pool is None
+            or len(query) < self.min_remote_chars
+        ):
+            return [food.to_dict() for food in local], True
+
+        remote = await self._search_remote(query, limit)
+        if remote is None:
+            return [food.to_dict() for food in local], False
+
+        # Re-rank with the remote foods indexed, then keep remote-only matches
+        ranked = self.index.search(query, limit)
+        seen = {food.food_id for food in ranked}
+        ranked.extend(food for food in remote if food.food_id not in seen)
+        return [food.to_dict() for food in ranked[:limit]], True
+
+    async def _search_remote(
+        self, query: str, limit: int
+    ) -> Optional[List[FoodRecord]]:
+        """Remote foods, added to the index; None if the search failed"""
+        try:
+            async with self.pool.acquire() as mfp:
+                items = await mfp.search_foods(query, limit)
+        except Exception as e:
+            logger.warning(f"MyFitnessPal food search failed, using local index: {e}")
+            return None
+
+        foods = [food for food in map(FoodRecord.from_mfp, items) if food]
+        self.index.add_many(foods)
+        return foods
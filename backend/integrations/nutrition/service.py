@@ -18,6 +18,14 @@ from .adapters.myfitnesspal import (
     MFPExercise,
     MFPFood,
 )
+from .food_search import (
+    FoodIndex,
+    FoodSearchEngine,
+    MFPSessionPool,
+    QueryCache,
+    load_seed_foods,
+)
+from .trends import NutritionTrendsEngine
 from .normalizer import (
     NutritionDataNormalizer,
     NutritionSource,
@@ -91,6 +99,12 @@ class NutritionIntegrationService:
 
         # Initialize platform adapters
         self._initialize_adapters()
+        self._initialize_food_search()
+
+        # Rolling nutrition statistics, updated as days are stored
+        self.trends = NutritionTrendsEngine(
+            capacity=config.get("trends_capacity_days", 35)
+        )
 
     def _initialize_adapters(self):
         """Initialize adapters for supported platforms"""
@@ -104,6 +118,51 @@ class NutritionIntegrationService:
 
         # TODO: Initialize other platform adapters (Cronometer, LoseIt, etc.)
 
+    def _initialize_food_search(self):
+        """
+        Initialize food search: seed index, query cache and session pool
+
+        Remote search uses a dedicated account from the MyFitnessPal config
+        ("username"/"password"); without one, searches use the local index.
+        """
+        mfp_settings = self.config.get("myfitnesspal") or {}
+
+        index = FoodIndex()
+        index.add_many(load_seed_foods())
+
+        pool = None
+        if mfp_settings.get("username") and mfp_settings.get("password"):
+            pool = MFPSessionPool(
+                MFPConfig(
+                    username=mfp_settings["username"],
+                    password=mfp_settings["password"],
+                ),
+                size=mfp_settings.get("search_pool_size", 2),
+                reauth_seconds=mfp_settings.get("search_reauth_seconds", 1800),
+            )
+        elif NutritionSource.MYFITNESSPAL in self.platform_adapters:
+            logger.info(
+                "No MyFitnessPal search account configured, food search is local only"
+            )
+
+        cache_ttl = mfp_settings.get("search_cache_ttl_seconds", 3600)
+        self.food_search = FoodSearchEngine(
+            pool=pool,
+            index=index,
+            cache=QueryCache(
+                max_entries=mfp_settings.get("search_cache_entries", 1024),
+                ttl_seconds=cache_ttl,
+            ),
+            fallback_ttl_seconds=mfp_settings.get("search_fallback_ttl_seconds", 30),
+        )
+
+        # Popular queries are refreshed shortly before their entries expire
+        self._warm_interval = mfp_settings.get(
+            "search_warm_interval_seconds", cache_ttl * 0.9
+        )
+        self._warm_count = mfp_settings.get("search_warm_count", 50)
+        self._warm_task: Optional[asyncio.Task] = None
+
     async def connect_platform(
         self, user_id: str, source: NutritionSource, credentials: Dict[str, str]
     ) -> NutritionConnection:
@@ -371,6 +430,7 @@ class NutritionIntegrationService:
                         await mfp.authenticate()
                         await mfp.log_food(food_name, meal_type, servings)
                         success = True
+                        self.food_search.record_use(food_name)
                         logger.info(
                             f"Logged {food_name} to MyFitnessPal for user {user_id}"
                         )
@@ -396,33 +456,55 @@ class NutritionIntegrationService:
             limit: Maximum results
 
         Returns:
-            List of food items
+            List of food items (food_id, name, brand, serving_size,
+            calories, protein_g, carbs_g, fat_g, source)
         """
         if source == NutritionSource.MYFITNESSPAL:
-            # Use a generic connection for searching
-            if NutritionSource.MYFITNESSPAL in self.platform_adapters:
-                # Get any active MFP connection for searching
-                mfp_connection = next(
-                    (
-                        conn
-                        for conn in self.active_connections.values()
-                        if conn.source == NutritionSource.MYFITNESSPAL
-                        and conn.is_active
-                    ),
-                    None,
-                )
+            self.start_food_search_warming()
+            return await self.food_search.search(query, limit)
 
-                if mfp_connection:
-                    mfp_config = MFPConfig(
-                        username=mfp_connection.username,
-                        password=mfp_connection.password,
-                    )
+        return []
 
-                    async with MyFitnessPalAdapter(mfp_config) as mfp:
-                        await mfp.authenticate()
-                        return await mfp.search_foods(query, limit)
+    def start_food_search_warming(self) -> None:
+        """
+        Start the periodic refresh of popular queries on the running loop
 
-        return []
+        The query cache lives in this process, so the refresh runs here
+        rather than in a separate worker. Restarted if its loop went away.
+        """
+        if self._warm_task is not None and not self._warm_task.done():
+            return
+        self._warm_task = asyncio.get_running_loop().create_task(
+            self._warm_food_search_periodically()
+        )
+
+    async def _warm_food_search_periodically(self):
+        while True:
+            await asyncio.sleep(self._warm_interval)
+            try:
+                refreshed = await self.warm_food_search(self._warm_count)
+                logger.debug(f"Refreshed {refreshed} popular food queries")
+            except Exception as e:
+                logger.warning(f"Food search warm-up failed: {e}")
+
+    async def warm_food_search(self, count: int = 50) -> int:
+        """
+        Refresh the most popular food queries before their cache entries expire
+
+        Args:
+            count: Number of popular queries to refresh
+
+        Returns:
+            Number of queries refreshed
+        """
+        return await self.food_search.warm(count)
+
+    async def close(self):
+        """Stop the cache refresh and close pooled platform sessions"""
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            self._warm_task = None
+        await self.food_search.close()
 
     async def get_nutrition_trends(
         self, user_id: str, days: int = 30
@@ -432,89 +514,111 @@ class NutritionIntegrationService:
 
         Args:
             user_id: NGX user ID
+            days: Number of days to analyze (capped at the trends capacity)
+
+        Returns:
+            Nutrition trends and insights, plus rolling 7/14/30-day windows
+        """
+        end_date = date.today()
+        await self._load_trend_history([user_id], end_date)
+        stats = self.trends.window_stats(
+            user_id, end_date, self.trends.windows + (days,)
+        )
+        return self._build_trends_report(stats, days)
+
+    async def get_bulk_nutrition_trends(
+        self, user_ids: List[str], days: int = 7
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get nutrition trends for many users in one vectorized pass
+
+        Users without new data since the last call reuse cached statistics.
+
+        Args:
+            user_ids: NGX user IDs
             days: Number of days to analyze
 
         Returns:
-            Nutrition trends and insights
+            Trends report per user, as returned by get_nutrition_trends
         """
         end_date = date.today()
-        start_date = end_date - timedelta(days=days)
+        await self._load_trend_history(user_ids, end_date)
+        stats = self.trends.bulk_window_stats(
+            user_ids, end_date, self.trends.windows + (days,)
+        )
+        return {
+            user_id: self._build_trends_report(user_stats, days)
+            for user_id, user_stats in stats.items()
+        }
 
-        # Get nutrition history from cache/database
-        daily_data = await self._get_nutrition_history(user_id, start_date, end_date)
+    async def _load_trend_history(self, user_ids: List[str], end_date: date):
+        """
+        Load the stored history of the whole trends window
 
-        if not daily_data:
+        The window is reloaded on every call (at most ``capacity`` rows per
+        user) so days stored by other processes are picked up whatever their
+        date, including backfills and refreshes of older days. Unchanged days
+        leave the cached statistics in place.
+        """
+        start_date = end_date - timedelta(days=self.trends.capacity - 1)
+        user_ids = list(dict.fromkeys(user_ids))
+        histories = await asyncio.gather(
+            *(
+                self._get_nutrition_history(user_id, start_date, end_date)
+                for user_id in user_ids
+            )
+        )
+        for history in histories:
+            self.trends.record_many(history)
+
+    def _build_trends_report(
+        self, stats: Dict[int, Dict[str, Dict[str, Any]]], days: int
+    ) -> Dict[str, Any]:
+        """Build the trends report from rolling window statistics"""
+        window = stats[max(1, min(days, self.trends.capacity))]
+        total_days = window["calories"]["days"]
+        if not total_days:
             return {
                 "error": "No nutrition data available for analysis",
                 "days_analyzed": 0,
             }
 
-        # Calculate trends
-        total_days = len(daily_data)
-        avg_calories = sum(d.total_calories for d in daily_data) / total_days
-        avg_protein = sum(d.total_protein_g for d in daily_data) / total_days
-        avg_carbs = sum(d.total_carbs_g for d in daily_data) / total_days
-        avg_fat = sum(d.total_fat_g for d in daily_data) / total_days
-
-        # Goal adherence
-        days_with_goals = [d for d in daily_data if d.calorie_goal]
-        avg_adherence = None
-        if days_with_goals:
-            avg_adherence = sum(
-                d.goal_adherence_percent or 0 for d in days_with_goals
-            ) / len(days_with_goals)
-
-        # Macro balance trends
-        macro_balances = [d.macro_balance for d in daily_data if d.macro_balance]
+        avg_adherence = window["goal_adherence_percent"]["mean"]
+
         avg_macro_balance = None
-        if macro_balances:
+        if window["protein_percent"]["days"]:
             avg_macro_balance = {
-                "protein_percent": sum(m["protein_percent"] for m in macro_balances)
-                / len(macro_balances),
-                "carbs_percent": sum(m["carbs_percent"] for m in macro_balances)
-                / len(macro_balances),
-                "fat_percent": sum(m["fat_percent"] for m in macro_balances)
-                / len(macro_balances),
+                f"{macro}_percent": window[f"{macro}_percent"]["mean"]
+                for macro in ("protein", "carbs", "fat")
             }
 
         return {
             "days_analyzed": total_days,
-            "average_daily_calories": round(avg_calories, 1),
-            "average_daily_protein_g": round(avg_protein, 1),
-            "average_daily_carbs_g": round(avg_carbs, 1),
-            "average_daily_fat_g": round(avg_fat, 1),
+            "average_daily_calories": round(window["calories"]["mean"], 1),
+            "average_daily_protein_g": round(window["protein_g"]["mean"], 1),
+            "average_daily_carbs_g": round(window["carbs_g"]["mean"], 1),
+            "average_daily_fat_g": round(window["fat_g"]["mean"], 1),
             "average_goal_adherence_percent": (
                 round(avg_adherence, 1) if avg_adherence else None
             ),
             "average_macro_balance": avg_macro_balance,
-            "calorie_trend": self._calculate_trend(
-                [d.total_calories for d in daily_data]
-            ),
-            "protein_trend": self._calculate_trend(
-                [d.total_protein_g for d in daily_data]
-            ),
-            "insights": self._generate_nutrition_insights(daily_data),
+            "calorie_trend": self._classify_trend(window["calories"]["slope"]),
+            "protein_trend": self._classify_trend(window["protein_g"]["slope"]),
+            "rolling_windows": {
+                str(length): {
+                    metric: values
+                    for metric, values in stats[length].items()
+                    if values["days"]
+                }
+                for length in self.trends.windows
+            },
+            "insights": self._generate_nutrition_insights(window, stats[7]),
         }
 
-    def _calculate_trend(self, values: List[float]) -> str:
-        """Calculate trend direction from a list of values"""
-        if len(values) < 2:
-            return "stable"
-
-        # Simple linear regression
-        n = len(values)
-        x_mean = (n - 1) / 2
-        y_mean = sum(values) / n
-
-        numerator = sum((i - x_mean) * (y - y_mean) for i, y in enumerate(values))
-        denominator = sum((i - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
+    def _classify_trend(self, slope: Optional[float]) -> str:
+        """Trend direction from a least-squares slope per day"""
+        if slope is None:
             return "stable"
-
-        slope = numerator / denominator
-
-        # Determine trend based on slope
         if slope > 0.5:
             return "increasing"
         elif slope < -0.5:
@@ -523,24 +627,24 @@ class NutritionIntegrationService:
             return "stable"
 
     def _generate_nutrition_insights(
-        self, daily_data: List[NormalizedDailyNutrition]
+        self,
+        window: Dict[str, Dict[str, Any]],
+        recent: Dict[str, Dict[str, Any]],
     ) -> List[str]:
-        """Generate insights from nutrition data"""
+        """Generate insights from the analyzed window and the last 7 days"""
         insights = []
 
-        if not daily_data:
+        if not window["calories"]["days"]:
             return insights
 
         # Calorie consistency
-        calories = [d.total_calories for d in daily_data]
-        calorie_std = self._calculate_std_dev(calories)
-        if calorie_std > 500:
+        if window["calories"]["variance"] ** 0.5 > 500:
             insights.append(
                 "Your daily calorie intake varies significantly. Consider more consistent eating patterns."
             )
 
         # Protein intake
-        avg_protein = sum(d.total_protein_g for d in daily_data) / len(daily_data)
+        avg_protein = window["protein_g"]["mean"]
         if avg_protein < 50:
             insights.append(
                 "Your protein intake is below recommended levels. Consider adding more protein sources."
@@ -551,11 +655,8 @@ class NutritionIntegrationService:
             )
 
         # Macro balance
-        recent_balances = [d.macro_balance for d in daily_data[-7:] if d.macro_balance]
-        if recent_balances:
-            avg_carb_percent = sum(b["carbs_percent"] for b in recent_balances) / len(
-                recent_balances
-            )
+        avg_carb_percent = recent["carbs_percent"]["mean"]
+        if avg_carb_percent is not None:
             if avg_carb_percent > 60:
                 insights.append(
                     "Your diet is very high in carbohydrates. Consider balancing with more protein and healthy fats."
@@ -567,18 +668,11 @@ class NutritionIntegrationService:
 
         return insights
 
-    def _calculate_std_dev(self, values: List[float]) -> float:
-        """Calculate standard deviation of a list of values"""
-        if len(values) < 2:
-            return 0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        return variance**0.5
-
     async def _store_daily_nutrition(
         self, user_id: str, daily_nutrition: NormalizedDailyNutrition
     ):
         """Store normalized daily nutrition data"""
+        self.trends.record(daily_nutrition)
         # TODO: Integrate with NGX storage system (Supabase)
         logger.debug(
             f"Storing daily nutrition for user {user_id} on {daily_nutrition.date}"
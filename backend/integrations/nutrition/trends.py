@@ -0,0 +1,266 @@
+"""
+Nutrition Trends Engine for NGX Agents
+Rolling nutrition statistics over per-user daily series
+
+Each user's most recent days live in one row of a shared
+(users x days x metrics) array, slotted by date in a ring of ``capacity``
+days. Writing a day touches a single slot; window statistics (mean,
+variance and least-squares slope per day for every metric) are computed
+with masked array sums over whole blocks of users at once. Results are
+cached per user and recomputed only after that user gets new data or the
+window end moves.
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .normalizer import NormalizedDailyNutrition
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    "calories",
+    "protein_g",
+    "carbs_g",
+    "fat_g",
+    "goal_adherence_percent",
+    "protein_percent",
+    "carbs_percent",
+    "fat_percent",
+)
+
+DEFAULT_WINDOWS = (7, 14, 30)
+
+EMPTY_DAY = -1
+
+WindowStats = Dict[int, Dict[str, Dict[str, Optional[float]]]]
+
+
+def daily_metric_values(daily: NormalizedDailyNutrition) -> List[float]:
+    """Metric vector for one day; NaN marks values the day does not have"""
+    nan = float("nan")
+    adherence = (daily.goal_adherence_percent or 0) if daily.calorie_goal else nan
+    balance = daily.macro_balance or {}
+    return [
+        daily.total_calories,
+        daily.total_protein_g,
+        daily.total_carbs_g,
+        daily.total_fat_g,
+        adherence,
+        balance.get("protein_percent", nan),
+        balance.get("carbs_percent", nan),
+        balance.get("fat_percent", nan),
+    ]
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def rolling_window_stats(
+    values: np.ndarray, offsets: np.ndarray, windows: Sequence[int]
+) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Window statistics for a block of users
+
+    Args:
+        values: (users, days, metrics) array, NaN where a value is missing
+        offsets: (users, days) days before the window end (0 = end day,
+            negative or beyond the window = excluded)
+        windows: Window lengths in days
+
+    Returns:
+        Per window, arrays of shape (users, metrics) for n, mean,
+        variance (population) and slope (units per day)
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    # x runs forward in time so a positive slope means increasing
+    x = -offsets.astype(np.float64)[:, :, None]
+
+    results = {}
+    for window in windows:
+        in_window = ((offsets >= 0) & (offsets < window))[:, :, None]
+        mask = present & in_window
+        n = mask.sum(axis=1).astype(np.float64)
+        y = np.where(mask, filled, 0.0)
+        xm = np.where(mask, x, 0.0)
+
+        sum_y = y.sum(axis=1)
+        sum_yy = (y * y).sum(axis=1)
+        sum_x = xm.sum(axis=1)
+        sum_xx = (xm * xm).sum(axis=1)
+        sum_xy = (xm * y).sum(axis=1)
+
+        mean = _safe_divide(sum_y, n)
+        variance = np.where(
+            n >= 2, np.maximum(_safe_divide(sum_yy, n) - mean * mean, 0.0), 0.0
+        )
+        variance = np.where(n > 0, variance, np.nan)
+        slope = _safe_divide(n * sum_xy - sum_x * sum_y, n * sum_xx - sum_x * sum_x)
+        slope = np.where(
+            n >= 2, np.nan_to_num(slope, nan=0.0), np.where(n > 0, 0.0, np.nan)
+        )
+
+        results[window] = {"n": n, "mean": mean, "variance": variance, "slope": slope}
+    return results
+
+
+class NutritionTrendsEngine:
+    """
+    Incrementally updated rolling nutrition statistics for many users
+
+    Args:
+        capacity: Days kept per user; longer windows are capped to it
+        windows: Default window lengths in days
+    """
+
+    def __init__(self, capacity: int = 35, windows: Sequence[int] = DEFAULT_WINDOWS):
+        self.capacity = max(capacity, max(windows))
+        self.windows = tuple(sorted(set(windows)))
+        self._rows: Dict[str, int] = {}
+        self._values = np.full(
+            (0, self.capacity, len(METRICS)), np.nan, dtype=np.float32
+        )
+        self._days = np.full((0, self.capacity), EMPTY_DAY, dtype=np.int64)
+        self._versions: Dict[str, int] = {}
+        self._cache: Dict[str, Tuple[Tuple[int, Tuple[int, ...], int], WindowStats]] = (
+            {}
+        )
+        self.computations = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def has_user(self, user_id: str) -> bool:
+        return user_id in self._rows
+
+    def record(self, daily: NormalizedDailyNutrition) -> None:
+        """Store or replace one day for its user"""
+        row = self._row_for(daily.user_id)
+        ordinal = daily.date.toordinal()
+        slot = ordinal % self.capacity
+        if self._days[row, slot] > ordinal:
+            # Older than everything the ring keeps for this user
+            return
+        values = np.asarray(daily_metric_values(daily), dtype=self._values.dtype)
+        if self._days[row, slot] == ordinal and np.array_equal(
+            self._values[row, slot], values, equal_nan=True
+        ):
+            # Unchanged day: keep the cached statistics
+            return
+        self._days[row, slot] = ordinal
+        self._values[row, slot] = values
+        self._versions[daily.user_id] = self._versions.get(daily.user_id, 0) + 1
+
+    def record_many(self, days: Iterable[NormalizedDailyNutrition]) -> None:
+        for daily in days:
+            self.record(daily)
+
+    def window_stats(
+        self,
+        user_id: str,
+        end_date: Optional[date] = None,
+        windows: Optional[Sequence[int]] = None,
+    ) -> WindowStats:
+        """Window statistics for one user (empty windows for unknown users)"""
+        return self.bulk_window_stats([user_id], end_date, windows)[user_id]
+
+    def bulk_window_stats(
+        self,
+        user_ids: Sequence[str],
+        end_date: Optional[date] = None,
+        windows: Optional[Sequence[int]] = None,
+    ) -> Dict[str, WindowStats]:
+        """
+        Window statistics for many users in one vectorized pass
+
+        Users whose data and window end are unchanged since the last call
+        are served from the cache.
+        """
+        end = (end_date or date.today()).toordinal()
+        windows = self._resolve_windows(windows)
+
+        results: Dict[str, WindowStats] = {}
+        stale = []
+        for user_id in dict.fromkeys(user_ids):
+            key = (end, windows, self._versions.get(user_id, 0))
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == key:
+                results[user_id] = cached[1]
+            else:
+                stale.append(user_id)
+
+        known = [user_id for user_id in stale if user_id in self._rows]
+        if known:
+            rows = np.array([self._rows[user_id] for user_id in known])
+            days = self._days[rows]
+            offsets = np.where(days == EMPTY_DAY, -1, end - days)
+            stats = rolling_window_stats(
+                self._values[rows].astype(np.float64), offsets, windows
+            )
+            self.computations += 1
+            for position, user_id in enumerate(known):
+                results[user_id] = self._unpack(stats, position)
+
+        for user_id in stale:
+            if user_id not in results:
+                results[user_id] = self._empty(windows)
+            key = (end, windows, self._versions.get(user_id, 0))
+            self._cache[user_id] = (key, results[user_id])
+        return results
+
+    def _resolve_windows(self, windows: Optional[Sequence[int]]) -> Tuple[int, ...]:
+        requested = windows or self.windows
+        return tuple(sorted({min(max(1, w), self.capacity) for w in requested}))
+
+    def _row_for(self, user_id: str) -> int:
+        row = self._rows.get(user_id)
+        if row is not None:
+            return row
+        row = len(self._rows)
+        if row == self._values.shape[0]:
+            grow = max(16, row)
+            self._values = np.concatenate(
+                [
+                    self._values,
+                    np.full((grow, self.capacity, len(METRICS)), np.nan, np.float32),
+                ]
+            )
+            self._days = np.concatenate(
+                [self._days, np.full((grow, self.capacity), EMPTY_DAY, np.int64)]
+            )
+        self._rows[user_id] = row
+        return row
+
+    @staticmethod
+    def _unpack(stats: Dict[int, Dict[str, np.ndarray]], position: int) -> WindowStats:
+        unpacked: WindowStats = {}
+        for window, arrays in stats.items():
+            unpacked[window] = {}
+            for index, metric in enumerate(METRICS):
+                n = int(arrays["n"][position, index])
+                unpacked[window][metric] = {
+                    "days": n,
+                    "mean": float(arrays["mean"][position, index]) if n else None,
+                    "variance": (
+                        float(arrays["variance"][position, index]) if n else None
+                    ),
+                    "slope": float(arrays["slope"][position, index]) if n else None,
+                }
+        return unpacked
+
+    @staticmethod
+    def _empty(windows: Sequence[int]) -> WindowStats:
+        return {
+            window: {
+                metric: {"days": 0, "mean": None, "variance": None, "slope": None}
+                for metric in METRICS
+            }
+            for window in windows
+        }
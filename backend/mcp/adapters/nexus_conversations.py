@@ -7,12 +7,12 @@ This adapter translates MCP requests into Nexus Conversations API calls.
 
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
-import aiohttp
 import random
 import json
 
 from mcp.schemas import ToolDefinition
 from mcp.config import ToolConfig
+from core.http_transport import HTTPTransport, get_http_transport
 from core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -31,17 +31,16 @@ class NexusConversationsAdapter:
     
     def __init__(self, endpoint: str = "http://localhost:8005"):
         self.endpoint = endpoint.rstrip("/")
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.transport: Optional[HTTPTransport] = None
         
     async def initialize(self):
-        """Initialize the adapter"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        """Initialize the adapter on the shared HTTP transport"""
+        if not self.transport:
+            self.transport = get_http_transport()
     
     async def close(self):
-        """Clean up resources"""
-        if self.session:
-            await self.session.close()
+        """Release the adapter (the shared transport stays open for other users)"""
+        self.transport = None
     
     def get_tool_definitions(self) -> List[ToolDefinition]:
         """Get all tool definitions provided by Nexus Conversations"""
@@ -270,7 +269,7 @@ class NexusConversationsAdapter:
         Returns:
             Tool execution result
         """
-        if not self.session:
+        if not self.transport:
             await self.initialize()
         
         # Route to appropriate handler
@@ -7,10 +7,10 @@ This adapter translates MCP requests into Nexus Core API calls.
 
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
-import aiohttp
 
 from mcp.schemas import ToolDefinition
 from mcp.config import ToolConfig
+from core.http_transport import HTTPTransport, get_http_transport
 from core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -29,17 +29,16 @@ class NexusCoreAdapter:
     
     def __init__(self, endpoint: str = "http://localhost:8001"):
         self.endpoint = endpoint.rstrip("/")
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.transport: Optional[HTTPTransport] = None
         
     async def initialize(self):
-        """Initialize the adapter"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        """Initialize the adapter on the shared HTTP transport"""
+        if not self.transport:
+            self.transport = get_http_transport()
     
     async def close(self):
-        """Clean up resources"""
-        if self.session:
-            await self.session.close()
+        """Release the adapter (the shared transport stays open for other users)"""
+        self.transport = None
     
     def get_tool_definitions(self) -> List[ToolDefinition]:
         """Get all tool definitions provided by Nexus Core"""
@@ -167,7 +166,7 @@ class NexusCoreAdapter:
         Returns:
             Tool execution result
         """
-        if not self.session:
+        if not self.transport:
             await self.initialize()
         
         # Route to appropriate handler
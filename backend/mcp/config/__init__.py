@@ -1,5 +1,5 @@
 """MCP Configuration Module"""
 
-from .settings import MCPSettings, ToolConfig, NGX_TOOLS, settings
+from .settings import MCPSettings, ToolConfig, CachePolicy, NGX_TOOLS, settings
 
-__all__ = ["MCPSettings", "ToolConfig", "NGX_TOOLS", "settings"]
\ No newline at end of file
+__all__ = ["MCPSettings", "ToolConfig", "CachePolicy", "NGX_TOOLS", "settings"]
\ No newline at end of file
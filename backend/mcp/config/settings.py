@@ -6,7 +6,8 @@ GENESIS with the NGX ecosystem tools.
 """
 
 import os
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional
 from pydantic import BaseSettings, Field
 
 
@@ -34,6 +35,7 @@ class MCPSettings(BaseSettings):
     mcp_max_concurrent_requests: int = Field(default=100, env="MCP_MAX_CONCURRENT_REQUESTS")
     mcp_request_timeout: int = Field(default=60, env="MCP_REQUEST_TIMEOUT")
     mcp_cache_ttl: int = Field(default=300, env="MCP_CACHE_TTL")
+    mcp_cache_stale_ttl: int = Field(default=300, env="MCP_CACHE_STALE_TTL")
     
     # Monitoring
     mcp_metrics_enabled: bool = Field(default=True, env="MCP_METRICS_ENABLED")
@@ -44,6 +46,20 @@ class MCPSettings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
+@dataclass(frozen=True)
+class CachePolicy:
+    """Caching policy for the results of a tool definition"""
+    ttl: int = 300
+    stale_ttl: int = 0  # seconds an expired result may be served while refreshing
+    cacheable: bool = True
+    mutates: bool = False  # every call is a write
+    mutating_actions: FrozenSet[str] = frozenset()  # writes selected by the "action" argument
+    
+    def is_mutation(self, arguments: Dict[str, Any]) -> bool:
+        """Whether a call with these arguments writes upstream data"""
+        return self.mutates or arguments.get("action") in self.mutating_actions
+
+
 class ToolConfig:
     """Configuration for individual NGX tools"""
     
@@ -56,6 +72,9 @@ class ToolConfig:
         self.required_permissions: List[str] = []
         self.rate_limit: Optional[int] = None
         self.priority: int = 5  # 1-10, higher is more important
+        self.max_concurrency: Optional[int] = None  # concurrent calls to this tool
+        self.timeout: Optional[float] = None  # per-call budget in seconds
+        self.cache_policies: Dict[str, CachePolicy] = {}  # definition name (or "*") -> policy
 
 
 # Predefined tool configurations
@@ -121,10 +140,67 @@ TOOL_CAPABILITIES = {
     ]
 }
 
-# Update tool capabilities
+# Tool execution limits: (max concurrent calls, timeout in seconds)
+TOOL_EXECUTION_LIMITS = {
+    "nexus_core": (int(os.getenv("NEXUS_CORE_MAX_CONCURRENCY", "8")), float(os.getenv("NEXUS_CORE_TIMEOUT", "10"))),
+    "nexus_crm": (int(os.getenv("NEXUS_CRM_MAX_CONCURRENCY", "4")), float(os.getenv("NEXUS_CRM_TIMEOUT", "10"))),
+    "ngx_pulse": (int(os.getenv("NGX_PULSE_MAX_CONCURRENCY", "8")), float(os.getenv("NGX_PULSE_TIMEOUT", "8"))),
+    "ngx_agents_blog": (int(os.getenv("NGX_BLOG_MAX_CONCURRENCY", "4")), float(os.getenv("NGX_BLOG_TIMEOUT", "20"))),
+    "nexus_conversations": (int(os.getenv("NEXUS_CONV_MAX_CONCURRENCY", "4")), float(os.getenv("NEXUS_CONV_TIMEOUT", "15")))
+}
+
+# Tool result cache policies: "*" applies to every definition of the tool
+TOOL_CACHE_POLICIES = {
+    "nexus_core": {
+        "*": CachePolicy(ttl=300, stale_ttl=900)
+    },
+    "nexus_crm": {
+        "*": CachePolicy(
+            ttl=60,
+            stale_ttl=300,
+            mutating_actions=frozenset({"create", "update", "delete", "close"})
+        )
+    },
+    "ngx_pulse": {
+        "*": CachePolicy(
+            ttl=30,
+            stale_ttl=120,
+            mutating_actions=frozenset({"start", "stop", "pause", "resume"})
+        ),
+        "ngx_pulse.sync_wearables": CachePolicy(cacheable=False, mutates=True)
+    },
+    "ngx_agents_blog": {
+        "*": CachePolicy(
+            ttl=300,
+            stale_ttl=900,
+            mutating_actions=frozenset({"create", "update", "delete", "publish", "unpublish"})
+        ),
+        "ngx_blog.generate_content": CachePolicy(cacheable=False),
+        "ngx_blog.schedule_content": CachePolicy(cacheable=False, mutates=True)
+    },
+    "nexus_conversations": {
+        "*": CachePolicy(
+            ttl=60,
+            stale_ttl=300,
+            mutating_actions=frozenset({"start", "end", "pause", "resume", "transfer"})
+        ),
+        "nexus_conversations.send_message": CachePolicy(cacheable=False, mutates=True)
+    }
+}
+
+# Update tool capabilities, execution limits and cache policies
 for tool_name, capabilities in TOOL_CAPABILITIES.items():
     if tool_name in NGX_TOOLS:
         NGX_TOOLS[tool_name].capabilities = capabilities
 
+for tool_name, (max_concurrency, timeout) in TOOL_EXECUTION_LIMITS.items():
+    if tool_name in NGX_TOOLS:
+        NGX_TOOLS[tool_name].max_concurrency = max_concurrency
+        NGX_TOOLS[tool_name].timeout = timeout
+
+for tool_name, policies in TOOL_CACHE_POLICIES.items():
+    if tool_name in NGX_TOOLS:
+        NGX_TOOLS[tool_name].cache_policies = dict(policies)
+
 # Singleton settings instance
 settings = MCPSettings()
\ No newline at end of file
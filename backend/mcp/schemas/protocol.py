@@ -24,6 +24,11 @@ class ToolCall(BaseModel):
     id: str = Field(..., description="Unique identifier for the tool call")
     name: str = Field(..., description="Name of the tool to call")
     arguments: Dict[str, Any] = Field(default_factory=dict, description="Tool arguments")
+    depends_on: List[str] = Field(
+        default_factory=list,
+        description="IDs of tool calls that must complete first; their results can be "
+                    "referenced in arguments as \"${call_id.field}\""
+    )
     
     class Config:
         schema_extra = {
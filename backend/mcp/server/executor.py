@@ -0,0 +1,236 @@
+"""
+Tool Execution Engine for MCP Gateway
+
+Runs the tool calls selected for a request as a dependency graph:
+
+- Independent calls run concurrently
+- A call declaring ``depends_on`` waits for those calls; if any of them
+  fails the call is skipped with an error result
+- String arguments of the form ``"${call_id}"`` or ``"${call_id.field}"``
+  are replaced with the (partial) result of a dependency
+- Each adapter gets its own concurrency limit and timeout budget, taken
+  from the ToolRegistry configuration
+- Results are yielded as each call finishes so they can be streamed
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp.schemas import ToolResult
+from mcp.server.registry import ToolRegistry
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_REFERENCE = re.compile(r"^\$\{([^}.]+)(?:\.([^}]+))?\}$")
+
+
+@dataclass
+class ToolExecution:
+    """Outcome of a single tool call within an execution graph"""
+    call: Dict[str, Any]
+    result: ToolResult
+    adapter: str
+    elapsed_ms: float
+    skipped: bool = False
+
+    def to_event(self) -> Dict[str, Any]:
+        """Serialize as a streaming event"""
+        return {
+            "type": "tool_result",
+            "tool_call_id": self.result.tool_call_id,
+            "name": self.call["name"],
+            "content": self.result.content,
+            "is_error": self.result.is_error,
+            "skipped": self.skipped,
+            "elapsed_ms": round(self.elapsed_ms, 2)
+        }
+
+
+class ToolExecutionEngine:
+    """
+    Executes tool calls concurrently while honoring declared dependencies
+    and per-adapter concurrency/timeout limits
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        registry: ToolRegistry,
+        default_timeout: float = 30.0,
+        default_concurrency: int = 4
+    ):
+        """
+        Args:
+            execute: Coroutine that runs one tool (name, arguments) -> result
+            registry: Tool registry providing adapter ownership and limits
+            default_timeout: Timeout for adapters without a configured budget
+            default_concurrency: Concurrency for adapters without a configured limit
+        """
+        self._execute = execute
+        self.registry = registry
+        self.default_timeout = default_timeout
+        self.default_concurrency = default_concurrency
+        self._semaphores: Dict[str, Tuple[int, asyncio.Semaphore]] = {}
+
+    def _limits(self, adapter: str) -> Tuple[int, float]:
+        """Concurrency and timeout for an adapter"""
+        concurrency, timeout = self.registry.get_execution_limits(adapter)
+        return concurrency or self.default_concurrency, timeout or self.default_timeout
+
+    def _semaphore(self, adapter: str) -> asyncio.Semaphore:
+        """Semaphore for an adapter, rebuilt if its configured limit changed"""
+        concurrency, _ = self._limits(adapter)
+        entry = self._semaphores.get(adapter)
+        if entry is None or entry[0] != concurrency:
+            entry = (concurrency, asyncio.Semaphore(concurrency))
+            self._semaphores[adapter] = entry
+        return entry[1]
+
+    @staticmethod
+    def validate(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Check ids and dependencies and return the calls in topological order
+
+        Raises:
+            ValueError: On duplicate ids, unknown dependencies or cycles
+        """
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for call in tool_calls:
+            if call["id"] in by_id:
+                raise ValueError(f"Duplicate tool call id: {call['id']}")
+            by_id[call["id"]] = call
+
+        for call in tool_calls:
+            for dependency in call.get("depends_on") or []:
+                if dependency not in by_id:
+                    raise ValueError(
+                        f"Tool call {call['id']} depends on unknown call {dependency}"
+                    )
+
+        ordered: List[Dict[str, Any]] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(call_id: str) -> None:
+            if state.get(call_id) == 2:
+                return
+            if state.get(call_id) == 1:
+                raise ValueError(f"Dependency cycle detected at tool call {call_id}")
+            state[call_id] = 1
+            for dependency in by_id[call_id].get("depends_on") or []:
+                visit(dependency)
+            state[call_id] = 2
+            ordered.append(by_id[call_id])
+
+        for call in tool_calls:
+            visit(call["id"])
+        return ordered
+
+    async def stream(self, tool_calls: List[Dict[str, Any]]) -> AsyncIterator[ToolExecution]:
+        """
+        Execute the graph, yielding each execution as soon as it finishes
+
+        Pending calls are cancelled if the consumer stops iterating early.
+        """
+        ordered = self.validate(tool_calls)
+        tasks: Dict[str, asyncio.Task] = {}
+        for call in ordered:
+            dependencies = [tasks[d] for d in call.get("depends_on") or []]
+            tasks[call["id"]] = asyncio.create_task(self._run_call(call, dependencies))
+
+        try:
+            for finished in asyncio.as_completed(list(tasks.values())):
+                yield await finished
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+    async def execute_all(self, tool_calls: List[Dict[str, Any]]) -> List[ToolExecution]:
+        """Execute the graph and return executions in the original call order"""
+        executions = {
+            execution.result.tool_call_id: execution
+            async for execution in self.stream(tool_calls)
+        }
+        return [executions[call["id"]] for call in tool_calls]
+
+    async def _run_call(
+        self,
+        call: Dict[str, Any],
+        dependencies: List["asyncio.Task[ToolExecution]"]
+    ) -> ToolExecution:
+        """Wait for dependencies, then run one call within its adapter's limits"""
+        adapter = self.registry.resolve_tool_owner(call["name"])
+        dependency_results: Dict[str, Any] = {}
+
+        for dependency in dependencies:
+            # Each task is awaited by every dependent and by the consumer;
+            # shield so a cancelled dependent doesn't cancel its dependency
+            execution = await asyncio.shield(dependency)
+            if execution.result.is_error:
+                return ToolExecution(
+                    call=call,
+                    result=ToolResult(
+                        tool_call_id=call["id"],
+                        content={"error": f"Dependency {execution.result.tool_call_id} failed"},
+                        is_error=True
+                    ),
+                    adapter=adapter,
+                    elapsed_ms=0.0,
+                    skipped=True
+                )
+            dependency_results[execution.result.tool_call_id] = execution.result.content
+
+        arguments = self._resolve_references(call.get("arguments", {}), dependency_results)
+        _, timeout = self._limits(adapter)
+
+        async with self._semaphore(adapter):
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._execute(call["name"], arguments), timeout)
+            except asyncio.TimeoutError:
+                result = {"error": f"Tool execution timed out after {timeout}s"}
+            except Exception as e:
+                logger.error(f"Error executing tool {call['name']}: {e}")
+                result = {"error": str(e)}
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        return ToolExecution(
+            call=call,
+            result=ToolResult(
+                tool_call_id=call["id"],
+                content=result,
+                is_error=isinstance(result, dict) and "error" in result
+            ),
+            adapter=adapter,
+            elapsed_ms=elapsed_ms
+        )
+
+    def _resolve_references(self, value: Any, results: Dict[str, Any]) -> Any:
+        """Replace ``${call_id[.path]}`` strings with dependency results"""
+        if isinstance(value, dict):
+            return {k: self._resolve_references(v, results) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve_references(v, results) for v in value]
+        if isinstance(value, str):
+            match = _REFERENCE.match(value)
+            if match and match.group(1) in results:
+                return self._lookup(results[match.group(1)], match.group(2))
+        return value
+
+    @staticmethod
+    def _lookup(content: Any, path: Optional[str]) -> Any:
+        """Follow a dotted path (keys or list indexes) into a result"""
+        if not path:
+            return content
+        for part in path.split("."):
+            if isinstance(content, dict):
+                content = content.get(part)
+            elif isinstance(content, list) and part.isdigit() and int(part) < len(content):
+                content = content[int(part)]
+            else:
+                return None
+        return content
@@ -15,9 +15,10 @@ and all NGX ecosystem tools. This server provides:
 import asyncio
 import json
 import logging
+import uuid
 from typing import Any, Dict, List, Optional, Set
 from datetime import datetime, timedelta
-import aiohttp
+import httpx
 from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -40,6 +41,7 @@ from mcp.schemas import (
 from mcp.utils.auth import verify_api_key
 from mcp.utils.cache import CacheManager
 from mcp.server.registry import tool_registry
+from mcp.server.executor import ToolExecutionEngine
 from mcp.adapters import (
     NexusCoreAdapter,
     NexusCRMAdapter,
@@ -47,6 +49,7 @@ from mcp.adapters import (
     NGXAgentsBlogAdapter,
     NexusConversationsAdapter
 )
+from core.http_transport import close_http_transport, get_http_transport
 from core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -68,12 +71,31 @@ class MCPGateway:
         self.start_time = datetime.utcnow()
         self.request_count = 0
         self.cache = CacheManager(ttl=settings.mcp_cache_ttl)
-        self.session = None
+        self._refreshes: Dict[str, asyncio.Task] = {}  # cache key -> in-flight refresh
+        self.transport = get_http_transport()
+        self.executor = ToolExecutionEngine(
+            self._execute_tool,
+            tool_registry,
+            default_timeout=settings.mcp_tool_timeout
+        )
         
+        self._configure_transport()
         self._setup_middleware()
         self._setup_routes()
         self._register_tools()
     
+    def _configure_transport(self):
+        """Size each upstream's connection pool from its tool execution limits"""
+        for tool_config in NGX_TOOLS.values():
+            overrides = {}
+            if tool_config.max_concurrency:
+                # Concurrent tool calls plus headroom for health checks
+                overrides["max_connections"] = tool_config.max_concurrency + 2
+                overrides["max_keepalive_connections"] = tool_config.max_concurrency
+            if tool_config.timeout:
+                overrides["timeout"] = tool_config.timeout
+            self.transport.configure_host(tool_config.endpoint, **overrides)
+    
     def _setup_middleware(self):
         """Configure middleware for the FastAPI app"""
         self.app.add_middleware(
@@ -97,16 +119,14 @@ class MCPGateway:
         
         @self.app.on_event("startup")
         async def startup_event():
-            """Initialize async session on startup"""
-            self.session = aiohttp.ClientSession()
+            """Start background tasks on startup"""
             # Start health check loop
             asyncio.create_task(self._health_check_loop())
         
         @self.app.on_event("shutdown")
         async def shutdown_event():
             """Clean up on shutdown"""
-            if self.session:
-                await self.session.close()
+            await close_http_transport()
         
         @self.app.get("/", response_model=ServerInfo)
         async def get_server_info():
@@ -146,6 +166,32 @@ class MCPGateway:
                 active_connections=len(self.active_connections)
             )
         
+        @self.app.get("/metrics/upstreams")
+        async def get_upstream_metrics():
+            """Get per-upstream request counts, retries, hedges and latency histograms"""
+            return self.transport.get_stats()
+        
+        @self.app.post("/cache/invalidate")
+        async def invalidate_cache(request: Request):
+            """
+            Purge cached tool results after an out-of-band write
+            
+            Body: {"adapter": "nexus_crm"} | {"tool": "nexus_crm.manage_contacts"}
+            | {"pattern": "ngx_pulse.*"}
+            """
+            if settings.mcp_auth_enabled and not verify_api_key(request.headers.get("X-API-Key")):
+                raise HTTPException(status_code=401, detail="Invalid API key")
+            
+            body = await request.json()
+            deleted = 0
+            if body.get("adapter"):
+                deleted += await self.cache.invalidate_tags(f"adapter:{body['adapter']}")
+            if body.get("tool"):
+                deleted += await self.cache.invalidate_tags(f"tool:{body['tool']}")
+            if body.get("pattern"):
+                deleted += await self.cache.clear_pattern(body["pattern"])
+            return {"deleted": deleted, "cache": self.cache.get_stats()}
+        
         @self.app.get("/tools", response_model=ToolRegistry)
         async def get_tools():
             """Get all available tools"""
@@ -311,42 +357,54 @@ class MCPGateway:
         for definition in definitions:
             self.tool_endpoints[definition.name] = NGX_TOOLS["nexus_conversations"].endpoint
     
-    async def _handle_completion(self, request: MCPRequest) -> Dict[str, Any]:
-        """Handle completion request with tool use"""
+    async def _select_tool_calls(self, request: MCPRequest) -> List[Dict[str, Any]]:
+        """
+        Get the tool calls for a completion request
+        
+        Clients may send explicit ``tool_calls`` (with ``depends_on``);
+        otherwise they are selected from the user's last message.
+        """
+        explicit_calls = request.params.get("tool_calls")
+        if explicit_calls:
+            return [
+                {
+                    "id": call.get("id") or self._new_call_id(),
+                    "name": call["name"],
+                    "arguments": call.get("arguments", {}),
+                    "depends_on": call.get("depends_on", [])
+                }
+                for call in explicit_calls
+            ]
+        
         messages = request.params.get("messages", [])
         available_tools = request.params.get("tools", list(self.tools.keys()))
         
-        # Check if we need to use tools
         last_message = messages[-1] if messages else None
         if last_message and last_message.get("role") == "user":
             # Analyze user intent and determine which tools to use
-            tool_calls = await self._analyze_intent_and_select_tools(
+            return await self._analyze_intent_and_select_tools(
                 last_message.get("content", ""),
                 available_tools
             )
+        return []
+    
+    async def _handle_completion(self, request: MCPRequest) -> Dict[str, Any]:
+        """Handle completion request with tool use"""
+        tool_calls = await self._select_tool_calls(request)
+        
+        if tool_calls:
+            # Independent calls run concurrently; dependencies are honored
+            executions = await self.executor.execute_all(tool_calls)
+            tool_results = [execution.result for execution in executions]
             
-            if tool_calls:
-                # Execute tool calls
-                tool_results = []
-                for tool_call in tool_calls:
-                    result = await self._execute_tool(
-                        tool_call["name"],
-                        tool_call["arguments"]
-                    )
-                    tool_results.append(ToolResult(
-                        tool_call_id=tool_call["id"],
-                        content=result,
-                        is_error=isinstance(result, dict) and "error" in result
-                    ))
-                
-                # Return assistant message with tool results
-                return {
-                    "message": {
-                        "role": "assistant",
-                        "tool_calls": tool_calls,
-                        "content": self._generate_response_from_tools(tool_results)
-                    }
+            # Return assistant message with tool results
+            return {
+                "message": {
+                    "role": "assistant",
+                    "tool_calls": tool_calls,
+                    "content": self._generate_response_from_tools(tool_results)
                 }
+            }
         
         # Default response without tools
         return {
@@ -368,23 +426,80 @@ class MCPGateway:
         return {"result": result}
     
     async def _execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        """Execute a tool call by routing to the appropriate service"""
-        # Check cache first
+        """
+        Execute a tool call through the result cache
+        
+        Fresh results are returned directly. Stale results (past TTL, within
+        the policy's stale window) are returned immediately while a single
+        background refresh runs. Concurrent misses share one upstream call.
+        Writes bypass the cache and purge the adapter's cached results.
+        """
+        policy = tool_registry.get_cache_policy(tool_name)
+        adapter_name = tool_registry.resolve_tool_owner(tool_name)
+        
+        if policy.is_mutation(arguments):
+            result = await self._execute_tool_uncached(tool_name, arguments)
+            if not self._is_error(result):
+                purged = await self.cache.invalidate_tags(f"adapter:{adapter_name}")
+                logger.debug(f"{tool_name} wrote upstream data; purged {purged} cached results")
+            return result
+        
+        if not policy.cacheable:
+            return await self._execute_tool_uncached(tool_name, arguments)
+        
         cache_key = f"{tool_name}:{json.dumps(arguments, sort_keys=True)}"
-        cached_result = await self.cache.get(cache_key)
-        if cached_result is not None:
-            return cached_result
+        cached = await self.cache.get_entry(cache_key)
+        if cached is not None:
+            if cached.is_stale and cache_key not in self._refreshes:
+                self._refreshes[cache_key] = asyncio.create_task(
+                    self._refresh_cached_tool(cache_key, tool_name, arguments)
+                )
+            return cached.value
         
+        refresh = self._refreshes.get(cache_key)
+        if refresh is None:
+            refresh = asyncio.create_task(self._refresh_cached_tool(cache_key, tool_name, arguments))
+            self._refreshes[cache_key] = refresh
+        return await asyncio.shield(refresh)
+    
+    async def _refresh_cached_tool(
+        self,
+        cache_key: str,
+        tool_name: str,
+        arguments: Dict[str, Any]
+    ) -> Any:
+        """Execute a tool and cache successful results under its policy and tags"""
+        policy = tool_registry.get_cache_policy(tool_name)
+        tags = (f"tool:{tool_name}", f"adapter:{tool_registry.resolve_tool_owner(tool_name)}")
+        # Writes that land while the call is in flight invalidate its result
+        generation = await self.cache.tag_generations(tags)
+        try:
+            result = await self._execute_tool_uncached(tool_name, arguments)
+            if not self._is_error(result):
+                await self.cache.set(
+                    cache_key,
+                    result,
+                    ttl=policy.ttl,
+                    stale_ttl=policy.stale_ttl,
+                    tags=tags,
+                    if_generation=generation
+                )
+            return result
+        finally:
+            self._refreshes.pop(cache_key, None)
+    
+    @staticmethod
+    def _is_error(result: Any) -> bool:
+        return isinstance(result, dict) and "error" in result
+    
+    async def _execute_tool_uncached(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Execute a tool call by routing to the appropriate service"""
         # Try to use adapter if available
-        adapter_name = tool_name.split(".")[0]  # Get base tool name
+        adapter_name = tool_registry.resolve_tool_owner(tool_name)
         if adapter_name in self.adapters:
             try:
                 adapter = self.adapters[adapter_name]
-                result = await adapter.execute_tool(tool_name, arguments)
-                # Cache successful results
-                if not isinstance(result, dict) or "error" not in result:
-                    await self.cache.set(cache_key, result)
-                return result
+                return await adapter.execute_tool(tool_name, arguments)
             except Exception as e:
                 logger.error(f"Error executing tool {tool_name} via adapter: {e}")
                 return {"error": str(e)}
@@ -395,25 +510,21 @@ class MCPGateway:
             return {"error": f"No endpoint configured for tool: {tool_name}"}
         
         try:
-            # Make request to tool endpoint
-            async with self.session.post(
+            # Make request to tool endpoint (not retried: execution may have side effects)
+            response = await self.transport.post(
                 f"{endpoint}/mcp/execute",
                 json={
                     "tool": tool_name,
                     "arguments": arguments
                 },
-                timeout=aiohttp.ClientTimeout(total=settings.mcp_tool_timeout)
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    # Cache successful results
-                    await self.cache.set(cache_key, result)
-                    return result
-                else:
-                    error_text = await response.text()
-                    return {"error": f"Tool execution failed: {error_text}"}
+                timeout=settings.mcp_tool_timeout
+            )
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {"error": f"Tool execution failed: {response.text}"}
                     
-        except asyncio.TimeoutError:
+        except httpx.TimeoutException:
             return {"error": f"Tool execution timed out after {settings.mcp_tool_timeout}s"}
         except Exception as e:
             logger.error(f"Error executing tool {tool_name}: {e}")
@@ -437,13 +548,13 @@ class MCPGateway:
         if any(word in message_lower for word in ["analytics", "revenue", "dashboard", "metrics", "report"]):
             if "nexus_core.get_client_analytics" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "nexus_core.get_client_analytics",
                     "arguments": {"metric": "revenue", "period": "last_30_days"}
                 })
             elif "nexus_core.get_dashboard_summary" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "nexus_core.get_dashboard_summary",
                     "arguments": {"include_ai_usage": True, "include_financial": True}
                 })
@@ -452,13 +563,13 @@ class MCPGateway:
         if any(word in message_lower for word in ["client", "customer", "contact", "deal", "crm"]):
             if "nexus_crm.manage_contacts" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "nexus_crm.manage_contacts",
                     "arguments": {"action": "list", "filters": {"status": "active", "limit": 10}}
                 })
             if "deal" in message_lower and "nexus_crm.manage_deals" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "nexus_crm.manage_deals",
                     "arguments": {"action": "list"}
                 })
@@ -467,13 +578,13 @@ class MCPGateway:
         if any(word in message_lower for word in ["health", "biometric", "heart", "sleep", "workout", "fitness"]):
             if "ngx_pulse.read_biometrics" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "ngx_pulse.read_biometrics",
                     "arguments": {"user_id": "current", "metric": "all"}
                 })
             if "workout" in message_lower and "ngx_pulse.track_workout" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "ngx_pulse.track_workout",
                     "arguments": {"action": "analyze", "workout_id": "latest"}
                 })
@@ -482,13 +593,13 @@ class MCPGateway:
         if any(word in message_lower for word in ["blog", "content", "post", "article", "seo"]):
             if "ngx_blog.manage_posts" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "ngx_blog.manage_posts",
                     "arguments": {"action": "list", "filters": {"status": "published", "limit": 5}}
                 })
             if "performance" in message_lower and "ngx_blog.analyze_performance" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "ngx_blog.analyze_performance",
                     "arguments": {"metric": "all", "period": "month"}
                 })
@@ -497,19 +608,24 @@ class MCPGateway:
         if any(word in message_lower for word in ["conversation", "chat", "message", "engagement"]):
             if "nexus_conversations.analyze_engagement" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "nexus_conversations.analyze_engagement",
                     "arguments": {"analysis_type": "user_satisfaction", "scope": "global", "period": "week"}
                 })
             if "history" in message_lower and "nexus_conversations.get_history" in available_tools:
                 tool_calls.append({
-                    "id": f"call_{datetime.utcnow().timestamp()}",
+                    "id": self._new_call_id(),
                     "name": "nexus_conversations.get_history",
                     "arguments": {"time_range": "today", "limit": 10}
                 })
         
         return tool_calls
     
+    @staticmethod
+    def _new_call_id() -> str:
+        """Unique tool call id (timestamps collide within one request)"""
+        return f"call_{uuid.uuid4().hex[:12]}"
+    
     def _generate_response_from_tools(self, tool_results: List[ToolResult]) -> str:
         """Generate natural language response from tool results"""
         # This is simplified - in production would use GENESIS AI
@@ -526,21 +642,53 @@ class MCPGateway:
         return " ".join(response_parts)
     
     async def _handle_streaming_request(self, request: MCPRequest):
-        """Handle streaming request over WebSocket"""
-        # Stream chunks of response
+        """
+        Handle streaming request over WebSocket
+        
+        Tool results are streamed as each call finishes, followed by the
+        combined response content.
+        """
         yield {"type": "start", "request_id": request.id}
         
-        # Process request
-        if request.method == "completion":
-            # Simulate streaming response
-            response_text = "Processing your request through the NGX ecosystem..."
-            for word in response_text.split():
+        try:
+            if request.method == "completion":
+                tool_calls = await self._select_tool_calls(request)
+            elif request.method == "tool_call":
+                tool_calls = [{
+                    "id": self._new_call_id(),
+                    "name": request.params.get("tool"),
+                    "arguments": request.params.get("arguments", {})
+                }]
+            else:
+                raise ValueError(f"Unknown method: {request.method}")
+            
+            if tool_calls:
+                yield {"type": "tool_calls", "tool_calls": tool_calls, "request_id": request.id}
+                
+                results: Dict[str, ToolResult] = {}
+                async for execution in self.executor.stream(tool_calls):
+                    results[execution.result.tool_call_id] = execution.result
+                    yield {**execution.to_event(), "request_id": request.id}
+                
+                ordered_results = [results[call["id"]] for call in tool_calls]
+                yield {
+                    "type": "content",
+                    "content": self._generate_response_from_tools(ordered_results),
+                    "request_id": request.id
+                }
+            else:
                 yield {
                     "type": "content",
-                    "content": word + " ",
+                    "content": "I'm ready to help you with the NGX ecosystem. What would you like to know?",
                     "request_id": request.id
                 }
-                await asyncio.sleep(0.1)  # Simulate processing
+        except Exception as e:
+            logger.error(f"Error streaming request {request.id}: {e}")
+            yield {
+                "type": "error",
+                "error": {"code": -32603, "message": str(e)},
+                "request_id": request.id
+            }
         
         yield {"type": "end", "request_id": request.id}
     
@@ -550,25 +698,28 @@ class MCPGateway:
             for tool_name, tool_config in NGX_TOOLS.items():
                 try:
                     start_time = datetime.utcnow()
-                    async with self.session.get(
+                    # Health probes must reflect the upstream as-is: no retries or hedging
+                    response = await self.transport.get(
                         f"{tool_config.endpoint}{tool_config.health_check_path}",
-                        timeout=aiohttp.ClientTimeout(total=5)
-                    ) as response:
-                        latency_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
-                        
-                        if response.status == 200:
-                            self.health_status[tool_name] = HealthStatus(
-                                service=tool_name,
-                                status="healthy",
-                                latency_ms=latency_ms
-                            )
-                        else:
-                            self.health_status[tool_name] = HealthStatus(
-                                service=tool_name,
-                                status="degraded",
-                                latency_ms=latency_ms,
-                                error=f"HTTP {response.status}"
-                            )
+                        idempotent=False,
+                        hedge=False,
+                        timeout=5
+                    )
+                    latency_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+                    
+                    if response.status_code == 200:
+                        self.health_status[tool_name] = HealthStatus(
+                            service=tool_name,
+                            status="healthy",
+                            latency_ms=latency_ms
+                        )
+                    else:
+                        self.health_status[tool_name] = HealthStatus(
+                            service=tool_name,
+                            status="degraded",
+                            latency_ms=latency_ms,
+                            error=f"HTTP {response.status_code}"
+                        )
                             
                 except Exception as e:
                     self.health_status[tool_name] = HealthStatus(
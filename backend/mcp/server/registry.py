@@ -9,13 +9,13 @@ Dynamic registration system that allows NGX tools to:
 """
 
 import asyncio
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 import json
 
 from mcp.schemas import ToolDefinition, HealthStatus
-from mcp.config import ToolConfig
+from mcp.config import CachePolicy, ToolConfig, settings
 from core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -47,8 +47,13 @@ class ToolRegistry:
     def __init__(self):
         self._tools: Dict[str, RegisteredTool] = {}
         self._tool_definitions: Dict[str, ToolDefinition] = {}
+        self._definition_owners: Dict[str, str] = {}  # definition name -> tool name
         self._capabilities: Dict[str, Set[str]] = {}  # capability -> set of tool names
         self._lock = asyncio.Lock()
+        self.default_cache_policy = CachePolicy(
+            ttl=settings.mcp_cache_ttl,
+            stale_ttl=settings.mcp_cache_stale_ttl
+        )
         
     async def register_tool(
         self,
@@ -81,6 +86,7 @@ class ToolRegistry:
                 # Update definitions index
                 for definition in definitions:
                     self._tool_definitions[definition.name] = definition
+                    self._definition_owners[definition.name] = name
                     
                     # Update capability index
                     for capability in config.capabilities:
@@ -121,6 +127,7 @@ class ToolRegistry:
             # Remove from definitions
             for definition in tool.definitions:
                 self._tool_definitions.pop(definition.name, None)
+                self._definition_owners.pop(definition.name, None)
             
             # Remove from capabilities
             for capability in tool.config.capabilities:
@@ -179,6 +186,63 @@ class ToolRegistry:
         """Get a tool definition by name"""
         return self._tool_definitions.get(definition_name)
     
+    def resolve_tool_owner(self, definition_name: str) -> str:
+        """
+        Get the registered tool (adapter) that owns a definition
+        
+        Falls back to the definition prefix (``nexus_core.x`` -> ``nexus_core``)
+        for definitions that are not registered yet.
+        """
+        return self._definition_owners.get(definition_name, definition_name.split(".")[0])
+    
+    def get_execution_limits(self, name: str) -> Tuple[Optional[int], Optional[float]]:
+        """
+        Get the concurrency limit and timeout budget configured for a tool
+        
+        Args:
+            name: Tool name
+            
+        Returns:
+            (max_concurrency, timeout_seconds); None where not configured
+        """
+        tool = self._tools.get(name)
+        if not tool:
+            return None, None
+        return tool.config.max_concurrency, tool.config.timeout
+    
+    def get_cache_policy(self, definition_name: str) -> CachePolicy:
+        """
+        Get the cache policy for a tool definition
+        
+        Resolution order: the definition's own policy, the owning tool's
+        ``"*"`` policy, then the gateway default.
+        """
+        tool = self._tools.get(self.resolve_tool_owner(definition_name))
+        if tool:
+            policies = tool.config.cache_policies
+            policy = policies.get(definition_name) or policies.get("*")
+            if policy:
+                return policy
+        return self.default_cache_policy
+    
+    def set_cache_policy(self, name: str, definition_name: str, policy: CachePolicy) -> bool:
+        """
+        Declare a cache policy for a registered tool
+        
+        Args:
+            name: Registered tool name
+            definition_name: Definition name, or "*" for all of the tool's definitions
+            policy: Cache policy
+            
+        Returns:
+            bool: Success status
+        """
+        tool = self._tools.get(name)
+        if not tool:
+            return False
+        tool.config.cache_policies[definition_name] = policy
+        return True
+    
     def list_tools(self, active_only: bool = False) -> List[str]:
         """
         List all registered tools
@@ -239,7 +303,9 @@ class ToolRegistry:
                         "name": tool.config.name,
                         "endpoint": tool.config.endpoint,
                         "version": tool.config.version,
-                        "capabilities": tool.config.capabilities
+                        "capabilities": tool.config.capabilities,
+                        "max_concurrency": tool.config.max_concurrency,
+                        "timeout": tool.config.timeout
                     },
                     "definitions": [d.dict() for d in tool.definitions],
                     "registered_at": tool.registered_at.isoformat(),
@@ -260,6 +326,7 @@ class ToolRegistry:
                 # Clear existing
                 self._tools.clear()
                 self._tool_definitions.clear()
+                self._definition_owners.clear()
                 self._capabilities.clear()
                 
                 # Import tools
@@ -270,6 +337,8 @@ class ToolRegistry:
                         version=tool_data["config"]["version"]
                     )
                     config.capabilities = tool_data["config"]["capabilities"]
+                    config.max_concurrency = tool_data["config"].get("max_concurrency")
+                    config.timeout = tool_data["config"].get("timeout")
                     
                     definitions = [
                         ToolDefinition(**d) for d in tool_data["definitions"]
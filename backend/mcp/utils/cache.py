@@ -3,121 +3,493 @@ Cache utilities for MCP Gateway
 """
 
 import json
-import asyncio
-from typing import Any, Optional
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
-from core.cache_manager import CacheManager as CoreCacheManager
+
+from core.advanced_cache_manager import advanced_cache_manager
+from core.logging_config import get_logger
+from core.redis_pool import get_redis_client
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CachedResult:
+    """A cached value together with its freshness"""
+    value: Any
+    is_stale: bool
+    age_seconds: float
+
+
+class LocalKeyIndex:
+    """
+    In-process key/tag index, used when Redis is not available
+
+    Only sees the keys written by this process; with several workers use
+    ``RedisKeyIndex`` so invalidation reaches every worker's entries.
+    """
+
+    def __init__(self):
+        # Sorted for prefix scans, plus tags
+        self._sorted_keys: List[str] = []
+        self._key_tags: Dict[str, Tuple[str, ...]] = {}
+        self._key_deadline: Dict[str, float] = {}
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._tag_generation: Dict[str, int] = {}
+
+    async def add(self, key: str, tags: Tuple[str, ...], deadline: float) -> None:
+        if key in self._key_deadline:
+            self._untag(key)
+        else:
+            insort(self._sorted_keys, key)
+        self._key_deadline[key] = deadline
+        self._key_tags[key] = tags
+        for tag in tags:
+            self._tag_keys.setdefault(tag, set()).add(key)
+
+    async def remove(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            if self._key_deadline.pop(key, None) is None:
+                continue
+            self._untag(key)
+            self._key_tags.pop(key, None)
+            index = bisect_left(self._sorted_keys, key)
+            if index < len(self._sorted_keys) and self._sorted_keys[index] == key:
+                del self._sorted_keys[index]
+
+    async def with_prefix(self, head: str) -> List[str]:
+        start = bisect_left(self._sorted_keys, head)
+        keys = []
+        for key in self._sorted_keys[start:]:
+            if not key.startswith(head):
+                break
+            keys.append(key)
+        return keys
+
+    async def matching(self, pattern: str) -> List[str]:
+        return [key for key in self._sorted_keys if fnmatchcase(key, pattern)]
+
+    async def tagged(self, tags: Iterable[str]) -> Set[str]:
+        keys: Set[str] = set()
+        for tag in tags:
+            keys |= self._tag_keys.get(tag, set())
+        return keys
+
+    async def bump_generations(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._tag_generation[tag] = self._tag_generation.get(tag, 0) + 1
+
+    async def generations(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {tag: self._tag_generation.get(tag, 0) for tag in tags}
+
+    async def prune(self, now: float) -> None:
+        """Drop index entries whose backend entry has expired"""
+        await self.remove(
+            [key for key, deadline in self._key_deadline.items() if deadline < now]
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "index": "local",
+            "indexed_keys": len(self._sorted_keys),
+            "tags": len(self._tag_keys),
+        }
+
+    def _untag(self, key: str) -> None:
+        for tag in self._key_tags.get(key, ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+
+class RedisKeyIndex:
+    """
+    Key/tag index shared through Redis by every worker on the same backend
+
+    - ``{ns}keys``: ZSET with score 0, for lexicographic prefix ranges
+    - ``{ns}deadlines``: ZSET scored by expiry, for pruning
+    - ``{ns}key_tags``: HASH key -> JSON list of its tags
+    - ``{ns}tag:{tag}``: SET of the keys carrying a tag
+    - ``{ns}tag_generations``: HASH tag -> invalidation counter
+    """
+
+    def __init__(self, client: Any, namespace: str = "mcp:index:"):
+        self.client = client
+        self.namespace = namespace
+        self._keys = f"{namespace}keys"
+        self._deadlines = f"{namespace}deadlines"
+        self._key_tags = f"{namespace}key_tags"
+        self._generations = f"{namespace}tag_generations"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}tag:{tag}"
+
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def add(self, key: str, tags: Tuple[str, ...], deadline: float) -> None:
+        previous = await self.client.hget(self._key_tags, key)
+        pipe = self.client.pipeline(transaction=True)
+        for tag in json.loads(self._decode(previous)) if previous else ():
+            if tag not in tags:
+                pipe.srem(self._tag_key(tag), key)
+        pipe.zadd(self._keys, {key: 0})
+        pipe.zadd(self._deadlines, {key: deadline})
+        pipe.hset(self._key_tags, key, json.dumps(list(tags)))
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), key)
+        await pipe.execute()
+
+    async def remove(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        tag_lists = await self.client.hmget(self._key_tags, keys)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrem(self._keys, *keys)
+        pipe.zrem(self._deadlines, *keys)
+        pipe.hdel(self._key_tags, *keys)
+        for key, tags in zip(keys, tag_lists):
+            for tag in json.loads(self._decode(tags)) if tags else ():
+                pipe.srem(self._tag_key(tag), key)
+        await pipe.execute()
+
+    async def with_prefix(self, head: str) -> List[str]:
+        if head:
+            low, high = b"[" + head.encode(), b"[" + head.encode() + b"\xff"
+        else:
+            low, high = "-", "+"
+        return [
+            self._decode(key)
+            for key in await self.client.zrangebylex(self._keys, low, high)
+        ]
+
+    async def matching(self, pattern: str) -> List[str]:
+        keys = []
+        async for key, _ in self.client.zscan_iter(self._keys, match=pattern):
+            key = self._decode(key)
+            if fnmatchcase(key, pattern):
+                keys.append(key)
+        return keys
+
+    async def tagged(self, tags: Iterable[str]) -> Set[str]:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return set()
+        return {self._decode(key) for key in await self.client.sunion(tag_keys)}
+
+    async def bump_generations(self, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.hincrby(self._generations, tag, 1)
+        await pipe.execute()
+
+    async def generations(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = await self.client.hmget(self._generations, tags)
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def prune(self, now: float) -> None:
+        """Drop index entries whose backend entry has expired"""
+        expired = await self.client.zrangebyscore(self._deadlines, "-inf", now)
+        await self.remove([self._decode(key) for key in expired])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"index": "redis", "namespace": self.namespace}
+
+
+class RedisCacheBackend:
+    """
+    Redis-only entry storage
+
+    Tool results must disappear from every worker as soon as they are
+    invalidated; a per-process L1 in front of Redis would keep serving
+    them elsewhere until their TTL ran out.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: Any, ttl: int) -> bool:
+        if ttl <= 0:
+            # Already past its stale window: nothing to keep
+            await self.client.delete(key)
+            return False
+        return bool(await self.client.set(key, value, ex=ttl))
+
+    async def delete(self, key: str) -> bool:
+        await self.client.delete(key)
+        return True
 
 
 class CacheManager:
     """
     Cache manager for MCP Gateway responses
-    Wraps the core cache manager with MCP-specific functionality
+    Wraps the core cache manager with MCP-specific functionality:
+
+    - Entries may outlive their TTL by ``stale_ttl`` seconds so an expired
+      result can be served while it is refreshed (stale-while-revalidate)
+    - A key/tag index kept next to the cache makes prefix, glob and tag
+      invalidation possible without scanning the backend. It lives in Redis
+      when available, so every worker sharing the backend sees the same
+      membership and tag generations
+    - Entries are stored in Redis only (no per-process layer), so an
+      invalidation run by one worker is seen by all of them
     """
-    
-    def __init__(self, ttl: int = 300):
+
+    # Sweep expired keys from the index every N writes
+    PRUNE_EVERY = 1000
+
+    def __init__(
+        self,
+        ttl: int = 300,
+        backend: Optional[Any] = None,
+        index: Optional[Any] = None
+    ):
         """
         Initialize cache manager
-        
+
         Args:
             ttl: Time to live in seconds (default: 5 minutes)
+            backend: Cache backend with async get/set/delete (default:
+                ``RedisCacheBackend`` on the shared Redis pool, or the core
+                advanced cache when Redis is not available)
+            index: Key/tag index (default: ``RedisKeyIndex`` on the shared Redis
+                pool, or ``LocalKeyIndex`` when Redis is not available)
         """
         self.ttl = ttl
-        self.core_cache = CoreCacheManager()
+        self.core_cache = backend
         self._cache_prefix = "mcp:"
-    
+
+        # Index of live keys (unprefixed) and tag generations, resolved lazily
+        self._index = index
+        self._writes = 0
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "invalidated": 0}
+
     async def get(self, key: str) -> Optional[Any]:
         """
         Get value from cache
-        
+
         Args:
             key: Cache key
-            
+
         Returns:
-            Cached value or None if not found/expired
+            Cached value or None if not found/expired (stale values are not returned)
+        """
+        entry = await self.get_entry(key)
+        if entry is None or entry.is_stale:
+            return None
+        return entry.value
+
+    async def get_entry(self, key: str) -> Optional[CachedResult]:
+        """
+        Get value from cache including stale values
+
+        Args:
+            key: Cache key
+
+        Returns:
+            CachedResult, or None if not found or past its stale window
         """
         prefixed_key = f"{self._cache_prefix}{key}"
-        cached_data = await self.core_cache.get(prefixed_key)
-        
-        if cached_data:
-            try:
-                data = json.loads(cached_data) if isinstance(cached_data, str) else cached_data
-                # Check if expired
-                if "expires_at" in data:
-                    expires_at = datetime.fromisoformat(data["expires_at"])
-                    if datetime.utcnow() > expires_at:
-                        await self.delete(key)
-                        return None
-                return data.get("value")
-            except (json.JSONDecodeError, KeyError):
-                return cached_data
-        
-        return None
-    
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        backend = await self._get_backend()
+        cached_data = await backend.get(prefixed_key)
+
+        if cached_data is None:
+            self._stats["misses"] += 1
+            return None
+
+        try:
+            data = json.loads(cached_data) if isinstance(cached_data, str) else cached_data
+            now = datetime.utcnow()
+            expires_at = datetime.fromisoformat(data["expires_at"])
+            stale_until = datetime.fromisoformat(data.get("stale_until", data["expires_at"]))
+            if now > stale_until:
+                await self.delete(key)
+                self._stats["misses"] += 1
+                return None
+
+            is_stale = now > expires_at
+            self._stats["stale_hits" if is_stale else "hits"] += 1
+            created_at = datetime.fromisoformat(data["created_at"])
+            return CachedResult(
+                value=data.get("value"),
+                is_stale=is_stale,
+                age_seconds=(now - created_at).total_seconds()
+            )
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            self._stats["hits"] += 1
+            return CachedResult(value=cached_data, is_stale=False, age_seconds=0.0)
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0,
+        tags: Iterable[str] = (),
+        if_generation: Optional[Dict[str, int]] = None
+    ) -> bool:
         """
         Set value in cache
-        
+
         Args:
             key: Cache key
             value: Value to cache
             ttl: Override default TTL in seconds
-            
+            stale_ttl: Extra seconds the value may be served stale after the TTL
+            tags: Tags for group invalidation (e.g. "adapter:nexus_crm")
+            if_generation: Tag generations from ``tag_generations`` taken before
+                computing the value; the write is skipped if any tag was
+                invalidated since
+
         Returns:
-            bool: Success status
+            bool: Success status (False if skipped)
         """
+        tags = tuple(tags)
+        if if_generation is not None and await self.tag_generations(tags) != if_generation:
+            logger.debug(f"Skipping cache write for {key}: invalidated while computing")
+            return False
+
         prefixed_key = f"{self._cache_prefix}{key}"
         cache_ttl = ttl or self.ttl
-        
+        now = datetime.utcnow()
+
         cache_data = {
             "value": value,
-            "expires_at": (datetime.utcnow() + timedelta(seconds=cache_ttl)).isoformat(),
-            "created_at": datetime.utcnow().isoformat()
+            "expires_at": (now + timedelta(seconds=cache_ttl)).isoformat(),
+            "stale_until": (now + timedelta(seconds=cache_ttl + stale_ttl)).isoformat(),
+            "created_at": now.isoformat()
         }
-        
-        return await self.core_cache.set(
+
+        backend = await self._get_backend()
+        stored = await backend.set(
             prefixed_key,
             json.dumps(cache_data, default=str),
-            ttl=cache_ttl
+            ttl=cache_ttl + stale_ttl
         )
-    
+        if stored:
+            index = await self._get_index()
+            await index.add(key, tags, time.time() + cache_ttl + stale_ttl)
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                await index.prune(time.time())
+        return stored
+
     async def delete(self, key: str) -> bool:
         """
         Delete value from cache
-        
+
         Args:
             key: Cache key
-            
+
         Returns:
             bool: Success status
         """
+        index = await self._get_index()
+        await index.remove((key,))
         prefixed_key = f"{self._cache_prefix}{key}"
-        return await self.core_cache.delete(prefixed_key)
-    
+        backend = await self._get_backend()
+        return await backend.delete(prefixed_key)
+
     async def clear_pattern(self, pattern: str) -> int:
         """
         Clear all keys matching a pattern
-        
+
+        A trailing ``*`` is resolved as a prefix range over the sorted key
+        index; other glob patterns are matched against the indexed keys.
+
         Args:
-            pattern: Pattern to match (e.g., "tool:nexus_core:*")
-            
+            pattern: Pattern to match (e.g., "nexus_core.*", "*:{\\"action\\": \\"list\\"*")
+
         Returns:
             int: Number of keys deleted
         """
-        # This would need Redis SCAN implementation
-        # For now, return 0
-        return 0
-    
+        index = await self._get_index()
+        head = pattern[:-1] if pattern.endswith("*") else None
+        if head is not None and not any(c in head for c in "*?["):
+            keys = await index.with_prefix(head)
+        else:
+            keys = await index.matching(pattern)
+
+        return await self._delete_many(keys)
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """
+        Delete every key carrying any of the tags
+
+        Args:
+            tags: Tags to invalidate
+
+        Returns:
+            int: Number of keys deleted
+        """
+        index = await self._get_index()
+        # Bumped on every invalidation of a tag (guards in-flight refreshes)
+        await index.bump_generations(tags)
+        return await self._delete_many(await index.tagged(tags))
+
+    async def tag_generations(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Current invalidation generation of each tag"""
+        index = await self._get_index()
+        return await index.generations(tags)
+
+    async def _get_backend(self) -> Any:
+        if self.core_cache is None:
+            client = await get_redis_client()
+            if client is not None:
+                self.core_cache = RedisCacheBackend(client)
+            else:
+                logger.warning("Redis not available, MCP cache entries are process-local")
+                self.core_cache = advanced_cache_manager
+        return self.core_cache
+
+    async def _get_index(self) -> Any:
+        if self._index is None:
+            client = await get_redis_client()
+            if client is not None:
+                self._index = RedisKeyIndex(client, f"{self._cache_prefix}index:")
+            else:
+                logger.warning("Redis not available, MCP cache index is process-local")
+                self._index = LocalKeyIndex()
+        return self._index
+
+    async def _delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        index = await self._get_index()
+        await index.remove(keys)
+        backend = await self._get_backend()
+        for key in keys:
+            await backend.delete(f"{self._cache_prefix}{key}")
+        self._stats["invalidated"] += len(keys)
+        return len(keys)
+
     def get_stats(self) -> dict:
         """
         Get cache statistics
-        
+
         Returns:
             dict: Cache statistics
         """
-        # Get stats from core cache if available
         return {
             "type": "mcp_cache",
             "ttl": self.ttl,
-            "prefix": self._cache_prefix
-        }
\ No newline at end of file
+            "prefix": self._cache_prefix,
+            **(self._index.stats() if self._index is not None else {}),
+            **self._stats
+        }
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la puntuación de adherencia en lote (core/adherence_batch.py).
+
+Genera una población sintética de AdherenceMetrics y mide el throughput
+(usuarios/s) de ``score_adherence_batch`` con distintos tamaños de lote,
+desde un usuario por llamada (el camino por petición) hasta la población
+completa (la tarea nocturna). También mide la materialización de las
+predicciones a dicts, que es lo que se serializa al escribir la caché.
+
+Uso:
+    python scripts/benchmark_adherence_batch.py --users 20000 --batch-sizes 1 100 1000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.adherence_batch import AdherenceFrame, score_adherence_batch  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("adherence-batch-benchmark")
+
+
+def synthetic_metrics(rng: random.Random) -> dict:
+    """Métricas de un usuario dentro de los rangos que valida la API."""
+    return {
+        "daily_app_usage_minutes": rng.uniform(0, 90),
+        "weekly_active_days": rng.randint(0, 7),
+        "agent_interaction_frequency": rng.uniform(0, 12),
+        "message_response_time_hours": rng.uniform(0, 48),
+        "consistency_score": rng.random(),
+        "goal_completion_rate": rng.random(),
+        "self_reporting_frequency": rng.uniform(0, 7),
+        "protocol_modification_requests": rng.randint(0, 8),
+        "progress_satisfaction_score": rng.uniform(1, 10),
+        "milestone_achievement_rate": rng.random(),
+        "plateau_duration_days": rng.randint(0, 40),
+        "expectation_reality_gap": rng.uniform(-1, 1),
+        "support_system_strength": rng.random(),
+        "environmental_challenges": rng.randint(0, 10),
+        "competing_priorities": rng.randint(0, 10),
+        "previous_program_completion_rate": rng.random(),
+        "longest_adherence_streak_days": rng.randint(0, 180),
+        "average_dropout_timeframe_days": rng.choice([None, rng.randint(10, 200)]),
+    }
+
+
+def score_in_batches(user_ids: list, metrics: list, batch_size: int) -> None:
+    for start in range(0, len(user_ids), batch_size):
+        frame = AdherenceFrame.from_metrics(
+            user_ids[start : start + batch_size], metrics[start : start + batch_size]
+        )
+        score_adherence_batch(frame)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    user_ids = [f"user-{i}" for i in range(args.users)]
+    metrics = [synthetic_metrics(rng) for _ in range(args.users)]
+
+    for batch_size in sorted(set(args.batch_sizes + [args.users])):
+        # El lote de un usuario es lento: se mide sobre una muestra
+        sample = min(args.users, max(batch_size, 2000)) if batch_size == 1 else args.users
+        start = time.perf_counter()
+        score_in_batches(user_ids[:sample], metrics[:sample], batch_size)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Lotes de {batch_size:>6}: {sample / elapsed:>12,.0f} usuarios/s")
+
+    frame = AdherenceFrame.from_metrics(user_ids, metrics)
+    start = time.perf_counter()
+    result = score_adherence_batch(frame)
+    scored = time.perf_counter() - start
+    start = time.perf_counter()
+    result.predictions()
+    materialized = time.perf_counter() - start
+    logger.info(
+        f"Población de {args.users}: puntuación {scored * 1000:.1f} ms, "
+        f"predicciones a dict {materialized * 1000:.1f} ms, riesgo {result.risk_summary()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los kernels columnares de analítica (tasks/analytics_frames.py).
+
+Genera historiales sintéticos de un año (entrenamientos y comidas) y mide:
+
+- el cálculo por registro previo: siete métricas de entrenamiento que
+  recorren la lista de dicts y re-parsean las fechas ISO en cada métrica
+- ``analyze_workouts``: un único frame con datetime64 y agrupaciones
+  vectorizadas
+- ``analyze_meals`` sobre el historial de comidas
+
+Uso:
+    python scripts/benchmark_analytics_kernels.py --users 20 --workouts-per-day 2
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tasks.analytics_frames import analyze_meals, analyze_workouts  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("analytics-kernels-benchmark")
+
+
+def synthetic_workouts(days: int, per_day: float, rng: random.Random) -> list:
+    """Historial de entrenamientos de ``days`` días, ordenado por fecha."""
+    start = datetime(2024, 1, 1)
+    workouts = []
+    for offset in range(days):
+        for _ in range(int(per_day) + (rng.random() < per_day % 1)):
+            day = start + timedelta(days=offset)
+            moment = day + timedelta(hours=rng.randint(5, 22), minutes=rng.randint(0, 59))
+            workouts.append(
+                {
+                    "date": day.date().isoformat(),
+                    "time": moment.isoformat(),
+                    "duration_minutes": rng.randint(20, 120),
+                    "intensity": rng.choice(["low", "medium", "high"]),
+                    "performance_score": rng.uniform(50, 100),
+                    "exercises": [
+                        {
+                            "type": rng.choice(["strength", "cardio", "mobility", "hiit"]),
+                            "muscle_groups": rng.sample(["legs", "back", "chest", "core", "arms"], 2),
+                        }
+                        for _ in range(3)
+                    ],
+                }
+            )
+    return workouts
+
+
+def synthetic_meals(days: int, rng: random.Random) -> list:
+    """Historial de comidas con 3-5 registros diarios."""
+    start = datetime(2024, 1, 1)
+    meals = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for meal_type, hour in (("breakfast", 8), ("lunch", 13), ("dinner", 20), ("snack", 17)):
+            if meal_type == "breakfast" and rng.random() < 0.2:
+                continue
+            meals.append(
+                {
+                    "logged_at": (day + timedelta(hours=hour + rng.randint(-1, 2))).isoformat(),
+                    "meal_type": meal_type,
+                    "calories": rng.randint(200, 900),
+                    "protein": rng.randint(5, 60),
+                    "carbs": rng.randint(10, 120),
+                    "fat": rng.randint(5, 40),
+                }
+            )
+    return meals
+
+
+def per_record_workout_metrics(workouts: list, period_days: int) -> dict:
+    """Cálculo por registro equivalente al previo (una pasada y un parseo por métrica)."""
+    weeks = {}
+    for w in workouts:
+        iso = datetime.fromisoformat(w["date"]).isocalendar()
+        weeks[(iso[0], iso[1])] = weeks.get((iso[0], iso[1]), 0) + 1
+
+    slots = {}
+    for w in workouts:
+        hour = datetime.fromisoformat(w["time"]).hour
+        slots[hour // 4] = slots.get(hour // 4, 0) + 1
+
+    durations = [w["duration_minutes"] for w in workouts if "duration_minutes" in w]
+    intensities = [w.get("intensity", "medium") for w in workouts]
+    counts = {k: intensities.count(k) for k in ("low", "medium", "high")}
+
+    types, muscles = {}, {}
+    for w in workouts:
+        for e in w.get("exercises", []):
+            types[e["type"]] = types.get(e["type"], 0) + 1
+            for m in e.get("muscle_groups", []):
+                muscles[m] = muscles.get(m, 0) + 1
+
+    ordered = sorted(workouts, key=lambda x: x["date"])
+    rest = []
+    for i in range(1, len(ordered)):
+        gap = (
+            datetime.fromisoformat(ordered[i]["date"])
+            - datetime.fromisoformat(ordered[i - 1]["date"])
+        ).days - 1
+        if gap > 0:
+            rest.append(gap)
+
+    dates = [datetime.fromisoformat(w["date"]) for w in workouts]
+    intervals = [(dates[i + 1] - dates[i]).days for i in range(len(dates) - 1)]
+
+    performance = {}
+    for w in workouts:
+        hour = datetime.fromisoformat(w["time"]).hour
+        performance.setdefault(hour // 4, []).append(w["performance_score"])
+
+    return {
+        "weeks": len(weeks),
+        "slots": slots,
+        "duration": (np.mean(durations), np.percentile(durations, [25, 75])),
+        "intensity": counts,
+        "types": types,
+        "muscles": muscles,
+        "rest": np.mean(rest) if rest else 0,
+        "regularity": np.std(intervals) / np.mean(intervals) if intervals and np.mean(intervals) else 0,
+        "performance": {k: np.mean(v) for k, v in performance.items()},
+    }
+
+
+def best_of(repeats: int, fn, *args) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--workouts-per-day", type=float, default=1.5)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    plan = {
+        "daily_meals": 4,
+        "daily_calories": 2200,
+        "daily_macros": {"protein": 140, "carbs": 250, "fat": 70},
+    }
+
+    totals = {"per_record": 0.0, "frame": 0.0, "meals": 0.0}
+    workouts_total = meals_total = 0
+    for _ in range(args.users):
+        workouts = synthetic_workouts(args.days, args.workouts_per_day, rng)
+        meals = synthetic_meals(args.days, rng)
+        workouts_total += len(workouts)
+        meals_total += len(meals)
+        totals["per_record"] += best_of(args.repeats, per_record_workout_metrics, workouts, args.days)
+        totals["frame"] += best_of(args.repeats, analyze_workouts, workouts, args.days)
+        totals["meals"] += best_of(args.repeats, analyze_meals, plan, meals, args.days)
+
+    logger.info(
+        f"{args.users} usuarios x {args.days} días: "
+        f"{workouts_total / args.users:.0f} entrenamientos y "
+        f"{meals_total / args.users:.0f} comidas por usuario"
+    )
+    logger.info(f"Entrenamientos por registro: {totals['per_record'] / args.users * 1000:.2f} ms/usuario")
+    logger.info(f"Entrenamientos con frame:    {totals['frame'] / args.users * 1000:.2f} ms/usuario")
+    logger.info(f"Aceleración: {totals['per_record'] / totals['frame']:.1f}x")
+    logger.info(f"Cumplimiento nutricional:    {totals['meals'] / args.users * 1000:.2f} ms/usuario")
+
+
+if __name__ == "__main__":
+    main()
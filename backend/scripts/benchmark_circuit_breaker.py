@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark del overhead por llamada del circuit breaker.
+
+Mide el coste de ``CircuitBreaker.call`` frente a un ``await`` directo de la
+misma corrutina, primero en bucle cerrado y después a una tasa objetivo
+(por defecto 5k llamadas/s) con llamadas concurrentes en el event loop.
+
+Uso:
+    python scripts/benchmark_circuit_breaker.py --calls 200000 --rate 5000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.circuit_breaker import CircuitBreaker  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("circuit-breaker-benchmark")
+
+
+async def noop() -> None:
+    """Corrutina vacía: aísla el coste del propio breaker."""
+    return None
+
+
+async def measure_tight_loop(calls: int, repeats: int) -> dict:
+    """Overhead medio por llamada en bucle cerrado (mejor de ``repeats``)."""
+    breaker = CircuitBreaker(name="benchmark", slow_call_duration=1.0)
+    direct_times, breaker_times = [], []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            await noop()
+        direct_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            await breaker.call(noop)
+        breaker_times.append(time.perf_counter() - start)
+
+    direct = min(direct_times) / calls
+    protected = min(breaker_times) / calls
+    return {
+        "direct_us": direct * 1e6,
+        "breaker_us": protected * 1e6,
+        "overhead_us": (protected - direct) * 1e6,
+        "max_calls_per_second": 1 / protected if protected else float("inf"),
+    }
+
+
+async def measure_paced(rate: int, duration: float) -> dict:
+    """Ejecuta llamadas concurrentes a ``rate`` llamadas/s y mide el tiempo de CPU."""
+    breaker = CircuitBreaker(name="benchmark_paced", slow_call_duration=1.0)
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+    ticks = int(duration / tick)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    latencies = []
+
+    for _ in range(ticks):
+        tick_start = time.perf_counter()
+        await asyncio.gather(*(breaker.call(noop) for _ in range(per_tick)))
+        elapsed = time.perf_counter() - tick_start
+        latencies.append(elapsed / per_tick)
+        await asyncio.sleep(max(0.0, tick - elapsed))
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    total_calls = per_tick * ticks
+    return {
+        "calls": total_calls,
+        "achieved_rate": total_calls / wall,
+        "cpu_utilization_pct": cpu / wall * 100,
+        "median_call_us": statistics.median(latencies) * 1e6,
+        "window": breaker.get_metrics(),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--rate", type=int, default=5_000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    tight = await measure_tight_loop(args.calls, args.repeats)
+    logger.info(
+        "Bucle cerrado: directo %.2f µs, breaker %.2f µs, overhead %.2f µs/llamada "
+        "(máx. %.0f llamadas/s por core)",
+        tight["direct_us"],
+        tight["breaker_us"],
+        tight["overhead_us"],
+        tight["max_calls_per_second"],
+    )
+    logger.info(
+        "Overhead a %d llamadas/s: %.2f%% de un core",
+        args.rate,
+        tight["overhead_us"] * args.rate / 1e4,
+    )
+
+    paced = await measure_paced(args.rate, args.duration)
+    logger.info(
+        "Carga sostenida: %d llamadas a %.0f llamadas/s, CPU %.1f%%, mediana %.2f µs/llamada",
+        paced["calls"],
+        paced["achieved_rate"],
+        paced["cpu_utilization_pct"],
+        paced["median_call_us"],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+-- =============================================================================
+-- |||            GENESIS - ROLLUPS DE MÉTRICAS EN SERVIDOR            ||| --
+-- =============================================================================
+--
+--  VERSION: 8.0
+--
+--  DESCRIPCIÓN:
+--  Agrega en Postgres los históricos de métricas que usan los gráficos de
+--  progreso, de modo que la API recibe un punto por bucket (día, semana o
+--  mes) en lugar de todas las filas del periodo.
+--
+--  CAMBIOS:
+--  - Función get_metric_rollup: n, min, max, media y percentiles
+--    (p25, p50, p75, p90) por bucket y métrica
+--  - Índices (user_id, date) para las tablas de logs que no los tenían
+--
+-- =============================================================================
+
+-- =============================================================================
+-- PARTE 1: ÍNDICES DE APOYO
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_body_composition_logs_user_date
+ON public.body_composition_logs(user_id, date);
+
+CREATE INDEX IF NOT EXISTS idx_performance_logs_user_date
+ON public.performance_logs(user_id, date);
+
+-- =============================================================================
+-- PARTE 2: FUNCIÓN DE ROLLUP
+-- =============================================================================
+
+-- Devuelve una fila por (bucket, métrica). Las métricas que no existen como
+-- columna numérica de la tabla se omiten, igual que los gráficos omiten las
+-- series sin datos. p_filters admite igualdades simples ({"columna": valor}).
+-- SECURITY INVOKER: se aplican las políticas RLS del usuario que llama.
+CREATE OR REPLACE FUNCTION public.get_metric_rollup(
+    p_user_id UUID,
+    p_table TEXT,
+    p_metrics TEXT[],
+    p_bucket TEXT DEFAULT 'week',
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL,
+    p_filters JSONB DEFAULT '{}'::JSONB
+) RETURNS TABLE (
+    bucket_start DATE,
+    metric TEXT,
+    n BIGINT,
+    min_value DOUBLE PRECISION,
+    max_value DOUBLE PRECISION,
+    avg_value DOUBLE PRECISION,
+    percentiles DOUBLE PRECISION[]
+) AS $$
+DECLARE
+    v_metric TEXT;
+    v_key TEXT;
+    v_filter_sql TEXT := '';
+BEGIN
+    IF p_table NOT IN ('weight_logs', 'body_composition_logs', 'performance_logs', 'nutrition_logs') THEN
+        RAISE EXCEPTION 'Tabla no permitida para rollups: %', p_table;
+    END IF;
+
+    IF p_bucket NOT IN ('day', 'week', 'month') THEN
+        RAISE EXCEPTION 'Bucket no soportado: %', p_bucket;
+    END IF;
+
+    FOR v_key IN SELECT jsonb_object_keys(COALESCE(p_filters, '{}'::JSONB)) LOOP
+        v_filter_sql := v_filter_sql || format(' AND t.%I::text = %L', v_key, p_filters ->> v_key);
+    END LOOP;
+
+    FOREACH v_metric IN ARRAY p_metrics LOOP
+        CONTINUE WHEN NOT EXISTS (
+            SELECT 1
+            FROM information_schema.columns c
+            WHERE c.table_schema = 'public'
+              AND c.table_name = p_table
+              AND c.column_name = v_metric
+              AND c.data_type IN ('numeric', 'integer', 'bigint', 'smallint', 'real', 'double precision')
+        );
+
+        RETURN QUERY EXECUTE format(
+            'SELECT date_trunc(%L, t.date)::date,
+                    %L::text,
+                    count(t.%I),
+                    min(t.%I)::float8,
+                    max(t.%I)::float8,
+                    avg(t.%I)::float8,
+                    percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY t.%I)::float8[]
+             FROM public.%I t
+             WHERE t.user_id = $1
+               AND t.%I IS NOT NULL
+               AND ($2::date IS NULL OR t.date >= $2::date)
+               AND ($3::date IS NULL OR t.date <= $3::date)' || v_filter_sql || '
+             GROUP BY 1
+             ORDER BY 1',
+            p_bucket, v_metric, v_metric, v_metric, v_metric, v_metric, v_metric, p_table, v_metric
+        ) USING p_user_id, p_start_date, p_end_date;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION public.get_metric_rollup(UUID, TEXT, TEXT[], TEXT, DATE, DATE, JSONB) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.get_metric_rollup(UUID, TEXT, TEXT[], TEXT, DATE, DATE, JSONB) TO service_role;
+
+COMMENT ON FUNCTION public.get_metric_rollup IS 'Rollups por bucket (day/week/month) de métricas de progreso para gráficos';
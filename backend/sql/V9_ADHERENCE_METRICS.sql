@@ -0,0 +1,73 @@
+-- =============================================================================
+-- |||          GENESIS - MÉTRICAS DE ADHERENCIA POR USUARIO           ||| --
+-- =============================================================================
+--
+--  VERSION: 9.0
+--
+--  DESCRIPCIÓN:
+--  Última foto de las métricas de adherencia de cada usuario (los campos de
+--  AdherenceMetrics). La tarea nocturna score_adherence_population lee la
+--  tabla completa y puntúa a toda la población en un solo lote vectorizado.
+--
+--  CAMBIOS:
+--  - Tabla user_adherence_metrics, una fila por usuario
+--  - Políticas RLS: cada usuario lee su fila, service_role escribe
+--
+-- =============================================================================
+
+-- =============================================================================
+-- PARTE 1: TABLA
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS public.user_adherence_metrics (
+    user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+
+    -- Engagement
+    daily_app_usage_minutes DOUBLE PRECISION NOT NULL DEFAULT 0,
+    weekly_active_days INTEGER NOT NULL DEFAULT 0 CHECK (weekly_active_days BETWEEN 0 AND 7),
+    agent_interaction_frequency DOUBLE PRECISION NOT NULL DEFAULT 0,
+    message_response_time_hours DOUBLE PRECISION NOT NULL DEFAULT 24,
+
+    -- Patrones de comportamiento
+    consistency_score DOUBLE PRECISION NOT NULL DEFAULT 0 CHECK (consistency_score BETWEEN 0 AND 1),
+    goal_completion_rate DOUBLE PRECISION NOT NULL DEFAULT 0 CHECK (goal_completion_rate BETWEEN 0 AND 1),
+    self_reporting_frequency DOUBLE PRECISION NOT NULL DEFAULT 0,
+    protocol_modification_requests INTEGER NOT NULL DEFAULT 0,
+
+    -- Progreso
+    progress_satisfaction_score DOUBLE PRECISION NOT NULL DEFAULT 5 CHECK (progress_satisfaction_score BETWEEN 1 AND 10),
+    milestone_achievement_rate DOUBLE PRECISION NOT NULL DEFAULT 0 CHECK (milestone_achievement_rate BETWEEN 0 AND 1),
+    plateau_duration_days INTEGER NOT NULL DEFAULT 0,
+    expectation_reality_gap DOUBLE PRECISION NOT NULL DEFAULT 0 CHECK (expectation_reality_gap BETWEEN -1 AND 1),
+
+    -- Entorno social
+    support_system_strength DOUBLE PRECISION NOT NULL DEFAULT 0.5 CHECK (support_system_strength BETWEEN 0 AND 1),
+    environmental_challenges INTEGER NOT NULL DEFAULT 0 CHECK (environmental_challenges BETWEEN 0 AND 10),
+    competing_priorities INTEGER NOT NULL DEFAULT 0 CHECK (competing_priorities BETWEEN 0 AND 10),
+
+    -- Histórico
+    previous_program_completion_rate DOUBLE PRECISION NOT NULL DEFAULT 0 CHECK (previous_program_completion_rate BETWEEN 0 AND 1),
+    longest_adherence_streak_days INTEGER NOT NULL DEFAULT 0,
+    average_dropout_timeframe_days INTEGER,
+
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE public.user_adherence_metrics IS 'Métricas de adherencia vigentes por usuario para la puntuación nocturna en lote';
+
+-- =============================================================================
+-- PARTE 2: SEGURIDAD
+-- =============================================================================
+
+ALTER TABLE public.user_adherence_metrics ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "adherence_metrics_read_own" ON public.user_adherence_metrics
+    FOR SELECT
+    TO authenticated
+    USING (user_id = auth.uid());
+
+CREATE POLICY "adherence_metrics_write_service" ON public.user_adherence_metrics
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
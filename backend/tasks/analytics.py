@@ -3,6 +3,7 @@ Analytics and Data Analysis Tasks
 Async tasks for data analysis, trends, and predictions
 """
 
+import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
@@ -12,6 +13,13 @@ from celery.exceptions import SoftTimeLimitExceeded
 from core.celery_app import app
 from clients.supabase_client import SupabaseClient
 from clients.vertex_ai.client import VertexAIClient
+from core.adherence_batch import (
+    AdherenceFrame,
+    score_adherence_batch,
+    write_predictions_to_cache,
+)
+from core.redis_pool import standalone_redis_client
+from tasks.analytics_frames import analyze_meals, analyze_workouts
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
@@ -151,23 +159,16 @@ def analyze_workout_patterns(user_id: str, period_days: int = 90) -> Dict[str, A
 
         workouts = supabase.get_workout_history(user_id, start_date, end_date)
 
-        # Analyze patterns
-        patterns = {
-            "frequency": _analyze_workout_frequency(workouts),
-            "timing": _analyze_workout_timing(workouts),
-            "duration": _analyze_workout_duration(workouts),
-            "intensity": _analyze_workout_intensity(workouts),
-            "exercise_distribution": _analyze_exercise_distribution(workouts),
-            "rest_days": _analyze_rest_patterns(workouts),
-            "consistency_score": _calculate_consistency_score(workouts, period_days),
-        }
+        # Analyze patterns (one columnar frame shared by every metric)
+        analysis = analyze_workouts(workouts, period_days)
+        patterns = analysis["patterns"]
 
         # Identify habits and recommendations
         habits = _identify_workout_habits(patterns)
         recommendations = _generate_workout_recommendations(patterns, habits)
 
-        # Predict optimal workout times
-        optimal_times = _predict_optimal_workout_times(workouts)
+        # Optimal workout times by average performance per time slot
+        optimal_times = analysis["optimal_times"]
 
         # Store analysis
         pattern_record = {
@@ -441,17 +442,10 @@ def analyze_nutrition_compliance(
         plan = supabase.get_nutrition_plan(plan_id)
         logged_meals = supabase.get_logged_meals(user_id, period_days)
 
-        # Calculate compliance metrics
-        compliance_metrics = {
-            "overall_compliance": _calculate_overall_compliance(plan, logged_meals),
-            "macro_compliance": _analyze_macro_compliance(plan, logged_meals),
-            "calorie_compliance": _analyze_calorie_compliance(plan, logged_meals),
-            "meal_timing_compliance": _analyze_meal_timing(plan, logged_meals),
-            "missed_meals": _identify_missed_meals(plan, logged_meals),
-        }
-
-        # Identify patterns
-        patterns = _identify_compliance_patterns(logged_meals, plan)
+        # Calculate compliance metrics and patterns from one columnar frame
+        analysis = analyze_meals(plan, logged_meals, period_days)
+        compliance_metrics = analysis["metrics"]
+        patterns = analysis["patterns"]
 
         # Generate recommendations
         recommendations = _generate_nutrition_recommendations(
@@ -493,6 +487,68 @@ def analyze_nutrition_compliance(
         raise
 
 
+@app.task(base=BaseAnalyticsTask, name="tasks.analytics.score_adherence_population")
+def score_adherence_population() -> Dict[str, Any]:
+    """
+    Nightly adherence scoring for every user with current metrics
+
+    Loads the user_adherence_metrics table page by page, scores each page
+    with the vectorized rules of core.adherence_batch and refreshes the
+    cached prediction of each user with one Redis pipeline per page.
+
+    Returns:
+        Dict with the number of users scored and the risk level distribution
+    """
+    try:
+        logger.info("Scoring adherence for the whole population")
+        return asyncio.run(_score_adherence_population())
+
+    except Exception as e:
+        logger.error(f"Error in nightly adherence scoring: {e}")
+        raise
+
+
+async def _score_adherence_population(page_size: int = 1000) -> Dict[str, Any]:
+    """Fetch metrics page by page, score each page in one batch and cache the predictions"""
+    supabase = SupabaseClient()
+
+    users_scored = 0
+    cached = 0
+    risk_summary: Dict[str, int] = {}
+    offset = 0
+    # The task runs under its own asyncio.run, so use a client bound to this loop
+    async with standalone_redis_client() as redis_client:
+        while True:
+            # Supabase caps an unbounded select at 1000 rows, so page explicitly
+            result = await supabase.execute_query(
+                "user_adherence_metrics",
+                "select",
+                use_batch=False,
+                order={"user_id": "asc"},
+                limit=page_size,
+                offset=offset,
+            )
+            rows = result.get("data") or []
+            if rows:
+                batch = score_adherence_batch(AdherenceFrame.from_rows(rows))
+                cached += await write_predictions_to_cache(redis_client, batch)
+                users_scored += len(batch)
+                for level, count in batch.risk_summary().items():
+                    risk_summary[level] = risk_summary.get(level, 0) + count
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+    logger.info(f"Adherence scored for {users_scored} users, {cached} cached")
+
+    return {
+        "success": True,
+        "users_scored": users_scored,
+        "predictions_cached": cached,
+        "risk_summary": risk_summary,
+    }
+
+
 # Helper functions for trend analysis
 def _extract_metric_data(
     historical_data: List[Dict], metric: str
@@ -644,186 +700,6 @@ def _generate_insights(
 
 
 # Helper functions for workout pattern analysis
-def _analyze_workout_frequency(workouts: List[Dict]) -> Dict[str, Any]:
-    """Analyze workout frequency patterns"""
-    if not workouts:
-        return {"average_per_week": 0}
-
-    # Group by week
-    weeks = {}
-    for workout in workouts:
-        date = datetime.fromisoformat(workout["date"])
-        week = date.isocalendar()[1]
-        year = date.year
-        week_key = f"{year}-{week}"
-        weeks[week_key] = weeks.get(week_key, 0) + 1
-
-    # Calculate statistics
-    frequencies = list(weeks.values())
-
-    return {
-        "average_per_week": np.mean(frequencies) if frequencies else 0,
-        "min_per_week": min(frequencies) if frequencies else 0,
-        "max_per_week": max(frequencies) if frequencies else 0,
-        "consistency": np.std(frequencies) < 1.5 if frequencies else False,
-    }
-
-
-def _analyze_workout_timing(workouts: List[Dict]) -> Dict[str, Any]:
-    """Analyze preferred workout times"""
-    time_distribution = {
-        "early_morning": 0,  # 5-8
-        "morning": 0,  # 8-12
-        "afternoon": 0,  # 12-17
-        "evening": 0,  # 17-21
-        "night": 0,  # 21-24
-    }
-
-    for workout in workouts:
-        if "time" in workout:
-            hour = datetime.fromisoformat(workout["time"]).hour
-            if 5 <= hour < 8:
-                time_distribution["early_morning"] += 1
-            elif 8 <= hour < 12:
-                time_distribution["morning"] += 1
-            elif 12 <= hour < 17:
-                time_distribution["afternoon"] += 1
-            elif 17 <= hour < 21:
-                time_distribution["evening"] += 1
-            else:
-                time_distribution["night"] += 1
-
-    # Find preferred time
-    total = sum(time_distribution.values())
-    if total > 0:
-        preferred_time = max(time_distribution, key=time_distribution.get)
-        preference_strength = time_distribution[preferred_time] / total
-    else:
-        preferred_time = "unknown"
-        preference_strength = 0
-
-    return {
-        "distribution": time_distribution,
-        "preferred_time": preferred_time,
-        "preference_strength": preference_strength,
-    }
-
-
-def _analyze_workout_duration(workouts: List[Dict]) -> Dict[str, Any]:
-    """Analyze workout duration patterns"""
-    durations = [
-        w.get("duration_minutes", 0) for w in workouts if "duration_minutes" in w
-    ]
-
-    if not durations:
-        return {"average_duration": 0}
-
-    return {
-        "average_duration": np.mean(durations),
-        "min_duration": min(durations),
-        "max_duration": max(durations),
-        "typical_range": (np.percentile(durations, 25), np.percentile(durations, 75)),
-    }
-
-
-def _analyze_workout_intensity(workouts: List[Dict]) -> Dict[str, Any]:
-    """Analyze workout intensity distribution"""
-    intensities = [w.get("intensity", "medium") for w in workouts]
-
-    intensity_count = {
-        "low": intensities.count("low"),
-        "medium": intensities.count("medium"),
-        "high": intensities.count("high"),
-    }
-
-    total = sum(intensity_count.values())
-    if total > 0:
-        intensity_distribution = {k: v / total for k, v in intensity_count.items()}
-    else:
-        intensity_distribution = {"low": 0, "medium": 0, "high": 0}
-
-    return {
-        "distribution": intensity_distribution,
-        "dominant_intensity": (
-            max(intensity_count, key=intensity_count.get) if total > 0 else "unknown"
-        ),
-    }
-
-
-def _analyze_exercise_distribution(workouts: List[Dict]) -> Dict[str, Any]:
-    """Analyze distribution of exercise types"""
-    exercise_types = {}
-    muscle_groups = {}
-
-    for workout in workouts:
-        for exercise in workout.get("exercises", []):
-            # Count exercise types
-            ex_type = exercise.get("type", "unknown")
-            exercise_types[ex_type] = exercise_types.get(ex_type, 0) + 1
-
-            # Count muscle groups
-            for muscle in exercise.get("muscle_groups", []):
-                muscle_groups[muscle] = muscle_groups.get(muscle, 0) + 1
-
-    return {
-        "exercise_types": exercise_types,
-        "muscle_groups": muscle_groups,
-        "variety_score": len(exercise_types) / 10.0,  # Normalized score
-    }
-
-
-def _analyze_rest_patterns(workouts: List[Dict]) -> Dict[str, Any]:
-    """Analyze rest day patterns"""
-    if not workouts:
-        return {"average_rest_days": 0}
-
-    # Sort workouts by date
-    sorted_workouts = sorted(workouts, key=lambda x: x["date"])
-
-    # Calculate days between workouts
-    rest_periods = []
-    for i in range(1, len(sorted_workouts)):
-        date1 = datetime.fromisoformat(sorted_workouts[i - 1]["date"])
-        date2 = datetime.fromisoformat(sorted_workouts[i]["date"])
-        rest_days = (date2 - date1).days - 1
-        if rest_days > 0:
-            rest_periods.append(rest_days)
-
-    if rest_periods:
-        return {
-            "average_rest_days": np.mean(rest_periods),
-            "max_rest_period": max(rest_periods),
-            "typical_rest": int(np.median(rest_periods)),
-        }
-    else:
-        return {"average_rest_days": 0}
-
-
-def _calculate_consistency_score(workouts: List[Dict], period_days: int) -> float:
-    """Calculate workout consistency score"""
-    if not workouts:
-        return 0.0
-
-    # Expected workouts (3-4 per week is good)
-    expected_workouts = (period_days / 7) * 3.5
-    actual_workouts = len(workouts)
-
-    # Calculate base score
-    ratio = actual_workouts / expected_workouts
-    base_score = min(ratio * 100, 100)
-
-    # Adjust for regularity
-    dates = [datetime.fromisoformat(w["date"]) for w in workouts]
-    if len(dates) > 1:
-        intervals = [(dates[i + 1] - dates[i]).days for i in range(len(dates) - 1)]
-        regularity = 1 - (
-            np.std(intervals) / np.mean(intervals) if np.mean(intervals) > 0 else 1
-        )
-        base_score *= 0.7 + 0.3 * regularity
-
-    return min(max(base_score, 0), 100)
-
-
 def _identify_workout_habits(patterns: Dict[str, Any]) -> List[str]:
     """Identify workout habits from patterns"""
     habits = []
@@ -886,53 +762,6 @@ def _generate_workout_recommendations(
     return recommendations
 
 
-def _predict_optimal_workout_times(workouts: List[Dict]) -> List[Dict[str, Any]]:
-    """Predict optimal workout times based on performance data"""
-    # Analyze performance by time of day
-    time_performance = {}
-
-    for workout in workouts:
-        if "time" in workout and "performance_score" in workout:
-            hour = datetime.fromisoformat(workout["time"]).hour
-            time_slot = _get_time_slot(hour)
-
-            if time_slot not in time_performance:
-                time_performance[time_slot] = []
-            time_performance[time_slot].append(workout["performance_score"])
-
-    # Calculate average performance by time slot
-    optimal_times = []
-    for time_slot, scores in time_performance.items():
-        if scores:
-            avg_score = np.mean(scores)
-            optimal_times.append(
-                {
-                    "time_slot": time_slot,
-                    "average_performance": avg_score,
-                    "sample_size": len(scores),
-                }
-            )
-
-    # Sort by performance
-    optimal_times.sort(key=lambda x: x["average_performance"], reverse=True)
-
-    return optimal_times[:3]  # Top 3 times
-
-
-def _get_time_slot(hour: int) -> str:
-    """Convert hour to time slot"""
-    if 5 <= hour < 8:
-        return "early_morning"
-    elif 8 <= hour < 12:
-        return "morning"
-    elif 12 <= hour < 17:
-        return "afternoon"
-    elif 17 <= hour < 21:
-        return "evening"
-    else:
-        return "night"
-
-
 # Helper functions for other analytics tasks
 def _calculate_progress_rate(historical_data: List[Dict], goal: Dict) -> float:
     """Calculate rate of progress towards goal"""
@@ -1188,64 +1017,6 @@ def _queue_summary_notification(user_id: str, summary: Dict):
 
 
 # Nutrition compliance helpers
-def _calculate_overall_compliance(plan: Dict, meals: List[Dict]) -> float:
-    """Calculate overall nutrition compliance percentage"""
-    if not plan or not meals:
-        return 0.0
-
-    # Simplified calculation
-    planned_meals = plan.get("daily_meals", 3) * 30  # Assuming 30 days
-    logged_meals = len(meals)
-
-    return min((logged_meals / planned_meals) * 100, 100)
-
-
-def _analyze_macro_compliance(plan: Dict, meals: List[Dict]) -> Dict[str, float]:
-    """Analyze macronutrient compliance"""
-    target_macros = plan.get("daily_macros", {})
-
-    compliance = {"protein": 0.0, "carbs": 0.0, "fat": 0.0}
-
-    # Would implement actual macro tracking
-    return compliance
-
-
-def _analyze_calorie_compliance(plan: Dict, meals: List[Dict]) -> Dict[str, Any]:
-    """Analyze calorie intake compliance"""
-    target_calories = plan.get("daily_calories", 2000)
-
-    # Would implement actual calorie tracking
-    return {
-        "average_daily": 1950,
-        "compliance_percentage": 97.5,
-        "over_days": 3,
-        "under_days": 2,
-    }
-
-
-def _analyze_meal_timing(plan: Dict, meals: List[Dict]) -> Dict[str, Any]:
-    """Analyze meal timing compliance"""
-    # Would implement meal timing analysis
-    return {"on_schedule_percentage": 85, "missed_breakfast": 2, "late_dinners": 3}
-
-
-def _identify_missed_meals(plan: Dict, meals: List[Dict]) -> List[Dict[str, Any]]:
-    """Identify missed meals"""
-    # Would implement missed meal detection
-    return [{"date": "2024-01-15", "meal": "breakfast", "reason": "unknown"}]
-
-
-def _identify_compliance_patterns(meals: List[Dict], plan: Dict) -> List[str]:
-    """Identify patterns in compliance"""
-    patterns = []
-
-    # Would analyze actual patterns
-    patterns.append("Better compliance on weekdays")
-    patterns.append("Tendency to skip breakfast on weekends")
-
-    return patterns
-
-
 def _generate_nutrition_recommendations(
     metrics: Dict, patterns: List[str]
 ) -> List[str]:
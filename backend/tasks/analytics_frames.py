@@ -0,0 +1,516 @@
+"""
+Columnar frames and vectorized kernels for analytics tasks
+
+A user's workout or meal history is converted once into a frame of NumPy
+columns: timestamps parsed to datetime64, categorical fields encoded as
+integer codes and numeric fields as float arrays with NaN for missing
+values. Pattern and compliance metrics are then computed as group-bys
+(bincount/unique) over those columns instead of re-iterating and
+re-parsing the raw records for every metric.
+"""
+
+import warnings
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Time slots by hour of day (index = hour)
+TIME_SLOTS = ("early_morning", "morning", "afternoon", "evening", "night")
+_SLOT_BY_HOUR = np.array(
+    [4] * 5 + [0] * 3 + [1] * 4 + [2] * 5 + [3] * 4 + [4] * 3, dtype=np.int8
+)
+
+INTENSITIES = ("low", "medium", "high")
+MACROS = ("protein", "carbs", "fat")
+
+# Expected hour window [start, end) per meal type for timing compliance
+MEAL_WINDOWS = {
+    "breakfast": (5, 11),
+    "lunch": (11, 16),
+    "dinner": (18, 22),
+}
+DEFAULT_MEAL_TYPES = ("breakfast", "lunch", "dinner")
+
+_NAT = np.datetime64("NaT", "s")
+
+
+def parse_timestamps(values: Sequence[Any]) -> np.ndarray:
+    """
+    Parse ISO strings (or datetimes) into a datetime64[s] array
+
+    Naive and date-only strings are parsed in one vectorized call. Values
+    with a UTC offset fall back to ``datetime.fromisoformat`` and keep their
+    wall-clock time, as the per-record code did. Missing values become NaT.
+    """
+    if not len(values):
+        return np.empty(0, dtype="datetime64[s]")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.array(
+                [_NAT if v is None else v for v in values], dtype="datetime64[s]"
+            )
+    except (ValueError, TypeError, DeprecationWarning):
+        pass
+
+    parsed = np.empty(len(values), dtype="datetime64[s]")
+    for i, value in enumerate(values):
+        if value is None:
+            parsed[i] = _NAT
+            continue
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if isinstance(value, datetime):
+            value = value.replace(tzinfo=None)
+        elif isinstance(value, date):
+            value = datetime(value.year, value.month, value.day)
+        parsed[i] = np.datetime64(value, "s")
+    return parsed
+
+
+def encode_categories(
+    values: Iterable[Any], categories: Optional[Sequence[str]] = None
+) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """
+    Encode a categorical column as int32 codes
+
+    Args:
+        values: Raw values
+        categories: Fixed vocabulary; values outside it get code -1
+
+    Returns:
+        (codes, vocabulary)
+    """
+    if categories is None:
+        vocabulary: Dict[Any, int] = {}
+        codes = np.fromiter(
+            (vocabulary.setdefault(v, len(vocabulary)) for v in values), dtype=np.int32
+        )
+        return codes, tuple(vocabulary)
+    lookup = {c: i for i, c in enumerate(categories)}
+    codes = np.fromiter((lookup.get(v, -1) for v in values), dtype=np.int32)
+    return codes, tuple(categories)
+
+
+def _numeric(records: Sequence[Dict], key: str) -> np.ndarray:
+    return np.fromiter(
+        (
+            r[key] if isinstance(r.get(key), (int, float)) and not isinstance(r.get(key), bool)
+            else np.nan
+            for r in records
+        ),
+        dtype=np.float64,
+        count=len(records),
+    )
+
+
+def _hours(timestamps: np.ndarray) -> np.ndarray:
+    """Hour of day (-1 for NaT)"""
+    valid = ~np.isnat(timestamps)
+    hours = np.full(timestamps.shape, -1, dtype=np.int16)
+    seconds = timestamps[valid].astype("datetime64[s]").astype(np.int64)
+    hours[valid] = (seconds // 3600) % 24
+    return hours
+
+
+def iso_week_keys(days: np.ndarray) -> np.ndarray:
+    """
+    Identify the ISO week of each day by the Thursday of that week
+
+    1970-01-01 was a Thursday, so the Monday-based weekday is
+    ``(days + 3) % 7``; the Thursday uniquely identifies the ISO year/week.
+    """
+    ordinals = days.astype("datetime64[D]").astype(np.int64)
+    return ordinals - (ordinals + 3) % 7 + 3
+
+
+@dataclass
+class WorkoutFrame:
+    """Columnar view of a workout history"""
+
+    days: np.ndarray  # datetime64[D], sorted
+    hours: np.ndarray  # int16, -1 if no time recorded
+    durations: np.ndarray  # float64, NaN if missing
+    intensity_codes: np.ndarray  # int32 codes into INTENSITIES, -1 otherwise
+    performance: np.ndarray  # float64, NaN if missing
+    exercise_type_codes: np.ndarray  # one entry per exercise
+    exercise_types: Tuple[str, ...]
+    muscle_group_codes: np.ndarray  # one entry per (exercise, muscle group)
+    muscle_groups: Tuple[str, ...]
+
+    @classmethod
+    def from_records(cls, workouts: Sequence[Dict]) -> "WorkoutFrame":
+        """Build the frame, parsing every timestamp exactly once (undated records are dropped)"""
+        days = parse_timestamps([w.get("date") for w in workouts]).astype("datetime64[D]")
+        order = np.argsort(days, kind="stable")
+        order = order[~np.isnat(days[order])]
+        workouts = [workouts[i] for i in order]
+        days = days[order]
+
+        hours = _hours(parse_timestamps([w.get("time") for w in workouts]))
+        intensity_codes, _ = encode_categories(
+            (w.get("intensity", "medium") for w in workouts), INTENSITIES
+        )
+
+        exercises = [e for w in workouts for e in w.get("exercises", [])]
+        exercise_type_codes, exercise_types = encode_categories(
+            e.get("type", "unknown") for e in exercises
+        )
+        muscle_group_codes, muscle_groups = encode_categories(
+            m for e in exercises for m in e.get("muscle_groups", [])
+        )
+
+        return cls(
+            days=days,
+            hours=hours,
+            durations=_numeric(workouts, "duration_minutes"),
+            intensity_codes=intensity_codes,
+            performance=_numeric(workouts, "performance_score"),
+            exercise_type_codes=exercise_type_codes,
+            exercise_types=exercise_types,
+            muscle_group_codes=muscle_group_codes,
+            muscle_groups=muscle_groups,
+        )
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def slots(self) -> np.ndarray:
+        """Time-slot code per workout (-1 if no time recorded)"""
+        slots = np.full(self.hours.shape, -1, dtype=np.int8)
+        timed = self.hours >= 0
+        slots[timed] = _SLOT_BY_HOUR[self.hours[timed]]
+        return slots
+
+
+def _counts(codes: np.ndarray, vocabulary: Sequence[str]) -> Dict[str, int]:
+    counts = np.bincount(codes[codes >= 0], minlength=len(vocabulary))
+    return {name: int(count) for name, count in zip(vocabulary, counts)}
+
+
+def workout_frequency(frame: WorkoutFrame) -> Dict[str, Any]:
+    """Workouts per ISO week"""
+    if not len(frame):
+        return {"average_per_week": 0}
+    _, frequencies = np.unique(iso_week_keys(frame.days), return_counts=True)
+    return {
+        "average_per_week": float(frequencies.mean()),
+        "min_per_week": int(frequencies.min()),
+        "max_per_week": int(frequencies.max()),
+        "consistency": bool(frequencies.std() < 1.5),
+    }
+
+
+def workout_timing(frame: WorkoutFrame) -> Dict[str, Any]:
+    """Distribution of workouts across time slots"""
+    distribution = _counts(frame.slots.astype(np.int32), TIME_SLOTS)
+    total = sum(distribution.values())
+    if total > 0:
+        preferred_time = max(distribution, key=distribution.get)
+        preference_strength = distribution[preferred_time] / total
+    else:
+        preferred_time = "unknown"
+        preference_strength = 0
+    return {
+        "distribution": distribution,
+        "preferred_time": preferred_time,
+        "preference_strength": preference_strength,
+    }
+
+
+def workout_duration(frame: WorkoutFrame) -> Dict[str, Any]:
+    """Duration statistics over workouts that recorded one"""
+    durations = frame.durations[~np.isnan(frame.durations)]
+    if not durations.size:
+        return {"average_duration": 0}
+    q25, q75 = np.percentile(durations, [25, 75])
+    return {
+        "average_duration": float(durations.mean()),
+        "min_duration": float(durations.min()),
+        "max_duration": float(durations.max()),
+        "typical_range": (float(q25), float(q75)),
+    }
+
+
+def workout_intensity(frame: WorkoutFrame) -> Dict[str, Any]:
+    """Share of low/medium/high intensity workouts"""
+    counts = _counts(frame.intensity_codes, INTENSITIES)
+    total = sum(counts.values())
+    if total > 0:
+        distribution = {k: v / total for k, v in counts.items()}
+    else:
+        distribution = {"low": 0, "medium": 0, "high": 0}
+    return {
+        "distribution": distribution,
+        "dominant_intensity": max(counts, key=counts.get) if total > 0 else "unknown",
+    }
+
+
+def exercise_distribution(frame: WorkoutFrame) -> Dict[str, Any]:
+    """Counts of exercise types and muscle groups"""
+    exercise_types = _counts(frame.exercise_type_codes, frame.exercise_types)
+    return {
+        "exercise_types": exercise_types,
+        "muscle_groups": _counts(frame.muscle_group_codes, frame.muscle_groups),
+        "variety_score": len(exercise_types) / 10.0,  # Normalized score
+    }
+
+
+def rest_patterns(frame: WorkoutFrame) -> Dict[str, Any]:
+    """Rest days between consecutive workouts"""
+    if not len(frame):
+        return {"average_rest_days": 0}
+    gaps = np.diff(frame.days.astype(np.int64)) - 1
+    rest = gaps[gaps > 0]
+    if not rest.size:
+        return {"average_rest_days": 0}
+    return {
+        "average_rest_days": float(rest.mean()),
+        "max_rest_period": int(rest.max()),
+        "typical_rest": int(np.median(rest)),
+    }
+
+
+def consistency_score(frame: WorkoutFrame, period_days: int) -> float:
+    """Volume against 3.5 workouts/week, weighted by interval regularity"""
+    if not len(frame):
+        return 0.0
+    expected_workouts = (period_days / 7) * 3.5
+    base_score = min(len(frame) / expected_workouts * 100, 100)
+
+    if len(frame) > 1:
+        intervals = np.diff(frame.days.astype(np.int64))
+        mean = intervals.mean()
+        regularity = 1 - (intervals.std() / mean if mean > 0 else 1)
+        base_score *= 0.7 + 0.3 * regularity
+
+    return float(min(max(base_score, 0), 100))
+
+
+def optimal_workout_times(frame: WorkoutFrame, top: int = 3) -> List[Dict[str, Any]]:
+    """Average performance score per time slot, best first"""
+    slots = frame.slots
+    mask = (slots >= 0) & ~np.isnan(frame.performance)
+    if not mask.any():
+        return []
+    codes = slots[mask].astype(np.int64)
+    counts = np.bincount(codes, minlength=len(TIME_SLOTS))
+    sums = np.bincount(codes, weights=frame.performance[mask], minlength=len(TIME_SLOTS))
+    optimal = [
+        {
+            "time_slot": TIME_SLOTS[slot],
+            "average_performance": float(sums[slot] / counts[slot]),
+            "sample_size": int(counts[slot]),
+        }
+        for slot in np.flatnonzero(counts)
+    ]
+    optimal.sort(key=lambda x: x["average_performance"], reverse=True)
+    return optimal[:top]
+
+
+def analyze_workouts(workouts: Sequence[Dict], period_days: int) -> Dict[str, Any]:
+    """
+    All workout pattern metrics from a single frame
+
+    Returns:
+        Dict with ``patterns`` (as stored by analyze_workout_patterns) and
+        ``optimal_times``
+    """
+    frame = WorkoutFrame.from_records(workouts)
+    return {
+        "patterns": {
+            "frequency": workout_frequency(frame),
+            "timing": workout_timing(frame),
+            "duration": workout_duration(frame),
+            "intensity": workout_intensity(frame),
+            "exercise_distribution": exercise_distribution(frame),
+            "rest_days": rest_patterns(frame),
+            "consistency_score": consistency_score(frame, period_days),
+        },
+        "optimal_times": optimal_workout_times(frame),
+    }
+
+
+@dataclass
+class MealFrame:
+    """Columnar view of logged meals"""
+
+    timestamps: np.ndarray  # datetime64[s]
+    days: np.ndarray  # datetime64[D]
+    hours: np.ndarray  # int16
+    meal_type_codes: np.ndarray
+    meal_types: Tuple[str, ...]
+    calories: np.ndarray
+    macros: Dict[str, np.ndarray]
+
+    @classmethod
+    def from_records(cls, meals: Sequence[Dict]) -> "MealFrame":
+        """Build the frame; the timestamp is ``logged_at``, ``timestamp`` or ``date``"""
+        timestamps = parse_timestamps(
+            [m.get("logged_at") or m.get("timestamp") or m.get("date") for m in meals]
+        )
+        codes, meal_types = encode_categories(
+            (str(m.get("meal_type", "snack")).lower() for m in meals)
+        )
+        return cls(
+            timestamps=timestamps,
+            days=timestamps.astype("datetime64[D]"),
+            hours=_hours(timestamps),
+            meal_type_codes=codes,
+            meal_types=meal_types,
+            calories=np.nan_to_num(_numeric(meals, "calories")),
+            macros={m: np.nan_to_num(_numeric(meals, m)) for m in MACROS},
+        )
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def daily(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Unique logged days and the index of each meal's day"""
+        valid = ~np.isnat(self.days)
+        days, index = np.unique(self.days[valid], return_inverse=True)
+        full_index = np.full(len(self), -1, dtype=np.int64)
+        full_index[valid] = index
+        return days, full_index
+
+    def code(self, meal_type: str) -> int:
+        return self.meal_types.index(meal_type) if meal_type in self.meal_types else -2
+
+
+def _daily_sum(values: np.ndarray, day_index: np.ndarray, n_days: int) -> np.ndarray:
+    mask = day_index >= 0
+    return np.bincount(day_index[mask], weights=values[mask], minlength=n_days)
+
+
+def _closeness(actual: np.ndarray, target: float) -> float:
+    """Mean of ``1 - |actual - target| / target`` clipped at 0, as a percentage"""
+    if not target or not actual.size:
+        return 0.0
+    return float(np.clip(1 - np.abs(actual - target) / target, 0, 1).mean() * 100)
+
+
+def overall_compliance(plan: Dict, frame: MealFrame, period_days: int) -> float:
+    """Logged meals against planned meals over the period"""
+    if not plan or not len(frame):
+        return 0.0
+    planned_meals = plan.get("daily_meals", 3) * period_days
+    return min((len(frame) / planned_meals) * 100, 100) if planned_meals else 0.0
+
+
+def macro_compliance(plan: Dict, frame: MealFrame) -> Dict[str, float]:
+    """Per-macro closeness of daily totals to the plan's targets"""
+    targets = plan.get("daily_macros", {}) if plan else {}
+    days, day_index = frame.daily()
+    return {
+        macro: round(
+            _closeness(_daily_sum(frame.macros[macro], day_index, len(days)), targets.get(macro)),
+            1,
+        )
+        for macro in MACROS
+    }
+
+
+def calorie_compliance(plan: Dict, frame: MealFrame) -> Dict[str, Any]:
+    """Daily calorie totals against the plan's target (±10% tolerance)"""
+    target = (plan or {}).get("daily_calories", 2000)
+    days, day_index = frame.daily()
+    totals = _daily_sum(frame.calories, day_index, len(days))
+    if not totals.size:
+        return {"average_daily": 0, "compliance_percentage": 0.0, "over_days": 0, "under_days": 0}
+    return {
+        "average_daily": round(float(totals.mean()), 1),
+        "compliance_percentage": round(_closeness(totals, target), 1),
+        "over_days": int((totals > target * 1.1).sum()),
+        "under_days": int((totals < target * 0.9).sum()),
+    }
+
+
+def _days_with(frame: MealFrame, meal_type: str, day_index: np.ndarray, n_days: int) -> np.ndarray:
+    mask = (frame.meal_type_codes == frame.code(meal_type)) & (day_index >= 0)
+    return np.bincount(day_index[mask], minlength=n_days) > 0
+
+
+def meal_timing(plan: Dict, frame: MealFrame) -> Dict[str, Any]:
+    """Share of main meals logged inside their expected window"""
+    days, day_index = frame.daily()
+    scheduled = np.zeros(len(frame), dtype=bool)
+    on_time = np.zeros(len(frame), dtype=bool)
+    for meal_type, (start, end) in MEAL_WINDOWS.items():
+        mask = (frame.meal_type_codes == frame.code(meal_type)) & (frame.hours >= 0)
+        scheduled |= mask
+        on_time |= mask & (frame.hours >= start) & (frame.hours < end)
+
+    dinners = (frame.meal_type_codes == frame.code("dinner")) & (frame.hours >= 22)
+    return {
+        "on_schedule_percentage": (
+            round(float(on_time.sum() / scheduled.sum() * 100), 1) if scheduled.any() else 0
+        ),
+        "missed_breakfast": int((~_days_with(frame, "breakfast", day_index, len(days))).sum()),
+        "late_dinners": int(dinners.sum()),
+    }
+
+
+def missed_meals(plan: Dict, frame: MealFrame, limit: int = 20) -> List[Dict[str, Any]]:
+    """Planned meal types with no log on days between the first and last log"""
+    days, day_index = frame.daily()
+    if not days.size:
+        return []
+    calendar = np.arange(days[0], days[-1] + np.timedelta64(1, "D"))
+    position = (days - days[0]).astype(np.int64)
+
+    missed: List[Dict[str, Any]] = []
+    for meal_type in (plan or {}).get("meal_types", DEFAULT_MEAL_TYPES):
+        logged = np.zeros(len(calendar), dtype=bool)
+        logged[position] = _days_with(frame, meal_type, day_index, len(days))
+        for day in calendar[~logged]:
+            missed.append({"date": str(day), "meal": meal_type, "reason": "not_logged"})
+    missed.sort(key=lambda m: m["date"], reverse=True)
+    return missed[:limit]
+
+
+def compliance_patterns(plan: Dict, frame: MealFrame) -> List[str]:
+    """Weekday/weekend differences in logging and breakfast habits"""
+    days, day_index = frame.daily()
+    if not days.size:
+        return []
+    weekend = (days.astype(np.int64) + 3) % 7 >= 5
+    meals_per_day = np.bincount(day_index[day_index >= 0], minlength=len(days))
+    has_breakfast = _days_with(frame, "breakfast", day_index, len(days))
+
+    patterns = []
+    if weekend.any() and (~weekend).any():
+        weekday_rate = meals_per_day[~weekend].mean()
+        weekend_rate = meals_per_day[weekend].mean()
+        if weekday_rate > weekend_rate * 1.15:
+            patterns.append("Better compliance on weekdays")
+        elif weekend_rate > weekday_rate * 1.15:
+            patterns.append("Better compliance on weekends")
+        if has_breakfast[weekend].mean() < has_breakfast[~weekend].mean() - 0.2:
+            patterns.append("Tendency to skip breakfast on weekends")
+    if has_breakfast.mean() < 0.5:
+        patterns.append("Frequently skip breakfast")
+    return patterns
+
+
+def analyze_meals(plan: Dict, meals: Sequence[Dict], period_days: int) -> Dict[str, Any]:
+    """
+    All nutrition compliance metrics from a single frame
+
+    Returns:
+        Dict with ``metrics`` (as stored by analyze_nutrition_compliance)
+        and ``patterns``
+    """
+    frame = MealFrame.from_records(meals)
+    return {
+        "metrics": {
+            "overall_compliance": overall_compliance(plan, frame, period_days),
+            "macro_compliance": macro_compliance(plan, frame),
+            "calorie_compliance": calorie_compliance(plan, frame),
+            "meal_timing_compliance": meal_timing(plan, frame),
+            "missed_meals": missed_meals(plan, frame),
+        },
+        "patterns": compliance_patterns(plan, frame),
+    }
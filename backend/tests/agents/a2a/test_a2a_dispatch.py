@@ -0,0 +1,98 @@
+"""
+Pruebas unitarias para el despacho concurrente y el registro de tareas A2A.
+"""
+
+import asyncio
+
+import pytest
+
+from agents.base.a2a_dispatch import TaskDispatcher, TaskRegistry
+
+
+def test_task_registry_lru_and_ttl(monkeypatch):
+    """El registro descarta las tareas menos recientes y las caducadas."""
+    clock = [100.0]
+    monkeypatch.setattr("agents.base.a2a_dispatch.time.monotonic", lambda: clock[0])
+
+    registry = TaskRegistry(max_entries=2, ttl_seconds=10)
+    first = registry.put("t1", {"status": "running"})
+    registry.put("t2", {"status": "running"})
+    assert registry.get("t1") is first  # t1 pasa a ser la más reciente
+    registry.put("t3", {"status": "running"})
+
+    assert "t2" not in registry
+    assert registry.get("t1") is first
+    assert registry.evicted == 1
+
+    clock[0] += 11
+    assert registry.get("t3") is None
+    with pytest.raises(KeyError):
+        registry["t1"]
+    assert registry.update("t1", status="completed") is None
+    # La referencia conservada sigue siendo utilizable tras el desalojo
+    first["status"] = "completed"
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_limits_concurrency_and_signals_backpressure():
+    """Nunca hay más de max_concurrent mensajes en ejecución."""
+    release = asyncio.Event()
+    running = 0
+    peak = 0
+    signals = []
+
+    async def handler(data):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await release.wait()
+        running -= 1
+
+    async def on_pressure(saturated, stats):
+        signals.append(saturated)
+
+    dispatcher = TaskDispatcher(handler, max_concurrent=2, max_queued=2, on_pressure=on_pressure)
+    for i in range(4):
+        assert await dispatcher.submit(f"m{i}", {"i": i})
+    assert not await dispatcher.submit("m4", {})  # cola llena
+    assert not await dispatcher.submit("m0", {})  # clave duplicada
+
+    await asyncio.sleep(0)
+    assert dispatcher.snapshot()["running"] == 2
+    assert dispatcher.snapshot()["queued"] == 2
+    assert signals == [True]
+
+    release.set()
+    while dispatcher.in_flight:
+        await asyncio.sleep(0)
+
+    assert peak == 2
+    assert signals == [True, False]
+    assert dispatcher.stats["accepted"] == 4
+    assert dispatcher.stats["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_cancel_and_failures():
+    """Las tareas se pueden cancelar y los errores no detienen el despacho."""
+    started = asyncio.Event()
+
+    async def handler(data):
+        if data.get("fail"):
+            raise RuntimeError("boom")
+        started.set()
+        await asyncio.sleep(60)
+
+    dispatcher = TaskDispatcher(handler, max_concurrent=4, max_queued=0)
+    await dispatcher.submit("slow", {})
+    await dispatcher.submit("bad", {"fail": True})
+    await started.wait()
+
+    assert dispatcher.cancel("slow")
+    assert not dispatcher.cancel("unknown")
+    while dispatcher.in_flight:
+        await asyncio.sleep(0)
+
+    assert dispatcher.stats["cancelled"] == 1
+    assert dispatcher.stats["failed"] == 1
+    await dispatcher.shutdown()
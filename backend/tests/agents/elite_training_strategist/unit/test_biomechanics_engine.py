@@ -0,0 +1,138 @@
+"""
+Unit tests for the vectorized BLAZE biomechanics engine.
+"""
+
+import numpy as np
+import pytest
+
+from agents.elite_training_strategist.biomechanics_engine import (
+    DEFAULT_SYMMETRY_SCORE,
+    JOINT_NAMES,
+    LANDMARK_INDEX,
+    KeypointTensor,
+    StreamingBiomechanicsAnalyzer,
+    analyze_clip,
+    angles_to_dict,
+    compute_joint_angles,
+    compute_symmetry_scores,
+)
+
+
+def _squat_clip(reps=10, fps=10.0, rep_seconds=2.0, depth=None):
+    """Synthetic squat: knees travel forward and back once per repetition."""
+    frames_per_rep = int(rep_seconds * fps)
+    num_frames = reps * frames_per_rep
+    tensor = KeypointTensor.allocate(num_frames, fps)
+
+    t = np.arange(num_frames)
+    phase = (1 - np.cos(2 * np.pi * t / frames_per_rep)) / 2
+    if depth is None:
+        depth = np.full(reps, 0.1)
+    knee_offset = phase * np.repeat(depth, frames_per_rep)
+
+    for side, x in (("left", 0.45), ("right", 0.55)):
+        tensor.coords[:, LANDMARK_INDEX[f"{side}_shoulder"]] = (x, 0.4, 0.0)
+        tensor.coords[:, LANDMARK_INDEX[f"{side}_hip"]] = (x, 0.6, 0.0)
+        tensor.coords[:, LANDMARK_INDEX[f"{side}_ankle"]] = (x, 0.9, 0.0)
+        tensor.coords[:, LANDMARK_INDEX[f"{side}_knee"], 0] = x + knee_offset
+        tensor.coords[:, LANDMARK_INDEX[f"{side}_knee"], 1] = 0.75
+        tensor.coords[:, LANDMARK_INDEX[f"{side}_knee"], 2] = 0.0
+    tensor.visibility[:] = 0.9
+    return tensor
+
+
+def _angle(p1, p2, p3):
+    ba = np.array(p1) - np.array(p2)
+    bc = np.array(p3) - np.array(p2)
+    cosine = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def test_single_frame_angles_match_point_formula():
+    keypoints = {
+        "pose_landmarks": [
+            {"name": "left_shoulder", "x": 0.4, "y": 0.4},
+            {"name": "right_shoulder", "x": 0.6, "y": 0.4},
+            {"name": "left_hip", "x": 0.45, "y": 0.6},
+            {"name": "right_hip", "x": 0.55, "y": 0.6},
+            {"name": "left_knee", "x": 0.43, "y": 0.75},
+            {"name": "right_knee", "x": 0.57, "y": 0.75},
+            {"name": "left_ankle", "x": 0.41, "y": 0.9},
+            {"name": "right_ankle", "x": 0.59, "y": 0.9},
+        ]
+    }
+    tensor = KeypointTensor.from_landmark_frames([keypoints])
+    angles = angles_to_dict(compute_joint_angles(tensor)[0])
+
+    assert set(angles) == set(JOINT_NAMES)
+    assert angles["left_knee"] == pytest.approx(
+        _angle((0.45, 0.6), (0.43, 0.75), (0.41, 0.9))
+    )
+    assert angles["left_hip"] == pytest.approx(
+        _angle((0.4, 0.4), (0.45, 0.6), (0.43, 0.75))
+    )
+    assert angles["torso_lean"] == pytest.approx(0.0)
+
+
+def test_missing_landmarks_are_dropped_and_symmetry_defaults():
+    tensor = KeypointTensor.from_landmark_frames(
+        [{"pose_landmarks": [{"name": "nose", "x": 0.5, "y": 0.3}]}]
+    )
+
+    assert angles_to_dict(compute_joint_angles(tensor)[0]) == {}
+    assert compute_symmetry_scores(tensor)[0] == DEFAULT_SYMMETRY_SCORE
+
+
+def test_symmetry_penalizes_height_difference():
+    tensor = _squat_clip(reps=1)
+    level = compute_symmetry_scores(tensor)
+    tensor.coords[:, LANDMARK_INDEX["left_shoulder"], 1] += 0.05
+    tilted = compute_symmetry_scores(tensor)
+
+    assert np.all(level == 100.0)
+    assert np.all(tilted < level)
+
+
+def test_repetitions_and_tempo_are_detected():
+    result = analyze_clip(_squat_clip(reps=10, fps=10.0, rep_seconds=2.0))
+
+    assert result["primary_joint"] in ("left_knee", "right_knee")
+    assert result["repetitions"]["count"] == 10
+    assert result["tempo"]["cadence_reps_per_minute"] == pytest.approx(30.0, rel=0.15)
+    assert result["phases"]["distribution"]["eccentric"] > 0
+    assert result["phases"]["distribution"]["concentric"] > 0
+    assert result["fatigue"]["fatigue_detected"] is False
+
+
+def test_fatigue_detected_when_depth_degrades():
+    depth = np.linspace(0.12, 0.05, 9)
+    result = analyze_clip(_squat_clip(reps=9, depth=depth))
+
+    assert result["fatigue"]["fatigue_detected"] is True
+    assert "rom_loss" in result["fatigue"]["indicators"]
+    assert result["fatigue"]["rom_slope_per_rep"] < 0
+
+
+def test_streaming_matches_whole_clip_analysis():
+    tensor = _squat_clip(reps=30, fps=10.0)  # 60 s
+    analyzer = StreamingBiomechanicsAnalyzer(
+        fps=10.0, window_seconds=10.0, hop_seconds=5.0, initial_capacity=16
+    )
+    for start in range(0, tensor.num_frames, 64):
+        analyzer.push(
+            KeypointTensor(
+                coords=tensor.coords[start : start + 64],
+                visibility=tensor.visibility[start : start + 64],
+                fps=tensor.fps,
+            )
+        )
+
+    summary = analyzer.finalize()
+    expected = analyze_clip(tensor)
+
+    assert analyzer.total_frames == tensor.num_frames
+    assert summary["repetitions"] == expected["repetitions"]
+    assert summary["tempo"] == expected["tempo"]
+    assert len(analyzer.window_results) == 11
+    assert all(w["repetitions"]["count"] >= 4 for w in analyzer.window_results)
+    assert analyzer.average_confidence == pytest.approx(0.9)
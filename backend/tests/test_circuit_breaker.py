@@ -13,6 +13,7 @@ from core.circuit_breaker import (
     CircuitBreaker,
     CircuitBreakerOpenError,
     CircuitState,
+    SlidingWindowStats,
     circuit_breaker,
 )
 
@@ -252,3 +253,116 @@ class TestCircuitBreakerDecorator:
         # Verificar que tiene el circuit breaker adjunto
         assert hasattr(documented_function, "circuit_breaker")
         assert isinstance(documented_function.circuit_breaker, CircuitBreaker)
+
+
+class TestSlidingWindowStats:
+    """Tests para las estadísticas por ventana deslizante."""
+
+    def test_rates_and_bucket_expiry(self):
+        """Test que las tasas se calculan sobre la ventana y expiran con el tiempo."""
+        window = SlidingWindowStats(
+            window_seconds=10.0, bucket_count=10, slow_call_duration=1.0
+        )
+
+        for i in range(4):
+            window.record(0.01, failed=i == 0, now=100.0)
+        window.record(2.0, failed=False, now=105.0)
+
+        snapshot = window.snapshot(now=105.0)
+        assert snapshot["calls"] == 5
+        assert snapshot["failures"] == 1
+        assert snapshot["slow_calls"] == 1
+        assert snapshot["failure_rate"] == pytest.approx(0.2)
+
+        # Los buckets de t=100 salen de la ventana a t=110
+        assert window.snapshot(now=110.5)["calls"] == 1
+        assert window.snapshot(now=200.0)["calls"] == 0
+
+    def test_latency_percentiles(self):
+        """Test que los percentiles usan los límites del histograma."""
+        window = SlidingWindowStats(window_seconds=60.0, bucket_count=6)
+        for _ in range(90):
+            window.record(0.004, failed=False, now=10.0)
+        for _ in range(10):
+            window.record(0.8, failed=False, now=10.0)
+
+        percentiles = window.percentiles(now=10.0)
+        assert percentiles["p50"] == pytest.approx(5.0)
+        assert percentiles["p90"] == pytest.approx(5.0)
+        assert percentiles["p99"] == pytest.approx(1000.0)
+
+
+class TestCircuitBreakerWindowTripping:
+    """Tests para la apertura por tasa de fallos y por latencia."""
+
+    @pytest.mark.asyncio
+    async def test_opens_on_failure_rate_without_consecutive_failures(self):
+        """Test que fallos intercalados abren el circuito por tasa de fallos."""
+        breaker = CircuitBreaker(
+            name="rate_breaker",
+            failure_threshold=100,
+            failure_rate_threshold=0.5,
+            minimum_calls=10,
+        )
+
+        async def succeed():
+            return "ok"
+
+        async def fail():
+            raise Exception("Test failure")
+
+        for _ in range(5):
+            await breaker.call(succeed)
+            with pytest.raises(Exception):
+                await breaker.call(fail)
+
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call(succeed)
+
+    @pytest.mark.asyncio
+    async def test_opens_on_slow_call_rate(self):
+        """Test que llamadas lentas abren el circuito aunque tengan éxito."""
+        breaker = CircuitBreaker(
+            name="slow_breaker",
+            slow_call_duration=0.01,
+            slow_call_rate_threshold=0.5,
+            minimum_calls=4,
+        )
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        for _ in range(4):
+            await breaker.call(slow)
+
+        assert breaker.state == CircuitState.OPEN
+        metrics = breaker.get_metrics()
+        assert metrics["slow_calls"] == 4
+        assert metrics["latency_ms"]["p50"] >= 10.0
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_slots_are_released(self):
+        """Test que los slots de half-open se liberan al terminar cada prueba."""
+        breaker = CircuitBreaker(
+            name="probe_breaker",
+            failure_threshold=1,
+            recovery_timeout=0,
+            success_threshold=5,
+            half_open_max_calls=1,
+        )
+
+        async def fail():
+            raise Exception("Test failure")
+
+        async def succeed():
+            return "ok"
+
+        with pytest.raises(Exception):
+            await breaker.call(fail)
+
+        for _ in range(5):
+            await breaker.call(succeed)
+
+        assert breaker.state == CircuitState.CLOSED
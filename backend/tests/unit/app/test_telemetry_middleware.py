@@ -0,0 +1,114 @@
+"""
+Tests for route-template labels and sampling in TelemetryMiddleware.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.middleware.telemetry import UNMATCHED_ROUTE, TelemetryMiddleware
+
+
+def build_app(sample_ratio: float, slow_request_ms: float = 10_000.0):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    reader = InMemoryMetricReader()
+    meter = MeterProvider(metric_readers=[reader]).get_meter("test")
+
+    app = FastAPI()
+
+    @app.get("/users/{user_id}/sessions/{session_id}")
+    async def get_session(user_id: str, session_id: str):
+        return {"user_id": user_id, "session_id": session_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(
+        TelemetryMiddleware,
+        tracer=provider.get_tracer("test"),
+        meter=meter,
+        sample_ratio=sample_ratio,
+        slow_request_ms=slow_request_ms,
+    )
+    return app, exporter, reader
+
+
+def route_labels(reader):
+    labels = set()
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                if metric.name == "http.requests":
+                    for point in metric.data.data_points:
+                        labels.add(point.attributes["http.route"])
+    return labels
+
+
+def test_metrics_use_route_template():
+    app, _, reader = build_app(sample_ratio=1.0)
+    client = TestClient(app)
+    for i in range(20):
+        assert client.get(f"/users/u{i}/sessions/s{i}").status_code == 200
+    client.get("/missing/123")
+
+    assert route_labels(reader) == {
+        "/users/{user_id}/sessions/{session_id}",
+        UNMATCHED_ROUTE,
+    }
+
+
+def test_head_sampling_drops_fast_requests_but_keeps_errors():
+    app, exporter, _ = build_app(sample_ratio=0.0)
+    client = TestClient(app, raise_server_exceptions=False)
+    for i in range(10):
+        client.get(f"/users/u{i}/sessions/s{i}")
+    assert client.get("/boom").status_code == 500
+
+    spans = exporter.get_finished_spans()
+    assert [span.name for span in spans] == ["GET /boom"]
+    assert spans[0].attributes["sampling.tail"] is True
+    assert spans[0].attributes["http.status_code"] == 500
+    assert spans[0].events[0].name == "exception"
+
+
+def test_slow_requests_are_tail_sampled():
+    app, exporter, _ = build_app(sample_ratio=0.0, slow_request_ms=0.0)
+    TestClient(app).get("/users/u1/sessions/s1")
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "GET /users/{user_id}/sessions/{session_id}"
+    assert span.attributes["http.route"] == "/users/{user_id}/sessions/{session_id}"
+
+
+def test_incoming_sampled_parent_is_respected():
+    app, exporter, _ = build_app(sample_ratio=0.0)
+    parent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    TestClient(app).get("/users/u1/sessions/s1", headers={"traceparent": parent})
+
+    (span,) = exporter.get_finished_spans()
+    assert format(span.context.trace_id, "032x") == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert "sampling.tail" not in span.attributes
+
+
+def test_overhead_is_measured_and_label_sets_bounded():
+    app, _, _ = build_app(sample_ratio=0.0)
+    client = TestClient(app)
+    for i in range(200):
+        client.get(f"/users/u{i}/sessions/s{i}")
+
+    stack = app.middleware_stack
+    while stack is not None and not isinstance(stack, TelemetryMiddleware):
+        stack = getattr(stack, "app", None)
+    stats = stack.get_overhead_stats()
+    assert stats["requests"] == 200
+    assert stats["label_sets"] == 1
+    assert stats["traces"]["dropped"] == 200
+    # Generous bound: the unsampled path is a few dictionary lookups
+    assert stats["mean_us"] < 2000
@@ -0,0 +1,247 @@
+"""
+Tests for vectorized adherence scoring.
+"""
+
+import asyncio
+import json
+import random
+
+import numpy as np
+import pytest
+
+from core.adherence_batch import (
+    PROTECTIVE_FACTOR_RULES,
+    RISK_FACTOR_RULES,
+    AdherenceFrame,
+    intervention_strategies,
+    matching_factors,
+    score_adherence_batch,
+    write_predictions_to_cache,
+)
+
+
+def synthetic_metrics(rng):
+    return {
+        "daily_app_usage_minutes": rng.uniform(0, 90),
+        "weekly_active_days": rng.randint(0, 7),
+        "agent_interaction_frequency": rng.uniform(0, 12),
+        "message_response_time_hours": rng.uniform(0, 48),
+        "consistency_score": rng.random(),
+        "goal_completion_rate": rng.random(),
+        "self_reporting_frequency": rng.uniform(0, 7),
+        "protocol_modification_requests": rng.randint(0, 8),
+        "progress_satisfaction_score": rng.uniform(1, 10),
+        "milestone_achievement_rate": rng.random(),
+        "plateau_duration_days": rng.randint(0, 40),
+        "expectation_reality_gap": rng.uniform(-1, 1),
+        "support_system_strength": rng.random(),
+        "environmental_challenges": rng.randint(0, 10),
+        "competing_priorities": rng.randint(0, 10),
+        "previous_program_completion_rate": rng.random(),
+        "longest_adherence_streak_days": rng.randint(0, 180),
+        "average_dropout_timeframe_days": rng.choice([None, 0, rng.randint(10, 200)]),
+    }
+
+
+class Metrics:
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def reference_prediction(m, time_pressure=False):
+    """Scalar rules as in AdherencePredictionEngine.predict_adherence without AI."""
+    usage = min(1.0, max(0.0, m.daily_app_usage_minutes / 30.0))
+    if m.daily_app_usage_minutes > 60:
+        usage *= 0.8
+    interaction = min(1.0, max(0.0, m.agent_interaction_frequency / 5.0))
+    if m.agent_interaction_frequency > 10:
+        interaction *= 0.7
+    engagement = (
+        usage
+        + min(1.0, m.weekly_active_days / 7.0)
+        + interaction
+        + max(0.0, 1.0 - m.message_response_time_hours / 24.0)
+    ) / 4.0
+    behavioral = (
+        m.consistency_score
+        + m.goal_completion_rate
+        + min(1.0, m.self_reporting_frequency / 5.0)
+        + max(0.0, 1.0 - m.protocol_modification_requests / 10.0)
+    ) / 4.0
+    progress = (
+        (m.progress_satisfaction_score - 1) / 9.0
+        + m.milestone_achievement_rate
+        + max(0.0, 1.0 - m.plateau_duration_days / 30.0)
+        + (m.expectation_reality_gap + 1) / 2.0
+    ) / 4.0
+    social = (
+        m.support_system_strength
+        + max(0.0, 1.0 - m.environmental_challenges / 10.0)
+        + max(0.0, 1.0 - m.competing_priorities / 10.0)
+    ) / 3.0
+    avg = m.average_dropout_timeframe_days
+    historical = (
+        m.previous_program_completion_rate
+        + min(1.0, m.longest_adherence_streak_days / 90.0)
+        + (0.5 if avg is None else min(1.0, avg / 180.0))
+    ) / 3.0
+    p = float(
+        np.clip(
+            engagement * 0.25 + behavioral * 0.30 + progress * 0.20 + social * 0.15 + historical * 0.10,
+            0.0,
+            1.0,
+        )
+    )
+
+    level = "very_high"
+    for name, threshold in (("very_low", 0.8), ("low", 0.6), ("moderate", 0.4), ("high", 0.2)):
+        if p >= threshold:
+            level = name
+            break
+
+    triggers = []
+    if m.plateau_duration_days > 14:
+        triggers.append("plateau")
+    if time_pressure:
+        triggers.append("time_pressure")
+    if m.progress_satisfaction_score < m.expectation_reality_gap + 7:
+        triggers.append("motivation_drop")
+    if m.protocol_modification_requests > 3:
+        triggers.append("complexity_overload")
+    if m.support_system_strength < 0.5 and m.environmental_challenges > 5:
+        triggers.append("social_pressure")
+    if m.expectation_reality_gap < -0.4:
+        triggers.append("progress_dissatisfaction")
+
+    risk_factors = matching_factors(m, RISK_FACTOR_RULES)
+    interventions = intervention_strategies(level, risk_factors, triggers)
+
+    dropout = None
+    if p <= 0.6:
+        dropout = 30
+        for threshold, days in ((0.0, 7), (0.2, 14), (0.4, 30), (0.6, 60)):
+            if p <= threshold:
+                dropout = days
+                break
+        if "time_pressure" in triggers:
+            dropout = int(dropout * 0.5)
+        if avg:
+            dropout = int(dropout * (avg / 60.0))
+        dropout = max(7, dropout)
+
+    window = {"very_high": 2, "high": 5, "moderate": 10, "low": 14, "very_low": 21}[level]
+    if "motivation_drop" in triggers:
+        window = max(1, window // 2)
+
+    consistency = (
+        m.consistency_score
+        + 1.0
+        - abs(m.expectation_reality_gap)
+        + min(1.0, m.longest_adherence_streak_days / 60.0)
+    ) / 3.0
+    confidence = (1.0 + consistency + 0.5) / 3.0
+
+    urgent = sum(1 for i in interventions if i["priority"] in ("critical", "high"))
+    responsiveness = sum(
+        (
+            m.message_response_time_hours < 6,
+            m.protocol_modification_requests < 3,
+            m.support_system_strength > 0.6,
+        )
+    )
+    success = min(0.95, p + len(interventions) * 0.05 + urgent * 0.08 + responsiveness * 0.05)
+
+    return {
+        "adherence_probability": p,
+        "risk_level": level,
+        "confidence_score": confidence,
+        "primary_risk_factors": risk_factors,
+        "protective_factors": matching_factors(m, PROTECTIVE_FACTOR_RULES),
+        "triggers_detected": triggers,
+        "estimated_dropout_timeframe_days": dropout,
+        "critical_intervention_window_days": window,
+        "intervention_strategies": interventions,
+        "success_probability_with_intervention": success,
+    }
+
+
+def test_batch_matches_scalar_rules():
+    rng = random.Random(7)
+    rows = [synthetic_metrics(rng) for _ in range(500)]
+    time_pressure = [rng.random() < 0.2 for _ in rows]
+    result = score_adherence_batch(
+        AdherenceFrame.from_metrics([f"u{i}" for i in range(len(rows))], rows),
+        time_constraints_increased=time_pressure,
+    )
+
+    for i, row in enumerate(rows):
+        expected = reference_prediction(Metrics(row), time_pressure[i])
+        got = result.prediction(i)
+        assert got["user_id"] == f"u{i}"
+        for key, value in expected.items():
+            if isinstance(value, float):
+                assert got[key] == pytest.approx(value), key
+            else:
+                assert got[key] == value, key
+
+    levels = result.risk_levels()
+    summary = result.risk_summary()
+    assert sum(summary.values()) == len(rows)
+    assert all(summary[level] == levels.count(level) for level in summary)
+
+
+def test_frame_accepts_objects_and_missing_values():
+    rng = random.Random(1)
+    row = synthetic_metrics(rng)
+    row["average_dropout_timeframe_days"] = None
+    frame = AdherenceFrame.from_metrics(["a", "b"], [row, Metrics(row)])
+    assert np.isnan(frame["average_dropout_timeframe_days"]).all()
+    assert frame["weekly_active_days"].tolist() == [row["weekly_active_days"]] * 2
+
+    empty = score_adherence_batch(AdherenceFrame.from_rows([]))
+    assert len(empty) == 0 and empty.predictions() == []
+
+    with pytest.raises(ValueError):
+        AdherenceFrame.from_metrics(["a"], [])
+
+
+class FakePipeline:
+    def __init__(self, store, calls):
+        self.store, self.calls, self.pending = store, calls, []
+
+    def setex(self, key, ttl, value):
+        self.pending.append((key, ttl, value))
+
+    async def execute(self):
+        self.calls.append(len(self.pending))
+        for key, ttl, value in self.pending:
+            self.store[key] = (ttl, value)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store, self.calls = {}, []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store, self.calls)
+
+
+def test_predictions_are_cached_in_chunked_pipelines():
+    rng = random.Random(3)
+    rows = [synthetic_metrics(rng) for _ in range(25)]
+    result = score_adherence_batch(
+        AdherenceFrame.from_metrics([f"u{i}" for i in range(25)], rows)
+    )
+    redis = FakeRedis()
+
+    written = asyncio.run(write_predictions_to_cache(redis, result, chunk_size=10))
+    assert written == 25
+    assert redis.calls == [10, 10, 5]
+
+    ttl, payload = redis.store["adherence_prediction:u4"]
+    assert ttl == 30 * 24 * 3600
+    cached = json.loads(payload)["prediction"]
+    assert cached["risk_level"] == result.risk_levels()[4]
+    assert cached["triggers_detected"] == result.prediction(4)["triggers_detected"]
+
+    assert asyncio.run(write_predictions_to_cache(None, result)) == 0
@@ -0,0 +1,193 @@
+"""
+Tests for the segmented, append-only audit log store.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.audit_log_store import AuditLogStore, iter_bits_desc, merkle_root
+
+START = datetime(2026, 1, 1)
+TYPES = ["authentication", "data_access", "security", "system"]
+SEVERITIES = ["critical", "high", "medium", "low", "info"]
+
+
+def make_records(count, seed=0, step_seconds=97):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        timestamp = START + timedelta(seconds=i * step_seconds)
+        records.append(
+            (
+                {
+                    "event_id": f"AUD-{i}",
+                    "timestamp": timestamp.isoformat(),
+                    "event_type": rng.choice(TYPES),
+                    "severity": rng.choice(SEVERITIES),
+                    "actor": f"actor-{rng.randint(0, 5)}",
+                    "resource": rng.choice([None, "db", "api"]),
+                    "compliance_tags": rng.sample(["GDPR", "HIPAA", "SOC2"], rng.randint(0, 2)),
+                    "details": {"n": i},
+                },
+                timestamp,
+            )
+        )
+    return records
+
+
+def fill(store, records):
+    for record, timestamp in records:
+        store.append(record, timestamp)
+
+
+def test_query_matches_full_scan_across_segments(tmp_path):
+    records = make_records(600)
+    store = AuditLogStore(
+        str(tmp_path), segment_seconds=3600, batch_size=50, cached_segments=2
+    )
+    fill(store, records)
+    assert len(store.segments) > 10
+
+    start, end = START + timedelta(hours=3, minutes=10), START + timedelta(hours=9)
+    cases = [
+        ({}, None, None),
+        ({"event_type": ["security", "data_access"]}, None, None),
+        ({"severity": ["critical", "high"], "actor": ["actor-2"]}, start, end),
+        ({"compliance_tags": ["GDPR"], "resource": ["db"]}, start, None),
+        ({"actor": ["nobody"]}, None, None),
+    ]
+    for filters, lower, upper in cases:
+        expected = [
+            record
+            for record, timestamp in reversed(records)
+            if all(
+                set(values) & set(record[name] if isinstance(record[name], list) else [record[name]])
+                for name, values in filters.items()
+            )
+            and (lower is None or timestamp >= lower)
+            and (upper is None or timestamp <= upper)
+        ]
+        got = [record for record, _ in store.query(filters, start=lower, end=upper)]
+        assert got == expected
+
+        page = [r for r, _ in store.query(filters, start=lower, end=upper, offset=7, limit=20)]
+        assert page == expected[7:27]
+
+    # Only two sealed segment indexes stay in memory
+    assert sum(segment.index is not None for segment in store.segments) <= 3
+
+    with pytest.raises(ValueError):
+        list(store.query({"action": ["read"]}))
+
+
+def test_batches_are_signed_once_and_tampering_is_detected(tmp_path):
+    store = AuditLogStore(str(tmp_path), batch_size=10, signing_key=b"k")
+    records = make_records(25, step_seconds=1)
+    hashes = [store.append(record, timestamp) for record, timestamp in records]
+
+    index = store.segments[0].index
+    assert [batch["count"] for batch in index.batches] == [10, 10]
+    assert store.pending == 5
+    assert index.batches[1]["prev"] == index.batches[0]["root"]
+    assert index.batches[0]["root"] == merkle_root(
+        [bytes.fromhex(h) for h in hashes[:10]]
+    ).hex()
+
+    assert store.verify_record("AUD-3")["signed"] is True
+    assert store.verify_record("AUD-22")["signed"] is False
+    assert store.verify_record("missing")["valid"] is False
+
+    result = store.verify()
+    assert result["valid"] and result["records_verified"] == 25
+    assert store.pending == 0
+
+    # Rewrite one record in place with a line of the same length
+    log_path = store.segments[0].log_path
+    with open(log_path, "rb") as handle:
+        data = handle.read()
+    original = b'"actor":"' + records[12][0]["actor"].encode() + b'"'
+    position = data.index(original, index.offsets[12])
+    with open(log_path, "r+b") as handle:
+        handle.seek(position)
+        handle.write(original.replace(b"actor-", b"actor_"))
+    index._map = None
+
+    result = store.verify()
+    assert not result["valid"]
+    assert {"record_id": "AUD-12", "error": "Record hash mismatch"} in result["violations"]
+    assert result["records_verified"] == 24
+    assert store.verify_record("AUD-12")["error"] == "Record hash mismatch"
+
+    # A different key cannot vouch for the batches
+    forged = AuditLogStore(str(tmp_path), signing_key=b"other")
+    assert not forged.verify()["valid"]
+
+
+def test_reopen_recovers_open_segment_and_retention_drops_segments(tmp_path):
+    records = make_records(300, step_seconds=60)
+    store = AuditLogStore(str(tmp_path), segment_seconds=3600, batch_size=40)
+    fill(store, records)
+    store.flush()
+
+    # Simulate a crash: the active segment has no index file and a torn line
+    with open(store.segments[-1].log_path, "ab") as handle:
+        handle.write(b'{"data":{"event_id":"torn"')
+    first = store.verify(quick=True)
+    assert first["segments_skipped"] == 0
+
+    reopened = AuditLogStore(str(tmp_path), segment_seconds=3600, batch_size=40)
+    assert reopened.count == 300
+    assert all(segment.sealed for segment in reopened.segments)
+    assert [r["event_id"] for r, _ in reopened.query(limit=3)] == ["AUD-299", "AUD-298", "AUD-297"]
+
+    verified = reopened.verify()
+    assert verified["valid"] and verified["records_verified"] == 300
+    again = reopened.verify(quick=True)
+    assert again["valid"] and again["records_verified"] == 300
+    # One unchanged segment is still re-verified in rotation
+    assert again["segments_skipped"] == len(reopened.segments) - 1
+    assert reopened.verify()["segments_skipped"] == 0
+
+    # Appends continue the chain in a new segment
+    reopened.append({"event_id": "AUD-new"}, START + timedelta(hours=6))
+    assert reopened.verify()["valid"]
+
+    dropped = reopened.drop_before(START + timedelta(hours=2, minutes=30))
+    assert dropped == 120
+    assert reopened.count == 181
+    assert not any(name.startswith("00000000-") for name in os.listdir(tmp_path))
+    assert reopened.verify()["valid"]
+
+
+def test_tampering_with_restored_mtime_is_caught(tmp_path):
+    records = make_records(300, step_seconds=60)
+    store = AuditLogStore(str(tmp_path), segment_seconds=3600, batch_size=40)
+    fill(store, records)
+    store.append({"event_id": "AUD-tail"}, START + timedelta(hours=6))
+    assert store.verify()["valid"]
+
+    # Same-length rewrite of a sealed segment, then put size and mtime back
+    segment = store.segments[1]
+    stat = os.stat(segment.log_path)
+    with open(segment.log_path, "rb") as handle:
+        data = handle.read()
+    position = data.index(b'"actor":"actor-')
+    with open(segment.log_path, "r+b") as handle:
+        handle.seek(position)
+        handle.write(b'"actor":"actor_')
+    os.utime(segment.log_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    store._index(segment)._map = None
+
+    assert not store.verify()["valid"]
+
+    # The monitoring mode reaches the segment within one rotation
+    results = [store.verify(quick=True) for _ in store.segments]
+    assert not all(result["valid"] for result in results)
+
+
+def test_bit_iteration_is_descending():
+    assert list(iter_bits_desc(0b1011001)) == [6, 4, 3, 0]
+    assert list(iter_bits_desc(0)) == []
@@ -0,0 +1,196 @@
+"""
+Pruebas del detector de comportamientos en una sola pasada.
+"""
+
+import asyncio
+import random
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.behavior_detector import BehaviorDetector, KeywordMatcher
+from core.behavioral_pattern_analyzer import BehaviorPatternAnalyzer, BehaviorType
+from core.conversation_memory import (
+    ConversationContext,
+    EmotionalState,
+    MemoryEntry,
+    _notify_memory_listeners,
+)
+
+TEXTS = [
+    "Necesito planificar mi rutina de la semana",
+    "¿Qué debería comer después del entrenamiento?",
+    "Quiero revisar mi PROGRESO y mi peso",
+    "¿Cómo voy con mis objetivos? Quiero alcanzar la meta",
+    "Me siento desanimado, necesito motivación",
+    "Tomo creatina y proteína después de entrenar",
+    "Conversación general",
+]
+
+NOW = datetime(2024, 6, 30, 12, 0)
+
+
+def make_entry(rng, user_id="u1", days_ago=None, content=None):
+    return MemoryEntry(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        agent_id="test",
+        timestamp=NOW - timedelta(days=days_ago if days_ago is not None else rng.randint(0, 29), hours=rng.randint(0, 16)),
+        content=content or rng.choice(TEXTS),
+        context=rng.choice(list(ConversationContext)),
+        emotional_state=rng.choice(list(EmotionalState) + [None]),
+        importance_score=rng.uniform(0.3, 0.9),
+        metadata={},
+    )
+
+
+def naive_stats(keywords, entries):
+    """Recorrido por tipo como lo hacía el analizador antes del detector."""
+    result = {}
+    for label, words in keywords.items():
+        relevant = [e for e in entries if any(w in e.content.lower() for w in words)]
+        emotions = Counter(e.emotional_state for e in relevant if e.emotional_state)
+        result[label] = {
+            "count": len(relevant),
+            "weekdays": Counter(e.timestamp.strftime("%A").lower() for e in relevant),
+            "hours": Counter(e.timestamp.hour for e in relevant),
+            "contexts": Counter(e.context for e in relevant),
+            "emotions": {k: v / sum(emotions.values()) for k, v in emotions.items()},
+            "timestamps": sorted(e.timestamp for e in relevant),
+            "importance": sum(e.importance_score for e in relevant),
+        }
+    return result
+
+
+def assert_matches(detector, keywords, entries):
+    expected = naive_stats(keywords, entries)
+    assert detector.total == len(entries)
+    for label, stats in detector.stats.items():
+        want = expected[label]
+        assert stats.count == want["count"]
+        assert stats.weekdays == want["weekdays"]
+        assert stats.hours == want["hours"]
+        assert stats.contexts == want["contexts"]
+        assert stats.emotional_associations() == pytest.approx(want["emotions"])
+        assert stats.timestamps == want["timestamps"]
+        assert stats.importance_sum == pytest.approx(want["importance"])
+
+
+@pytest.fixture
+def keywords():
+    return BehaviorPatternAnalyzer._initialize_behavior_keywords(None)
+
+
+def test_matcher_finds_every_type_in_one_pass(keywords):
+    matcher = KeywordMatcher(keywords)
+    labels = matcher.match("Tomo creatina y PROTEÍNA para alcanzar mi meta de peso")
+    assert set(labels) == {
+        BehaviorType.NUTRITION_TRACKING,
+        BehaviorType.PROGRESS_CHECKING,
+        BehaviorType.GOAL_SETTING,
+        BehaviorType.SUPPLEMENT_USAGE,
+    }
+    assert matcher.match("hola") == ()
+
+
+def test_incremental_updates_match_full_rescan(keywords):
+    rng = random.Random(3)
+    entries = [make_entry(rng) for _ in range(300)]
+    matcher = KeywordMatcher(keywords)
+
+    detector = BehaviorDetector(matcher)
+    assert detector.observe_many(entries[:200]) == 200
+    assert_matches(detector, keywords, entries[:200])
+
+    # Entradas nuevas se suman sin recorrer el historial; los duplicados se ignoran
+    assert detector.observe_many(entries[200:] + entries[:5]) == 100
+    assert_matches(detector, keywords, entries)
+
+    # La ventana deslizante resta lo que sale
+    cutoff = NOW - timedelta(days=10)
+    removed = detector.expire(cutoff)
+    kept = [e for e in entries if e.timestamp >= cutoff]
+    assert removed == len(entries) - len(kept)
+    assert_matches(detector, keywords, kept)
+
+
+def test_analyzer_loads_history_once_and_follows_new_conversations(monkeypatch):
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    history = [
+        make_entry(rng, content="Necesito planificar mi rutina de entrenamiento")
+        for _ in range(30)
+    ]
+    for entry in history:
+        entry.timestamp = now - timedelta(days=rng.randint(0, 20), hours=1)
+
+    analyzer = BehaviorPatternAnalyzer()
+    fetches = []
+
+    async def fake_history(user_id, since=None):
+        fetches.append((user_id, since))
+        return [e for e in history if since is None or e.timestamp >= since]
+
+    monkeypatch.setattr(analyzer, "_get_user_conversation_data", fake_history)
+
+    patterns = asyncio.run(analyzer.analyze_user_patterns("u-detector"))
+    assert [p.behavior_type for p in patterns] == [BehaviorType.WORKOUT_SCHEDULING]
+    assert patterns[0].frequency.value == "very_frequent"
+
+    new_entry = make_entry(rng, user_id="u-detector", content="Cambiar mi dieta y calorías")
+    new_entry.timestamp = now
+    history.append(new_entry)
+    _notify_memory_listeners(new_entry)
+
+    detector = asyncio.run(analyzer._get_behavior_detector("u-detector"))
+    assert detector.total == 31
+    assert detector.stats[BehaviorType.NUTRITION_TRACKING].count == 1
+    # La recarga solo pide lo posterior a la entrada más reciente ya contada
+    assert fetches == [("u-detector", None), ("u-detector", now)]
+
+
+def test_analyzer_picks_up_conversations_stored_by_other_processes(monkeypatch):
+    rng = random.Random(12)
+    now = datetime.utcnow()
+    history = [make_entry(rng, content="Necesito planificar mi rutina") for _ in range(5)]
+    for entry in history:
+        entry.timestamp = now - timedelta(days=rng.randint(1, 20))
+
+    analyzer = BehaviorPatternAnalyzer()
+
+    async def fake_history(user_id, since=None):
+        return [e for e in history if since is None or e.timestamp >= since]
+
+    monkeypatch.setattr(analyzer, "_get_user_conversation_data", fake_history)
+
+    detector = asyncio.run(analyzer._get_behavior_detector("u-remote"))
+    assert detector.total == 5
+
+    # Guardada por otro worker: el listener local nunca la ve
+    remote = make_entry(rng, user_id="u-remote", content="Tomo creatina cada día")
+    remote.timestamp = now
+    history.append(remote)
+
+    detector = asyncio.run(analyzer._get_behavior_detector("u-remote"))
+    assert detector.total == 6
+    assert detector.stats[BehaviorType.SUPPLEMENT_USAGE].count == 1
+    assert detector.newest == now
+
+
+def test_simulated_history_is_stable_across_catch_ups():
+    analyzer = BehaviorPatternAnalyzer()
+
+    first = asyncio.run(analyzer._get_user_conversation_data("u-sim"))
+    again = asyncio.run(analyzer._get_user_conversation_data("u-sim"))
+    assert 45 <= len(first) <= 51
+    assert [(e.id, e.timestamp, e.content) for e in first] == [
+        (e.id, e.timestamp, e.content) for e in again
+    ]
+
+    detector = asyncio.run(analyzer._get_behavior_detector("u-sim"))
+    total = detector.total
+    for _ in range(3):
+        detector = asyncio.run(analyzer._get_behavior_detector("u-sim"))
+    assert detector.total == total
@@ -0,0 +1,121 @@
+"""
+Pruebas para el controlador adaptativo de caché (TTL + prefetch).
+"""
+
+from datetime import datetime
+
+import pytest
+
+from core.advanced_cache_manager import AdvancedCacheManager
+from core.cache_controller import (
+    AccessEventFeed,
+    AdaptiveTTLPolicy,
+    CacheController,
+    replay_access_trace,
+)
+
+
+def _periodic_trace(keys=20, period=7200.0, accesses=15):
+    return [
+        (f"user_profile:{k}", k * 60.0 + i * period, False, None)
+        for k in range(keys)
+        for i in range(accesses)
+    ]
+
+
+def test_feed_is_bounded_and_samples_whole_keys():
+    """Test que el feed descarta lo más antiguo y muestrea por key."""
+    feed = AccessEventFeed(capacity=10, sample_rate=0.5)
+    for i in range(1000):
+        feed.record(f"key:{i % 50}", hit=False, timestamp=float(i))
+
+    assert len(feed) == 10
+    sampled = {key for key, _, _, _ in feed.drain()}
+    assert all(feed.is_sampled(key) for key in sampled)
+    assert 0 < sum(feed.is_sampled(f"key:{i}") for i in range(50)) < 50
+    assert feed.stats["dropped"] > 0
+
+
+def test_policy_falls_back_to_family_ttl():
+    """Test que las keys sin TTL propio heredan la mediana de su familia."""
+    policy = AdaptiveTTLPolicy(max_keys=3)
+    for i, ttl in enumerate((100, 200, 300, 400)):
+        policy.update(f"user_profile:{i}", ttl)
+    policy.recompute_families()
+
+    assert policy("user_profile:0") == 300  # desalojada: usa la familia
+    assert policy("user_profile:3") == 400
+    assert policy("other:1") is None
+
+
+@pytest.mark.asyncio
+async def test_cycle_adjusts_ttl_and_prefetches_within_budget():
+    """Test de un ciclo: TTL ajustado en el caché y prefetch acotado por coste."""
+    cache = AdvancedCacheManager()
+    controller = CacheController(
+        feed=AccessEventFeed(sample_rate=1.0), prefetch_cost_budget=2.0
+    )
+    controller.attach("advanced", cache)
+    loaded = []
+
+    async def loader(key):
+        loaded.append(key)
+        return {"key": key}
+
+    controller.register_loader("user_profile:", loader, cost=1.0)
+    for key, ts, hit, _ in _periodic_trace(keys=5, period=600.0):
+        controller.feed.record(key, hit, "advanced", timestamp=ts)
+
+    last_access = max(ts for _, ts, _, _ in _periodic_trace(keys=5, period=600.0))
+    result = await controller.run_cycle(now=datetime.utcfromtimestamp(last_access))
+
+    assert result["ttl_updates"] == 5
+    assert cache.ttl_advisor("user_profile:0") == 720  # p90(600 s) * 1.2
+    assert result["prefetched"] == 2 and len(loaded) == 2
+    assert await cache.get(loaded[0]) == {"key": loaded[0]}
+
+
+@pytest.mark.asyncio
+async def test_replay_improves_hit_rate_over_short_static_ttl():
+    """Test que la reproducción offline mide la ganancia frente a TTL estático."""
+    result = await replay_access_trace(_periodic_trace(), static_ttl=3600)
+
+    assert result["events"] == 300
+    assert result["static"]["hit_rate"] == 0.0
+    assert result["adaptive"]["hit_rate"] > 0.4
+    assert result["hit_rate_gain"] == pytest.approx(
+        result["adaptive"]["hit_rate"] - result["static"]["hit_rate"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefetch_refreshes_only_the_owning_cache():
+    """Test que la precarga lee de las capas inferiores y escribe solo en el caché propietario."""
+    advanced, vertex = AdvancedCacheManager(), AdvancedCacheManager()
+    controller = CacheController(feed=AccessEventFeed(sample_rate=1.0))
+    controller.attach("advanced", advanced)
+    controller.attach("vertex_ai", vertex, prefixes=("vertex:",))
+    controller.register_loader("", advanced.load_backing_value)
+    controller.register_loader("vertex:", vertex.load_backing_value)
+    assert controller.owner_of("vertex:generate_content:ab") == "vertex_ai"
+    assert controller.owner_of("user_profile:1") == "advanced"
+
+    trace = _periodic_trace(keys=2, period=600.0) + [
+        (f"vertex:generate_content:{k}", k * 60.0 + i * 600.0, False, None)
+        for k in range(2)
+        for i in range(15)
+    ]
+    for key, ts, hit, _ in trace:
+        owner = vertex if key.startswith("vertex:") else advanced
+        await owner.set(key, {"key": key})
+        await owner.l1_cache.delete(key)
+        controller.feed.record(key, hit, "test", timestamp=ts)
+
+    last_access = max(ts for _, ts, _, _ in trace)
+    result = await controller.run_cycle(now=datetime.utcfromtimestamp(last_access))
+
+    assert result["prefetched"] == 4
+    assert await advanced.l1_cache.get("user_profile:0")
+    assert await vertex.l1_cache.get("vertex:generate_content:0")
+    assert not await advanced.l1_cache.get("vertex:generate_content:0")
+    assert not await vertex.l1_cache.get("user_profile:0")
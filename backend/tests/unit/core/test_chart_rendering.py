@@ -0,0 +1,117 @@
+"""
+Pruebas del servicio de renderizado de gráficos fuera del event loop.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from core.chart_rendering import ChartRenderService, spec_hash
+
+PNG_MAGIC = b"\x89PNG"
+
+CURRENT = {"weight": 80.0, "body_fat": 18.0}
+PREVIOUS = {"weight": 82.0, "body_fat": 19.5}
+
+
+class MemoryStore:
+    """Almacén de segundo nivel en memoria con la interfaz de GCSChartStore."""
+
+    def __init__(self):
+        self.objects = {}
+        self.gets = 0
+
+    def url(self, key, content_type):
+        return f"https://cdn.test/charts/{key}.png"
+
+    async def get(self, key, content_type):
+        self.gets += 1
+        return self.objects.get(key)
+
+    async def put(self, key, content_type, content):
+        self.objects[key] = content
+        return self.url(key, content_type)
+
+
+def test_spec_hash_is_stable_and_content_sensitive():
+    a = spec_hash("comparison", ({"b": 1, "a": 2}, {"x": 1.0}, "month"))
+    b = spec_hash("comparison", ({"a": 2, "b": 1}, {"x": 1.0}, "month"))
+    assert a == b
+    assert a != spec_hash("comparison", ({"a": 2, "b": 1}, {"x": 1.5}, "month"))
+    assert a != spec_hash("weight_progress", ({"a": 2, "b": 1}, {"x": 1.0}, "month"))
+    # Los bytes (p. ej. imágenes de un collage) se identifican por su hash
+    assert spec_hash("progress_collage", ([b"img"],)) != spec_hash("progress_collage", ([b"img2"],))
+
+
+def test_identical_requests_render_once_and_are_cached():
+    async def scenario():
+        service = ChartRenderService(workers=0)
+        charts = await asyncio.gather(
+            *(service.render("comparison", CURRENT, PREVIOUS, "month") for _ in range(5))
+        )
+        again = await service.render("comparison", dict(CURRENT), dict(PREVIOUS), "month")
+        await service.shutdown()
+        return service, charts, again
+
+    service, charts, again = asyncio.run(scenario())
+
+    assert charts[0].content.startswith(PNG_MAGIC)
+    assert all(c.content_hash == charts[0].content_hash for c in charts)
+    assert again.source == "memory" and again.content == charts[0].content
+    stats = service.get_stats()
+    assert stats["renders"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["memory_hits"] == 1
+    assert stats["inflight"] == 0 and stats["cached_blobs"] == 1
+
+
+def test_store_tier_serves_other_instances_without_rendering():
+    store = MemoryStore()
+
+    async def scenario():
+        first = ChartRenderService(workers=0, store=store)
+        rendered = await first.render("comparison", CURRENT, PREVIOUS, "week")
+        await first.shutdown()  # espera a la subida en segundo plano
+
+        second = ChartRenderService(workers=0, store=store)
+        fetched = await second.render("comparison", CURRENT, PREVIOUS, "week")
+        return rendered, fetched, second.get_stats()
+
+    rendered, fetched, stats = asyncio.run(scenario())
+
+    assert rendered.source == "render" and rendered.url.endswith(f"{rendered.spec_hash}.png")
+    assert fetched.source == "store" and fetched.content == rendered.content
+    assert stats["renders"] == 0 and stats["store_hits"] == 1
+    with pytest.raises(ValueError):
+        asyncio.run(ChartRenderService(workers=0).render("unknown_chart"))
+
+
+def test_process_pool_keeps_event_loop_responsive():
+    async def scenario():
+        service = ChartRenderService(workers=1)
+        await service.start()
+
+        lags = []
+
+        async def ticker():
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        tick = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        chart = await service.render("comparison", CURRENT, PREVIOUS, "quarter")
+        elapsed = time.perf_counter() - started
+        tick.cancel()
+        await service.shutdown()
+        return chart, elapsed, lags
+
+    chart, elapsed, lags = asyncio.run(scenario())
+
+    assert chart.content.startswith(PNG_MAGIC)
+    # El render tarda cientos de ms pero el loop sigue atendiendo otras tareas
+    assert elapsed > 0.1
+    assert len(lags) >= 5
+    assert max(lags) < 0.1
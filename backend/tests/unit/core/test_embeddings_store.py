@@ -0,0 +1,102 @@
+"""
+Pruebas del almacén de embeddings en matriz y de sus snapshots.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from core.embeddings_store import EmbeddingStore, load_concurrently
+
+
+def make_store(count=50, dimension=8, seed=0):
+    rng = np.random.default_rng(seed)
+    store = EmbeddingStore()
+    for i in range(count):
+        store[f"k{i}"] = {
+            "text": f"texto {i}",
+            "embedding": rng.normal(size=dimension).tolist(),
+            "metadata": {"i": i},
+            "timestamp": float(i),
+        }
+    return store
+
+
+def brute_force(store, query, top_k, threshold):
+    q = np.asarray(query)
+    scored = []
+    for key in store:
+        v = np.asarray(store[key]["embedding"])
+        scored.append((key, float(v @ q / (np.linalg.norm(v) * np.linalg.norm(q)))))
+    scored = [item for item in scored if item[1] >= threshold]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:top_k]
+
+
+def test_search_matches_brute_force():
+    store = make_store()
+    query = np.random.default_rng(1).normal(size=8).tolist()
+    result = store.search(query, top_k=5, threshold=-1.0)
+    expected = brute_force(store, query, 5, -1.0)
+    assert [key for key, _ in result] == [key for key, _ in expected]
+    assert np.allclose([s for _, s in result], [s for _, s in expected], atol=1e-5)
+
+    with pytest.raises(ValueError):
+        store["bad"] = {"text": "", "embedding": [1.0, 2.0], "metadata": {}, "timestamp": 0}
+
+
+def test_snapshot_roundtrip_is_mmapped_and_accepts_updates(tmp_path):
+    store = make_store()
+    store.watermark = "2025-01-01T00:00:00"
+    store.write_snapshot(str(tmp_path))
+
+    loaded = EmbeddingStore.from_snapshot(str(tmp_path))
+    assert loaded.stats()["base_mmapped"]
+    assert len(loaded) == 50
+    assert loaded.watermark == "2025-01-01T00:00:00"
+    assert loaded["k3"]["metadata"] == {"i": 3}
+    assert np.allclose(loaded["k3"]["embedding"], store["k3"]["embedding"])
+
+    # Reescribir y borrar claves de la base deja tumbas y un delta
+    loaded["k0"] = {"text": "nuevo", "embedding": [1.0] * 8, "metadata": {}, "timestamp": 99.0}
+    del loaded["k1"]
+    loaded["k50"] = {"text": "extra", "embedding": [0.5] * 4 + [-0.5] * 4, "metadata": {}, "timestamp": 100.0}
+    assert len(loaded) == 50
+    assert "k1" not in loaded and loaded["k0"]["text"] == "nuevo"
+    assert loaded.stats()["tombstones"] == 2
+
+    query = [1.0] * 8
+    result = loaded.search(query, top_k=5, threshold=-1.0)
+    expected = brute_force(loaded, query, 5, -1.0)
+    assert result[0][0] == "k0"
+    assert [key for key, _ in result] == [key for key, _ in expected]
+    assert np.allclose([s for _, s in result], [s for _, s in expected], atol=1e-5)
+
+    # Compactar en un snapshot nuevo
+    loaded.write_snapshot(str(tmp_path), name="compacted")
+    compacted = EmbeddingStore.from_snapshot(str(tmp_path), name="compacted", mmap=False)
+    assert sorted(compacted) == sorted(loaded)
+    assert compacted.stats()["tombstones"] == 0
+
+
+@pytest.mark.asyncio
+async def test_load_concurrently_is_bounded():
+    active = 0
+    peak = 0
+
+    async def fetch(name):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001)
+        active -= 1
+        if name == "bad":
+            raise IOError("boom")
+        return name.upper()
+
+    names = [f"blob{i}" for i in range(40)] + ["bad"]
+    loaded, failed = await load_concurrently(names, fetch, concurrency=4)
+    assert peak == 4
+    assert failed == ["bad"]
+    assert loaded["blob7"] == "BLOB7" and len(loaded) == 40
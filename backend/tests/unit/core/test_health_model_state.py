@@ -0,0 +1,233 @@
+"""
+Pruebas del estado incremental de los modelos de trayectoria de salud.
+"""
+
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from core.health_model_state import HoltState, MetricState
+from core.predictive_health_engine import (
+    AdherencePredictor,
+    HealthDataPoint,
+    HealthMetricType,
+    PredictiveHealthEngine,
+    WeightTrajectoryPredictor,
+)
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def make_points(metric, values, step_days=1, user_id="u1", start=START):
+    return [
+        HealthDataPoint(
+            user_id=user_id,
+            metric_type=metric,
+            value=value,
+            timestamp=start + timedelta(days=i * step_days, hours=i % 3),
+            confidence=0.9,
+            source="test",
+            metadata={},
+            id=str(uuid.uuid4()),
+            ingested_at=start + timedelta(days=i * step_days, hours=i % 3),
+        )
+        for i, value in enumerate(values)
+    ]
+
+
+def weekly_reference(points):
+    """Agrupación semanal y tendencia como las calculaba el predictor antes."""
+    weekly, current, week_start = [], [], points[0].timestamp.replace(hour=0)
+    for dp in points:
+        day = dp.timestamp.replace(hour=0)
+        if (day - week_start).days < 7:
+            current.append(dp.value)
+        else:
+            weekly.append(np.mean(current))
+            current, week_start = [dp.value], day
+    weekly.append(np.mean(current))
+    older = weekly[:-2] if len(weekly) > 2 else weekly[:1]
+    return weekly[-1], np.mean(weekly[-2:]) - np.mean(older)
+
+
+def test_regression_matches_refit_over_sliding_window():
+    rng = random.Random(5)
+    values = [80 - 0.05 * i + rng.gauss(0, 0.3) for i in range(150)]
+    points = make_points(HealthMetricType.WEIGHT, values)
+
+    state = MetricState()
+    for point in points:
+        state.observe(point)
+
+    # Solo quedan los puntos de los últimos 90 días
+    cutoff = points[-1].timestamp - timedelta(days=90)
+    window = [p for p in points if p.timestamp >= cutoff]
+    assert state.window_size == len(window)
+
+    x = np.array([(p.timestamp - START).days for p in window], dtype=float)
+    y = np.array([p.value for p in window])
+    slope, intercept = np.polyfit(x, y, 1)
+    residuals = y - (slope * x + intercept)
+
+    assert state.regression.fit() == pytest.approx((slope, intercept))
+    assert state.regression.r_squared() == pytest.approx(1 - np.var(residuals) / np.var(y))
+
+    trajectory = WeightTrajectoryPredictor().predict_from_state(state)
+    assert trajectory.trend_direction == "stable"  # -0.05 kg/día
+    assert trajectory.current_value == values[-1]
+    assert trajectory.predicted_values[0][1] == pytest.approx(slope * (x[-1] + 1) + intercept)
+
+
+@pytest.mark.parametrize("count", [14, 20, 60])
+def test_weekly_means_match_previous_grouping(count):
+    rng = random.Random(count)
+    points = make_points(
+        HealthMetricType.ADHERENCE_RATE, [rng.uniform(0.4, 1.0) for _ in range(count)]
+    )
+    state = MetricState()
+    for point in points:
+        state.observe(point)
+
+    current, trend = weekly_reference(points)
+    assert state.weekly.current == pytest.approx(current)
+    assert state.weekly.recent_trend() == pytest.approx(trend)
+
+    # predict() sobre la lista da lo mismo que el estado incremental
+    from_list = asyncio.run(AdherencePredictor().predict(points))
+    from_state = AdherencePredictor().predict_from_state(state)
+    assert from_list.current_value == pytest.approx(from_state.current_value)
+    assert from_list.risk_level == from_state.risk_level
+
+
+def test_holt_recovers_linear_trend_with_irregular_spacing():
+    holt = HoltState()
+    rng = random.Random(2)
+    day = 0.0
+    for _ in range(200):
+        day += rng.choice([0.5, 1, 2, 3])
+        holt.add(START + timedelta(days=day), 5 + 0.1 * day)
+    assert holt.trend == pytest.approx(0.1, rel=0.01)
+    assert holt.forecast(10) == pytest.approx(5 + 0.1 * (day + 10), abs=0.05)
+
+
+def test_engine_reads_history_once_and_folds_new_points(monkeypatch):
+    engine = PredictiveHealthEngine()
+    history = make_points(
+        HealthMetricType.WEIGHT,
+        [80 - 0.1 * i for i in range(30)],
+        step_days=2,
+        start=datetime.utcnow() - timedelta(days=61),
+    )
+    fetches = []
+
+    async def fake_history(user_id, metric_type, days_back=90, ingested_since=None):
+        fetches.append((user_id, metric_type, ingested_since))
+        return [p for p in history if ingested_since is None or p.ingested_at >= ingested_since]
+
+    monkeypatch.setattr(engine, "_get_historical_data", fake_history)
+
+    first = asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+    assert first.current_value == pytest.approx(history[-1].value)
+
+    asyncio.run(engine.store_health_data("u1", HealthMetricType.WEIGHT, 60.0))
+    second = asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+
+    state = engine.model_states.get("u1", HealthMetricType.WEIGHT)
+    assert second.current_value == 60.0
+    assert state.count == 31
+    # Tras la carga inicial solo se pide lo ingerido desde la última lectura;
+    # el punto guardado por este proceso no mueve el cursor
+    assert fetches == [
+        ("u1", HealthMetricType.WEIGHT, None),
+        ("u1", HealthMetricType.WEIGHT, history[-1].ingested_at),
+    ]
+
+    # Métricas sin historial cargado no se crean al almacenar
+    asyncio.run(engine.store_health_data("u2", HealthMetricType.WEIGHT, 70.0))
+    assert not engine.model_states.has("u2", HealthMetricType.WEIGHT)
+
+
+def test_engine_catches_up_on_points_stored_by_other_processes(monkeypatch):
+    engine = PredictiveHealthEngine()
+    start = datetime.utcnow() - timedelta(days=61)
+    history = make_points(
+        HealthMetricType.WEIGHT, [80 - 0.1 * i for i in range(30)], step_days=2, start=start
+    )
+
+    async def fake_history(user_id, metric_type, days_back=90, ingested_since=None):
+        return [p for p in history if ingested_since is None or p.ingested_at >= ingested_since]
+
+    monkeypatch.setattr(engine, "_get_historical_data", fake_history)
+
+    asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+
+    # Guardados por otro worker; store_health_data de este proceso no los ve
+    history.extend(
+        make_points(
+            HealthMetricType.WEIGHT, [70.0, 69.5], start=history[-1].timestamp + timedelta(days=1)
+        )
+    )
+    trajectory = asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+
+    state = engine.model_states.get("u1", HealthMetricType.WEIGHT)
+    assert state.count == 32
+    assert state.last_timestamp == history[-1].timestamp
+    assert trajectory.current_value == 69.5
+
+    # Una segunda consulta no vuelve a sumar los mismos puntos
+    asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+    assert state.count == 32
+
+
+def test_engine_catches_up_on_backdated_points_and_its_own_writes(monkeypatch):
+    engine = PredictiveHealthEngine()
+    now = datetime.utcnow()
+    history = make_points(
+        HealthMetricType.WEIGHT,
+        [80 - 0.1 * i for i in range(30)],
+        step_days=2,
+        start=now - timedelta(days=61),
+    )
+
+    async def fake_history(user_id, metric_type, days_back=90, ingested_since=None):
+        return [p for p in history if ingested_since is None or p.ingested_at >= ingested_since]
+
+    monkeypatch.setattr(engine, "_get_historical_data", fake_history)
+    asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+
+    # Un punto guardado aquí llega también en la lectura del almacenamiento
+    own_id = asyncio.run(engine.store_health_data("u1", HealthMetricType.WEIGHT, 71.0))
+    state = engine.model_states.get("u1", HealthMetricType.WEIGHT)
+    own = make_points(HealthMetricType.WEIGHT, [71.0], start=state.last_timestamp)[0]
+    own.id = own_id
+    # Otro worker guarda después una medición con fecha de hace diez días
+    backdated = make_points(HealthMetricType.WEIGHT, [72.0], start=now - timedelta(days=10))[0]
+    backdated.ingested_at = datetime.utcnow()
+    history.extend([own, backdated])
+
+    asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+    assert state.count == 32
+    assert state.ingested_until == backdated.ingested_at
+
+    asyncio.run(engine.generate_health_trajectory("u1", HealthMetricType.WEIGHT))
+    assert state.count == 32
+
+
+def test_simulated_history_is_stable_across_catch_ups():
+    engine = PredictiveHealthEngine()
+
+    first = asyncio.run(engine._get_historical_data("u-sim", HealthMetricType.WEIGHT))
+    again = asyncio.run(engine._get_historical_data("u-sim", HealthMetricType.WEIGHT))
+    assert [(p.id, p.timestamp, p.value) for p in first] == [
+        (p.id, p.timestamp, p.value) for p in again
+    ]
+
+    state = asyncio.run(engine._get_model_state("u-sim", HealthMetricType.WEIGHT))
+    count = state.count
+    for _ in range(3):
+        asyncio.run(engine._get_model_state("u-sim", HealthMetricType.WEIGHT))
+    assert state.count == count
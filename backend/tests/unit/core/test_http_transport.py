@@ -0,0 +1,103 @@
+"""
+Pruebas para el transporte HTTP compartido (reintentos, hedging, latencias).
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from core.http_transport import (
+    HostPolicy,
+    HTTPTransport,
+    LatencyHistogram,
+    RetryPolicy,
+    upstream_of,
+)
+
+FAST_RETRY = RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.002)
+
+
+def _transport(handler, **policy):
+    return HTTPTransport(
+        default_policy=HostPolicy(retry=FAST_RETRY, **policy),
+        transport_factory=lambda upstream, _: httpx.MockTransport(handler),
+    )
+
+
+def test_histogram_percentiles_and_upstream_key():
+    histogram = LatencyHistogram()
+    for latency in range(1, 101):
+        histogram.observe(float(latency))
+
+    assert histogram.count == 100
+    assert 40 <= histogram.percentile(50) <= 60
+    assert 90 <= histogram.percentile(95) <= 100
+    assert upstream_of("https://api.x.com/v1/a?b=1") == "https://api.x.com:443"
+
+
+@pytest.mark.asyncio
+async def test_idempotent_requests_retry_and_posts_do_not():
+    """Test que los GET se reintentan ante 503 y los POST no."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    transport = _transport(handler, hedge=False)
+    response = await transport.get("http://svc.local/data")
+    assert response.status_code == 200 and calls == ["GET"] * 3
+
+    calls.clear()
+    response = await transport.post("http://svc.local/data", json={})
+    assert response.status_code == 503 and calls == ["POST"]
+
+    stats = transport.get_stats()["upstreams"]["http://svc.local:80"]
+    assert stats["retries"] == 2 and stats["requests"] == 4
+    assert stats["latency"]["count"] == 4
+    await transport.aclose()
+
+
+@pytest.mark.asyncio
+async def test_slow_get_is_hedged_and_fastest_response_wins():
+    """Test que un GET lento lanza un hedge y devuelve la respuesta más rápida."""
+    attempts = 0
+
+    async def handler(request):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            await asyncio.sleep(1.0)
+            return httpx.Response(200, json={"from": "primary"})
+        return httpx.Response(200, json={"from": "hedge"})
+
+    transport = _transport(handler, hedge_delay=0.02)
+    response = await transport.get("http://svc.local/slow")
+
+    assert response.json() == {"from": "hedge"}
+    stats = transport.get_stats()["upstreams"]["http://svc.local:80"]
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    await transport.aclose()
+
+
+@pytest.mark.asyncio
+async def test_configure_host_applies_pool_policy_per_upstream():
+    created = {}
+
+    def factory(upstream, policy):
+        created[upstream] = policy
+        return httpx.MockTransport(lambda request: httpx.Response(204))
+
+    transport = HTTPTransport(transport_factory=factory)
+    transport.configure_host("http://crm.local", max_connections=3, hedge=False)
+    await transport.get("http://crm.local/a")
+    await transport.get("http://crm.local/b")
+    await transport.get("http://pulse.local/a")
+
+    assert created["http://crm.local:80"].max_connections == 3
+    assert created["http://pulse.local:80"].max_connections == HostPolicy().max_connections
+    assert len(created) == 2  # un cliente (pool) por upstream
+    await transport.aclose()
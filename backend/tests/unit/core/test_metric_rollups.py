@@ -0,0 +1,146 @@
+"""
+Pruebas de los rollups de métricas (SQLite como sustituto local de Postgres).
+"""
+
+import asyncio
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from agents.progress_tracker.services.progress_data_service import ProgressDataService
+from core.metric_rollups import (
+    MetricRollupService,
+    RollupSeries,
+    SQLiteRollupBackend,
+    bucket_for_days,
+    rollup_values,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def year_of_weights():
+    rng = np.random.default_rng(7)
+    start = date(2024, 1, 1)
+    days = [start + timedelta(days=i) for i in range(366)]
+    weights = np.round(85 - np.arange(366) * 0.02 + rng.normal(0, 0.4, 366), 2)
+    return days, weights
+
+
+@pytest.fixture
+def sqlite_backend(year_of_weights):
+    days, weights = year_of_weights
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE weight_logs (user_id TEXT, date TEXT, weight REAL)")
+    connection.execute(
+        "CREATE TABLE performance_logs (user_id TEXT, date TEXT, metric_type TEXT, squat REAL)"
+    )
+    connection.executemany(
+        "INSERT INTO weight_logs VALUES (?, ?, ?)",
+        [("u1", d.isoformat(), float(w)) for d, w in zip(days, weights)]
+        + [("u2", d.isoformat(), 60.0) for d in days[:10]],
+    )
+    connection.executemany(
+        "INSERT INTO performance_logs VALUES (?, ?, ?, ?)",
+        [
+            ("u1", "2024-03-04", "strength", 100.0),
+            ("u1", "2024-03-06", "strength", 110.0),
+            ("u1", "2024-03-06", "endurance", 999.0),
+        ],
+    )
+    return SQLiteRollupBackend(connection)
+
+
+def test_sqlite_rollup_matches_numpy_and_is_columnar(sqlite_backend, year_of_weights):
+    days, weights = year_of_weights
+    service = MetricRollupService(sqlite_backend)
+
+    series = run(service.rollup("u1", "weight_logs", ("weight",), bucket_for_days(365)))
+
+    # Un año de registros diarios se reduce a un punto por semana ISO (lunes)
+    assert series.bucket == "week"
+    assert len(series) == 53
+    assert series.starts[0] == "2024-01-01" and series.starts[-1] == "2024-12-30"
+    assert sum(series.column("weight", "n")) == 366
+
+    expected = RollupSeries.from_rows("week", ["weight"], rollup_values(days, {"weight": weights}))
+    for stat in ("n", "min", "max", "avg", "p25", "p50", "p90"):
+        assert series.column("weight", stat) == pytest.approx(expected.column("weight", stat))
+
+    first_week = weights[:7]
+    assert series.column("weight", "p50")[0] == pytest.approx(np.median(first_week))
+
+    chart = series.chart_data()
+    assert list(chart) == ["date", "weight"]
+    assert len(chart["date"]) == len(chart["weight"]) == 53
+
+    # Filtros de igualdad, rango de fechas y métricas inexistentes
+    strength = run(
+        service.rollup(
+            "u1",
+            "performance_logs",
+            ("squat", "bench_press"),
+            "month",
+            start_date=date(2024, 3, 1),
+            filters={"metric_type": "strength"},
+        )
+    )
+    assert strength.starts == ["2024-03-01"]
+    assert list(strength.metrics) == ["squat"]
+    assert strength.column("squat", "max") == [110.0]
+
+    with pytest.raises(ValueError):
+        run(service.rollup("u1", "users", ("weight",)))
+    with pytest.raises(ValueError):
+        run(service.rollup("u1", "weight_logs", ("weight; DROP TABLE x",)))
+
+
+def test_rollup_cache_is_per_user_and_invalidated_on_new_data(sqlite_backend):
+    service = MetricRollupService(sqlite_backend)
+    start = datetime(2024, 1, 1, 8, 30)
+
+    first = run(service.rollup("u1", "weight_logs", ("weight",), "month", start))
+    # Misma consulta con otra hora del mismo día: se sirve desde caché
+    again = run(service.rollup("u1", "weight_logs", ("weight",), "month", start + timedelta(hours=3)))
+    assert again is first
+    assert service.stats["hits"] == 1
+
+    other = run(service.rollup("u2", "weight_logs", ("weight",), "month", start))
+    assert other.column("weight", "n") == [10]
+
+    sqlite_backend.connection.execute(
+        "INSERT INTO weight_logs VALUES ('u1', '2024-12-31', 40.0)"
+    )
+    service.invalidate("u1", "weight_logs")
+    refreshed = run(service.rollup("u1", "weight_logs", ("weight",), "month", start))
+    assert refreshed.column("weight", "min")[-1] == 40.0
+    assert refreshed.column("weight", "n")[-1] == first.column("weight", "n")[-1] + 1
+
+    # u2 no se ve afectado por la invalidación de u1
+    assert run(service.rollup("u2", "weight_logs", ("weight",), "month", start)) is other
+    assert service.get_stats()["misses"] == 3
+
+
+def test_progress_data_service_rollup_and_invalidation():
+    service = ProgressDataService()
+    for weight in (80.0, 82.0):
+        service.store_progress_data("u1", "weight", {"weight": weight})
+
+    series = service.rollup_progress_data("u1", "weight", ["weight"], bucket="day")
+    assert series.column("weight", "n") == [2]
+    assert series.column("weight", "avg") == [81.0]
+    assert service.rollup_progress_data("u1", "weight", ["weight"], bucket="day") is series
+
+    service.retrieve_progress_data("u1", data_type="weight")
+    service.store_progress_data("u1", "weight", {"weight": 84.0})
+
+    # Los datos nuevos invalidan tanto los rollups como las consultas cacheadas
+    assert service.rollup_progress_data("u1", "weight", ["weight"], bucket="day").column(
+        "weight", "avg"
+    ) == [82.0]
+    assert len(service.retrieve_progress_data("u1", data_type="weight")) == 3
@@ -0,0 +1,150 @@
+"""
+Pruebas del grafo de construcción de recomendaciones.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from core.recommendation_graph import (
+    CONVERSATION_DATA,
+    HEALTH_DATA,
+    DataVersions,
+    GraphNode,
+    RecommendationGraph,
+)
+
+
+class Counter:
+    def __init__(self):
+        self.calls = {}
+
+    def node(self, name, result=None, delay=0.0):
+        async def compute(user_id, **deps):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            await asyncio.sleep(delay)
+            return result(user_id, deps) if result else (name, self.calls[name])
+
+        return compute
+
+
+def build_graph(counter, versions, clock=time.monotonic, delay=0.0):
+    return RecommendationGraph(
+        [
+            GraphNode("risk_assessment", counter.node("risk", delay=delay), sources=(HEALTH_DATA,)),
+            GraphNode("segment", counter.node("segment", delay=delay), sources=(CONVERSATION_DATA,)),
+            GraphNode(
+                "generator:workout",
+                counter.node("workout", delay=delay),
+                deps=("risk_assessment", "segment"),
+                ttl=3600,
+            ),
+            GraphNode("generator:nutrition", counter.node("nutrition", delay=delay), deps=("segment",)),
+            GraphNode(
+                "recommendation_set",
+                counter.node("set", result=lambda user_id, deps: sorted(deps)),
+                deps=("risk_assessment", "segment", "generator:workout", "generator:nutrition"),
+            ),
+        ],
+        versions=versions,
+        clock=clock,
+    )
+
+
+def test_independent_nodes_run_concurrently():
+    counter = Counter()
+    graph = build_graph(counter, DataVersions(), delay=0.05)
+
+    started = time.perf_counter()
+    values = asyncio.run(graph.evaluate("u1", ["recommendation_set"]))
+    elapsed = time.perf_counter() - started
+
+    # Dos niveles de 50 ms (entradas y generadores), no cuatro nodos en serie
+    assert elapsed < 0.18
+    assert values["recommendation_set"] == [
+        "generator:nutrition",
+        "generator:workout",
+        "risk_assessment",
+        "segment",
+    ]
+    assert graph.get_stats()["computed"] == 5
+
+
+def test_only_nodes_with_changed_inputs_are_recomputed():
+    counter = Counter()
+    versions = DataVersions()
+    graph = build_graph(counter, versions)
+
+    first = asyncio.run(graph.evaluate("u1"))
+    second = asyncio.run(graph.evaluate("u1"))
+    assert second == first
+    assert counter.calls == {"risk": 1, "segment": 1, "workout": 1, "nutrition": 1, "set": 1}
+
+    # Datos de salud: riesgo y generadores que lo leen, no el segmento ni nutrición
+    versions.bump("u1", HEALTH_DATA)
+    asyncio.run(graph.evaluate("u1"))
+    assert counter.calls == {"risk": 2, "segment": 1, "workout": 2, "nutrition": 1, "set": 2}
+
+    # Conversación nueva: segmento y todo lo que depende de él
+    versions.bump("u1", CONVERSATION_DATA)
+    asyncio.run(graph.evaluate("u1"))
+    assert counter.calls == {"risk": 2, "segment": 2, "workout": 3, "nutrition": 2, "set": 3}
+
+    # Otro usuario no se ve afectado por los avisos de u1
+    asyncio.run(graph.evaluate("u2"))
+    versions.bump("u1", HEALTH_DATA)
+    asyncio.run(graph.evaluate("u2"))
+    assert counter.calls["risk"] == 3
+
+
+def test_ttl_and_explicit_invalidation_force_recompute():
+    counter = Counter()
+    now = [0.0]
+    graph = build_graph(counter, DataVersions(), clock=lambda: now[0])
+
+    asyncio.run(graph.evaluate("u1"))
+    now[0] = 3601.0
+    asyncio.run(graph.evaluate("u1"))
+    # Solo el generador con TTL caducó; el conjunto lo recoge
+    assert counter.calls["workout"] == 2 and counter.calls["risk"] == 1
+    assert counter.calls["set"] == 2
+
+    graph.invalidate("u1", "segment")
+    asyncio.run(graph.evaluate("u1"))
+    assert counter.calls["segment"] == 2 and counter.calls["nutrition"] == 2
+
+
+def test_invalid_graphs_are_rejected():
+    async def noop(user_id, **deps):
+        return None
+
+    with pytest.raises(ValueError):
+        RecommendationGraph([GraphNode("a", noop, deps=("missing",))])
+    with pytest.raises(ValueError):
+        RecommendationGraph([GraphNode("a", noop, deps=("b",)), GraphNode("b", noop, deps=("a",))])
+
+
+def test_failed_node_cancels_and_awaits_siblings():
+    finished = []
+
+    async def failing(user_id):
+        raise RuntimeError("boom")
+
+    async def slow(user_id):
+        await asyncio.sleep(0.2)
+        finished.append("slow")
+
+    graph = RecommendationGraph(
+        [GraphNode("a", failing), GraphNode("b", slow)], versions=DataVersions()
+    )
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await graph.evaluate("u1")
+        leftover = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.sleep(0.25)
+        return leftover
+
+    assert asyncio.run(run()) == []
+    assert finished == []
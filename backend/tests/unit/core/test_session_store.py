@@ -0,0 +1,192 @@
+"""
+Pruebas para el RedisSessionStore y su integración en el SessionManager.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from core.session_manager import SessionManager, SessionStatus  # noqa: E402
+from core.session_store import RedisSessionStore  # noqa: E402
+
+
+@pytest.fixture
+def store():
+    return RedisSessionStore(redis_client=fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture
+def manager(store):
+    manager = SessionManager(max_sessions_per_user=2)
+    manager.store = store
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_create_indexes_and_evicts_least_recent(manager, store):
+    """Test que el límite por usuario desaloja la sesión menos reciente."""
+    first = await manager.create_session("user-1", "phone")
+    second = await manager.create_session("user-1", "web")
+    await manager.update_session_activity(first.session_id, agent_id="nova")
+    third = await manager.create_session("user-1", "tablet")
+
+    sessions = await manager.get_user_sessions("user-1")
+    assert [s.session_id for s in sessions] == [third.session_id, first.session_id]
+    assert await manager.get_session(second.session_id) is None
+
+
+@pytest.mark.asyncio
+async def test_activity_updates_only_changed_fields(manager, store):
+    """Test que la actividad escribe campos sueltos sin reescribir la sesión."""
+    session = await manager.create_session(
+        "user-1", "phone", initial_context={"goal": "fuerza"}
+    )
+    await manager.update_session_activity(
+        session.session_id, agent_id="blaze", context_update={"mood": "bien"}
+    )
+    await manager.update_session_activity(session.session_id, agent_id="blaze")
+
+    stored = await manager.get_session(session.session_id)
+    assert stored.total_interactions == 2
+    assert stored.context.conversation_flow == ["blaze"]
+    assert stored.context.active_agent_id == "blaze"
+    assert stored.context.session_metadata == {"goal": "fuerza", "mood": "bien"}
+    assert await manager.update_session_activity("missing") is False
+
+
+@pytest.mark.asyncio
+async def test_hash_expires_with_session(store):
+    """Test que el hash usa EXPIREAT en expires_at."""
+    now = datetime.utcnow()
+    await store.create(
+        "s1",
+        {"user_id": "u", "device_id": "d"},
+        last_activity=now,
+        expires_at=now + timedelta(seconds=120),
+        max_sessions=5,
+        index_retention=3600,
+    )
+    ttl = await store._redis.ttl(store.session_key("s1"))
+    assert 100 < ttl <= 120
+
+
+@pytest.mark.asyncio
+async def test_pause_resume_end_and_sync(manager):
+    """Test de transiciones de estado y sincronización entre dispositivos."""
+    source = await manager.create_session("user-1", "phone")
+    await manager.update_session_activity(source.session_id, agent_id="sage")
+    target = await manager.create_session("user-1", "web")
+
+    synced = await manager.sync_session_across_devices("user-1", source.session_id, "web")
+    assert synced.session_id == target.session_id
+    assert synced.context.conversation_flow == ["sage"]
+    assert synced.sync_token == source.sync_token
+
+    assert await manager.pause_session(target.session_id)
+    assert [s.session_id for s in await manager.get_user_sessions("user-1")] == [
+        source.session_id
+    ]
+    paused = await manager.get_user_sessions("user-1", include_inactive=True)
+    assert {s.status for s in paused} == {SessionStatus.ACTIVE, SessionStatus.PAUSED}
+
+    assert await manager.resume_session(target.session_id)
+    assert await manager.end_session(source.session_id)
+    assert await manager.get_session(source.session_id) is None
+
+
+@pytest.mark.asyncio
+async def test_evictions_reach_database_but_activity_does_not(manager, store, monkeypatch):
+    """Test que los desalojos se archivan en base de datos y los mensajes no."""
+    written = []
+
+    async def record(session_info):
+        written.append((session_info.session_id, session_info.status))
+
+    monkeypatch.setattr(manager, "_update_session", record)
+    first = await manager.create_session("user-1", "phone")
+    await manager.create_session("user-1", "web")
+    assert await manager.update_session_activity(first.session_id, agent_id="nova")
+    assert written == []
+
+    await manager.create_session("user-1", "tablet")
+    evicted = [entry for entry in written if entry[1] == SessionStatus.ARCHIVED]
+    assert len(evicted) == 1 and evicted[0][0] != first.session_id
+
+
+@pytest.mark.asyncio
+async def test_activity_keeps_user_index_alive(store):
+    """Test que la actividad renueva el TTL del índice y de los dispositivos."""
+    now = datetime.utcnow()
+    await store.create(
+        "s1",
+        {"user_id": "u", "device_id": "d", "expires_at": (now + timedelta(hours=2)).isoformat()},
+        last_activity=now,
+        expires_at=now + timedelta(hours=2),
+        max_sessions=5,
+        index_retention=60,
+    )
+    client = store._redis
+    assert await client.ttl(store.index_key("u")) <= 60
+
+    await store.record_activity("s1", {"a": "b"}, None, now, session_ttl=600)
+    for key in (store.index_key("u"), store.devices_key("u")):
+        assert 7100 < await client.ttl(key) <= 7201
+
+    await client.expire(store.index_key("u"), 5)
+    await client.expire(store.devices_key("u"), 5)
+    await store.update_fields("s1", "u", {"status": "paused"}, now, index_retention=900)
+    for key in (store.index_key("u"), store.devices_key("u")):
+        assert 890 < await client.ttl(key) <= 900
+
+
+@pytest.mark.asyncio
+async def test_activity_without_redis_updates_session():
+    """Test que sin Redis la interacción se aplica sobre la sesión y se persiste."""
+    manager = SessionManager()
+    manager.store = RedisSessionStore()
+    manager.store._client = _no_redis
+    written = []
+
+    async def record(session_info):
+        written.append(session_info)
+
+    manager._update_session = record
+    manager._active_sessions.add("dev-1")
+    assert await manager.update_session_activity(
+        "dev-1", agent_id="nova", context_update={"mood": "bien"}
+    )
+    session_info = written[0]
+    assert session_info.total_interactions == 1
+    assert session_info.context.active_agent_id == "nova"
+    assert session_info.context.conversation_flow == ["nova"]
+    assert session_info.context.session_metadata == {"mood": "bien"}
+    assert not await manager.update_session_activity("unknown")
+
+
+async def _no_redis():
+    return None
+
+
+@pytest.mark.asyncio
+async def test_activity_does_not_recreate_expired_hash(store):
+    """Test que la actividad sobre un hash expirado no lo recrea sin TTL."""
+    now = datetime.utcnow()
+    await store.create(
+        "s1",
+        {"user_id": "u", "device_id": "d", "expires_at": now.isoformat()},
+        last_activity=now,
+        expires_at=now + timedelta(seconds=60),
+        max_sessions=5,
+        index_retention=3600,
+    )
+    fields = await store.record_activity(
+        "s1", {"last_activity": now.isoformat()}, None, now, session_ttl=600
+    )
+    assert fields["total_interactions"] == "1"
+    assert 500 < await store._redis.ttl(store.session_key("s1")) <= 600
+
+    await store._redis.delete(store.session_key("s1"))
+    assert await store.record_activity("s1", {"a": "b"}, None, now, 600) is False
+    assert not await store._redis.exists(store.session_key("s1"))
@@ -0,0 +1,150 @@
+"""
+Tests for the chunked streaming pipeline runtime.
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from core.stream_pipeline import (
+    StreamChunk,
+    StreamPipelineRunner,
+    StreamStage,
+    StreamStageError,
+    chunk_records,
+)
+
+
+async def numbers(count, offset=0, produced=None):
+    for value in range(offset, count):
+        if produced is not None:
+            produced.append(value)
+        yield {"value": value}
+
+
+def test_parallel_stage_commits_chunks_in_order():
+    rng = random.Random(4)
+
+    async def double(chunk):
+        await asyncio.sleep(rng.random() / 500)
+        return StreamChunk(chunk.index, [{"value": r["value"] * 2} for r in chunk.records])
+
+    async def run():
+        committed = []
+
+        async def commit(chunk):
+            committed.append(chunk)
+
+        runner = StreamPipelineRunner(
+            [StreamStage("transformation", double, parallelism=4)],
+            chunk_size=7,
+            queue_size=2,
+        )
+        counters = await runner.run(numbers(100), commit)
+        return committed, counters
+
+    committed, counters = asyncio.run(run())
+    assert [chunk.index for chunk in committed] == list(range(15))
+    assert [r["value"] for chunk in committed for r in chunk.records] == [
+        2 * v for v in range(100)
+    ]
+    assert counters == {"chunks_committed": 15, "records_in": 100, "records_committed": 100}
+
+
+def test_bounded_queues_limit_read_ahead():
+    produced, lag = [], []
+
+    async def passthrough(chunk):
+        return chunk
+
+    async def run():
+        committed = 0
+
+        async def slow_commit(chunk):
+            nonlocal committed
+            await asyncio.sleep(0.001)
+            committed += len(chunk.records)
+            lag.append(len(produced) - committed)
+
+        runner = StreamPipelineRunner(
+            [StreamStage("transformation", passthrough), StreamStage("loading", passthrough)],
+            chunk_size=10,
+            queue_size=2,
+        )
+        await runner.run(numbers(2000, produced=produced), slow_commit)
+
+    asyncio.run(run())
+    # Three queues of two chunks, one chunk in each stage and one being built
+    assert max(lag) <= (3 * 2 + 2 + 1) * 10
+    assert len(produced) == 2000
+
+
+def test_failure_reports_stage_and_resume_continues_after_checkpoint():
+    loaded, checkpoint = [], {"last": -1}
+    fail_at = {5}
+
+    async def load(chunk):
+        if chunk.index in fail_at:
+            fail_at.clear()
+            raise IOError("target unavailable")
+        loaded.extend(r["value"] for r in chunk.records)
+        return chunk
+
+    async def commit(chunk):
+        checkpoint["last"] = chunk.index
+
+    async def run(start):
+        runner = StreamPipelineRunner([StreamStage("loading", load)], chunk_size=10)
+        return await runner.run(
+            numbers(95, offset=start * 10), commit, start_index=start
+        )
+
+    with pytest.raises(StreamStageError) as failure:
+        asyncio.run(run(0))
+    assert failure.value.stage == "loading"
+    assert failure.value.chunk_index == 5
+    assert isinstance(failure.value.error, IOError)
+    assert checkpoint["last"] == 4
+
+    counters = asyncio.run(run(checkpoint["last"] + 1))
+    assert counters["chunks_committed"] == 5
+    assert checkpoint["last"] == 9
+    assert loaded == list(range(95))
+
+
+def test_source_errors_and_finish_chunk():
+    async def broken():
+        yield {"value": 1}
+        raise ValueError("connection reset")
+
+    async def passthrough(chunk):
+        return chunk
+
+    async def total(index):
+        return StreamChunk(index, [{"total": 3}])
+
+    async def run(source):
+        committed = []
+
+        async def commit(chunk):
+            committed.append(chunk)
+
+        runner = StreamPipelineRunner(
+            [StreamStage("transformation", passthrough, finish=total)], chunk_size=2
+        )
+        await runner.run(source, commit, start_index=3)
+        return committed
+
+    with pytest.raises(StreamStageError) as failure:
+        asyncio.run(run(broken()))
+    assert failure.value.stage == "extraction"
+
+    committed = asyncio.run(run(numbers(3)))
+    assert [(chunk.index, len(chunk.records)) for chunk in committed] == [(3, 2), (4, 1), (5, 1)]
+    assert committed[-1].records == [{"total": 3}]
+
+    async def collect():
+        return [chunk async for chunk in chunk_records(numbers(5), 2)]
+
+    assert [len(chunk.records) for chunk in asyncio.run(collect())] == [2, 2, 1]
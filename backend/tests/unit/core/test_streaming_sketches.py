@@ -0,0 +1,114 @@
+"""
+Pruebas para los sketches de memoria constante y el AccessPatternAnalyzer.
+"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.cache_prediction_engine import AccessEvent, AccessPatternAnalyzer
+from core.streaming_sketches import (
+    CountMinSketch,
+    HyperLogLog,
+    Reservoir,
+    SpaceSaving,
+    stable_hash64,
+)
+
+
+def _zipf_stream(n=20000, keys=2000, seed=7):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(keys)]
+    return rng.choices([f"k{i}" for i in range(keys)], weights=weights, k=n)
+
+
+def _event(key, ts):
+    return AccessEvent(
+        key=key, timestamp=ts, hit=False, layer=None, response_time_ms=0.0,
+        user_id=None, context=None, metadata={},
+    )
+
+
+def test_space_saving_finds_heavy_hitters_in_order():
+    """Test que SpaceSaving recupera el top-k exacto en un flujo Zipf."""
+    stream = _zipf_stream()
+    exact = Counter(stream)
+    sketch = SpaceSaving(capacity=200)
+    for key in stream:
+        sketch.increment(key)
+
+    top = sketch.top(10)
+    assert [key for key, _ in top] == [key for key, _ in exact.most_common(10)]
+    assert all(count >= exact[key] for key, count in top)
+    assert [count for _, count in top] == sorted((c for _, c in top), reverse=True)
+    assert len(sketch) == 200
+
+
+def test_space_saving_decay_keeps_order_and_drops_zeros():
+    sketch = SpaceSaving(capacity=10)
+    for key, repeats in (("a", 8), ("b", 4), ("c", 1)):
+        for _ in range(repeats):
+            sketch.increment(key)
+
+    assert sketch.decay() == ["c"]
+    assert sketch.top(5) == [("a", 4), ("b", 2)]
+    sketch.increment("b")
+    assert sketch.top(1) == [("a", 4)]
+
+
+def test_count_min_never_underestimates():
+    stream = _zipf_stream(n=5000)
+    sketch = CountMinSketch(width=256, depth=4)
+    for key in stream:
+        sketch.add(stable_hash64(key))
+
+    for key, count in Counter(stream).items():
+        assert sketch.estimate(stable_hash64(key)) >= count
+
+
+def test_hyperloglog_estimates_cardinality():
+    hll = HyperLogLog(precision=12)
+    for i in range(50000):
+        hll.add(stable_hash64(f"user:{i}"))
+    assert hll.count() == pytest.approx(50000, rel=0.05)
+
+
+def test_reservoir_is_bounded_and_uniform():
+    reservoir = Reservoir(size=100, rng=random.Random(3))
+    for value in range(10000):
+        reservoir.add(float(value))
+    assert len(reservoir) == 100 and reservoir.seen == 10000
+    assert 3000 < sum(reservoir.samples) / 100 < 7000
+
+
+def test_analyzer_state_is_bounded_by_configuration():
+    """Test que el estado no crece con la cardinalidad de keys."""
+    analyzer = AccessPatternAnalyzer(max_tracked_keys=64, max_families=8)
+    start = datetime(2026, 1, 1)
+    for i in range(30000):
+        analyzer.record_access(_event(f"user_{i % 50}:{i}", start + timedelta(seconds=i)))
+    for i in range(200):
+        analyzer.record_access(_event("hot:key", start + timedelta(seconds=30000 + i * 60)))
+
+    assert len(analyzer.tracked_keys()) <= 64
+    assert len(analyzer.key_stats) <= 64
+    assert len(analyzer.family_intervals) <= 8
+    assert analyzer.get_hotspot_keys(1)[0][0] == "hot:key"
+    assert analyzer.get_distinct_key_count() == pytest.approx(30001, rel=0.05)
+    assert set(analyzer.get_intervals("hot:key")) == {60.0}
+
+
+def test_family_intervals_cover_untracked_keys():
+    """Test que los intervalos de reutilización se agregan por familia."""
+    analyzer = AccessPatternAnalyzer(max_tracked_keys=4)
+    start = datetime(2026, 1, 1)
+    for round_number in range(3):
+        for user in range(100):
+            ts = start + timedelta(seconds=round_number * 3600 + user)
+            analyzer.record_access(_event(f"user_profile:{user}", ts))
+
+    intervals = analyzer.get_family_intervals("user_profile:999")
+    assert len(intervals) >= 4
+    assert set(intervals) == {3600.0}
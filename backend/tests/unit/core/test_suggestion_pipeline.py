@@ -0,0 +1,141 @@
+"""
+Pruebas de las piezas del pipeline de sugerencias proactivas.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.suggestion_pipeline import (
+    UserFeatureSnapshot,
+    cooldown_key,
+    fan_out,
+    fetch_active_cooldowns,
+    gather_bounded,
+    write_suggestion_cache,
+)
+
+
+class FakeRedis:
+    """Cliente en memoria con las operaciones que usa el pipeline."""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.calls = []
+
+    async def mget(self, keys):
+        self.calls.append(("mget", len(keys)))
+        return [self.values.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def setex(self, key, ttl, value):
+                self.ops.append((key, ttl, value))
+
+            async def execute(self):
+                redis.calls.append(("pipeline", len(self.ops)))
+                for key, _, value in self.ops:
+                    redis.values[key] = value
+                return [True] * len(self.ops)
+
+        return Pipeline()
+
+
+def snapshot_for(user_id, **features):
+    return UserFeatureSnapshot.build(SimpleNamespace(user_id=user_id), **features)
+
+
+def test_snapshot_is_immutable():
+    snapshot = snapshot_for(
+        "u1",
+        behavior={"patterns": {"preferred_time": "morning"}, "tags": ["a"]},
+        goals={"at_risk_goals": [{"id": 1}]},
+    )
+
+    assert snapshot.user_id == "u1"
+    assert snapshot.behavior["patterns"]["preferred_time"] == "morning"
+    assert snapshot.goals.get("at_risk_goals")[0]["id"] == 1
+    with pytest.raises(TypeError):
+        snapshot.behavior["patterns"]["preferred_time"] = "night"
+    with pytest.raises(AttributeError):
+        snapshot.behavior["tags"].append("b")
+    with pytest.raises(AttributeError):
+        snapshot.history = {}
+
+
+def test_generators_run_concurrently_and_failures_are_isolated():
+    seen = []
+
+    def generator(name, delay=0.05):
+        async def run(snapshot):
+            seen.append(snapshot)
+            await asyncio.sleep(delay)
+            return [f"{name}:{snapshot.user_id}"]
+
+        return name, run
+
+    async def broken(snapshot):
+        raise RuntimeError("boom")
+
+    generators = [generator(f"g{i}") for i in range(10)] + [("broken", broken)]
+    snapshot = snapshot_for("u1")
+
+    started = time.perf_counter()
+    suggestions = asyncio.run(fan_out(generators, snapshot))
+    elapsed = time.perf_counter() - started
+
+    # Diez generadores de 50 ms tardan lo que el más lento, no la suma
+    assert elapsed < 0.25
+    assert suggestions == [f"g{i}:u1" for i in range(10)]
+    assert all(s is snapshot for s in seen)
+
+
+def test_gather_bounded_limits_concurrency_and_keeps_order():
+    in_flight = []
+    peak = []
+
+    async def work(item):
+        in_flight.append(item)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(item)
+        return item * 2
+
+    assert asyncio.run(gather_bounded(range(10), work, 3)) == [i * 2 for i in range(10)]
+    assert max(peak) == 3
+
+
+def test_cooldowns_for_many_users_use_one_mget():
+    redis = FakeRedis({cooldown_key("u1", "stress_management"): "active"})
+    pairs = [
+        ("u1", "stress_management"),
+        ("u1", "workout_optimization"),
+        ("u2", "stress_management"),
+        ("u1", "stress_management"),
+    ]
+
+    active = asyncio.run(fetch_active_cooldowns(redis, pairs))
+
+    assert active == {("u1", "stress_management")}
+    assert redis.calls == [("mget", 3)]
+    # Sin Redis no hay cooldowns y no se rompe el pipeline
+    assert asyncio.run(fetch_active_cooldowns(None, pairs)) == set()
+
+
+def test_suggestion_cache_is_written_in_one_pipeline():
+    redis = FakeRedis()
+    entries = [(f"s{i}", f'{{"n": {i}}}') for i in range(25)]
+
+    written = asyncio.run(write_suggestion_cache(redis, entries, 3600))
+
+    assert written == 25
+    assert redis.calls == [("pipeline", 25)]
+    assert redis.values["suggestion:s7"] == '{"n": 7}'
+    assert asyncio.run(write_suggestion_cache(redis, [], 3600)) == 0
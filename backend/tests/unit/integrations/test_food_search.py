@@ -0,0 +1,266 @@
+"""
+Tests for the local-first food search with pooled MyFitnessPal sessions.
+"""
+
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from integrations.nutrition.adapters.myfitnesspal import MFPConfig
+from integrations.nutrition.food_search import (
+    FoodIndex,
+    FoodRecord,
+    FoodSearchEngine,
+    MFPSessionPool,
+    QueryCache,
+    load_seed_foods,
+)
+from integrations.nutrition.service import NutritionIntegrationService
+from integrations.nutrition.normalizer import NutritionSource
+
+REMOTE_FOODS = [
+    {
+        "item": {
+            "id": "salmon-1",
+            "description": "Atlantic Salmon Fillet",
+            "brand_name": "Ocean Fresh",
+            "nutritional_contents": {
+                "energy": {"unit": "calories", "value": 234},
+                "protein": 25,
+                "carbohydrates": 0,
+                "fat": 14,
+            },
+            "serving_sizes": [{"value": 113, "unit": "g"}],
+        }
+    },
+    {
+        "item": {
+            "id": "salmon-2",
+            "description": "Smoked Salmon",
+            "nutritional_contents": {
+                "energy": {"value": 117},
+                "protein": 18.3,
+                "carbohydrates": 0,
+                "fat": 4.3,
+            },
+        }
+    },
+    {"item": {"id": "salsa-1", "description": "Salsa Verde", "brand_name": "Casa"}},
+]
+
+
+class LocalMFP:
+    """Login and food search endpoints of a MyFitnessPal stand-in."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = Counter()
+        self.fail_search = False
+
+    async def login_page(self, request):
+        self.calls["login_page"] += 1
+        return web.Response(text="<form></form>")
+
+    async def login(self, request):
+        self.calls["login"] += 1
+        response = web.Response(status=302, headers={"Location": "/"})
+        response.set_cookie("session", "abc")
+        return response
+
+    async def search(self, request):
+        self.calls["search"] += 1
+        await asyncio.sleep(self.delay)
+        if self.fail_search:
+            return web.Response(status=503, text="down")
+        query = request.query["q"].lower()
+        items = [
+            item
+            for item in REMOTE_FOODS
+            if any(
+                word.startswith(query.split()[0])
+                for word in item["item"]["description"].lower().split()
+            )
+        ]
+        return web.json_response({"items": items[: int(request.query["limit"])]})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/account/login", self.login_page)
+        app.router.add_post("/account/login", self.login)
+        app.router.add_get("/v2/foods/search", self.search)
+        return app
+
+
+async def with_mfp(mfp, run):
+    server = TestServer(mfp.app())
+    await server.start_server()
+    base = str(server.make_url("")).rstrip("/")
+    try:
+        return await run(
+            MFPConfig(username="search", password="pw", base_url=base, web_url=base)
+        )
+    finally:
+        await server.close()
+
+
+def seeded_index():
+    index = FoodIndex()
+    index.add_many(load_seed_foods())
+    return index
+
+
+def names(results):
+    return [food["name"] if isinstance(food, dict) else food.name for food in results]
+
+
+def test_index_prefix_fuzzy_and_popularity():
+    index = seeded_index()
+    assert len(index) >= 60
+
+    assert set(names(index.search("chick", 5))) == {
+        "Chicken Breast, grilled",
+        "Chicken Thigh, roasted",
+        "Chickpeas, cooked",
+    }
+    assert names(index.search("chiken brest", 3))[0] == "Chicken Breast, grilled"
+    assert names(index.search("brocoli", 3)) == ["Broccoli"]
+    assert names(index.search("yogurt GREEK", 3)) == ["Greek Yogurt, plain nonfat"]
+    assert index.search("zzzz", 3) == []
+
+    # Logged foods rank first among equal matches
+    assert names(index.search("rice", 2))[0] == "Brown Rice, cooked"
+    assert index.record_use("white rice, cooked") == 1
+    assert names(index.search("rice", 2))[0] == "White Rice, cooked"
+
+    # Replacing a food drops its old tokens
+    index.add(FoodRecord("seed:banana", "Plátano", calories=105))
+    assert names(index.search("platano", 1)) == ["Plátano"]
+    assert index.search("banana", 1) == []
+
+
+def test_keystrokes_reuse_one_login_and_fill_the_index():
+    mfp = LocalMFP()
+
+    async def run(config):
+        pool = MFPSessionPool(config, size=2)
+        engine = FoodSearchEngine(pool, seeded_index(), QueryCache())
+        typed = "salmon"
+        for end in range(1, len(typed) + 1):
+            results = await engine.search(typed[:end], limit=3)
+        again = await engine.search("Salmon", limit=3)
+
+        # Identical concurrent queries share one remote request
+        concurrent = await asyncio.gather(
+            *(engine.search("smoked sal", 3) for _ in range(5))
+        )
+        await engine.close()
+        return pool, engine, results, again, concurrent
+
+    pool, engine, results, again, concurrent = asyncio.run(with_mfp(mfp, run))
+
+    assert pool.logins == 1 and mfp.calls["login"] == 1
+    # "s" and "sa" stay local; "sal" goes remote once and the indexed
+    # results then answer "salm" to "salmon" locally
+    assert mfp.calls["search"] == 1 + 1
+    assert set(names(results)) == {
+        "Salmon, baked",
+        "Smoked Salmon",
+        "Atlantic Salmon Fillet",
+    }
+    fillet = next(food for food in results if food["food_id"] == "mfp:salmon-1")
+    assert fillet["brand"] == "Ocean Fresh" and fillet["calories"] == 234
+    assert fillet["serving_size"] == "113 g"
+    assert again == results and engine.cache.hits >= 1
+    assert all(batch == concurrent[0] for batch in concurrent)
+    assert "mfp:salmon-2" in engine.index.foods
+
+
+def test_remote_failure_falls_back_and_warm_refreshes_popular_queries():
+    mfp = LocalMFP(delay=0)
+    clock = [0.0]
+
+    async def run(config):
+        cache = QueryCache(ttl_seconds=60, clock=lambda: clock[0])
+        engine = FoodSearchEngine(MFPSessionPool(config), seeded_index(), cache)
+        mfp.fail_search = True
+        fallback = await engine.search("salm", 5)
+
+        mfp.fail_search = False
+        for _ in range(3):
+            await engine.search("tuna", 5)
+        await engine.search("salsa", 5)
+        clock[0] = 61
+        searches_before = mfp.calls["search"]
+        warmed = await engine.warm(2)
+        after_warm = await engine.search("tuna", 5)
+        return (
+            fallback,
+            warmed,
+            mfp.calls["search"] - searches_before,
+            after_warm,
+            cache,
+        )
+
+    fallback, warmed, remote_calls, after_warm, cache = asyncio.run(with_mfp(mfp, run))
+    assert names(fallback) == ["Salmon, baked"]
+    assert warmed == 2 and remote_calls == 2
+    assert cache.popular(1) == [("tuna", 5)]
+    assert names(after_warm) == ["Tuna, canned in water"]
+
+
+def test_fallback_results_are_retried_after_the_short_ttl():
+    mfp = LocalMFP(delay=0)
+    clock = [0.0]
+
+    async def run(config):
+        cache = QueryCache(ttl_seconds=3600, clock=lambda: clock[0])
+        engine = FoodSearchEngine(
+            MFPSessionPool(config), seeded_index(), cache, fallback_ttl_seconds=30
+        )
+        mfp.fail_search = True
+        fallback = await engine.search("salm", 5)
+        mfp.fail_search = False
+        cached = await engine.search("salm", 5)
+        clock[0] = 31
+        recovered = await engine.search("salm", 5)
+        return fallback, cached, recovered
+
+    fallback, cached, recovered = asyncio.run(with_mfp(mfp, run))
+    assert cached == fallback and names(fallback) == ["Salmon, baked"]
+    assert "Atlantic Salmon Fillet" in names(recovered)
+    assert mfp.calls["search"] == 2
+
+
+def test_service_refreshes_popular_queries_periodically():
+    service = NutritionIntegrationService(
+        {"myfitnesspal": {"search_warm_interval_seconds": 0.01}}
+    )
+    warmed = []
+
+    async def fake_warm(count=50):
+        warmed.append(count)
+        return 0
+
+    service.warm_food_search = fake_warm
+
+    async def run():
+        await service.search_foods("oat", limit=5)
+        await asyncio.sleep(0.05)
+        task = service._warm_task
+        await service.close()
+        await asyncio.sleep(0)
+        return task
+
+    task = asyncio.run(run())
+    assert warmed and warmed[0] == 50
+    assert task.cancelled()
+
+
+def test_service_search_is_local_without_search_account():
+    service = NutritionIntegrationService({"myfitnesspal": {"api_endpoint": "x"}})
+    results = asyncio.run(service.search_foods("oat", limit=5))
+    assert names(results) == ["Oatmeal, cooked", "Rolled Oats, dry"]
+    assert service.food_search.pool is None
+    assert asyncio.run(service.search_foods("oat", NutritionSource.CRONOMETER)) == []
@@ -0,0 +1,182 @@
+"""
+Tests for the vectorized, incrementally updated nutrition trends engine.
+"""
+
+import asyncio
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from integrations.nutrition.normalizer import NormalizedDailyNutrition, NutritionSource
+from integrations.nutrition.service import NutritionIntegrationService
+from integrations.nutrition.trends import NutritionTrendsEngine
+
+END = date(2026, 5, 31)
+
+
+def make_day(user_id, day, rng, with_goal=True):
+    protein, carbs, fat = (
+        rng.uniform(40, 180),
+        rng.uniform(100, 350),
+        rng.uniform(30, 120),
+    )
+    calories = protein * 4 + carbs * 4 + fat * 9
+    return NormalizedDailyNutrition(
+        date=day,
+        user_id=user_id,
+        source=NutritionSource.MANUAL,
+        total_calories=calories,
+        total_protein_g=protein,
+        total_carbs_g=carbs,
+        total_fat_g=fat,
+        meals=[],
+        calorie_goal=2200 if with_goal else None,
+        goal_adherence_percent=calories / 22 if with_goal else None,
+        macro_balance={
+            "protein_percent": protein * 400 / calories,
+            "carbs_percent": carbs * 400 / calories,
+            "fat_percent": fat * 900 / calories,
+        },
+    )
+
+
+def history(user_id, seed, days=60, skip=0.3):
+    rng = random.Random(seed)
+    return [
+        make_day(user_id, END - timedelta(days=offset), rng, with_goal=offset % 3 != 0)
+        for offset in range(days)
+        if rng.random() > skip
+    ]
+
+
+def reference(days, window, field):
+    """Window statistics computed the straightforward way."""
+    selected = [d for d in days if 0 <= (END - d.date).days < window]
+    values = [getattr(d, field) for d in selected]
+    x = [-(END - d.date).days for d in selected]
+    slope = np.polyfit(x, values, 1)[0] if len(values) >= 2 else 0.0
+    return len(values), np.mean(values), np.var(values), slope
+
+
+@pytest.mark.parametrize("window", [7, 14, 30])
+def test_windows_match_reference_for_every_user_in_bulk(window):
+    engine = NutritionTrendsEngine()
+    users = {f"u{i}": history(f"u{i}", i) for i in range(25)}
+    for days in users.values():
+        engine.record_many(days)
+
+    stats = engine.bulk_window_stats(list(users) + ["ghost"], END)
+    assert engine.computations == 1
+    assert stats["ghost"][window]["calories"]["days"] == 0
+
+    for user_id, days in users.items():
+        for field, metric in (
+            ("total_calories", "calories"),
+            ("total_protein_g", "protein_g"),
+        ):
+            n, mean, variance, slope = reference(days, window, field)
+            got = stats[user_id][window][metric]
+            assert got["days"] == n
+            assert got["mean"] == pytest.approx(mean, rel=1e-5)
+            assert got["variance"] == pytest.approx(variance, rel=1e-4, abs=1e-2)
+            assert got["slope"] == pytest.approx(slope, rel=1e-4, abs=1e-3)
+
+        with_goal = [
+            d.goal_adherence_percent
+            for d in days
+            if d.calorie_goal and (END - d.date).days < window
+        ]
+        adherence = stats[user_id][window]["goal_adherence_percent"]
+        assert adherence["days"] == len(with_goal)
+        assert adherence["mean"] == pytest.approx(np.mean(with_goal), rel=1e-5)
+
+
+def test_new_days_recompute_only_that_user():
+    engine = NutritionTrendsEngine()
+    users = [f"u{i}" for i in range(10)]
+    for i, user_id in enumerate(users):
+        engine.record_many(history(user_id, i))
+
+    first = engine.bulk_window_stats(users, END)
+    again = engine.bulk_window_stats(users, END)
+    assert again["u3"] is first["u3"] and engine.computations == 1
+
+    # Rewriting the end day for one user only touches that user
+    rng = random.Random(99)
+    engine.record(make_day("u3", END, rng))
+    third = engine.bulk_window_stats(users, END)
+    assert engine.computations == 2
+    assert third["u4"] is first["u4"] and third["u3"] is not first["u3"]
+
+    # Recording the same days again keeps the cached statistics
+    engine.record_many(history("u4", 4))
+    assert engine.bulk_window_stats(users, END)["u4"] is first["u4"]
+    assert engine.computations == 2
+
+    # Days older than the ring are ignored, the window end moving recomputes
+    engine.record(make_day("u3", END - timedelta(days=200), rng))
+    assert engine.bulk_window_stats(["u3"], END)["u3"] is third["u3"]
+    later = engine.bulk_window_stats(["u3"], END + timedelta(days=40))
+    assert later["u3"][30]["calories"]["days"] == 0
+
+
+def test_service_trends_report_and_bulk_mode(monkeypatch):
+    service = NutritionIntegrationService({})
+    today = date.today()
+    loads = []
+
+    async def fake_history(user_id, start_date, end_date):
+        loads.append((user_id, (end_date - start_date).days))
+        if user_id == "nobody":
+            return []
+        rng = random.Random(user_id)
+        # The last week of "a" is stored below, the database has the rest
+        first = 7 if user_id == "a" else 1
+        days = [
+            make_day(user_id, today - timedelta(days=offset), rng)
+            for offset in range(first, 30)
+        ]
+        return [day for day in days + written if start_date <= day.date <= end_date]
+
+    # Days written to storage by another process
+    written = []
+
+    monkeypatch.setattr(service, "_get_nutrition_history", fake_history)
+
+    # Rising intake: +20 kcal per day over the last week
+    for offset in range(7):
+        day = make_day("a", today - timedelta(days=6 - offset), random.Random(offset))
+        day.total_calories = 1800 + 20 * offset
+        asyncio.run(service._store_daily_nutrition("a", day))
+
+    report = asyncio.run(service.get_nutrition_trends("a", days=7))
+    assert report["days_analyzed"] == 7
+    assert report["average_daily_calories"] == pytest.approx(1860.0)
+    assert report["calorie_trend"] == "increasing"
+    assert set(report["rolling_windows"]) == {"7", "14", "30"}
+    assert report["rolling_windows"]["30"]["calories"]["days"] == 30
+    assert isinstance(report["insights"], list)
+
+    bulk = asyncio.run(service.get_bulk_nutrition_trends(["a", "b", "c"], days=7))
+    # The whole window is read on every call
+    assert loads == [("a", 34), ("a", 34), ("b", 34), ("c", 34)]
+    assert bulk["a"]["average_daily_calories"] == report["average_daily_calories"]
+    assert bulk["b"]["days_analyzed"] == 6
+
+    written.append(make_day("b", today, random.Random(7)))
+    # Another process refreshes an earlier day of "a": 1840 -> 1980 kcal
+    refreshed = make_day("a", today - timedelta(days=4), random.Random(2))
+    refreshed.total_calories = 1980
+    written.append(refreshed)
+    again = asyncio.run(service.get_bulk_nutrition_trends(["a", "b", "c"], days=7))
+    assert loads[4:] == [("a", 34), ("b", 34), ("c", 34)]
+    assert again["b"]["days_analyzed"] == 7
+    assert again["a"]["average_daily_calories"] == pytest.approx(1880.0)
+
+    empty = asyncio.run(service.get_nutrition_trends("nobody"))
+    assert empty == {
+        "error": "No nutrition data available for analysis",
+        "days_analyzed": 0,
+    }
@@ -0,0 +1,253 @@
+"""
+Tests for concurrent push delivery against a local FCM stand-in.
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from integrations.notifications.delivery import (
+    MULTICAST_LIMIT,
+    MulticastDispatcher,
+    PayloadDeduplicator,
+    SendResponse,
+)
+from integrations.notifications.firebase_service import (
+    DeviceToken,
+    FirebaseNotificationService,
+    NotificationType,
+)
+from integrations.notifications.timing_wheel import (
+    RedisWheelCursor,
+    TimingWheel,
+    minute_of_day,
+)
+
+PROGRESS = {"workouts_completed": 5, "calories_burned": 2500, "week_number": 10}
+
+
+class LocalFCM:
+    """Minimal FCM v1 endpoint that records traffic."""
+
+    def __init__(self, delay=0.002):
+        self.delay = delay
+        self.posts = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failed_once = set()
+
+    async def send(self, request):
+        body = await request.json()
+        token = body["message"]["token"]
+        self.posts[token] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if token.startswith("dead"):
+            return web.Response(
+                status=404, text='{"error": {"status": "UNREGISTERED"}}'
+            )
+        if token.startswith("flaky") and token not in self.failed_once:
+            self.failed_once.add(token)
+            return web.Response(
+                status=503, text="unavailable", headers={"Retry-After": "0"}
+            )
+        return web.json_response({"name": f"projects/test/messages/{token}"})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/v1/projects/{project}/messages:send", self.send)
+        return app
+
+
+async def with_service(fcm, run, **config):
+    server = TestServer(fcm.app())
+    await server.start_server()
+    try:
+        service_config = {
+            "project_id": "test",
+            "fcm_endpoint": str(server.make_url("")),
+            "max_concurrent_requests": 20,
+            "retry_backoff_seconds": 0.001,
+            **config,
+        }
+        async with FirebaseNotificationService(service_config) as service:
+            return await run(service)
+    finally:
+        await server.close()
+
+
+def test_bulk_multicast_is_concurrent_bounded_and_retries():
+    fcm = LocalFCM()
+    users = [f"user{i}" for i in range(1200)]
+
+    async def run(service):
+        for i, user_id in enumerate(users):
+            await service.register_device_token(
+                DeviceToken(user_id=user_id, token=f"token{i}", platform="android")
+            )
+        # Same device under two accounts, a stale token and a flaky one
+        await service.register_device_token(DeviceToken("user1", "token0", "android"))
+        await service.register_device_token(DeviceToken("user2", "dead-2", "ios"))
+        await service.register_device_token(DeviceToken("user3", "flaky-3", "ios"))
+
+        started = asyncio.get_running_loop().time()
+        results = await service.send_bulk_notification(
+            users + ["user0", "nobody"], NotificationType.PROGRESS_UPDATE, PROGRESS
+        )
+        elapsed = asyncio.get_running_loop().time() - started
+        return service, results, elapsed
+
+    service, results, elapsed = asyncio.run(with_service(fcm, run))
+
+    assert len(results) == 1201
+    assert results["nobody"][0].error == "No device tokens"
+    assert all(r.success for r in results["user7"])
+    assert [r.success for r in results["user1"]] == [True, True]
+    assert [r.success for r in results["user2"]] == [True, False]
+    assert "404" in results["user2"][1].error
+    assert all(r.success for r in results["user3"])
+
+    # Every token once, the flaky one retried once
+    assert fcm.posts["token0"] == 1 and fcm.posts["flaky-3"] == 2
+    assert sum(fcm.posts.values()) == 1200 + 2 + 1
+    assert 1 < fcm.max_in_flight <= 20
+    # Serial sends would need at least 1200 * 2 ms
+    assert elapsed < 1200 * fcm.delay
+
+    assert not service.device_tokens["user2"][1].is_active
+    assert service.device_tokens["user7"][0].last_used is not None
+
+
+def test_identical_payloads_are_suppressed_within_window():
+    fcm = LocalFCM(delay=0)
+
+    async def run(service):
+        for user_id in ("a", "b"):
+            await service.register_device_token(
+                DeviceToken(user_id, f"t-{user_id}", "ios")
+            )
+        first = await service.send_bulk_notification(
+            ["a", "b"], NotificationType.PROGRESS_UPDATE, PROGRESS
+        )
+        repeat = await service.send_notification(
+            "a", NotificationType.PROGRESS_UPDATE, PROGRESS
+        )
+        changed = await service.send_notification(
+            "a", NotificationType.PROGRESS_UPDATE, {**PROGRESS, "workouts_completed": 6}
+        )
+        return first, repeat, changed
+
+    first, repeat, changed = asyncio.run(with_service(fcm, run))
+    assert first["a"][0].success and first["b"][0].success
+    assert repeat[0].success is False
+    assert repeat[0].error == "Duplicate payload suppressed"
+    assert changed[0].success
+    assert fcm.posts == {"t-a": 2, "t-b": 1}
+
+    # A failed send does not block the retry
+    clock = [0.0]
+    dedup = PayloadDeduplicator(window_seconds=60, clock=lambda: clock[0])
+    assert dedup.claim("t", "p") and not dedup.claim("t", "p")
+    dedup.release("t", "p")
+    assert dedup.claim("t", "p")
+    clock[0] = 61
+    assert dedup.claim("t", "p") and len(dedup) == 1
+
+
+def test_dispatcher_batches_and_gives_up_after_max_attempts():
+    sent = []
+
+    async def send(message):
+        sent.append(message["message"]["token"])
+        if message["message"]["token"] == "down":
+            return SendResponse(503, {"error": "unavailable"})
+        if message["message"]["token"] == "bad":
+            return SendResponse(400, {"error": "INVALID_ARGUMENT"})
+        return SendResponse(200, {"name": "ok"})
+
+    async def run():
+        dispatcher = MulticastDispatcher(
+            send,
+            max_concurrency=8,
+            max_attempts=3,
+            backoff_seconds=0,
+            batch_size=10_000,
+        )
+        tokens = [f"t{i}" for i in range(MULTICAST_LIMIT + 5)] + ["down", "bad"]
+        return dispatcher, await dispatcher.dispatch({"data": {}}, tokens)
+
+    dispatcher, outcomes = asyncio.run(run())
+    assert dispatcher.batch_size == MULTICAST_LIMIT
+    assert outcomes["down"].attempts == 3 and not outcomes["down"].success
+    assert outcomes["bad"].attempts == 1 and outcomes["bad"].status == 400
+    assert sent.count("down") == 3 and sent.count("bad") == 1
+    assert sum(o.success for o in outcomes.values()) == MULTICAST_LIMIT + 5
+
+
+def test_timing_wheel_emits_due_minutes_and_catches_up():
+    wheel = TimingWheel(max_catch_up=5)
+    wheel.schedule(("u1", "workout"), "08:00", "u1-workout")
+    wheel.schedule(("u2", "workout"), "08:00", "u2-workout")
+    wheel.schedule(("u1", "meal"), "08:03", "u1-meal")
+    wheel.schedule(("u3", "meal"), "23:59", "u3-meal")
+    assert minute_of_day("08:03") == 483 and len(wheel) == 4
+
+    day = datetime(2026, 3, 1)
+    assert [b.items for b in wheel.advance(day + timedelta(hours=8))] == [
+        ["u1-workout", "u2-workout"]
+    ]
+    assert wheel.advance(day + timedelta(hours=8, seconds=40)) == []
+    # A late tick replays the skipped minutes
+    assert [b.minute for b in wheel.advance(day + timedelta(hours=8, minutes=4))] == [
+        483
+    ]
+
+    # Rescheduling moves the entry, cancelling removes it
+    wheel.schedule(("u1", "workout"), "08:05", "u1-workout")
+    assert wheel.cancel(("u2", "workout")) and not wheel.cancel(("u2", "workout"))
+    assert wheel.due(480).items == [] and wheel.due(485).items == ["u1-workout"]
+
+    # Catch-up is capped and wraps past midnight
+    wheel.advance(day + timedelta(hours=23, minutes=58))
+    assert [b.items for b in wheel.advance(day + timedelta(days=1, minutes=1))] == [
+        ["u3-meal"]
+    ]
+
+
+def test_shared_cursor_never_replays_minutes_sent_by_another_worker():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis()
+    wheels = [TimingWheel(), TimingWheel()]
+    for wheel in wheels:
+        wheel.schedule(("u1", "workout"), "08:00", "u1-workout")
+        wheel.schedule(("u1", "meal"), "08:03", "u1-meal")
+    first, second = (RedisWheelCursor(client, max_catch_up=5) for _ in wheels)
+    day = datetime(2026, 3, 1)
+
+    async def scenario():
+        sent = []
+        for cursor, wheel, tick in [
+            (first, wheels[0], timedelta(hours=8)),
+            # Another worker's first tick must not replay 08:00
+            (second, wheels[1], timedelta(hours=8, minutes=1)),
+            (first, wheels[0], timedelta(hours=8, minutes=1, seconds=30)),
+            # A late tick still catches up on 08:03, once
+            (second, wheels[1], timedelta(hours=8, minutes=4)),
+            (first, wheels[0], timedelta(hours=8, minutes=4)),
+        ]:
+            batches = await cursor.advance(wheel, day + tick)
+            sent.extend(item for batch in batches for item in batch.items)
+        return sent
+
+    assert asyncio.run(scenario()) == ["u1-workout", "u1-meal"]
+
+    wheels[0].clear()
+    assert len(wheels[0]) == 0 and wheels[0].due(480).items == []
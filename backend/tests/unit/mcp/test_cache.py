@@ -0,0 +1,128 @@
+"""
+Tests for the MCP tool-result cache (index, invalidation, stale entries).
+"""
+
+import pytest
+
+from core.advanced_cache_manager import AdvancedCacheManager
+from mcp.config import CachePolicy, ToolConfig
+from mcp.schemas import ToolDefinition
+from mcp.server.registry import ToolRegistry
+from mcp.utils.cache import (
+    CacheManager,
+    LocalKeyIndex,
+    RedisCacheBackend,
+    RedisKeyIndex,
+)
+
+
+def _cache(ttl=300):
+    return CacheManager(ttl=ttl, backend=AdvancedCacheManager(), index=LocalKeyIndex())
+
+
+@pytest.mark.asyncio
+async def test_clear_pattern_uses_prefix_index():
+    cache = _cache()
+    for key in ("nexus_crm.manage_contacts:{}", "nexus_crm.manage_deals:{}", "ngx_pulse.read:{}"):
+        await cache.set(key, {"key": key})
+
+    assert await cache.clear_pattern("nexus_crm.*") == 2
+    assert await cache.get("nexus_crm.manage_deals:{}") is None
+    assert await cache.get("ngx_pulse.read:{}") == {"key": "ngx_pulse.read:{}"}
+    assert await cache.clear_pattern("*read*") == 1
+    assert cache.get_stats()["indexed_keys"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tag_invalidation_and_generation_guard():
+    cache = _cache()
+    await cache.set("a", 1, tags=("adapter:nexus_crm",))
+    await cache.set("b", 2, tags=("adapter:nexus_crm", "tool:x"))
+    await cache.set("c", 3, tags=("adapter:ngx_pulse",))
+
+    generation = await cache.tag_generations(("adapter:nexus_crm",))
+    assert await cache.invalidate_tags("adapter:nexus_crm") == 2
+    assert await cache.get("c") == 3
+
+    # A refresh computed before the invalidation must not repopulate the cache
+    assert not await cache.set("a", "old", tags=("adapter:nexus_crm",), if_generation=generation)
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_index_is_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis()
+    worker_a, worker_b = (
+        CacheManager(backend=RedisCacheBackend(client), index=RedisKeyIndex(client))
+        for _ in range(2)
+    )
+    await worker_a.set("nexus_crm.manage_contacts:{}", 1, tags=("adapter:nexus_crm",))
+    await worker_a.set("nexus_crm.manage_deals:{}", 2, tags=("tool:deals",))
+    await worker_a.set("ngx_pulse.read:{}", 3, tags=("adapter:ngx_pulse",))
+    await worker_a.set("ngx_pulse.read:{}", 3, tags=("adapter:other",))
+    # Read once so a per-process layer, if there were one, would hold a copy
+    assert await worker_a.get("nexus_crm.manage_contacts:{}") == 1
+
+    generation = await worker_a.tag_generations(("adapter:nexus_crm",))
+    assert await worker_b.invalidate_tags("adapter:nexus_crm") == 1
+    assert await worker_a.get("nexus_crm.manage_contacts:{}") is None
+    assert not await worker_a.set("x", 0, tags=("adapter:nexus_crm",), if_generation=generation)
+
+    assert await worker_b.clear_pattern("nexus_crm.*") == 1
+    assert await worker_b.invalidate_tags("adapter:ngx_pulse") == 0
+    assert await worker_b.clear_pattern("*read*") == 1
+    assert await client.zcard("mcp:index:keys") == 0
+    assert await client.hlen("mcp:index:key_tags") == 0
+    assert not await client.exists("mcp:index:tag:adapter:other")
+
+
+@pytest.mark.asyncio
+async def test_entries_default_to_redis_when_available(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis()
+
+    async def redis_client():
+        return client
+
+    monkeypatch.setattr("mcp.utils.cache.get_redis_client", redis_client)
+    cache = CacheManager()
+    await cache.set("tool:{}", {"ok": True}, ttl=60)
+    assert await client.exists("mcp:tool:{}")
+    assert isinstance(cache.core_cache, RedisCacheBackend)
+    assert await cache.get("tool:{}") == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_served_stale_within_window():
+    cache = _cache()
+    await cache.set("fresh", "v", ttl=60, stale_ttl=60)
+    await cache.set("stale", "v", ttl=-1, stale_ttl=60)
+    await cache.set("gone", "v", ttl=-1, stale_ttl=0)
+
+    assert (await cache.get_entry("fresh")).is_stale is False
+    stale = await cache.get_entry("stale")
+    assert stale.is_stale and stale.value == "v"
+    assert await cache.get("stale") is None  # plain get only returns fresh values
+    assert await cache.get_entry("gone") is None
+
+
+@pytest.mark.asyncio
+async def test_registry_resolves_cache_policies():
+    registry = ToolRegistry()
+    config = ToolConfig(name="nexus_crm", endpoint="http://crm")
+    config.cache_policies = {
+        "*": CachePolicy(ttl=60, mutating_actions=frozenset({"create"})),
+        "nexus_crm.export": CachePolicy(cacheable=False),
+    }
+    definitions = [
+        ToolDefinition(name=name, description=name, input_schema={})
+        for name in ("nexus_crm.manage_contacts", "nexus_crm.export")
+    ]
+    await registry.register_tool("nexus_crm", config, definitions)
+
+    policy = registry.get_cache_policy("nexus_crm.manage_contacts")
+    assert policy.ttl == 60
+    assert policy.is_mutation({"action": "create"}) and not policy.is_mutation({"action": "list"})
+    assert registry.get_cache_policy("nexus_crm.export").cacheable is False
+    assert registry.get_cache_policy("unknown.tool") is registry.default_cache_policy
@@ -0,0 +1,116 @@
+"""
+Tests for the MCP gateway tool execution engine.
+"""
+
+import asyncio
+
+import pytest
+
+from mcp.config import ToolConfig
+from mcp.schemas import ToolDefinition
+from mcp.server.executor import ToolExecutionEngine
+from mcp.server.registry import ToolRegistry
+
+
+async def _registry(limits):
+    registry = ToolRegistry()
+    for name, (concurrency, timeout) in limits.items():
+        config = ToolConfig(name=name, endpoint=f"http://{name}")
+        config.max_concurrency = concurrency
+        config.timeout = timeout
+        definitions = [
+            ToolDefinition(name=f"{name}.{op}", description=op, input_schema={})
+            for op in ("a", "b", "c")
+        ]
+        await registry.register_tool(name, config, definitions)
+    return registry
+
+
+class _Recorder:
+    """Fake tool executor that records concurrency per adapter"""
+
+    def __init__(self, delay=0.05, failures=()):
+        self.delay = delay
+        self.failures = set(failures)
+        self.active = {}
+        self.peak = {}
+        self.calls = []
+
+    async def __call__(self, name, arguments):
+        adapter = name.split(".")[0]
+        self.active[adapter] = self.active.get(adapter, 0) + 1
+        self.peak[adapter] = max(self.peak.get(adapter, 0), self.active[adapter])
+        self.calls.append((name, arguments))
+        try:
+            await asyncio.sleep(arguments.get("delay", self.delay))
+            if name in self.failures:
+                return {"error": "boom"}
+            return {"tool": name, "value": arguments.get("value")}
+        finally:
+            self.active[adapter] -= 1
+
+
+@pytest.mark.asyncio
+async def test_independent_calls_run_concurrently_within_adapter_limits():
+    registry = await _registry({"nexus_core": (2, 5.0), "ngx_pulse": (4, 5.0)})
+    recorder = _Recorder(delay=0.05)
+    engine = ToolExecutionEngine(recorder, registry)
+    calls = [
+        {"id": f"c{i}", "name": f"{adapter}.a", "arguments": {}}
+        for i, adapter in enumerate(["nexus_core"] * 4 + ["ngx_pulse"] * 4)
+    ]
+
+    start = asyncio.get_event_loop().time()
+    executions = await engine.execute_all(calls)
+    elapsed = asyncio.get_event_loop().time() - start
+
+    assert [e.result.tool_call_id for e in executions] == [c["id"] for c in calls]
+    assert recorder.peak == {"nexus_core": 2, "ngx_pulse": 4}
+    assert elapsed < 0.3  # 8 sequential calls would take 0.4 s
+
+
+@pytest.mark.asyncio
+async def test_dependencies_pass_results_and_skip_on_failure():
+    registry = await _registry({"nexus_crm": (4, 5.0), "nexus_core": (4, 5.0)})
+    recorder = _Recorder(delay=0.01, failures={"nexus_core.b"})
+    engine = ToolExecutionEngine(recorder, registry)
+    calls = [
+        {"id": "contacts", "name": "nexus_crm.a", "arguments": {"value": {"id": 42}}},
+        {"id": "analytics", "name": "nexus_core.a", "depends_on": ["contacts"],
+         "arguments": {"client_id": "${contacts.value.id}"}},
+        {"id": "broken", "name": "nexus_core.b", "arguments": {}},
+        {"id": "after_broken", "name": "nexus_core.c", "depends_on": ["broken"], "arguments": {}},
+    ]
+
+    executions = {e.result.tool_call_id: e for e in await engine.execute_all(calls)}
+
+    assert ("nexus_core.a", {"client_id": 42}) in recorder.calls
+    assert executions["broken"].result.is_error
+    assert executions["after_broken"].skipped
+    assert "nexus_core.c" not in [name for name, _ in recorder.calls]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_in_completion_order_and_enforces_timeouts():
+    registry = await _registry({"ngx_pulse": (4, 0.05)})
+    engine = ToolExecutionEngine(_Recorder(), registry)
+    calls = [
+        {"id": "slow", "name": "ngx_pulse.a", "arguments": {"delay": 1.0}},
+        {"id": "fast", "name": "ngx_pulse.b", "arguments": {"delay": 0.0}},
+    ]
+
+    order = [e.result.tool_call_id async for e in engine.stream(calls)]
+    executions = await engine.execute_all(calls)
+
+    assert order == ["fast", "slow"]
+    assert "timed out" in executions[0].result.content["error"]
+
+
+def test_validate_rejects_cycles_and_unknown_dependencies():
+    with pytest.raises(ValueError, match="cycle"):
+        ToolExecutionEngine.validate([
+            {"id": "a", "name": "x.a", "depends_on": ["b"]},
+            {"id": "b", "name": "x.b", "depends_on": ["a"]},
+        ])
+    with pytest.raises(ValueError, match="unknown"):
+        ToolExecutionEngine.validate([{"id": "a", "name": "x.a", "depends_on": ["z"]}])
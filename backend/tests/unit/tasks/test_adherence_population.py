@@ -0,0 +1,80 @@
+"""
+Tests for the nightly adherence scoring task
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import fakeredis
+import fakeredis.aioredis
+
+import core.redis_pool as redis_pool
+import tasks.analytics as analytics
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def execute_query(self, table, query_type, **kwargs):
+        self.calls.append(kwargs)
+        offset, limit = kwargs["offset"], kwargs["limit"]
+        return {"data": self.rows[offset : offset + limit]}
+
+
+def make_row(i):
+    return {
+        "user_id": f"user-{i:04d}",
+        "engagement_score": 0.2 + (i % 7) / 10,
+        "consistency_score": 0.3 + (i % 5) / 10,
+        "days_since_last_interaction": i % 9,
+    }
+
+
+def test_population_is_scored_in_pages_beyond_the_row_cap(monkeypatch):
+    rows = [make_row(i) for i in range(2500)]
+    supabase = FakeSupabase(rows)
+    written = []
+
+    @asynccontextmanager
+    async def fake_redis():
+        yield None
+
+    async def fake_write(client, batch):
+        written.extend(batch.user_ids)
+        return len(batch)
+
+    monkeypatch.setattr(analytics, "SupabaseClient", lambda: supabase)
+    monkeypatch.setattr(analytics, "standalone_redis_client", fake_redis)
+    monkeypatch.setattr(analytics, "write_predictions_to_cache", fake_write)
+
+    result = asyncio.run(analytics._score_adherence_population(page_size=1000))
+
+    assert result["users_scored"] == 2500
+    assert result["predictions_cached"] == 2500
+    assert sum(result["risk_summary"].values()) == 2500
+    assert written == [row["user_id"] for row in rows]
+    assert [call["offset"] for call in supabase.calls] == [0, 1000, 2000]
+
+
+def test_each_run_gets_its_own_redis_client(monkeypatch):
+    server = fakeredis.FakeServer()
+    clients = []
+
+    def fake_from_url(url, **kwargs):
+        client = fakeredis.aioredis.FakeRedis(server=server, **kwargs)
+        clients.append(client)
+        return client
+
+    rows = [make_row(i) for i in range(10)]
+    monkeypatch.setattr(analytics, "SupabaseClient", lambda: FakeSupabase(rows))
+    monkeypatch.setattr(redis_pool.redis, "from_url", fake_from_url)
+
+    # Celery calls asyncio.run once per task, each with a new event loop
+    for _ in range(2):
+        result = asyncio.run(analytics._score_adherence_population(page_size=1000))
+        assert result["predictions_cached"] == 10
+
+    assert len(clients) == 2
+    assert len(fakeredis.FakeRedis(server=server).keys()) == 10
@@ -0,0 +1,100 @@
+"""
+Tests for the columnar analytics kernels
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from tasks.analytics_frames import (
+    MealFrame,
+    analyze_meals,
+    analyze_workouts,
+    iso_week_keys,
+    parse_timestamps,
+)
+
+
+def test_parse_timestamps_handles_naive_aware_and_missing():
+    parsed = parse_timestamps(["2024-01-15", "2024-01-15T07:30:00", None])
+    assert str(parsed[1]) == "2024-01-15T07:30:00"
+    assert np.isnat(parsed[2])
+
+    aware = parse_timestamps(["2024-01-15T07:30:00+02:00", datetime(2024, 1, 16, 9)])
+    # Wall-clock time is kept, as datetime.fromisoformat(...).hour did
+    assert str(aware[0]) == "2024-01-15T07:30:00"
+    assert str(aware[1]) == "2024-01-16T09:00:00"
+
+
+def test_iso_week_keys_match_isocalendar():
+    days = [date(2020, 12, 27) + timedelta(days=i) for i in range(400)]
+    keys = iso_week_keys(np.array(days, dtype="datetime64[D]"))
+    expected = [d.isocalendar()[:2] for d in days]
+    # Same key <=> same ISO (year, week)
+    for i in range(1, len(days)):
+        assert (keys[i] == keys[i - 1]) == (expected[i] == expected[i - 1])
+
+
+def test_workout_patterns():
+    workouts = [
+        {"date": "2024-01-01", "time": "2024-01-01T06:30:00", "duration_minutes": 45,
+         "intensity": "high", "performance_score": 80,
+         "exercises": [{"type": "strength", "muscle_groups": ["legs", "core"]}]},
+        {"date": "2024-01-03", "time": "2024-01-03T18:00:00", "duration_minutes": 60,
+         "intensity": "medium", "performance_score": 70,
+         "exercises": [{"type": "cardio", "muscle_groups": ["legs"]}]},
+        {"date": "2024-01-08", "time": "2024-01-08T06:00:00", "duration_minutes": 30,
+         "performance_score": 90},
+        {"time": "2024-01-09T06:00:00"},  # undated: dropped
+    ]
+    result = analyze_workouts(workouts, period_days=14)
+    patterns = result["patterns"]
+
+    assert patterns["frequency"] == {
+        "average_per_week": 1.5, "min_per_week": 1, "max_per_week": 2, "consistency": True,
+    }
+    assert patterns["timing"]["distribution"]["early_morning"] == 2
+    assert patterns["timing"]["preferred_time"] == "early_morning"
+    assert patterns["duration"]["average_duration"] == 45
+    assert patterns["intensity"]["distribution"]["medium"] == pytest.approx(2 / 3)
+    assert patterns["exercise_distribution"]["muscle_groups"] == {"legs": 2, "core": 1}
+    assert patterns["rest_days"] == {"average_rest_days": 2.5, "max_rest_period": 4, "typical_rest": 2}
+    assert 0 < patterns["consistency_score"] <= 100
+    assert result["optimal_times"][0] == {
+        "time_slot": "early_morning", "average_performance": 85.0, "sample_size": 2,
+    }
+    assert analyze_workouts([], 30)["patterns"]["frequency"] == {"average_per_week": 0}
+
+
+def test_meal_compliance():
+    plan = {"daily_meals": 3, "daily_calories": 2000,
+            "daily_macros": {"protein": 150, "carbs": 200, "fat": 60}}
+    meals = []
+    # Monday to Sunday: breakfast on weekdays only, late dinner on Saturday
+    for offset in range(7):
+        day = datetime(2024, 1, 1) + timedelta(days=offset)
+        if offset < 5:
+            meals.append({"logged_at": (day + timedelta(hours=8)).isoformat(), "meal_type": "Breakfast",
+                          "calories": 500, "protein": 40, "carbs": 50, "fat": 15})
+        meals.append({"logged_at": (day + timedelta(hours=13)).isoformat(), "meal_type": "lunch",
+                      "calories": 800, "protein": 60, "carbs": 80, "fat": 25})
+        meals.append({"logged_at": (day + timedelta(hours=23 if offset == 5 else 20)).isoformat(),
+                      "meal_type": "dinner", "calories": 700, "protein": 50, "carbs": 70, "fat": 20})
+
+    result = analyze_meals(plan, meals, period_days=7)
+    metrics = result["metrics"]
+    assert metrics["overall_compliance"] == pytest.approx(19 / 21 * 100)
+    assert metrics["calorie_compliance"]["average_daily"] == pytest.approx((5 * 2000 + 2 * 1500) / 7, abs=0.1)
+    assert metrics["calorie_compliance"]["under_days"] == 2
+    # 150 g protein on weekdays (100%), 110 g on weekends (73.3%)
+    assert metrics["macro_compliance"]["protein"] == 92.4
+    assert metrics["meal_timing_compliance"]["missed_breakfast"] == 2
+    assert metrics["meal_timing_compliance"]["late_dinners"] == 1
+    assert {(m["date"], m["meal"]) for m in metrics["missed_meals"]} == {
+        ("2024-01-06", "breakfast"), ("2024-01-07", "breakfast"),
+    }
+    assert "Tendency to skip breakfast on weekends" in result["patterns"]
+
+    frame = MealFrame.from_records(meals)
+    assert frame.meal_types == ("breakfast", "lunch", "dinner")